@@ -27,6 +27,8 @@ from typing import Iterable, Generator
 
 import requests
 
+from services import http_clients
+
 from ..provider_base import ILLMProvider
 from ..types import Task
 
@@ -78,12 +80,12 @@ class OllamaProvider(ILLMProvider):
         started = time.time()
         try:
             if self.stream:
-                resp = requests.post(url, json=payload, timeout=self.timeout, stream=True)
+                resp = http_clients.get_session("ollama").post(url, json=payload, timeout=self.timeout, stream=True)
                 resp.raise_for_status()
                 for chunk in self._iter_stream(resp):
                     yield chunk
             else:
-                resp = requests.post(url, json=payload, timeout=self.timeout)
+                resp = http_clients.get_session("ollama").post(url, json=payload, timeout=self.timeout)
                 resp.raise_for_status()
                 data = resp.json()
                 text = data.get("response", "").strip()
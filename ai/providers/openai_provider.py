@@ -24,6 +24,7 @@ import logging
 from ..provider_base import ILLMProvider
 from ..types import Task
 from agent_core.detect_mcp_url import get_mcp_products_url, get_mcp_web_search_url
+from services import http_clients
 from services.auth import create_mcp_token
 
 try:  # Import perezoso para no forzar dependencia si no se usa
@@ -32,6 +33,15 @@ except Exception:  # pragma: no cover - si la lib no está
     OpenAI = None  # type: ignore
 
 
+# Búsquedas y get_product_full_info invocadas por turno (los get_product_info van en batch)
+_MAX_DIRECT_TOOL_CALLS = 3
+
+
+def _sku_key(sku: str) -> str:
+    """Clave de SKU sin espacios ni mayúsculas (la API los resuelve igual)."""
+    return f"sku:{str(sku).strip().lower()}"
+
+
 class OpenAIProvider(ILLMProvider):
     name = "openai"
 
@@ -251,33 +261,50 @@ class OpenAIProvider(ILLMProvider):
 
         # IMPORTANTE: Agregar el mensaje del assistant con tool_calls antes de procesar las respuestas
         # Esto es requerido por la API de OpenAI para mantener el formato correcto de mensajes
-        messages.append(
-            {
-                "role": "assistant",
-                "content": choice.message.content,
-                "tool_calls": [
-                    {
-                        "id": call.id,
-                        "type": "function",
-                        "function": {
-                            "name": call.function.name,
-                            "arguments": call.function.arguments,
-                        }
+        assistant_message: Dict[str, Any] = {
+            "role": "assistant",
+            "content": choice.message.content,
+            "tool_calls": [
+                {
+                    "id": call.id,
+                    "type": "function",
+                    "function": {
+                        "name": call.function.name,
+                        "arguments": call.function.arguments,
                     }
-                    for call in tool_calls
-                ]
-            }
-        )
+                }
+                for call in tool_calls
+            ]
+        }
+        messages.append(assistant_message)
 
-        # Procesar tool_calls (ciclo de invocación MCP)
+        # Procesar tool_calls (ciclo de invocación MCP).
+        # Búsquedas y get_product_full_info se invocan en orden (con límite de seguridad);
+        # los get_product_info del turno, incluida la llamada sintética tras una búsqueda
+        # con resultado único, se difieren y se resuelven juntos con un único viaje al MCP.
         used_search_sku: str | None = None
         used_search_product_id: int | None = None
-        for idx, call in enumerate(tool_calls[:3]):  # límite de 3 calls por seguridad
+        has_product_info_call = any(c.function.name == "get_product_info" for c in tool_calls)
+        outputs: List[Dict[str, Any]] = []  # call_id, name, args y result (o lookup pendiente)
+        direct_calls = 0
+        for idx, call in enumerate(tool_calls):
             fn_name = call.function.name
+            call_id = getattr(call, "id", f"call_{idx}")
             try:
                 fn_args = json.loads(call.function.arguments or "{}")
             except Exception:
                 fn_args = {}
+            output: Dict[str, Any] = {"call_id": call_id, "name": fn_name, "args": fn_args}
+            outputs.append(output)
+
+            if fn_name != "get_product_info":
+                direct_calls += 1
+                if direct_calls > _MAX_DIRECT_TOOL_CALLS:
+                    output["result"] = {
+                        "error": "tool_call_limit",
+                        "message": f"Máximo {_MAX_DIRECT_TOOL_CALLS} llamadas de este tipo por turno",
+                    }
+                    continue
 
             # ------------------------------------------------------------------
             # Normalización defensiva de parámetros
@@ -297,7 +324,7 @@ class OpenAIProvider(ILLMProvider):
                 
                 if not query or not isinstance(query, str):
                     # Error: falta parámetro obligatorio
-                    tool_result = {
+                    output["result"] = {
                         "error": "missing_query",
                         "message": "El parámetro 'query' (string) es obligatorio para find_products_by_name"
                     }
@@ -305,89 +332,142 @@ class OpenAIProvider(ILLMProvider):
                         "Tool call find_products_by_name sin 'query' válido. Args recibidos: %s",
                         fn_args
                     )
-                else:
-                    # Llamada correcta al MCP
-                    tool_result = await self.call_mcp_tool(
-                        tool_name=fn_name,
-                        parameters={"query": query},
-                        user_role=user_role,
+                    continue
+
+                # Llamada correcta al MCP
+                tool_result = await self.call_mcp_tool(
+                    tool_name=fn_name,
+                    parameters={"query": query},
+                    user_role=user_role,
+                )
+                output["result"] = tool_result
+                # Auto-extracción de product_id y sku si búsqueda retorna 1 resultado único
+                single = False
+                if isinstance(tool_result, dict) and not tool_result.get("error"):
+                    items = tool_result.get("items", [])
+                    if isinstance(items, list) and len(items) == 1:
+                        single = True
+                        if items[0].get("product_id"):
+                            used_search_product_id = items[0]["product_id"]
+                            logging.debug(
+                                "Auto-extracción de product_id desde búsqueda: %s",
+                                used_search_product_id
+                            )
+                        if items[0].get("sku"):
+                            used_search_sku = items[0]["sku"]
+                            logging.debug(
+                                "Auto-extracción de SKU desde búsqueda: %s",
+                                used_search_sku
+                            )
+
+                # Si búsqueda retornó 1 producto y el modelo no pidió get_product_info,
+                # agregar una llamada sintética (una sola por turno) para completar información.
+                # Se resuelve junto con el resto de get_product_info, sin viaje extra.
+                if (
+                    single
+                    and (used_search_product_id or used_search_sku)
+                    and not has_product_info_call
+                    and not any(o.get("synthetic") for o in outputs)
+                ):
+                    synthetic_params: Dict[str, Any] = {}
+                    if used_search_product_id:
+                        synthetic_params["product_id"] = used_search_product_id
+                    if used_search_sku:
+                        synthetic_params["sku"] = used_search_sku
+                    synthetic_args = (
+                        {"product_id": used_search_product_id} if used_search_product_id else {"sku": used_search_sku}
                     )
-                    # Auto-extracción de product_id y sku si búsqueda retorna 1 resultado único
-                    if isinstance(tool_result, dict) and not tool_result.get("error"):
-                        items = tool_result.get("items", [])
-                        if isinstance(items, list) and len(items) == 1:
-                            if items[0].get("product_id"):
-                                used_search_product_id = items[0]["product_id"]
-                                logging.debug(
-                                    "Auto-extracción de product_id desde búsqueda: %s",
-                                    used_search_product_id
-                                )
-                            if items[0].get("sku"):
-                                used_search_sku = items[0]["sku"]
-                                logging.debug(
-                                    "Auto-extracción de SKU desde búsqueda: %s",
-                                    used_search_sku
-                                )
+                    # IMPORTANTE: Agregar la llamada sintética al assistant message
+                    # para que OpenAI reconozca el tool_call_id correspondiente
+                    assistant_message["tool_calls"].append({
+                        "id": "call_auto_product",
+                        "type": "function",
+                        "function": {
+                            "name": "get_product_info",
+                            "arguments": json.dumps(synthetic_args, ensure_ascii=False),
+                        }
+                    })
+                    outputs.append({
+                        "call_id": "call_auto_product",
+                        "name": "get_product_info",
+                        "args": synthetic_args,
+                        "lookup": synthetic_params,
+                        "synthetic": True,
+                    })
+                continue
+
+            # Tools basadas en producto: get_product_info, get_product_full_info
+            # Prioridad: product_id > sku (product_id es más confiable)
+            product_id = (
+                fn_args.get("product_id")      # Parámetro preferido
+                or used_search_product_id      # Fallback: ID extraído de búsqueda previa
+            )
+            sku = (
+                fn_args.get("sku")             # Parámetro SKU canónico
+                or fn_args.get("product_sku")  # Alias posible
+                or fn_args.get("code")         # Alias posible
+                or used_search_sku             # Fallback: SKU extraído de búsqueda previa
+            )
             
-            else:
-                # Tools basadas en producto: get_product_info, get_product_full_info
-                # Prioridad: product_id > sku (product_id es más confiable)
-                product_id = (
-                    fn_args.get("product_id")      # Parámetro preferido
-                    or used_search_product_id      # Fallback: ID extraído de búsqueda previa
+            if not product_id and (not sku or not isinstance(sku, str)):
+                # Error: falta parámetro obligatorio
+                output["result"] = {
+                    "error": "missing_identifier",
+                    "message": f"Se requiere 'product_id' o 'sku' para {fn_name}"
+                }
+                logging.warning(
+                    "Tool call %s sin identificador válido. Args: %s, used_product_id: %s, used_sku: %s",
+                    fn_name, fn_args, used_search_product_id, used_search_sku
                 )
-                sku = (
-                    fn_args.get("sku")             # Parámetro SKU canónico
-                    or fn_args.get("product_sku")  # Alias posible
-                    or fn_args.get("code")         # Alias posible
-                    or used_search_sku             # Fallback: SKU extraído de búsqueda previa
+                continue
+
+            # Validación de permisos para get_product_full_info
+            if fn_name == "get_product_full_info" and user_role not in {"admin", "colaborador"}:
+                output["result"] = {
+                    "error": "permission_denied",
+                    "message": f"El rol '{user_role}' no tiene permisos para get_product_full_info"
+                }
+                logging.warning(
+                    "Intento de usar get_product_full_info con rol '%s' (requiere admin/colaborador)",
+                    user_role
                 )
-                
-                if not product_id and (not sku or not isinstance(sku, str)):
-                    # Error: falta parámetro obligatorio
-                    tool_result = {
-                        "error": "missing_identifier",
-                        "message": f"Se requiere 'product_id' o 'sku' para {fn_name}"
-                    }
-                    logging.warning(
-                        "Tool call %s sin identificador válido. Args: %s, used_product_id: %s, used_sku: %s",
-                        fn_name, fn_args, used_search_product_id, used_search_sku
-                    )
-                else:
-                    # Validación de permisos para get_product_full_info
-                    if fn_name == "get_product_full_info" and user_role not in {"admin", "colaborador"}:
-                        tool_result = {
-                            "error": "permission_denied",
-                            "message": f"El rol '{user_role}' no tiene permisos para get_product_full_info"
-                        }
-                        logging.warning(
-                            "Intento de usar get_product_full_info con rol '%s' (requiere admin/colaborador)",
-                            user_role
-                        )
-                    else:
-                        # Llamada correcta al MCP (preferir product_id sobre sku)
-                        params = {}
-                        if product_id:
-                            params["product_id"] = product_id
-                        if sku:
-                            params["sku"] = sku
-                        tool_result = await self.call_mcp_tool(
-                            tool_name=fn_name,
-                            parameters=params,
-                            user_role=user_role,
-                        )
-
-            # Guardar tool call para logging
-            self._last_tool_calls.append({
-                "tool_name": fn_name,
-                "parameters": fn_args,
-                "success": not isinstance(tool_result, dict) or not tool_result.get("error"),
-                "result_summary": {
-                    "items_count": len(tool_result.get("items", [])) if isinstance(tool_result, dict) else 0,
-                    "product_id": tool_result.get("product_id") if isinstance(tool_result, dict) else None,
-                    "sku": tool_result.get("sku") if isinstance(tool_result, dict) else None,
-                } if isinstance(tool_result, dict) else {},
-            })
+                continue
+
+            # Llamada correcta al MCP (preferir product_id sobre sku)
+            params = {}
+            if product_id:
+                params["product_id"] = product_id
+            if sku:
+                params["sku"] = sku
+            if fn_name == "get_product_info":
+                output["lookup"] = params  # se resuelve abajo junto con el resto del turno
+            else:
+                output["result"] = await self.call_mcp_tool(
+                    tool_name=fn_name,
+                    parameters=params,
+                    user_role=user_role,
+                )
+
+        pending = [o for o in outputs if "lookup" in o]
+        resolved = await self._resolve_product_infos([o["lookup"] for o in pending], user_role)
+        for output, tool_result in zip(pending, resolved):
+            output["result"] = tool_result
+
+        for output in outputs:
+            fn_name = output["name"]
+            tool_result = output["result"]
+            if not output.get("synthetic"):
+                # Guardar tool call para logging
+                self._last_tool_calls.append({
+                    "tool_name": fn_name,
+                    "parameters": output["args"],
+                    "success": not isinstance(tool_result, dict) or not tool_result.get("error"),
+                    "result_summary": {
+                        "items_count": len(tool_result.get("items", [])) if isinstance(tool_result, dict) else 0,
+                        "product_id": tool_result.get("product_id") if isinstance(tool_result, dict) else None,
+                        "sku": tool_result.get("sku") if isinstance(tool_result, dict) else None,
+                    } if isinstance(tool_result, dict) else {},
+                })
             
             # DEBUG: Log del resultado de la tool antes de inyectarlo en mensajes
             tool_result_json = json.dumps(tool_result, ensure_ascii=False)
@@ -413,62 +493,12 @@ class OpenAIProvider(ILLMProvider):
             messages.append(
                 {
                     "role": "tool",
-                    "tool_call_id": getattr(call, "id", f"call_{idx}"),
+                    "tool_call_id": output["call_id"],
                     "name": fn_name,
                     "content": tool_result_json,
                 }
             )
 
-            # Si búsqueda retornó 1 producto y no hay get_product_info pendiente,
-            # forzar llamada sintética para completar información
-            if (
-                fn_name == "find_products_by_name"
-                and (used_search_product_id or used_search_sku)
-                and all(c.function.name != "get_product_info" for c in tool_calls)
-            ):
-                synthetic_params = {}
-                if used_search_product_id:
-                    synthetic_params["product_id"] = used_search_product_id
-                if used_search_sku:
-                    synthetic_params["sku"] = used_search_sku
-                
-                synthetic_result = await self.call_mcp_tool(
-                    tool_name="get_product_info",
-                    parameters=synthetic_params,
-                    user_role=user_role,
-                )
-                
-                # IMPORTANTE: Agregar la llamada sintética al assistant message
-                # para que OpenAI reconozca el tool_call_id correspondiente
-                synthetic_call_id = "call_auto_product"
-                synthetic_args = json.dumps(
-                    {"product_id": used_search_product_id} if used_search_product_id else {"sku": used_search_sku},
-                    ensure_ascii=False,
-                )
-                
-                # Buscar y actualizar el mensaje del assistant con el nuevo tool_call
-                for msg in messages:
-                    if msg.get("role") == "assistant" and "tool_calls" in msg:
-                        msg["tool_calls"].append({
-                            "id": synthetic_call_id,
-                            "type": "function",
-                            "function": {
-                                "name": "get_product_info",
-                                "arguments": synthetic_args,
-                            }
-                        })
-                        break
-                
-                messages.append(
-                    {
-                        "role": "tool",
-                        "tool_call_id": synthetic_call_id,
-                        "name": "get_product_info",
-                        "content": json.dumps(synthetic_result, ensure_ascii=False),
-                    }
-                )
-                break  # Cerrar ciclo temprano
-
         # Segunda llamada para obtener respuesta final
         try:
             followup = client.chat.completions.create(
@@ -619,6 +649,54 @@ class OpenAIProvider(ILLMProvider):
             )
         return base_tools
 
+    async def _resolve_product_infos(self, lookups: List[Dict[str, Any]], user_role: str) -> List[Dict[str, Any] | str]:
+        """Resuelve todos los `get_product_info` del turno con un único viaje al MCP.
+
+        ``lookups`` son los parámetros de cada llamada (``product_id`` y/o ``sku``); el
+        resultado respeta ese orden. Con dos o más productos se usa ``get_products_info``
+        (los no encontrados devuelven el mismo error que el camino individual); si el
+        batch falla se cae a una llamada por producto.
+        """
+        if len(lookups) < 2:
+            return [
+                await self.call_mcp_tool(tool_name="get_product_info", parameters=params, user_role=user_role)
+                for params in lookups
+            ]
+        product_ids: List[int] = []
+        skus: List[str] = []
+        for params in lookups:
+            pid = params.get("product_id")
+            if pid and str(pid).isdigit():
+                product_ids.append(int(pid))
+            elif isinstance(params.get("sku"), str):
+                skus.append(params["sku"].strip())
+        result = await self.call_mcp_tool(
+            tool_name="get_products_info",
+            parameters={"product_ids": product_ids, "skus": skus},
+            user_role=user_role,
+        )
+        batch_ok = isinstance(result, dict) and not result.get("error")
+        resolved: Dict[str, Dict[str, Any]] = {}
+        for item in result.get("items", []) if batch_ok else []:
+            if item.get("product_id"):
+                resolved[f"id:{item['product_id']}"] = item
+            if item.get("sku"):
+                resolved[_sku_key(item["sku"])] = item
+        out: List[Dict[str, Any] | str] = []
+        for params in lookups:
+            pid = params.get("product_id")
+            sku = params.get("sku")
+            item = resolved.get(f"id:{pid}") if pid else None
+            if item is None and isinstance(sku, str):
+                item = resolved.get(_sku_key(sku))
+            if item is not None:
+                out.append(item)
+            elif batch_ok:
+                out.append({"error": "tool_call_failed", "status": 404})
+            else:
+                out.append(await self.call_mcp_tool(tool_name="get_product_info", parameters=params, user_role=user_role))
+        return out
+
     async def call_mcp_tool(self, *, tool_name: str, parameters: Dict[str, Any], user_role: str = "guest") -> Dict[str, Any] | str:
         """Invoca el servidor MCP de productos de forma resiliente con autenticación JWT.
 
@@ -649,12 +727,12 @@ class OpenAIProvider(ILLMProvider):
         headers = {"X-MCP-Token": token}
         
         try:
-            async with httpx.AsyncClient(timeout=8.0) as client:
-                resp = await client.post(mcp_url, json=payload, headers=headers)
-                if resp.status_code != 200:
-                    logging.warning("MCP respondió status=%s detail=%s", resp.status_code, resp.text[:200])
-                    return {"error": "tool_call_failed", "status": resp.status_code}
-                return resp.json().get("result", {})
+            client = http_clients.get_client("mcp_products")
+            resp = await client.post(mcp_url, json=payload, headers=headers)
+            if resp.status_code != 200:
+                logging.warning("MCP respondió status=%s detail=%s", resp.status_code, resp.text[:200])
+                return {"error": "tool_call_failed", "status": resp.status_code}
+            return resp.json().get("result", {})
         except httpx.RequestError as e:  # problemas de red, DNS, timeout
             logging.error("Fallo de red MCP tool=%s: %s", tool_name, e)
             return {"error": "tool_network_failure"}
@@ -671,12 +749,12 @@ class OpenAIProvider(ILLMProvider):
         mcp_url = get_mcp_web_search_url()
         payload = {"tool_name": tool_name, "parameters": parameters}
         try:
-            async with httpx.AsyncClient(timeout=6.0) as client:
-                resp = await client.post(mcp_url, json=payload)
-                if resp.status_code != 200:
-                    logging.warning("MCP(web) respondió status=%s detail=%s", resp.status_code, resp.text[:200])
-                    return {"error": "tool_call_failed", "status": resp.status_code}
-                return resp.json().get("result", {})
+            client = http_clients.get_client("mcp_web_search")
+            resp = await client.post(mcp_url, json=payload)
+            if resp.status_code != 200:
+                logging.warning("MCP(web) respondió status=%s detail=%s", resp.status_code, resp.text[:200])
+                return {"error": "tool_call_failed", "status": resp.status_code}
+            return resp.json().get("result", {})
         except httpx.RequestError as e:
             logging.error("Fallo de red MCP(web) tool=%s: %s", tool_name, e)
             return {"error": "tool_network_failure"}
@@ -735,78 +813,96 @@ class OpenAIProvider(ILLMProvider):
             return f"openai:{content.strip()}"
 
         # IMPORTANTE: Agregar el mensaje del assistant con tool_calls antes de procesar las respuestas
-        messages.append(
-            {
-                "role": "assistant",
-                "content": choice.message.content,
-                "tool_calls": [
-                    {
-                        "id": call.id,
-                        "type": "function",
-                        "function": {
-                            "name": call.function.name,
-                            "arguments": call.function.arguments,
-                        }
+        assistant_message: Dict[str, Any] = {
+            "role": "assistant",
+            "content": choice.message.content,
+            "tool_calls": [
+                {
+                    "id": call.id,
+                    "type": "function",
+                    "function": {
+                        "name": call.function.name,
+                        "arguments": call.function.arguments,
                     }
-                    for call in tool_calls
-                ]
-            }
-        )
+                }
+                for call in tool_calls
+            ]
+        }
+        messages.append(assistant_message)
 
-        # Procesar secuencialmente cada tool_call (hasta 2 pasos búsqueda→info)
+        # Procesar cada tool_call (búsqueda→info); los get_product_info se resuelven juntos al final
         tool_results_for_model: List[Dict[str, Any]] = []
         used_search_sku: str | None = None
-        used_search_product_id: int | None = None
         # Reiniciar lista de tool calls para esta generación
         self._last_tool_calls = []
+        has_product_info_call = any(c.function.name == "get_product_info" for c in tool_calls)
+        outputs: List[Dict[str, Any]] = []
+        direct_calls = 0
         
-        for idx, call in enumerate(tool_calls[:3]):  # límite prudente MVP
+        for idx, call in enumerate(tool_calls):
             fn_name = call.function.name
+            output: Dict[str, Any] = {"call_id": getattr(call, "id", f"call_{idx}"), "name": fn_name}
+            outputs.append(output)
             try:
                 fn_args = json.loads(call.function.arguments or "{}")
             except Exception:
                 fn_args = {}
+            if fn_name != "get_product_info":
+                direct_calls += 1
+                if direct_calls > _MAX_DIRECT_TOOL_CALLS:  # límite prudente MVP
+                    output["result"] = {"error": "tool_call_limit"}
+                    continue
             if fn_name == "find_products_by_name":
                 query = fn_args.get("query") or fn_args.get("name") or fn_args.get("product_name")
                 if not query or not isinstance(query, str):
-                    tool_result = {"error": "missing_query"}
-                else:
-                    tool_result = await self.call_mcp_tool(tool_name=fn_name, parameters={"query": query}, user_role=user_role)
-                    # Si hay un único resultado podemos preparar un segundo paso auto
-                    if isinstance(tool_result, dict) and not tool_result.get("error"):
-                        items = tool_result.get("items", [])
-                        if isinstance(items, list) and len(items) == 1 and items[0].get("sku"):
-                            used_search_sku = items[0]["sku"]
+                    output["result"] = {"error": "missing_query"}
+                    continue
+                tool_result = await self.call_mcp_tool(tool_name=fn_name, parameters={"query": query}, user_role=user_role)
+                output["result"] = tool_result
+                # Si hay un único resultado preparamos un segundo paso auto (sin viaje extra)
+                if isinstance(tool_result, dict) and not tool_result.get("error"):
+                    items = tool_result.get("items", [])
+                    if isinstance(items, list) and len(items) == 1 and items[0].get("sku"):
+                        used_search_sku = items[0]["sku"]
+                        if not has_product_info_call and not any(o.get("synthetic") for o in outputs):
+                            assistant_message["tool_calls"].append({
+                                "id": "call_auto_sku",
+                                "type": "function",
+                                "function": {
+                                    "name": "get_product_info",
+                                    "arguments": json.dumps({"sku": used_search_sku}, ensure_ascii=False),
+                                },
+                            })
+                            outputs.append({
+                                "call_id": "call_auto_sku",
+                                "name": "get_product_info",
+                                "lookup": {"sku": used_search_sku},
+                                "synthetic": True,
+                            })
             else:
                 # Tools basadas en sku
                 sku = fn_args.get("sku") or used_search_sku
                 if not sku or not isinstance(sku, str):
-                    tool_result = {"error": "missing_sku"}
+                    output["result"] = {"error": "missing_sku"}
+                elif fn_name == "get_product_info":
+                    output["lookup"] = {"sku": sku}
                 else:
-                    tool_result = await self.call_mcp_tool(tool_name=fn_name, parameters={"sku": sku}, user_role=user_role)
-            tool_results_for_model.append({"name": fn_name, "result": tool_result})
+                    output["result"] = await self.call_mcp_tool(tool_name=fn_name, parameters={"sku": sku}, user_role=user_role)
+
+        pending = [o for o in outputs if "lookup" in o]
+        resolved = await self._resolve_product_infos([o["lookup"] for o in pending], user_role)
+        for output, tool_result in zip(pending, resolved):
+            output["result"] = tool_result
+        for output in outputs:
+            tool_results_for_model.append({"name": output["name"], "result": output["result"]})
             messages.append(
                 {
                     "role": "tool",
-                    "tool_call_id": getattr(call, "id", f"call_{idx}"),
-                    "name": fn_name,
-                    "content": json.dumps(tool_result, ensure_ascii=False),
+                    "tool_call_id": output["call_id"],
+                    "name": output["name"],
+                    "content": json.dumps(output["result"], ensure_ascii=False),
                 }
             )
-            # Si acabamos de hacer búsqueda y obtuvimos 1 SKU, forzamos siguiente llamada get_product_info
-            if fn_name == "find_products_by_name" and used_search_sku and all(c.function.name != "get_product_info" for c in tool_calls):
-                # Inyectar manualmente una tool call sintética para obtener info
-                synthetic_result = await self.call_mcp_tool(tool_name="get_product_info", parameters={"sku": used_search_sku}, user_role=user_role)
-                messages.append(
-                    {
-                        "role": "tool",
-                        "tool_call_id": f"call_auto_sku",
-                        "name": "get_product_info",
-                        "content": json.dumps(synthetic_result, ensure_ascii=False),
-                    }
-                )
-                tool_results_for_model.append({"name": "get_product_info", "result": synthetic_result})
-                break  # cerramos ciclo temprano
 
         try:
             followup = client.chat.completions.create(
@@ -0,0 +1,31 @@
+# NG-HEADER: Nombre de archivo: 3f9c2a7d1b04_chat_messages_session_created_index.py
+# NG-HEADER: Ubicación: db/migrations/versions/3f9c2a7d1b04_chat_messages_session_created_index.py
+# NG-HEADER: Descripción: Índice compuesto (session_id, created_at) para historial de chat
+# NG-HEADER: Lineamientos: Ver AGENTS.md
+"""chat_messages: índice compuesto (session_id, created_at)
+
+Revision ID: 3f9c2a7d1b04
+Revises: a1b2c3d4e5f6
+Create Date: 2026-10-18 10:00:00.000000
+
+Reemplaza ix_chat_messages_session (solo session_id): el índice compuesto cubre
+el mismo prefijo y además resuelve el ORDER BY created_at DESC LIMIT n del
+historial reciente sin sort.
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '3f9c2a7d1b04'
+down_revision = 'a1b2c3d4e5f6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_chat_messages_session_created', 'chat_messages', ['session_id', 'created_at'], unique=False)
+    op.drop_index('ix_chat_messages_session', table_name='chat_messages')
+
+
+def downgrade() -> None:
+    op.create_index('ix_chat_messages_session', 'chat_messages', ['session_id'], unique=False)
+    op.drop_index('ix_chat_messages_session_created', table_name='chat_messages')
@@ -0,0 +1,39 @@
+# NG-HEADER: Nombre de archivo: 7c41e9a2d5f3_keyset_pagination_indexes.py
+# NG-HEADER: Ubicación: db/migrations/versions/7c41e9a2d5f3_keyset_pagination_indexes.py
+# NG-HEADER: Descripción: Índices compuestos (clave de orden, id) para paginación keyset de listados
+# NG-HEADER: Lineamientos: Ver AGENTS.md
+"""índices compuestos para paginación keyset
+
+Revision ID: 7c41e9a2d5f3
+Revises: 3f9c2a7d1b04
+Create Date: 2026-10-18 12:00:00.000000
+
+Cada listado ordena por (clave, id); el índice compuesto resuelve tanto el
+ORDER BY ... LIMIT como el predicado del cursor sin sort ni OFFSET. En
+chat_sessions reemplaza al índice simple sobre last_message_at.
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '7c41e9a2d5f3'
+down_revision = '3f9c2a7d1b04'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_supplier_products_last_seen_id', 'supplier_products', ['last_seen_at', 'id'], unique=False)
+    op.create_index('ix_purchases_created_id', 'purchases', ['created_at', 'id'], unique=False)
+    op.create_index('ix_customers_name_id', 'customers', ['name', 'id'], unique=False)
+    op.create_index('idx_market_alerts_created_id', 'market_alerts', ['created_at', 'id'], unique=False)
+    op.create_index('ix_chat_sessions_last_message_sid', 'chat_sessions', ['last_message_at', 'session_id'], unique=False)
+    op.drop_index('ix_chat_sessions_last_message', table_name='chat_sessions')
+
+
+def downgrade() -> None:
+    op.create_index('ix_chat_sessions_last_message', 'chat_sessions', ['last_message_at'], unique=False)
+    op.drop_index('ix_chat_sessions_last_message_sid', table_name='chat_sessions')
+    op.drop_index('idx_market_alerts_created_id', table_name='market_alerts')
+    op.drop_index('ix_customers_name_id', table_name='customers')
+    op.drop_index('ix_purchases_created_id', table_name='purchases')
+    op.drop_index('ix_supplier_products_last_seen_id', table_name='supplier_products')
@@ -0,0 +1,41 @@
+# NG-HEADER: Nombre de archivo: 8d2b5e41c7a9_enrichment_job_items.py
+# NG-HEADER: Ubicación: db/migrations/versions/8d2b5e41c7a9_enrichment_job_items.py
+# NG-HEADER: Descripción: Tabla de ítems por producto para jobs de enriquecimiento masivo
+# NG-HEADER: Lineamientos: Ver AGENTS.md
+"""ítems de jobs de enriquecimiento masivo
+
+Revision ID: 8d2b5e41c7a9
+Revises: 7c41e9a2d5f3
+Create Date: 2026-10-18 18:00:00.000000
+
+El job (``jobs.type='bulk_enrich'``) guarda parámetros y resumen; cada producto
+tiene su fila con estado para poder consultar el progreso y reanudar tras un
+reinicio sin repetir lo ya procesado.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '8d2b5e41c7a9'
+down_revision = '7c41e9a2d5f3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'enrichment_job_items',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('job_id', sa.Integer(), sa.ForeignKey('jobs.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(length=16), nullable=False, server_default='pending'),
+        sa.Column('detail', sa.String(length=300), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index('ix_enrichment_job_items_job_status', 'enrichment_job_items', ['job_id', 'status'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_enrichment_job_items_job_status', table_name='enrichment_job_items')
+    op.drop_table('enrichment_job_items')
@@ -0,0 +1,34 @@
+# NG-HEADER: Nombre de archivo: 9e3c6f52d8b0_import_commit_checkpoint.py
+# NG-HEADER: Ubicación: db/migrations/versions/9e3c6f52d8b0_import_commit_checkpoint.py
+# NG-HEADER: Descripción: Checkpoint y progreso del commit por lotes de import_jobs
+# NG-HEADER: Lineamientos: Ver AGENTS.md
+"""checkpoint de commit en import_jobs
+
+Revision ID: 9e3c6f52d8b0
+Revises: 8d2b5e41c7a9
+Create Date: 2026-10-18 20:00:00.000000
+
+El commit de una lista de precios corre en background por lotes: ``commit_cursor``
+guarda el último ``import_job_rows.id`` aplicado para reanudar sin repetir filas,
+``commit_result`` el progreso/contadores y ``updated_at`` sirve de heartbeat.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '9e3c6f52d8b0'
+down_revision = '8d2b5e41c7a9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('import_jobs', sa.Column('commit_cursor', sa.Integer(), nullable=True))
+    op.add_column('import_jobs', sa.Column('commit_result', sa.JSON(), nullable=True))
+    op.add_column('import_jobs', sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('import_jobs', 'updated_at')
+    op.drop_column('import_jobs', 'commit_result')
+    op.drop_column('import_jobs', 'commit_cursor')
@@ -0,0 +1,45 @@
+# NG-HEADER: Nombre de archivo: a4c8e2f17b3d_supplier_mail_messages.py
+# NG-HEADER: Ubicación: db/migrations/versions/a4c8e2f17b3d_supplier_mail_messages.py
+# NG-HEADER: Descripción: Registro de mensajes de buzón de proveedor ya procesados (ingesta POP/IMAP)
+# NG-HEADER: Lineamientos: Ver AGENTS.md
+"""mensajes de buzón de proveedor procesados
+
+Revision ID: a4c8e2f17b3d
+Revises: 9e3c6f52d8b0
+Create Date: 2026-10-18 21:00:00.000000
+
+La ingesta de emails de proveedores (POP3/IMAP) es incremental: cada UID del
+buzón ya importado (o descartado) queda registrado para no volver a descargarlo,
+y el ``message_id`` evita duplicar un mismo mail que aparezca en otra carpeta.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'a4c8e2f17b3d'
+down_revision = '9e3c6f52d8b0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'supplier_mail_messages',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('supplier_id', sa.Integer(), sa.ForeignKey('suppliers.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('mailbox', sa.String(length=300), nullable=False),
+        sa.Column('uid', sa.String(length=200), nullable=False),
+        sa.Column('message_id', sa.String(length=300), nullable=True),
+        sa.Column('status', sa.String(length=16), nullable=False, server_default='done'),
+        sa.Column('purchase_id', sa.Integer(), sa.ForeignKey('purchases.id', ondelete='SET NULL'), nullable=True),
+        sa.Column('detail', sa.String(length=300), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.UniqueConstraint('supplier_id', 'mailbox', 'uid', name='ux_supplier_mail_messages_uid'),
+    )
+    op.create_index('ix_supplier_mail_messages_message_id', 'supplier_mail_messages', ['supplier_id', 'message_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_supplier_mail_messages_message_id', table_name='supplier_mail_messages')
+    op.drop_table('supplier_mail_messages')
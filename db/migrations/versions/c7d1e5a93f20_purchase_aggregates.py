@@ -0,0 +1,70 @@
+# NG-HEADER: Nombre de archivo: c7d1e5a93f20_purchase_aggregates.py
+# NG-HEADER: Ubicación: db/migrations/versions/c7d1e5a93f20_purchase_aggregates.py
+# NG-HEADER: Descripción: Agregados por compra (líneas, sin vincular, totales, última actividad) e índices de listado
+# NG-HEADER: Lineamientos: Ver AGENTS.md
+"""agregados denormalizados en purchases
+
+Revision ID: c7d1e5a93f20
+Revises: a4c8e2f17b3d
+Create Date: 2026-10-19 10:00:00.000000
+
+El listado de compras mostraba sólo el encabezado y el detalle recalculaba
+totales desde ``purchase_lines`` en cada request. Ahora cada compra guarda
+``lines_count``, ``unmatched_count``, ``subtotal``, ``total`` y
+``last_activity_at``, mantenidos en el mismo flush que modifica las líneas
+(``db.purchase_aggregates``). Se rellenan para las compras existentes y
+se agregan índices (status|supplier_id, created_at, id) para que el listado
+filtrado sea un único scan ordenado.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'c7d1e5a93f20'
+down_revision = 'a4c8e2f17b3d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('purchases', sa.Column('lines_count', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('purchases', sa.Column('unmatched_count', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('purchases', sa.Column('subtotal', sa.Numeric(14, 2), nullable=False, server_default='0'))
+    op.add_column('purchases', sa.Column('total', sa.Numeric(14, 2), nullable=False, server_default='0'))
+    op.add_column('purchases', sa.Column('last_activity_at', sa.DateTime(), nullable=True))
+
+    # Backfill: mismas reglas que el recálculo en línea (IVA redondeado a centavos)
+    op.execute(
+        """
+        UPDATE purchases SET
+            lines_count = COALESCE(agg.n, 0),
+            unmatched_count = COALESCE(agg.unmatched, 0),
+            subtotal = ROUND(COALESCE(agg.subtotal, 0), 2),
+            total = ROUND(COALESCE(agg.subtotal, 0), 2)
+                    + ROUND(COALESCE(agg.subtotal, 0) * COALESCE(purchases.vat_rate, 0) / 100, 2),
+            last_activity_at = COALESCE(purchases.updated_at, purchases.created_at)
+        FROM (
+            SELECT purchase_id,
+                   COUNT(*) AS n,
+                   SUM(CASE WHEN state <> 'OK' THEN 1 ELSE 0 END) AS unmatched,
+                   SUM(qty * unit_cost * (100 - COALESCE(line_discount, 0)) / 100) AS subtotal
+            FROM purchase_lines
+            GROUP BY purchase_id
+        ) AS agg
+        WHERE agg.purchase_id = purchases.id
+        """
+    )
+    op.execute("UPDATE purchases SET last_activity_at = COALESCE(updated_at, created_at) WHERE last_activity_at IS NULL")
+
+    op.create_index('ix_purchases_status_created', 'purchases', ['status', 'created_at', 'id'])
+    op.create_index('ix_purchases_supplier_created', 'purchases', ['supplier_id', 'created_at', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_purchases_supplier_created', table_name='purchases')
+    op.drop_index('ix_purchases_status_created', table_name='purchases')
+    op.drop_column('purchases', 'last_activity_at')
+    op.drop_column('purchases', 'total')
+    op.drop_column('purchases', 'subtotal')
+    op.drop_column('purchases', 'unmatched_count')
+    op.drop_column('purchases', 'lines_count')
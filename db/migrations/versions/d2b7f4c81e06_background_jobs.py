@@ -0,0 +1,40 @@
+# NG-HEADER: Nombre de archivo: d2b7f4c81e06_background_jobs.py
+# NG-HEADER: Ubicación: db/migrations/versions/d2b7f4c81e06_background_jobs.py
+# NG-HEADER: Descripción: Estado persistido de jobs en background (catálogo PDF, remitos, buzón POP)
+# NG-HEADER: Lineamientos: Ver AGENTS.md
+"""estado de jobs en background
+
+Revision ID: d2b7f4c81e06
+Revises: c7d1e5a93f20
+Create Date: 2026-10-19 12:00:00.000000
+
+Los jobs de catálogo PDF, importación de remitos y buzón POP guardaban su estado
+en memoria del worker que los ejecutaba: un polling atendido por otro worker
+respondía 404. Ahora el estado se persiste en ``background_jobs`` por id de job.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'd2b7f4c81e06'
+down_revision = 'c7d1e5a93f20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'background_jobs',
+        sa.Column('id', sa.String(length=32), primary_key=True),
+        sa.Column('kind', sa.String(length=32), nullable=False),
+        sa.Column('status', sa.String(length=16), nullable=False, server_default='queued'),
+        sa.Column('data', sa.JSON(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index('ix_background_jobs_kind_updated', 'background_jobs', ['kind', 'updated_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_background_jobs_kind_updated', table_name='background_jobs')
+    op.drop_table('background_jobs')
@@ -301,6 +301,44 @@ class Job(Base):
     result: Mapped[Optional[dict]] = mapped_column(JSON)
 
 
+class BackgroundJob(Base):
+    """Estado de un job en background de la API (catálogo PDF, remito, buzón POP).
+
+    Lo escribe el worker que ejecuta el job (``services.job_registry``) para que el
+    polling responda desde cualquier worker. ``data`` es el ``to_dict()`` del job.
+    """
+
+    __tablename__ = "background_jobs"
+    __table_args__ = (
+        Index("ix_background_jobs_kind_updated", "kind", "updated_at"),
+    )
+
+    id: Mapped[str] = mapped_column(String(32), primary_key=True)
+    kind: Mapped[str] = mapped_column(String(32))
+    status: Mapped[str] = mapped_column(String(16), default="queued")
+    data: Mapped[dict] = mapped_column(JSON)
+    created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
+    updated_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
+
+
+class EnrichmentJobItem(Base):
+    """Estado por producto de un job de enriquecimiento masivo (``jobs.type='bulk_enrich'``)."""
+
+    __tablename__ = "enrichment_job_items"
+    __table_args__ = (
+        Index("ix_enrichment_job_items_job_status", "job_id", "status"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    job_id: Mapped[int] = mapped_column(ForeignKey("jobs.id", ondelete="CASCADE"))
+    product_id: Mapped[int] = mapped_column(Integer)
+    # pending | running | done | skipped | error
+    status: Mapped[str] = mapped_column(String(16), default="pending")
+    detail: Mapped[Optional[str]] = mapped_column(String(300), nullable=True)
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    updated_at: Mapped[datetime] = mapped_column(default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
 class Supplier(Base):
     __tablename__ = "suppliers"
 
@@ -341,6 +379,8 @@ class SupplierProduct(Base):
     __tablename__ = "supplier_products"
     __table_args__ = (
         UniqueConstraint("supplier_id", "supplier_product_id"),
+        # Paginación keyset del listado de productos (orden por defecto)
+        Index("ix_supplier_products_last_seen_id", "last_seen_at", "id"),
     )
 
     id: Mapped[int] = mapped_column(primary_key=True)
@@ -521,6 +561,10 @@ class ImportJob(Base):
     created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
     status: Mapped[str] = mapped_column(String(20), default="DRY_RUN")
     summary_json: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    # Commit por lotes: último ImportJobRow.id aplicado (checkpoint) y progreso/resultado
+    commit_cursor: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    commit_result: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    updated_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
 
     rows: Mapped[list["ImportJobRow"]] = relationship(back_populates="job")
 
@@ -648,6 +692,9 @@ class Purchase(Base):
             "status IN ('BORRADOR','VALIDADA','CONFIRMADA','ANULADA')",
             name="ck_purchases_status",
         ),
+        Index("ix_purchases_created_id", "created_at", "id"),
+        Index("ix_purchases_status_created", "status", "created_at", "id"),
+        Index("ix_purchases_supplier_created", "supplier_id", "created_at", "id"),
     )
 
     id: Mapped[int] = mapped_column(primary_key=True)
@@ -662,6 +709,12 @@ class Purchase(Base):
     created_by: Mapped[Optional[int]] = mapped_column(ForeignKey("users.id", ondelete="SET NULL"))
     created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Agregados de las líneas, mantenidos en cada flush por db.purchase_aggregates
+    lines_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    unmatched_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    subtotal: Mapped[Numeric] = mapped_column(Numeric(14, 2), default=0, server_default="0")
+    total: Mapped[Numeric] = mapped_column(Numeric(14, 2), default=0, server_default="0")
+    last_activity_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
 
     supplier: Mapped["Supplier"] = relationship()
     lines: Mapped[list["PurchaseLine"]] = relationship(back_populates="purchase")
@@ -708,6 +761,32 @@ class PurchaseAttachment(Base):
     purchase: Mapped["Purchase"] = relationship(back_populates="attachments")
 
 
+class SupplierMailMessage(Base):
+    """Mensaje del buzón de un proveedor ya procesado por la ingesta de emails (POP/IMAP).
+
+    ``uid`` es el UIDL de POP3 o el UID de IMAP; ``mailbox`` identifica el buzón
+    (incluye UIDVALIDITY en IMAP) para que los UIDs no se confundan entre carpetas.
+    """
+
+    __tablename__ = "supplier_mail_messages"
+    __table_args__ = (
+        UniqueConstraint("supplier_id", "mailbox", "uid", name="ux_supplier_mail_messages_uid"),
+        Index("ix_supplier_mail_messages_message_id", "supplier_id", "message_id"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    supplier_id: Mapped[int] = mapped_column(ForeignKey("suppliers.id", ondelete="CASCADE"))
+    mailbox: Mapped[str] = mapped_column(String(300))
+    uid: Mapped[str] = mapped_column(String(200))
+    message_id: Mapped[Optional[str]] = mapped_column(String(300), nullable=True)
+    # done | skipped | error (los error se reintentan en la próxima corrida)
+    status: Mapped[str] = mapped_column(String(16), default="done")
+    purchase_id: Mapped[Optional[int]] = mapped_column(ForeignKey("purchases.id", ondelete="SET NULL"), nullable=True)
+    detail: Mapped[Optional[str]] = mapped_column(String(300), nullable=True)
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    updated_at: Mapped[datetime] = mapped_column(default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
 class ImportLog(Base):
     __tablename__ = "import_logs"
 
@@ -786,6 +865,7 @@ class Customer(Base):
     __table_args__ = (
         UniqueConstraint("email", name="ux_customers_email"),
         UniqueConstraint("doc_id", name="ux_customers_doc"),
+        Index("ix_customers_name_id", "name", "id"),
     )
 
     id: Mapped[int] = mapped_column(primary_key=True)
@@ -969,6 +1049,7 @@ class MarketAlert(Base):
     __table_args__ = (
         Index("idx_market_alerts_product_id", "product_id"),
         Index("idx_market_alerts_created_at", "created_at"),
+        Index("idx_market_alerts_created_id", "created_at", "id"),
         Index("idx_market_alerts_resolved", "resolved"),
         # Índice compuesto para consultas de alertas activas por producto
         Index("idx_market_alerts_product_active", "product_id", "resolved"),
@@ -1130,7 +1211,7 @@ class ChatSession(Base):
     __table_args__ = (
         Index("ix_chat_sessions_user", "user_identifier"),
         Index("ix_chat_sessions_status", "status"),
-        Index("ix_chat_sessions_last_message", "last_message_at"),
+        Index("ix_chat_sessions_last_message_sid", "last_message_at", "session_id"),
         Index("ix_chat_sessions_created", "created_at"),
         CheckConstraint(
             "status IN ('new','reviewed','archived')",
@@ -1158,7 +1239,7 @@ class ChatMessage(Base):
     """Representa un mensaje en una conversación de chat (historial)."""
     __tablename__ = "chat_messages"
     __table_args__ = (
-        Index("ix_chat_messages_session", "session_id"),
+        Index("ix_chat_messages_session_created", "session_id", "created_at"),
         Index("ix_chat_messages_created", "created_at"),
     )
 
@@ -1170,3 +1251,8 @@ class ChatMessage(Base):
     meta: Mapped[Optional[dict]] = mapped_column(JSONBCompat, nullable=True, default=dict, server_default='{}')  # Ej: {"tool_name": "...", "tokens": 123}
 
     session: Mapped["ChatSession"] = relationship(back_populates="messages")
+
+
+# Listener ORM que mantiene los agregados de ``purchases``: se registra acá para que
+# todo proceso que use los modelos (API, workers, scripts) lo tenga activo.
+from . import purchase_aggregates as _purchase_aggregates  # noqa: E402,F401
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# NG-HEADER: Nombre de archivo: purchase_aggregates.py
+# NG-HEADER: Ubicación: db/purchase_aggregates.py
+# NG-HEADER: Descripción: Mantenimiento transaccional de los agregados por compra (líneas, sin vincular, totales, actividad)
+# NG-HEADER: Lineamientos: Ver AGENTS.md
+"""Agregados denormalizados de ``purchases``.
+
+Cada compra guarda ``lines_count``, ``unmatched_count`` (líneas en estado
+distinto de ``OK``), ``subtotal``, ``total`` (subtotal + IVA según ``vat_rate``)
+y ``last_activity_at``. Así el listado es un scan sobre ``purchases`` sin
+agregar ``purchase_lines`` por fila.
+
+Se recalculan en el mismo flush (y por lo tanto en la misma transacción) en que
+cambian las líneas o el encabezado de una compra, vía evento ORM ``after_flush``:
+cubre ``update_purchase``, ``validate_purchase``, ``confirm_purchase``,
+``cancel_purchase`` y cualquier otro camino que escriba por el ORM (imports,
+iAVaL, vinculación desde catálogo). El recálculo es una única consulta agrupada
+para todas las compras tocadas en el flush, más un ``UPDATE`` por lotes.
+
+El listener se registra al importar ``db.models`` (último import de ese
+módulo): cualquier proceso que escriba ``PurchaseLine`` (API, workers, scripts)
+lo tiene activo sin depender de qué routers/servicios cargó.
+
+Las escrituras Core directas sobre ``purchase_lines`` (``update()``/``delete()``
+masivos) no disparan el evento: quien las use debe llamar a
+``services.purchases.aggregates.refresh_purchase_aggregates``.
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, Set
+
+from sqlalchemy import bindparam, case, event, func, inspect, select
+from sqlalchemy.orm import Session as _OrmSession
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.util import identity_key
+
+from .models import Purchase, PurchaseLine
+
+_CENT = Decimal("0.01")
+# Columnas de ``purchases`` que mantiene este módulo
+_AGG_COLUMNS = ("lines_count", "unmatched_count", "subtotal", "total", "last_activity_at")
+
+_purchases = Purchase.__table__
+_UPDATE = (
+    _purchases.update()
+    .where(_purchases.c.id == bindparam("_id"))
+    .values(
+        lines_count=bindparam("_lines"),
+        unmatched_count=bindparam("_unmatched"),
+        subtotal=bindparam("_subtotal"),
+        total=bindparam("_total"),
+        last_activity_at=bindparam("_activity"),
+        # Evita el onupdate de updated_at: el recálculo no es una edición del encabezado
+        updated_at=_purchases.c.updated_at,
+    )
+)
+
+
+def _compute(sync_session: _OrmSession, purchase_ids: Set[int]) -> Dict[int, Dict[str, Any]]:
+    eff_cost = PurchaseLine.qty * PurchaseLine.unit_cost * (100 - func.coalesce(PurchaseLine.line_discount, 0)) / 100
+    stmt = (
+        select(
+            Purchase.id,
+            Purchase.vat_rate,
+            func.count(PurchaseLine.id),
+            func.coalesce(func.sum(case((PurchaseLine.state != "OK", 1), else_=0)), 0),
+            func.coalesce(func.sum(eff_cost), 0),
+        )
+        .outerjoin(PurchaseLine, PurchaseLine.purchase_id == Purchase.id)
+        .where(Purchase.id.in_(purchase_ids))
+        .group_by(Purchase.id, Purchase.vat_rate)
+    )
+    now = datetime.utcnow()
+    out: Dict[int, Dict[str, Any]] = {}
+    for pid, vat_rate, n_lines, n_unmatched, raw_subtotal in sync_session.connection().execute(stmt):
+        # Misma aritmética que GET /purchases/{id}: IVA redondeado a centavos sobre el subtotal
+        subtotal = Decimal(str(raw_subtotal or 0))
+        iva = (subtotal * Decimal(str(vat_rate or 0)) / Decimal("100")).quantize(_CENT)
+        out[pid] = {
+            "lines_count": int(n_lines or 0),
+            "unmatched_count": int(n_unmatched or 0),
+            "subtotal": subtotal.quantize(_CENT),
+            "total": (subtotal + iva).quantize(_CENT),
+            "last_activity_at": now,
+        }
+    return out
+
+
+def apply_purchase_aggregates(sync_session: _OrmSession, purchase_ids: Set[int]) -> None:
+    """Recalcula y persiste los agregados de ``purchase_ids`` (sesión sync, dentro de la transacción)."""
+    values = _compute(sync_session, purchase_ids)
+    if not values:
+        return
+    sync_session.connection().execute(_UPDATE, [
+        {"_id": pid, "_lines": v["lines_count"], "_unmatched": v["unmatched_count"],
+         "_subtotal": v["subtotal"], "_total": v["total"], "_activity": v["last_activity_at"]}
+        for pid, v in values.items()
+    ])
+    # Las instancias cargadas en la sesión reflejan lo persistido sin quedar "dirty"
+    for pid, v in values.items():
+        obj = sync_session.identity_map.get(identity_key(Purchase, pid))
+        if obj is not None:
+            for key in _AGG_COLUMNS:
+                set_committed_value(obj, key, v[key])
+
+
+def _touched_purchases(sync_session: _OrmSession) -> Set[int]:
+    ids: Set[int] = set()
+    deleted = set(sync_session.deleted)
+    for obj in (*sync_session.new, *sync_session.dirty, *deleted):
+        if isinstance(obj, PurchaseLine):
+            if obj in sync_session.dirty and not sync_session.is_modified(obj):
+                continue
+            if obj.purchase_id is not None:
+                ids.add(obj.purchase_id)
+            # Línea movida de compra: el origen también cambia
+            ids.update(v for v in inspect(obj).attrs.purchase_id.history.deleted or () if v is not None)
+        elif isinstance(obj, Purchase) and obj.id is not None and obj not in deleted:
+            if obj in sync_session.new or sync_session.is_modified(obj):
+                ids.add(obj.id)
+    # Compras borradas en este flush: no hay nada que actualizar
+    ids.difference_update(o.id for o in deleted if isinstance(o, Purchase))
+    return ids
+
+
+@event.listens_for(_OrmSession, "after_flush")
+def _refresh_on_flush(sync_session: _OrmSession, _ctx: Any) -> None:
+    ids = _touched_purchases(sync_session)
+    if ids:
+        apply_purchase_aggregates(sync_session, ids)
@@ -23,6 +23,7 @@ export default function ImportViewer({ open, jobId, summary, onClose }: Props) {
   const [pages, setPages] = useState(1)
   const [loading, setLoading] = useState(false)
   const [committing, setCommitting] = useState(false)
+  const [commitProgress, setCommitProgress] = useState<number | null>(null)
   const [error, setError] = useState('')
   const [localSummary, setLocalSummary] = useState(summary)
   const [canonicalId, setCanonicalId] = useState<number | null>(null)
@@ -50,13 +51,14 @@ export default function ImportViewer({ open, jobId, summary, onClose }: Props) {
   async function confirm() {
     try {
       setCommitting(true)
-      const r = await commitImport(jobId)
+      const r = await commitImport(jobId, (c) => setCommitProgress(c?.progress ?? null))
       alert(`Insertados: ${r.inserted}, Actualizados: ${r.updated}, Cambios de precio: ${r.price_changes}`)
       onClose()
     } catch (e: any) {
       setError(e.message)
     } finally {
       setCommitting(false)
+      setCommitProgress(null)
     }
   }
 
@@ -156,7 +158,7 @@ export default function ImportViewer({ open, jobId, summary, onClose }: Props) {
               Cerrar
             </button>
             <button onClick={confirm} disabled={committing}>
-              {committing ? 'Confirmando...' : 'Confirmar'}
+              {committing ? `Confirmando...${commitProgress != null ? ` ${commitProgress}%` : ''}` : 'Confirmar'}
             </button>
           </div>
         </div>
@@ -21,6 +21,7 @@ export default function PdfImportModal({ open, onClose, onSuccess }: Props) {
   const [supplierId, setSupplierId] = useState('')
   const [file, setFile] = useState<File | null>(null)
   const [loading, setLoading] = useState(false)
+  const [progress, setProgress] = useState<{ stage: string; progress: number } | null>(null)
   const [debug, setDebug] = useState(false)
   const [forceOCR, setForceOCR] = useState(false)
   const [errorMsg, setErrorMsg] = useState<string | null>(null)
@@ -83,9 +84,10 @@ export default function PdfImportModal({ open, onClose, onSuccess }: Props) {
     const ok = await ensurePdfService()
     if (!ok) return
     setLoading(true)
+    setProgress(null)
     setErrorMsg(null); setErrorCid(null); setErrorDetail(null)
     try {
-      const res = await importSantaPlanta(Number(supplierId), file, debug, forceOCR)
+      const res = await importSantaPlanta(Number(supplierId), file, debug, forceOCR, (job) => setProgress({ stage: job.stage, progress: job.progress }))
       const correlationId = (res as any).correlation_id || (res as any).correlationId || null
 
       let purchaseId: number | null = null
@@ -243,7 +245,8 @@ export default function PdfImportModal({ open, onClose, onSuccess }: Props) {
             }}
           >
             <div className='panel' style={{ padding: 18, textAlign: 'center' }}>
-              <div style={{ fontWeight: 600 }}>Procesando PDF...</div>
+              <div style={{ fontWeight: 600 }}>Procesando PDF...{progress ? ` ${progress.progress}%` : ''}</div>
+              {progress && <div className='text-sm' style={{ opacity: 0.8 }}>Etapa: {progress.stage}</div>}
               <div className='text-sm' style={{ opacity: 0.8, marginTop: 4 }}>
                 No cierres esta ventana. Si tarda, activa "Modo debug" para ver mas detalle.
               </div>
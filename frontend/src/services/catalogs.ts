@@ -9,7 +9,16 @@ function csrfHeaders(): Record<string, string> {
   return m ? { 'X-CSRF-Token': decodeURIComponent(m[1]) } : {}
 }
 
-export async function generateCatalog(ids: number[]): Promise<void> {
+export interface CatalogJob {
+  id: string
+  status: 'queued' | 'running' | 'done' | 'error'
+  progress: number
+  step: string
+  error?: string | null
+}
+
+// El render corre como job en background: se encola y se consulta el progreso
+export async function generateCatalog(ids: number[], onProgress?: (job: CatalogJob) => void): Promise<void> {
   const res = await fetch(base + '/catalogs/generate', {
     method: 'POST',
     credentials: 'include',
@@ -23,6 +32,17 @@ export async function generateCatalog(ids: number[]): Promise<void> {
     } catch {}
     throw new Error(detail)
   }
+  const { job_id } = await res.json()
+  if (!job_id) return
+  for (;;) {
+    await new Promise((r) => setTimeout(r, 1000))
+    const jr = await fetch(base + `/catalogs/jobs/${job_id}`, { credentials: 'include' })
+    if (!jr.ok) throw new Error('Error consultando el estado del catálogo')
+    const job: CatalogJob = await jr.json()
+    onProgress?.(job)
+    if (job.status === 'done') return
+    if (job.status === 'error') throw new Error(job.error || 'Error generando catálogo')
+  }
 }
 
 export async function headLatestCatalog(): Promise<boolean> {
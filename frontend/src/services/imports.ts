@@ -57,7 +57,21 @@ export async function downloadGenericTemplate(): Promise<void> {
   a.remove()
 }
 
-export async function commitImport(jobId: number): Promise<any> {
+export async function commitImport(
+  jobId: number,
+  onProgress?: (commit: any) => void
+): Promise<any> {
   const res = await http.post(`/imports/${jobId}/commit`)
-  return res.data
+  if (res.status !== 202) return res.data
+  // Commit en background por lotes: consultar el progreso hasta que termine
+  for (;;) {
+    await new Promise((r) => setTimeout(r, 1000))
+    const st = await http.get(`/imports/${jobId}`, { params: { limit: 1 } })
+    const commit = st.data?.commit
+    if (commit && onProgress) onProgress(commit)
+    if (st.data?.status === 'COMMITTED') return commit
+    if (st.data?.status === 'COMMIT_ERROR') {
+      throw new Error(commit?.error || 'Error aplicando la importación')
+    }
+  }
 }
@@ -29,6 +29,11 @@ export type Purchase = {
   depot_id?: number | null
   note?: string | null
   lines?: PurchaseLine[]
+  lines_count?: number
+  unmatched_count?: number
+  subtotal?: number
+  total?: number
+  last_activity_at?: string | null
 }
 
 export async function listPurchases(params?: Record<string, any>) {
@@ -95,7 +100,15 @@ export async function rollbackPurchase(id: number) {
   return r.data as { status: string; reverted?: { product_id: number; delta: number }[] }
 }
 
-export async function importSantaPlanta(supplier_id: number, file: File, debug: boolean = false, forceOcr: boolean = false) {
+export type RemitoImportJob = { id: string; status: 'queued' | 'running' | 'done' | 'error'; stage: string; progress: number; status_code?: number | null; error?: any; result?: any }
+
+export async function importSantaPlanta(
+  supplier_id: number,
+  file: File,
+  debug: boolean = false,
+  forceOcr: boolean = false,
+  onProgress?: (job: RemitoImportJob) => void,
+) {
   const fd = new FormData()
   fd.append('file', file)
   const r = await http.post(`/purchases/import/santaplanta`, fd, {
@@ -105,7 +118,21 @@ export async function importSantaPlanta(supplier_id: number, file: File, debug:
       force_ocr: forceOcr ? 1 : 0,
     }
   })
-  return r.data as { purchase_id: number; status: string; filename: string; correlation_id?: string; parsed?: any; debug?: any }
+  type ImportResult = { purchase_id: number; status: string; filename: string; correlation_id?: string; parsed?: any; debug?: any }
+  if (r.status !== 202) return r.data as ImportResult
+  // Parsing en background (pool de workers): consultar el job hasta que termine
+  const correlationId = r.data?.correlation_id
+  for (;;) {
+    await new Promise((res) => setTimeout(res, 1000))
+    const st = await http.get(`/purchases/import/jobs/${r.data.job_id}`)
+    const job = st.data as RemitoImportJob
+    if (onProgress) onProgress(job)
+    if (job.status === 'done') return job.result as ImportResult
+    if (job.status === 'error') {
+      // Misma forma que un error de axios para reutilizar el manejo del modal
+      throw { response: { status: job.status_code, data: typeof job.error === 'string' ? { detail: job.error } : job.error, headers: { 'x-correlation-id': correlationId } } }
+    }
+  }
 }
 
 // POP Email importer (sin PDF). Puede recibir .eml o contenido pegado.
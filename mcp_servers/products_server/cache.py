@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+# NG-HEADER: Nombre de archivo: cache.py
+# NG-HEADER: Ubicación: mcp_servers/products_server/cache.py
+# NG-HEADER: Descripción: Cache LRU+TTL acotada con negative caching y coalescing de requests
+# NG-HEADER: Lineamientos: Ver AGENTS.md
+
+"""Cache en memoria para el Servidor MCP de Productos.
+
+- LRU acotada (``MCP_CACHE_MAX_ENTRIES``) con TTL por entrada: get/set/expiración O(1)
+  amortizado (OrderedDict; las entradas vencidas se descartan al tocarlas o al
+  desalojar por tamaño, sin barridos completos).
+- Negative caching: los "no encontrado" se guardan con un TTL propio más corto
+  (``MCP_CACHE_NEGATIVE_TTL_SECONDS``) para no martillar la API con SKUs inexistentes.
+- Coalescing: llamadas concurrentes con la misma clave comparten un único
+  request upstream (``coalesce``).
+
+El TTL se lee en runtime (igual que antes) para permitir variación en tests.
+Default 30s; ``MCP_CACHE_TTL_SECONDS=0`` deshabilita la cache (y el negative
+caching), dejando sólo el coalescing.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+# Marcador para resultados negativos (producto inexistente)
+NOT_FOUND = object()
+
+# Ventana corta: absorbe lookups repetidos de un mismo turno/conversación sin
+# servir precio/stock viejos por mucho tiempo.
+DEFAULT_TTL_SECONDS = 30.0
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)) or default)
+    except ValueError:
+        return default
+
+
+def get_cache_ttl() -> float:
+    """TTL (segundos) para entradas positivas (default 30). ``0`` deshabilita la cache."""
+    return _env_float("MCP_CACHE_TTL_SECONDS", DEFAULT_TTL_SECONDS)
+
+
+def get_negative_ttl() -> float:
+    """TTL para entradas negativas, acotado al TTL positivo."""
+    return min(_env_float("MCP_CACHE_NEGATIVE_TTL_SECONDS", 10.0), get_cache_ttl())
+
+
+def get_max_entries() -> int:
+    try:
+        return max(1, int(os.getenv("MCP_CACHE_MAX_ENTRIES", "2048") or 2048))
+    except ValueError:
+        return 2048
+
+
+class TTLCache:
+    """Cache LRU con expiración por entrada y contadores de uso."""
+
+    def __init__(self) -> None:
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: str) -> bool:
+        item = self._data.get(key)
+        return bool(item) and item[0] > time.monotonic()
+
+    def get(self, key: str) -> Any | None:
+        """Retorna el valor (o ``NOT_FOUND``) si está vigente; ``None`` si no."""
+        if get_cache_ttl() <= 0:
+            return None
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        if value is NOT_FOUND:
+            self.negative_hits += 1
+        else:
+            self.hits += 1
+        return value
+
+    def put(self, key: str, value: Any, ttl: float | None = None) -> None:
+        ttl = get_cache_ttl() if ttl is None else ttl
+        if ttl <= 0:
+            return
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        max_entries = get_max_entries()
+        while len(self._data) > max_entries:
+            # popitem(last=False) desaloja el menos usado recientemente
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def put_negative(self, key: str) -> None:
+        self.put(key, NOT_FOUND, ttl=get_negative_ttl())
+
+    def pop(self, key: str, default: Any = None) -> Any:
+        item = self._data.pop(key, None)
+        return default if item is None else item[1]
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.hits = self.misses = self.negative_hits = 0
+        self.evictions = self.expirations = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.negative_hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_entries": get_max_entries(),
+            "ttl_seconds": get_cache_ttl(),
+            "negative_ttl_seconds": get_negative_ttl(),
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_ratio": round((self.hits + self.negative_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Requests upstream en vuelo por clave (coalescing)
+_inflight: Dict[str, "asyncio.Future[Any]"] = {}
+coalesced_calls = 0
+
+
+async def coalesce(key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+    """Ejecuta ``factory`` una sola vez por clave entre llamadas concurrentes.
+
+    Los llamadores que llegan mientras hay un request en vuelo esperan el mismo
+    resultado (o la misma excepción) en lugar de disparar otro request.
+    """
+    global coalesced_calls
+    fut = _inflight.get(key)
+    if fut is not None and fut.get_loop() is asyncio.get_running_loop():
+        coalesced_calls += 1
+        return await asyncio.shield(fut)
+    fut = asyncio.get_running_loop().create_future()
+    _inflight[key] = fut
+    try:
+        result = await factory()
+    except BaseException as exc:
+        fut.set_exception(exc)
+        # Evita warning "exception was never retrieved" cuando nadie más esperaba
+        fut.exception()
+        raise
+    else:
+        fut.set_result(result)
+        return result
+    finally:
+        if _inflight.get(key) is fut:
+            del _inflight[key]
+
+
+__all__ = [
+    "DEFAULT_TTL_SECONDS",
+    "NOT_FOUND",
+    "TTLCache",
+    "coalesce",
+    "get_cache_ttl",
+    "get_negative_ttl",
+    "get_max_entries",
+]
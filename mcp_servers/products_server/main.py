@@ -12,7 +12,7 @@ from typing import Any, Dict
 import os
 import logging
 
-from .tools import invoke_tool
+from .tools import invoke_tool, close_client, cache_stats
 from .security import (
     MCPAuthError,
     MCPTokenExpired,
@@ -30,6 +30,12 @@ logger = logging.getLogger("mcp_products.main")
 app = FastAPI(title="Growen MCP Products Server", version="0.2.0")
 
 
+@app.on_event("shutdown")
+async def _close_http_client() -> None:
+    """Libera el pool de conexiones compartido hacia la API principal."""
+    await close_client()
+
+
 class InvokeRequest(BaseModel):
     tool_name: str
     parameters: Dict[str, Any]
@@ -105,7 +111,7 @@ async def invoke_tool_endpoint(
 
 @app.get("/health")
 async def health():
-    return {"status": "ok", "service": "mcp_products"}
+    return {"status": "ok", "service": "mcp_products", "cache": cache_stats()}
 
 @app.get("/")
 async def root():
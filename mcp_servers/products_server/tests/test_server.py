@@ -12,6 +12,7 @@ import os
 import respx
 import httpx
 import time
+import json
 import jwt
 from datetime import datetime, timedelta, timezone
 
@@ -341,3 +342,144 @@ def test_health_endpoint():
     response = client.get("/health")
     assert response.status_code == 200
     assert response.json()["status"] == "ok"
+
+
+def test_negative_cache_avoids_repeated_404(monkeypatch):
+    """Un SKU inexistente se cachea como negativo y no vuelve a consultar la API."""
+    monkeypatch.setenv("MCP_CACHE_TTL_SECONDS", "5")
+    token = create_test_token()
+    with respx.mock(base_url="http://api:8000") as router:
+        route = router.get("/variants/lookup").mock(return_value=httpx.Response(404, json={"detail": "nf"}))
+        payload = {"tool_name": "get_product_info", "parameters": {"sku": "NOPE"}}
+        r1 = client.post("/invoke_tool", json=payload, headers={"X-MCP-Token": token})
+        r2 = client.post("/invoke_tool", json=payload, headers={"X-MCP-Token": token})
+        assert r1.status_code == 404 and r2.status_code == 404
+        assert route.call_count == 1
+
+
+def test_cache_lru_bounded(monkeypatch):
+    """La cache desaloja las entradas menos usadas al superar MCP_CACHE_MAX_ENTRIES."""
+    from mcp_servers.products_server.tools import _cache
+    monkeypatch.setenv("MCP_CACHE_TTL_SECONDS", "60")
+    monkeypatch.setenv("MCP_CACHE_MAX_ENTRIES", "2")
+    _cache.put("a", {"v": 1})
+    _cache.put("b", {"v": 2})
+    assert _cache.get("a") == {"v": 1}  # "a" pasa a ser el más reciente
+    _cache.put("c", {"v": 3})
+    assert _cache.get("b") is None
+    assert _cache.get("a") is not None and _cache.get("c") is not None
+    stats = _cache.stats()
+    assert stats["size"] == 2 and stats["evictions"] == 1
+
+
+def test_get_products_info_batch():
+    """get_products_info resuelve varios SKUs con una sola llamada bulk y cachea el resultado."""
+    token = create_test_token(role="viewer")
+    bulk_response = {
+        "items": [
+            {"product_id": 1, "sku": "AAA", "name": "Prod AAA", "stock": 1, "requested": "AAA"},
+            {"product_id": 2, "sku": "BBBB", "name": "Prod BBBB", "stock": 2, "requested": 2},
+        ],
+        "not_found": ["MISSING"],
+        "count": 2,
+    }
+    with respx.mock(base_url="http://api:8000") as router:
+        route = router.post("/catalog/products/bulk_info").mock(return_value=httpx.Response(200, json=bulk_response))
+        payload = {"tool_name": "get_products_info", "parameters": {"skus": ["AAA", "MISSING"], "product_ids": [2]}}
+        response = client.post("/invoke_tool", json=payload, headers={"X-MCP-Token": token})
+        assert response.status_code == 200
+        result = response.json()["result"]
+        assert [it["sku"] for it in result["items"]] == ["BBBB", "AAA"]
+        assert result["not_found"] == ["MISSING"]
+        assert route.call_count == 1
+        sent = json.loads(route.calls[0].request.content)
+        assert sent == {"product_ids": [2], "skus": ["AAA", "MISSING"]}
+        # Segunda invocación: todo desde cache (positivos y negativos)
+        response = client.post("/invoke_tool", json=payload, headers={"X-MCP-Token": token})
+        assert response.status_code == 200
+        assert route.call_count == 1
+        # El lookup individual reutiliza la entrada cargada por el batch (sin ruta mockeada para /variants/lookup)
+        single = {"tool_name": "get_product_info", "parameters": {"sku": "AAA"}}
+        response = client.post("/invoke_tool", json=single, headers={"X-MCP-Token": token})
+        assert response.status_code == 200
+        assert response.json()["result"]["name"] == "Prod AAA"
+
+
+def test_get_products_info_normalizes_sku_variants():
+    """SKUs con espacios o en otra capitalización resuelven contra el eco de la API."""
+    token = create_test_token(role="viewer")
+    bulk_response = {
+        "items": [{"product_id": 7, "sku": "ABC_0001_XYZ", "name": "Prod", "stock": 1, "requested": "abc_0001_xyz"}],
+        "not_found": [],
+        "count": 1,
+    }
+    with respx.mock(base_url="http://api:8000") as router:
+        route = router.post("/catalog/products/bulk_info").mock(return_value=httpx.Response(200, json=bulk_response))
+        payload = {"tool_name": "get_products_info", "parameters": {"skus": [" abc_0001_xyz ", "ABC_0001_XYZ"]}}
+        response = client.post("/invoke_tool", json=payload, headers={"X-MCP-Token": token})
+        assert response.status_code == 200
+        result = response.json()["result"]
+        assert [it["sku"] for it in result["items"]] == ["ABC_0001_XYZ"]
+        assert result["not_found"] == []
+        assert json.loads(route.calls[0].request.content)["skus"] == ["abc_0001_xyz"]
+        # Otra variante del mismo SKU sale de la cache
+        single = {"tool_name": "get_product_info", "parameters": {"sku": "Abc_0001_Xyz"}}
+        response = client.post("/invoke_tool", json=single, headers={"X-MCP-Token": token})
+        assert response.status_code == 200
+        assert route.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_lookups_are_coalesced(monkeypatch):
+    """Lookups concurrentes del mismo SKU comparten un único request upstream."""
+    import asyncio
+    from mcp_servers.products_server import tools as t
+
+    monkeypatch.setenv("MCP_CACHE_TTL_SECONDS", "0")  # sin cache: solo coalescing
+    calls = 0
+
+    async def _slow(request):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json={"product_id": 1, "sku": "CO1", "name": "Coalesced"})
+
+    with respx.mock(base_url="http://api:8000") as router:
+        router.get("/variants/lookup").mock(side_effect=_slow)
+        results = await asyncio.gather(*(t._fetch_lookup(sku="CO1") for _ in range(5)))
+    assert calls == 1
+    assert all(r["sku"] == "CO1" for r in results)
+    await t.close_client()
+
+
+def test_cache_enabled_by_default(monkeypatch):
+    """Sin configuración la cache queda activa (30s); ``0`` la deshabilita."""
+    from mcp_servers.products_server import cache as c
+
+    monkeypatch.delenv("MCP_CACHE_TTL_SECONDS", raising=False)
+    monkeypatch.delenv("MCP_CACHE_NEGATIVE_TTL_SECONDS", raising=False)
+    assert c.get_cache_ttl() == 30.0 and c.get_negative_ttl() == 10.0
+    monkeypatch.setenv("MCP_CACHE_TTL_SECONDS", "0")
+    assert c.get_cache_ttl() == 0 and c.get_negative_ttl() == 0
+
+
+def test_client_replaced_on_new_loop_is_closed():
+    """Al cambiar de event loop el cliente anterior se cierra (no quedan sockets del pool)."""
+    import asyncio
+    from mcp_servers.products_server import tools as t
+
+    async def _grab():
+        client = t._get_client()
+        await asyncio.sleep(0)
+        return client
+
+    first = asyncio.run(_grab())
+
+    async def _replace():
+        second = t._get_client()
+        await asyncio.sleep(0.01)  # deja correr el aclose del cliente retirado
+        return second
+
+    second = asyncio.run(_replace())
+    assert second is not first and first.is_closed
+    asyncio.run(t.close_client())
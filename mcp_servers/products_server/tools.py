@@ -16,14 +16,25 @@ Todas las funciones reciben `user_role` para aplicar control de acceso.
 """
 from __future__ import annotations
 
-from typing import Any, Dict, Tuple, List
+from typing import Any, Dict, List
+import asyncio
 import os
-import time
 import httpx
 import logging
 
-# Cache in-memory simple (MVP). Se consulta TTL en runtime para permitir variación en tests.
-_cache: dict[str, Tuple[float, Dict[str, Any]]] = {}
+from .cache import NOT_FOUND, TTLCache, coalesce
+from . import cache as _cache_mod
+
+# Cache LRU+TTL acotada (ver cache.py). El TTL se consulta en runtime para permitir variación en tests.
+_cache = TTLCache()
+
+# Cliente HTTP compartido (pool de conexiones keep-alive hacia la API principal).
+# Se crea perezosamente en el event loop activo y se cierra en el shutdown de la app.
+_client: httpx.AsyncClient | None = None
+_client_loop: asyncio.AbstractEventLoop | None = None
+
+# Máximo de productos por invocación de get_products_info
+_BATCH_MAX_ITEMS = 50
 
 # Logger básico configurable vía LOG_LEVEL (info por defecto)
 LOG_LEVEL = os.getenv("LOG_LEVEL", "info").upper()
@@ -44,14 +55,6 @@ from .security import (
 )
 
 
-def _get_cache_ttl() -> float:
-    """Lee el TTL de cache desde variables de entorno en runtime."""
-    try:
-        return float(os.getenv("MCP_CACHE_TTL_SECONDS", "0") or 0)
-    except ValueError:
-        return 0.0
-
-
 def _get_api_base_url() -> str:
     """Retorna la URL base de la API principal desde env o default."""
     return os.getenv("API_BASE_URL", "http://api:8000")
@@ -59,10 +62,10 @@ def _get_api_base_url() -> str:
 
 def _get_internal_auth_headers() -> Dict[str, str]:
     """Genera headers de autenticación para servicios internos.
-    
+
     Incluye el token de servicio interno (INTERNAL_SERVICE_TOKEN) en el header
     X-Internal-Service-Token para autenticarse ante la API principal.
-    
+
     Returns:
         Dict con headers HTTP incluyendo token de autenticación.
     """
@@ -73,146 +76,195 @@ def _get_internal_auth_headers() -> Dict[str, str]:
     return {"X-Internal-Service-Token": token}
 
 
-def _cache_get(key: str) -> Dict[str, Any] | None:
-    ttl = _get_cache_ttl()
-    if ttl <= 0:
-        return None
-    item = _cache.get(key)
-    if not item:
-        return None
-    ts, value = item
-    if time.time() - ts > ttl:
-        _cache.pop(key, None)
-        return None
-    return value
+# Clientes reemplazados que se están cerrando (referencia para que el GC no corte la tarea)
+_closing: "set[asyncio.Future[Any]]" = set()
 
 
-def _cache_put(key: str, value: Dict[str, Any]) -> None:
-    ttl = _get_cache_ttl()
-    if ttl <= 0:
-        return
-    _cache[key] = (time.time(), value)
+async def _aclose_quietly(client: httpx.AsyncClient) -> None:
+    try:
+        await client.aclose()
+    except Exception:  # pragma: no cover - sockets de un loop ya cerrado
+        logger.debug("Error cerrando cliente HTTP reemplazado", exc_info=True)
 
 
-@require_mcp_auth()  # Todos los usuarios autenticados pueden acceder
-async def get_product_info(sku: str = None, product_id: int = None) -> Dict[str, Any]:
-    """Obtiene información de un producto por SKU canónico o ID, incluyendo descripción.
+def _retire_client(client: httpx.AsyncClient, loop: asyncio.AbstractEventLoop | None) -> None:
+    """Cierra el cliente anterior sin bloquear: en su propio loop si sigue vivo, si no en el actual."""
+    if client.is_closed:
+        return
+    if loop is not None and loop.is_running() and loop is not asyncio.get_running_loop():
+        fut: "asyncio.Future[Any]" = asyncio.wrap_future(asyncio.run_coroutine_threadsafe(_aclose_quietly(client), loop))
+    else:
+        fut = asyncio.ensure_future(_aclose_quietly(client))
+    _closing.add(fut)
+    fut.add_done_callback(_closing.discard)
 
-    Retorna datos del producto: name, sale_price, stock, sku, y descripción/especificaciones
-    cuando están disponibles.
 
-    Args:
-        sku: SKU canónico del producto (formato XXX_####_YYY).
-        product_id: ID interno del producto (alternativa al SKU).
+def _get_client() -> httpx.AsyncClient:
+    """Retorna el cliente HTTP compartido, creándolo si no existe para el loop actual.
 
-    Returns:
-        Diccionario con claves: name, sale_price, stock, sku, description, technical_specs, usage_instructions.
+    Las conexiones de httpx quedan ligadas al event loop donde se abrieron; si el
+    loop cambió (p.ej. TestClient sin context manager) se crea un cliente nuevo y
+    el anterior se cierra (``aclose``) para no dejar sockets del pool abiertos.
+    """
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        if _client is not None:
+            _retire_client(_client, _client_loop)
+        _client = httpx.AsyncClient(
+            timeout=5.0,
+            limits=httpx.Limits(
+                max_connections=int(os.getenv("MCP_HTTP_MAX_CONNECTIONS", "20") or 20),
+                max_keepalive_connections=int(os.getenv("MCP_HTTP_MAX_KEEPALIVE", "10") or 10),
+            ),
+        )
+        _client_loop = loop
+    return _client
+
+
+async def close_client() -> None:
+    """Cierra el cliente HTTP compartido (llamado en el shutdown de la app)."""
+    global _client, _client_loop
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
+    _client_loop = None
+
+
+def cache_stats() -> Dict[str, Any]:
+    """Métricas de la cache y del coalescing de requests."""
+    stats = _cache.stats()
+    stats["coalesced_calls"] = _cache_mod.coalesced_calls
+    return stats
+
+
+def _lookup_key(sku: str | None, product_id: int | None) -> str:
+    # La API resuelve SKUs sin distinguir mayúsculas ni espacios: la clave tampoco.
+    return f"lookup:id:{product_id}" if product_id else f"lookup:sku:{(sku or '').strip().lower()}"
+
+
+async def _fetch_lookup(sku: str | None = None, product_id: int | None = None) -> Dict[str, Any]:
+    """Obtiene el payload crudo de `/variants/lookup` con cache, negative cache y coalescing.
 
     Raises:
-        httpx.HTTPStatusError: Si la API responde un status >= 400.
-        httpx.RequestError: Problema de red al invocar la API.
-        KeyError: Si la respuesta no contiene campos esperados.
+        KeyError: Si el producto no existe (404, también cacheado como negativo).
+        httpx.HTTPStatusError / httpx.RequestError: Errores de transporte a la API.
     """
-    if not sku and not product_id:
-        raise ValueError("Se requiere 'sku' o 'product_id'.")
-    
-    # Cache lookup
-    cache_key = f"product_info:{product_id or sku}"
-    cached = _cache_get(cache_key)
-    if cached:
-        logger.debug("Cache HIT para %s", cache_key)
+    key = _lookup_key(sku, product_id)
+    cached = _cache.get(key)
+    if cached is NOT_FOUND:
+        logger.debug("Cache HIT (negativo) para %s", key)
+        raise KeyError("Producto no encontrado")
+    if cached is not None:
+        logger.debug("Cache HIT para %s", key)
         return cached
 
     base_url = _get_api_base_url()
-    headers = _get_internal_auth_headers()
-    
-    # Construir URL con el parámetro disponible
     if product_id:
         url = f"{base_url}/variants/lookup?product_id={product_id}"
     else:
         url = f"{base_url}/variants/lookup?sku={sku}"
-    
-    async with httpx.AsyncClient(timeout=5.0) as client:
+
+    async def _do_fetch() -> Dict[str, Any]:
         try:
-            logger.debug("get_product_info: Consultando URL=%s", url)
-            resp = await client.get(url, headers=headers)
+            logger.debug("Consultando URL=%s", url)
+            resp = await _get_client().get(url, headers=_get_internal_auth_headers())
             resp.raise_for_status()
             data = resp.json()
-            
-            # DEBUG: Log de respuesta raw de la API
-            logger.debug(
-                "get_product_info: API Response raw - product_id=%s, sku=%s, has_description=%s, description_length=%d",
-                data.get("product_id"),
-                data.get("sku"),
-                bool(data.get("description")),
-                len(data.get("description") or "") if data.get("description") else 0,
-            )
-            
-            # Construir resultado con toda la información disponible
-            result = {
-                "product_id": data.get("product_id"),
-                "sku": data.get("sku"),
-                "name": data.get("name") or data.get("title") or "(sin nombre)",
-                "sale_price": data.get("sale_price"),
-                "stock": data.get("stock"),
-            }
-            
-            # Incluir tags si están disponibles
-            tags = data.get("tags")
-            if tags and isinstance(tags, list):
-                result["tags"] = tags
-                logger.debug("get_product_info: Incluyendo tags: %s", tags)
-            
-            # Incluir descripción y especificaciones si están disponibles
-            description = data.get("description")
-            if description:
-                result["description"] = description
-                logger.debug(
-                    "get_product_info: Incluyendo descripción (%d chars): %s...",
-                    len(description),
-                    description[:200] if len(description) > 200 else description,
-                )
-            else:
-                logger.warning(
-                    "get_product_info: SIN DESCRIPCION para product_id=%s sku=%s",
-                    data.get("product_id"),
-                    data.get("sku"),
-                )
-            
-            technical_specs = data.get("technical_specs")
-            if technical_specs and isinstance(technical_specs, dict) and technical_specs:
-                result["technical_specs"] = technical_specs
-                logger.debug("get_product_info: Incluyendo technical_specs: %s", list(technical_specs.keys()))
-            
-            usage_instructions = data.get("usage_instructions")
-            if usage_instructions and isinstance(usage_instructions, dict) and usage_instructions:
-                result["usage_instructions"] = usage_instructions
-                logger.debug("get_product_info: Incluyendo usage_instructions: %s", list(usage_instructions.keys()))
-            
-            # DEBUG: Log final del resultado que se devuelve al LLM
-            logger.info(
-                "get_product_info: Tool Output - product_id=%s, sku=%s, name=%s, stock=%s, has_description=%s",
-                result.get("product_id"),
-                result.get("sku"),
-                result.get("name"),
-                result.get("stock"),
-                "description" in result,
-            )
-            
-            _cache_put(cache_key, result)
-            return result
-            
         except httpx.TimeoutException as exc:
             logger.warning("Timeout URL=%s: %s", url, exc)
             raise
         except httpx.HTTPStatusError as exc:
             if exc.response.status_code == 404:
                 logger.warning("Producto no encontrado: sku=%s product_id=%s", sku, product_id)
+                _cache.put_negative(key)
                 raise KeyError("Producto no encontrado")
             raise
         except httpx.RequestError as exc:
             logger.warning("RequestError URL=%s: %s", url, exc)
             raise
+        _cache.put(key, data)
+        # Indexar también por el identificador alternativo para reutilizar la entrada
+        alt_key = _lookup_key(data.get("sku"), None) if product_id else (
+            _lookup_key(None, data.get("product_id")) if data.get("product_id") else None
+        )
+        if alt_key and alt_key != key:
+            _cache.put(alt_key, data)
+        logger.debug("Cache SET %s", key)
+        return data
+
+    return await coalesce(key, _do_fetch)
+
+
+def _build_product_result(data: Dict[str, Any], include_tags: bool = True) -> Dict[str, Any]:
+    """Arma la respuesta de producto a partir del payload de `/variants/lookup`.
+
+    Los campos opcionales (tags, descripción, specs, instrucciones) solo se incluyen
+    cuando tienen contenido, para ahorrar tokens del LLM.
+    """
+    result: Dict[str, Any] = {
+        "product_id": data.get("product_id"),
+        "sku": data.get("sku"),
+        "name": data.get("name") or data.get("title") or "(sin nombre)",
+        "sale_price": data.get("sale_price"),
+        "stock": data.get("stock"),
+    }
+    tags = data.get("tags")
+    if include_tags and tags and isinstance(tags, list):
+        result["tags"] = tags
+    description = data.get("description")
+    if description:
+        result["description"] = description
+    technical_specs = data.get("technical_specs")
+    if technical_specs and isinstance(technical_specs, dict):
+        result["technical_specs"] = technical_specs
+    usage_instructions = data.get("usage_instructions")
+    if usage_instructions and isinstance(usage_instructions, dict):
+        result["usage_instructions"] = usage_instructions
+    return result
+
+
+@require_mcp_auth()  # Todos los usuarios autenticados pueden acceder
+async def get_product_info(sku: str = None, product_id: int = None) -> Dict[str, Any]:
+    """Obtiene información de un producto por SKU canónico o ID, incluyendo descripción.
+
+    Retorna datos del producto: name, sale_price, stock, sku, y descripción/especificaciones
+    cuando están disponibles.
+
+    Args:
+        sku: SKU canónico del producto (formato XXX_####_YYY).
+        product_id: ID interno del producto (alternativa al SKU).
+
+    Returns:
+        Diccionario con claves: name, sale_price, stock, sku, description, technical_specs, usage_instructions.
+
+    Raises:
+        httpx.HTTPStatusError: Si la API responde un status >= 400.
+        httpx.RequestError: Problema de red al invocar la API.
+        KeyError: Si el producto no existe.
+    """
+    if not sku and not product_id:
+        raise ValueError("Se requiere 'sku' o 'product_id'.")
+
+    data = await _fetch_lookup(sku=sku, product_id=product_id)
+    result = _build_product_result(data)
+    if "description" not in result:
+        logger.warning(
+            "get_product_info: SIN DESCRIPCION para product_id=%s sku=%s",
+            result.get("product_id"),
+            result.get("sku"),
+        )
+
+    # DEBUG: Log final del resultado que se devuelve al LLM
+    logger.info(
+        "get_product_info: Tool Output - product_id=%s, sku=%s, name=%s, stock=%s, has_description=%s",
+        result.get("product_id"),
+        result.get("sku"),
+        result.get("name"),
+        result.get("stock"),
+        "description" in result,
+    )
+    return result
 
 
 @require_mcp_auth(allowed_roles=["admin", "colaborador"])
@@ -234,72 +286,103 @@ async def get_product_full_info(sku: str = None, product_id: int = None) -> Dict
     Raises:
         MCPUnauthorized: Si el rol no está autorizado para información "full".
         httpx.HTTPStatusError / httpx.RequestError: Errores de transporte a la API.
-        KeyError: Campos faltantes en la respuesta de la API.
+        KeyError: Si el producto no existe.
     """
     if not sku and not product_id:
         raise ValueError("Se requiere 'sku' o 'product_id'.")
-    
-    # Cache lookup
-    cache_key = f"product_full_info:{product_id or sku}"
-    cached = _cache_get(cache_key)
-    if cached:
-        logger.debug("Cache HIT para full info %s", cache_key)
-        return cached
 
-    base_url = _get_api_base_url()
-    headers = _get_internal_auth_headers()
-    
-    # Construir URL con el parámetro disponible
-    if product_id:
-        url = f"{base_url}/variants/lookup?product_id={product_id}"
-    else:
-        url = f"{base_url}/variants/lookup?sku={sku}"
-    
-    async with httpx.AsyncClient(timeout=5.0) as client:
-        try:
-            logger.debug("Consultando URL=%s (full info)", url)
-            resp = await client.get(url, headers=headers)
-            resp.raise_for_status()
-            data = resp.json()
-            
-            # Construir respuesta completa
-            result = {
-                "product_id": data.get("product_id"),
-                "sku": data.get("sku"),
-                "name": data.get("name") or data.get("title") or "(sin nombre)",
-                "sale_price": data.get("sale_price"),
-                "stock": data.get("stock"),
-            }
-            
-            # Incluir descripción enriquecida si existe
-            description = data.get("description")
-            if description:
-                result["description"] = description
-            
-            # Agregar datos de enriquecimiento solo si tienen contenido
-            technical_specs = data.get("technical_specs")
-            if technical_specs and isinstance(technical_specs, dict) and technical_specs:
-                result["technical_specs"] = technical_specs
-            
-            usage_instructions = data.get("usage_instructions")
-            if usage_instructions and isinstance(usage_instructions, dict) and usage_instructions:
-                result["usage_instructions"] = usage_instructions
-            
-            _cache_put(cache_key, result)
-            logger.debug("Cache SET full info %s", cache_key)
-            return result
-            
-        except httpx.TimeoutException as exc:
-            logger.warning("Timeout URL=%s: %s", url, exc)
-            raise
-        except httpx.HTTPStatusError as exc:
-            if exc.response.status_code == 404:
-                logger.warning("Producto no encontrado: sku=%s product_id=%s", sku, product_id)
-                raise KeyError("Producto no encontrado")
-            raise
-        except httpx.RequestError as exc:
-            logger.warning("RequestError URL=%s: %s", url, exc)
-            raise
+    data = await _fetch_lookup(sku=sku, product_id=product_id)
+    return _build_product_result(data, include_tags=False)
+
+
+async def _fetch_bulk(skus: List[str], product_ids: List[int]) -> Dict[str, Dict[str, Any] | None]:
+    """Resuelve varios productos con una sola llamada a `/catalog/products/bulk_info`.
+
+    Consulta la cache primero; solo los faltantes viajan upstream. Devuelve un dict
+    lookup_key -> payload (``None`` si no existe; también se cachea como negativo).
+    """
+    keys = {_lookup_key(None, p): (None, p) for p in product_ids}
+    keys.update({_lookup_key(s, None): (s, None) for s in skus})
+    out: Dict[str, Dict[str, Any] | None] = {}
+    missing_ids: List[int] = []
+    missing_skus: List[str] = []
+    for key, (sku, product_id) in keys.items():
+        cached = _cache.get(key)
+        if cached is NOT_FOUND:
+            out[key] = None
+        elif cached is not None:
+            out[key] = cached
+        elif product_id:
+            missing_ids.append(product_id)
+        else:
+            missing_skus.append(sku)  # type: ignore[arg-type]
+    if not missing_ids and not missing_skus:
+        return out
+
+    url = f"{_get_api_base_url()}/catalog/products/bulk_info"
+    try:
+        logger.debug("Consultando URL=%s (%d ids, %d skus)", url, len(missing_ids), len(missing_skus))
+        resp = await _get_client().post(
+            url,
+            json={"product_ids": missing_ids, "skus": missing_skus},
+            headers=_get_internal_auth_headers(),
+        )
+        resp.raise_for_status()
+        data = resp.json()
+    except httpx.TimeoutException as exc:
+        logger.warning("Timeout URL=%s: %s", url, exc)
+        raise
+    except httpx.RequestError as exc:
+        logger.warning("RequestError URL=%s: %s", url, exc)
+        raise
+
+    for item in data.get("items", []):
+        requested = item.get("requested")
+        key = _lookup_key(None, requested) if isinstance(requested, int) else _lookup_key(requested, None)
+        out[key] = item
+        _cache.put(key, item)
+    for requested in data.get("not_found", []):
+        key = _lookup_key(None, requested) if isinstance(requested, int) else _lookup_key(requested, None)
+        out[key] = None
+        _cache.put_negative(key)
+    return out
+
+
+@require_mcp_auth()  # Todos los usuarios autenticados
+async def get_products_info(skus: List[str] | None = None, product_ids: List[int] | None = None) -> Dict[str, Any]:
+    """Resuelve varios productos en una sola invocación de tool.
+
+    Usa la misma cache que `get_product_info`; los faltantes se resuelven con una
+    única llamada a `/catalog/products/bulk_info` de la API principal.
+
+    Args:
+        skus: Lista de SKUs canónicos.
+        product_ids: Lista de IDs internos (alternativa o complemento a `skus`).
+
+    Returns:
+        Dict con `items` (en el orden pedido), `not_found` (identificadores sin match) y `count`.
+    """
+    unique_skus: Dict[str, str] = {}
+    for s in skus or []:
+        if s and s.strip():
+            unique_skus.setdefault(_lookup_key(s, None), s.strip())
+    skus = list(unique_skus.values())
+    product_ids = list(dict.fromkeys(int(p) for p in (product_ids or []) if p))
+    if not skus and not product_ids:
+        raise ValueError("Se requiere 'skus' o 'product_ids' (lista no vacía).")
+    if len(skus) + len(product_ids) > _BATCH_MAX_ITEMS:
+        raise ValueError(f"Máximo {_BATCH_MAX_ITEMS} productos por invocación.")
+
+    resolved = await _fetch_bulk(skus, product_ids)
+    items: List[Dict[str, Any]] = []
+    not_found: List[Any] = []
+    for ident, key in [(p, _lookup_key(None, p)) for p in product_ids] + [(s, _lookup_key(s, None)) for s in skus]:
+        data = resolved.get(key)
+        if data is None:
+            not_found.append(ident)
+        else:
+            items.append(_build_product_result(data))
+    return {"items": items, "not_found": not_found, "count": len(items)}
 
 
 @require_mcp_auth()  # Todos los usuarios autenticados
@@ -327,53 +410,53 @@ async def find_products_by_name(query: str) -> Dict[str, Any]:
     base_url = _get_api_base_url()
     url = f"{base_url}/catalog/search?q={httpx.QueryParams({'q': query})['q']}"  # asegura encoding
     headers = _get_internal_auth_headers()
-    async with httpx.AsyncClient(timeout=5.0) as client:
-        resp = await client.get(url, headers=headers)
-        resp.raise_for_status()
-        data = resp.json()
-        # Se asume una lista de productos
-        items: List[Dict[str, Any]] = []
-        if isinstance(data, list):
-            source_iter = data
-        else:
-            source_iter = data.get("items", []) if isinstance(data, dict) else []
-        
-        for prod in source_iter:
-            if not isinstance(prod, dict):
-                continue
-            
-            # Obtener datos del producto
-            product_id = prod.get("id")
-            name = prod.get("name") or prod.get("title") or "(sin nombre)"
-            sku = prod.get("sku")  # SKU canónico (formato XXX_####_YYY)
-            stock = prod.get("stock")
-            price = prod.get("price") or prod.get("sale_price")
-            tags = prod.get("tags", [])  # Tags del producto (ej: ["#Organico", "#Floracion"])
-            
-            # Solo incluir si tiene SKU canónico (no mostrar SKUs internos)
-            # El SKU canónico tiene formato XXX_####_YYY
-            if not sku or not product_id:
-                continue
-            
-            item = {
-                "product_id": product_id,
-                "name": name,
-                "sku": sku,
-                "stock": stock,
-                "price": price,
-            }
-            # Incluir tags si están disponibles
-            if tags:
-                item["tags"] = tags
-            
-            items.append(item)
-        
-        return {"items": items, "count": len(items), "query": query}
+    resp = await _get_client().get(url, headers=headers)
+    resp.raise_for_status()
+    data = resp.json()
+    # Se asume una lista de productos
+    items: List[Dict[str, Any]] = []
+    if isinstance(data, list):
+        source_iter = data
+    else:
+        source_iter = data.get("items", []) if isinstance(data, dict) else []
+
+    for prod in source_iter:
+        if not isinstance(prod, dict):
+            continue
+
+        # Obtener datos del producto
+        product_id = prod.get("id")
+        name = prod.get("name") or prod.get("title") or "(sin nombre)"
+        sku = prod.get("sku")  # SKU canónico (formato XXX_####_YYY)
+        stock = prod.get("stock")
+        price = prod.get("price") or prod.get("sale_price")
+        tags = prod.get("tags", [])  # Tags del producto (ej: ["#Organico", "#Floracion"])
+
+        # Solo incluir si tiene SKU canónico (no mostrar SKUs internos)
+        # El SKU canónico tiene formato XXX_####_YYY
+        if not sku or not product_id:
+            continue
+
+        item = {
+            "product_id": product_id,
+            "name": name,
+            "sku": sku,
+            "stock": stock,
+            "price": price,
+        }
+        # Incluir tags si están disponibles
+        if tags:
+            item["tags"] = tags
+
+        items.append(item)
+
+    return {"items": items, "count": len(items), "query": query}
 
 
 TOOLS_REGISTRY = {
     "get_product_info": get_product_info,
     "get_product_full_info": get_product_full_info,
+    "get_products_info": get_products_info,
     "find_products_by_name": find_products_by_name,
 }
 
@@ -383,7 +466,7 @@ async def invoke_tool(tool_name: str, parameters: Dict[str, Any], token: str) ->
 
     Args:
         tool_name: Nombre registrado de la herramienta.
-        parameters: Parámetros de la herramienta (sku, product_id, query según el tool).
+        parameters: Parámetros de la herramienta (sku, product_id, skus, query según el tool).
         token: Token JWT para autenticación (validado por el decorador @require_mcp_auth).
 
     Returns:
@@ -413,6 +496,14 @@ async def invoke_tool(tool_name: str, parameters: Dict[str, Any], token: str) ->
         logger.info("invoke_tool: Ejecutando %s con query='%s'", tool_name, query)
         # El decorador @require_mcp_auth recibe token como primer parámetro
         result = await func(token, query=query)  # type: ignore[arg-type]
+    elif tool_name == "get_products_info":
+        skus = parameters.get("skus") or []
+        product_ids = parameters.get("product_ids") or []
+        if not isinstance(skus, list) or not isinstance(product_ids, list):
+            raise ValueError("'skus' y 'product_ids' deben ser listas.")
+        product_ids = [int(p) for p in product_ids if str(p).isdigit()]
+        logger.info("invoke_tool: Ejecutando %s con %d skus y %d ids", tool_name, len(skus), len(product_ids))
+        result = await func(token, skus=skus, product_ids=product_ids)  # type: ignore[arg-type]
     else:
         # Tools de producto: aceptan sku o product_id
         sku = parameters.get("sku")
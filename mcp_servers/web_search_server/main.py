@@ -8,11 +8,17 @@ from __future__ import annotations
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
 
-from .tools import invoke_tool
+from .tools import close_client, invoke_tool
 
 app = FastAPI(title="MCP Web Search Server")
 
 
+@app.on_event("shutdown")
+async def _close_http_client() -> None:
+    """Libera el pool de conexiones compartido hacia el buscador."""
+    await close_client()
+
+
 class InvokePayload(BaseModel):
     tool_name: str
     parameters: dict
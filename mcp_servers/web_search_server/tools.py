@@ -6,6 +6,7 @@
 from __future__ import annotations
 
 from typing import Any, Dict, List
+import asyncio
 import os
 import urllib.parse as _url
 import httpx
@@ -14,6 +15,37 @@ from bs4 import BeautifulSoup  # type: ignore
 # Roles permitidos (puedes afinar en futuro)
 _ALLOWED_ROLES = {"admin", "colaborador"}
 
+# Cliente HTTP compartido hacia DuckDuckGo (keep-alive entre búsquedas).
+# Se crea perezosamente en el event loop activo y se cierra en el shutdown de la app.
+_client: httpx.AsyncClient | None = None
+_client_loop: asyncio.AbstractEventLoop | None = None
+
+
+def _get_client() -> httpx.AsyncClient:
+    """Retorna el cliente HTTP compartido para el loop actual (ver products_server)."""
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        _client = httpx.AsyncClient(
+            timeout=8.0,
+            trust_env=True,
+            limits=httpx.Limits(
+                max_connections=int(os.getenv("MCP_HTTP_MAX_CONNECTIONS", "20") or 20),
+                max_keepalive_connections=int(os.getenv("MCP_HTTP_MAX_KEEPALIVE", "10") or 10),
+            ),
+        )
+        _client_loop = loop
+    return _client
+
+
+async def close_client() -> None:
+    """Cierra el cliente HTTP compartido (llamado en el shutdown de la app)."""
+    global _client, _client_loop
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
+    _client_loop = None
+
 
 def _ddg_unwrap(href: str) -> str:
     """Normaliza enlaces de DuckDuckGo que usan redirección /l/?uddg=..."""
@@ -54,40 +86,40 @@ async def search_web(query: str, user_role: str, max_results: int = 5) -> Dict[s
         params = {"q": query}
         items: List[Dict[str, Any]] = []
         headers = {"User-Agent": os.getenv("WEB_SEARCH_UA", "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36")}
-        async with httpx.AsyncClient(timeout=8.0, headers=headers, trust_env=True) as client:
-            for base in bases:
-                try:
-                    resp = await client.get(base, params=params)
-                    if resp.status_code != 200:
+        client = _get_client()
+        for base in bases:
+            try:
+                resp = await client.get(base, params=params, headers=headers)
+                if resp.status_code != 200:
+                    continue
+                soup = BeautifulSoup(resp.text, "html.parser")
+                # Selectores alternativos según versión html/lite
+                anchors = soup.select("a.result__a")
+                if not anchors:
+                    anchors = soup.select("a.result-link, a.result__url")
+                tmp: List[Dict[str, Any]] = []
+                for a in anchors:
+                    title = a.get_text(" ").strip()
+                    href = a.get("href") or ""
+                    if not title or not href:
                         continue
-                    soup = BeautifulSoup(resp.text, "html.parser")
-                    # Selectores alternativos según versión html/lite
-                    anchors = soup.select("a.result__a")
-                    if not anchors:
-                        anchors = soup.select("a.result-link, a.result__url")
-                    tmp: List[Dict[str, Any]] = []
-                    for a in anchors:
-                        title = a.get_text(" ").strip()
-                        href = a.get("href") or ""
-                        if not title or not href:
-                            continue
-                        href = _ddg_unwrap(href)
-                        # snippet opcional
-                        parent = a.find_parent("div")
-                        snippet = None
-                        if parent:
-                            sn_div = parent.select_one(".result__snippet, .result-snippet")
-                            if sn_div:
-                                snippet = sn_div.get_text(" ").strip()
-                        tmp.append({"title": title, "url": href, "snippet": snippet})
-                        if len(tmp) >= max_results:
-                            break
-                    if tmp:
-                        items = tmp
+                    href = _ddg_unwrap(href)
+                    # snippet opcional
+                    parent = a.find_parent("div")
+                    snippet = None
+                    if parent:
+                        sn_div = parent.select_one(".result__snippet, .result-snippet")
+                        if sn_div:
+                            snippet = sn_div.get_text(" ").strip()
+                    tmp.append({"title": title, "url": href, "snippet": snippet})
+                    if len(tmp) >= max_results:
                         break
-                except Exception:
-                    # Intentar siguiente base
-                    continue
+                if tmp:
+                    items = tmp
+                    break
+            except Exception:
+                # Intentar siguiente base
+                continue
         return {"items": items, "query": query, "source": "duckduckgo" if items else "duckduckgo:none"}
     except Exception:
         return {"items": [], "query": query, "error": "network_failure"}
@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+# NG-HEADER: Nombre de archivo: bench_remito_parser.py
+# NG-HEADER: Ubicación: scripts/bench_remito_parser.py
+# NG-HEADER: Descripción: Benchmark del parser de remitos por etapa (cascada completa vs. perfil de layout)
+# NG-HEADER: Lineamientos: Ver AGENTS.md
+"""Mide el parser de remitos sobre los PDFs de muestra.
+
+Hace dos pasadas con la caché de extracción vacía:
+
+1. ``cold``: sin perfil de layout (como el primer remito de un proveedor).
+2. ``hinted``: con ``layout_hint`` = etapa que resolvió cada PDF en la pasada 1
+   (como los remitos siguientes del mismo proveedor).
+
+Por pasada informa tiempo medio por etapa, cuántas veces corrió cada una, qué
+proporción de PDFs la salteó y la tasa de fast path.
+
+Uso:
+    python scripts/bench_remito_parser.py [--dirs ImagenesTest data Devs] [--ocr] [--limit N]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+def _collect(dirs: List[str], limit: Optional[int]) -> List[Path]:
+    pdfs: List[Path] = []
+    for d in dirs:
+        base = (ROOT / d) if not Path(d).is_absolute() else Path(d)
+        if base.is_file() and base.suffix.lower() == ".pdf":
+            pdfs.append(base)
+        elif base.is_dir():
+            pdfs.extend(p for p in sorted(base.rglob("*.pdf")) if not p.stem.endswith("_ocr") and "_extract" not in p.parts)
+    return pdfs[:limit] if limit else pdfs
+
+
+def _run_pass(pdfs: List[Path], hints: Dict[Path, Optional[str]], use_ocr: bool) -> Dict[str, Any]:
+    from services.importers import pdf_extract
+    from services.importers.santaplanta_pipeline import STAGE_NAMES, parse_remito
+
+    stage_ms: Dict[str, List[int]] = {}
+    skipped = {name: 0 for name in STAGE_NAMES}
+    fast = 0
+    stages: Dict[Path, Optional[str]] = {}
+    totals: List[float] = []
+    with tempfile.TemporaryDirectory() as cache:
+        os.environ["PDF_EXTRACT_CACHE_DIR"] = cache
+        pdf_extract.clear_memory()
+        for pdf in pdfs:
+            t0 = time.perf_counter()
+            res = parse_remito(pdf, correlation_id="bench", use_ocr_auto=use_ocr, layout_hint=hints.get(pdf))
+            totals.append((time.perf_counter() - t0) * 1000)
+            for name, ms in (res.debug.get("stage_ms") or {}).items():
+                stage_ms.setdefault(name, []).append(ms)
+            for name in res.debug.get("stages_skipped") or []:
+                skipped[name] = skipped.get(name, 0) + 1
+            fast += 1 if res.debug.get("fast_path") else 0
+            stages[pdf] = res.debug.get("layout_stage")
+        pdf_extract.clear_memory()
+    return {"stage_ms": stage_ms, "skipped": skipped, "fast": fast, "stages": stages, "totals": totals}
+
+
+def _report(title: str, data: Dict[str, Any], n: int) -> None:
+    print(f"\n== {title} ({n} PDFs) ==")
+    if data["totals"]:
+        print(f"total: media {statistics.mean(data['totals']):.1f} ms, p50 {statistics.median(data['totals']):.1f} ms")
+    print(f"fast path: {data['fast']}/{n} ({100 * data['fast'] / n:.0f}%)")
+    print(f"{'etapa':<18}{'corridas':>9}{'media ms':>10}{'salteada':>10}")
+    names = list(dict.fromkeys(list(data["skipped"]) + list(data["stage_ms"])))
+    for name in names:
+        runs = data["stage_ms"].get(name, [])
+        mean = f"{statistics.mean(runs):.1f}" if runs else "-"
+        print(f"{name:<18}{len(runs):>9}{mean:>10}{100 * data['skipped'].get(name, 0) / n:>9.0f}%")
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--dirs", nargs="+", default=["ImagenesTest", "data", "Devs"], help="Carpetas o PDFs a medir")
+    ap.add_argument("--ocr", action="store_true", help="Permitir OCR automático (lento)")
+    ap.add_argument("--limit", type=int, default=None)
+    args = ap.parse_args()
+
+    pdfs = _collect(args.dirs, args.limit)
+    if not pdfs:
+        print("No se encontraron PDFs en: " + ", ".join(args.dirs))
+        return 1
+    cold = _run_pass(pdfs, {}, args.ocr)
+    _report("cold (sin perfil)", cold, len(pdfs))
+    hinted = _run_pass(pdfs, cold["stages"], args.ocr)
+    _report("hinted (perfil de layout)", hinted, len(pdfs))
+    changed = [p.name for p in pdfs if cold["stages"].get(p) != hinted["stages"].get(p)]
+    if changed:
+        print(f"\nAVISO: {len(changed)} PDFs resolvieron con otra etapa usando el perfil: {', '.join(changed[:10])}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
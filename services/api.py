@@ -78,7 +78,10 @@ try:
     LOG_DIR.mkdir(parents=True, exist_ok=True)
 except Exception:
     pass
-fmt = logging.Formatter("%(asctime)s | %(levelname)s | %(name)s | %(message)s")
+from services.logging import pipeline as log_pipeline  # noqa: E402
+from services.logging import outbox as side_effects  # noqa: E402
+
+fmt = log_pipeline.make_formatter()
 stream_handler = logging.StreamHandler()
 stream_handler.setFormatter(fmt)
 
@@ -93,14 +96,14 @@ try:
         str(log_path), maxBytes=10 * 1024 * 1024, backupCount=5, encoding="utf-8", delay=True
     )
     file_handler.setFormatter(fmt)
-    logger.addHandler(file_handler)
 except Exception:
     # Sin permisos o archivo bloqueado: continuar solo con consola
     file_handler = None
 
-logger.addHandler(stream_handler)
-
-handlers = [h for h in (file_handler, stream_handler) if h is not None]
+# Con LOG_ASYNC (default) los handlers reales quedan detrás de un QueueHandler
+handlers = log_pipeline.install((file_handler, stream_handler))
+for _h in handlers:
+    logger.addHandler(_h)
 logging.getLogger("uvicorn").handlers = handlers
 logging.getLogger("uvicorn.error").handlers = handlers
 logging.getLogger("uvicorn.access").handlers = handlers
@@ -121,7 +124,10 @@ except Exception:
 
 # `redirect_slashes=False` evita redirecciones 307 entre `/ruta` y `/ruta/`,
 # lo que rompe las solicitudes *preflight* de CORS.
-app = FastAPI(title="Growen", redirect_slashes=False)
+# FastJSONResponse como clase por defecto sólo si FastAPI no serializa response_model en una pasada
+from services.json_response import app_kwargs as _json_app_kwargs  # noqa: E402
+
+app = FastAPI(title="Growen", redirect_slashes=False, **_json_app_kwargs())
 APP_IMPORT_TS = time.perf_counter()
 APP_READY_TS: float | None = None
 _STARTUP_METRIC_WRITTEN = False
@@ -134,9 +140,58 @@ except Exception:
     pass
 
 
+def _notion_500_job(request: Request, corr: str | None) -> "side_effects.Job":
+    """Arma el trabajo de outbox que registra la tarjeta Notion de un 500."""
+    path = request.url.path
+    url = str(request.url)
+    method = request.method
+
+    async def _job() -> None:
+        cfg = load_notion_settings()
+        # En modo sections NO enviar reportes 500 a Notion desde middleware (solo logs).
+        if not (cfg.enabled and cfg.errors_db) or cfg.mode == "sections":
+            return
+        ev = ErrorEvent(
+            servicio="api",
+            entorno=os.getenv("ENV", "dev"),
+            url=url,
+            codigo="HTTP 500",
+            mensaje=f"Unhandled exception en {method} {path}",
+            stacktrace=None,  # el logger.exception dejA3 traza en archivo
+            correlation_id=corr,
+            etiquetas=["unhandled", "500"],
+            seccion=(
+                "Compras" if "/purchases" in path or "/compras" in path else
+                "Stock" if "/stock" in path or "/inventario" in path else
+                "App" if "/admin" in path else
+                None
+            ),
+        )
+        await asyncio.to_thread(create_or_update_card, ev)
+
+    return _job
+
+
+def _startup_metric_job(path: str) -> "side_effects.Job":
+    ttfb_ms = int((time.perf_counter() - APP_IMPORT_TS) * 1000)
+    app_ready_ms = int(((APP_READY_TS or APP_IMPORT_TS) - APP_IMPORT_TS) * 1000)
+
+    async def _job() -> None:
+        from db.models import StartupMetric  # local import to avoid early import
+        async with SessionLocal() as s:  # type: ignore
+            s.add(StartupMetric(ttfb_ms=ttfb_ms, app_ready_ms=app_ready_ms, meta={"path": path}))
+            await s.commit()
+
+    return _job
+
+
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
-    """Registra cada solicitud y captura excepciones con un correlation-id."""
+    """Registra cada solicitud y captura excepciones con un correlation-id.
+
+    La escritura del log va por ``services.logging.pipeline`` (cola + thread) y los
+    efectos secundarios (Notion, ``StartupMetric``) por el outbox async.
+    """
     start = time.perf_counter()
     # Correlation / request id (prefer incoming header if present)
     try:
@@ -150,6 +205,7 @@ async def log_requests(request: Request, call_next):
         request.state.correlation_id = corr
     except Exception:
         pass
+    own = time.perf_counter() - start
     try:
         resp = await call_next(request)
     except (FastHTTPException, StarletteHTTPException):
@@ -162,34 +218,8 @@ async def log_requests(request: Request, call_next):
         else:
             logger.exception("EXC %s %s (%.2fms)", request.method, request.url.path, dur)
         # Notion: registrar tarjeta de error 500 si estA habilitado (no bloquear respuesta)
-        try:
-            cfg = load_notion_settings()
-            if cfg.enabled and cfg.errors_db:
-                ev = ErrorEvent(
-                    servicio="api",
-                    entorno=os.getenv("ENV", "dev"),
-                    url=str(request.url),
-                    codigo="HTTP 500",
-                    mensaje=f"Unhandled exception en {request.method} {request.url.path}",
-                    stacktrace=None,  # el logger.exception dejA3 traza en archivo
-                    correlation_id=corr,
-                    etiquetas=["unhandled", "500"],
-                    seccion=(
-                        "Compras" if "/purchases" in request.url.path or "/compras" in request.url.path else
-                        "Stock" if "/stock" in request.url.path or "/inventario" in request.url.path else
-                        "App" if "/admin" in request.url.path else
-                        None
-                    ),
-                )
-                import asyncio
-                if cfg.mode == "sections":
-                    # En modo sections NO enviar reportes 500 a Notion desde middleware.
-                    # SA3lo dejamos el registro en logs para evitar ruido.
-                    pass
-                else:
-                    asyncio.create_task(asyncio.to_thread(create_or_update_card, ev))
-        except Exception:
-            logger.debug("No se pudo encolar tarjeta Notion para 500", exc_info=True)
+        if not side_effects.submit(_notion_500_job(request, corr)):
+            logger.debug("No se pudo encolar tarjeta Notion para 500")
         # Devolver error con tono argento, breve y claro (sin faltar el respeto)
         return JSONResponse(
             {
@@ -197,29 +227,27 @@ async def log_requests(request: Request, call_next):
             },
             status_code=500,
         )
-    dur = (time.perf_counter() - start) * 1000
+    after = time.perf_counter()
+    dur = (after - start) * 1000
+    path = request.url.path
+    status = resp.status_code
     if corr:
         # echo correlation id in response header so FE can surface it
         try:
             resp.headers["X-Correlation-Id"] = corr
         except Exception:
             pass
-        logger.info("%s %s -> %s cid=%s (%.2fms)", request.method, request.url.path, resp.status_code, corr, dur)
-    else:
-        logger.info("%s %s -> %s (%.2fms)", request.method, request.url.path, resp.status_code, dur)
+    if log_pipeline.should_log_access(path, status):
+        http = {"method": request.method, "path": path, "status": status, "cid": corr, "dur_ms": round(dur, 2)}
+        if corr:
+            logger.info("%s %s -> %s cid=%s (%.2fms)", request.method, path, status, corr, dur, extra={"http": http})
+        else:
+            logger.info("%s %s -> %s (%.2fms)", request.method, path, status, dur, extra={"http": http})
     # Record startup metric once on first successful request
     global _STARTUP_METRIC_WRITTEN
     if not _STARTUP_METRIC_WRITTEN:
-        try:
-            from db.models import StartupMetric  # local import to avoid early import
-            ttfb_ms = int((time.perf_counter() - APP_IMPORT_TS) * 1000)
-            app_ready_ms = int(((APP_READY_TS or APP_IMPORT_TS) - APP_IMPORT_TS) * 1000)
-            async with SessionLocal() as s:  # type: ignore
-                s.add(StartupMetric(ttfb_ms=ttfb_ms, app_ready_ms=app_ready_ms, meta={"path": request.url.path}))
-                await s.commit()
-            _STARTUP_METRIC_WRITTEN = True
-        except Exception:
-            pass
+        _STARTUP_METRIC_WRITTEN = side_effects.submit(_startup_metric_job(path))
+    log_pipeline.record_overhead((own + time.perf_counter() - after) * 1_000_000)
     return resp
 
 # --- Exception Handlers EspecAficos ---
@@ -329,6 +357,10 @@ extra_origins = os.getenv("CORS_EXTRA_ORIGINS", "")
 if extra_origins:
     origins.extend([o.strip() for o in extra_origins.split(",") if o.strip()])
 
+# Compresión y ETag/304 (opt-in: HTTP_COMPRESSION / HTTP_ETAGS); CORS queda por fuera
+from services.http_cache import HttpCacheMiddleware  # noqa: E402
+
+app.add_middleware(HttpCacheMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
@@ -653,6 +685,21 @@ async def _init_inmemory_db():
     except Exception:
         pass
 
+    # Reanudar jobs de enriquecimiento masivo interrumpidos (watchdog por heartbeat)
+    try:
+        if os.getenv("ENRICH_JOBS_WATCHDOG", "1") != "0":
+            from services import enrichment_jobs
+            enrichment_jobs.start_watchdog()
+    except Exception:
+        logger.exception("No se pudo iniciar el watchdog de jobs de enriquecimiento")
+
+    # Reanudar commits de importación que quedaron a mitad de camino (checkpoint por lote)
+    try:
+        from services import import_commit
+        asyncio.create_task(import_commit.resume_orphaned())
+    except Exception:
+        logger.exception("No se pudieron reanudar commits de importación")
+
     # Programar autobackup diferido y no bloqueante
     try:
         _t = _schedule_auto_backup()  # may be coroutine
@@ -663,6 +710,65 @@ async def _init_inmemory_db():
         pass
 
 
+@app.on_event("shutdown")
+async def _drain_side_effects():
+    """Ejecuta los efectos secundarios pendientes (la cola de logging se vacía en atexit)."""
+    try:
+        await side_effects.drain()
+    except Exception:
+        logger.exception("No se pudo vaciar el outbox de efectos secundarios")
+
+
+@app.on_event("shutdown")
+async def _drain_chat_write_queue():
+    """Persiste los mensajes de chat pendientes de la escritura diferida."""
+    try:
+        from services.chat.context_buffer import write_queue
+        await write_queue.drain()
+    except Exception:
+        logger.exception("No se pudo vaciar la cola de escritura de chat")
+
+
+@app.on_event("shutdown")
+async def _close_http_clients():
+    """Cierra los pools de clientes HTTP salientes (Telegram, MCP, scraping...)."""
+    try:
+        from services import http_clients
+        await http_clients.aclose_all()
+    except Exception:
+        logger.exception("No se pudieron cerrar los clientes HTTP compartidos")
+
+
+@app.on_event("shutdown")
+async def _stop_enrichment_watchdog():
+    """Detiene el watchdog; los jobs en curso se reanudan en el próximo arranque."""
+    try:
+        from services import enrichment_jobs
+        enrichment_jobs.stop_watchdog()
+    except Exception:
+        logger.exception("No se pudo detener el watchdog de jobs de enriquecimiento")
+
+
+@app.on_event("shutdown")
+async def _stop_catalog_render_pool():
+    """Libera el pool de procesos de render de catálogos."""
+    try:
+        from services import catalog_pdf
+        catalog_pdf.shutdown_executor()
+    except Exception:
+        logger.exception("No se pudo detener el pool de render de catálogos")
+
+
+@app.on_event("shutdown")
+async def _stop_remito_import_pool():
+    """Libera el pool de parsing de remitos PDF."""
+    try:
+        from services.importers import remito_jobs
+        remito_jobs.shutdown_executor()
+    except Exception:
+        logger.exception("No se pudo detener el pool de importación de remitos")
+
+
 # Unificado en services.routers.health
 
 # --- Static frontend (built) + SPA fallback ---
@@ -23,6 +23,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from agent_core.config import settings
 from db.models import Session as DBSess, User
 from db.session import get_session
+from services import session_cache
 
 
 def verify_internal_service_token(request: Request) -> bool:
@@ -66,6 +67,8 @@ class SessionData:
     session: Optional[DBSess]
     user: Optional[User]
     role: str
+    # True si se resolvió desde ``services.session_cache`` (puede tener hasta un TTL de atraso)
+    cached: bool = False
 
 
 async def set_session_cookies(resp: Response, sid: str, csrf: str, request: Request | None = None) -> None:
@@ -126,6 +129,7 @@ async def create_session(
     if prev_session:
         await db.delete(prev_session)
         await db.commit()
+        await session_cache.invalidate(prev_session.id)
 
     sid = secrets.token_hex(32)
     csrf = secrets.token_urlsafe(24)
@@ -147,8 +151,16 @@ async def create_session(
 async def current_session(
     request: Request, db: AsyncSession = Depends(get_session)
 ) -> SessionData:
-    """Resuelve la sesión actual a partir de la cookie."""
+    """Resuelve la sesión actual a partir de la cookie.
 
+    Con hit en ``services.session_cache`` no se consulta la DB (y la ``AsyncSession``
+    inyectada no llega a tomar una conexión del pool).
+    """
+
+    return await _resolve_session(request, db, use_cache=True)
+
+
+async def _resolve_session(request: Request, db: AsyncSession, *, use_cache: bool) -> SessionData:
     sid = request.cookies.get("growen_session")
     if not sid:
         # En desarrollo, opcionalmente se puede asumir admin sin sesión si DEV_ASSUME_ADMIN=true.
@@ -156,18 +168,25 @@ async def current_session(
         role = "admin" if (settings.env == "dev" and settings.dev_assume_admin) else "guest"
         return SessionData(None, None, role)
 
-    res = await db.execute(select(DBSess).where(DBSess.id == sid))
-    sess: DBSess | None = res.scalar_one_or_none()
+    cached = await session_cache.get(sid) if use_cache else None
+    if cached is not None:
+        sess, user = cached
+    else:
+        res = await db.execute(select(DBSess).where(DBSess.id == sid))
+        sess = res.scalar_one_or_none()
+        user = None
+        if sess and sess.user_id:
+            user = await db.get(User, sess.user_id)
+        if sess is None or sess.expires_at >= datetime.utcnow():
+            await session_cache.put(sid, sess, user)
+
     if not sess or sess.expires_at < datetime.utcnow():
         # En desarrollo, solo asumimos admin si DEV_ASSUME_ADMIN=true.
         if settings.env == "dev" and settings.dev_assume_admin:
             return SessionData(None, None, "admin")
         return SessionData(None, None, "guest")
 
-    user: User | None = None
-    if sess.user_id:
-        user = await db.get(User, sess.user_id)
-    return SessionData(sess, user, sess.role)
+    return SessionData(sess, user, sess.role, cached=cached is not None)
 
 
 def require_roles(*roles: str) -> Callable[[SessionData], SessionData]:
@@ -177,10 +196,17 @@ def require_roles(*roles: str) -> Callable[[SessionData], SessionData]:
     1. Token de servicio interno (X-Internal-Service-Token): asume rol admin
     2. Sesión de usuario con cookie (growen_session)
     3. Headers de prueba (X-User-Roles, X-User-Id) - solo para tests
+
+    Los endpoints sólo-admin no confían en la cache de sesiones: una revocación o
+    un cambio de rol hecho en otro worker tiene que cortar el acceso de inmediato.
     """
 
+    admin_only = all(r == "admin" or r == ["admin"] for r in roles)
+
     async def dep(
-        request: Request, sess: SessionData = Depends(current_session)
+        request: Request,
+        sess: SessionData = Depends(current_session),
+        db: AsyncSession = Depends(get_session),
     ) -> SessionData:
         # 1. Verificar token de servicio interno (mayor prioridad)
         if verify_internal_service_token(request):
@@ -208,6 +234,9 @@ def require_roles(*roles: str) -> Callable[[SessionData], SessionData]:
                     setattr(eff, "user_id", hdr_uid)
                 return eff
 
+        if admin_only and sess.cached:
+            sess = await _resolve_session(request, db, use_cache=False)
+
         # Chequeo normal de roles
         if sess.role not in roles:
             raise HTTPException(status_code=403, detail="Forbidden")
@@ -0,0 +1,401 @@
+# NG-HEADER: Nombre de archivo: catalog_pdf.py
+# NG-HEADER: Ubicación: services/catalog_pdf.py
+# NG-HEADER: Descripción: Render de catálogo PDF en background (pool de procesos, fragmentos cacheados, miniaturas)
+# NG-HEADER: Lineamientos: Ver AGENTS.md
+"""Generación del PDF de catálogo fuera del event loop.
+
+El endpoint ``POST /catalogs/generate`` sólo consulta la DB y arma los grupos por
+categoría; el render (WeasyPrint, CPU intensivo y con el GIL tomado) corre como
+job en un pool (``CATALOG_RENDER_EXECUTOR=process|thread``, ``CATALOG_RENDER_WORKERS``)
+y el progreso se consulta con ``GET /catalogs/jobs/{job_id}`` (estado persistido por
+``services.job_registry``: responde aunque el polling llegue a otro worker).
+
+Render incremental: las fichas de cada categoría ya empiezan en página nueva, así
+que se renderizan como PDFs independientes cacheados en disco por hash de su
+contenido (``<cache>/fragments/<sha1>.pdf``). Si sólo cambiaron algunos productos
+se re-renderizan esas categorías más el listado inicial y se unen con ``pypdf``.
+Las imágenes se reducen a miniaturas JPEG cacheadas (``<cache>/thumbs``) en lugar de
+decodificar la imagen original en cada render.
+
+Sin WeasyPrint o ``pypdf`` se renderiza el documento completo de una vez (fallback
+de texto con reportlab), igual que antes.
+
+Este módulo lo importan los procesos del pool: sólo dependencias livianas arriba.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import uuid
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from services.job_registry import JobRegistry
+
+logger = logging.getLogger("growen.catalogs")
+
+_EXECUTOR_KIND = os.getenv("CATALOG_RENDER_EXECUTOR", "process").lower()
+_WORKERS = max(1, int(os.getenv("CATALOG_RENDER_WORKERS", "2") or 2))
+_FRAGMENT_CACHE_MAX = int(os.getenv("CATALOG_FRAGMENT_CACHE_MAX", "200") or 200)
+_THUMB_PX = int(os.getenv("CATALOG_THUMB_PX", "600") or 600)
+_JOBS_MAX = 50
+
+CSS = """
+    <style>
+    body { font-family: 'Helvetica','Arial',sans-serif; background:#111; color:#eee; margin:0; padding:32px; }
+    h1 { color:#f0f; text-align:center; margin-top:0; }
+    h2 { color:#22c55e; border-bottom:1px solid #333; padding-bottom:4px; margin-top:40px; }
+    .cat-list { columns:2; column-gap:40px; }
+    .cat-item { break-inside:avoid; margin:2px 0; font-size:14px; }
+    .price { color:#f0f; font-weight:600; }
+    .grid-page { display:grid; grid-template-columns:1fr 1fr; grid-template-rows:1fr 1fr; gap:28px; page-break-after:always; padding:16px 0; }
+    .card { background:#1d1d1d; border:1px solid #333; border-radius:8px; padding:12px; display:flex; flex-direction:column; }
+    .card h3 { margin:4px 0 8px; font-size:16px; line-height:1.2; color:#fff; }
+    .card img { max-width:100%; max-height:180px; object-fit:contain; margin:0 auto 8px; filter: drop-shadow(0 0 4px #000); }
+    .desc { font-size:12px; line-height:1.35; color:#bbb; margin-top:auto; white-space:pre-wrap; }
+    footer { text-align:center; font-size:10px; color:#666; margin-top:60px; }
+    @page { size:A4; margin:20mm 15mm; background:#111; }
+    </style>
+    """
+
+# Cambia si cambia el CSS o el markup de las fichas: invalida los fragmentos cacheados
+_LAYOUT_VERSION = hashlib.sha1(("cards-v1" + CSS).encode("utf-8")).hexdigest()[:8]
+
+
+# ------------------------------ HTML ------------------------------
+def _document(body: str) -> str:
+    return "<html><head>" + CSS + "</head><body>" + body + "</body></html>"
+
+
+def listing_html(groups: Dict[str, List[Dict[str, Any]]]) -> str:
+    parts = ["<h1>Catálogo</h1><section id='listado'>"]
+    for cat in sorted(groups.keys()):
+        parts.append(f"<h2>{cat}</h2><div class='cat-list'>")
+        for p in groups[cat]:
+            price = f"<span class='price'>$ {p['price']:.2f}</span>" if p.get("price") is not None else ""
+            parts.append(f"<div class='cat-item'>{p['title']} {price}</div>")
+        parts.append("</div>")
+    parts.append("</section>")
+    return "".join(parts)
+
+
+def cards_html(items: List[Dict[str, Any]]) -> str:
+    """Fichas de una categoría, de a 4 por página (no se mezclan categorías)."""
+    parts: List[str] = []
+    for i in range(0, len(items), 4):
+        parts.append("<div class='grid-page'>")
+        for p in items[i:i + 4]:
+            img_html = f"<img src='{p['image']}' alt='img'/>" if p.get("image") else ""
+            desc = (p.get("description") or "").strip()
+            if len(desc) > 600:
+                desc = desc[:600] + "…"
+            price = f"<div class='price'>$ {p['price']:.2f}</div>" if p.get("price") is not None else ""
+            parts.append("<div class='card'>" + img_html + f"<h3>{p['title']}</h3>{price}<div class='desc'>{desc}</div></div>")
+        parts.append("</div>")
+    return "".join(parts)
+
+
+def _footer(generated_at: str) -> str:
+    return "<footer>Generado: " + generated_at + " UTC</footer>"
+
+
+def build_html(groups: Dict[str, List[Dict[str, Any]]], generated_at: Optional[str] = None) -> str:
+    """Documento completo (listado + fichas) para el render en una sola pasada."""
+    generated_at = generated_at or datetime.utcnow().isoformat()
+    body = [listing_html(groups), "<section id='fichas'>"]
+    for cat in sorted(groups.keys()):
+        body.append(cards_html(groups[cat]))
+    body.append("</section>" + _footer(generated_at))
+    return _document("".join(body))
+
+
+# ------------------------------ Render ------------------------------
+def _weasyprint_available() -> bool:
+    try:
+        import weasyprint  # noqa: F401  # type: ignore
+    except Exception:
+        return False
+    return True
+
+
+def _pypdf_available() -> bool:
+    try:
+        import pypdf  # noqa: F401  # type: ignore
+    except Exception:
+        return False
+    return True
+
+
+def incremental_available() -> bool:
+    return _weasyprint_available() and _pypdf_available()
+
+
+def render_pdf(html: str) -> bytes:
+    # Prefer WeasyPrint
+    try:
+        from weasyprint import HTML  # type: ignore
+        return HTML(string=html).write_pdf()
+    except Exception:  # pragma: no cover - fallback
+        # Minimal fallback with reportlab: render plain text (degraded)
+        from reportlab.lib.pagesizes import A4  # type: ignore
+        from reportlab.pdfgen import canvas  # type: ignore
+        buf = BytesIO()
+        c = canvas.Canvas(buf, pagesize=A4)
+        text = c.beginText(40, A4[1]-40)
+        text.textLine("Catálogo (fallback texto)")
+        for line in html.splitlines():
+            if len(line) > 100:
+                line = line[:100]
+            text.textLine(line)
+            if text.getY() < 60:
+                c.drawText(text)
+                c.showPage()
+                text = c.beginText(40, A4[1]-40)
+        c.drawText(text)
+        c.showPage()
+        c.save()
+        return buf.getvalue()
+
+
+def render_document(groups: Dict[str, List[Dict[str, Any]]], generated_at: str) -> bytes:
+    return render_pdf(build_html(groups, generated_at))
+
+
+def render_listing(groups: Dict[str, List[Dict[str, Any]]], generated_at: str) -> bytes:
+    return render_pdf(_document(listing_html(groups) + _footer(generated_at)))
+
+
+def fragment_key(category: str, items: List[Dict[str, Any]]) -> str:
+    raw = json.dumps([_LAYOUT_VERSION, category, items], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _media_path(src: str) -> Optional[Path]:
+    if src.startswith("/media/"):
+        from services.media import get_media_root
+
+        return get_media_root() / src[len("/media/"):]
+    path = Path(src)
+    if not path.is_absolute():
+        from services.media import get_media_root
+
+        path = get_media_root() / src
+    return path
+
+
+def thumbnail(src: Optional[str], cache_dir: Path, max_px: int = _THUMB_PX) -> Optional[str]:
+    """URI ``file://`` de una miniatura JPEG cacheada de ``src``; ``src`` si no se pudo."""
+    if not src:
+        return src
+    target = cache_dir / "thumbs" / (hashlib.sha1(f"{src}|{max_px}".encode("utf-8")).hexdigest() + ".jpg")
+    if target.exists():
+        return target.as_uri()
+    try:
+        from PIL import Image as PILImage  # type: ignore
+
+        if src.startswith(("http://", "https://")):
+            from services import http_clients
+
+            resp = http_clients.get_session("default").get(src, timeout=10)
+            resp.raise_for_status()
+            source: Any = BytesIO(resp.content)
+        else:
+            path = _media_path(src)
+            if path is None or not path.is_file():
+                return src
+            source = path
+        with PILImage.open(source) as im:
+            im.thumbnail((max_px, max_px))
+            if im.mode not in ("RGB", "L"):
+                im = im.convert("RGB")
+            target.parent.mkdir(parents=True, exist_ok=True)
+            tmp = target.with_suffix(".tmp")
+            im.save(tmp, "JPEG", quality=82, optimize=True)
+            os.replace(tmp, target)
+        return target.as_uri()
+    except Exception:
+        logger.debug("[catalog] no se pudo generar miniatura de %s", src, exc_info=True)
+        return src
+
+
+def render_fragment(category: str, items: List[Dict[str, Any]], key: str, cache_dir: str) -> str:
+    """Renderiza las fichas de una categoría en ``<cache>/fragments/<key>.pdf`` (corre en el pool)."""
+    cache = Path(cache_dir)
+    with_thumbs = [{**p, "image": thumbnail(p.get("image"), cache)} for p in items]
+    pdf = render_pdf(_document(cards_html(with_thumbs)))
+    target = cache / "fragments" / f"{key}.pdf"
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_bytes(pdf)
+    os.replace(tmp, target)
+    return str(target)
+
+
+def merge_pdfs(parts: List[Any]) -> bytes:
+    """Une PDFs (bytes o rutas) en orden."""
+    from pypdf import PdfWriter  # type: ignore
+
+    writer = PdfWriter()
+    for part in parts:
+        writer.append(BytesIO(part) if isinstance(part, (bytes, bytearray)) else str(part))
+    out = BytesIO()
+    writer.write(out)
+    return out.getvalue()
+
+
+def prune_fragments(cache_dir: Path, keep: int = _FRAGMENT_CACHE_MAX) -> int:
+    files = sorted((cache_dir / "fragments").glob("*.pdf"), key=lambda p: p.stat().st_mtime, reverse=True)
+    removed = 0
+    for f in files[keep:]:
+        try:
+            f.unlink()
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+# ------------------------------ Jobs ------------------------------
+@dataclass
+class CatalogJob:
+    id: str
+    count: int
+    status: str = "queued"  # queued | running | done | error
+    progress: int = 0
+    step: str = "queued"
+    created_at: str = field(default_factory=lambda: datetime.utcnow().isoformat())
+    finished_at: Optional[str] = None
+    fragments_total: int = 0
+    fragments_reused: int = 0
+    error: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+_REGISTRY: JobRegistry[CatalogJob] = JobRegistry("catalog_pdf", max_local=_JOBS_MAX)
+_executor: Optional[Executor] = None
+
+
+def _get_executor() -> Executor:
+    global _executor
+    if _executor is None:
+        if _EXECUTOR_KIND == "process":
+            import multiprocessing
+
+            # spawn: el proceso de la API tiene threads (logging, pools); fork no es seguro
+            _executor = ProcessPoolExecutor(max_workers=_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        else:
+            _executor = ThreadPoolExecutor(max_workers=_WORKERS, thread_name_prefix="catalog-render")
+    return _executor
+
+
+def shutdown_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def get_job(job_id: str) -> Optional[CatalogJob]:
+    return _REGISTRY.get(job_id)
+
+
+async def job_status(job_id: str) -> Optional[Dict[str, Any]]:
+    """Estado del job aunque lo esté ejecutando otro worker (ver ``services.job_registry``)."""
+    return await _REGISTRY.status(job_id)
+
+
+def submit(
+    groups: Dict[str, List[Dict[str, Any]]],
+    *,
+    count: int,
+    cache_dir: Path,
+    on_done: Callable[[bytes, CatalogJob], Dict[str, Any]],
+    on_finish: Optional[Callable[[CatalogJob], None]] = None,
+) -> CatalogJob:
+    """Encola el render; ``on_done`` (en un thread) persiste el PDF y devuelve el resultado."""
+    job = CatalogJob(id=uuid.uuid4().hex[:12], count=count)
+    return _REGISTRY.submit(job, _run(job, groups, cache_dir, on_done, on_finish))
+
+
+async def wait(job_id: str) -> Optional[CatalogJob]:
+    return await _REGISTRY.wait(job_id)
+
+
+async def _render_incremental(
+    job: CatalogJob, groups: Dict[str, List[Dict[str, Any]]], generated_at: str, cache_dir: Path
+) -> Tuple[bytes, Dict[str, Any]]:
+    loop = asyncio.get_running_loop()
+    ex = _get_executor()
+    cats = sorted(groups.keys())
+    keys = {cat: fragment_key(cat, groups[cat]) for cat in cats}
+    paths: Dict[str, str] = {}
+    pending: List["asyncio.Future[Any]"] = []
+    for cat in cats:
+        path = cache_dir / "fragments" / f"{keys[cat]}.pdf"
+        if path.exists():
+            os.utime(path)  # LRU por mtime
+            paths[cat] = str(path)
+        else:
+            fut = loop.run_in_executor(ex, render_fragment, cat, groups[cat], keys[cat], str(cache_dir))
+            pending.append(_tag(cat, fut))
+    job.fragments_total = len(cats)
+    job.fragments_reused = len(paths)
+    listing_fut = loop.run_in_executor(ex, render_listing, groups, generated_at)
+    total = len(pending) + 1
+    done = 0
+    listing: Optional[bytes] = None
+    for next_done in asyncio.as_completed([*pending, _tag(None, listing_fut)]):
+        cat, value = await next_done
+        if cat is None:
+            listing = value
+        else:
+            paths[cat] = value
+        done += 1
+        job.progress = 10 + int(80 * done / total)
+    job.step = "merging"
+    pdf = await asyncio.to_thread(merge_pdfs, [listing, *(paths[cat] for cat in cats)])
+    await asyncio.to_thread(prune_fragments, cache_dir)
+    return pdf, {"fragments": len(cats), "reused": job.fragments_reused}
+
+
+async def _tag(tag: Any, fut: "asyncio.Future[Any]") -> Tuple[Any, Any]:
+    return tag, await fut
+
+
+async def _run(
+    job: CatalogJob,
+    groups: Dict[str, List[Dict[str, Any]]],
+    cache_dir: Path,
+    on_done: Callable[[bytes, CatalogJob], Dict[str, Any]],
+    on_finish: Optional[Callable[[CatalogJob], None]],
+) -> None:
+    try:
+        job.status, job.step, job.progress = "running", "rendering", 10
+        generated_at = datetime.utcnow().isoformat()
+        if incremental_available():
+            pdf, _stats = await _render_incremental(job, groups, generated_at, cache_dir)
+        else:
+            pdf = await asyncio.get_running_loop().run_in_executor(_get_executor(), render_document, groups, generated_at)
+        job.step, job.progress = "writing", 95
+        job.result = await asyncio.to_thread(on_done, pdf, job)
+        job.status, job.step, job.progress = "done", "done", 100
+    except Exception as e:
+        logger.exception("[catalog] job %s falló", job.id)
+        job.status, job.step, job.error = "error", "error", str(e) or type(e).__name__
+    finally:
+        job.finished_at = datetime.utcnow().isoformat()
+        if on_finish is not None:
+            try:
+                on_finish(job)
+            except Exception:
+                logger.exception("[catalog] on_finish falló para job %s", job.id)
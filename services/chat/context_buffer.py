@@ -0,0 +1,453 @@
+# NG-HEADER: Nombre de archivo: context_buffer.py
+# NG-HEADER: Ubicación: services/chat/context_buffer.py
+# NG-HEADER: Descripción: Buffer de contexto conversacional por sesión (memoria local + Redis opcional)
+# NG-HEADER: Lineamientos: Ver AGENTS.md
+"""Buffer rodante de los últimos mensajes user/assistant por sesión de chat.
+
+Evita el ``SELECT ... ORDER BY created_at DESC`` de ``get_recent_history`` en cada
+turno: el buffer se siembra una sola vez desde la DB (lectura en frío) y luego se
+alimenta con ``append`` al guardar mensajes.
+
+- Tier local: OrderedDict LRU (``CHAT_CONTEXT_MAX_SESSIONS``) con TTL de inactividad
+  (``CHAT_CONTEXT_TTL_SECONDS``). Sólo con un worker: una sesión que pasa por otro
+  worker dejaría aquí un buffer viejo, así que con ``WEB_CONCURRENCY`` > 1 el tier
+  local no se usa (se lee la DB).
+- Tier Redis (``CHAT_CONTEXT_BACKEND=redis``, o ``auto`` con varios workers): lista por
+  sesión con ``RPUSH``+``LTRIM``, compartida entre workers (``redis.asyncio``). Si Redis
+  falla se lee la DB durante ``CHAT_CONTEXT_REDIS_RETRY_SECONDS`` y, al volver, se
+  descartan los buffers a los que les pudo faltar un append.
+
+Los appends hechos dentro de una transacción se aplican recién en ``after_commit``
+(ver ``defer_append``), así un rollback no deja mensajes fantasma en el buffer.
+
+Escritura diferida opcional (``CHAT_HISTORY_WRITE_BEHIND=1``): ``ChatWriteQueue``
+persiste los ``ChatMessage`` en lotes desde una tarea en background. Mientras una
+sesión tiene mensajes en cola la lectura en frío no siembra el buffer (la DB todavía
+no los tiene), y si un mensaje no entró al buffer al encolarse, el buffer de esa
+sesión se descarta cuando el lote confirma.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Any, Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import event, select, update
+from sqlalchemy.orm import Session as _OrmSession
+
+logger = logging.getLogger(__name__)
+
+BUFFER_SIZE = int(os.getenv("CHAT_CONTEXT_BUFFER_SIZE", "20"))
+_TTL_SECONDS = int(os.getenv("CHAT_CONTEXT_TTL_SECONDS", "3600"))
+_MAX_SESSIONS = int(os.getenv("CHAT_CONTEXT_MAX_SESSIONS", "5000"))
+_REDIS_PREFIX = "growen:chat_ctx:"
+_REDIS_RETRY_SECONDS = float(os.getenv("CHAT_CONTEXT_REDIS_RETRY_SECONDS", "30"))
+
+# Entrada del buffer: (role, content)
+Entry = Tuple[str, str]
+
+
+def format_history(entries: Iterable[Entry]) -> str:
+    """Formatea mensajes (orden cronológico) con el formato "H: <Usuario|Asistente>: ..."."""
+    lines = []
+    for role, content in entries:
+        # Mapear role a etiqueta legible
+        label = "Usuario" if role == "user" else "Asistente"
+        # Limpiar contenido (quitar prefijos tipo "openai:" si existen)
+        clean_content = content.replace("openai:", "").strip()
+        lines.append(f"H: {label}: {clean_content}")
+    return "\n".join(lines)
+
+
+class _LocalTier:
+    def __init__(self) -> None:
+        self._data: "OrderedDict[str, Tuple[float, Deque[Entry]]]" = OrderedDict()
+
+    def _expire(self, now: float) -> None:
+        while self._data:
+            _, (touched, _) = next(iter(self._data.items()))
+            if now - touched <= _TTL_SECONDS:
+                break
+            self._data.popitem(last=False)
+
+    def get(self, session_id: str) -> Optional[List[Entry]]:
+        now = time.time()
+        self._expire(now)
+        item = self._data.get(session_id)
+        if item is None:
+            return None
+        self._data[session_id] = (now, item[1])
+        self._data.move_to_end(session_id)
+        return list(item[1])
+
+    def seed(self, session_id: str, entries: List[Entry]) -> None:
+        self._data[session_id] = (time.time(), deque(entries[-BUFFER_SIZE:], maxlen=BUFFER_SIZE))
+        self._data.move_to_end(session_id)
+        while len(self._data) > _MAX_SESSIONS:
+            self._data.popitem(last=False)
+
+    def append(self, session_id: str, entry: Entry) -> bool:
+        # Solo se agrega a buffers ya sembrados: uno parcial daría historial incompleto
+        item = self._data.get(session_id)
+        if item is None:
+            return False
+        item[1].append(entry)
+        self._data[session_id] = (time.time(), item[1])
+        self._data.move_to_end(session_id)
+        return True
+
+    def invalidate(self, session_id: str) -> None:
+        self._data.pop(session_id, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+class _RedisTier:
+    """Lista JSON por sesión; la clave ``:seeded`` marca que la lista está completa."""
+
+    def __init__(self, client: Any) -> None:
+        self._client = client
+
+    async def get(self, session_id: str) -> Optional[List[Entry]]:
+        key = _REDIS_PREFIX + session_id
+        pipe = self._client.pipeline()
+        pipe.exists(key + ":seeded")
+        pipe.lrange(key, 0, -1)
+        seeded, raw = await pipe.execute()
+        if not seeded:
+            return None
+        return [tuple(json.loads(x)) for x in raw]  # type: ignore[misc]
+
+    async def seed(self, session_id: str, entries: List[Entry]) -> None:
+        key = _REDIS_PREFIX + session_id
+        pipe = self._client.pipeline()
+        pipe.delete(key)
+        if entries:
+            pipe.rpush(key, *[json.dumps(list(e)) for e in entries[-BUFFER_SIZE:]])
+            pipe.expire(key, _TTL_SECONDS)
+        pipe.setex(key + ":seeded", _TTL_SECONDS, 1)
+        await pipe.execute()
+
+    async def append(self, session_id: str, entry: Entry) -> bool:
+        key = _REDIS_PREFIX + session_id
+        if not await self._client.exists(key + ":seeded"):
+            return False
+        pipe = self._client.pipeline()
+        pipe.rpush(key, json.dumps(list(entry)))
+        pipe.ltrim(key, -BUFFER_SIZE, -1)
+        pipe.expire(key, _TTL_SECONDS)
+        pipe.expire(key + ":seeded", _TTL_SECONDS)
+        await pipe.execute()
+        return True
+
+    async def invalidate(self, session_id: str) -> None:
+        await self._client.delete(_REDIS_PREFIX + session_id, _REDIS_PREFIX + session_id + ":seeded")
+
+
+def _workers() -> int:
+    # Mismo env que usan uvicorn/gunicorn para la cantidad de workers
+    try:
+        return int(os.getenv("WEB_CONCURRENCY", "1"))
+    except ValueError:
+        return 1
+
+
+def _create_tier() -> _LocalTier | _RedisTier | None:
+    workers = _workers()
+    backend = os.getenv("CHAT_CONTEXT_BACKEND", "auto").lower()
+    if backend == "auto":
+        backend = "redis" if workers > 1 else "memory"
+    if backend == "redis":
+        try:
+            import redis.asyncio as aioredis  # type: ignore
+
+            # La conexión es perezosa: una caída en runtime la maneja ``_call``
+            client = aioredis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0"), socket_timeout=0.5)
+            return _RedisTier(client)
+        except Exception as exc:  # pragma: no cover - depende de infraestructura
+            logger.warning("chat.context: redis no disponible (%s)", exc)
+    if workers > 1:
+        logger.warning("chat.context: %d workers sin redis, buffer deshabilitado (se lee la DB)", workers)
+        return None
+    return _LocalTier()
+
+
+_TIER = _create_tier()
+_redis_down_until = 0.0
+# Sesiones con un append/seed/invalidate a Redis fallido: su buffer se descarta al reconectar
+_DIRTY: Set[str] = set()
+
+
+async def _call(op: str, session_id: str, *args: Any) -> Any:
+    """Ejecuta ``op`` en el tier; con Redis caído devuelve ``None`` (el llamador va a la DB)."""
+    global _redis_down_until
+    tier = _TIER
+    if tier is None:
+        return None
+    if isinstance(tier, _LocalTier):
+        return getattr(tier, op)(session_id, *args)
+    if time.monotonic() < _redis_down_until:
+        if op != "get":
+            _DIRTY.add(session_id)
+        return None
+    try:
+        for sid in list(_DIRTY):
+            await tier.invalidate(sid)
+            _DIRTY.discard(sid)
+        return await getattr(tier, op)(session_id, *args)
+    except Exception as exc:
+        logger.warning(
+            "chat.context: redis falló (%s), leyendo historial de la DB por %.0fs", exc, _REDIS_RETRY_SECONDS
+        )
+        _redis_down_until = time.monotonic() + _REDIS_RETRY_SECONDS
+        if op != "get":
+            _DIRTY.add(session_id)
+        return None
+
+
+# Appends confirmados que todavía se están escribiendo en Redis (ver ``_apply_pending``)
+_INFLIGHT: Dict[str, "asyncio.Task[None]"] = {}
+
+
+async def get_entries(session_id: str, limit: int) -> Optional[List[Entry]]:
+    """Últimos ``limit`` mensajes desde el buffer, o ``None`` si hay que ir a la DB."""
+    if limit > BUFFER_SIZE:
+        return None
+    inflight = _INFLIGHT.get(session_id)
+    if inflight is not None:
+        # No leer antes de que aterrice el append del turno anterior
+        await asyncio.wait([inflight])
+    try:
+        entries = await _call("get", session_id)
+    except Exception:
+        logger.debug("chat.context: fallo leyendo buffer de %s", session_id, exc_info=True)
+        return None
+    if entries is None:
+        return None
+    return entries[-limit:] if limit > 0 else []
+
+
+async def seed(session_id: str, entries: List[Entry]) -> None:
+    try:
+        await _call("seed", session_id, entries)
+    except Exception:
+        logger.debug("chat.context: fallo sembrando buffer de %s", session_id, exc_info=True)
+
+
+async def append(session_id: str, role: str, content: str) -> bool:
+    """Agrega al buffer si está sembrado; ``True`` si el mensaje quedó en el buffer."""
+    if role not in ("user", "assistant"):
+        return True
+    try:
+        return bool(await _call("append", session_id, (role, content)))
+    except Exception:
+        logger.debug("chat.context: fallo agregando al buffer de %s", session_id, exc_info=True)
+        return False
+
+
+async def invalidate(session_id: str) -> None:
+    try:
+        await _call("invalidate", session_id)
+    except Exception:
+        logger.debug("chat.context: fallo invalidando buffer de %s", session_id, exc_info=True)
+
+
+# ------------------------------ Appends ligados a la transacción ------------------------------
+_PENDING_KEY = "chat_context_pending"
+
+
+def defer_append(db: Any, session_id: str, role: str, content: str) -> None:
+    """Registra un append que se aplica al confirmar la transacción de ``db`` (AsyncSession)."""
+    sync_session = getattr(db, "sync_session", db)
+    sync_session.info.setdefault(_PENDING_KEY, []).append((session_id, role, content))
+
+
+async def _append_all(items: List[Tuple[str, str, str]], previous: List["asyncio.Task[None]"]) -> None:
+    if previous:
+        await asyncio.wait(previous)  # respetar el orden de los commits de la misma sesión
+    for session_id, role, content in items:
+        await append(session_id, role, content)
+
+
+@event.listens_for(_OrmSession, "after_commit")
+def _apply_pending(sync_session: _OrmSession) -> None:
+    pending = sync_session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    if isinstance(_TIER, _LocalTier):
+        for session_id, role, content in pending:
+            if role in ("user", "assistant"):
+                _TIER.append(session_id, (role, content))
+        return
+    if _TIER is None:
+        return
+    # El evento es sincrónico: la escritura en Redis corre como task del event loop
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        asyncio.run(_append_all(pending, []))  # scripts sin event loop
+        return
+    sids = {sid for sid, _, _ in pending}
+    previous = [_INFLIGHT[sid] for sid in sids if sid in _INFLIGHT]
+    task = loop.create_task(_append_all(pending, previous))
+    for sid in sids:
+        _INFLIGHT[sid] = task
+
+    def _done(t: "asyncio.Task[None]") -> None:
+        for sid in sids:
+            if _INFLIGHT.get(sid) is t:
+                del _INFLIGHT[sid]
+
+    task.add_done_callback(_done)
+
+
+@event.listens_for(_OrmSession, "after_rollback")
+def _discard_pending(sync_session: _OrmSession) -> None:
+    sync_session.info.pop(_PENDING_KEY, None)
+
+
+# ------------------------------ Escritura diferida (write-behind) ------------------------------
+def write_behind_enabled() -> bool:
+    return os.getenv("CHAT_HISTORY_WRITE_BEHIND", "0") == "1"
+
+
+_STOP: dict = {}
+
+
+class ChatWriteQueue:
+    """Cola de ``ChatMessage`` pendientes que una tarea en background persiste por lotes."""
+
+    def __init__(self, batch_size: int = 50, flush_interval: float = 0.5) -> None:
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "asyncio.Queue[dict]" | None = None
+        self._task: "asyncio.Task[None]" | None = None
+        self._pending: Dict[str, List[dict]] = {}
+        self.flushed = 0
+
+    def enqueue(self, item: dict) -> None:
+        if self._queue is None or self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        self._pending.setdefault(item["session_id"], []).append(item)
+        self._queue.put_nowait(item)
+
+    def pending(self, session_id: str) -> List[dict]:
+        """Mensajes de ``session_id`` encolados en este proceso y todavía sin confirmar en la DB."""
+        return list(self._pending.get(session_id, ()))
+
+    def _settle(self, batch: List[dict]) -> None:
+        for it in batch:
+            items = self._pending.get(it["session_id"])
+            if items is not None:
+                items.remove(it)
+                if not items:
+                    del self._pending[it["session_id"]]
+
+    async def _run(self) -> None:
+        assert self._queue is not None
+        stop = False
+        while not stop:
+            item = await self._queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    # Shutdown: no perder el lote parcial
+                    stop = True
+                    break
+                batch.append(item)
+            await self._write(batch)
+
+    async def _write(self, batch: List[dict]) -> None:
+        from db.models import ChatMessage, ChatSession
+        from db.session import SessionLocal
+
+        try:
+            async with SessionLocal() as db:  # type: ignore
+                session_ids = {it["session_id"] for it in batch}
+                existing = set(
+                    (await db.execute(select(ChatSession.session_id).where(ChatSession.session_id.in_(session_ids))))
+                    .scalars()
+                    .all()
+                )
+                now = datetime.utcnow()
+                for it in batch:
+                    if it["session_id"] not in existing:
+                        db.add(
+                            ChatSession(
+                                session_id=it["session_id"],
+                                user_identifier=it["user_identifier"],
+                                status="new",
+                                created_at=now,
+                                updated_at=now,
+                            )
+                        )
+                        existing.add(it["session_id"])
+                db.add_all(
+                    ChatMessage(
+                        session_id=it["session_id"],
+                        role=it["role"],
+                        content=it["content"],
+                        created_at=it["created_at"],
+                        meta=it["meta"],
+                    )
+                    for it in batch
+                )
+                await db.execute(
+                    update(ChatSession)
+                    .where(ChatSession.session_id.in_(session_ids))
+                    .values(last_message_at=now, updated_at=now)
+                )
+                await db.commit()
+                self.flushed += len(batch)
+        except Exception:
+            logger.exception("chat.context: fallo persistiendo lote de %d mensajes", len(batch))
+            # El historial en DB quedó incompleto: forzar relectura en frío
+            stale = {it["session_id"] for it in batch}
+        else:
+            # Un mensaje que no entró al buffer al encolarse pudo faltar en una siembra
+            # hecha (en cualquier worker) antes de este commit
+            stale = {it["session_id"] for it in batch if not it.get("buffered", True)}
+        finally:
+            self._settle(batch)
+        for sid in stale:
+            await invalidate(sid)
+
+    async def drain(self) -> None:
+        """Detiene la tarea persistiendo lo pendiente (usado en shutdown y tests)."""
+        if self._queue is None or self._task is None:
+            return
+        if not self._task.done():
+            # Centinela en lugar de cancel(): wait_for puede tragarse la cancelación
+            self._queue.put_nowait(_STOP)
+            await self._task
+        self._task = None
+        self._queue = None
+
+
+write_queue = ChatWriteQueue()
+
+
+def reset() -> None:
+    """Vacía el tier local y el estado de caída de Redis (tests)."""
+    global _redis_down_until
+    if isinstance(_TIER, _LocalTier):
+        _TIER.clear()
+    _DIRTY.clear()
+    _redis_down_until = 0.0
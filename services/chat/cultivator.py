@@ -6,15 +6,16 @@
 """Servicio de diagnóstico de plantas para el Modo Cultivador."""
 from __future__ import annotations
 
-import base64
 import logging
 import re
+import time
 from typing import Any, Dict, List, Optional
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ai.router import AIRouter
 from ai.types import Task
+from services.chat import vision_input
 from services.notifications.telegram import download_telegram_file
 from services.rag.search import get_rag_search_service
 
@@ -179,7 +180,11 @@ async def get_image_base64_from_file_id(
     token: Optional[str] = None,
 ) -> Optional[str]:
     """
-    Descarga imagen desde Telegram y la convierte a Base64.
+    Descarga imagen desde Telegram, la preprocesa y la convierte a Base64.
+    
+    La imagen se rota según EXIF, se reduce y se re-encodea (ver
+    ``services.chat.vision_input``). El resultado se cachea por ``file_id``: un
+    diagnóstico repetido sobre la misma foto no vuelve a descargarla.
     
     Args:
         file_id: File ID de Telegram
@@ -192,25 +197,23 @@ async def get_image_base64_from_file_id(
     if not file_id:
         return None
     
+    cached = vision_input.cached_for_file_id(file_id)
+    if cached is not None:
+        return cached
+    
     try:
         # Descargar imagen desde Telegram
+        started = time.perf_counter()
         image_bytes = await download_telegram_file(file_id, token=token)
         if not image_bytes:
             logger.warning(f"No se pudo descargar imagen con file_id: {file_id}")
             return None
+        vision_input.record_download((time.perf_counter() - started) * 1000)
         
-        # Detectar MIME type desde los primeros bytes
-        mime_type = "image/jpeg"  # Default
-        if image_bytes.startswith(b'\x89PNG'):
-            mime_type = "image/png"
-        elif image_bytes.startswith(b'RIFF') and b'WEBP' in image_bytes[:12]:
-            mime_type = "image/webp"
-        elif image_bytes.startswith(b'\xff\xd8\xff'):
-            mime_type = "image/jpeg"
-        
-        # Convertir a Base64
-        base64_data = base64.b64encode(image_bytes).decode('utf-8')
-        return f"data:{mime_type};base64,{base64_data}"
+        # Decodificar/reducir en thread pool y convertir a Base64
+        data_url = await vision_input.to_data_url(image_bytes)
+        vision_input.remember_file_id(file_id, data_url)
+        return data_url
         
     except Exception as e:
         logger.error(f"Error convirtiendo file_id a Base64: {e}")
@@ -273,12 +276,17 @@ async def diagnose_plant(
                 "Responde solo con la descripción de síntomas, sin diagnósticos aún."
             )
             try:
+                started = time.perf_counter()
                 visual_symptoms = await ai_router.run_async(
                     task=Task.DIAGNOSIS_VISION.value,
                     prompt=vision_prompt,
                     user_context={"role": user_role, "intent": "diagnosis"},
                     images=images,
                 )
+                vision_input.record_vision_call(
+                    (time.perf_counter() - started) * 1000,
+                    preprocessed=vision_input.preprocess_enabled(),
+                )
                 # Limpiar prefijo técnico si existe
                 if ":" in visual_symptoms and visual_symptoms.split(":")[0].lower() in ("openai", "ollama"):
                     visual_symptoms = visual_symptoms.split(":", 1)[1].strip()
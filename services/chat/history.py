@@ -18,10 +18,20 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
 
 from db.models import ChatMessage, ChatSession
+from services.chat import context_buffer
 
 logger = logging.getLogger(__name__)
 
 
+def _user_identifier_from_session_id(session_id: str) -> str:
+    """Extrae el identificador de usuario del session_id ("telegram:12345" -> "12345")."""
+    if session_id.startswith("telegram:"):
+        return session_id[9:]
+    if session_id.startswith("web:"):
+        return session_id[4:]
+    return session_id  # Usar el session_id completo como fallback
+
+
 async def get_or_create_session(
     db: AsyncSession,
     session_id: str,
@@ -42,23 +52,15 @@ async def get_or_create_session(
         ValueError: Si hay un error al crear la sesión (ej: constraint violation)
     """
     try:
-        # Buscar sesión existente
-        stmt = select(ChatSession).where(ChatSession.session_id == session_id)
-        result = await db.execute(stmt)
-        existing_session = result.scalar_one_or_none()
+        # Buscar sesión existente (db.get usa el identity map: sin SQL si ya se cargó en esta sesión)
+        existing_session = await db.get(ChatSession, session_id)
         
         if existing_session:
             return existing_session
         
         # Crear nueva sesión
         if not user_identifier:
-            # Extraer user_identifier del session_id
-            if session_id.startswith("telegram:"):
-                user_identifier = session_id[9:]  # "telegram:12345" -> "12345"
-            elif session_id.startswith("web:"):
-                user_identifier = session_id[4:]  # "web:abc123" -> "abc123"
-            else:
-                user_identifier = session_id  # Usar el session_id completo como fallback
+            user_identifier = _user_identifier_from_session_id(session_id)
         
         new_session = ChatSession(
             session_id=session_id,
@@ -122,30 +124,53 @@ async def save_message(
         ...     metadata={"intent": "product_query"}
         ... )
     """
+    # Validar role
+    if role not in ("user", "assistant", "tool", "system"):
+        logger.warning(f"Role inválido '{role}' en session {session_id[:20]}..., usando 'user'")
+        role = "user"
+
+    if context_buffer.write_behind_enabled():
+        # Escritura diferida: se persiste en lote desde background; el buffer se actualiza ya
+        message = ChatMessage(
+            session_id=session_id,
+            role=role,
+            content=content,
+            created_at=datetime.utcnow(),
+            meta=metadata or {}
+        )
+        buffered = await context_buffer.append(session_id, role, content)
+        context_buffer.write_queue.enqueue({
+            "session_id": session_id,
+            "user_identifier": user_identifier or _user_identifier_from_session_id(session_id),
+            "role": role,
+            "content": content,
+            "created_at": message.created_at,
+            "meta": message.meta,
+            "buffered": buffered,
+        })
+        return message
+
     try:
         # Asegurar que la sesión existe
         chat_session = await get_or_create_session(session, session_id, user_identifier)
         
-        # Validar role
-        if role not in ("user", "assistant", "tool", "system"):
-            logger.warning(f"Role inválido '{role}' en session {session_id[:20]}..., usando 'user'")
-            role = "user"
-        
         # Crear el mensaje
+        now = datetime.utcnow()
         message = ChatMessage(
             session_id=session_id,
             role=role,
             content=content,
-            created_at=datetime.utcnow(),
+            created_at=now,
             meta=metadata or {}
         )
         session.add(message)
-        await session.flush()
         
         # Actualizar last_message_at de la sesión
-        chat_session.last_message_at = datetime.utcnow()
-        chat_session.updated_at = datetime.utcnow()
+        chat_session.last_message_at = now
+        chat_session.updated_at = now
         await session.flush()
+        # El buffer de contexto se actualiza recién cuando la transacción confirma
+        context_buffer.defer_append(session, session_id, role, content)
         
         logger.debug(f"Mensaje guardado: session={session_id[:20]}..., role={role}, content_length={len(content)}")
         return message
@@ -168,6 +193,7 @@ async def save_message(
             chat_session.last_message_at = datetime.utcnow()
             chat_session.updated_at = datetime.utcnow()
             await session.flush()
+            context_buffer.defer_append(session, session_id, role, content)
             logger.info(f"Mensaje guardado exitosamente tras reintento: {session_id[:20]}...")
             return message
         except Exception as retry_error:
@@ -212,34 +238,38 @@ async def get_recent_history(
         H: Asistente: El sustrato Growmix Multipro cuesta $X...
         H: Usuario: ¿Cuántos hay en stock?
     """
-    # Consultar últimos mensajes (solo user/assistant, no tool/system)
+    # Camino caliente: buffer de contexto (sin SQL)
+    cached = await context_buffer.get_entries(session_id, limit)
+    if cached is not None:
+        return context_buffer.format_history(cached)
+
+    # Escritura diferida: mensajes encolados que la DB todavía no tiene (antes del SELECT)
+    pending = [it for it in context_buffer.write_queue.pending(session_id) if it["role"] in ("user", "assistant")]
+
+    # Lectura en frío: traer lo suficiente para sembrar el buffer completo
+    fetch = max(limit, context_buffer.BUFFER_SIZE)
     stmt = (
-        select(ChatMessage)
+        select(ChatMessage.role, ChatMessage.content, ChatMessage.created_at)
         .where(ChatMessage.session_id == session_id)
         .where(ChatMessage.role.in_(["user", "assistant"]))
         .order_by(desc(ChatMessage.created_at))
-        .limit(limit)
+        .limit(fetch)
     )
     
     result = await session.execute(stmt)
-    messages = result.scalars().all()
-    
-    if not messages:
-        return ""
-    
     # Revertir orden para que sea cronológico (más antiguo primero)
-    messages = list(reversed(messages))
-    
-    # Formatear historial
-    lines = []
-    for msg in messages:
-        # Mapear role a etiqueta legible
-        label = "Usuario" if msg.role == "user" else "Asistente"
-        # Limpiar contenido (quitar prefijos tipo "openai:" si existen)
-        clean_content = msg.content.replace("openai:", "").strip()
-        lines.append(f"H: {label}: {clean_content}")
+    rows = list(reversed(result.all()))
+    if pending:
+        # El lote pudo confirmarse durante el SELECT: no duplicar lo que ya está en la DB
+        seen = {tuple(row) for row in rows}
+        rows += [row for row in ((it["role"], it["content"], it["created_at"]) for it in pending) if row not in seen]
+        rows = sorted(rows, key=lambda row: row[2])[-fetch:]
+    entries = [(role, content) for role, content, _ in rows]
+    # Con escrituras pendientes la DB está incompleta: sembrar dejaría un buffer parcial
+    if not pending:
+        await context_buffer.seed(session_id, entries)
     
-    return "\n".join(lines)
+    return context_buffer.format_history(entries[-limit:] if limit > 0 else [])
 
 
 async def get_full_history(
@@ -289,10 +319,15 @@ async def clear_session_history(
     Returns:
         Número de mensajes eliminados
     """
-    from sqlalchemy import delete
+    from sqlalchemy import delete, update
     
     stmt = delete(ChatMessage).where(ChatMessage.session_id == session_id)
     result = await session.execute(stmt)
+    # Los borrados no mueven max(id): tocar la sesión invalida los ETag de /admin/chats
+    await session.execute(
+        update(ChatSession).where(ChatSession.session_id == session_id).values(updated_at=datetime.utcnow())
+    )
     await session.flush()
+    await context_buffer.invalidate(session_id)
     
     return result.rowcount or 0
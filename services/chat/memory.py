@@ -2,16 +2,34 @@
 # NG-HEADER: Ubicacion: services/chat/memory.py
 # NG-HEADER: Descripcion: Memoria corta para el chatbot de productos
 # NG-HEADER: Lineamientos: Ver AGENTS.md
-"""Estado efimero para recordar consultas recientes del chatbot."""
+"""Estado efimero para recordar consultas recientes del chatbot.
+
+Backends:
+- ``memory`` (default): OrderedDict acotado (``CHAT_MEMORY_MAX_ENTRIES``). Como el TTL
+  es deslizante y constante, el orden LRU coincide con el orden de expiracion: basta
+  con descartar desde el frente, por lo que get/set/expire son O(1) amortizado.
+- ``redis`` (``CHAT_MEMORY_BACKEND=redis``): estado serializado en JSON con ``SETEX``;
+  sobrevive reinicios y se comparte entre workers de la API. El cliente es
+  ``redis.asyncio`` (no bloquea el event loop); si Redis falla en runtime la memoria
+  se degrada a un store local con un warning y se reintenta Redis mas tarde.
+"""
 
 from __future__ import annotations
 
+import json
+import logging
+import os
 import time
-from dataclasses import dataclass
-from typing import Dict, Optional
+import zlib
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional
 
 from services.chat.price_lookup import ProductQuery
 
+logger = logging.getLogger(__name__)
+
+
 @dataclass
 class MemoryState:
     query: ProductQuery
@@ -24,39 +42,143 @@ class MemoryState:
     def touch(self) -> None:
         self.created_at = time.time()
 
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
 
-_TTL_SECONDS = 300
-_MEMORY: Dict[str, MemoryState] = {}
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "MemoryState":
+        return cls(**{**data, "query": ProductQuery(**data["query"])})
 
 
-def _prune(now: Optional[float] = None) -> None:
-    if not _MEMORY:
-        return
-    if now is None:
-        now = time.time()
-    expired = [key for key, state in _MEMORY.items() if now - state.created_at > _TTL_SECONDS]
-    for key in expired:
-        _MEMORY.pop(key, None)
+_TTL_SECONDS = int(os.getenv("CHAT_MEMORY_TTL_SECONDS", "300"))
+_MAX_ENTRIES = int(os.getenv("CHAT_MEMORY_MAX_ENTRIES", "10000"))
+_REDIS_PREFIX = "growen:chat_memory:"
 
 
-def get_memory(key: str) -> Optional[MemoryState]:
-    now = time.time()
-    _prune(now)
-    state = _MEMORY.get(key)
-    if state:
+class _InMemoryStore:
+    """LRU acotada con TTL deslizante (orden de insercion == orden de expiracion)."""
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, MemoryState]" = OrderedDict()
+
+    def _expire(self, now: float) -> None:
+        # Solo mira el frente: se detiene en la primera entrada vigente
+        while self._data:
+            key, state = next(iter(self._data.items()))
+            if now - state.created_at <= _TTL_SECONDS:
+                break
+            self._data.popitem(last=False)
+
+    def get(self, key: str) -> Optional[MemoryState]:
+        now = time.time()
+        self._expire(now)
+        state = self._data.get(key)
+        if state is None:
+            return None
+        if now - state.created_at > _TTL_SECONDS:
+            # Entrada vencida fuera de orden (p.ej. created_at asignado a mano)
+            self._data.pop(key, None)
+            return None
         state.touch()
-    return state
+        self._data.move_to_end(key)
+        return state
+
+    def set(self, key: str, state: MemoryState) -> None:
+        self._data[key] = state
+        self._data.move_to_end(key)
+        self._expire(time.time())
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class _RedisStore:
+    """Backend Redis (``redis.asyncio``): una clave por conversacion con expiracion nativa."""
+
+    def __init__(self, client: Any) -> None:
+        self._client = client
+
+    async def get(self, key: str) -> Optional[MemoryState]:
+        raw = await self._client.get(_REDIS_PREFIX + key)
+        if raw is None:
+            return None
+        try:
+            state = MemoryState.from_dict(json.loads(raw))
+        except Exception:
+            logger.warning("chat.memory: estado corrupto en redis para %s, descartando", key)
+            await self.delete(key)
+            return None
+        state.touch()
+        await self._client.expire(_REDIS_PREFIX + key, _TTL_SECONDS)
+        return state
+
+    async def set(self, key: str, state: MemoryState) -> None:
+        await self._client.setex(_REDIS_PREFIX + key, _TTL_SECONDS, json.dumps(state.to_dict()))
+
+    async def delete(self, key: str) -> None:
+        await self._client.delete(_REDIS_PREFIX + key)
 
 
-def set_memory(key: str, state: MemoryState) -> None:
-    _MEMORY[key] = state
+def _create_store() -> _InMemoryStore | _RedisStore:
+    if os.getenv("CHAT_MEMORY_BACKEND", "memory").lower() != "redis":
+        return _InMemoryStore(_MAX_ENTRIES)
+    try:
+        import redis.asyncio as aioredis  # type: ignore
 
+        # La conexion es perezosa: una caida en runtime la maneja ``_call``
+        client = aioredis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0"), socket_timeout=0.5)
+        return _RedisStore(client)
+    except Exception as exc:  # pragma: no cover - depende de infraestructura
+        logger.warning("chat.memory: redis no disponible (%s), usando memoria local", exc)
+        return _InMemoryStore(_MAX_ENTRIES)
 
-def clear_memory(key: str) -> None:
-    _MEMORY.pop(key, None)
 
+_STORE = _create_store()
+# Respaldo local mientras Redis esta caido; se reintenta Redis cada ``_REDIS_RETRY_SECONDS``
+_FALLBACK = _InMemoryStore(_MAX_ENTRIES)
+_REDIS_RETRY_SECONDS = float(os.getenv("CHAT_MEMORY_REDIS_RETRY_SECONDS", "30"))
+_redis_down_until = 0.0
 
-def ensure_memory(key: str, query: ProductQuery, *, pending: bool, rendered: str) -> MemoryState:
+
+async def _call(op: str, *args: Any) -> Any:
+    """Ejecuta ``op`` en el store activo; si Redis falla degrada a memoria local con un warning."""
+    global _redis_down_until
+    store = _STORE
+    if isinstance(store, _RedisStore):
+        if time.monotonic() >= _redis_down_until:
+            try:
+                return await getattr(store, op)(*args)
+            except Exception as exc:
+                logger.warning(
+                    "chat.memory: redis fallo (%s), usando memoria local por %.0fs", exc, _REDIS_RETRY_SECONDS
+                )
+                _redis_down_until = time.monotonic() + _REDIS_RETRY_SECONDS
+        store = _FALLBACK
+    return getattr(store, op)(*args)
+
+
+async def get_memory(key: str) -> Optional[MemoryState]:
+    return await _call("get", key)
+
+
+async def set_memory(key: str, state: MemoryState) -> None:
+    await _call("set", key, state)
+
+
+async def clear_memory(key: str) -> None:
+    await _call("delete", key)
+
+
+async def ensure_memory(key: str, query: ProductQuery, *, pending: bool, rendered: str) -> MemoryState:
     state = MemoryState(
         query=query,
         pending_clarification=pending,
@@ -65,29 +187,31 @@ def ensure_memory(key: str, query: ProductQuery, *, pending: bool, rendered: str
         last_render=rendered,
         created_at=time.time(),
     )
-    set_memory(key, state)
+    await set_memory(key, state)
     return state
 
 
-def mark_prompted(key: str) -> None:
-    state = _MEMORY.get(key)
+async def mark_prompted(key: str) -> None:
+    state = await get_memory(key)
     if state:
         state.prompted = True
-        state.touch()
+        await set_memory(key, state)
 
 
-def mark_resolved(key: str) -> None:
-    state = _MEMORY.get(key)
+async def mark_resolved(key: str) -> None:
+    state = await get_memory(key)
     if state:
         state.pending_clarification = False
         state.prompted = False
-        state.touch()
+        await set_memory(key, state)
+
 
 def build_memory_key(*, session_id: Optional[str], role: str, host: Optional[str], user_agent: Optional[str] = None) -> str:
     if session_id:
         return f"sess:{session_id}"
     base = host or "unknown"
     if user_agent:
-        suffix = format(abs(hash(user_agent)) & 0xFFFF, "04x")
+        # crc32 (no hash()) para que la clave sea estable entre procesos/workers
+        suffix = format(zlib.crc32(user_agent.encode("utf-8")) & 0xFFFF, "04x")
         base = f"{base}:{suffix}"
     return f"anon:{role}:{base}"
@@ -10,6 +10,8 @@ from typing import Any, Dict, List, Optional
 from enum import Enum
 from rapidfuzz import process, fuzz
 
+from services import http_clients
+
 # --- Configuración de la API ---
 # Se recomienda obtener la URL base de una variable de entorno.
 API_BASE_URL = os.getenv("API_BASE_URL", "http://127.0.0.1:8000")
@@ -29,35 +31,35 @@ async def _buscar_producto(nombre_producto: str) -> List[Dict[str, Any]]:
     """
     params = {"q": nombre_producto}
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{API_BASE_URL}/sales/catalog/search",
-                params=params,
-                headers=HEADERS,
-                timeout=10.0
-            )
-            response.raise_for_status()
-            productos_candidatos = response.json()
-
-            if not productos_candidatos:
-                return []
-
-            # Extraer solo los nombres para el procesamiento con fuzzy matching
-            nombres_candidatos = [p.get("name", "") for p in productos_candidatos]
-            
-            # Usar rapidfuzz para encontrar las mejores coincidencias
-            # extract() devuelve una lista de tuplas: (nombre, score, indice_original)
-            mejores_coincidencias = process.extract(nombre_producto, nombres_candidatos, scorer=fuzz.WRatio, limit=5)
-
-            # Mapear los resultados ordenados de vuelta a los objetos de producto originales
-            productos_ordenados = []
-            for nombre, score, indice in mejores_coincidencias:
-                if score > 75: # Umbral de confianza para evitar malas coincidencias
-                    producto_original = productos_candidatos[indice]
-                    producto_original['match_score'] = score # Opcional: añadir el score al objeto
-                    productos_ordenados.append(producto_original)
-            
-            return productos_ordenados
+        client = http_clients.get_client("internal_api")
+        response = await client.get(
+            f"{API_BASE_URL}/sales/catalog/search",
+            params=params,
+            headers=HEADERS,
+            timeout=10.0
+        )
+        response.raise_for_status()
+        productos_candidatos = response.json()
+
+        if not productos_candidatos:
+            return []
+
+        # Extraer solo los nombres para el procesamiento con fuzzy matching
+        nombres_candidatos = [p.get("name", "") for p in productos_candidatos]
+        
+        # Usar rapidfuzz para encontrar las mejores coincidencias
+        # extract() devuelve una lista de tuplas: (nombre, score, indice_original)
+        mejores_coincidencias = process.extract(nombre_producto, nombres_candidatos, scorer=fuzz.WRatio, limit=5)
+
+        # Mapear los resultados ordenados de vuelta a los objetos de producto originales
+        productos_ordenados = []
+        for nombre, score, indice in mejores_coincidencias:
+            if score > 75: # Umbral de confianza para evitar malas coincidencias
+                producto_original = productos_candidatos[indice]
+                producto_original['match_score'] = score # Opcional: añadir el score al objeto
+                productos_ordenados.append(producto_original)
+        
+        return productos_ordenados
 
     except httpx.RequestError as e:
         print(f"Error en la petición a la API para buscar producto: {e}")
@@ -169,18 +171,18 @@ async def _gestionar_cliente(nombre_cliente: str) -> Optional[Dict[str, Any]]:
     """
     params = {"q": nombre_cliente}
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{API_BASE_URL}/sales/customers/search",
-                params=params,
-                headers=HEADERS,
-                timeout=10.0
-            )
-            response.raise_for_status()
-            resultados = response.json()
-            if resultados:  # Si la lista de resultados no está vacía
-                return resultados[0]  # Devuelve el primer cliente
-            return None
+        client = http_clients.get_client("internal_api")
+        response = await client.get(
+            f"{API_BASE_URL}/sales/customers/search",
+            params=params,
+            headers=HEADERS,
+            timeout=10.0
+        )
+        response.raise_for_status()
+        resultados = response.json()
+        if resultados:  # Si la lista de resultados no está vacía
+            return resultados[0]  # Devuelve el primer cliente
+        return None
     except httpx.RequestError as e:
         print(f"Error en la petición a la API para buscar cliente: {e}")
         return None
@@ -199,15 +201,15 @@ async def _crear_venta(payload: Dict[str, Any]) -> Dict[str, Any]:
         Un diccionario con la respuesta de la API (la venta creada) o un diccionario vacío en caso de error.
     """
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{API_BASE_URL}/sales",
-                json=payload,
-                headers=HEADERS,
-                timeout=15.0
-            )
-            response.raise_for_status()
-            return response.json()
+        client = http_clients.get_client("internal_api")
+        response = await client.post(
+            f"{API_BASE_URL}/sales",
+            json=payload,
+            headers=HEADERS,
+            timeout=15.0
+        )
+        response.raise_for_status()
+        return response.json()
     except httpx.RequestError as e:
         print(f"Error en la petición a la API para crear la venta: {e}")
         return {}
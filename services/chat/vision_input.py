@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+# NG-HEADER: Nombre de archivo: vision_input.py
+# NG-HEADER: Ubicación: services/chat/vision_input.py
+# NG-HEADER: Descripción: Preprocesamiento y cache de imágenes para llamadas de visión (Modo Cultivador)
+# NG-HEADER: Lineamientos: Ver AGENTS.md
+"""Preparación de imágenes para el modelo de visión.
+
+Las fotos de celular (varios MB) se decodifican en un thread pool, se rotan según
+EXIF, se reducen a ``CULTIVATOR_VISION_MAX_SIDE`` px en el lado mayor y se
+re-encodean como JPEG/WebP compacto. El resultado (data URL) se cachea por
+``file_id`` de Telegram (evita re-descargar) y por sha256 del contenido (evita
+re-procesar la misma foto reenviada).
+
+Pillow es dependencia de la API (``requirements-base``). Si falta, o si la imagen
+no se puede decodificar (HEIC sin plugin, archivo truncado o corrupto), se envían
+los bytes originales como antes y se cuenta en ``preprocess_failures``.
+
+Métricas: latencia de descarga, preprocesamiento y llamada de visión, separando
+llamadas con imagen preprocesada (``preprocessed``) y cruda (``raw``) para poder
+comparar antes/después vía ``metrics_snapshot()`` (``GET /admin/services/metrics/vision``).
+"""
+from __future__ import annotations
+
+import asyncio
+import base64
+import hashlib
+import io
+import logging
+import os
+from collections import Counter, OrderedDict, deque
+from typing import Deque, Dict, Optional, Tuple
+
+_MAX_SIDE = int(os.getenv("CULTIVATOR_VISION_MAX_SIDE", "1024"))
+_FORMAT = os.getenv("CULTIVATOR_VISION_FORMAT", "jpeg").lower()
+_QUALITY = int(os.getenv("CULTIVATOR_VISION_QUALITY", "85"))
+_CACHE_SIZE = int(os.getenv("CULTIVATOR_VISION_CACHE_SIZE", "64"))
+
+logger = logging.getLogger(__name__)
+
+
+def preprocess_enabled() -> bool:
+    return os.getenv("CULTIVATOR_VISION_PREPROCESS", "1") != "0"
+
+
+def sniff_mime(data: bytes) -> str:
+    """Detecta el MIME type desde los primeros bytes (default JPEG)."""
+    if data.startswith(b"\x89PNG"):
+        return "image/png"
+    if data.startswith(b"RIFF") and b"WEBP" in data[:12]:
+        return "image/webp"
+    return "image/jpeg"
+
+
+def preprocess_image(data: bytes) -> Tuple[bytes, str]:
+    """Rota según EXIF, reduce y re-encodea. Retorna (bytes, mime).
+
+    Bloqueante (decodificación CPU): llamar vía ``asyncio.to_thread``.
+    """
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        return data, sniff_mime(data)
+
+    with Image.open(io.BytesIO(data)) as im:
+        rotated = im.getexif().get(0x0112, 1) not in (1, None)  # tag EXIF Orientation
+        oversized = max(im.size) > _MAX_SIDE
+        img = ImageOps.exif_transpose(im)
+        if img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        img.thumbnail((_MAX_SIDE, _MAX_SIDE), Image.LANCZOS)
+        out = io.BytesIO()
+        if _FORMAT == "webp":
+            img.save(out, format="WEBP", quality=_QUALITY, method=4)
+            mime = "image/webp"
+        else:
+            img.save(out, format="JPEG", quality=_QUALITY, optimize=True)
+            mime = "image/jpeg"
+    encoded = out.getvalue()
+    if len(encoded) >= len(data) and not (rotated or oversized):
+        # Ya era chica y sin rotación: el re-encode no aporta
+        return data, sniff_mime(data)
+    return encoded, mime
+
+
+# ------------------------------ Cache ------------------------------
+_BY_FILE_ID: "OrderedDict[str, str]" = OrderedDict()
+_BY_SHA: "OrderedDict[str, str]" = OrderedDict()
+
+
+def _lru_get(store: "OrderedDict[str, str]", key: str) -> Optional[str]:
+    value = store.get(key)
+    if value is not None:
+        store.move_to_end(key)
+    return value
+
+
+def _lru_put(store: "OrderedDict[str, str]", key: str, value: str) -> None:
+    store[key] = value
+    store.move_to_end(key)
+    while len(store) > _CACHE_SIZE:
+        store.popitem(last=False)
+
+
+def cached_for_file_id(file_id: str) -> Optional[str]:
+    return _lru_get(_BY_FILE_ID, file_id)
+
+
+def remember_file_id(file_id: str, data_url: str) -> None:
+    _lru_put(_BY_FILE_ID, file_id, data_url)
+
+
+async def to_data_url(data: bytes) -> str:
+    """Convierte bytes de imagen a data URL lista para el modelo de visión."""
+    digest = hashlib.sha256(data).hexdigest()
+    cached = _lru_get(_BY_SHA, digest)
+    if cached is not None:
+        return cached
+    payload, mime = data, sniff_mime(data)
+    if preprocess_enabled():
+        started = asyncio.get_running_loop().time()
+        try:
+            payload, mime = await asyncio.to_thread(preprocess_image, data)
+        except Exception as exc:
+            # Formato no soportado o imagen dañada: mejor la foto cruda que ninguna
+            _BYTES["preprocess_failures"] += 1
+            logger.warning("vision_input: no se pudo preprocesar la imagen (%s), se envía sin procesar", exc)
+        else:
+            _record("preprocess", (asyncio.get_running_loop().time() - started) * 1000)
+    _BYTES["in"] += len(data)
+    _BYTES["out"] += len(payload)
+    data_url = f"data:{mime};base64,{base64.b64encode(payload).decode('ascii')}"
+    _lru_put(_BY_SHA, digest, data_url)
+    return data_url
+
+
+def clear_cache() -> None:
+    _BY_FILE_ID.clear()
+    _BY_SHA.clear()
+
+
+# ------------------------------ Métricas ------------------------------
+_DURATIONS: Dict[str, Deque[float]] = {}
+_BYTES: Counter = Counter()
+
+
+def _record(stage: str, took_ms: float) -> None:
+    _DURATIONS.setdefault(stage, deque(maxlen=200)).append(float(took_ms))
+
+
+def record_download(took_ms: float) -> None:
+    _record("download", took_ms)
+
+
+def record_vision_call(took_ms: float, *, preprocessed: bool) -> None:
+    _record("vision_preprocessed" if preprocessed else "vision_raw", took_ms)
+
+
+def metrics_snapshot() -> Dict[str, object]:
+    stages: Dict[str, Dict[str, float]] = {}
+    for stage, values in _DURATIONS.items():
+        ordered = sorted(values)
+        if not ordered:
+            continue
+        stages[stage] = {
+            "count": len(ordered),
+            "avg_ms": round(sum(ordered) / len(ordered), 2),
+            "p95_ms": round(ordered[int(round(0.95 * (len(ordered) - 1)))], 2),
+        }
+    return {
+        "latency": stages,
+        "bytes_in": _BYTES["in"],
+        "bytes_out": _BYTES["out"],
+        "preprocess_failures": _BYTES["preprocess_failures"],
+        "cache_entries": {"file_id": len(_BY_FILE_ID), "sha256": len(_BY_SHA)},
+    }
@@ -0,0 +1,488 @@
+# NG-HEADER: Nombre de archivo: enrichment_jobs.py
+# NG-HEADER: Ubicación: services/enrichment_jobs.py
+# NG-HEADER: Descripción: Jobs de enriquecimiento IA masivo (concurrencia, rate limits por proveedor, reanudación)
+# NG-HEADER: Lineamientos: Ver AGENTS.md
+"""Enriquecimiento masivo de productos como job en background.
+
+``POST /products/enrich-multiple`` crea un ``Job`` (``type='bulk_enrich'``) con una
+fila ``EnrichmentJobItem`` por producto y responde enseguida con el ``job_id``. Un
+runner en el proceso de la API procesa los ítems en paralelo
+(``ENRICH_BULK_CONCURRENCY``) reutilizando ``enrich_product``:
+
+- Rate limits por proveedor (token bucket): búsqueda web y el proveedor LLM que
+  elija ``AIRouter`` para ``REASONING``. ``ENRICH_RATE_<PROVEEDOR>_RPS`` y
+  ``ENRICH_RATE_<PROVEEDOR>_BURST`` (p.ej. ``ENRICH_RATE_OPENAI_RPS=2``).
+- Estado por ítem persistido (``pending``/``running``/``done``/``skipped``/``error``):
+  progreso vía ``GET /products/enrich-jobs/{id}`` o SSE en ``/events``.
+- Reanudación: el runner marca un heartbeat en ``jobs.updated_at``; un watchdog toma
+  los jobs sin heartbeat por más de ``ENRICH_JOB_STALE_S`` (reinicio o caída),
+  devuelve sus ítems ``running`` a ``pending``, libera ``is_enriching`` y continúa.
+- Búsquedas web reutilizadas: una búsqueda por marca por job (contexto compartido
+  entre productos de la misma marca) y caché TTL por consulta. Sólo las búsquedas que
+  salen al MCP consumen el bucket ``web_search``; el re-enriquecimiento forzado de un
+  producto individual ignora la caché.
+- Cancelación: ``cancel`` persiste ``status='cancelled'``; el runner lo relee de la DB
+  cada ``ENRICH_CANCEL_CHECK_EVERY`` ítems, así que también corta si el pedido llegó a
+  otro worker (``_CANCELLED`` es sólo el atajo en el mismo proceso).
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.models import (
+    AuditLog,
+    CanonicalProduct,
+    EnrichmentJobItem,
+    Job,
+    Product,
+    ProductEquivalence,
+    SupplierProduct,
+    User,
+)
+from db.session import SessionLocal
+from services.images.ratelimit import _TokenBucket
+
+logger = logging.getLogger("growen.enrichment_jobs")
+
+JOB_TYPE = "bulk_enrich"
+TERMINAL = {"done", "cancelled", "error"}
+
+_CONCURRENCY = max(1, int(os.getenv("ENRICH_BULK_CONCURRENCY", "4") or 4))
+_STALE_S = int(os.getenv("ENRICH_JOB_STALE_S", "90") or 90)
+_HEARTBEAT_S = max(1.0, _STALE_S / 3)
+_WEB_CACHE_TTL = int(os.getenv("ENRICH_WEB_CACHE_TTL", "3600") or 3600)
+_WEB_CACHE_MAX = 500
+_CANCEL_CHECK_EVERY = max(1, int(os.getenv("ENRICH_CANCEL_CHECK_EVERY", "5") or 5))
+_RATE_DEFAULTS: Dict[str, Tuple[float, int]] = {
+    "web_search": (1.0, 2),
+    "openai": (1.0, 3),
+    "ollama": (0.5, 1),
+}
+
+RUNNER_ID = uuid.uuid4().hex[:8]
+
+# Resultados de la búsqueda por marca del producto en curso (los lee enrich_product)
+brand_context: ContextVar[Optional[Dict[str, Any]]] = ContextVar("enrich_brand_context", default=None)
+# Id del job en curso (None fuera de un job): las búsquedas web dentro de un job pasan por el rate limit
+current_job: ContextVar[Optional[int]] = ContextVar("enrich_current_job", default=None)
+
+
+# ------------------------------ Rate limits ------------------------------
+_BUCKETS: Dict[str, Tuple[asyncio.AbstractEventLoop, _TokenBucket]] = {}
+
+
+def _bucket(name: str) -> _TokenBucket:
+    loop = asyncio.get_running_loop()
+    entry = _BUCKETS.get(name)
+    if entry is not None and entry[0] is loop:
+        return entry[1]
+    rate, burst = _RATE_DEFAULTS.get(name, (1.0, 1))
+    rate = float(os.getenv(f"ENRICH_RATE_{name.upper()}_RPS", rate) or rate)
+    burst = int(os.getenv(f"ENRICH_RATE_{name.upper()}_BURST", burst) or burst)
+    bucket = _TokenBucket(rate, burst)
+    _BUCKETS[name] = (loop, bucket)
+    return bucket
+
+
+def _llm_provider_name() -> str:
+    try:
+        from agent_core.config import settings
+        from ai.router import AIRouter
+        from ai.types import Task
+
+        router = AIRouter(settings)
+        router.get_provider(Task.REASONING.value)
+        return router._last_provider_name or "openai"
+    except Exception:
+        return "openai"
+
+
+# ------------------------------ Búsqueda web ------------------------------
+_WEB_CACHE: "OrderedDict[Tuple[str, int], Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+
+async def search_web_cached(
+    provider: Any, query: str, role: str, max_results: int, *, refresh: bool = False
+) -> Dict[str, Any] | str:
+    """``search_web`` vía MCP con caché TTL por consulta normalizada (sólo respuestas con ítems).
+
+    ``refresh`` ignora la entrada cacheada (y la reemplaza). Dentro de un job sólo los
+    misses consumen el bucket ``web_search``.
+    """
+    key = (" ".join((query or "").lower().split()), int(max_results))
+    hit = None if refresh else _WEB_CACHE.get(key)
+    if hit is not None and time.monotonic() - hit[0] < _WEB_CACHE_TTL:
+        _WEB_CACHE.move_to_end(key)
+        return hit[1]
+    if current_job.get() is not None:
+        await _bucket("web_search").acquire()
+    res = await provider.call_mcp_web_tool(
+        tool_name="search_web",
+        parameters={"query": query, "user_role": role, "max_results": int(max_results)},
+    )
+    if isinstance(res, dict) and res.get("items") and not res.get("error"):
+        _WEB_CACHE[key] = (time.monotonic(), res)
+        while len(_WEB_CACHE) > _WEB_CACHE_MAX:
+            _WEB_CACHE.popitem(last=False)
+    return res
+
+
+def clear_web_cache() -> None:
+    _WEB_CACHE.clear()
+
+
+async def _brand_results(brand: str, role: str) -> Optional[Dict[str, Any]]:
+    from ai.providers.openai_provider import OpenAIProvider
+
+    try:
+        res = await search_web_cached(OpenAIProvider(), f"{brand} sitio oficial fabricante", role, 5)
+    except Exception:
+        logger.debug("bulk_enrich: búsqueda de marca %s falló", brand, exc_info=True)
+        return None
+    return res if isinstance(res, dict) and res.get("items") else None
+
+
+# ------------------------------ Jobs ------------------------------
+async def create_job(
+    db: AsyncSession, ids: List[int], *, force: bool, user_id: Optional[int], role: str
+) -> Job:
+    job = Job(
+        type=JOB_TYPE,
+        params={"ids": ids, "force": bool(force), "user_id": user_id, "role": role},
+        status="pending",
+        result={"owner": RUNNER_ID},
+    )
+    db.add(job)
+    await db.flush()
+    db.add_all([EnrichmentJobItem(job_id=job.id, product_id=pid, status="pending") for pid in ids])
+    await db.commit()
+    return job
+
+
+_TASKS: Dict[int, "asyncio.Task[None]"] = {}
+_CANCELLED: set[int] = set()
+
+
+def start(job_id: int) -> None:
+    task = _TASKS.get(job_id)
+    if task is not None and not task.done():
+        return
+    _TASKS[job_id] = asyncio.get_running_loop().create_task(_run_job(job_id))
+    _TASKS[job_id].add_done_callback(lambda _t, j=job_id: _TASKS.pop(j, None))
+
+
+async def wait(job_id: int) -> None:
+    task = _TASKS.get(job_id)
+    if task is not None:
+        await asyncio.shield(task)
+
+
+async def cancel(db: AsyncSession, job_id: int) -> bool:
+    res = await db.execute(
+        update(Job)
+        .where(Job.id == job_id, Job.type == JOB_TYPE, Job.status.in_(("pending", "running")))
+        .values(status="cancelled")
+    )
+    await db.commit()
+    _CANCELLED.add(job_id)
+    return bool(res.rowcount)
+
+
+async def _cancel_requested(job_id: int, seen: List[int]) -> bool:
+    """``True`` si el job fue cancelado; consulta la DB cada ``_CANCEL_CHECK_EVERY`` ítems."""
+    if job_id in _CANCELLED:
+        return True
+    seen[0] += 1
+    if seen[0] % _CANCEL_CHECK_EVERY:
+        return False
+    async with SessionLocal() as db:
+        status = (await db.execute(select(Job.status).where(Job.id == job_id))).scalar_one_or_none()
+    if status == "cancelled":
+        _CANCELLED.add(job_id)
+        return True
+    return False
+
+
+async def counts(db: AsyncSession, job_id: int) -> Dict[str, int]:
+    rows = (await db.execute(
+        select(EnrichmentJobItem.status, func.count())
+        .where(EnrichmentJobItem.job_id == job_id)
+        .group_by(EnrichmentJobItem.status)
+    )).all()
+    out = {s: 0 for s in ("pending", "running", "done", "skipped", "error")}
+    out.update({status: int(n) for status, n in rows})
+    out["total"] = sum(int(n) for _, n in rows)
+    return out
+
+
+async def snapshot(db: AsyncSession, job_id: int, *, with_items: bool = True) -> Optional[Dict[str, Any]]:
+    # populate_existing: el SSE consulta repetidamente con la misma sesión
+    job = await db.get(Job, job_id, populate_existing=True)
+    if job is None or job.type != JOB_TYPE:
+        return None
+    c = await counts(db, job_id)
+    processed = c["done"] + c["skipped"] + c["error"]
+    data: Dict[str, Any] = {
+        "job_id": job.id,
+        "status": job.status,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "updated_at": job.updated_at.isoformat() if job.updated_at else None,
+        "counts": c,
+        "progress": int(round(100 * processed / c["total"])) if c["total"] else 100,
+    }
+    if with_items:
+        items = (await db.execute(
+            select(EnrichmentJobItem).where(EnrichmentJobItem.job_id == job_id)
+            .order_by(EnrichmentJobItem.id).execution_options(populate_existing=True)
+        )).scalars().all()
+        data["items"] = [
+            {"product_id": it.product_id, "status": it.status, "detail": it.detail, "attempts": it.attempts}
+            for it in items
+        ]
+    return data
+
+
+async def _heartbeat(job_id: int) -> None:
+    async with SessionLocal() as db:
+        await db.execute(update(Job).where(Job.id == job_id).values(updated_at=datetime.utcnow()))
+        await db.commit()
+
+
+async def _load_brands(db: AsyncSession, product_ids: Iterable[int]) -> Dict[int, str]:
+    rows = (await db.execute(
+        select(SupplierProduct.internal_product_id, CanonicalProduct.brand)
+        .join(ProductEquivalence, ProductEquivalence.supplier_product_id == SupplierProduct.id)
+        .join(CanonicalProduct, CanonicalProduct.id == ProductEquivalence.canonical_product_id)
+        .where(SupplierProduct.internal_product_id.in_(list(product_ids)), CanonicalProduct.brand.is_not(None))
+    )).all()
+    out: Dict[int, str] = {}
+    for pid, brand in rows:
+        brand = (brand or "").strip()
+        if pid is not None and brand and pid not in out:
+            out[pid] = brand
+    return out
+
+
+async def _set_item(db: AsyncSession, item_id: int, status: str, detail: Optional[str] = None) -> None:
+    await db.execute(
+        update(EnrichmentJobItem)
+        .where(EnrichmentJobItem.id == item_id)
+        .values(status=status, detail=(detail or None) and detail[:300], updated_at=datetime.utcnow())
+    )
+    await db.commit()
+
+
+async def _process_item(
+    job_id: int,
+    item_id: int,
+    product_id: int,
+    params: Dict[str, Any],
+    brand: Optional[str],
+    brand_cache: Dict[str, "asyncio.Task[Optional[Dict[str, Any]]]"],
+    llm_name: str,
+) -> None:
+    from fastapi import HTTPException
+
+    from services.auth import SessionData
+    from services.routers.catalog import enrich_product
+
+    force = bool(params.get("force"))
+    role = params.get("role") or "colaborador"
+    async with SessionLocal() as db:
+        claimed = await db.execute(
+            update(EnrichmentJobItem)
+            .where(EnrichmentJobItem.id == item_id, EnrichmentJobItem.status == "pending")
+            .values(status="running", attempts=EnrichmentJobItem.attempts + 1, updated_at=datetime.utcnow())
+        )
+        await db.commit()
+        if not claimed.rowcount:
+            return
+        prod = await db.get(Product, product_id)
+        if prod is None:
+            await _set_item(db, item_id, "skipped", "not_found")
+            return
+        if getattr(prod, "is_enriching", False):
+            await _set_item(db, item_id, "error", "locked")
+            return
+        if not (prod.title or "").strip():
+            await _set_item(db, item_id, "skipped", "no_title")
+            return
+        already = bool((prod.enrichment_sources_url or "").strip()) or bool((prod.description_html or "").strip())
+        if already and not force:
+            await _set_item(db, item_id, "skipped", "already_enriched")
+            return
+
+        brand_res = None
+        if brand:
+            if brand not in brand_cache:
+                brand_cache[brand] = asyncio.ensure_future(_brand_results(brand, role))
+            brand_res = await brand_cache[brand]
+
+        await _bucket(llm_name).acquire()
+        user = await db.get(User, params["user_id"]) if params.get("user_id") else None
+        token = brand_context.set(brand_res)
+        try:
+            await enrich_product(product_id, session=db, request=None, sess=SessionData(None, user, role), force=force)
+            await _set_item(db, item_id, "done")
+        except HTTPException as e:
+            await db.rollback()
+            await _set_item(db, item_id, "skipped" if e.status_code == 409 else "error", str(e.detail))
+        except Exception as e:
+            logger.exception("bulk_enrich: fallo en producto %s (job %s)", product_id, job_id)
+            await db.rollback()
+            await _set_item(db, item_id, "error", str(e) or type(e).__name__)
+        finally:
+            brand_context.reset(token)
+
+
+async def _run_job(job_id: int) -> None:
+    async with SessionLocal() as db:
+        job = await db.get(Job, job_id)
+        if job is None or job.status in TERMINAL:
+            return
+        params = dict(job.params or {})
+        job.status = "running"
+        job.result = {**(job.result or {}), "owner": RUNNER_ID}
+        job.updated_at = datetime.utcnow()
+        await db.commit()
+        items = (await db.execute(
+            select(EnrichmentJobItem.id, EnrichmentJobItem.product_id)
+            .where(EnrichmentJobItem.job_id == job_id, EnrichmentJobItem.status == "pending")
+            .order_by(EnrichmentJobItem.id)
+        )).all()
+        brands = await _load_brands(db, [pid for _, pid in items]) if items else {}
+
+    llm_name = await asyncio.to_thread(_llm_provider_name)
+    sem = asyncio.Semaphore(_CONCURRENCY)
+    brand_cache: Dict[str, "asyncio.Task[Optional[Dict[str, Any]]]"] = {}
+    seen = [0]
+    current_job.set(job_id)
+
+    async def _one(item_id: int, pid: int) -> None:
+        async with sem:
+            if await _cancel_requested(job_id, seen):
+                return
+            await _process_item(job_id, item_id, pid, params, brands.get(pid), brand_cache, llm_name)
+
+    async def _beat() -> None:
+        while True:
+            await asyncio.sleep(_HEARTBEAT_S)
+            try:
+                await _heartbeat(job_id)
+            except Exception:
+                logger.debug("bulk_enrich: heartbeat falló (job %s)", job_id, exc_info=True)
+
+    beat = asyncio.ensure_future(_beat())
+    try:
+        await asyncio.gather(*(_one(item_id, pid) for item_id, pid in items))
+    finally:
+        beat.cancel()
+    await _finish(job_id, params)
+
+
+async def _finish(job_id: int, params: Dict[str, Any]) -> None:
+    async with SessionLocal() as db:
+        job = await db.get(Job, job_id)
+        if job is None:
+            return
+        c = await counts(db, job_id)
+        cancelled = job.status == "cancelled" or job_id in _CANCELLED
+        job.status = "cancelled" if cancelled else "done"
+        job.result = {**(job.result or {}), "counts": c}
+        errors = (await db.execute(
+            select(EnrichmentJobItem.product_id)
+            .where(EnrichmentJobItem.job_id == job_id, EnrichmentJobItem.status == "error")
+        )).scalars().all()
+        db.add(AuditLog(
+            action="bulk_enrich",
+            table="products",
+            entity_id=None,
+            meta={
+                "job_id": job_id,
+                "requested": c["total"],
+                "enriched": c["done"],
+                "skipped": c["skipped"],
+                "errors": list(errors),
+                "ids": params.get("ids") or [],
+            },
+            user_id=params.get("user_id"),
+        ))
+        await db.commit()
+    _CANCELLED.discard(job_id)
+    logger.info("bulk_enrich: job %s %s %s", job_id, "cancelado" if cancelled else "terminado", c)
+
+
+# ------------------------------ Reanudación ------------------------------
+async def resume_orphaned() -> List[int]:
+    """Toma los jobs sin heartbeat reciente y los reanuda en este proceso."""
+    threshold = datetime.utcnow() - timedelta(seconds=_STALE_S)
+    resumed: List[int] = []
+    async with SessionLocal() as db:
+        candidates = (await db.execute(
+            select(Job.id).where(Job.type == JOB_TYPE, Job.status.in_(("pending", "running")), Job.updated_at < threshold)
+        )).scalars().all()
+        for job_id in candidates:
+            if job_id in _TASKS:
+                continue
+            # Claim atómico: sólo un proceso gana el job
+            claimed = await db.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.updated_at < threshold, Job.status.in_(("pending", "running")))
+                .values(updated_at=datetime.utcnow())
+            )
+            await db.commit()
+            if not claimed.rowcount:
+                continue
+            stuck = (await db.execute(
+                select(EnrichmentJobItem.product_id)
+                .where(EnrichmentJobItem.job_id == job_id, EnrichmentJobItem.status == "running")
+            )).scalars().all()
+            if stuck:
+                await db.execute(update(Product).where(Product.id.in_(stuck)).values(is_enriching=False))
+                await db.execute(
+                    update(EnrichmentJobItem)
+                    .where(EnrichmentJobItem.job_id == job_id, EnrichmentJobItem.status == "running")
+                    .values(status="pending")
+                )
+                await db.commit()
+            logger.warning("bulk_enrich: reanudando job %s (%d ítems interrumpidos)", job_id, len(stuck))
+            start(job_id)
+            resumed.append(job_id)
+    return resumed
+
+
+_watchdog: Optional["asyncio.Task[None]"] = None
+
+
+def start_watchdog() -> None:
+    global _watchdog
+    if _watchdog is not None and not _watchdog.done():
+        return
+
+    async def _loop() -> None:
+        while True:
+            try:
+                await resume_orphaned()
+            except Exception:
+                logger.debug("bulk_enrich: watchdog falló", exc_info=True)
+            await asyncio.sleep(_HEARTBEAT_S)
+
+    _watchdog = asyncio.get_running_loop().create_task(_loop())
+
+
+def stop_watchdog() -> None:
+    global _watchdog
+    if _watchdog is not None:
+        _watchdog.cancel()
+        _watchdog = None
@@ -0,0 +1,260 @@
+# NG-HEADER: Nombre de archivo: http_cache.py
+# NG-HEADER: Ubicación: services/http_cache.py
+# NG-HEADER: Descripción: Compresión de respuestas (gzip/brotli) y GET condicional con ETag débiles
+# NG-HEADER: Lineamientos: Ver AGENTS.md
+"""Compresión y validadores HTTP para respuestas JSON pesadas (opt-in).
+
+- ``HTTP_COMPRESSION=1``: respuestas con ``Content-Length`` (no streaming) de tipo texto/JSON de
+  al menos ``HTTP_COMPRESSION_MIN_BYTES`` se comprimen con brotli (si el paquete
+  ``brotli`` está instalado y el cliente envía ``br``) o gzip.
+- ``HTTP_ETAGS=1``: los GET 200 JSON sin ``ETag`` propio reciben uno débil derivado
+  del cuerpo; si coincide con ``If-None-Match`` se responde 304 sin cuerpo.
+  Los endpoints cuyo contenido depende sólo de tablas versionables pueden además
+  responder 304 *antes* de consultar y serializar, vía ``row_version`` +
+  ``not_modified``.
+
+Métricas de bytes antes/después y cantidad de 304 por ruta en ``metrics_snapshot()``.
+"""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import os
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:  # pragma: no cover - dependencia opcional
+    import brotli  # type: ignore
+except Exception:  # pragma: no cover
+    brotli = None  # type: ignore
+
+_COMPRESSION = os.getenv("HTTP_COMPRESSION", "0") == "1"
+_ETAGS = os.getenv("HTTP_ETAGS", "0") == "1"
+_MIN_BYTES = int(os.getenv("HTTP_COMPRESSION_MIN_BYTES", "1024"))
+_GZIP_LEVEL = int(os.getenv("HTTP_GZIP_LEVEL", "6"))
+_BROTLI_QUALITY = int(os.getenv("HTTP_BROTLI_QUALITY", "5"))
+_MAX_BUFFER = 16 * 1024 * 1024
+
+_COMPRESSIBLE = ("application/json", "text/", "application/javascript", "application/xml", "image/svg+xml")
+
+
+def etags_enabled() -> bool:
+    return _ETAGS
+
+
+def compression_enabled() -> bool:
+    return _COMPRESSION
+
+
+# ------------------------------ ETag ------------------------------
+def weak_etag(*parts: Any) -> str:
+    digest = hashlib.sha1("|".join(str(p) for p in parts).encode("utf-8")).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Comparación débil (RFC 9110): ``W/"x"`` equivale a ``"x"``."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    target = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == target:
+            return True
+    return False
+
+
+async def row_version(db: AsyncSession, sources: Sequence[Tuple[Any, ...]]) -> Tuple[Any, ...]:
+    """Versión barata de un conjunto de tablas en un único SELECT.
+
+    ``sources``: ``[(Modelo, [columnas a maximizar], *criterios), ...]``; por tabla
+    se toma el ``max`` de cada columna (``updated_at``, ids crecientes...) filtrando
+    por los criterios opcionales (p.ej. la sesión pedida). Sólo ``max`` sobre
+    columnas indexadas: nada de ``count(*)`` que recorra la tabla en cada poll.
+    Los borrados no mueven un ``max``; quien borre filas debe tocar un
+    ``updated_at`` incluido en la versión.
+    """
+    cols = []
+    for model, maxed, *criteria in sources:
+        cols.extend(select(func.max(col)).select_from(model).where(*criteria).scalar_subquery() for col in maxed)
+    row = (await db.execute(select(*cols))).one()
+    return tuple(row)
+
+
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    """304 si ``If-None-Match`` coincide con ``etag`` (sólo con ``HTTP_ETAGS``)."""
+    if _ETAGS and etag_matches(request.headers.get("if-none-match"), etag):
+        _record(request.url.path, 0, 0, not_modified=True)
+        return Response(status_code=304, headers={"ETag": etag})
+    return None
+
+
+# ------------------------------ Middleware ------------------------------
+def _accepted_encoding(accept: str) -> Optional[str]:
+    offered: Dict[str, float] = {}
+    for part in accept.split(","):
+        token, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        offered[token.strip().lower()] = q
+    if brotli is not None and offered.get("br", 0) > 0:
+        return "br"
+    if offered.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=_BROTLI_QUALITY)  # type: ignore[union-attr]
+    return gzip.compress(body, compresslevel=_GZIP_LEVEL, mtime=0)
+
+
+class HttpCacheMiddleware:
+    """Middleware ASGI: ETag de cuerpo + 304 y compresión de respuestas completas."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not (_COMPRESSION or _ETAGS):
+            await self.app(scope, receive, send)
+            return
+
+        headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope.get("headers") or []}
+        encoding = _accepted_encoding(headers.get("accept-encoding", "")) if _COMPRESSION else None
+        is_get = scope.get("method") == "GET"
+        if encoding is None and not (_ETAGS and is_get):
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+        chunks: List[bytes] = []
+        passthrough = False
+
+        async def _send(message: Message) -> None:
+            nonlocal start, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                resp_headers = {k.lower(): v for k, v in message.get("headers") or []}
+                length = resp_headers.get(b"content-length")
+                ctype = resp_headers.get(b"content-type", b"").decode("latin-1")
+                if length is None or int(length) > _MAX_BUFFER or not ctype.startswith(_COMPRESSIBLE):
+                    # Streaming (SSE, descargas) o binarios: no se toca
+                    passthrough = True
+                    await send(message)
+                    return
+                start = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+            await self._finish(scope, headers, encoding, is_get, start, b"".join(chunks), send)  # type: ignore[arg-type]
+
+        await self.app(scope, receive, _send)
+
+    async def _finish(
+        self,
+        scope: Scope,
+        req_headers: Dict[str, str],
+        encoding: Optional[str],
+        is_get: bool,
+        start: Message,
+        body: bytes,
+        send: Send,
+    ) -> None:
+        raw_headers: List[Tuple[bytes, bytes]] = list(start.get("headers") or [])
+        resp_headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in raw_headers}
+        status = start["status"]
+        ctype = resp_headers.get("content-type", "")
+        path = scope.get("path", "")
+
+        if _ETAGS and is_get and status == 200 and ctype.startswith("application/json"):
+            etag = resp_headers.get("etag")
+            if etag is None:
+                etag = weak_etag(hashlib.sha1(body).hexdigest())
+                raw_headers.append((b"etag", etag.encode("latin-1")))
+            if etag_matches(req_headers.get("if-none-match"), etag):
+                _record(path, len(body), 0, not_modified=True)
+                keep = {b"etag", b"cache-control", b"vary", b"x-correlation-id"}
+                await send({
+                    "type": "http.response.start",
+                    "status": 304,
+                    "headers": [(k, v) for k, v in raw_headers if k.lower() in keep],
+                })
+                await send({"type": "http.response.body", "body": b""})
+                return
+
+        if (
+            encoding is not None
+            and len(body) >= _MIN_BYTES
+            and "content-encoding" not in resp_headers
+            and ctype.startswith(_COMPRESSIBLE)
+        ):
+            compressed = _compress(body, encoding)
+            if len(compressed) < len(body):
+                _record(path, len(body), len(compressed))
+                raw_headers = [(k, v) for k, v in raw_headers if k.lower() != b"content-length"]
+                raw_headers.append((b"content-encoding", encoding.encode("ascii")))
+                raw_headers.append((b"content-length", str(len(compressed)).encode("ascii")))
+                if "vary" in resp_headers:
+                    raw_headers = [
+                        (k, v + b", Accept-Encoding") if k.lower() == b"vary" else (k, v) for k, v in raw_headers
+                    ]
+                else:
+                    raw_headers.append((b"vary", b"Accept-Encoding"))
+                body = compressed
+            else:
+                _record(path, len(body), len(body))
+        await send({**start, "headers": raw_headers})
+        await send({"type": "http.response.body", "body": body})
+
+
+# ------------------------------ Métricas ------------------------------
+_STATS: Dict[str, Dict[str, int]] = defaultdict(lambda: {"responses": 0, "bytes_in": 0, "bytes_out": 0, "not_modified": 0})
+
+
+def _route_key(path: str) -> str:
+    # Dos primeros segmentos: agrupa /products/123 con /products/456
+    parts = [p for p in path.split("/") if p]
+    return "/" + "/".join(parts[:2])
+
+
+def _record(path: str, bytes_in: int, bytes_out: int, *, not_modified: bool = False) -> None:
+    stats = _STATS[_route_key(path)]
+    stats["responses"] += 1
+    stats["bytes_in"] += bytes_in
+    stats["bytes_out"] += bytes_out
+    if not_modified:
+        stats["not_modified"] += 1
+
+
+def metrics_snapshot() -> Dict[str, Any]:
+    routes = {}
+    for key, stats in sorted(_STATS.items()):
+        saved = stats["bytes_in"] - stats["bytes_out"]
+        routes[key] = {**stats, "saved_pct": round(100.0 * saved / stats["bytes_in"], 1) if stats["bytes_in"] else 0.0}
+    return {"compression": _COMPRESSION, "etags": _ETAGS, "brotli": brotli is not None, "routes": routes}
+
+
+def clear_metrics() -> None:
+    _STATS.clear()
@@ -0,0 +1,290 @@
+# NG-HEADER: Nombre de archivo: http_clients.py
+# NG-HEADER: Ubicación: services/http_clients.py
+# NG-HEADER: Descripción: Registro central de clientes HTTP salientes (pools por servicio, timeouts, reintentos, métricas)
+# NG-HEADER: Lineamientos: Ver AGENTS.md
+"""Clientes HTTP compartidos por upstream.
+
+Cada upstream (``telegram``, ``mcp_products``, ``scraping``...) tiene una
+``UpstreamPolicy`` con timeouts, tamaño de pool, reintentos y HTTP/2. Los clientes
+se crean perezosamente y se reutilizan (keep-alive: sin TCP+TLS por llamada):
+
+- ``get_client(name)``: ``httpx.AsyncClient`` ligado al event loop actual (las
+  conexiones de httpx no pueden cruzar loops; si el loop cambia se crea otro).
+- ``get_session(name)``: ``requests.Session`` con pool y ``Retry`` para los
+  call sites sincrónicos (proveedor Ollama, scraper estático).
+- ``request(name, method, url, ...)``: atajo async que además reintenta 502/503/504
+  en métodos idempotentes.
+
+Reintentos: errores de conexión en el transporte (``retries``) y, vía ``request``,
+respuestas 5xx transitorias con backoff exponencial. HTTP/2 sólo si la política lo
+pide y el paquete ``h2`` está instalado (``HTTP_CLIENT_HTTP2=0`` lo desactiva).
+
+Overrides por entorno: ``HTTP_<UPSTREAM>_TIMEOUT``, ``HTTP_<UPSTREAM>_RETRIES`` y
+``HTTP_<UPSTREAM>_MAX_CONNECTIONS`` (p.ej. ``HTTP_TELEGRAM_TIMEOUT=15``).
+
+Métricas por upstream (requests, errores, status, latencia avg/p95) en
+``metrics_snapshot()``. La app cierra todo en shutdown con ``aclose_all()``; los
+workers al terminar su loop principal.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field, replace
+from typing import Any, Deque, Dict, Optional, Tuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+_IDEMPOTENT = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+_RETRY_STATUS = {502, 503, 504}
+
+
+@dataclass(frozen=True)
+class UpstreamPolicy:
+    timeout: float = 10.0
+    connect_timeout: float = 5.0
+    max_connections: int = 20
+    max_keepalive: int = 10
+    retries: int = 1
+    backoff: float = 0.3
+    http2: bool = False
+    follow_redirects: bool = False
+    headers: Dict[str, str] = field(default_factory=dict)
+
+
+_SCRAPER_HEADERS = {"User-Agent": "GrowenBot/1.0 (+https://growen.app)"}
+
+POLICIES: Dict[str, UpstreamPolicy] = {
+    "default": UpstreamPolicy(),
+    "telegram": UpstreamPolicy(timeout=10.0, retries=2, http2=True),
+    # Long polling: el timeout real lo pasa cada getUpdates
+    "telegram_polling": UpstreamPolicy(timeout=40.0, max_connections=4, max_keepalive=2, retries=2, http2=True),
+    "mcp_products": UpstreamPolicy(timeout=8.0, retries=1),
+    "mcp_web_search": UpstreamPolicy(timeout=6.0, retries=1),
+    "internal_api": UpstreamPolicy(timeout=10.0, retries=1),
+    "scraping": UpstreamPolicy(timeout=15.0, max_connections=10, max_keepalive=5, retries=1,
+                               follow_redirects=True, headers=_SCRAPER_HEADERS),
+    "ollama": UpstreamPolicy(timeout=120.0, connect_timeout=3.0, max_connections=4, max_keepalive=2, retries=0),
+}
+
+
+def _h2_available() -> bool:
+    try:
+        import h2  # noqa: F401  # type: ignore
+    except Exception:
+        return False
+    return True
+
+
+_HTTP2 = os.getenv("HTTP_CLIENT_HTTP2", "1") != "0" and _h2_available()
+
+
+def policy(name: str) -> UpstreamPolicy:
+    base = POLICIES.get(name) or POLICIES["default"]
+    prefix = f"HTTP_{name.upper()}_"
+    overrides: Dict[str, Any] = {}
+    for env_key, attr, cast in (("TIMEOUT", "timeout", float), ("RETRIES", "retries", int),
+                                ("MAX_CONNECTIONS", "max_connections", int)):
+        raw = os.getenv(prefix + env_key)
+        if raw:
+            try:
+                overrides[attr] = cast(raw)
+            except ValueError:
+                logger.warning("http_clients: %s%s inválido (%r)", prefix, env_key, raw)
+    return replace(base, **overrides) if overrides else base
+
+
+# ------------------------------ Métricas ------------------------------
+_LATENCY: Dict[str, Deque[float]] = {}
+_COUNTS: Dict[str, Counter] = {}
+
+
+def _record(name: str, took_ms: Optional[float], status: Optional[int]) -> None:
+    counts = _COUNTS.setdefault(name, Counter())
+    counts["requests"] += 1
+    if status is None:
+        counts["errors"] += 1
+    else:
+        counts[f"{status // 100}xx"] += 1
+    if took_ms is not None:
+        _LATENCY.setdefault(name, deque(maxlen=200)).append(took_ms)
+
+
+def record_error(name: str) -> None:
+    _record(name, None, None)
+
+
+def metrics_snapshot() -> Dict[str, Dict[str, Any]]:
+    out: Dict[str, Dict[str, Any]] = {}
+    for name, counts in _COUNTS.items():
+        data: Dict[str, Any] = dict(counts)
+        ordered = sorted(_LATENCY.get(name) or ())
+        if ordered:
+            data["avg_ms"] = round(sum(ordered) / len(ordered), 2)
+            data["p95_ms"] = round(ordered[int(round(0.95 * (len(ordered) - 1)))], 2)
+        out[name] = data
+    return out
+
+
+def clear_metrics() -> None:
+    _LATENCY.clear()
+    _COUNTS.clear()
+
+
+# ------------------------------ Clientes async ------------------------------
+_ASYNC: Dict[str, Tuple[asyncio.AbstractEventLoop, httpx.AsyncClient]] = {}
+
+
+def _hooks(name: str) -> Dict[str, list]:
+    async def _on_request(request: httpx.Request) -> None:
+        request.extensions["growen_t0"] = time.perf_counter()
+
+    async def _on_response(response: httpx.Response) -> None:
+        t0 = response.request.extensions.get("growen_t0")
+        took = (time.perf_counter() - t0) * 1000 if t0 else None
+        _record(name, took, response.status_code)
+
+    return {"request": [_on_request], "response": [_on_response]}
+
+
+def _timeout(pol: UpstreamPolicy) -> httpx.Timeout:
+    return httpx.Timeout(pol.timeout, connect=min(pol.connect_timeout, pol.timeout))
+
+
+def _limits(pol: UpstreamPolicy) -> httpx.Limits:
+    return httpx.Limits(max_connections=pol.max_connections, max_keepalive_connections=pol.max_keepalive)
+
+
+# Clientes reemplazados que se están cerrando (referencia para que el GC no corte la tarea)
+_CLOSING: "set[asyncio.Future[Any]]" = set()
+
+
+async def _aclose_quietly(name: str, client: httpx.AsyncClient) -> None:
+    try:
+        await client.aclose()
+    except Exception:  # pragma: no cover - sockets de un loop ya cerrado
+        logger.debug("http_clients: fallo cerrando %s", name, exc_info=True)
+
+
+def _retire(name: str, client: httpx.AsyncClient, loop: asyncio.AbstractEventLoop) -> None:
+    """Cierra el cliente anterior sin bloquear: en su propio loop si sigue vivo, si no en el actual."""
+    if client.is_closed:
+        return
+    if loop.is_running() and loop is not asyncio.get_running_loop():
+        fut: "asyncio.Future[Any]" = asyncio.wrap_future(
+            asyncio.run_coroutine_threadsafe(_aclose_quietly(name, client), loop)
+        )
+    else:
+        fut = asyncio.ensure_future(_aclose_quietly(name, client))
+    _CLOSING.add(fut)
+    fut.add_done_callback(_CLOSING.discard)
+
+
+def get_client(name: str) -> httpx.AsyncClient:
+    """Cliente async compartido del upstream ``name`` para el loop actual.
+
+    Si el loop cambió (p.ej. un ``asyncio.run`` por tarea en workers/scripts) el
+    cliente anterior se cierra para no dejar abiertas las conexiones de su pool.
+    """
+    loop = asyncio.get_running_loop()
+    entry = _ASYNC.get(name)
+    if entry is not None and entry[0] is loop and not entry[1].is_closed:
+        return entry[1]
+    if entry is not None:
+        _retire(name, entry[1], entry[0])
+    pol = policy(name)
+    http2 = pol.http2 and _HTTP2
+    transport = httpx.AsyncHTTPTransport(retries=pol.retries, http2=http2, limits=_limits(pol))
+    client = httpx.AsyncClient(
+        transport=transport,
+        timeout=_timeout(pol),
+        headers=pol.headers or None,
+        follow_redirects=pol.follow_redirects,
+        event_hooks=_hooks(name),
+    )
+    _ASYNC[name] = (loop, client)
+    return client
+
+
+async def request(name: str, method: str, url: str, **kwargs: Any) -> httpx.Response:
+    """Request vía el cliente compartido; reintenta 502/503/504 en métodos idempotentes."""
+    pol = policy(name)
+    attempts = 1 + (pol.retries if method.upper() in _IDEMPOTENT else 0)
+    for attempt in range(attempts):
+        try:
+            resp = await get_client(name).request(method, url, **kwargs)
+        except httpx.TransportError:
+            record_error(name)
+            raise
+        if resp.status_code not in _RETRY_STATUS or attempt == attempts - 1:
+            return resp
+        await asyncio.sleep(pol.backoff * (2 ** attempt))
+    return resp  # pragma: no cover - el loop siempre retorna
+
+
+async def aclose_all() -> None:
+    """Cierra los clientes async (shutdown de app/worker).
+
+    Los de otro loop que sigue corriendo se cierran en ese loop; los de loops ya
+    terminados, en el actual.
+    """
+    loop = asyncio.get_running_loop()
+    for name, (client_loop, client) in list(_ASYNC.items()):
+        _ASYNC.pop(name, None)
+        if client_loop is not loop and client_loop.is_running():
+            _retire(name, client, client_loop)
+        else:
+            await _aclose_quietly(name, client)
+    close_sessions()
+
+
+# ------------------------------ Sesiones sync (requests) ------------------------------
+_SYNC: Dict[str, Any] = {}
+
+
+def get_session(name: str):
+    """``requests.Session`` compartida del upstream ``name`` (pool + reintentos de conexión)."""
+    session = _SYNC.get(name)
+    if session is not None:
+        return session
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    pol = policy(name)
+    retry = Retry(
+        total=pol.retries,
+        connect=pol.retries,
+        read=0,
+        status=pol.retries,
+        status_forcelist=sorted(_RETRY_STATUS),
+        allowed_methods=frozenset(_IDEMPOTENT),
+        backoff_factor=pol.backoff,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pol.max_keepalive, pool_maxsize=pol.max_connections, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update(pol.headers)
+
+    def _on_response(resp, *args, **kwargs):
+        _record(name, resp.elapsed.total_seconds() * 1000, resp.status_code)
+
+    session.hooks["response"].append(_on_response)
+    _SYNC[name] = session
+    return session
+
+
+def close_sessions() -> None:
+    for name, session in list(_SYNC.items()):
+        try:
+            session.close()
+        except Exception:
+            logger.debug("http_clients: fallo cerrando sesión %s", name, exc_info=True)
+        _SYNC.pop(name, None)
@@ -0,0 +1,361 @@
+# NG-HEADER: Nombre de archivo: import_commit.py
+# NG-HEADER: Ubicación: services/import_commit.py
+# NG-HEADER: Descripción: Commit de listas de precios en background, por lotes con checkpoint reanudable
+# NG-HEADER: Lineamientos: Ver AGENTS.md
+"""Aplicación (commit) de un ``ImportJob`` en background y por lotes.
+
+``POST /imports/{id}/commit`` marca el job ``COMMITTING`` y responde enseguida; un
+runner en el proceso de la API recorre las filas en lotes de ``IMPORT_COMMIT_CHUNK``
+por ``ImportJobRow.id``. Cada lote:
+
+- precarga categorías, ``Product`` (por ``sku_root``), ``SupplierProduct`` y
+  ``ProductEquivalence`` de todas sus filas con un ``IN`` por tabla,
+- crea lo faltante con un ``flush`` por tabla (inserciones en bloque),
+- corre en su propia transacción y guarda el checkpoint (``commit_cursor``) y los
+  contadores (``commit_result``) junto con los datos.
+
+Si el proceso cae o un lote falla, el job queda ``COMMITTING`` sin heartbeat o
+``COMMIT_ERROR``; volver a llamar al commit (o el arranque de la API para los
+huérfanos) continúa desde el checkpoint sin repetir filas.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.models import (
+    CanonicalProduct,
+    Category,
+    ImportJob,
+    ImportJobRow,
+    Product,
+    ProductEquivalence,
+    SupplierPriceHistory,
+    SupplierProduct,
+)
+from db.session import SessionLocal
+from services.suppliers.parsers import AUTO_CREATE_CANONICAL
+
+logger = logging.getLogger("growen.import_commit")
+
+_CHUNK = max(1, int(os.getenv("IMPORT_COMMIT_CHUNK", "500") or 500))
+_STALE_S = int(os.getenv("IMPORT_COMMIT_STALE_S", "120") or 120)
+
+COUNTERS = ("inserted", "updated", "unchanged", "skipped_duplicates", "errors", "price_changes")
+
+
+def progress(job: ImportJob) -> Optional[Dict[str, Any]]:
+    """Estado del commit para los endpoints de importación (``None`` si no empezó)."""
+    if job.commit_result is None:
+        return None
+    data = dict(job.commit_result)
+    total = int(data.get("total") or 0)
+    data["status"] = job.status
+    data["progress"] = int(round(100 * int(data.get("processed") or 0) / total)) if total else 100
+    return data
+
+
+def legacy_result(job: ImportJob) -> Dict[str, int]:
+    """Contadores con la forma de la respuesta síncrona original."""
+    res = job.commit_result or {}
+    return {k: int(res.get(k) or 0) for k in COUNTERS}
+
+
+# ------------------------------ Resolución en bloque ------------------------------
+def _split_path(path: str) -> List[str]:
+    return [p.strip() for p in (path or "").split(">") if p.strip()]
+
+
+async def _resolve_categories(db: AsyncSession, paths: Iterable[str], cache: Dict[str, int]) -> None:
+    """Completa ``cache`` (ruta -> id de la última categoría), creando las que falten."""
+    pending = {p: _split_path(p) for p in set(paths) if p not in cache}
+    pending = {p: parts for p, parts in pending.items() if parts}
+    if not pending:
+        return
+    names = {n for parts in pending.values() for n in parts}
+    rows = (await db.execute(
+        select(Category.id, Category.name, Category.parent_id).where(Category.name.in_(names)).order_by(Category.id)
+    )).all()
+    known: Dict[tuple, int] = {}
+    for cid, name, parent_id in rows:
+        known.setdefault((name, parent_id), cid)
+    for path, parts in pending.items():
+        parent_id: Optional[int] = None
+        for name in parts:
+            key = (name, parent_id)
+            if key not in known:
+                cat = Category(name=name, parent_id=parent_id)
+                db.add(cat)
+                await db.flush()
+                known[key] = cat.id
+            parent_id = known[key]
+        cache[path] = parent_id  # type: ignore[assignment]
+
+
+def _price_history(sp_id: int, data: Dict[str, Any]) -> SupplierPriceHistory:
+    prev_purchase = data.get("precio_compra") - data.get("delta_compra", 0)
+    prev_sale = data.get("precio_venta") - data.get("delta_venta", 0)
+    return SupplierPriceHistory(
+        supplier_product_fk=sp_id,
+        file_fk=None,
+        as_of_date=date.today(),
+        purchase_price=data.get("precio_compra"),
+        sale_price=data.get("precio_venta"),
+        delta_purchase_pct=(data.get("delta_compra", 0) / prev_purchase * 100) if prev_purchase else None,
+        delta_sale_pct=(data.get("delta_venta", 0) / prev_sale * 100) if prev_sale else None,
+    )
+
+
+async def apply_rows(
+    db: AsyncSession,
+    supplier_id: int,
+    rows: List[ImportJobRow],
+    result: Dict[str, int],
+    category_cache: Dict[str, int],
+) -> None:
+    """Aplica un lote de filas sobre la sesión (sin commit) acumulando en ``result``."""
+    todo: List[Dict[str, Any]] = []
+    statuses: List[str] = []
+    for r in rows:
+        data = r.row_json_normalized or {}
+        if r.status == "error":
+            result["errors"] += 1
+        elif r.status == "duplicate_in_file":
+            result["skipped_duplicates"] += 1
+        elif r.status == "unchanged":
+            result["unchanged"] += 1
+        elif not _split_path(data.get("categoria_path", "")) or not data.get("codigo"):
+            result["errors"] += 1
+        else:
+            todo.append(data)
+            statuses.append(r.status)
+    if not todo:
+        return
+
+    await _resolve_categories(db, (d["categoria_path"] for d in todo), category_cache)
+    codes = list({d["codigo"] for d in todo})
+
+    products: Dict[str, Product] = {}
+    for prod in (await db.execute(
+        select(Product).where(Product.sku_root.in_(codes)).order_by(Product.id)
+    )).scalars():
+        products.setdefault(prod.sku_root, prod)
+    sps: Dict[str, SupplierProduct] = {
+        sp.supplier_product_id: sp
+        for sp in (await db.execute(
+            select(SupplierProduct).where(
+                SupplierProduct.supplier_id == supplier_id,
+                SupplierProduct.supplier_product_id.in_(codes),
+            )
+        )).scalars()
+    }
+
+    # Productos internos: altas en bloque, actualizaciones sobre los precargados
+    for data in todo:
+        cat_id = category_cache[data["categoria_path"]]
+        prod = products.get(data["codigo"])
+        if prod is None:
+            prod = Product(sku_root=data["codigo"], title=data["nombre"], category_id=cat_id)
+            db.add(prod)
+            products[data["codigo"]] = prod
+        else:
+            prod.title = data["nombre"]
+            prod.category_id = cat_id
+    await db.flush()
+
+    now = datetime.utcnow()
+    for data in todo:
+        sp = sps.get(data["codigo"])
+        if sp is None:
+            sp = SupplierProduct(supplier_id=supplier_id, supplier_product_id=data["codigo"])
+            db.add(sp)
+            sps[data["codigo"]] = sp
+            result["inserted"] += 1
+        else:
+            result["updated"] += 1
+        parts = _split_path(data.get("categoria_path", ""))
+        sp.title = data["nombre"]
+        sp.category_level_1 = parts[0] if len(parts) > 0 else None
+        sp.category_level_2 = parts[1] if len(parts) > 1 else None
+        sp.category_level_3 = parts[2] if len(parts) > 2 else None
+        sp.min_purchase_qty = data.get("compra_minima")
+        sp.last_seen_at = now
+        sp.current_purchase_price = data.get("precio_compra")
+        sp.current_sale_price = data.get("precio_venta")
+        sp.internal_product_id = products[data["codigo"]].id
+    await db.flush()
+
+    # Equivalencias con canónicos: sugerencia existente o alta automática
+    sp_ids = [sp.id for sp in sps.values()]
+    equivalences: Dict[int, ProductEquivalence] = {
+        eq.supplier_product_id: eq
+        for eq in (await db.execute(
+            select(ProductEquivalence).where(
+                ProductEquivalence.supplier_id == supplier_id,
+                ProductEquivalence.supplier_product_id.in_(sp_ids),
+            )
+        )).scalars()
+    }
+    new_canonicals: List[tuple] = []
+    for data in todo:
+        sp = sps[data["codigo"]]
+        suggestions = data.get("canonical_suggestions", [])
+        if suggestions:
+            eq = equivalences.get(sp.id)
+            if eq is None:
+                eq = ProductEquivalence(supplier_id=supplier_id, supplier_product_id=sp.id)
+                db.add(eq)
+                equivalences[sp.id] = eq
+            eq.canonical_product_id = suggestions[0]["id"]
+            eq.source = "auto"
+            eq.confidence = suggestions[0]["score"]
+        elif data.get("auto_create_canonical") and AUTO_CREATE_CANONICAL:
+            cp = CanonicalProduct(name=data["nombre"])
+            db.add(cp)
+            new_canonicals.append((sp, cp))
+    if new_canonicals:
+        await db.flush()
+        for sp, cp in new_canonicals:
+            # ng_sku se genera con el id asignado
+            cp.ng_sku = f"NG-{cp.id:06d}"
+            db.add(ProductEquivalence(
+                supplier_id=supplier_id,
+                supplier_product_id=sp.id,
+                canonical_product_id=cp.id,
+                source="auto",
+                confidence=1.0,
+            ))
+
+    history = [_price_history(sps[d["codigo"]].id, d) for d, st in zip(todo, statuses) if st == "changed"]
+    if history:
+        db.add_all(history)
+        result["price_changes"] += len(history)
+    await db.flush()
+
+
+# ------------------------------ Runner ------------------------------
+_TASKS: Dict[int, "asyncio.Task[None]"] = {}
+
+
+async def claim(db: AsyncSession, job_id: int) -> bool:
+    """Pasa el job a ``COMMITTING`` si está pendiente, falló o quedó huérfano."""
+    threshold = datetime.utcnow() - timedelta(seconds=_STALE_S)
+    res = await db.execute(
+        update(ImportJob)
+        .where(
+            ImportJob.id == job_id,
+            or_(
+                ImportJob.status.in_(("DRY_RUN", "COMMIT_ERROR")),
+                (ImportJob.status == "COMMITTING") & or_(ImportJob.updated_at.is_(None), ImportJob.updated_at < threshold),
+            ),
+        )
+        .values(status="COMMITTING", updated_at=datetime.utcnow())
+    )
+    await db.commit()
+    return bool(res.rowcount)
+
+
+def is_running(job_id: int) -> bool:
+    task = _TASKS.get(job_id)
+    return task is not None and not task.done()
+
+
+def start(job_id: int) -> None:
+    if is_running(job_id):
+        return
+    _TASKS[job_id] = asyncio.get_running_loop().create_task(_run(job_id))
+    _TASKS[job_id].add_done_callback(lambda _t, j=job_id: _TASKS.pop(j, None))
+
+
+async def wait(job_id: int) -> None:
+    task = _TASKS.get(job_id)
+    if task is not None:
+        await asyncio.shield(task)
+
+
+async def _run(job_id: int) -> None:
+    category_cache: Dict[str, int] = {}
+    async with SessionLocal() as db:
+        job = await db.get(ImportJob, job_id)
+        if job is None or job.status != "COMMITTING":
+            return
+        state: Dict[str, Any] = dict(job.commit_result or {})
+        if "total" not in state:
+            total = (await db.execute(
+                select(func.count()).select_from(ImportJobRow).where(ImportJobRow.job_id == job_id)
+            )).scalar() or 0
+            state = {"total": int(total), "processed": 0, **{k: 0 for k in COUNTERS}}
+        state.pop("error", None)
+        job.commit_result = state
+        cursor = job.commit_cursor or 0
+        supplier_id = job.supplier_id
+        await db.commit()
+
+        while True:
+            rows = (await db.execute(
+                select(ImportJobRow)
+                .where(ImportJobRow.job_id == job_id, ImportJobRow.id > cursor)
+                .order_by(ImportJobRow.id)
+                .limit(_CHUNK)
+            )).scalars().all()
+            if not rows:
+                break
+            counters = {k: int(state.get(k) or 0) for k in COUNTERS}
+            try:
+                await apply_rows(db, supplier_id, list(rows), counters, category_cache)
+                state = {**state, **counters, "processed": int(state.get("processed") or 0) + len(rows)}
+                # Checkpoint en la misma transacción que los datos del lote
+                job.commit_cursor = rows[-1].id
+                job.commit_result = state
+                job.updated_at = datetime.utcnow()
+                await db.commit()
+            except Exception as e:
+                logger.exception("import_commit: fallo en job %s (lote tras fila %s)", job_id, cursor)
+                await db.rollback()
+                category_cache.clear()
+                await db.execute(
+                    update(ImportJob)
+                    .where(ImportJob.id == job_id)
+                    .values(
+                        status="COMMIT_ERROR",
+                        commit_result={**state, "error": (str(e) or type(e).__name__)[:300]},
+                        updated_at=datetime.utcnow(),
+                    )
+                )
+                await db.commit()
+                return
+            cursor = rows[-1].id
+            # Liberar las filas ya aplicadas del identity map
+            db.expunge_all()
+            job = await db.get(ImportJob, job_id)
+
+        job.status = "COMMITTED"
+        job.updated_at = datetime.utcnow()
+        await db.commit()
+    logger.info("import_commit: job %s aplicado %s", job_id, state)
+
+
+async def resume_orphaned() -> List[int]:
+    """Reanuda commits que quedaron ``COMMITTING`` sin heartbeat (p.ej. tras un reinicio)."""
+    threshold = datetime.utcnow() - timedelta(seconds=_STALE_S)
+    resumed: List[int] = []
+    async with SessionLocal() as db:
+        candidates = (await db.execute(
+            select(ImportJob.id).where(
+                ImportJob.status == "COMMITTING",
+                or_(ImportJob.updated_at.is_(None), ImportJob.updated_at < threshold),
+            )
+        )).scalars().all()
+        for job_id in candidates:
+            if is_running(job_id) or not await claim(db, job_id):
+                continue
+            logger.warning("import_commit: reanudando job %s desde el checkpoint", job_id)
+            start(job_id)
+            resumed.append(job_id)
+    return resumed
@@ -0,0 +1,171 @@
+# NG-HEADER: Nombre de archivo: mime_stream.py
+# NG-HEADER: Ubicación: services/importers/mime_stream.py
+# NG-HEADER: Descripción: Recorrido en streaming de mensajes MIME (.eml) con decodificación incremental por parte
+# NG-HEADER: Lineamientos: Ver AGENTS.md
+"""Recorrido de un mensaje MIME leyendo línea a línea desde un archivo.
+
+``email.message_from_bytes`` arma el mensaje completo en memoria (incluidos los
+adjuntos). :func:`walk` en cambio lee el archivo por líneas, resuelve los
+límites ``multipart`` y entrega el contenido de cada parte hoja, ya decodificado
+(base64 / quoted-printable), a un *sink* que elige el llamador: un parser
+incremental para el HTML, un archivo en disco para un adjunto o nada.
+
+Sólo se parsean en memoria los bloques de headers.
+"""
+from __future__ import annotations
+
+import binascii
+import re
+from email import policy
+from email.message import EmailMessage
+from email.parser import BytesHeaderParser
+from typing import BinaryIO, Callable, List, Optional, Protocol, Tuple
+
+_MAX_LINE = 64 * 1024
+_HEADER_PARSER = BytesHeaderParser(policy=policy.default)
+_HEADER_LINE = re.compile(rb"^(From |[\041-\071\073-\176]*:|[\t ])")
+
+
+class Sink(Protocol):
+    def write(self, data: bytes) -> object: ...
+
+    def close(self) -> object: ...
+
+
+# Recibe los headers de una parte hoja; devuelve dónde escribir su contenido o None para saltearla
+PartHandler = Callable[[EmailMessage], Optional[Sink]]
+
+
+class _Lines:
+    def __init__(self, fh: BinaryIO):
+        self.fh = fh
+        self.pushed: Optional[bytes] = None
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> bytes:
+        if self.pushed is not None:
+            line, self.pushed = self.pushed, None
+            return line
+        line = self.fh.readline(_MAX_LINE)
+        if not line:
+            raise StopIteration
+        return line
+
+
+def _read_headers(lines: _Lines) -> EmailMessage:
+    block: List[bytes] = []
+    for line in lines:
+        if line in (b"\r\n", b"\n"):
+            break
+        if not _HEADER_LINE.match(line):
+            # Sin línea en blanco separadora: como ``email.feedparser``, el resto ya es cuerpo
+            lines.pushed = line
+            break
+        block.append(line)
+    return _HEADER_PARSER.parsebytes(b"".join(block))  # type: ignore[return-value]
+
+
+class _Decoder:
+    """Decodificación incremental del Content-Transfer-Encoding."""
+
+    def __init__(self, cte: str, sink: Sink):
+        self.cte = cte
+        self.sink = sink
+        self.pending = b""
+
+    def feed(self, line: bytes) -> None:
+        if self.cte == "base64":
+            data = self.pending + b"".join(line.split())
+            cut = len(data) - len(data) % 4
+            self.pending = data[cut:]
+            if cut:
+                self.sink.write(binascii.a2b_base64(data[:cut]))
+        elif self.cte == "quoted-printable":
+            self.sink.write(binascii.a2b_qp(line))
+        else:
+            self.sink.write(line)
+
+    def close(self) -> None:
+        if self.pending:
+            try:
+                self.sink.write(binascii.a2b_base64(self.pending + b"=" * (-len(self.pending) % 4)))
+            except binascii.Error:
+                pass
+        self.sink.close()
+
+
+def _marker(line: bytes, boundaries: List[bytes]) -> Optional[Tuple[bytes, bool]]:
+    """``(boundary, es_cierre)`` si la línea es un delimitador de algún multipart abierto."""
+    if not line.startswith(b"--"):
+        return None
+    body = line.rstrip(b"\r\n \t")
+    for b in reversed(boundaries):
+        if body == b"--" + b:
+            return b, False
+        if body == b"--" + b + b"--":
+            return b, True
+    return None
+
+
+def _leaf(lines: _Lines, headers: EmailMessage, handler: PartHandler, boundaries: List[bytes]):
+    sink = handler(headers)
+    decoder = _Decoder(str(headers.get("Content-Transfer-Encoding", "7bit")).strip().lower(), sink) if sink else None
+    prev: Optional[bytes] = None
+    found = None
+    for line in lines:
+        found = _marker(line, boundaries)
+        if found:
+            break
+        if prev is not None and decoder:
+            decoder.feed(prev)
+        prev = line
+    # El salto de línea previo a un delimitador es parte del delimitador
+    if prev is not None and decoder:
+        decoder.feed(prev[:-2] if found and prev.endswith(b"\r\n") else prev[:-1] if found and prev.endswith(b"\n") else prev)
+    if decoder:
+        decoder.close()
+    return found
+
+
+def _part(lines: _Lines, headers: EmailMessage, handler: PartHandler, boundaries: List[bytes]):
+    """Procesa una parte; devuelve el delimitador (de un nivel superior) que la terminó, o None en EOF."""
+    boundary = headers.get_param("boundary") if headers.get_content_maintype() == "multipart" else None
+    if not boundary:
+        return _leaf(lines, headers, handler, boundaries)
+    own = str(boundary).encode("utf-8", "replace")
+    boundaries.append(own)
+    try:
+        # Preámbulo hasta el primer delimitador
+        found = None
+        for line in lines:
+            found = _marker(line, boundaries)
+            if found:
+                break
+        while found and found[0] == own and not found[1]:
+            found = _part(lines, _read_headers(lines), handler, boundaries)
+        if found and found[0] == own and found[1]:
+            # Epílogo: hasta el delimitador de un multipart contenedor o EOF
+            boundaries.pop()
+            found = None
+            for line in lines:
+                found = _marker(line, boundaries)
+                if found:
+                    break
+            boundaries.append(own)
+        return found
+    finally:
+        boundaries.pop()
+
+
+def walk(fh: BinaryIO, handler: PartHandler) -> EmailMessage:
+    """Recorre el mensaje de ``fh`` llamando a ``handler`` por cada parte hoja.
+
+    Returns:
+        Los headers del mensaje (Subject, Date, Message-ID, From...).
+    """
+    lines = _Lines(fh)
+    top = _read_headers(lines)
+    _part(lines, top, handler, [])
+    return top
@@ -0,0 +1,295 @@
+#!/usr/bin/env python
+# NG-HEADER: Nombre de archivo: pdf_extract.py
+# NG-HEADER: Ubicación: services/importers/pdf_extract.py
+# NG-HEADER: Descripción: Caché por documento (sha256) de texto, palabras, tablas e imágenes de páginas PDF
+# NG-HEADER: Lineamientos: Ver AGENTS.md
+"""Extracción única por documento PDF, cacheada por sha256 del contenido.
+
+El pipeline de remitos y los endpoints iAVaL leen de acá en lugar de abrir el PDF
+en cada etapa:
+
+- Una sola pasada con pdfplumber extrae, por página, texto, cajas de palabras y
+  tablas (estrategia por líneas).
+- Las tablas de Camelot se cachean por flavor + parámetros.
+- Las páginas rasterizadas (PNG) se cachean por página + dpi, y sus versiones
+  comprimidas para visión (JPEG/WebP) por tamaño + calidad.
+
+La caché vive en disco (``PDF_EXTRACT_CACHE_DIR``, una carpeta por sha256) para que
+la compartan los workers del pool de importación y sobreviva reinicios: re-importar
+el mismo archivo o repetir preview/apply no vuelve a extraer nada. Se conservan las
+``PDF_EXTRACT_CACHE_MAX`` entradas usadas más recientemente (LRU por mtime). Las
+extracciones fallidas no se cachean.
+"""
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import logging
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger("growen")
+
+_CACHE_MAX = int(os.getenv("PDF_EXTRACT_CACHE_MAX", "500") or 500)
+_MEMORY_MAX = 32
+_FORMAT = 1  # cambia si cambia la estructura de extract.json
+
+_memory: "OrderedDict[str, PdfDocument]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def cache_root() -> Path:
+    return Path(os.getenv("PDF_EXTRACT_CACHE_DIR", str(Path("data") / "purchases" / "_extract")))
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+class PdfDocument:
+    """Vista cacheada de un PDF. Cada extracción se hace a lo sumo una vez por contenido."""
+
+    def __init__(self, path: Path, sha256: str):
+        self.path = path
+        self.sha256 = sha256
+        self.dir = cache_root() / sha256
+        self._pages: Optional[List[Dict[str, Any]]] = None
+        self._camelot: Optional[Dict[str, List[List[List[str]]]]] = None
+        self.error: Optional[str] = None
+        self._mu = threading.Lock()
+
+    # ------------------------------ pdfplumber ------------------------------
+    def _load_pages(self) -> List[Dict[str, Any]]:
+        if self._pages is not None:
+            return self._pages
+        with self._mu:
+            if self._pages is not None:
+                return self._pages
+            cached = self._read_json("extract.json")
+            if cached is not None and cached.get("format") == _FORMAT:
+                self._pages = cached["pages"]
+                return self._pages
+            try:
+                self._pages = _extract_pages(self.path)
+                self.error = None
+            except Exception as e:
+                self.error = str(e) or type(e).__name__
+                return []
+            self._write_json("extract.json", {"format": _FORMAT, "pages": self._pages})
+            return self._pages
+
+    @property
+    def page_count(self) -> int:
+        return len(self._load_pages())
+
+    def page_texts(self) -> List[str]:
+        return [p["text"] for p in self._load_pages()]
+
+    def text(self, sep: str = "\n") -> str:
+        return sep.join(self.page_texts())
+
+    def words(self, page: int) -> List[Dict[str, Any]]:
+        pages = self._load_pages()
+        return pages[page]["words"] if page < len(pages) else []
+
+    def tables(self) -> List[List[List[List[Optional[str]]]]]:
+        """Tablas de pdfplumber por página (estrategia por líneas)."""
+        return [p["tables"] for p in self._load_pages()]
+
+    # ------------------------------ Camelot ------------------------------
+    def camelot_tables(self, flavor: str, **kw: Any) -> List[List[List[str]]]:
+        """Tablas de Camelot (``pages="all"``) como listas de filas; lanza si Camelot falla."""
+        key = flavor + ":" + json.dumps(kw, sort_keys=True)
+        with self._mu:
+            if self._camelot is None:
+                self._camelot = self._read_json("camelot.json") or {}
+            if key in self._camelot:
+                return self._camelot[key]
+        tables = [tbl.df.astype(str).values.tolist() for tbl in _camelot().read_pdf(str(self.path), flavor=flavor, pages="all", **kw)]
+        with self._mu:
+            self._camelot[key] = tables
+            self._write_json("camelot.json", self._camelot)
+        return tables
+
+    # ------------------------------ Imágenes ------------------------------
+    def page_png(self, page: int = 0, dpi: int = 150) -> bytes:
+        return self._cached_bytes(f"page-{page}-{dpi}.png", page, lambda: render_page_png(self.path, page=page, dpi=dpi))
+
+    def page_image(self, page: int = 0, *, max_side: int = 1600, fmt: str = "jpeg", quality: int = 80, dpi: int = 150) -> bytes:
+        """Página comprimida (JPEG/WebP) con el lado mayor acotado a ``max_side`` (modelos de visión).
+
+        Se deriva del PNG cacheado y se cachea junto a él.
+        """
+        ext = "webp" if fmt == "webp" else "jpg"
+        return self._cached_bytes(
+            f"page-{page}-{dpi}-{max_side}-q{quality}.{ext}",
+            page,
+            lambda: encode_page_image(self.page_png(page, dpi), max_side=max_side, fmt=fmt, quality=quality),
+        )
+
+    def _cached_bytes(self, name: str, page: int, produce: Any) -> bytes:
+        path = self.dir / name
+        try:
+            data = path.read_bytes()
+            os.utime(self.dir)
+            return data
+        except OSError:
+            pass
+        data = produce()
+        try:
+            self.dir.mkdir(parents=True, exist_ok=True)
+            _write_atomic(path, data)
+        except OSError:
+            logger.warning("[pdf_extract] no se pudo cachear la página %s de %s", page, self.sha256[:12])
+        return data
+
+    # ------------------------------ Disco ------------------------------
+    def _read_json(self, name: str) -> Optional[Dict[str, Any]]:
+        try:
+            data = json.loads((self.dir / name).read_text(encoding="utf-8"))
+            os.utime(self.dir)  # LRU por mtime
+            return data
+        except (OSError, ValueError):
+            return None
+
+    def _write_json(self, name: str, obj: Any) -> None:
+        try:
+            new_entry = not self.dir.exists()
+            self.dir.mkdir(parents=True, exist_ok=True)
+            _write_atomic(self.dir / name, json.dumps(obj, ensure_ascii=False).encode("utf-8"))
+            if new_entry:
+                prune(cache_root())
+        except OSError:
+            logger.warning("[pdf_extract] no se pudo escribir %s para %s", name, self.sha256[:12])
+
+
+def _extract_pages(path: Path) -> List[Dict[str, Any]]:
+    import pdfplumber  # type: ignore
+
+    pages: List[Dict[str, Any]] = []
+    with pdfplumber.open(str(path)) as pdf:
+        for page in pdf.pages:
+            # Palabras y tablas son opcionales: una página problemática no invalida el texto
+            try:
+                words = [
+                    {"text": w["text"], "x0": round(w["x0"], 2), "top": round(w["top"], 2), "x1": round(w["x1"], 2), "bottom": round(w["bottom"], 2)}
+                    for w in (page.extract_words() or [])
+                ]
+            except Exception:
+                words = []
+            try:
+                tables = page.extract_tables(table_settings={
+                    "vertical_strategy": "lines",
+                    "horizontal_strategy": "lines",
+                    "snap_tolerance": 5,
+                    "join_tolerance": 10,
+                }) or []
+            except Exception:
+                tables = []
+            pages.append({"text": page.extract_text() or "", "words": words, "tables": tables})
+    return pages
+
+
+def _camelot() -> Any:
+    # Algunos entornos elevan a error un CryptographyDeprecationWarning (ARC4) al importar camelot
+    import warnings
+    try:
+        from cryptography.utils import CryptographyDeprecationWarning as _CryDW  # type: ignore
+    except Exception:  # pragma: no cover
+        _CryDW = DeprecationWarning
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", category=_CryDW, message=r".*ARC4 has been moved.*")
+        import camelot  # type: ignore
+    return camelot
+
+
+def render_page_png(pdf_path: Path | str, page: int = 0, dpi: int = 150) -> bytes:
+    """Rasteriza una página: PyMuPDF → pdf2image → pdfplumber/PIL."""
+    try:
+        import fitz  # PyMuPDF
+        doc = fitz.open(str(pdf_path))
+        try:
+            pix = doc[page].get_pixmap(matrix=fitz.Matrix(dpi / 72, dpi / 72))
+            return pix.tobytes("png")
+        finally:
+            doc.close()
+    except ImportError:
+        pass
+    try:
+        from pdf2image import convert_from_path
+        images = convert_from_path(str(pdf_path), dpi=dpi, first_page=page + 1, last_page=page + 1)
+        if images:
+            buffer = io.BytesIO()
+            images[0].save(buffer, format="PNG")
+            return buffer.getvalue()
+    except ImportError:
+        pass
+    try:
+        import pdfplumber  # type: ignore
+        with pdfplumber.open(str(pdf_path)) as pdf:
+            if page < len(pdf.pages):
+                img = pdf.pages[page].to_image(resolution=dpi)
+                buffer = io.BytesIO()
+                img.original.save(buffer, format="PNG")
+                return buffer.getvalue()
+    except Exception:
+        pass
+    raise ValueError("No se pudo convertir el PDF a imagen. Instale PyMuPDF, pdf2image o pdfplumber.")
+
+
+def encode_page_image(png: bytes, *, max_side: int, fmt: str = "jpeg", quality: int = 80) -> bytes:
+    """Reescala (sin agrandar) y comprime una página rasterizada a JPEG o WebP."""
+    from PIL import Image
+
+    with Image.open(io.BytesIO(png)) as img:
+        img = img.convert("RGB")
+        img.thumbnail((max_side, max_side), Image.LANCZOS)
+        buffer = io.BytesIO()
+        if fmt == "webp":
+            img.save(buffer, format="WEBP", quality=quality, method=4)
+        else:
+            img.save(buffer, format="JPEG", quality=quality, optimize=True)
+        return buffer.getvalue()
+
+
+def open_document(path: Path | str, data: Optional[bytes] = None) -> PdfDocument:
+    """Documento cacheado para ``path`` (``data`` evita releer el archivo si ya se tiene)."""
+    path = Path(path)
+    if data is None:
+        data = path.read_bytes()
+    sha = hashlib.sha256(data).hexdigest()
+    with _lock:
+        doc = _memory.get(sha)
+        if doc is not None and doc.path.exists():
+            _memory.move_to_end(sha)
+            return doc
+        doc = PdfDocument(path, sha)
+        _memory[sha] = doc
+        while len(_memory) > _MEMORY_MAX:
+            _memory.popitem(last=False)
+    return doc
+
+
+def prune(root: Path, keep: int = _CACHE_MAX) -> int:
+    """Borra las entradas menos usadas por encima de ``keep``."""
+    try:
+        entries = sorted((d for d in root.iterdir() if d.is_dir()), key=lambda d: d.stat().st_mtime, reverse=True)
+    except OSError:
+        return 0
+    removed = 0
+    for d in entries[keep:]:
+        shutil.rmtree(d, ignore_errors=True)
+        removed += 1
+    return removed
+
+
+def clear_memory() -> None:
+    with _lock:
+        _memory.clear()
@@ -13,8 +13,9 @@ Objetivos:
 - Si falta `supplier_sku`, generar uno sintético (editable): `POP-YYYYMMDD-###`.
 
 Estrategia parsing:
-- EML: preferir parte HTML; fallback a texto plano.
-- HTML: buscar tablas con 2+ columnas; detectar encabezados típicos (Producto/Descripción, Cantidad, Precio/Total).
+- EML: se recorre en streaming (``mime_stream``); preferir parte HTML; fallback a texto plano.
+  Los adjuntos se escriben a disco sólo si se pide (``parse_pop_eml_stream``).
+- HTML: se lee con ``html.parser`` incremental (sin armar el DOM); buscar tablas con 2+ columnas; detectar encabezados típicos (Producto/Descripción, Cantidad, Precio/Total).
   - Si no hay encabezados claros, interpretar filas como: primera columna = título, alguna otra con número = cantidad y/o precio.
 - TEXT: buscar patrones con nombre + qty + precio. Fallback mínimo con título y qty=1.
 
@@ -24,9 +25,15 @@ Nota: Este parser es tolerante; es mejor extraer 80% y editar en la app que bloq
 from dataclasses import dataclass, field
 from datetime import datetime, date as _date
 from decimal import Decimal
-from typing import Any, List, Optional, Tuple, Dict
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Any, BinaryIO, List, Optional, Tuple, Dict
+import codecs
+import io
 import re
 
+from services.importers import mime_stream
+
 
 @dataclass
 class PopLine:
@@ -44,6 +51,8 @@ class PopParsed:
     remito_date: Optional[str] = None  # ISO
     lines: List[PopLine] = field(default_factory=list)
     debug: Dict[str, Any] = field(default_factory=dict)
+    message_id: Optional[str] = None  # header Message-ID (sólo .eml)
+    attachments: List[Dict[str, Any]] = field(default_factory=list)  # {filename, mime, size, path} escritos a disco
 
 
 def _norm_text(s: str) -> str:
@@ -118,42 +127,198 @@ def _extract_from_text_body(text: str) -> Optional[str]:
     return m.group(1) if m else None
 
 
-def _parse_eml(data: bytes) -> Tuple[str, Optional[str], str, str]:
-    """Devuelve (subject, date_iso?, best_body_html, best_body_text)."""
-    import email
-    from email import policy
-    msg = email.message_from_bytes(data, policy=policy.default)
-    subj = str(msg.get('Subject') or '')
-    dt_iso: Optional[str] = None
+class _HtmlScan(HTMLParser):
+    """Recolector incremental del HTML del mail (se alimenta por trozos con ``feed``).
+
+    Reproduce lo que usa :func:`_parse_html` sin armar el árbol completo:
+    filas de cada tabla (``tr`` descendientes, celdas ``td`` o si no ``th``),
+    textos de ``li`` y el texto plano "textish" (tags reemplazados por espacio).
+    """
+
+    _TRACKED = {'table', 'tr', 'td', 'th', 'li', 'script', 'style'}
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self._tables: List[List[Dict[str, list]]] = []
+        self._items: List[list] = []
+        self._open: List[Tuple[str, Any]] = []
+        self._text: List[str] = []
+        self._raw = 0
+        self.tables: List[List[List[str]]] = []
+        self.items: List[str] = []
+        self.textish = ''
+
+    @classmethod
+    def of(cls, html: str) -> "_HtmlScan":
+        scan = cls()
+        scan.feed(html)
+        scan.close()
+        return scan
+
+    def handle_starttag(self, tag: str, attrs: Any) -> None:
+        self._text.append(' ')
+        if tag not in self._TRACKED:
+            return
+        if tag == 'table':
+            node: Any = []
+            self._tables.append(node)
+        elif tag == 'tr':
+            node = {'td': [], 'th': []}
+            for kind, parent in self._open:
+                if kind == 'table':
+                    parent.append(node)
+        elif tag in ('td', 'th'):
+            node = []
+            for kind, parent in self._open:
+                if kind == 'tr':
+                    parent[tag].append(node)
+        elif tag == 'li':
+            node = []
+            self._items.append(node)
+        else:
+            node = None
+            self._raw += 1
+        self._open.append((tag, node))
+
+    def handle_startendtag(self, tag: str, attrs: Any) -> None:
+        self._text.append(' ')
+
+    def handle_endtag(self, tag: str) -> None:
+        self._text.append(' ')
+        if not any(kind == tag for kind, _ in self._open):
+            return
+        while self._open:
+            kind, _ = self._open.pop()
+            if kind in ('script', 'style'):
+                self._raw -= 1
+            if kind == tag:
+                break
+
+    def handle_data(self, data: str) -> None:
+        self._text.append(data)
+        if self._raw:
+            return
+        for kind, node in self._open:
+            if kind in ('td', 'th', 'li'):
+                node.append(data)
+
+    def handle_comment(self, data: str) -> None:
+        self._text.append(' ')
+
+    handle_decl = handle_pi = unknown_decl = handle_comment
+
+    def close(self) -> None:
+        super().close()
+        for rows in self._tables:
+            table = []
+            for row in rows:
+                cols = [_norm_text(' '.join(cell)) for cell in (row['td'] or row['th'])]
+                if cols and any(c for c in cols):
+                    table.append(cols)
+            self.tables.append(table)
+        self.items = [_norm_text(' '.join(item)) for item in self._items]
+        self.textish = ''.join(self._text)
+        self._tables, self._items, self._open, self._text = [], [], [], []
+
+
+class _TextSink:
+    """Decodifica por trozos (charset de la parte) hacia un parser o una lista."""
+
+    def __init__(self, charset: Optional[str], target: Any):
+        try:
+            self._dec = codecs.getincrementaldecoder(charset or 'utf-8')(errors='replace')
+        except LookupError:
+            self._dec = codecs.getincrementaldecoder('latin-1')()
+        self._target = target
+
+    def write(self, data: bytes) -> None:
+        text = self._dec.decode(data)
+        if text:
+            self._push(text)
+
+    def close(self) -> None:
+        tail = self._dec.decode(b'', final=True)
+        if tail:
+            self._push(tail)
+
+    def _push(self, text: str) -> None:
+        if isinstance(self._target, list):
+            self._target.append(text)
+        else:
+            self._target.feed(text)
+
+
+class _FileSink:
+    def __init__(self, path: Path, meta: Dict[str, Any]):
+        self._fh = open(path, 'wb')
+        self._meta = meta
+
+    def write(self, data: bytes) -> None:
+        self._fh.write(data)
+        self._meta['size'] += len(data)
+
+    def close(self) -> None:
+        self._fh.close()
+
+
+def _safe_attachment_name(name: str, index: int) -> str:
+    base = re.sub(r"[^A-Za-z0-9._-]+", "_", Path(name).name).strip('._') or 'adjunto'
+    return f"{index:02d}_{base[:100]}"
+
+
+def _read_eml(fh: BinaryIO, attachments_dir: Optional[Path] = None):
+    """Recorre el .eml en streaming.
+
+    Devuelve ``(headers, scan_html?, body_text, attachments)``: la primera parte HTML
+    pasa directo al :class:`_HtmlScan`, la primera de texto plano se acumula y, si se
+    indica ``attachments_dir``, los adjuntos se escriben a disco a medida que se leen.
+    """
+    scan: Optional[_HtmlScan] = None
+    text_parts: List[str] = []
+    state = {'text': False}
+    attachments: List[Dict[str, Any]] = []
+
+    def _handler(part: Any):
+        nonlocal scan
+        ctype = (part.get_content_type() or '').lower()
+        filename = part.get_filename()
+        if part.get_content_disposition() != 'attachment' and not filename:
+            if ctype == 'text/html' and scan is None:
+                scan = _HtmlScan()
+                return _TextSink(part.get_content_charset(), scan)
+            if ctype == 'text/plain' and not state['text']:
+                state['text'] = True
+                return _TextSink(part.get_content_charset(), text_parts)
+        # Adjuntos reales; las imágenes inline (logos del template) se descartan
+        attached = part.get_content_disposition() == 'attachment' or (filename and not ctype.startswith('image/'))
+        if attachments_dir is None or not attached:
+            return None
+        attachments_dir.mkdir(parents=True, exist_ok=True)
+        meta = {'filename': filename or f"adjunto.{ctype.split('/')[-1]}", 'mime': ctype, 'size': 0}
+        meta['path'] = str(attachments_dir / _safe_attachment_name(meta['filename'], len(attachments) + 1))
+        attachments.append(meta)
+        return _FileSink(Path(meta['path']), meta)
+
+    headers = mime_stream.walk(fh, _handler)
+    if scan is not None:
+        scan.close()
+    return headers, scan, ''.join(text_parts), attachments
+
+
+def _header_date(headers: Any) -> Optional[str]:
     try:
         from email.utils import parsedate_to_datetime
-        dd = parsedate_to_datetime(msg.get('Date')) if msg.get('Date') else None
+        dd = parsedate_to_datetime(headers.get('Date')) if headers.get('Date') else None
         if dd:
-            dt_iso = dd.date().isoformat()
+            return dd.date().isoformat()
     except Exception:
         pass
-    body_html = ""
-    body_text = ""
-    if msg.is_multipart():
-        for part in msg.walk():
-            ctype = (part.get_content_type() or '').lower()
-            if ctype == 'text/html' and not body_html:
-                body_html = part.get_content()
-            elif ctype == 'text/plain' and not body_text:
-                body_text = part.get_content()
-    else:
-        ctype = (msg.get_content_type() or '').lower()
-        if ctype == 'text/html':
-            body_html = msg.get_content()
-        else:
-            body_text = msg.get_content()
-    return subj, dt_iso, body_html, body_text
+    return None
 
 
-def _parse_html(body_html: str, dbg: Dict[str, Any]) -> List[PopLine]:
-    from bs4 import BeautifulSoup
-    soup = BeautifulSoup(body_html, 'html.parser')
-    tables = soup.find_all('table')
+def _parse_html(body_html: str | _HtmlScan, dbg: Dict[str, Any]) -> List[PopLine]:
+    scan = _HtmlScan.of(body_html) if isinstance(body_html, str) else body_html
+    tables = scan.tables
     lines: List[PopLine] = []
     dbg.setdefault('html_tables', len(tables))
     best_rows: List[List[str]] = []
@@ -173,12 +338,7 @@ def _parse_html(body_html: str, dbg: Dict[str, Any]) -> List[PopLine]:
     best_score: int = -1
     best_meta: Dict[str, Any] = {}
     # Elegimos la tabla con más filas y columnas >= 2
-    for t in tables:
-        rows = []
-        for tr in t.find_all('tr'):
-            cols = [_norm_text(td.get_text(' ')) for td in (tr.find_all('td') or tr.find_all('th'))]
-            if cols and any(c for c in cols):
-                rows.append(cols)
+    for rows in tables:
         # preferimos la tabla con más filas, y como desempate, la que tenga encabezados más "comerciales"
         if rows and len(rows[0]) >= 2:
             def header_score(rr0: List[str]) -> int:
@@ -212,8 +372,7 @@ def _parse_html(body_html: str, dbg: Dict[str, Any]) -> List[PopLine]:
         dbg['table_selected'] = best_meta
     if not best_rows:
         # Como fallback, buscar listados por <li>
-        for li in soup.find_all('li'):
-            txt = _norm_text(li.get_text(' '))
+        for txt in scan.items:
             if len(txt) >= 4:
                 lines.append(_parse_line_from_text(txt))
         return [ln for ln in lines if ln.title]
@@ -440,26 +599,33 @@ def _parse_text(body_text: str, dbg: Dict[str, Any]) -> List[PopLine]:
 
 
 def parse_pop_email(source: bytes | str, kind: str = 'eml') -> PopParsed:
-    dbg: Dict[str, Any] = {}
-    subject = ''
-    rem_date: Optional[str] = None
-    body_html = ''
-    body_text = ''
     if kind == 'eml':
-        subject, rem_date, body_html, body_text = _parse_eml(source if isinstance(source, (bytes, bytearray)) else str(source).encode('utf-8'))
-    elif kind == 'html':
-        body_html = str(source)
-    else:
-        body_text = str(source)
+        data = source if isinstance(source, (bytes, bytearray)) else str(source).encode('utf-8')
+        return parse_pop_eml_stream(io.BytesIO(data))
+    if kind == 'html':
+        return _build_parsed('', None, _HtmlScan.of(str(source)), '')
+    return _build_parsed('', None, None, str(source))
+
+
+def parse_pop_eml_stream(fh: BinaryIO, attachments_dir: Optional[Path] = None) -> PopParsed:
+    """Parsea un .eml leyéndolo en streaming (p.ej. desde el spool del buzón).
+
+    Con ``attachments_dir`` los adjuntos se guardan ahí y quedan listados en
+    ``PopParsed.attachments``; sin él se descartan sin cargarlos en memoria.
+    """
+    headers, scan, body_text, attachments = _read_eml(fh, attachments_dir)
+    parsed = _build_parsed(str(headers.get('Subject') or ''), _header_date(headers), scan, body_text)
+    parsed.message_id = (str(headers.get('Message-ID') or '').strip() or None)
+    parsed.attachments = attachments
+    return parsed
+
+
+def _build_parsed(subject: str, rem_date: Optional[str], scan: Optional[_HtmlScan], body_text: str) -> PopParsed:
+    dbg: Dict[str, Any] = {}
+    # Texto "plano" del HTML (tags reemplazados por espacio) para heurísticas: Pedido N, conteo de "$" y fallback
+    text_from_html = scan.textish if scan is not None else ''
     remito_number, _ = _extract_from_subject(subject)
     lines: List[PopLine] = []
-    # Helper: texto "plano" para heurísticas (contar "$" y fallback)
-    def _to_textish(html: str) -> str:
-        try:
-            return re.sub(r"<[^>]+>", " ", html)
-        except Exception:
-            return html
-
     # Fallback por signos de $: cada línea con $ es probable línea de producto; al total restamos 3 (Subtotal, Total, Ahorro)
     def _fallback_parse_by_dollars(textish: str) -> List[PopLine]:
         out: List[PopLine] = []
@@ -473,22 +639,15 @@ def parse_pop_email(source: bytes | str, kind: str = 'eml') -> PopParsed:
                     seen.add(ln.title)
         return out
 
-    if body_html:
-        lines = _parse_html(body_html, dbg)
+    if scan is not None and text_from_html:
+        lines = _parse_html(scan, dbg)
         if not remito_number:
-            # Quick text extraction from HTML to find Pedido 123456
-            try:
-                # Evitar dependencia directa si no está bs4; usar regex para quitar tags
-                textish = _to_textish(body_html)
-            except Exception:
-                textish = body_html
-            remito_number = _extract_from_text_body(_norm_text(textish)) or remito_number
+            remito_number = _extract_from_text_body(_norm_text(text_from_html)) or remito_number
     if not lines and body_text:
         lines = _parse_text(body_text, dbg)
     if not remito_number and body_text:
         remito_number = _extract_from_text_body(_norm_text(body_text)) or remito_number
     # Heurística de conteo por símbolo $ (Subtotal/Total/Ahorro consumen 3)
-    text_from_html = _to_textish(body_html) if body_html else ''
     html_dollar_signs = (text_from_html or '').count('$')
     text_dollar_signs = (body_text or '').count('$') if body_text else 0
     dollar_signs = max(html_dollar_signs, text_dollar_signs)
@@ -542,4 +701,4 @@ def parse_pop_email(source: bytes | str, kind: str = 'eml') -> PopParsed:
         if not ln.supplier_sku:
             ln.supplier_sku = f"{base}{seq:03d}"
         seq += 1
-    return PopParsed(remito_number=remito_number, remito_date=rem_date, lines=lines, debug=dbg | {'subject': subject, 'has_html': bool(body_html), 'has_text': bool(body_text)})
+    return PopParsed(remito_number=remito_number, remito_date=rem_date, lines=lines, debug=dbg | {'subject': subject, 'has_html': bool(text_from_html), 'has_text': bool(body_text)})
@@ -0,0 +1,456 @@
+# NG-HEADER: Nombre de archivo: pop_mailbox.py
+# NG-HEADER: Ubicación: services/importers/pop_mailbox.py
+# NG-HEADER: Descripción: Ingesta incremental de emails de proveedor desde un buzón POP3/IMAP a compras
+# NG-HEADER: Lineamientos: Ver AGENTS.md
+"""Ingesta incremental del buzón donde llegan los pedidos de POP.
+
+- Incremental: cada UID (UIDL en POP3, UID + UIDVALIDITY en IMAP) procesado queda
+  en ``supplier_mail_messages``; la corrida siguiente sólo descarga los nuevos
+  (y reintenta los que fallaron). Antes de bajar el cuerpo se leen sólo los
+  headers, así que un Message-ID ya importado o un remitente ajeno no se descargan.
+- Streaming: el mensaje se escribe al spool en disco a medida que llega (RETR
+  línea a línea / ``BODY.PEEK[]`` por trozos) y se parsea desde el archivo
+  (:func:`~services.importers.pop_email.parse_pop_eml_stream`): los adjuntos van
+  directo a disco, nunca se arma el mensaje completo en memoria.
+- Concurrente: la conexión descarga en serie (un socket no admite comandos
+  cruzados) mientras ``POP_MAIL_CONCURRENCY`` mensajes se parsean en el pool
+  (``POP_MAIL_EXECUTOR`` process|thread); el alta en DB se serializa sobre una
+  única sesión, un commit por mensaje.
+- En background: ``POST /purchases/import/pop-mailbox`` encola la corrida (:func:`submit`)
+  y responde con un ``job_id``; el progreso (los mismos contadores del resumen) se
+  consulta en ``GET /purchases/import/pop-mailbox/jobs/{job_id}`` desde cualquier
+  worker (``services.job_registry``).
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import imaplib
+import logging
+import os
+import poplib
+import re
+import shutil
+import uuid
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from email import policy
+from email.parser import BytesHeaderParser
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.models import SupplierMailMessage
+from services.importers.pop_email import PopParsed, parse_pop_eml_stream
+from services.job_registry import JobRegistry
+from services.purchases.pop_import import create_pop_purchase
+
+logger = logging.getLogger("growen")
+
+_CONCURRENCY = max(1, int(os.getenv("POP_MAIL_CONCURRENCY", "4") or 4))
+_EXECUTOR_KIND = os.getenv("POP_MAIL_EXECUTOR", "process").lower()
+_FETCH_CHUNK = max(4096, int(os.getenv("POP_MAIL_FETCH_CHUNK", str(1024 * 1024)) or 1024 * 1024))
+_HEADER_BATCH = 200
+_TIMEOUT = 60
+
+_HEADERS = BytesHeaderParser(policy=policy.default)
+
+
+class MailboxError(Exception):
+    """Error de conexión o protocolo con el servidor de correo."""
+
+
+@dataclass
+class MailboxConfig:
+    protocol: str  # imap | pop3
+    host: str
+    port: int
+    user: str
+    password: str
+    ssl: bool = True
+    folder: str = "INBOX"
+    sender: Optional[str] = None  # filtro por subcadena del From (p.ej. "@pop.com.ar")
+
+    @classmethod
+    def from_env(cls) -> Optional["MailboxConfig"]:
+        host = os.getenv("POP_MAIL_HOST", "").strip()
+        if not host:
+            return None
+        protocol = os.getenv("POP_MAIL_PROTOCOL", "imap").strip().lower()
+        use_ssl = os.getenv("POP_MAIL_SSL", "1").strip().lower() not in ("0", "false", "no")
+        default_port = {("imap", True): 993, ("imap", False): 143, ("pop3", True): 995, ("pop3", False): 110}
+        return cls(
+            protocol=protocol,
+            host=host,
+            port=int(os.getenv("POP_MAIL_PORT", "0") or 0) or default_port.get((protocol, use_ssl), 993),
+            user=os.getenv("POP_MAIL_USER", ""),
+            password=os.getenv("POP_MAIL_PASSWORD", ""),
+            ssl=use_ssl,
+            folder=os.getenv("POP_MAIL_FOLDER", "INBOX") or "INBOX",
+            sender=os.getenv("POP_MAIL_FROM", "").strip() or None,
+        )
+
+
+def spool_root() -> Path:
+    return Path(os.getenv("POP_MAIL_SPOOL_DIR", str(Path("data") / "purchases" / "_mail")))
+
+
+@dataclass
+class MailRef:
+    uid: str
+    message_id: Optional[str]
+    sender: str
+    subject: str
+    size: int = 0
+
+
+def _ref(uid: str, raw_headers: bytes, size: int) -> MailRef:
+    h = _HEADERS.parsebytes(raw_headers)
+    return MailRef(
+        uid=uid,
+        message_id=str(h.get("Message-ID") or "").strip() or None,
+        sender=str(h.get("From") or ""),
+        subject=str(h.get("Subject") or ""),
+        size=size,
+    )
+
+
+class _Pop3Source:
+    """Buzón POP3: UIDL para el estado incremental, TOP para headers y RETR en streaming."""
+
+    def __init__(self, cfg: MailboxConfig):
+        cls = poplib.POP3_SSL if cfg.ssl else poplib.POP3
+        self.conn = cls(cfg.host, cfg.port, timeout=_TIMEOUT)
+        self.conn.user(cfg.user)
+        self.conn.pass_(cfg.password)
+        self.key = f"pop3://{cfg.user}@{cfg.host}"
+        self._num: Dict[str, int] = {}
+        self._size: Dict[int, int] = {}
+
+    def uids(self) -> List[str]:
+        for line in self.conn.uidl()[1]:
+            num, uid = line.decode("ascii", "replace").split(None, 1)
+            self._num[uid.strip()] = int(num)
+        for line in self.conn.list()[1]:
+            num, size = line.split()[:2]
+            self._size[int(num)] = int(size)
+        return list(self._num)
+
+    def headers(self, uids: List[str]) -> List[MailRef]:
+        out = []
+        for uid in uids:
+            num = self._num[uid]
+            out.append(_ref(uid, b"\r\n".join(self.conn.top(num, 0)[1]) + b"\r\n", self._size.get(num, 0)))
+        return out
+
+    def fetch(self, ref: MailRef, path: Path) -> None:
+        # RETR línea a línea (poplib.retr acumula el mensaje completo en una lista)
+        self.conn._putcmd(f"RETR {self._num[ref.uid]}")
+        self.conn._getresp()
+        with open(path, "wb") as fh:
+            while True:
+                line, _ = self.conn._getline()
+                if line == b".":
+                    break
+                fh.write((line[1:] if line.startswith(b"..") else line) + b"\r\n")
+
+    def close(self) -> None:
+        try:
+            self.conn.quit()
+        except Exception:
+            pass
+
+
+class _ImapSource:
+    """Buzón IMAP de sólo lectura: UID SEARCH, headers en lote y cuerpo por trozos (``BODY.PEEK[]<off.n>``)."""
+
+    def __init__(self, cfg: MailboxConfig):
+        cls = imaplib.IMAP4_SSL if cfg.ssl else imaplib.IMAP4
+        self.conn = cls(cfg.host, cfg.port, timeout=_TIMEOUT)
+        self.conn.login(cfg.user, cfg.password)
+        typ, _ = self.conn.select(cfg.folder, readonly=True)
+        if typ != "OK":
+            raise MailboxError(f"No se pudo abrir la carpeta {cfg.folder}")
+        validity = (self.conn.response("UIDVALIDITY")[1] or [b""])[0] or b""
+        self.key = f"imap://{cfg.user}@{cfg.host}/{cfg.folder};UIDVALIDITY={validity.decode('ascii', 'replace')}"
+
+    def _check(self, typ: str, what: str) -> None:
+        if typ != "OK":
+            raise MailboxError(f"IMAP {what} falló ({typ})")
+
+    def uids(self) -> List[str]:
+        typ, data = self.conn.uid("SEARCH", None, "ALL")
+        self._check(typ, "SEARCH")
+        return [u.decode("ascii") for u in (data[0] or b"").split()]
+
+    def headers(self, uids: List[str]) -> List[MailRef]:
+        out: List[MailRef] = []
+        for i in range(0, len(uids), _HEADER_BATCH):
+            chunk = ",".join(uids[i:i + _HEADER_BATCH])
+            typ, data = self.conn.uid("FETCH", chunk, "(RFC822.SIZE BODY.PEEK[HEADER.FIELDS (MESSAGE-ID FROM SUBJECT)])")
+            self._check(typ, "FETCH headers")
+            for item in data:
+                if not isinstance(item, tuple):
+                    continue
+                meta = item[0].decode("ascii", "replace")
+                uid = re.search(r"UID (\d+)", meta)
+                size = re.search(r"RFC822\.SIZE (\d+)", meta)
+                if uid:
+                    out.append(_ref(uid.group(1), item[1], int(size.group(1)) if size else 0))
+        return out
+
+    def fetch(self, ref: MailRef, path: Path) -> None:
+        offset = 0
+        with open(path, "wb") as fh:
+            while True:
+                typ, data = self.conn.uid("FETCH", ref.uid, f"(BODY.PEEK[]<{offset}.{_FETCH_CHUNK}>)")
+                self._check(typ, "FETCH body")
+                part = b"".join(item[1] for item in data if isinstance(item, tuple))
+                fh.write(part)
+                offset += len(part)
+                if len(part) < _FETCH_CHUNK or (ref.size and offset >= ref.size):
+                    break
+
+    def close(self) -> None:
+        try:
+            self.conn.logout()
+        except Exception:
+            pass
+
+
+def open_mailbox(cfg: MailboxConfig):
+    try:
+        if cfg.protocol == "pop3":
+            return _Pop3Source(cfg)
+        if cfg.protocol == "imap":
+            return _ImapSource(cfg)
+    except (OSError, poplib.error_proto, imaplib.IMAP4.error) as e:
+        raise MailboxError(f"No se pudo conectar a {cfg.host}:{cfg.port} ({cfg.protocol}): {e}") from e
+    raise MailboxError(f"Protocolo de correo no soportado: {cfg.protocol}")
+
+
+def _parse_spooled(path: str, attachments_dir: str) -> PopParsed:
+    """Parsea un mensaje del spool. Corre en el pool (debe ser picklable)."""
+    with open(path, "rb") as fh:
+        return parse_pop_eml_stream(fh, Path(attachments_dir))
+
+
+def _make_executor(workers: int) -> Executor:
+    if _EXECUTOR_KIND == "process":
+        import multiprocessing
+
+        return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pop-mail")
+
+
+async def ingest_mailbox(
+    db: AsyncSession,
+    supplier_id: int,
+    cfg: MailboxConfig,
+    *,
+    limit: Optional[int] = None,
+    concurrency: Optional[int] = None,
+    stats: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Importa como compras los mensajes nuevos del buzón.
+
+    ``stats`` (opcional) se actualiza en el lugar durante la corrida: es el progreso
+    de los jobs en background.
+
+    Returns:
+        Resumen con ``seen`` (UIDs en el buzón), ``new``, ``imported``,
+        ``duplicates`` (remito ya existente), ``skipped`` y ``errors``.
+    """
+    source = await asyncio.to_thread(open_mailbox, cfg)
+    stats = stats if stats is not None else {}
+    stats.update({"mailbox": source.key, "seen": 0, "new": 0, "imported": 0, "duplicates": 0, "skipped": 0, "errors": 0})
+    spool = spool_root() / hashlib.sha1(f"{supplier_id}:{source.key}".encode()).hexdigest()[:16]
+    workers = max(1, concurrency or _CONCURRENCY)
+    executor: Optional[Executor] = None
+    try:
+        uids = await asyncio.to_thread(source.uids)
+        stats["seen"] = len(uids)
+        rows = {
+            r.uid: r
+            for r in (
+                await db.scalars(
+                    select(SupplierMailMessage).where(
+                        SupplierMailMessage.supplier_id == supplier_id, SupplierMailMessage.mailbox == source.key
+                    )
+                )
+            ).all()
+        }
+        new = [u for u in uids if u not in rows or rows[u].status == "error"]
+        if limit:
+            new = new[:limit]
+        stats["new"] = len(new)
+        if not new:
+            return stats
+        seen_ids = set(
+            (
+                await db.scalars(
+                    select(SupplierMailMessage.message_id).where(
+                        SupplierMailMessage.supplier_id == supplier_id,
+                        SupplierMailMessage.status == "done",
+                        SupplierMailMessage.message_id.is_not(None),
+                    )
+                )
+            ).all()
+        )
+        refs = await asyncio.to_thread(source.headers, new)
+        db_lock = asyncio.Lock()
+
+        # Sin leer atributos de las filas: tras un rollback quedan expiradas (lazy load no es posible en async)
+        attempts = {uid: row.attempts or 0 for uid, row in rows.items()}
+
+        async def record(ref: MailRef, status: str, counter: str, detail: Optional[str] = None, purchase_id: Optional[int] = None) -> None:
+            row = rows.get(ref.uid)
+            if row is None:
+                row = rows[ref.uid] = SupplierMailMessage(supplier_id=supplier_id, mailbox=source.key, uid=ref.uid)
+                db.add(row)
+            attempts[ref.uid] = attempts.get(ref.uid, 0) + 1
+            row.message_id = ref.message_id[:300] if ref.message_id else None
+            row.status = status
+            row.detail = detail[:300] if detail else None
+            row.purchase_id = purchase_id
+            row.attempts = attempts[ref.uid]
+            stats[counter] += 1
+            await db.commit()
+
+        todo: List[MailRef] = []
+        async with db_lock:
+            for ref in refs:
+                if cfg.sender and cfg.sender.lower() not in ref.sender.lower():
+                    await record(ref, "skipped", "skipped", f"remitente ajeno: {ref.sender}")
+                elif ref.message_id and ref.message_id in seen_ids:
+                    await record(ref, "skipped", "skipped", "Message-ID ya importado")
+                else:
+                    if ref.message_id:
+                        seen_ids.add(ref.message_id)
+                    todo.append(ref)
+        if not todo:
+            return stats
+
+        spool.mkdir(parents=True, exist_ok=True)
+        executor = _make_executor(workers)
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=workers * 2)
+
+        async def produce() -> None:
+            try:
+                for ref in todo:
+                    path = spool / f"{hashlib.sha1(ref.uid.encode()).hexdigest()[:20]}.eml"
+                    try:
+                        await asyncio.to_thread(source.fetch, ref, path)
+                    except Exception as e:
+                        logger.warning("[pop-mail] descarga fallida uid=%s: %s", ref.uid, e)
+                        async with db_lock:
+                            await record(ref, "error", "errors", f"descarga: {e}")
+                        path.unlink(missing_ok=True)
+                        continue
+                    await queue.put((ref, path))
+            finally:
+                for _ in range(workers):
+                    await queue.put(None)
+
+        async def consume() -> None:
+            while (item := await queue.get()) is not None:
+                ref, path = item
+                attachments = path.with_suffix("")
+                try:
+                    parsed = await loop.run_in_executor(executor, _parse_spooled, str(path), str(attachments))
+                    async with db_lock:
+                        try:
+                            if not parsed.lines:
+                                await record(ref, "skipped", "skipped", "sin líneas de compra")
+                                continue
+                            result = await create_pop_purchase(
+                                db,
+                                supplier_id,
+                                parsed,
+                                remito_fallback=f"MAIL-{ref.uid}"[:64],
+                                eml=(f"{path.stem}.eml", "message/rfc822", path),
+                                audit_meta={"source": "mailbox", "mailbox": source.key, "uid": ref.uid, "message_id": ref.message_id},
+                            )
+                            if result.get("duplicate"):
+                                await record(ref, "done", "duplicates", "remito ya importado", result["purchase_id"])
+                            else:
+                                await record(ref, "done", "imported", purchase_id=result["purchase_id"])
+                        except Exception:
+                            await db.rollback()
+                            raise
+                except Exception as e:
+                    logger.warning("[pop-mail] mensaje uid=%s no importado: %s", ref.uid, e)
+                    async with db_lock:
+                        await record(ref, "error", "errors", str(e) or type(e).__name__)
+                finally:
+                    path.unlink(missing_ok=True)
+                    shutil.rmtree(attachments, ignore_errors=True)
+
+        await asyncio.gather(produce(), *(consume() for _ in range(workers)))
+        return stats
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=False)
+        await asyncio.to_thread(source.close)
+
+
+# ------------------------------ Jobs ------------------------------
+@dataclass
+class MailboxJob:
+    id: str
+    supplier_id: int
+    status: str = "queued"  # queued | running | done | error
+    stats: Dict[str, Any] = field(default_factory=dict)
+    created_at: str = field(default_factory=lambda: datetime.utcnow().isoformat())
+    finished_at: Optional[str] = None
+    status_code: Optional[int] = None
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+_REGISTRY: JobRegistry[MailboxJob] = JobRegistry("pop_mailbox")
+
+
+def submit(supplier_id: int, cfg: MailboxConfig, *, limit: Optional[int] = None) -> MailboxJob:
+    """Encola una corrida de :func:`ingest_mailbox` (con su propia sesión de DB).
+
+    Si este proceso ya tiene una corrida activa para el proveedor devuelve esa misma.
+    """
+    for active in _REGISTRY.active():
+        if active.supplier_id == supplier_id:
+            return active
+    job = MailboxJob(id=uuid.uuid4().hex[:12], supplier_id=supplier_id)
+    return _REGISTRY.submit(job, _run(job, cfg, limit))
+
+
+async def wait(job_id: str) -> Optional[MailboxJob]:
+    return await _REGISTRY.wait(job_id)
+
+
+async def job_status(job_id: str) -> Optional[Dict[str, Any]]:
+    """Estado del job aunque lo esté ejecutando otro worker."""
+    return await _REGISTRY.status(job_id)
+
+
+async def _run(job: MailboxJob, cfg: MailboxConfig, limit: Optional[int]) -> None:
+    from db.session import SessionLocal
+
+    try:
+        job.status = "running"
+        async with SessionLocal() as db:
+            await ingest_mailbox(db, job.supplier_id, cfg, limit=limit, stats=job.stats)
+        job.status = "done"
+    except MailboxError as e:
+        job.status, job.status_code, job.error = "error", 502, str(e)
+    except Exception:
+        logger.exception("[pop-mail] job %s falló (supplier_id=%s)", job.id, job.supplier_id)
+        job.status, job.status_code = "error", 500
+        job.error = "No se pudo procesar el buzón; revisá backend.log para más detalles"
+    finally:
+        job.finished_at = datetime.utcnow().isoformat()
@@ -0,0 +1,295 @@
+#!/usr/bin/env python
+# NG-HEADER: Nombre de archivo: remito_jobs.py
+# NG-HEADER: Ubicación: services/importers/remito_jobs.py
+# NG-HEADER: Descripción: Parsing de remitos PDF (pipeline + OCR + IA) como job en un pool de workers
+# NG-HEADER: Lineamientos: Ver AGENTS.md
+"""Importación de remitos PDF fuera del event loop.
+
+``parse_remito`` (pdfplumber, Camelot, OCR) y el fallback IA son síncronos y
+pueden tardar decenas de segundos con un remito escaneado. El endpoint
+``POST /purchases/import/santaplanta`` encola el parsing en un pool
+(``IMPORT_PDF_EXECUTOR=process|thread``, ``IMPORT_PDF_WORKERS``) y responde con un
+``job_id``; el progreso se consulta con ``GET /purchases/import/jobs/{job_id}``
+(estado persistido por ``services.job_registry``, visible desde cualquier worker).
+
+El progreso sale de las mismas etapas (``stage``) que después se guardan en
+``ImportLog``: cada evento emitido por el pipeline se reenvía al proceso de la
+API (cola compartida en modo ``process``). ``IMPORT_OCR_CONCURRENCY`` limita los
+OCR simultáneos entre todos los workers para no sobresuscribir CPUs.
+
+Este módulo lo importan los procesos del pool: sólo dependencias livianas arriba.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from services.importers.santaplanta_pipeline import ParsedResult, parse_remito, set_ocr_gate
+from services.job_registry import JobRegistry
+
+logger = logging.getLogger("growen")
+
+_EXECUTOR_KIND = os.getenv("IMPORT_PDF_EXECUTOR", "process").lower()
+_WORKERS = max(1, int(os.getenv("IMPORT_PDF_WORKERS", "2") or 2))
+_OCR_CONCURRENCY = max(1, int(os.getenv("IMPORT_OCR_CONCURRENCY", "1") or 1))
+_JOBS_MAX = 50
+_EVENTS_KEPT = 20
+
+# Avance aproximado por etapa del pipeline (mismas etapas que ImportLog)
+STAGE_PROGRESS = {
+    "start": 5,
+    "header_extract": 10,
+    "header": 15,
+    "footer": 20,
+    "pdfplumber": 30,
+    "camelot": 45,
+    "ocr": 60,
+    "postprocess": 70,
+    "fallback": 75,
+    "multiline_fallback": 75,
+    "validation": 82,
+    "summary": 85,
+    "end": 88,
+    "ai": 90,
+}
+
+
+class ImportRejected(Exception):
+    """Rechazo de negocio al persistir (duplicado, sin líneas): se informa con su código HTTP."""
+
+    def __init__(self, status_code: int, detail: Any):
+        super().__init__(str(detail))
+        self.status_code = status_code
+        self.detail = detail
+
+
+@dataclass
+class RemitoJob:
+    id: str
+    correlation_id: str
+    supplier_id: int
+    filename: str
+    status: str = "queued"  # queued | running | done | error
+    stage: str = "queued"
+    progress: int = 0
+    events_count: int = 0
+    events: List[Dict[str, Any]] = field(default_factory=list)
+    created_at: str = field(default_factory=lambda: datetime.utcnow().isoformat())
+    finished_at: Optional[str] = None
+    status_code: Optional[int] = None
+    error: Any = None
+    result: Optional[Dict[str, Any]] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+_REGISTRY: JobRegistry[RemitoJob] = JobRegistry("remito_import", max_local=_JOBS_MAX)
+_executor: Optional[Executor] = None
+_event_queue: Any = None
+_event_thread: Optional[threading.Thread] = None
+
+# En cada worker: a dónde mandar los eventos (cola al proceso de la API o directo en modo thread)
+_event_sink: Optional[Callable[[str, Dict[str, Any]], None]] = None
+
+
+# ------------------------------ Worker ------------------------------
+def _init_worker(queue: Any, ocr_gate: Any) -> None:
+    global _event_sink
+    _event_sink = lambda job_id, ev: queue.put((job_id, ev))  # noqa: E731
+    set_ocr_gate(ocr_gate)
+
+
+def parse_with_fallback(
+    pdf_path: Path,
+    *,
+    correlation_id: str,
+    force_ocr: bool = False,
+    debug: bool = False,
+    on_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+    layout_hint: Optional[str] = None,
+) -> ParsedResult:
+    """Pipeline clásico + fallback IA (sin líneas o baja confianza). Nunca lanza por la IA."""
+    res = parse_remito(
+        pdf_path,
+        correlation_id=correlation_id,
+        use_ocr_auto=True,
+        force_ocr=force_ocr,
+        debug=debug,
+        on_event=on_event,
+        layout_hint=layout_hint,
+    )
+    try:
+        from agent_core.config import settings as _st
+        low_conf = False
+        if res.lines and hasattr(res, 'classic_confidence'):
+            try:
+                low_conf = res.classic_confidence < _st.import_ai_classic_min_confidence
+            except Exception:
+                low_conf = False
+        if (not res.lines or low_conf) and _st.import_ai_enabled:
+            from services.importers.ai_fallback import run_ai_fallback, merge_ai_lines
+            text_excerpt = (getattr(res, 'text_excerpt', None) or getattr(res, 'debug', {}).get('text_excerpt') or "")
+            ai_result = run_ai_fallback(
+                correlation_id=correlation_id,
+                text_excerpt=text_excerpt,
+                classic_lines_hint=len(res.lines or []),
+                classic_confidence=getattr(res, 'classic_confidence', None),
+            )
+            # Añadir eventos AI al final
+            for ev in ai_result.events:
+                res.events.append(ev)
+            if ai_result.ok and ai_result.payload:
+                merged, stats = merge_ai_lines(res.lines or [], ai_result.payload, _st.import_ai_min_confidence)
+                res.lines = merged
+                res.events.append({"level": "INFO", "stage": "ai", "event": "merged", "details": stats})
+            else:
+                res.events.append({"level": "INFO", "stage": "ai", "event": "no_data", "details": {"reason": ai_result.error}})
+    except Exception as _ai_e:  # No debe abortar importación
+        try:
+            res.events.append({"level": "WARN", "stage": "ai", "event": "exception", "details": {"error": str(_ai_e)}})
+        except Exception:
+            pass
+    # La lista con callback no es serializable: devolver una lista común
+    res.events = list(res.events)
+    return res
+
+
+def _parse_job(job_id: str, pdf_path: str, correlation_id: str, force_ocr: bool, debug: bool, layout_hint: Optional[str]) -> ParsedResult:
+    sink = _event_sink
+
+    def _on_event(ev: Dict[str, Any]) -> None:
+        if sink is not None:
+            sink(job_id, {"level": ev.get("level"), "stage": ev.get("stage"), "event": ev.get("event")})
+
+    return parse_with_fallback(
+        Path(pdf_path), correlation_id=correlation_id, force_ocr=force_ocr, debug=debug, on_event=_on_event, layout_hint=layout_hint
+    )
+
+
+# ------------------------------ Pool ------------------------------
+def _record_event(job_id: str, ev: Dict[str, Any]) -> None:
+    job = _REGISTRY.get(job_id)
+    # Eventos que llegan tarde por la cola no pisan la etapa de persistencia
+    if job is None or job.progress >= 95:
+        return
+    stage = str(ev.get("stage") or "")
+    job.stage = stage or job.stage
+    job.progress = max(job.progress, STAGE_PROGRESS.get(stage, job.progress))
+    job.events_count += 1
+    job.events.append(ev)
+    del job.events[:-_EVENTS_KEPT]
+
+
+def _drain_events(queue: Any) -> None:
+    while True:
+        item = queue.get()
+        if item is None:
+            return
+        try:
+            _record_event(*item)
+        except Exception:
+            logger.exception("[remito] evento de progreso inválido")
+
+
+def _get_executor() -> Executor:
+    global _executor, _event_queue, _event_thread, _event_sink
+    if _executor is None:
+        if _EXECUTOR_KIND == "process":
+            import multiprocessing
+
+            # spawn: el proceso de la API tiene threads (logging, pools); fork no es seguro
+            ctx = multiprocessing.get_context("spawn")
+            _event_queue = ctx.Queue()
+            _event_thread = threading.Thread(target=_drain_events, args=(_event_queue,), name="remito-events", daemon=True)
+            _event_thread.start()
+            _executor = ProcessPoolExecutor(
+                max_workers=_WORKERS,
+                mp_context=ctx,
+                initializer=_init_worker,
+                initargs=(_event_queue, ctx.BoundedSemaphore(_OCR_CONCURRENCY)),
+            )
+        else:
+            _event_sink = _record_event
+            set_ocr_gate(threading.BoundedSemaphore(_OCR_CONCURRENCY))
+            _executor = ThreadPoolExecutor(max_workers=_WORKERS, thread_name_prefix="remito-parse")
+    return _executor
+
+
+def shutdown_executor() -> None:
+    global _executor, _event_queue, _event_thread
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+    if _event_queue is not None:
+        _event_queue.put(None)
+        _event_queue = None
+        _event_thread = None
+
+
+# ------------------------------ Jobs ------------------------------
+def get_job(job_id: str) -> Optional[RemitoJob]:
+    return _REGISTRY.get(job_id)
+
+
+async def job_status(job_id: str) -> Optional[Dict[str, Any]]:
+    """Estado del job aunque lo esté ejecutando otro worker."""
+    return await _REGISTRY.status(job_id)
+
+
+def submit(
+    pdf_path: Path,
+    *,
+    supplier_id: int,
+    filename: str,
+    correlation_id: str,
+    force_ocr: bool,
+    debug: bool,
+    persist: Callable[[ParsedResult], Awaitable[Dict[str, Any]]],
+    layout_hint: Optional[str] = None,
+) -> RemitoJob:
+    """Encola el parsing; ``persist`` (en el event loop) crea la compra y devuelve la respuesta.
+
+    ``persist`` lanza :class:`ImportRejected` para rechazos esperables (409/422).
+    ``layout_hint`` es la etapa del perfil de layout del proveedor.
+    """
+    job = RemitoJob(id=uuid.uuid4().hex[:12], correlation_id=correlation_id, supplier_id=supplier_id, filename=filename)
+    return _REGISTRY.submit(job, _run(job, pdf_path, force_ocr, debug, persist, layout_hint))
+
+
+async def wait(job_id: str) -> Optional[RemitoJob]:
+    return await _REGISTRY.wait(job_id)
+
+
+async def _run(
+    job: RemitoJob,
+    pdf_path: Path,
+    force_ocr: bool,
+    debug: bool,
+    persist: Callable[[ParsedResult], Awaitable[Dict[str, Any]]],
+    layout_hint: Optional[str] = None,
+) -> None:
+    try:
+        job.status, job.stage = "running", "parsing"
+        res = await asyncio.get_running_loop().run_in_executor(
+            _get_executor(), _parse_job, job.id, str(pdf_path), job.correlation_id, force_ocr, debug, layout_hint
+        )
+        job.stage, job.progress = "persisting", 95
+        job.result = await persist(res)
+        job.status, job.stage, job.progress = "done", "done", 100
+    except ImportRejected as e:
+        job.status, job.stage, job.status_code, job.error = "error", "rejected", e.status_code, e.detail
+    except Exception:
+        logger.exception("[remito] job %s falló (correlation_id=%s)", job.id, job.correlation_id)
+        job.status, job.stage, job.status_code = "error", "error", 500
+        job.error = "No se pudo importar el remito; revisá backend.log para más detalles"
+    finally:
+        job.finished_at = datetime.utcnow().isoformat()
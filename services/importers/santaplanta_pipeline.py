@@ -11,7 +11,7 @@ Estrategia:
 - Extraer header (número de remito y fecha) vía texto (pdfplumber) con normalización.
 - Detectar tablas de líneas con pdfplumber y/o Camelot (lattice/stream), con
   heurísticas de fallback cuando no hay estructura clara.
-- Si falta texto o header/líneas, invocar OCR (ocrmypdf + Tesseract) y reintentar.
+- Si falta texto o header/líneas, invocar OCR por página (Tesseract, con caché) y reintentar.
 - Emitir eventos y datos de depuración para observabilidad.
 """
 
@@ -19,13 +19,16 @@ from dataclasses import dataclass, field
 from datetime import datetime
 from decimal import Decimal
 from pathlib import Path
-import io
 import re
 import os as _os
-from typing import List, Dict, Any, Optional, Tuple
+from typing import Callable, List, Dict, Any, Optional, Tuple
 from decimal import Decimal
+from contextlib import nullcontext
 import math
 
+from services.importers import pdf_extract
+from services.ocr.pages import ocr_document
+
 # --- Dataclasses principales ---
 @dataclass
 class ParsedLine:
@@ -186,22 +189,39 @@ def _extract_expected_counts_and_totals(text: str) -> Dict[str, Any]:
         pass
     return out
 
-def _try_camelot_flavor(pdf_path: Path, flavor: str, kw: Dict[str, Any], dbg: Dict[str, Any], events: List[Dict[str, Any]]):
+def _try_camelot_flavor(doc: "pdf_extract.PdfDocument", flavor: str, kw: Dict[str, Any], dbg: Dict[str, Any], events: List[Dict[str, Any]]):
     try:
-        import camelot  # type: ignore
-        tables = camelot.read_pdf(str(pdf_path), flavor=flavor, pages="all", **kw)
         out: List[ParsedLine] = []
-        for tbl in tables:
-            df_list = tbl.df.astype(str).values.tolist()
+        for df_list in doc.camelot_tables(flavor, **kw):
             out.extend(_extract_lines_from_table(df_list, dbg))
         return out
     except Exception as e:
         events.append({"level": "WARN", "stage": "camelot", "event": "flavor_error", "details": {"flavor": flavor, "error": str(e)}})
         return []
 
-def run_ocrmypdf(src: Path, dst: Path, *, force: bool, timeout: int, lang: str):  # stub básica
-    # Para este contexto de test, devolvemos False para evitar dependencias reales
-    return False, "", ""
+class _EventList(list):
+    """Lista de eventos que además notifica cada ``append`` (progreso en vivo)."""
+
+    def __init__(self, on_event: Callable[[Dict[str, Any]], None]):
+        super().__init__()
+        self._on_event = on_event
+
+    def append(self, ev: Dict[str, Any]) -> None:  # type: ignore[override]
+        super().append(ev)
+        try:
+            self._on_event(ev)
+        except Exception:
+            pass
+
+
+# Semáforo que limita OCRs simultáneos (lo fija el pool de importación; ver remito_jobs)
+_ocr_gate: Any = None
+
+
+def set_ocr_gate(gate: Any) -> None:
+    global _ocr_gate
+    _ocr_gate = gate
+
 
 class settings:  # stub mínima para constantes usadas
     import_pdf_text_min_chars = 120
@@ -210,12 +230,7 @@ class settings:  # stub mínima para constantes usadas
 
 def pdf_has_text(pdf_path: Path, *, min_chars: int) -> bool:
     try:
-        import pdfplumber  # type: ignore
-        with pdfplumber.open(str(pdf_path)) as pdf:
-            total = 0
-            for p in pdf.pages:
-                total += len(p.extract_text() or "")
-            return total >= min_chars
+        return sum(len(t) for t in pdf_extract.open_document(pdf_path).page_texts()) >= min_chars
     except Exception:
         return False
 
@@ -434,35 +449,107 @@ def _parse_money(token: str) -> Decimal:
         return Decimal(number)
     except Exception:
         return Decimal(0)
-def parse_remito(pdf_path: Path, *, correlation_id: str, use_ocr_auto: bool = True, force_ocr: bool = False, debug: bool = False) -> ParsedResult:
+# --- Etapas de extracción de líneas (orden por defecto) ---
+_FAST_MIN_CONFIDENCE = float(_os.getenv("IMPORT_FAST_PATH_MIN_CONFIDENCE", "0.8") or 0.8)
+_CAMELOT_FLAVORS: Dict[str, Dict[str, Any]] = {
+    "camelot-lattice": {"line_scale": 40, "strip_text": "\n"},
+    "camelot-stream": {"edge_tol": 200, "row_tol": 10, "column_tol": 10},
+}
+_STAGES: Dict[str, Callable[..., List[ParsedLine]]] = {
+    "plumber": lambda doc, text, exp, dbg, ev: _try_pdfplumber_tables(doc, dbg, ev),
+    "camelot-lattice": lambda doc, text, exp, dbg, ev: _try_camelot_flavor(doc, "lattice", _CAMELOT_FLAVORS["camelot-lattice"], dbg, ev),
+    "camelot-stream": lambda doc, text, exp, dbg, ev: _try_camelot_flavor(doc, "stream", _CAMELOT_FLAVORS["camelot-stream"], dbg, ev),
+    "multiline": lambda doc, text, exp, dbg, ev: _try_text_multiline_heuristic(text, ev, exp),
+    "multiline-qty": lambda doc, text, exp, dbg, ev: _second_pass_qty_multiline(text, ev, exp),
+    "multiline-third": lambda doc, text, exp, dbg, ev: _third_pass_sku_money_mix(text, ev, exp),
+}
+STAGE_NAMES = tuple(_STAGES)
+_STAGE_ERROR_EVENTS = {
+    "multiline": "multiline_error",
+    "multiline-qty": "quantity_multiline_error",
+    "multiline-third": "third_pass_error",
+}
+# ``stage`` de los eventos de cada etapa (mismos nombres que el pipeline secuencial)
+_STAGE_EVENT_NAMES = {
+    "plumber": "pdfplumber",
+    "camelot-lattice": "camelot",
+    "camelot-stream": "camelot",
+    "multiline": "multiline_fallback",
+    "multiline-qty": "multiline_fallback",
+    "multiline-third": "multiline_fallback",
+}
+
+
+def lines_sufficient(lines: Optional[List[ParsedLine]], expected_items: Optional[int], importe_total: Optional[Decimal]) -> bool:
+    """¿Alcanza el resultado de una etapa para no probar las siguientes?
+
+    Con pie de remito manda la cantidad de ítems (o, sin ella, el importe total con la
+    misma tolerancia de la validación); sin pie, la confianza clásica.
+    """
+    if not lines:
+        return False
+    if expected_items:
+        return len(lines) == expected_items
+    if importe_total is not None:
+        try:
+            sum_total = sum([(l.total if (l.total is not None and l.total > 0) else (l.subtotal or Decimal("0"))) for l in lines])
+            return abs(sum_total - importe_total) <= Decimal("0.11")
+        except Exception:
+            return False
+    return compute_classic_confidence(lines) >= _FAST_MIN_CONFIDENCE
+
+
+def _better(cand: Optional[List[ParsedLine]], best: Optional[List[ParsedLine]], expected_items: Optional[int]) -> bool:
+    if not cand:
+        return False
+    if not best:
+        return True
+    if expected_items:
+        return abs(len(cand) - expected_items) < abs(len(best) - expected_items)
+    return len(cand) > len(best)
+
+
+def parse_remito(
+    pdf_path: Path,
+    *,
+    correlation_id: str,
+    use_ocr_auto: bool = True,
+    force_ocr: bool = False,
+    debug: bool = False,
+    on_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+    layout_hint: Optional[str] = None,
+) -> ParsedResult:
     """Pipeline limpio (reconstruido) para parsear remito Santa Planta.
 
     Mantiene etapas clave: extracción texto, tablas (pdfplumber + camelot),
     validaciones, heurísticas de SKU y cálculo de confianza. Siempre retorna
-    un ParsedResult (nunca None)."""
+    un ParsedResult (nunca None). ``on_event`` recibe cada evento a medida que
+    se emite (progreso de jobs). ``layout_hint`` es la etapa que resolvió el
+    último remito del proveedor (``debug["layout_stage"]``); se prueba primero y,
+    si alcanza, se saltean las demás."""
     _sanitize_tessdata_prefix()
     result = ParsedResult(debug={"correlation_id": correlation_id})
+    if on_event is not None:
+        result.events = _EventList(on_event)
     ev = result.events
     ev.append({"level": "INFO", "stage": "start", "event": "parse_remito_called", "details": {"pdf": str(pdf_path), "force_ocr": force_ocr, "debug": debug}})
-    # 1. Lectura de bytes
+    # 1. Lectura de bytes (el sha256 identifica la extracción cacheada)
     try:
-        data = pdf_path.read_bytes()
+        doc = pdf_extract.open_document(pdf_path)
     except Exception as e:
         ev.append({"level": "ERROR", "stage": "start", "event": "read_bytes_failed", "details": {"error": str(e)}})
         return result
 
-    # 2. Texto base
+    # 2. Texto base (una sola pasada de pdfplumber: texto, palabras y tablas)
     text_all = ""
-    try:
-        import pdfplumber  # type: ignore
-        with pdfplumber.open(str(pdf_path)) as pdf:
-            pages_text = [(p.extract_text() or "") for p in pdf.pages]
-            text_all = "\n".join(pages_text)
-            if debug:
-                result.text_excerpt = text_all[:12000]
-            ev.append({"level": "INFO", "stage": "header_extract", "event": "text_stats", "details": {"pages": len(pages_text), "len_text": sum(len(t) for t in pages_text)}})
-    except Exception as e:
-        ev.append({"level": "WARN", "stage": "header_extract", "event": "pdfplumber_failed", "details": {"error": str(e)}})
+    pages_text = doc.page_texts()
+    if doc.error:
+        ev.append({"level": "WARN", "stage": "header_extract", "event": "pdfplumber_failed", "details": {"error": doc.error}})
+    else:
+        text_all = "\n".join(pages_text)
+        if debug:
+            result.text_excerpt = text_all[:12000]
+        ev.append({"level": "INFO", "stage": "header_extract", "event": "text_stats", "details": {"pages": len(pages_text), "len_text": sum(len(t) for t in pages_text)}})
 
     # 3. Header + footer expected
     result.remito_number, result.remito_date = _parse_header_text(text_all, ev)
@@ -480,25 +567,58 @@ def parse_remito(pdf_path: Path, *, correlation_id: str, use_ocr_auto: bool = Tr
     importe_total = exp_footer.get("importe_total")
     ev.append({"level": "INFO", "stage": "footer", "event": "expected_from_footer", "details": {"expected_items": expected_items, "importe_total": (float(importe_total) if importe_total is not None else None)}})
 
-    # 4. Intento pdfplumber tablas
+    # 4-7. Extracción de líneas por etapas con salida temprana: cada etapa corre a lo
+    # sumo una vez y, si el resultado ya alcanza (cantidad/importe del pie o confianza
+    # clásica), se saltean las siguientes. ``layout_hint`` (la etapa que resolvió el
+    # último remito del proveedor) se prueba primero.
     attempts: List[ImportAttempt] = []
+    ran: Dict[str, List[ParsedLine]] = {}
+    stage_ms: Dict[str, int] = {}
     from time import perf_counter
-    t0 = perf_counter()
-    result.lines = _try_pdfplumber_tables(data, result.debug, ev)
-    t1 = perf_counter()
-    try:
-        attempts.append(ImportAttempt(
-            name="plumber",
-            ok=bool(result.lines),
-            lines_found=len(result.lines or []),
-            elapsed_ms=int((t1 - t0) * 1000),
-            sample_rows=[str((getattr(x, 'title', '') or '')[:80]) for x in (result.lines or [])[:3]],
-            notes={"tables": True},
-        ))
-    except Exception:
-        pass
-    if result.lines:
-        ev.append({"level": "INFO", "stage": "pdfplumber", "event": "lines_detected", "details": {"count": len(result.lines)}})
+
+    def _run(name: str) -> List[ParsedLine]:
+        if name in ran:
+            return ran[name]
+        t0 = perf_counter()
+        try:
+            lines = _STAGES[name](doc, text_all, expected_items, result.debug, ev) or []
+        except Exception as e:
+            ev.append({"level": "WARN", "stage": _STAGE_EVENT_NAMES.get(name, name), "event": _STAGE_ERROR_EVENTS.get(name, f"{name}_error"), "details": {"error": str(e)}})
+            lines = []
+        stage_ms[name] = int((perf_counter() - t0) * 1000)
+        ran[name] = lines
+        try:
+            attempts.append(ImportAttempt(
+                name=name,
+                ok=bool(lines),
+                lines_found=len(lines),
+                elapsed_ms=stage_ms[name],
+                sample_rows=[str((getattr(x, 'title', '') or '')[:80]) for x in lines[:3]],
+                notes=_CAMELOT_FLAVORS.get(name, {"tables": True} if name == "plumber" else None),
+            ))
+        except Exception:
+            pass
+        return lines
+
+    def _enough(lines: Optional[List[ParsedLine]]) -> bool:
+        return lines_sufficient(lines, expected_items, importe_total)
+
+    source: Optional[str] = None
+    fast_path = False
+    hint = layout_hint if layout_hint in _STAGES else None
+    if hint:
+        cand = _run(hint)
+        fast_path = _enough(cand)
+        if fast_path:
+            result.lines, source = cand, hint
+        ev.append({"level": "INFO", "stage": "layout", "event": "fast_path_hit" if fast_path else "fast_path_miss", "details": {"stage": hint, "lines": len(cand)}})
+
+    # 4. Intento pdfplumber tablas
+    if not fast_path:
+        result.lines = _run("plumber")
+        source = "plumber" if result.lines else None
+        if result.lines:
+            ev.append({"level": "INFO", "stage": "pdfplumber", "event": "lines_detected", "details": {"count": len(result.lines)}})
 
     # 4.b Reescritura adicional del remito si aún carece de guión (formato inconsistente)
     if result.remito_number and '-' not in result.remito_number:
@@ -510,48 +630,56 @@ def parse_remito(pdf_path: Path, *, correlation_id: str, use_ocr_auto: bool = Tr
                 ev.append({"level": "INFO", "stage": "header", "event": "remito_number_rewritten_from_filename_forced", "details": {"old": result.remito_number, "new": new_val}})
                 result.remito_number = new_val
 
-    # 5. Camelot si faltan
-    if (not result.lines) or (expected_items and len(result.lines) < expected_items):
-        flavors = [
-            ("lattice", {"line_scale": 40, "strip_text": "\n"}),
-            ("stream", {"edge_tol": 200, "row_tol": 10, "column_tol": 10}),
-        ]
-        best = list(result.lines or [])
-        for fl, kw in flavors:
-            t2 = perf_counter()
-            cand = _try_camelot_flavor(pdf_path, fl, kw, result.debug, ev)
-            t3 = perf_counter()
-            try:
-                attempts.append(ImportAttempt(
-                    name=f"camelot-{fl}",
-                    ok=bool(cand),
-                    lines_found=len(cand or []),
-                    elapsed_ms=int((t3 - t2) * 1000),
-                    sample_rows=[str((getattr(x, 'title', '') or '')[:80]) for x in (cand or [])[:3]],
-                    notes=kw,
-                ))
-            except Exception:
-                pass
-            if cand and len(cand) > len(best):
-                best = cand
-            if expected_items and cand and len(cand) == expected_items:
-                best = cand
+    # 5. Camelot sólo si lo obtenido no alcanza
+    if not fast_path and not _enough(result.lines):
+        best, best_src = list(result.lines or []), source
+        for name in ("camelot-lattice", "camelot-stream"):
+            if _enough(best):
                 break
-        if best and (not result.lines or len(best) >= len(result.lines)):
-            result.lines = best
-
-    # 6. (Opcional OCR) – sólo si se solicita y faltan header/lines
+            cand = _run(name)
+            if _better(cand, best, expected_items):
+                best, best_src = cand, name
+        if best_src != source:
+            result.lines, source = best, best_src
+
+    # 6. (Opcional OCR) – sólo si se solicita y faltan header/lines. OCR por página en
+    # paralelo, salteando páginas con capa de texto y reutilizando la caché por imagen.
     header_ok = bool(result.remito_number and result.remito_date)
     if use_ocr_auto and (force_ocr or (not result.lines) or (not header_ok)):
         try:
-            ocr_out = pdf_path.with_name(pdf_path.stem + "_ocr.pdf")
-            o_ok, _, _ = run_ocrmypdf(pdf_path, ocr_out, force=True, timeout=settings.import_ocr_timeout, lang=settings.import_ocr_lang)
-            ev.append({"level": "INFO" if o_ok else "WARN", "stage": "ocr", "event": "ocr_attempt", "details": {"ok": o_ok}})
-            if o_ok and ocr_out.exists():
-                data_ocr = ocr_out.read_bytes()
-                lines_ocr = _try_pdfplumber_tables(data_ocr, result.debug, ev)
+            t_ocr = perf_counter()
+            with (_ocr_gate if _ocr_gate is not None else nullcontext()):
+                ocr = ocr_document(
+                    doc,
+                    lang=settings.import_ocr_lang,
+                    timeout=settings.import_ocr_timeout,
+                    force=force_ocr,
+                    min_chars=settings.import_pdf_text_min_chars,
+                )
+            ocr_ok = bool(ocr.count("ocr") or ocr.count("cache"))
+            ev.append({"level": "INFO" if ocr_ok else "WARN", "stage": "ocr", "event": "ocr_attempt", "details": {"ok": ocr_ok, **ocr.stats()}})
+            if ocr_ok:
+                text_ocr = ocr.text
+                if not header_ok:
+                    num, dt = _parse_header_text(text_ocr, ev)
+                    result.remito_number = result.remito_number or num
+                    result.remito_date = result.remito_date or dt
+                if len(text_all.strip()) < settings.import_pdf_text_min_chars:
+                    # PDF escaneado: el texto OCR reemplaza al original para pie y fallbacks textuales
+                    text_all = text_ocr
+                    if debug:
+                        result.text_excerpt = text_all[:12000]
+                    exp_footer = _extract_expected_counts_and_totals(text_all)
+                    expected_items = int(exp_footer.get("expected_items") or 0) or expected_items
+                    importe_total = exp_footer.get("importe_total") if importe_total is None else importe_total
+                    for name in ("multiline", "multiline-qty", "multiline-third"):
+                        ran.pop(name, None)
+                    lines_ocr = _run("multiline")
+                else:
+                    lines_ocr = _try_text_multiline_heuristic(text_ocr, ev, expected_items)
                 if lines_ocr and len(lines_ocr) > len(result.lines or []):
-                    result.lines = lines_ocr
+                    result.lines, source = lines_ocr, "ocr"
+            stage_ms["ocr"] = int((perf_counter() - t_ocr) * 1000)
         except Exception as e:
             ev.append({"level": "WARN", "stage": "ocr", "event": "ocr_error", "details": {"error": str(e)}})
 
@@ -565,65 +693,61 @@ def parse_remito(pdf_path: Path, *, correlation_id: str, use_ocr_auto: bool = Tr
     # 7.b Fallback multiline textual si aún no hay líneas
     if not result.lines:
         ev.append({"level": "INFO", "stage": "multiline_fallback", "event": "multiline_fallback_attempt", "details": {"expected_items": expected_items}})
-        try:
-            ml = _try_text_multiline_heuristic(text_all, ev, expected_items)
-            if ml:
-                result.lines = ml
-                ev.append({"level": "INFO", "stage": "multiline_fallback", "event": "multiline_fallback_used", "details": {"count": len(ml)}})
-            else:
-                ev.append({"level": "INFO", "stage": "multiline_fallback", "event": "multiline_fallback_empty"})
-        except Exception as _merr:
-            ev.append({"level": "WARN", "stage": "multiline_fallback", "event": "multiline_error", "details": {"error": str(_merr)}})
+        ml = _run("multiline")
+        if ml:
+            result.lines, source = ml, "multiline"
+            ev.append({"level": "INFO", "stage": "multiline_fallback", "event": "multiline_fallback_used", "details": {"count": len(ml)}})
+        else:
+            ev.append({"level": "INFO", "stage": "multiline_fallback", "event": "multiline_fallback_empty"})
         if result.lines:
             try: _enforce_expected_skus(result.lines, ev, stage="after_multiline")
             except Exception: pass
 
-    # 7.b.1 Forzar fallback multiline aunque haya pocas (posible falsa tabla) (<5) para robustez
-    if result.lines and len(result.lines) < 5:
+    # 7.b.1 Forzar fallback multiline con pocas líneas (<5, posible falsa tabla) salvo que ya alcancen
+    if result.lines and len(result.lines) < 5 and not _enough(result.lines):
         ev.append({"level": "INFO", "stage": "multiline_fallback", "event": "multiline_fallback_forced", "details": {"current_count": len(result.lines)}})
-        try:
-            ml2 = _try_text_multiline_heuristic(text_all, ev, expected_items)
-            if ml2 and len(ml2) > len(result.lines):
-                ev.append({"level": "INFO", "stage": "multiline_fallback", "event": "multiline_fallback_forced_replace", "details": {"old": len(result.lines), "new": len(ml2)}})
-                result.lines = ml2
-                try: _enforce_expected_skus(result.lines, ev, stage="after_multiline_forced")
-                except Exception: pass
-        except Exception as _mferr:
-            ev.append({"level": "WARN", "stage": "multiline_fallback", "event": "multiline_forced_error", "details": {"error": str(_mferr)}})
+        ml2 = _run("multiline")
+        if ml2 and len(ml2) > len(result.lines):
+            ev.append({"level": "INFO", "stage": "multiline_fallback", "event": "multiline_fallback_forced_replace", "details": {"old": len(result.lines), "new": len(ml2)}})
+            result.lines, source = ml2, "multiline"
+            try: _enforce_expected_skus(result.lines, ev, stage="after_multiline_forced")
+            except Exception: pass
 
     # 7.c Second-pass multiline por cantidad (cuando falló parse monetario)
     if not result.lines:
-        try:
-            lines_qty = _second_pass_qty_multiline(text_all, ev, expected_items)
-            if lines_qty:
-                result.lines = lines_qty
-                ev.append({"level": "INFO", "stage": "multiline_fallback", "event": "quantity_multiline_used", "details": {"count": len(lines_qty)}})
-                try: _enforce_expected_skus(result.lines, ev, stage="after_multiline_qty")
-                except Exception: pass
-            else:
-                ev.append({"level": "INFO", "stage": "multiline_fallback", "event": "quantity_multiline_empty"})
-        except Exception as _qerr:
-            ev.append({"level": "WARN", "stage": "multiline_fallback", "event": "quantity_multiline_error", "details": {"error": str(_qerr)}})
+        lines_qty = _run("multiline-qty")
+        if lines_qty:
+            result.lines, source = lines_qty, "multiline-qty"
+            ev.append({"level": "INFO", "stage": "multiline_fallback", "event": "quantity_multiline_used", "details": {"count": len(lines_qty)}})
+            try: _enforce_expected_skus(result.lines, ev, stage="after_multiline_qty")
+            except Exception: pass
+        else:
+            ev.append({"level": "INFO", "stage": "multiline_fallback", "event": "quantity_multiline_empty"})
 
     # 7.d Third-pass híbrida SKU+qty+money si seguimos sin líneas
     if not result.lines:
         ev.append({"level": "INFO", "stage": "multiline_fallback", "event": "third_pass_attempt"})
-        try:
-            lines_third = _third_pass_sku_money_mix(text_all, ev, expected_items)
-            if lines_third:
-                result.lines = lines_third
-                ev.append({"level": "INFO", "stage": "multiline_fallback", "event": "third_pass_lines", "details": {"count": len(lines_third)}})
-                try: _enforce_expected_skus(result.lines, ev, stage="after_multiline_third")
-                except Exception: pass
-            else:
-                ev.append({"level": "INFO", "stage": "multiline_fallback", "event": "third_pass_empty"})
-        except Exception as _tp_err:
-            ev.append({"level": "WARN", "stage": "multiline_fallback", "event": "third_pass_error", "details": {"error": str(_tp_err)}})
+        lines_third = _run("multiline-third")
+        if lines_third:
+            result.lines, source = lines_third, "multiline-third"
+            ev.append({"level": "INFO", "stage": "multiline_fallback", "event": "third_pass_lines", "details": {"count": len(lines_third)}})
+            try: _enforce_expected_skus(result.lines, ev, stage="after_multiline_third")
+            except Exception: pass
+        else:
+            ev.append({"level": "INFO", "stage": "multiline_fallback", "event": "third_pass_empty"})
 
     # 7.e Evento global si tras todas las pasadas no hay líneas
     if not result.lines:
         ev.append({"level": "WARN", "stage": "summary", "event": "all_fallbacks_empty"})
 
+    # 7.f Resumen de etapas (perfil de layout del proveedor y benchmark)
+    skipped = [name for name in _STAGES if name not in ran]
+    result.debug["layout_stage"] = source if result.lines else None
+    result.debug["fast_path"] = fast_path
+    result.debug["stage_ms"] = dict(stage_ms)
+    result.debug["stages_skipped"] = skipped
+    ev.append({"level": "INFO", "stage": "layout", "event": "stages_summary", "details": {"source": result.debug["layout_stage"], "fast_path": fast_path, "ran": list(ran), "skipped": skipped, "ms": dict(stage_ms)}})
+
     # 8. Totales preliminares
     subtotal = sum([(ln.subtotal if ln.subtotal is not None else (ln.qty * (ln.unit_cost_bonif or Decimal('0')))) for ln in (result.lines or [])])
     result.totals = {"subtotal": subtotal, "iva": Decimal("0"), "total": subtotal}
@@ -676,25 +800,17 @@ def parse_remito(pdf_path: Path, *, correlation_id: str, use_ocr_auto: bool = Tr
 
     ev.append({"level": "INFO", "stage": "end", "event": "parse_remito_finished", "details": {"lines": len(result.lines or []), "remito_number": result.remito_number}})
     return result
-def _try_pdfplumber_tables(data: bytes, dbg: Dict[str, Any], events: List[Dict[str, Any]]) -> List[ParsedLine]:
+def _try_pdfplumber_tables(doc: "pdf_extract.PdfDocument", dbg: Dict[str, Any], events: List[Dict[str, Any]]) -> List[ParsedLine]:
     all_lines: List[ParsedLine] = []
     try:
-        import pdfplumber  # type: ignore
-        with pdfplumber.open(io.BytesIO(data)) as pdf:
-            for pi, page in enumerate(pdf.pages):
-                events.append({"level": "INFO", "stage": "pdfplumber", "event": "page_info", "details": {"page": pi + 1}})
-                tables = page.extract_tables(table_settings={
-                    "vertical_strategy": "lines",
-                    "horizontal_strategy": "lines",
-                    "snap_tolerance": 5,
-                    "join_tolerance": 10,
-                }) or []
-                try:
-                    events.append({"level": "INFO", "stage": "pdfplumber", "event": "tables_found", "details": {"page": pi + 1, "count": len(tables)}})
-                except Exception:
-                    pass
-                for t in tables:
-                    all_lines.extend(_extract_lines_from_table(t, dbg))
+        pages_tables = doc.tables()
+        if doc.error:
+            raise RuntimeError(doc.error)
+        for pi, tables in enumerate(pages_tables):
+            events.append({"level": "INFO", "stage": "pdfplumber", "event": "page_info", "details": {"page": pi + 1}})
+            events.append({"level": "INFO", "stage": "pdfplumber", "event": "tables_found", "details": {"page": pi + 1, "count": len(tables)}})
+            for t in tables:
+                all_lines.extend(_extract_lines_from_table(t, dbg))
     except Exception as e:
         events.append({"level": "WARN", "stage": "pdfplumber", "event": "exception", "details": {"msg": str(e)}})
     return all_lines
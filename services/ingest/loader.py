@@ -2,14 +2,66 @@
 # NG-HEADER: Ubicación: services/ingest/loader.py
 # NG-HEADER: Descripción: Carga archivos fuente dentro del pipeline de ingesta.
 # NG-HEADER: Lineamientos: Ver AGENTS.md
-"""Carga archivos CSV/XLSX usando pandas."""
+"""Carga archivos CSV/XLSX usando pandas.
+
+Para XLSX se usa ``python-calamine`` (lector en Rust, ~10x más rápido en planillas
+grandes) cuando está instalado; si no, openpyxl en modo ``read_only`` volcando las
+filas como tuplas directamente a un ``DataFrame``.
+"""
 from __future__ import annotations
 
+from io import BytesIO
 from pathlib import Path
-from typing import Any, Dict
+from typing import IO, Any, Dict
 
 import pandas as pd
 
+try:  # lector rápido opcional
+    import python_calamine  # noqa: F401
+
+    EXCEL_ENGINE = "calamine"
+except Exception:  # pragma: no cover - depende del entorno
+    EXCEL_ENGINE = "openpyxl"
+
+
+def _read_excel_openpyxl(source: str | Path | IO[bytes], sheet_name: int | str, header: int) -> pd.DataFrame:
+    from openpyxl import load_workbook
+
+    wb = load_workbook(source, read_only=True, data_only=True)
+    try:
+        ws = wb[sheet_name] if isinstance(sheet_name, str) else wb.worksheets[sheet_name]
+        rows = ws.iter_rows(values_only=True)
+        for _ in range(header):
+            next(rows, None)
+        head = next(rows, None) or ()
+        columns = [c if c is not None else f"Unnamed: {i}" for i, c in enumerate(head)]
+        data = [r[: len(columns)] for r in rows if any(v is not None for v in r)]
+    finally:
+        wb.close()
+    return pd.DataFrame(data, columns=columns)
+
+
+def read_excel(
+    source: str | Path | bytes | IO[bytes],
+    *,
+    sheet_name: int | str | None = 0,
+    header: int = 0,
+    raw: bool = False,
+) -> pd.DataFrame:
+    """Lee una hoja (por nombre o índice; ``None`` = primera) con el lector más rápido disponible.
+
+    ``raw=True`` conserva los valores de las celdas sin inferir tipos (p.ej. ``"1.500"``
+    queda como texto en lugar de ``1.5``) para normalizarlos después por columna.
+    """
+    if isinstance(source, bytes):
+        source = BytesIO(source)
+    sheet = 0 if sheet_name is None else sheet_name
+    if EXCEL_ENGINE == "calamine":
+        return pd.read_excel(
+            source, sheet_name=sheet, header=header, engine="calamine", dtype=object if raw else None
+        )
+    return _read_excel_openpyxl(source, sheet, header)
+
 
 def load_file(path: str | Path, mapping: Dict[str, Any]) -> pd.DataFrame:
     """Lee un archivo de proveedor según la configuración dada."""
@@ -22,7 +74,7 @@ def load_file(path: str | Path, mapping: Dict[str, Any]) -> pd.DataFrame:
             delimiter=mapping.get("delimiter", ","),
         )
     if file_type == "xlsx":
-        return pd.read_excel(
+        return read_excel(
             path,
             sheet_name=mapping.get("sheet_name"),
             header=mapping.get("header_row", 1) - 1,
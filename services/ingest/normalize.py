@@ -2,13 +2,47 @@
 # NG-HEADER: Ubicación: services/ingest/normalize.py
 # NG-HEADER: Descripción: Normaliza datos de importación antes de persistir.
 # NG-HEADER: Lineamientos: Ver AGENTS.md
-"""Funciones de limpieza de datos."""
+"""Funciones de limpieza de datos (operaciones por columna, sin bucles por fila)."""
 from __future__ import annotations
 
 from typing import Any, Dict
 
 import pandas as pd
 
+# "1.234" / "12.345.678": puntos como separador de miles aunque no haya coma decimal
+_THOUSANDS_ONLY = r"^-?\d{1,3}(?:\.\d{3})+$"
+
+
+def parse_decimal(values: pd.Series) -> pd.Series:
+    """Convierte una columna a float admitiendo formato local.
+
+    Acepta números ya tipados (columna o celda) y textos como ``"10,50"``, ``"1.234,56"``,
+    ``"$ 1.234"`` o ``"10.5"``. Si hay coma, es el separador decimal y los puntos
+    son de miles; sin coma, el punto es decimal salvo grupos de miles exactos.
+    Lo no convertible queda ``NaN``.
+    """
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype(float)
+    # Columnas object (p.ej. ``read_excel(raw=True)``): las celdas ya numéricas se toman
+    # tal cual; sólo el texto pasa por coma decimal/miles (0.125 no debe leerse 125)
+    is_text = values.map(lambda v: isinstance(v, str))
+    numeric = pd.to_numeric(values.where(~is_text), errors="coerce").astype(float)
+    text = values.where(is_text).astype("string").str.strip().str.replace(r"[^\d,.\-]", "", regex=True)
+    has_comma = text.str.contains(",", regex=False, na=False)
+    thousands = ~has_comma & text.str.fullmatch(_THOUSANDS_ONLY, na=False)
+    drop_dots = has_comma | thousands
+    text = text.where(~drop_dots, text.str.replace(".", "", regex=False))
+    text = text.str.replace(",", ".", regex=False)
+    return numeric.combine_first(pd.to_numeric(text, errors="coerce").astype(float))
+
+
+def text_column(values: pd.Series | None, index: pd.Index) -> pd.Series:
+    """Columna como texto recortado; faltantes y vacíos quedan ``""``."""
+    if values is None:
+        return pd.Series("", index=index, dtype=object)
+    out = values.astype(object).where(values.notna() & values.astype(bool), "")
+    return out.astype(str).str.strip()
+
 
 def apply(df: pd.DataFrame, mapping: Dict[str, Any]) -> pd.DataFrame:
     """Aplica transformaciones básicas al DataFrame."""
@@ -17,11 +51,5 @@ def apply(df: pd.DataFrame, mapping: Dict[str, Any]) -> pd.DataFrame:
         if field not in df.columns:
             continue
         if rules.get("replace_comma_decimal"):
-            df[field] = (
-                df[field]
-                .astype(str)
-                .str.replace(".", "", regex=False)
-                .str.replace(",", ".", regex=False)
-            )
-            df[field] = pd.to_numeric(df[field], errors="coerce")
+            df[field] = parse_decimal(df[field])
     return df
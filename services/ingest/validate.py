@@ -5,7 +5,9 @@
 """Validaciones simples de filas."""
 from __future__ import annotations
 
-from typing import Any, Dict, Tuple
+from typing import Any, Dict, Iterable, Tuple
+
+import pandas as pd
 
 
 def validate_row(row: Dict[str, Any]) -> Tuple[bool, str | None]:
@@ -18,3 +20,30 @@ def validate_row(row: Dict[str, Any]) -> Tuple[bool, str | None]:
     if price is not None and price < 0:
         return False, "purchase_price negativo"
     return True, None
+
+
+def first_error(index: pd.Index, rules: Iterable[Tuple[pd.Series, str]]) -> pd.Series:
+    """Mensaje de la primera regla que falla en cada fila (``None`` si ninguna).
+
+    ``rules`` son pares ``(máscara_de_falla, mensaje)`` en orden de prioridad.
+    """
+    errors = pd.Series(None, index=index, dtype=object)
+    for failed, message in reversed(list(rules)):
+        errors = errors.mask(failed.fillna(False).astype(bool), message)
+    return errors.astype(object).where(errors.notna(), None)
+
+
+def validate_frame(df: pd.DataFrame) -> pd.Series:
+    """Versión por columnas de :func:`validate_row` para un DataFrame completo."""
+    def _missing(col: str) -> pd.Series:
+        if col not in df.columns:
+            return pd.Series(True, index=df.index)
+        s = df[col]
+        return s.isna() | s.astype(str).str.strip().eq("")
+
+    price = pd.to_numeric(df["purchase_price"], errors="coerce") if "purchase_price" in df.columns else None
+    return first_error(df.index, [
+        (_missing("supplier_product_id"), "supplier_product_id requerido"),
+        (_missing("title"), "title requerido"),
+        (price.lt(0) if price is not None else pd.Series(False, index=df.index), "purchase_price negativo"),
+    ])
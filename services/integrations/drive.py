@@ -2,23 +2,50 @@
 # NG-HEADER: Ubicación: services/integrations/drive.py
 # NG-HEADER: Descripción: Servicio de sincronización con Google Drive API.
 # NG-HEADER: Lineamientos: Ver AGENTS.md
-"""Servicio para interactuar con Google Drive API usando Service Account."""
+"""Servicio para interactuar con Google Drive API usando Service Account.
+
+Los movimientos de archivos se agrupan en requests al endpoint batch de Drive
+(hasta :data:`BATCH_LIMIT` llamadas por request) y los IDs de carpetas se
+cachean por instancia (una instancia por sincronización).
+
+``DRIVE_API_ROOT`` (o ``api_root``) cambia la raíz de la API, p. ej. para correr
+contra un servidor Drive falso local en tests; por defecto es la de Google.
+"""
 
 from __future__ import annotations
 
 import asyncio
 import logging
 import os
+import time
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Iterable, Optional
 
 from google.oauth2 import service_account
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
-from googleapiclient.http import MediaIoBaseDownload
+from googleapiclient.http import BatchHttpRequest, HttpRequest, MediaIoBaseDownload
+import google_auth_httplib2
+import httplib2
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_API_ROOT = "https://www.googleapis.com"
+# Máximo de llamadas por request batch que acepta Drive
+BATCH_LIMIT = 100
+# Reintentos de las llamadas de un batch que fallan por cuota o error transitorio
+_BATCH_RETRIES = 3
+_RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+def _retryable(err: Optional[Exception]) -> bool:
+    """Cuota excedida (403 rateLimitExceeded / 429) o error 5xx."""
+    if not isinstance(err, HttpError):
+        return False
+    if err.resp.status == 403:
+        return b"ateLimitExceeded" in (err.content or b"")
+    return err.resp.status in _RETRY_STATUS
+
 # MIME types de imágenes permitidas
 ALLOWED_IMAGE_MIMES = {
     "image/jpeg",
@@ -39,12 +66,13 @@ class GoogleDriveError(Exception):
 class GoogleDriveSync:
     """Cliente para sincronizar archivos desde Google Drive."""
 
-    def __init__(self, credentials_path: str, source_folder_id: str):
+    def __init__(self, credentials_path: str, source_folder_id: str, api_root: Optional[str] = None):
         """Inicializa el cliente de Google Drive.
 
         Args:
             credentials_path: Ruta al archivo JSON de Service Account.
             source_folder_id: ID de la carpeta origen en Drive.
+            api_root: Raíz de la API (default: ``DRIVE_API_ROOT`` o la de Google).
         """
         # Resolver ruta relativa desde el directorio raíz del proyecto
         creds_path = Path(credentials_path)
@@ -55,6 +83,10 @@ class GoogleDriveSync:
         self.credentials_path = creds_path
         self.source_folder_id = source_folder_id
         self.service: Optional[object] = None
+        self.api_root = (api_root or os.getenv("DRIVE_API_ROOT") or DEFAULT_API_ROOT).rstrip("/")
+        # (parent_id, nombre) -> ID de carpeta, válido durante la vida de la instancia
+        self._folder_ids: dict[tuple[str, str], str] = {}
+        self._folder_lock = asyncio.Lock()
         self._validate_credentials()
 
     def _validate_credentials(self) -> None:
@@ -75,7 +107,18 @@ class GoogleDriveSync:
                 str(self.credentials_path),
                 scopes=["https://www.googleapis.com/auth/drive"],
             )
-            self.service = build("drive", "v3", credentials=credentials)
+            # Un Http por request: el cliente queda thread-safe para descargas concurrentes
+            # (httplib2.Http no lo es; ver thread_safety en google-api-python-client)
+            def build_request(http, *args, **kwargs):
+                authed = google_auth_httplib2.AuthorizedHttp(credentials, http=httplib2.Http())
+                return HttpRequest(authed, *args, **kwargs)
+
+            client_options = None
+            if self.api_root != DEFAULT_API_ROOT:
+                client_options = {"api_endpoint": f"{self.api_root}/drive/v3/"}
+            self.service = build(
+                "drive", "v3", credentials=credentials, requestBuilder=build_request, client_options=client_options
+            )
             logger.info("Autenticación con Google Drive exitosa")
         except Exception as e:
             logger.error(f"Error al autenticar con Google Drive: {e}")
@@ -194,20 +237,22 @@ class GoogleDriveSync:
         try:
             import io
 
-            request = self.service.files().get_media(fileId=file_id)
-            file_content = io.BytesIO()
-            downloader = MediaIoBaseDownload(file_content, request)
-
-            done = False
-            while not done:
-                status, done = downloader.next_chunk()
-                if status:
-                    logger.debug(
-                        f"Descargando archivo {file_id}: {int(status.progress() * 100)}%"
-                    )
+            # Ejecutar en thread para no bloquear (permite descargas concurrentes)
+            def execute_download() -> bytes:
+                request = self.service.files().get_media(fileId=file_id)
+                file_content = io.BytesIO()
+                downloader = MediaIoBaseDownload(file_content, request)
+
+                done = False
+                while not done:
+                    status, done = downloader.next_chunk()
+                    if status:
+                        logger.debug(
+                            f"Descargando archivo {file_id}: {int(status.progress() * 100)}%"
+                        )
+                return file_content.getvalue()
 
-            file_content.seek(0)
-            content = file_content.read()
+            content = await asyncio.to_thread(execute_download)
             logger.info(f"Archivo {file_id} descargado: {len(content)} bytes")
             return content
         except HttpError as e:
@@ -219,6 +264,8 @@ class GoogleDriveSync:
     ) -> str:
         """Busca una carpeta por nombre dentro de un padre, o la crea si no existe.
 
+        El resultado se cachea en la instancia: llamadas repetidas no consultan Drive.
+
         Args:
             parent_id: ID de la carpeta padre.
             folder_name: Nombre de la carpeta a buscar/crear.
@@ -229,6 +276,13 @@ class GoogleDriveSync:
         if not self.service:
             raise GoogleDriveError("No autenticado. Llame a authenticate() primero.")
 
+        key = (parent_id, folder_name)
+        async with self._folder_lock:
+            if key not in self._folder_ids:
+                self._folder_ids[key] = await self._find_or_create_folder(parent_id, folder_name)
+            return self._folder_ids[key]
+
+    async def _find_or_create_folder(self, parent_id: str, folder_name: str) -> str:
         try:
             # Buscar carpeta existente
             # Escapar comillas simples en el nombre de la carpeta para la query
@@ -305,33 +359,104 @@ class GoogleDriveSync:
     async def move_file(self, file_id: str, target_folder_id: str) -> None:
         """Mueve un archivo a otra carpeta en Drive.
 
+        Para muchos archivos usar :meth:`move_files` (una request batch cada 100).
+
         Args:
             file_id: ID del archivo a mover.
             target_folder_id: ID de la carpeta destino.
         """
-        if not self.service:
-            raise GoogleDriveError("No autenticado. Llame a authenticate() primero.")
+        errors = await self.move_files([(file_id, target_folder_id)])
+        if errors.get(file_id):
+            raise GoogleDriveError(f"Error al mover archivo: {errors[file_id]}")
 
-        try:
-            # Obtener metadata del archivo para obtener padres actuales
-            file = (
-                self.service.files()
-                .get(fileId=file_id, fields="parents")
-                .execute()
-            )
-
-            previous_parents = ",".join(file.get("parents", []))
+    async def move_files(
+        self,
+        moves: Iterable[tuple[str, str]],
+        parents: Optional[dict[str, list[str]]] = None,
+    ) -> dict[str, Optional[str]]:
+        """Mueve varios archivos agrupando las llamadas en requests batch.
 
-            # Mover archivo
-            self.service.files().update(
-                fileId=file_id,
-                addParents=target_folder_id,
-                removeParents=previous_parents,
-                fields="id, parents",
-            ).execute()
-
-            logger.info(f"Archivo {file_id} movido a carpeta {target_folder_id}")
-        except HttpError as e:
-            logger.error(f"Error al mover archivo {file_id}: {e}")
-            raise GoogleDriveError(f"Error al mover archivo: {e}") from e
+        Args:
+            moves: Pares ``(file_id, target_folder_id)``.
+            parents: Padres actuales conocidos por archivo (p. ej. del listado);
+                los que falten se consultan, también en batch.
 
+        Returns:
+            ``{file_id: None}`` si se movió o ``{file_id: mensaje}`` si falló.
+        """
+        if not self.service:
+            raise GoogleDriveError("No autenticado. Llame a authenticate() primero.")
+        moves = list(moves)
+        if not moves:
+            return {}
+        known = dict(parents or {})
+        errors: dict[str, Optional[str]] = {}
+
+        missing = list(dict.fromkeys(fid for fid, _ in moves if fid not in known))
+        if missing:
+            fetched = await asyncio.to_thread(
+                self._execute_batch,
+                {fid: (lambda fid=fid: self.service.files().get(fileId=fid, fields="parents")) for fid in missing},
+            )
+            for fid, (resp, err) in fetched.items():
+                if err is not None:
+                    errors[fid] = str(err)
+                else:
+                    known[fid] = resp.get("parents", [])
+
+        updates = {
+            fid: (
+                lambda fid=fid, target=target: self.service.files().update(
+                    fileId=fid,
+                    addParents=target,
+                    removeParents=",".join(p for p in known[fid] if p != target),
+                    fields="id, parents",
+                )
+            )
+            for fid, target in moves
+            if fid not in errors
+        }
+        results = await asyncio.to_thread(self._execute_batch, updates)
+        for fid, (_, err) in results.items():
+            errors[fid] = str(err) if err is not None else None
+        failed = [fid for fid, err in errors.items() if err]
+        logger.info(f"Movidos {len(moves) - len(failed)}/{len(moves)} archivos en Drive")
+        if failed:
+            logger.error(f"Error al mover archivos {failed[:10]}: {errors[failed[0]]}")
+        return errors
+
+    def _execute_batch(
+        self, requests: dict[str, Callable[[], HttpRequest]]
+    ) -> dict[str, tuple[Optional[dict], Optional[Exception]]]:
+        """Ejecuta requests en batch (``BATCH_LIMIT`` por request HTTP), con reintentos.
+
+        ``requests`` mapea id -> fábrica de la llamada (un reintento arma una nueva).
+        Bloqueante: llamar desde un thread. Devuelve ``{id: (respuesta, error)}``.
+        """
+        results: dict[str, tuple[Optional[dict], Optional[Exception]]] = {}
+        pending = dict(requests)
+        for attempt in range(_BATCH_RETRIES + 1):
+            retry: dict[str, Callable[[], HttpRequest]] = {}
+            keys = list(pending)
+            for start in range(0, len(keys), BATCH_LIMIT):
+                def callback(request_id, response, exception):
+                    results[request_id] = (response, exception)
+
+                batch = BatchHttpRequest(callback=callback, batch_uri=f"{self.api_root}/batch/drive/v3")
+                for key in keys[start:start + BATCH_LIMIT]:
+                    batch.add(pending[key](), request_id=key)
+                try:
+                    batch.execute()
+                except Exception as e:
+                    # Falla de la request batch completa (red, auth): todas sus llamadas fallan
+                    for key in keys[start:start + BATCH_LIMIT]:
+                        results[key] = (None, e)
+            for key in keys:
+                if _retryable(results[key][1]) and attempt < _BATCH_RETRIES:
+                    retry[key] = pending[key]
+            if not retry:
+                break
+            logger.warning(f"Reintentando {len(retry)} llamadas batch de Drive (intento {attempt + 1})")
+            time.sleep(0.5 * 2 ** attempt)
+            pending = retry
+        return results
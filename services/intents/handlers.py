@@ -192,7 +192,7 @@ def handle_search(args: List[str], opts: Dict[str, Any]) -> Dict[str, Any]:
 
     async def _search() -> Dict[str, Any]:
         async with SessionLocal() as session:
-            return await catalog_router.list_products(q=query, session=session)
+            return await catalog_router.products_page(q=query, session=session)
 
     data = _run_blocking(_search)
     return {
@@ -0,0 +1,142 @@
+# NG-HEADER: Nombre de archivo: job_registry.py
+# NG-HEADER: Ubicación: services/job_registry.py
+# NG-HEADER: Descripción: Registro compartido de jobs en background con estado persistido para polling multi-worker
+# NG-HEADER: Lineamientos: Ver AGENTS.md
+"""Registro de jobs en background de la API (catálogo PDF, remitos, buzón POP).
+
+Cada job es un dataclass que su runner actualiza en el proceso que lo ejecuta
+(estado vivo en memoria, acotado a ``max_local`` entradas). El registro persiste
+``job.to_dict()`` en ``background_jobs`` al encolar, cada ``_FLUSH_S`` mientras hay
+cambios (como mínimo cada ``_HEARTBEAT_S``) y al terminar, así ``status()`` responde
+desde cualquier worker. Un job que no reporta por más de ``_STALE_S`` (worker caído)
+se informa como ``error``. Las filas terminadas se purgan después de ``_RETENTION``.
+
+Las escrituras del estado son best effort: si la DB falla, el job sigue corriendo
+y el worker dueño lo sigue informando desde memoria.
+
+Este módulo lo importan los procesos de los pools: DB y FastAPI se importan al usarse.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Dict, Generic, List, Optional, Protocol, TypeVar
+
+logger = logging.getLogger("growen.job_registry")
+
+_FLUSH_S = 1.0
+_HEARTBEAT_S = 30.0
+_STALE_S = 120.0
+_RETENTION = timedelta(days=1)
+ACTIVE = ("queued", "running")
+
+
+class _JobLike(Protocol):
+    id: str
+    status: str
+
+    def to_dict(self) -> Dict[str, Any]: ...
+
+
+J = TypeVar("J", bound=_JobLike)
+
+
+class JobRegistry(Generic[J]):
+    """Jobs de un tipo (``kind``): ejecución local y estado visible desde cualquier worker."""
+
+    def __init__(self, kind: str, *, max_local: int = 50) -> None:
+        self.kind = kind
+        self._max_local = max_local
+        self._jobs: "OrderedDict[str, J]" = OrderedDict()
+        self._tasks: Dict[str, "asyncio.Task[None]"] = {}
+
+    def get(self, job_id: str) -> Optional[J]:
+        """Job vivo de este proceso (``None`` si corre o corrió en otro worker)."""
+        return self._jobs.get(job_id)
+
+    def active(self) -> List[J]:
+        """Jobs de este proceso todavía en curso."""
+        return [job for job in self._jobs.values() if job.status in ACTIVE]
+
+    def submit(self, job: J, work: Awaitable[None]) -> J:
+        """Registra ``job`` y ejecuta ``work`` (que lo actualiza) como task del event loop."""
+        self._jobs[job.id] = job
+        while len(self._jobs) > self._max_local:
+            self._jobs.popitem(last=False)
+        task = asyncio.get_running_loop().create_task(self._track(job, work))
+        self._tasks[job.id] = task
+        task.add_done_callback(lambda _t, j=job.id: self._tasks.pop(j, None))
+        return job
+
+    async def wait(self, job_id: str) -> Optional[J]:
+        task = self._tasks.get(job_id)
+        if task is not None:
+            await asyncio.shield(task)
+        return self._jobs.get(job_id)
+
+    async def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """``to_dict()`` del job: en memoria si es local, si no desde ``background_jobs``."""
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job.to_dict()
+        from db.models import BackgroundJob
+        from db.session import SessionLocal
+
+        async with SessionLocal() as db:
+            row = await db.get(BackgroundJob, job_id)
+        if row is None or row.kind != self.kind:
+            return None
+        data = dict(row.data or {})
+        if row.status in ACTIVE and datetime.utcnow() - row.updated_at > timedelta(seconds=_STALE_S):
+            data.update(status="error", error="Job interrumpido: el worker que lo ejecutaba dejó de reportar")
+        return data
+
+    async def _track(self, job: J, work: Awaitable[None]) -> None:
+        saved = await self._save(job, prune=True)
+        flusher = asyncio.ensure_future(self._flush_loop(job, saved))
+        try:
+            await work
+        finally:
+            flusher.cancel()
+            await self._save(job)
+
+    async def _flush_loop(self, job: J, saved: Dict[str, Any]) -> None:
+        idle = 0.0
+        while True:
+            await asyncio.sleep(_FLUSH_S)
+            idle += _FLUSH_S
+            if job.to_dict() != saved or idle >= _HEARTBEAT_S:
+                saved, idle = await self._save(job), 0.0
+
+    async def _save(self, job: J, *, prune: bool = False) -> Dict[str, Any]:
+        """Persiste el estado actual y devuelve el ``to_dict()`` guardado."""
+        snapshot = job.to_dict()
+        try:
+            from fastapi.encoders import jsonable_encoder
+            from sqlalchemy import delete
+
+            from db.models import BackgroundJob
+            from db.session import SessionLocal
+
+            data = jsonable_encoder(snapshot)
+            now = datetime.utcnow()
+            async with SessionLocal() as db:
+                if prune:
+                    await db.execute(
+                        delete(BackgroundJob).where(
+                            BackgroundJob.kind == self.kind,
+                            BackgroundJob.updated_at < now - _RETENTION,
+                            BackgroundJob.status.not_in(ACTIVE),
+                        )
+                    )
+                row = await db.get(BackgroundJob, job.id)
+                if row is None:
+                    db.add(BackgroundJob(id=job.id, kind=self.kind, status=job.status, data=data, created_at=now, updated_at=now))
+                else:
+                    row.status, row.data, row.updated_at = job.status, data, now
+                await db.commit()
+        except Exception:
+            logger.warning("No se pudo persistir el estado del job %s (%s)", job.id, self.kind, exc_info=True)
+        return snapshot
@@ -0,0 +1,84 @@
+# NG-HEADER: Nombre de archivo: json_response.py
+# NG-HEADER: Ubicación: services/json_response.py
+# NG-HEADER: Descripción: Respuesta JSON rápida (orjson) con soporte nativo de Decimal/datetime
+# NG-HEADER: Lineamientos: Ver AGENTS.md
+"""Serialización JSON de respuestas en una sola pasada.
+
+FastAPI, para endpoints que devuelven ``dict`` sin ``response_model``, recorre el
+árbol con ``jsonable_encoder`` y después lo vuelve a recorrer ``json.dumps``.
+``FastJSONResponse`` serializa con ``orjson`` (``Decimal`` -> float, ``datetime``
+ISO 8601 nativo) y, devuelta directamente desde el endpoint, evita el primer
+recorrido. Sin ``orjson`` instalado cae a ``json`` stdlib con el mismo mapeo.
+
+Los endpoints con ``response_model`` ya serializan en una pasada vía Pydantic en
+versiones recientes de FastAPI; ``app_kwargs()`` sólo instala ``FastJSONResponse``
+como clase por defecto cuando ese camino no existe, para no desactivarlo.
+"""
+from __future__ import annotations
+
+import inspect
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Dict
+from uuid import UUID
+
+from fastapi.responses import JSONResponse
+
+try:  # pragma: no cover - dependencia opcional
+    import orjson  # type: ignore
+except Exception:  # pragma: no cover
+    orjson = None  # type: ignore
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, UUID):
+        return str(obj)
+    if isinstance(obj, Enum):
+        return obj.value
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump(mode="json")
+    raise TypeError(f"{type(obj).__name__} no es serializable a JSON")
+
+
+if orjson is not None:
+    _OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def dumps(content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=_OPTIONS)
+
+else:  # pragma: no cover - sólo sin orjson
+
+    def dumps(content: Any) -> bytes:
+        return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def _native_fast_path() -> bool:
+    """True si FastAPI serializa ``response_model`` directo a bytes (``dump_json``)."""
+    try:
+        from fastapi.routing import serialize_response
+
+        return "dump_json" in inspect.signature(serialize_response).parameters
+    except Exception:
+        return False
+
+
+def app_kwargs() -> Dict[str, Any]:
+    """Argumentos extra para ``FastAPI(...)`` según la versión instalada."""
+    if orjson is None or _native_fast_path():
+        return {}
+    return {"default_response_class": FastJSONResponse}
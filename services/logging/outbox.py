@@ -0,0 +1,100 @@
+# NG-HEADER: Nombre de archivo: outbox.py
+# NG-HEADER: Ubicación: services/logging/outbox.py
+# NG-HEADER: Descripción: Outbox async acotado para efectos secundarios del middleware (Notion, métricas en DB)
+# NG-HEADER: Lineamientos: Ver AGENTS.md
+"""Outbox en memoria para efectos secundarios que no deben demorar la respuesta.
+
+El middleware de requests encola callables async (tarjeta Notion de un 500,
+``StartupMetric`` de la primera request) y una única tarea en background los
+ejecuta en orden. La cola es acotada (``LOG_OUTBOX_MAX``): si se llena, el
+trabajo se descarta y se cuenta, nunca se bloquea la request. En shutdown
+``drain()`` ejecuta lo pendiente.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from typing import Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger("growen.outbox")
+
+Job = Callable[[], Awaitable[None]]
+
+_STOP: Dict[str, str] = {}
+
+
+class SideEffectOutbox:
+    def __init__(self, maxsize: int = 1000) -> None:
+        self.maxsize = maxsize
+        self._queue: "asyncio.Queue[object]" | None = None
+        self._task: "asyncio.Task[None]" | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self.done = 0
+        self.failed = 0
+        self.dropped = 0
+
+    def submit(self, job: Job) -> bool:
+        """Encola ``job``; ``False`` si la cola está llena (se descarta)."""
+        loop = asyncio.get_running_loop()
+        if self._queue is None or self._task is None or self._task.done() or self._loop is not loop:
+            # Primer uso o loop nuevo (p.ej. TestClient crea uno por contexto)
+            self._loop = loop
+            self._queue = asyncio.Queue(maxsize=self.maxsize)
+            self._task = loop.create_task(self._run())
+        try:
+            self._queue.put_nowait(job)
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+
+    async def _run(self) -> None:
+        assert self._queue is not None
+        while True:
+            job = await self._queue.get()
+            if job is _STOP:
+                return
+            try:
+                await job()  # type: ignore[operator]
+                self.done += 1
+            except Exception:
+                self.failed += 1
+                logger.debug("outbox: fallo ejecutando efecto secundario", exc_info=True)
+
+    async def drain(self, timeout: float = 5.0) -> None:
+        """Ejecuta lo pendiente y detiene la tarea."""
+        if self._queue is None or self._task is None or self._task.done():
+            return
+        if self._loop is not asyncio.get_running_loop():
+            self._task = self._queue = self._loop = None
+            return
+        try:
+            self._queue.put_nowait(_STOP)
+        except asyncio.QueueFull:
+            await self._queue.put(_STOP)
+        try:
+            await asyncio.wait_for(self._task, timeout)
+        except asyncio.TimeoutError:
+            logger.warning("outbox: %s trabajos sin ejecutar al apagar", self._queue.qsize())
+            self._task.cancel()
+        self._task = self._queue = self._loop = None
+
+    def stats(self) -> Dict[str, int]:
+        pending = self._queue.qsize() if self._queue is not None else 0
+        return {"pending": pending, "done": self.done, "failed": self.failed, "dropped": self.dropped}
+
+
+outbox = SideEffectOutbox(int(os.getenv("LOG_OUTBOX_MAX", "1000")))
+
+
+def submit(job: Job) -> bool:
+    try:
+        return outbox.submit(job)
+    except RuntimeError:
+        # Sin loop corriendo (contexto sync): no hay dónde ejecutarlo
+        return False
+
+
+async def drain(timeout: Optional[float] = None) -> None:
+    await outbox.drain(timeout if timeout is not None else 5.0)
@@ -0,0 +1,165 @@
+# NG-HEADER: Nombre de archivo: pipeline.py
+# NG-HEADER: Ubicación: services/logging/pipeline.py
+# NG-HEADER: Descripción: Logging no bloqueante (QueueHandler/QueueListener), formato JSON y muestreo de accesos
+# NG-HEADER: Lineamientos: Ver AGENTS.md
+"""Pipeline de logging fuera del camino caliente de las requests.
+
+- ``LOG_ASYNC=1`` (default): los handlers reales (archivo rotativo, consola) se
+  mueven detrás de un ``QueueHandler``; un ``QueueListener`` en un thread aparte
+  formatea y escribe. En la request sólo queda ``getMessage()`` + ``put_nowait``.
+  La cola es acotada (``LOG_QUEUE_MAX``): si se llena se descarta el registro y se
+  cuenta en ``metrics_snapshot()["dropped"]`` en lugar de bloquear.
+- ``LOG_FORMAT=json``: una línea JSON por registro (``ts``, ``level``, ``logger``,
+  ``msg`` y los campos pasados en ``extra``, p.ej. ``http`` del access log).
+- ``LOG_SAMPLE_PATHS`` + ``LOG_SAMPLE_RATE``: las respuestas 2xx de esos prefijos
+  (polling del frontend) se loguean sólo con esa probabilidad. Errores y 4xx/5xx
+  se registran siempre.
+"""
+from __future__ import annotations
+
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import random
+from collections import deque
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Deque, Dict, Iterable, List, Optional
+
+_QUEUE_MAX = int(os.getenv("LOG_QUEUE_MAX", "10000"))
+_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "0.1"))
+_SAMPLE_PATHS = tuple(p.strip() for p in os.getenv("LOG_SAMPLE_PATHS", "").split(",") if p.strip())
+
+# Atributos estándar de LogRecord: lo demás vino por ``extra``
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+def async_enabled() -> bool:
+    return os.getenv("LOG_ASYNC", "1") != "0"
+
+
+def json_enabled() -> bool:
+    return os.getenv("LOG_FORMAT", "text").lower() == "json"
+
+
+class JsonFormatter(logging.Formatter):
+    """Una línea JSON por registro; los campos de ``extra`` van al nivel raíz."""
+
+    def format(self, record: logging.LogRecord) -> str:  # type: ignore[override]
+        data: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and not key.startswith("_"):
+                data[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exc"] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+def make_formatter() -> logging.Formatter:
+    if json_enabled():
+        return JsonFormatter()
+    return logging.Formatter("%(asctime)s | %(levelname)s | %(name)s | %(message)s")
+
+
+class _FastQueueHandler(QueueHandler):
+    """``QueueHandler`` que no formatea en el thread de la request y no bloquea si la cola está llena."""
+
+    def __init__(self, q: "queue.Queue[logging.LogRecord]") -> None:
+        super().__init__(q)
+        self.dropped = 0
+        self._exc_formatter = logging.Formatter()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Congela el mensaje (los args podrían mutar) y la traza (el traceback no debe
+        # sobrevivir al frame); fecha, formato y escritura quedan para el listener.
+        # Se trabaja sobre una copia, como QueueHandler.prepare: el registro original
+        # lo siguen usando otros handlers del logger y de sus padres.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = self._exc_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[_FastQueueHandler] = None
+
+
+def install(handlers: Iterable[logging.Handler]) -> List[logging.Handler]:
+    """Devuelve los handlers a registrar en los loggers.
+
+    Con ``LOG_ASYNC`` activo es un único ``QueueHandler`` que alimenta un listener
+    con ``handlers``; si no, los mismos ``handlers`` (comportamiento anterior).
+    """
+    global _listener, _queue_handler
+    real = [h for h in handlers if h is not None]
+    if not async_enabled() or not real:
+        return real
+    stop()
+    _queue_handler = _FastQueueHandler(queue.Queue(maxsize=_QUEUE_MAX))
+    _listener = QueueListener(_queue_handler.queue, *real, respect_handler_level=True)
+    _listener.start()
+    return [_queue_handler]
+
+
+def stop() -> None:
+    """Detiene el listener vaciando lo pendiente (shutdown/atexit)."""
+    global _listener
+    if _listener is not None:
+        try:
+            _listener.stop()
+        except Exception:
+            pass
+        _listener = None
+
+
+atexit.register(stop)
+
+
+def should_log_access(path: str, status: int) -> bool:
+    """Muestreo de accesos 2xx en rutas ruidosas; el resto siempre se registra."""
+    if status >= 300 or not _SAMPLE_PATHS or not path.startswith(_SAMPLE_PATHS):
+        return True
+    return random.random() < _SAMPLE_RATE
+
+
+# ------------------------------ Métricas ------------------------------
+_OVERHEAD_US: Deque[float] = deque(maxlen=200)
+
+
+def record_overhead(took_us: float) -> None:
+    """Tiempo propio del middleware de logging (sin contar el handler)."""
+    _OVERHEAD_US.append(float(took_us))
+
+
+def metrics_snapshot() -> Dict[str, Any]:
+    ordered = sorted(_OVERHEAD_US)
+    overhead: Dict[str, float] = {"count": len(ordered)}
+    if ordered:
+        overhead["avg_us"] = round(sum(ordered) / len(ordered), 1)
+        overhead["p95_us"] = round(ordered[int(round(0.95 * (len(ordered) - 1)))], 1)
+    return {
+        "async": _listener is not None,
+        "format": "json" if json_enabled() else "text",
+        "queue_depth": _queue_handler.queue.qsize() if _queue_handler is not None and _listener is not None else 0,
+        "dropped": _queue_handler.dropped if _queue_handler is not None else 0,
+        "overhead": overhead,
+    }
@@ -12,8 +12,11 @@ from typing import Optional
 
 try:  # httpx opcional; si no está, el envío se omite silenciosamente
     import httpx  # type: ignore
+
+    from services import http_clients
 except Exception:  # pragma: no cover
     httpx = None  # type: ignore
+    http_clients = None  # type: ignore
 
 
 async def send_message(
@@ -58,24 +61,25 @@ async def send_message(
         payload = {"chat_id": chat, "text": text}
         if parse_mode:
             payload["parse_mode"] = parse_mode
-        async with httpx.AsyncClient(timeout=timeout) as client:  # type: ignore
-            resp = await client.post(
-                f"https://api.telegram.org/bot{tok}/sendMessage",
-                json=payload,
-            )
-            if resp.status_code == 200:
-                logger.debug(f"✓ Mensaje enviado exitosamente a chat_id={chat}")
-                return True
-            else:
-                # Log del error de Telegram API
-                try:
-                    error_data = resp.json()
-                    error_code = error_data.get("error_code")
-                    description = error_data.get("description", "Unknown error")
-                    logger.error(f"✗ Error enviando mensaje a chat_id={chat}: code={error_code}, description={description}")
-                except Exception:
-                    logger.error(f"✗ Error enviando mensaje a chat_id={chat}: HTTP {resp.status_code} - {resp.text[:200]}")
-                return False
+        client = http_clients.get_client("telegram")
+        resp = await client.post(
+            f"https://api.telegram.org/bot{tok}/sendMessage",
+            json=payload,
+            timeout=timeout,
+        )
+        if resp.status_code == 200:
+            logger.debug(f"✓ Mensaje enviado exitosamente a chat_id={chat}")
+            return True
+        else:
+            # Log del error de Telegram API
+            try:
+                error_data = resp.json()
+                error_code = error_data.get("error_code")
+                description = error_data.get("description", "Unknown error")
+                logger.error(f"✗ Error enviando mensaje a chat_id={chat}: code={error_code}, description={description}")
+            except Exception:
+                logger.error(f"✗ Error enviando mensaje a chat_id={chat}: HTTP {resp.status_code} - {resp.text[:200]}")
+            return False
     except httpx.TimeoutException:
         logger.error(f"✗ Timeout enviando mensaje a chat_id={chat}")
         return False
@@ -114,31 +118,31 @@ async def download_telegram_file(
     
     try:
         # Paso 1: Obtener file_path usando getFile
-        async with httpx.AsyncClient(timeout=timeout) as client:  # type: ignore
-            get_file_url = f"https://api.telegram.org/bot{tok}/getFile"
-            get_file_resp = await client.get(get_file_url, params={"file_id": file_id})
-            get_file_resp.raise_for_status()
-            file_info = get_file_resp.json()
-            
-            if not file_info.get("ok"):
-                return None
-            
-            file_path = file_info.get("result", {}).get("file_path")
-            if not file_path:
-                return None
-            
-            # Validar tamaño (límite 20MB para OpenAI)
-            file_size = file_info.get("result", {}).get("file_size", 0)
-            if file_size > 20 * 1024 * 1024:  # 20MB
-                return None
-            
-            # Paso 2: Descargar el archivo usando file_path
-            download_url = f"https://api.telegram.org/file/bot{tok}/{file_path}"
-            download_resp = await client.get(download_url, timeout=timeout)
-            download_resp.raise_for_status()
-            
-            return download_resp.content
-            
+        client = http_clients.get_client("telegram")
+        get_file_url = f"https://api.telegram.org/bot{tok}/getFile"
+        get_file_resp = await client.get(get_file_url, params={"file_id": file_id}, timeout=timeout)
+        get_file_resp.raise_for_status()
+        file_info = get_file_resp.json()
+        
+        if not file_info.get("ok"):
+            return None
+        
+        file_path = file_info.get("result", {}).get("file_path")
+        if not file_path:
+            return None
+        
+        # Validar tamaño (límite 20MB para OpenAI)
+        file_size = file_info.get("result", {}).get("file_size", 0)
+        if file_size > 20 * 1024 * 1024:  # 20MB
+            return None
+        
+        # Paso 2: Descargar el archivo usando file_path
+        download_url = f"https://api.telegram.org/file/bot{tok}/{file_path}"
+        download_resp = await client.get(download_url, timeout=timeout)
+        download_resp.raise_for_status()
+        
+        return download_resp.content
+        
 
     except Exception:
         return None
@@ -192,46 +196,46 @@ async def send_photo(
         params["parse_mode"] = parse_mode
         
     try:
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            # Caso 1: URL pública (string)
-            if isinstance(photo, str) and (photo.startswith("http://") or photo.startswith("https://")):
-                params["photo"] = photo
-                resp = await client.post(url_api, params=params)
+        client = http_clients.get_client("telegram")
+        # Caso 1: URL pública (string)
+        if isinstance(photo, str) and (photo.startswith("http://") or photo.startswith("https://")):
+            params["photo"] = photo
+            resp = await client.post(url_api, params=params, timeout=timeout)
+        
+        # Caso 2: Archivo local (str o Path) o Bytes
+        else:
+            files = {}
+            file_content = None
+            filename = "image.jpg"
             
-            # Caso 2: Archivo local (str o Path) o Bytes
+            if isinstance(photo, (str, Path)):
+                p = Path(photo)
+                if not p.exists():
+                    logger.error(f"Archivo de imagen no encontrado: {p}")
+                    return False
+                file_content = open(p, "rb")
+                filename = p.name
             else:
-                files = {}
-                file_content = None
-                filename = "image.jpg"
-                
-                if isinstance(photo, (str, Path)):
-                    p = Path(photo)
-                    if not p.exists():
-                        logger.error(f"Archivo de imagen no encontrado: {p}")
-                        return False
-                    file_content = open(p, "rb")
-                    filename = p.name
-                else:
-                    # Bytes
-                    file_content = photo
-                
-                # Enviar multipart/form-data
-                # Nota: httpx cierra el archivo si se pasa como objeto file-like
-                files = {"photo": (filename, file_content)}
-                
-                resp = await client.post(url_api, params=params, files=files)
-                
-                # Cerrar archivo si lo abrimos nosotros
-                if isinstance(photo, (str, Path)) and hasattr(file_content, "close"):
-                    file_content.close() # type: ignore
-
-            if resp.status_code == 200:
-                logger.debug(f"✓ Foto enviada exitosamente a chat_id={chat}")
-                return True
-            else:
-                logger.error(f"✗ Error enviando foto a chat_id={chat}: {resp.status_code} - {resp.text[:200]}")
-                return False
-                
+                # Bytes
+                file_content = photo
+            
+            # Enviar multipart/form-data
+            # Nota: httpx cierra el archivo si se pasa como objeto file-like
+            files = {"photo": (filename, file_content)}
+            
+            resp = await client.post(url_api, params=params, files=files, timeout=timeout)
+            
+            # Cerrar archivo si lo abrimos nosotros
+            if isinstance(photo, (str, Path)) and hasattr(file_content, "close"):
+                file_content.close() # type: ignore
+
+        if resp.status_code == 200:
+            logger.debug(f"✓ Foto enviada exitosamente a chat_id={chat}")
+            return True
+        else:
+            logger.error(f"✗ Error enviando foto a chat_id={chat}: {resp.status_code} - {resp.text[:200]}")
+            return False
+            
     except Exception as e:
         logger.error(f"✗ Excepción enviando foto a chat_id={chat}: {e}")
         return False
@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+# NG-HEADER: Nombre de archivo: pages.py
+# NG-HEADER: Ubicación: services/ocr/pages.py
+# NG-HEADER: Descripción: OCR por página en paralelo con caché por hash de imagen
+# NG-HEADER: Lineamientos: Ver AGENTS.md
+"""OCR de PDFs página por página.
+
+- Las páginas que ya tienen capa de texto (``min_chars``) no se rasterizan ni se
+  pasan por OCR, salvo ``force``.
+- El resto se rasteriza (PNG cacheado por :mod:`services.importers.pdf_extract`) y
+  se busca por sha256 de la imagen + idioma en ``OCR_PAGE_CACHE_DIR``: un re-import
+  o un re-run de debug del mismo PDF (o una página idéntica en otro PDF) no vuelve
+  a correr Tesseract.
+- Las páginas faltantes se procesan en paralelo (``IMPORT_OCR_JOBS`` hilos, por
+  defecto un núcleo cada uno); cada Tesseract queda limitado a un hilo OpenMP
+  para no sobresuscribir CPUs.
+
+``timeout`` es el plazo total del documento, no por página.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger("growen")
+
+_JOBS = max(1, int(os.getenv("IMPORT_OCR_JOBS", "0") or 0) or (os.cpu_count() or 1))
+_CACHE_MAX = int(os.getenv("OCR_PAGE_CACHE_MAX", "5000") or 5000)
+_DPI = 300
+
+
+def cache_root() -> Path:
+    return Path(os.getenv("OCR_PAGE_CACHE_DIR", str(Path("data") / "purchases" / "_ocr")))
+
+
+@dataclass
+class OcrPages:
+    """Texto por página (capa original u OCR) y de dónde salió cada una."""
+
+    texts: List[str] = field(default_factory=list)
+    sources: List[str] = field(default_factory=list)  # text_layer | cache | ocr | failed
+    errors: List[str] = field(default_factory=list)
+    elapsed_ms: int = 0
+
+    @property
+    def ok(self) -> bool:
+        return bool(self.texts) and "failed" not in self.sources
+
+    @property
+    def text(self) -> str:
+        return "\n".join(self.texts)
+
+    def count(self, source: str) -> int:
+        return self.sources.count(source)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pages": len(self.texts),
+            "text_layer": self.count("text_layer"),
+            "cached": self.count("cache"),
+            "ocr": self.count("ocr"),
+            "failed": self.count("failed"),
+            "elapsed_ms": self.elapsed_ms,
+            "errors": self.errors[:3],
+        }
+
+
+def tesseract_png(png: bytes, *, lang: str, timeout: float) -> str:
+    """Tesseract sobre un PNG (``--psm 6``: bloque uniforme, lo habitual en remitos)."""
+    import io
+
+    import pytesseract  # type: ignore
+    from PIL import Image
+
+    # Un hilo OpenMP por proceso: el paralelismo lo da el pool por página
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+    with Image.open(io.BytesIO(png)) as img:
+        return pytesseract.image_to_string(img, lang=lang, config="--psm 6", timeout=max(1, int(timeout)))
+
+
+def _cache_path(png: bytes, lang: str) -> Path:
+    return cache_root() / f"{hashlib.sha256(png).hexdigest()}.{lang.replace('+', '_')}.txt"
+
+
+def _read_cached(path: Path) -> Optional[str]:
+    try:
+        text = path.read_text(encoding="utf-8")
+        os.utime(path)  # LRU por mtime
+        return text
+    except OSError:
+        return None
+
+
+def _write_cached(path: Path, text: str) -> None:
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(text, encoding="utf-8")
+        os.replace(tmp, path)
+    except OSError:
+        logger.warning("[ocr] no se pudo cachear %s", path.name)
+
+
+def prune(root: Path, keep: int = _CACHE_MAX) -> int:
+    """Borra los textos menos usados por encima de ``keep``."""
+    try:
+        entries = sorted((p for p in root.iterdir() if p.is_file()), key=lambda p: p.stat().st_mtime, reverse=True)
+    except OSError:
+        return 0
+    for p in entries[keep:]:
+        try:
+            p.unlink()
+        except OSError:
+            pass
+    return max(0, len(entries) - keep)
+
+
+def ocr_document(
+    doc: Any,
+    *,
+    lang: str,
+    timeout: float,
+    force: bool = False,
+    min_chars: int = 120,
+    jobs: Optional[int] = None,
+) -> OcrPages:
+    """OCR por página de un :class:`~services.importers.pdf_extract.PdfDocument`."""
+    t0 = time.perf_counter()
+    deadline = time.monotonic() + timeout
+    layer = doc.page_texts()
+    out = OcrPages(texts=list(layer), sources=["text_layer"] * len(layer))
+    todo = [i for i, t in enumerate(layer) if force or len(t.strip()) < min_chars]
+
+    def _page(i: int) -> None:
+        try:
+            png = doc.page_png(i, dpi=_DPI)
+            path = _cache_path(png, lang)
+            cached = _read_cached(path)
+            if cached is not None:
+                out.texts[i], out.sources[i] = cached, "cache"
+                return
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError("plazo de OCR agotado")
+            text = tesseract_png(png, lang=lang, timeout=remaining)
+            _write_cached(path, text)
+            out.texts[i], out.sources[i] = text, "ocr"
+        except Exception as e:
+            out.sources[i] = "failed"
+            out.errors.append(f"p{i + 1}: {e or type(e).__name__}")
+
+    if todo:
+        workers = min(len(todo), jobs or _JOBS)
+        if workers == 1:
+            for i in todo:
+                _page(i)
+        else:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ocr-page") as pool:
+                list(pool.map(_page, todo))
+        if out.count("ocr"):
+            prune(cache_root())
+    out.elapsed_ms = int((time.perf_counter() - t0) * 1000)
+    return out
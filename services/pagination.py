@@ -0,0 +1,238 @@
+# NG-HEADER: Nombre de archivo: pagination.py
+# NG-HEADER: Ubicación: services/pagination.py
+# NG-HEADER: Descripción: Paginación keyset (cursor opaco) y totales opcionales/estimados para listados
+# NG-HEADER: Lineamientos: Ver AGENTS.md
+"""Paginación compartida de los endpoints de listado.
+
+Dos modos sobre el mismo orden ``(clave de orden, id)``:
+
+- ``page``/``page_size`` (contrato histórico): ``OFFSET`` clásico.
+- ``cursor``: token opaco con los valores de la última fila; la siguiente página
+  se obtiene con un predicado ``WHERE (clave, id) > cursor`` que aprovecha los
+  índices compuestos, sin importar cuán profunda sea la página.
+
+Ambos modos devuelven ``next_cursor`` (``None`` en la última página), así un
+cliente puede pasar de ``page=1`` a cursores sin cambiar nada más.
+
+Totales (``count``):
+- ``exact``: ``SELECT count(*)`` sobre la consulta filtrada (default en modo page).
+- ``estimate``: en PostgreSQL y sin filtros, ``pg_class.reltuples``; en otro caso
+  un conteo exacto cacheado ``PAGINATION_COUNT_TTL_SECONDS`` segundos.
+- ``none``: sin conteo (default en modo cursor).
+
+Los NULL se ordenan como el valor más grande (``NULLS FIRST`` en DESC, ``NULLS
+LAST`` en ASC), igual que el default de PostgreSQL, para que un índice btree
+simple sirva en ambos sentidos.
+"""
+from __future__ import annotations
+
+import base64
+import json
+import os
+import time
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import and_, false, func, or_, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+from sqlalchemy.sql.elements import ColumnElement
+
+COUNT_MODES = ("exact", "estimate", "none")
+COUNT_PATTERN = "^(exact|estimate|none)$"
+
+_COUNT_TTL = float(os.getenv("PAGINATION_COUNT_TTL_SECONDS", "30"))
+_COUNT_CACHE_MAX = 512
+_count_cache: Dict[str, Tuple[float, int]] = {}
+
+
+@dataclass(frozen=True)
+class SortKey:
+    """Columna de orden; ``nullable`` agrega el manejo de NULL al predicado."""
+
+    column: ColumnElement
+    descending: bool = True
+    nullable: bool = False
+
+    def order_by(self) -> ColumnElement:
+        if self.descending:
+            clause = self.column.desc()
+            return clause.nulls_first() if self.nullable else clause
+        clause = self.column.asc()
+        return clause.nulls_last() if self.nullable else clause
+
+    def after(self, value: Any) -> ColumnElement:
+        """Filas estrictamente posteriores a ``value`` en el orden de esta clave."""
+        if value is None:
+            # NULL es el mayor valor: en DESC viene primero, en ASC no hay nada después
+            return self.column.is_not(None) if self.descending else false()
+        if self.descending:
+            return self.column < value
+        cmp = self.column > value
+        return or_(cmp, self.column.is_(None)) if self.nullable else cmp
+
+    def equals(self, value: Any) -> ColumnElement:
+        return self.column.is_(None) if value is None else self.column == value
+
+
+@dataclass
+class Page:
+    rows: List[Any]
+    total: Optional[int]
+    page: int
+    page_size: int
+    next_cursor: Optional[str] = None
+
+    def scalars(self) -> List[Any]:
+        return [row[0] for row in self.rows]
+
+    @property
+    def pages(self) -> Optional[int]:
+        if self.total is None:
+            return None
+        return (self.total + self.page_size - 1) // self.page_size if self.total else 0
+
+
+# ------------------------------ Cursor ------------------------------
+def _dump(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"d": value.isoformat()}
+    if isinstance(value, Decimal):
+        return {"dec": str(value)}
+    return value
+
+
+def _load(value: Any) -> Any:
+    if isinstance(value, dict):
+        if "dt" in value:
+            return datetime.fromisoformat(value["dt"])
+        if "d" in value:
+            return date.fromisoformat(value["d"])
+        if "dec" in value:
+            return Decimal(value["dec"])
+        raise ValueError("valor de cursor desconocido")
+    return value
+
+
+def encode_cursor(signature: str, values: Sequence[Any]) -> str:
+    raw = json.dumps({"s": signature, "v": [_dump(v) for v in values]}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str, signature: str, size: int) -> List[Any]:
+    """Decodifica un cursor; 400 si está corrupto o fue emitido para otro orden."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        values = [_load(v) for v in data["v"]]
+        if data["s"] != signature or len(values) != size:
+            raise ValueError("cursor de otro orden")
+        return values
+    except HTTPException:
+        raise
+    except Exception:
+        raise HTTPException(status_code=400, detail="cursor inválido")
+
+
+def keyset_predicate(keys: Sequence[SortKey], values: Sequence[Any]) -> ColumnElement:
+    """``(k1, k2, ...) > (v1, v2, ...)`` lexicográfico respetando sentido y NULLs."""
+    clauses = []
+    for i, key in enumerate(keys):
+        prefix = [k.equals(v) for k, v in zip(keys[:i], values[:i])]
+        clauses.append(and_(*prefix, key.after(values[i])))
+    return or_(*clauses)
+
+
+# ------------------------------ Totales ------------------------------
+def _cache_key(stmt: Select) -> str:
+    compiled = stmt.compile()
+    return f"{compiled}|{sorted((k, repr(v)) for k, v in compiled.params.items())}"
+
+
+async def _exact_count(db: AsyncSession, stmt: Select) -> int:
+    return int(await db.scalar(select(func.count()).select_from(stmt.order_by(None).subquery())) or 0)
+
+
+async def count_rows(
+    db: AsyncSession,
+    stmt: Select,
+    mode: str,
+    *,
+    estimate_table: Optional[str] = None,
+) -> Optional[int]:
+    """Total según ``mode``. ``estimate_table`` sólo se pasa si ``stmt`` no tiene filtros."""
+    if mode == "none":
+        return None
+    if mode == "exact":
+        return await _exact_count(db, stmt)
+    bind = db.get_bind()
+    if estimate_table and bind.dialect.name == "postgresql":
+        estimate = await db.scalar(
+            text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:t)"),
+            {"t": estimate_table},
+        )
+        # reltuples = -1 si la tabla nunca fue analizada
+        if estimate is not None and estimate >= 0:
+            return int(estimate)
+    key = _cache_key(stmt)
+    now = time.monotonic()
+    hit = _count_cache.get(key)
+    if hit is not None and hit[0] > now:
+        return hit[1]
+    total = await _exact_count(db, stmt)
+    if len(_count_cache) >= _COUNT_CACHE_MAX:
+        _count_cache.clear()
+    _count_cache[key] = (now + _COUNT_TTL, total)
+    return total
+
+
+# ------------------------------ Paginación ------------------------------
+async def paginate(
+    db: AsyncSession,
+    stmt: Select,
+    keys: Sequence[SortKey],
+    *,
+    page: int = 1,
+    page_size: int,
+    cursor: Optional[str] = None,
+    count: Optional[str] = None,
+    signature: str = "",
+    estimate_table: Optional[str] = None,
+) -> Page:
+    """Pagina ``stmt`` (sin ORDER BY) por ``keys``; la última clave debe ser única (id).
+
+    Sin ``cursor`` usa ``OFFSET`` sobre ``page``; con ``cursor`` usa keyset. ``count``
+    por default es ``exact`` en modo page y ``none`` en modo cursor.
+    """
+    if count is None:
+        count = "none" if cursor else "exact"
+    if count not in COUNT_MODES:
+        raise HTTPException(status_code=400, detail="count inválido (exact|estimate|none)")
+    total = await count_rows(db, stmt, count, estimate_table=estimate_table)
+
+    n = len(keys)
+    query = stmt.add_columns(*[k.column.label(f"_pg_k{i}") for i, k in enumerate(keys)])
+    query = query.order_by(*[k.order_by() for k in keys])
+    if cursor:
+        values = decode_cursor(cursor, signature, n)
+        query = query.where(keyset_predicate(keys, values))
+    else:
+        query = query.offset((page - 1) * page_size)
+    # Una fila extra para saber si hay página siguiente sin contar
+    result = (await db.execute(query.limit(page_size + 1))).all()
+    has_more = len(result) > page_size
+    result = result[:page_size]
+    next_cursor = None
+    if has_more and result:
+        next_cursor = encode_cursor(signature, list(result[-1][-n:]))
+    rows = [tuple(r[:-n]) for r in result]
+    return Page(rows=rows, total=total, page=page, page_size=page_size, next_cursor=next_cursor)
+
+
+def clear_count_cache() -> None:
+    _count_cache.clear()
@@ -0,0 +1,26 @@
+#!/usr/bin/env python
+# NG-HEADER: Nombre de archivo: aggregates.py
+# NG-HEADER: Ubicación: services/purchases/aggregates.py
+# NG-HEADER: Descripción: Recálculo explícito de los agregados por compra tras escrituras Core masivas
+# NG-HEADER: Lineamientos: Ver AGENTS.md
+"""Recálculo explícito de los agregados de ``purchases``.
+
+El mantenimiento normal es automático (listener ORM en :mod:`db.purchase_aggregates`,
+registrado al importar ``db.models``). Esto sólo hace falta tras ``update()``/``delete()``
+Core sobre ``purchase_lines``, que no pasan por el flush del ORM.
+"""
+from __future__ import annotations
+
+from typing import Iterable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.purchase_aggregates import apply_purchase_aggregates
+
+
+async def refresh_purchase_aggregates(db: AsyncSession, purchase_ids: Iterable[int]) -> None:
+    """Recalcula los agregados de ``purchase_ids`` dentro de la transacción de ``db``."""
+    ids = {int(pid) for pid in purchase_ids}
+    if ids:
+        await db.flush()
+        await db.run_sync(apply_purchase_aggregates, ids)
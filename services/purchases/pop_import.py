@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# NG-HEADER: Nombre de archivo: pop_import.py
+# NG-HEADER: Ubicación: services/purchases/pop_import.py
+# NG-HEADER: Descripción: Alta de una compra a partir de un email de POP ya parseado
+# NG-HEADER: Lineamientos: Ver AGENTS.md
+"""Alta de compra desde un email de POP parseado (:class:`PopParsed`).
+
+Lo usan el endpoint de carga manual (``POST /purchases/import/pop-email``) y la
+ingesta incremental del buzón (:mod:`services.importers.pop_mailbox`). No hace
+commit: el llamador decide la transacción.
+"""
+from __future__ import annotations
+
+import shutil
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.models import AuditLog, Purchase, PurchaseAttachment, PurchaseLine
+from services.importers.pop_email import PopParsed
+from services.purchases.sku_resolver import SkuResolver
+
+# (filename, mime, contenido en memoria o archivo en disco)
+EmlSource = Tuple[str, Optional[str], Union[bytes, Path]]
+
+
+def _store(root: Path, filename: str, src: Union[bytes, Path]) -> Tuple[Path, int]:
+    root.mkdir(parents=True, exist_ok=True)
+    dest = root / filename
+    if isinstance(src, (bytes, bytearray)):
+        with open(dest, "wb") as fh:
+            fh.write(src)
+    else:
+        shutil.copyfile(src, dest)
+    return dest, dest.stat().st_size
+
+
+async def create_pop_purchase(
+    db: AsyncSession,
+    supplier_id: int,
+    parsed: PopParsed,
+    *,
+    remito_fallback: Optional[str] = None,
+    eml: Optional[EmlSource] = None,
+    audit_meta: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Crea la compra BORRADOR con sus líneas; idempotente por (proveedor, remito).
+
+    ``eml`` y los ``parsed.attachments`` (ya escritos a disco) se copian a
+    ``data/purchases/{id}/`` como adjuntos de la compra.
+    """
+    # Unicidad por (supplier_id, remito_number) si logramos extraer remito
+    remito_number = parsed.remito_number or remito_fallback or "POP"
+    try:
+        remito_dt = date.fromisoformat(parsed.remito_date or date.today().isoformat())
+    except Exception:
+        remito_dt = date.today()
+
+    exists = await db.scalar(select(Purchase).where(Purchase.supplier_id == supplier_id, Purchase.remito_number == remito_number))
+    if exists:
+        # Idempotente: si ya existe una compra con ese remito para el proveedor, devolverla como éxito
+        return {
+            "purchase_id": exists.id,
+            "status": getattr(exists, "status", None),
+            "parsed": {"remito": remito_number, "fecha": (getattr(exists, "remito_date", None) or remito_dt).isoformat() if getattr(exists, "remito_date", None) else remito_dt.isoformat(), "lines": None},
+            "duplicate": True,
+        }
+
+    # Crear compra
+    p = Purchase(supplier_id=supplier_id, remito_number=remito_number, remito_date=remito_dt)
+    db.add(p)
+    await db.flush()
+
+    # Crear líneas con datos parseados (SKU puede ser sintético; editable luego).
+    # Sólo SKU exacto: los títulos POP traen medidas numéricas (500, 1000) que no son SKUs.
+    resolver = await SkuResolver.load(db, supplier_id, ((ln.supplier_sku, None) for ln in parsed.lines))
+    created = 0
+    for ln in parsed.lines:
+        title = (ln.title or "").strip() or "(sin título)"
+        qty = Decimal(str(ln.qty or 0))
+        unit_cost = Decimal(str(ln.unit_cost or 0))
+        # Clamps defensivos para evitar overflow / datos absurdos
+        try:
+            if qty <= 0 or qty >= Decimal('100000'):
+                qty = Decimal('1')
+        except Exception:
+            qty = Decimal('1')
+        try:
+            if unit_cost < 0 or unit_cost > Decimal('10000000'):
+                unit_cost = Decimal('0')
+        except Exception:
+            unit_cost = Decimal('0')
+        sp = resolver.get(ln.supplier_sku)
+        db.add(PurchaseLine(
+            purchase_id=p.id,
+            supplier_item_id=sp.id if sp else None,
+            product_id=sp.internal_product_id if sp else None,
+            supplier_sku=(ln.supplier_sku or None),
+            title=title,
+            qty=qty,
+            unit_cost=unit_cost,
+            line_discount=Decimal("0"),
+            state="OK" if sp else "SIN_VINCULAR",
+        ))
+        created += 1
+
+    # Guardar eml y adjuntos del mail (si vinieron)
+    root = Path("data") / "purchases" / str(p.id)
+    files = [(eml[0], eml[1], eml[2])] if eml else []
+    files += [(Path(a["path"]).name, a.get("mime"), Path(a["path"])) for a in parsed.attachments]
+    for filename, mime, src in files:
+        try:
+            path, size = _store(root, filename, src)
+            db.add(PurchaseAttachment(purchase_id=p.id, filename=filename, mime=mime, size=size, path=str(path)))
+        except Exception:
+            pass
+
+    # Audit
+    db.add(AuditLog(action="purchase_import_pop_email", table="purchases", entity_id=p.id, meta={
+        "lines": created,
+        "remito_number": remito_number,
+        "remito_date": remito_dt.isoformat(),
+        "parse_debug": parsed.debug,
+        **(audit_meta or {}),
+    }))
+    return {"purchase_id": p.id, "status": p.status, "parsed": {"remito": remito_number, "fecha": remito_dt.isoformat(), "lines": created}}
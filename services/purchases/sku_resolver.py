@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# NG-HEADER: Nombre de archivo: sku_resolver.py
+# NG-HEADER: Ubicación: services/purchases/sku_resolver.py
+# NG-HEADER: Descripción: Resolución en bloque de SKUs de proveedor para líneas de compra
+# NG-HEADER: Lineamientos: Ver AGENTS.md
+"""Resolución de ``supplier_sku`` → ``SupplierProduct`` para todo un documento.
+
+Importación de remitos, validación, confirmación y reenvío de stock resolvían
+cada línea con un ``SELECT`` por SKU (y, en la importación, otro por cada token
+numérico del título). :meth:`SkuResolver.load` junta todos los candidatos del
+documento y los trae en una sola consulta ``IN`` (por lotes si son muchos); las
+líneas se resuelven en memoria con la misma precedencia:
+
+1. SKU exacto de la línea.
+2. Si no existe y se pidieron tokens de título, el primer número de 3 a 6
+   dígitos del título (en orden de aparición) que exista como SKU.
+"""
+from __future__ import annotations
+
+import re
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.models import SupplierProduct
+
+_TITLE_TOKEN_RE = re.compile(r"\b(\d{3,6})\b")
+_IN_CHUNK = 500  # límite de parámetros de SQLite (999) con margen
+
+
+def title_tokens(title: Optional[str]) -> List[str]:
+    return _TITLE_TOKEN_RE.findall(title or "")
+
+
+class SkuResolver:
+    """SupplierProducts de un proveedor indexados por SKU e id."""
+
+    def __init__(self, products: Iterable[SupplierProduct] = ()):
+        self.by_sku: Dict[str, SupplierProduct] = {}
+        self.by_id: Dict[int, SupplierProduct] = {}
+        for sp in products:
+            self.by_sku[sp.supplier_product_id] = sp
+            self.by_id[sp.id] = sp
+
+    @classmethod
+    async def load(
+        cls,
+        db: AsyncSession,
+        supplier_id: int,
+        lines: Iterable[Tuple[Optional[str], Optional[str]]],
+        *,
+        use_title_tokens: bool = False,
+        ids: Iterable[Optional[int]] = (),
+    ) -> "SkuResolver":
+        """Carga en bloque los candidatos de ``lines`` (pares ``(sku, título)``).
+
+        ``ids`` agrega ``SupplierProduct`` ya vinculados (``supplier_item_id``) del
+        mismo proveedor en la misma consulta.
+        """
+        skus: Set[str] = set()
+        for sku, title in lines:
+            sku = (sku or "").strip()
+            if not sku:
+                continue
+            skus.add(sku)
+            if use_title_tokens:
+                skus.update(title_tokens(title))
+        wanted_ids = {i for i in ids if i}
+        if not supplier_id or not (skus or wanted_ids):
+            return cls()
+        sku_list, id_list = sorted(skus), sorted(wanted_ids)
+        found: List[SupplierProduct] = []
+        for start in range(0, max(len(sku_list), len(id_list)), _IN_CHUNK):
+            conds = []
+            if sku_list[start:start + _IN_CHUNK]:
+                conds.append(SupplierProduct.supplier_product_id.in_(sku_list[start:start + _IN_CHUNK]))
+            if id_list[start:start + _IN_CHUNK]:
+                conds.append(SupplierProduct.id.in_(id_list[start:start + _IN_CHUNK]))
+            rows = await db.scalars(select(SupplierProduct).where(SupplierProduct.supplier_id == supplier_id, or_(*conds)))
+            found.extend(rows.all())
+        return cls(found)
+
+    def get(self, sku: Optional[str]) -> Optional[SupplierProduct]:
+        sku = (sku or "").strip()
+        return self.by_sku.get(sku) if sku else None
+
+    def get_by_id(self, supplier_item_id: Optional[int]) -> Optional[SupplierProduct]:
+        return self.by_id.get(supplier_item_id) if supplier_item_id else None
+
+    def match(self, sku: Optional[str], title: Optional[str] = None) -> Tuple[Optional[SupplierProduct], Optional[str]]:
+        """``(SupplierProduct, sku_usado)`` según la precedencia del módulo; ``(None, sku)`` si no hay."""
+        sp = self.get(sku)
+        if sp is not None or not (sku or "").strip():
+            return sp, sku
+        for tok in title_tokens(title):
+            sp = self.by_sku.get(tok)
+            if sp is not None:
+                return sp, tok
+        return None, sku
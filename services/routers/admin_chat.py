@@ -14,15 +14,17 @@ Endpoints:
 
 from typing import Optional
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from pydantic import BaseModel, Field
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, desc, and_
+from sqlalchemy import select, func, and_
 from sqlalchemy.orm import selectinload
 
 from db.session import get_session
 from db.models import ChatSession, ChatMessage
 from services.auth import require_roles, SessionData
+from services.http_cache import etags_enabled, not_modified, row_version, weak_etag
+from services.pagination import COUNT_PATTERN, SortKey, paginate
 
 router = APIRouter(prefix="/admin/chats", tags=["Admin - Chat"])
 
@@ -73,9 +75,10 @@ class ChatSessionUpdate(BaseModel):
 class ChatSessionsListResponse(BaseModel):
     """Respuesta de lista de sesiones."""
     items: list[ChatSessionOut]
-    total: int
+    total: Optional[int]
     page: int
     page_size: int
+    next_cursor: Optional[str] = None
 
 
 # ==================== ENDPOINTS ====================
@@ -88,8 +91,13 @@ async def list_chat_sessions(
     user_identifier: Optional[str] = Query(None, description="Buscar por user_identifier (búsqueda parcial)"),
     date_from: Optional[str] = Query(None, description="Fecha desde (ISO format: YYYY-MM-DD)"),
     date_to: Optional[str] = Query(None, description="Fecha hasta (ISO format: YYYY-MM-DD)"),
+    cursor: Optional[str] = Query(None, description="Cursor opaco (next_cursor de la página anterior)"),
+    count: Optional[str] = Query(None, pattern=COUNT_PATTERN, description="Total: exact, estimate o none"),
     _session: SessionData = Depends(require_roles("admin", "colaborador")),
     db: AsyncSession = Depends(get_session),
+    *,
+    request: Request,
+    response: Response,
 ):
     """
     Lista sesiones de chat con paginación y filtros.
@@ -101,7 +109,22 @@ async def list_chat_sessions(
     - user_identifier: Búsqueda parcial en user_identifier
     - date_from: Filtrar sesiones desde esta fecha (basado en created_at)
     - date_to: Filtrar sesiones hasta esta fecha (basado en created_at)
+
+    Con ``HTTP_ETAGS=1`` responde 304 a ``If-None-Match`` antes de listar: la
+    versión sale del máximo ``updated_at``/``last_message_at`` de sesiones y del
+    máximo id de mensajes (índices existentes, sin ``count(*)``).
     """
+    etag = None
+    if etags_enabled():
+        version = await row_version(db, [
+            (ChatSession, [ChatSession.updated_at, ChatSession.last_message_at]),
+            (ChatMessage, [ChatMessage.id]),
+        ])
+        etag = weak_etag("admin_chats", request.url.query, *version)
+        early = not_modified(request, etag)
+        if early is not None:
+            return early
+
     # Construir query base
     query = select(ChatSession)
     filters = []
@@ -135,18 +158,15 @@ async def list_chat_sessions(
     if filters:
         query = query.where(and_(*filters))
     
-    # Contar total
-    count_query = select(func.count()).select_from(query.subquery())
-    total_result = await db.execute(count_query)
-    total = total_result.scalar() or 0
-    
-    # Aplicar paginación y ordenamiento
-    offset = (page - 1) * page_size
-    query = query.order_by(desc(ChatSession.last_message_at)).offset(offset).limit(page_size)
-    
-    # Ejecutar query
-    result = await db.execute(query)
-    sessions = result.scalars().all()
+    # Paginar por actividad reciente (sesiones sin mensajes primero, como en PostgreSQL)
+    page_result = await paginate(
+        db, query,
+        [SortKey(ChatSession.last_message_at, nullable=True), SortKey(ChatSession.session_id)],
+        page=page, page_size=page_size, cursor=cursor, count=count,
+        signature="chat_sessions:last_message_at:desc",
+        estimate_table=None if filters else "chat_sessions",
+    )
+    sessions = page_result.scalars()
     
     # Obtener conteo de mensajes para cada sesión
     session_ids = [s.session_id for s in sessions]
@@ -175,12 +195,15 @@ async def list_chat_sessions(
             "message_count": message_counts.get(session.session_id, 0),
         }
         items.append(ChatSessionOut(**session_dict))
-    
+
+    if etag:
+        response.headers["ETag"] = etag
     return ChatSessionsListResponse(
         items=items,
-        total=total,
+        total=page_result.total,
         page=page,
         page_size=page_size,
+        next_cursor=page_result.next_cursor,
     )
 
 
@@ -189,12 +212,29 @@ async def get_chat_session(
     session_id: str,
     _session: SessionData = Depends(require_roles("admin", "colaborador")),
     db: AsyncSession = Depends(get_session),
+    *,
+    request: Request,
+    response: Response,
 ):
     """
     Obtiene el detalle completo de una sesión de chat incluyendo todos sus mensajes.
     
     **Requiere rol**: admin o colaborador
+
+    Con ``HTTP_ETAGS=1`` responde 304 antes de cargar mensajes; la versión se
+    acota a la sesión (``ix_chat_messages_session_created``).
     """
+    etag = None
+    if etags_enabled():
+        version = await row_version(db, [
+            (ChatSession, [ChatSession.updated_at, ChatSession.last_message_at], ChatSession.session_id == session_id),
+            (ChatMessage, [ChatMessage.created_at], ChatMessage.session_id == session_id),
+        ])
+        etag = weak_etag("admin_chat", session_id, *version)
+        early = not_modified(request, etag)
+        if early is not None:
+            return early
+
     # Buscar sesión con mensajes
     stmt = (
         select(ChatSession)
@@ -209,7 +249,9 @@ async def get_chat_session(
     
     # Ordenar mensajes por fecha
     messages = sorted(session.messages, key=lambda m: m.created_at)
-    
+
+    if etag:
+        response.headers["ETag"] = etag
     return ChatSessionDetailOut(
         session=ChatSessionOut(
             session_id=session.session_id,
@@ -23,12 +23,13 @@ from datetime import datetime
 
 from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel, Field
-from sqlalchemy import select, and_, or_, func, desc
+from sqlalchemy import select, and_, or_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from db.models import MarketAlert, CanonicalProduct, User
 from db.session import get_session
 from services.auth import require_roles, current_session, SessionData
+from services.pagination import COUNT_PATTERN, SortKey, paginate
 from services.market.alerts import (
     resolve_alert,
     bulk_resolve_alerts,
@@ -78,10 +79,11 @@ class AlertResponse(AlertBase):
 class AlertListResponse(BaseModel):
     """Respuesta paginada de alertas."""
     items: List[AlertResponse]
-    total: int
+    total: Optional[int]
     page: int
     page_size: int
-    total_pages: int
+    total_pages: Optional[int]
+    next_cursor: Optional[str] = None
 
 
 class AlertStatsResponse(BaseModel):
@@ -125,6 +127,8 @@ async def list_alerts(
     severity: Optional[str] = Query(None, description="Filtrar por severidad (low, medium, high, critical)"),
     alert_type: Optional[str] = Query(None, description="Filtrar por tipo"),
     product_id: Optional[int] = Query(None, description="Filtrar por producto"),
+    cursor: Optional[str] = Query(None, description="Cursor opaco (next_cursor de la página anterior)"),
+    count: Optional[str] = Query(None, pattern=COUNT_PATTERN, description="Total: exact, estimate o none"),
     db: AsyncSession = Depends(get_session),
     _: None = Depends(require_roles("admin", "colaborador"))
 ):
@@ -158,23 +162,13 @@ async def list_alerts(
     if filters:
         query = query.where(and_(*filters))
     
-    # Ordenar por fecha de creación (más recientes primero)
-    query = query.order_by(desc(MarketAlert.created_at))
-    
-    # Contar total
-    count_query = select(func.count()).select_from(MarketAlert)
-    if filters:
-        count_query = count_query.where(and_(*filters))
-    
-    total = await db.scalar(count_query) or 0
-    
-    # Paginación
-    offset = (page - 1) * page_size
-    query = query.offset(offset).limit(page_size)
-    
-    # Ejecutar query
-    result = await db.execute(query)
-    alerts = result.scalars().all()
+    # Ordenar por fecha de creación (más recientes primero) y paginar
+    result = await paginate(
+        db, query, [SortKey(MarketAlert.created_at), SortKey(MarketAlert.id)],
+        page=page, page_size=page_size, cursor=cursor, count=count,
+        signature="alerts:created_at:desc", estimate_table=None if filters else "market_alerts",
+    )
+    alerts = result.scalars()
     
     # Construir respuestas
     items = []
@@ -204,15 +198,13 @@ async def list_alerts(
         )
         items.append(alert_data)
     
-    # Calcular total de páginas
-    total_pages = (total + page_size - 1) // page_size if total > 0 else 0
-    
     return AlertListResponse(
         items=items,
-        total=total,
+        total=result.total,
         page=page,
         page_size=page_size,
-        total_pages=total_pages
+        total_pages=result.pages,
+        next_cursor=result.next_cursor,
     )
 
 
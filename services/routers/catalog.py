@@ -46,7 +46,10 @@ from ai.router import AIRouter
 from ai.providers.openai_provider import OpenAIProvider
 from ai.types import Task
 from agent_core.detect_mcp_url import get_mcp_web_search_url
+from services import enrichment_jobs, http_clients
 from services.auth import require_csrf, require_roles, current_session, SessionData
+from services.pagination import SortKey, paginate
+from services.json_response import FastJSONResponse
 
 logger = logging.getLogger(__name__)
 
@@ -832,86 +835,264 @@ async def catalog_next_seq(
 
 
 # ------------------------------- Helper: Build Product Response -------------------------------
-async def _build_product_response(session: AsyncSession, product: Product) -> dict:
-    """Construye la respuesta completa de un producto con su info canónica.
-    
-    Devuelve SKU canónico (formato XXX_####_YYY) preferentemente.
+# Máximo de identificadores aceptados por /catalog/products/bulk_info
+BULK_INFO_MAX_ITEMS = int(os.getenv("BULK_INFO_MAX_ITEMS", "100"))
+
+
+async def _build_product_responses(session: AsyncSession, products: List[Product]) -> dict[int, dict]:
+    """Construye la respuesta completa (info canónica, precio, stock, tags, imagen) de varios productos.
+
+    Usa un número fijo de consultas (inventario, canónicos, variantes, tags, imágenes)
+    independientemente de la cantidad de productos. Devuelve un dict product_id -> respuesta.
     """
-    # Calcular stock real
-    stock = product.stock or 0
+    if not products:
+        return {}
+    ids = [p.id for p in products]
+
+    # Stock real desde inventario (suma por producto)
+    inv_totals: dict[int, int] = {}
     try:
-        inv_result = await session.execute(
-            select(func.sum(Inventory.stock_qty))
-            .join(Variant, Variant.id == Inventory.variant_id)
-            .where(Variant.product_id == product.id)
-        )
-        inv_total = inv_result.scalar()
-        if inv_total is not None:
-            stock = int(inv_total)
+        inv_rows = (
+            await session.execute(
+                select(Variant.product_id, func.sum(Inventory.stock_qty))
+                .join(Variant, Variant.id == Inventory.variant_id)
+                .where(Variant.product_id.in_(ids))
+                .group_by(Variant.product_id)
+            )
+        ).all()
+        inv_totals = {pid: int(total) for pid, total in inv_rows if total is not None}
     except Exception:
         pass
 
-    # Obtener info canónica vinculada
-    canonical_info = (
+    # Info canónica vinculada (primera por producto)
+    canonical_by_product: dict[int, CanonicalProduct] = {}
+    canon_rows = (
         await session.execute(
-            select(CanonicalProduct)
+            select(SupplierProduct.internal_product_id, CanonicalProduct)
             .join(ProductEquivalence, ProductEquivalence.canonical_product_id == CanonicalProduct.id)
             .join(SupplierProduct, SupplierProduct.id == ProductEquivalence.supplier_product_id)
-            .where(SupplierProduct.internal_product_id == product.id)
-            .limit(1)
+            .where(SupplierProduct.internal_product_id.in_(ids))
         )
-    ).scalars().first()
+    ).all()
+    for pid, canonical in canon_rows:
+        canonical_by_product.setdefault(pid, canonical)
 
-    # SKU preferido: canónico (formato XXX_####_YYY) sobre interno
-    canonical_sku = None
-    sale_price = None
-    canonical_name = None
-    
-    if canonical_info:
-        canonical_sku = canonical_info.sku_custom or canonical_info.ng_sku
-        canonical_name = canonical_info.name
-        if canonical_info.sale_price:
-            sale_price = float(canonical_info.sale_price)
-
-    # Si no hay precio canónico, intentar desde variante
-    if sale_price is None:
-        variant = (
-            await session.execute(
-                select(Variant).where(Variant.product_id == product.id).limit(1)
-            )
-        ).scalars().first()
-        if variant and (variant.promo_price or variant.price):
-            sale_price = float(variant.promo_price or variant.price)
+    # Precio desde variante (fallback si no hay precio canónico)
+    variant_price: dict[int, float] = {}
+    var_rows = (
+        await session.execute(
+            select(Variant.product_id, Variant.promo_price, Variant.price)
+            .where(Variant.product_id.in_(ids))
+            .order_by(Variant.id.asc())
+        )
+    ).all()
+    for pid, promo_price, price in var_rows:
+        if pid not in variant_price and (promo_price or price):
+            variant_price[pid] = float(promo_price or price)
 
-    # Obtener tags del producto
-    tags = []
+    # Tags del producto
+    tags_map: dict[int, list[str]] = {}
     try:
         from db.models import Tag, ProductTag
-        tag_result = (
+        tag_rows = (
             await session.execute(
-                select(Tag.name)
-                .join(ProductTag, ProductTag.tag_id == Tag.id)
-                .where(ProductTag.product_id == product.id)
+                select(ProductTag.product_id, Tag.name)
+                .join(Tag, ProductTag.tag_id == Tag.id)
+                .where(ProductTag.product_id.in_(ids))
             )
-        ).scalars().all()
-        tags = [f"#{tag}" for tag in tag_result] if tag_result else []
+        ).all()
+        for pid, tag_name in tag_rows:
+            tags_map.setdefault(pid, []).append(f"#{tag_name}")
     except Exception:
         # Si falla la consulta de tags, continuar sin tags
-        tags = []
+        tags_map = {}
+
+    # Imagen principal (misma prioridad que el listado de imágenes)
+    primary_image: dict[int, str] = {}
+    img_rows = (
+        await session.execute(
+            select(Image.product_id, Image.url)
+            .where(Image.product_id.in_(ids), Image.active == True)  # noqa: E712
+            .order_by(Image.product_id, Image.is_primary.desc(), Image.sort_order.asc().nulls_last(), Image.id.asc())
+        )
+    ).all()
+    for pid, url in img_rows:
+        primary_image.setdefault(pid, url)
+
+    out: dict[int, dict] = {}
+    for product in products:
+        canonical_info = canonical_by_product.get(product.id)
+        # SKU preferido: canónico (formato XXX_####_YYY) sobre interno
+        canonical_sku = None
+        canonical_name = None
+        sale_price = None
+        if canonical_info:
+            canonical_sku = canonical_info.sku_custom or canonical_info.ng_sku
+            canonical_name = canonical_info.name
+            if canonical_info.sale_price:
+                sale_price = float(canonical_info.sale_price)
+        if sale_price is None:
+            sale_price = variant_price.get(product.id)
+        out[product.id] = {
+            "product_id": product.id,
+            "sku": canonical_sku,  # SKU canónico (puede ser None si no hay)
+            "name": stylize_product_name(canonical_name or product.title) or "(sin nombre)",
+            "sale_price": sale_price,
+            "stock": inv_totals.get(product.id, product.stock or 0),
+            "description": getattr(product, 'description_html', None),
+            "technical_specs": getattr(product, 'technical_specs', None),
+            "usage_instructions": getattr(product, 'usage_instructions', None),
+            "tags": tags_map.get(product.id, []),  # Lista de tags formateados como ["#Organico", "#Floracion"]
+            "primary_image": primary_image.get(product.id),
+        }
+    return out
+
+
+async def _build_product_response(session: AsyncSession, product: Product) -> dict:
+    """Construye la respuesta completa de un producto con su info canónica.
+    
+    Devuelve SKU canónico (formato XXX_####_YYY) preferentemente.
+    """
+    return (await _build_product_responses(session, [product]))[product.id]
 
+
+def _canonical_only_response(canonical: CanonicalProduct) -> dict:
+    """Respuesta para un canónico sin producto interno vinculado."""
     return {
-        "product_id": product.id,
-        "sku": canonical_sku,  # SKU canónico (puede ser None si no hay)
-        "name": stylize_product_name(canonical_name or product.title) or "(sin nombre)",
-        "sale_price": sale_price,
-        "stock": stock,
-        "description": getattr(product, 'description_html', None),
-        "technical_specs": getattr(product, 'technical_specs', None),
-        "usage_instructions": getattr(product, 'usage_instructions', None),
-        "tags": tags,  # Lista de tags formateados como ["#Organico", "#Floracion"]
+        "product_id": None,
+        "sku": canonical.sku_custom or canonical.ng_sku,
+        "name": stylize_product_name(canonical.name) or "(sin nombre)",
+        "sale_price": float(canonical.sale_price) if canonical.sale_price else None,
+        "stock": 0,
+        "description": None,
+        "technical_specs": None,
+        "usage_instructions": None,
     }
 
 
+class _BulkInfoRequest(_PydModel):
+    product_ids: List[int] = []
+    skus: List[str] = []
+
+
+@router.post(
+    "/catalog/products/bulk_info",
+    dependencies=[Depends(require_roles("cliente", "proveedor", "colaborador", "admin"))],
+)
+async def catalog_products_bulk_info(
+    payload: _BulkInfoRequest,
+    session: AsyncSession = Depends(get_session),
+):
+    """Devuelve info canónica, precio, stock, tags e imagen principal de varios productos.
+
+    Pensado para agentes y el servidor MCP de productos: resuelve hasta
+    ``BULK_INFO_MAX_ITEMS`` IDs/SKUs con un número fijo de consultas. La resolución de
+    SKUs sigue la misma precedencia que ``/variants/lookup`` (canónico > Product.canonical_sku
+    > Product.sku_root > Variant.sku). Es de solo lectura (POST solo por el tamaño del payload).
+
+    Devuelve ``items`` (en el orden pedido: primero IDs, luego SKUs; cada item incluye
+    ``requested``) y ``not_found`` con los identificadores sin match.
+    """
+    product_ids = list(dict.fromkeys(payload.product_ids))
+    skus = list(dict.fromkeys(s.strip() for s in payload.skus if s and s.strip()))
+    if not product_ids and not skus:
+        raise HTTPException(status_code=400, detail={"code": "missing_sku_or_product_id"})
+    if len(product_ids) + len(skus) > BULK_INFO_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail={"code": "too_many_items", "max": BULK_INFO_MAX_ITEMS})
+
+    # Resolución de SKUs -> product_id (o canónico sin producto)
+    sku_to_pid: dict[str, int] = {}
+    sku_to_canonical: dict[str, CanonicalProduct] = {}
+    pending = {s.lower() for s in skus}
+    if pending:
+        canon_rows = (
+            await session.execute(
+                select(CanonicalProduct).where(
+                    or_(
+                        func.lower(CanonicalProduct.sku_custom).in_(pending),
+                        func.lower(CanonicalProduct.ng_sku).in_(pending),
+                    )
+                )
+            )
+        ).scalars().all()
+        for canonical in canon_rows:
+            for key in ((canonical.sku_custom or "").lower(), (canonical.ng_sku or "").lower()):
+                if key in pending:
+                    sku_to_canonical.setdefault(key, canonical)
+        if sku_to_canonical:
+            link_rows = (
+                await session.execute(
+                    select(ProductEquivalence.canonical_product_id, SupplierProduct.internal_product_id)
+                    .join(SupplierProduct, SupplierProduct.id == ProductEquivalence.supplier_product_id)
+                    .where(
+                        ProductEquivalence.canonical_product_id.in_({c.id for c in sku_to_canonical.values()}),
+                        SupplierProduct.internal_product_id.is_not(None),
+                    )
+                )
+            ).all()
+            first_pid: dict[int, int] = {}
+            for cid, pid in link_rows:
+                first_pid.setdefault(cid, pid)
+            for key, canonical in sku_to_canonical.items():
+                if canonical.id in first_pid:
+                    sku_to_pid[key] = first_pid[canonical.id]
+        pending -= set(sku_to_canonical)
+    if pending:
+        prod_rows = (
+            await session.execute(
+                select(Product.id, Product.canonical_sku, Product.sku_root).where(
+                    or_(
+                        func.lower(Product.canonical_sku).in_(pending),
+                        func.lower(Product.sku_root).in_(pending),
+                    )
+                )
+            )
+        ).all()
+        # Product.canonical_sku tiene prioridad sobre sku_root
+        for pid, canonical_sku, _ in prod_rows:
+            if canonical_sku and canonical_sku.lower() in pending:
+                sku_to_pid.setdefault(canonical_sku.lower(), pid)
+        for pid, _, sku_root in prod_rows:
+            if sku_root and sku_root.lower() in pending:
+                sku_to_pid.setdefault(sku_root.lower(), pid)
+        pending -= set(sku_to_pid)
+    if pending:
+        var_rows = (
+            await session.execute(
+                select(Variant.sku, Variant.product_id).where(func.lower(Variant.sku).in_(pending))
+            )
+        ).all()
+        for vsku, pid in var_rows:
+            if pid:
+                sku_to_pid.setdefault(vsku.lower(), pid)
+
+    wanted_ids = set(product_ids) | set(sku_to_pid.values())
+    products = (
+        (await session.execute(select(Product).where(Product.id.in_(wanted_ids)))).scalars().all()
+        if wanted_ids
+        else []
+    )
+    responses = await _build_product_responses(session, list(products))
+
+    items: list[dict] = []
+    not_found: list = []
+    for pid in product_ids:
+        if pid in responses:
+            items.append({**responses[pid], "requested": pid})
+        else:
+            not_found.append(pid)
+    for sku in skus:
+        key = sku.lower()
+        pid = sku_to_pid.get(key)
+        if pid is not None and pid in responses:
+            items.append({**responses[pid], "requested": sku})
+        elif key in sku_to_canonical:
+            items.append({**_canonical_only_response(sku_to_canonical[key]), "requested": sku})
+        else:
+            not_found.append(sku)
+    return {"items": items, "not_found": not_found, "count": len(items)}
+
+
 # ------------------------------- Variants Lookup (para MCP Products) -------------------------------
 @router.get(
     "/variants/lookup",
@@ -980,16 +1161,7 @@ async def variants_lookup(
             return await _build_product_response(session, product_row)
         
         # Si no hay producto vinculado, devolver info del canónico
-        return {
-            "product_id": None,
-            "sku": canonical.sku_custom or canonical.ng_sku,
-            "name": stylize_product_name(canonical.name) or "(sin nombre)",
-            "sale_price": float(canonical.sale_price) if canonical.sale_price else None,
-            "stock": 0,
-            "description": None,
-            "technical_specs": None,
-            "usage_instructions": None,
-        }
+        return _canonical_only_response(canonical)
 
     # 2. Buscar por SKU canónico en Product (Product.canonical_sku) - preferido
     product = (
@@ -2174,6 +2346,7 @@ async def _category_path(session: AsyncSession, category_id: int | None) -> str
 
 @router.get(
     "/products",
+    response_class=FastJSONResponse,
     dependencies=[
         Depends(require_roles("cliente", "proveedor", "colaborador", "admin"))
     ],
@@ -2189,10 +2362,55 @@ async def list_products(
     sort_by: str = "updated_at",
     order: str = "desc",
     type: Optional[str] = Query(None, pattern="^(all|canonical|supplier)$"),
+    cursor: Optional[str] = None,
+    count: Optional[str] = None,
     *,
     session: AsyncSession = Depends(get_session),
+) -> FastJSONResponse:
+    """Lista productos de proveedores con filtros, orden y paginación (ver ``products_page``).
+
+    La página se serializa directo con ``FastJSONResponse``, sin ``jsonable_encoder``.
+    """
+    return FastJSONResponse(
+        await products_page(
+            supplier_id=supplier_id,
+            category_id=category_id,
+            q=q,
+            stock=stock,
+            created_since_days=created_since_days,
+            page=page,
+            page_size=page_size,
+            sort_by=sort_by,
+            order=order,
+            type=type,
+            cursor=cursor,
+            count=count,
+            session=session,
+        )
+    )
+
+
+async def products_page(
+    supplier_id: Optional[int] = None,
+    category_id: Optional[int] = None,
+    q: Optional[str] = None,
+    stock: Optional[str] = None,
+    created_since_days: Optional[int] = None,
+    page: int = 1,
+    page_size: int = 20,
+    sort_by: str = "updated_at",
+    order: str = "desc",
+    type: Optional[str] = None,
+    cursor: Optional[str] = None,
+    count: Optional[str] = None,
+    *,
+    session: AsyncSession,
 ) -> dict:
-    """Lista productos de proveedores con filtros, orden y paginación."""
+    """Página de productos de proveedores con filtros, orden y paginación.
+
+    Paginación por ``page``/``page_size`` o por ``cursor`` (keyset sobre la columna
+    de orden + id del ítem de proveedor, ver ``services.pagination``).
+    """
 
     max_page = int(os.getenv("PRODUCTS_PAGE_MAX", "100"))
     if page < 1 or page_size < 1 or page_size > max_page:
@@ -2267,9 +2485,6 @@ async def list_products(
         elif type == "supplier":
             stmt = stmt.where(eq.canonical_product_id.is_(None))
 
-    count_stmt = select(func.count()).select_from(stmt.subquery())
-    total = await session.scalar(count_stmt) or 0
-
     sort_map = {
         ProductSortBy.updated_at: sp.last_seen_at,
         ProductSortBy.precio_venta: sp.current_sale_price,
@@ -2277,16 +2492,20 @@ async def list_products(
         ProductSortBy.name: p.title,
         ProductSortBy.created_at: p.created_at,
     }
-    sort_col = sort_map[sort_by_enum]
-    sort_col = sort_col.asc() if order_enum == SortOrder.asc else sort_col.desc()
-
-    stmt = (
-        stmt.order_by(sort_col)
-        .offset((page - 1) * page_size)
-        .limit(page_size)
+    descending = order_enum != SortOrder.asc
+    nullable_sorts = {ProductSortBy.updated_at, ProductSortBy.precio_venta, ProductSortBy.precio_compra}
+    keys = [
+        SortKey(sort_map[sort_by_enum], descending=descending, nullable=sort_by_enum in nullable_sorts),
+        SortKey(sp.id, descending=descending),
+    ]
+    unfiltered = all(v is None for v in (supplier_id, category_id, stock, created_since_days)) and not q and type in (None, "all")
+    page_result = await paginate(
+        session, stmt, keys,
+        page=page, page_size=page_size, cursor=cursor, count=count,
+        signature=f"products:{sort_by_enum.value}:{order_enum.value}",
+        estimate_table="supplier_products" if unfiltered else None,
     )
-    result = await session.execute(stmt)
-    rows = result.all()
+    rows = page_result.rows
 
     # Prefetch primer SKU por producto para evitar N+1
     product_ids = [p_obj.id for _, p_obj, *_ in rows]
@@ -2415,8 +2634,9 @@ async def list_products(
     return {
         "page": page,
         "page_size": page_size,
-        "total": total,
+        "total": page_result.total,
         "items": items,
+        "next_cursor": page_result.next_cursor,
     }
 
 
@@ -3210,9 +3430,10 @@ async def update_product_stock(
 
 @router.get(
     "/products/{product_id}",
+    response_class=FastJSONResponse,
     dependencies=[Depends(require_roles("guest", "cliente", "proveedor", "colaborador", "admin"))],
 )
-async def get_product(product_id: int, session: AsyncSession = Depends(get_session)):
+async def get_product(product_id: int, session: AsyncSession = Depends(get_session)) -> FastJSONResponse:
     prod = await session.get(Product, product_id)
     if not prod:
         raise HTTPException(status_code=404, detail="Producto no encontrado")
@@ -3314,7 +3535,7 @@ async def get_product(product_id: int, session: AsyncSession = Depends(get_sessi
     ).all()
     tags = [{"id": tag_id, "name": tag_name} for tag_id, tag_name in tag_rows]
 
-    return {
+    return FastJSONResponse({
         "id": prod.id,
         "title": stylize_product_name(prod.title),
         "preferred_title": preferred_title,
@@ -3350,7 +3571,7 @@ async def get_product(product_id: int, session: AsyncSession = Depends(get_sessi
             for im in imgs
         ],
         "tags": tags,
-    }
+    })
 
 
 # ------------------------------ Variantes por producto ------------------------------
@@ -3483,84 +3704,99 @@ async def patch_product(product_id: int, payload: ProductUpdate, session: AsyncS
 )
 async def enrich_multiple_products(
     payload: EnrichMultipleRequest,
+    wait: bool = Query(False, description="Esperar a que termine el job (compatibilidad)"),
     session: AsyncSession = Depends(get_session),
-    request: Request = None,
     sess: SessionData = Depends(current_session),
-) -> dict:
-    """Encola/ejecuta enriquecimiento para múltiples productos.
+):
+    """Crea un job de enriquecimiento masivo y responde 202 con su ``job_id``.
 
-    Reglas:
-    - Máximo 20 IDs por solicitud.
-    - Se ignoran productos sin título.
+    Reglas (por ítem, al procesarse):
+    - Máximo ``ENRICH_BULK_MAX`` IDs por solicitud (200 por defecto).
+    - Se omiten productos inexistentes, sin título o en enriquecimiento.
     - Si `force` es False, se omiten productos ya enriquecidos (description o fuentes).
-    - Reutiliza el flujo de `enrich_product` (ejecución inline para MVP).
+    - Cada ítem reutiliza el flujo de `enrich_product`; ver ``services/enrichment_jobs.py``.
+
+    Progreso en ``GET /products/enrich-jobs/{job_id}`` (o SSE en ``/events``). Con
+    ``wait=true`` espera y devuelve ``{enriched, skipped, errors}`` como antes.
     """
     ids = list(dict.fromkeys(payload.ids or []))
     if not ids:
         raise HTTPException(status_code=400, detail="ids requerido")
-    if len(ids) > 20:
-        raise HTTPException(status_code=400, detail="Máximo 20 productos por lote")
+    max_ids = int(os.getenv("ENRICH_BULK_MAX", "200") or 200)
+    if len(ids) > max_ids:
+        raise HTTPException(status_code=400, detail=f"Máximo {max_ids} productos por lote")
+
+    user = getattr(sess, "user", None)
+    job = await enrichment_jobs.create_job(
+        session,
+        ids,
+        force=bool(payload.force),
+        user_id=getattr(user, "id", None),
+        role=getattr(user, "role", None) or getattr(sess, "role", None) or "colaborador",
+    )
+    enrichment_jobs.start(job.id)
+    if wait:
+        await enrichment_jobs.wait(job.id)
+        c = await enrichment_jobs.counts(session, job.id)
+        snap = await enrichment_jobs.snapshot(session, job.id)
+        errors = [it["product_id"] for it in (snap or {}).get("items", []) if it["status"] == "error"]
+        return {"job_id": job.id, "enriched": c["done"], "skipped": c["skipped"], "errors": errors}
+    return JSONResponse(status_code=202, content={"status": "accepted", "job_id": job.id, "total": len(ids)})
 
-    enriched = 0
-    skipped = 0
-    errors: list[int] = []
-    for pid in ids:
-        prod = await session.get(Product, pid)
-        if not prod:
-            skipped += 1
-            continue
 
-        # Chequear si ya está en proceso de enriquecimiento
-        if getattr(prod, 'is_enriching', False):
-            errors.append(pid)
-            continue
+@router.get(
+    "/products/enrich-jobs/{job_id}",
+    dependencies=[Depends(require_roles("admin", "colaborador"))],
+)
+async def get_enrich_job(job_id: int, session: AsyncSession = Depends(get_session)) -> dict:
+    """Estado del job: conteos por estado, progreso (%) y estado por producto."""
+    snap = await enrichment_jobs.snapshot(session, job_id)
+    if snap is None:
+        raise HTTPException(status_code=404, detail="Job no encontrado")
+    return snap
 
-        title_ok = bool((prod.title or '').strip())
-        if not title_ok:
-            skipped += 1
-            continue
-        already = bool((prod.enrichment_sources_url or '').strip()) or bool((prod.description_html or '').strip())
-        if already and not payload.force:
-            skipped += 1
-            continue
-        try:
-            # reusar la lógica existente
-            await enrich_product(pid, session=session, request=request, sess=sess, force=bool(payload.force))
-            enriched += 1
-        except HTTPException as e:
-            # Si el error es 409 (conflicto), significa que el bloqueo se activó entre el chequeo y la ejecución
-            if e.status_code == 409:
-                skipped += 1
-            errors.append(pid)
-            continue
-        except Exception:
-            errors.append(pid)
-            # continuar con el siguiente sin abortar lote
-            continue
 
-    # Audit resumen de lote
-    try:
-        session.add(
-            AuditLog(
-                action="bulk_enrich",
-                table="products",
-                entity_id=None,
-                meta={
-                    "requested": len(ids),
-                    "enriched": enriched,
-                    "skipped": skipped,
-                    "errors": errors,
-                    "ids": ids,
-                },
-                user_id=sess.user.id if sess and sess.user else None,
-                ip=(request.client.host if request and request.client else None),
-            )
-        )
-        await session.commit()
-    except Exception:
-        pass
+@router.get(
+    "/products/enrich-jobs/{job_id}/events",
+    dependencies=[Depends(require_roles("admin", "colaborador"))],
+)
+async def stream_enrich_job(job_id: int, poll: float = Query(1.0, ge=0.2, le=10.0)):
+    """SSE con el progreso del job hasta que termina (``done``/``cancelled``)."""
+    from db.session import SessionLocal as _SessionLocal
+    import asyncio as _asyncio
+    import json as _json
 
-    return {"enriched": enriched, "skipped": skipped, "errors": errors}
+    async def event_gen():
+        last = None
+        while True:
+            try:
+                async with _SessionLocal() as db:
+                    snap = await enrichment_jobs.snapshot(db, job_id, with_items=False)
+            except _asyncio.CancelledError:  # client disconnected
+                break
+            if snap is None:
+                yield 'data: {"error": "not_found"}\n\n'
+                break
+            payload = _json.dumps(snap, ensure_ascii=False)
+            if payload != last:
+                yield f"data: {payload}\n\n"
+                last = payload
+            if snap["status"] in enrichment_jobs.TERMINAL:
+                break
+            await _asyncio.sleep(poll)
+
+    return StreamingResponse(event_gen(), media_type="text/event-stream")
+
+
+@router.post(
+    "/products/enrich-jobs/{job_id}/cancel",
+    dependencies=[Depends(require_csrf), Depends(require_roles("admin", "colaborador"))],
+)
+async def cancel_enrich_job(job_id: int, session: AsyncSession = Depends(get_session)) -> dict:
+    """Cancela un job: los ítems pendientes no se procesan (los en curso terminan)."""
+    if not await enrichment_jobs.cancel(session, job_id):
+        raise HTTPException(status_code=409, detail="El job no está en curso")
+    return {"status": "cancelled", "job_id": job_id}
 
 
 @router.get(
@@ -3875,18 +4111,16 @@ async def enrich_product(
         logger.info({"event": "enrich.web_search.start", "product_id": product_id})
         
         # Health check del servicio MCP Web Search
-        import httpx as _httpx
         mcp_url = get_mcp_web_search_url()
         health_url = mcp_url.replace("/invoke_tool", "/health")
         web_health = "unknown"
         
         try:
-            async with _httpx.AsyncClient(timeout=5.0) as _cli:
-                _h = await _cli.get(health_url)
-                if _h.status_code == 200:
-                    web_health = "ok"
-                else:
-                    web_health = f"bad_status_{_h.status_code}"
+            _h = await http_clients.get_client("mcp_web_search").get(health_url, timeout=5.0)
+            if _h.status_code == 200:
+                web_health = "ok"
+            else:
+                web_health = f"bad_status_{_h.status_code}"
         except Exception as e:
             web_health = "unhealthy"
             logger.error({
@@ -3914,13 +4148,11 @@ async def enrich_product(
         provider = OpenAIProvider()
         
         try:
-            wres = await provider.call_mcp_web_tool(
-                tool_name="search_web",
-                parameters={
-                    "query": web_query,
-                    "user_role": role,
-                    "max_results": int(_os.getenv("AI_WEB_SEARCH_MAX_RESULTS", "5"))
-                }
+            # Caché por consulta: lotes con títulos repetidos no repiten la búsqueda.
+            # El re-enriquecimiento forzado de un producto individual busca de nuevo.
+            wres = await enrichment_jobs.search_web_cached(
+                provider, web_query, role, int(_os.getenv("AI_WEB_SEARCH_MAX_RESULTS", "5")),
+                refresh=bool(force) and enrichment_jobs.current_job.get() is None,
             )
             if isinstance(wres, dict) and wres:
                 items = wres.get("items") or []
@@ -4036,6 +4268,15 @@ async def enrich_product(
             except Exception:
                 pass
 
+        # En jobs masivos: resultados de la búsqueda por marca compartidos entre productos de la misma marca
+        brand_results = enrichment_jobs.brand_context.get()
+        if brand_results:
+            try:
+                import json as _json
+                prompt += "\n\n========== RESULTADOS DE BÚSQUEDA WEB (marca / fabricante) ==========\n" + _json.dumps(brand_results, ensure_ascii=False, indent=2)
+            except Exception:
+                pass
+
         router_ai = AIRouter(settings)
         raw = await router_ai.run_async(Task.REASONING.value, prompt)
         
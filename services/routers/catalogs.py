@@ -16,7 +16,7 @@ import csv
 from io import StringIO
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload
@@ -24,6 +24,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from db.models import Product, Image, Category, ProductEquivalence, SupplierProduct, CanonicalProduct
 from db.session import get_session
+from services import catalog_pdf
 from services.auth import require_roles, require_csrf, current_session, SessionData
 
 logger = logging.getLogger("growen.catalogs")
@@ -37,6 +38,8 @@ DETAIL_LOG_DIR = LOG_DIR / "detail"
 LOG_DIR.mkdir(parents=True, exist_ok=True)
 DETAIL_LOG_DIR.mkdir(parents=True, exist_ok=True)
 CATALOG_DIR.mkdir(parents=True, exist_ok=True)
+# Fragmentos PDF por categoría y miniaturas reutilizados entre generaciones
+RENDER_CACHE_DIR = CATALOG_DIR / ".cache"
 
 RETENTION = int(os.getenv("CATALOG_RETENTION", "0") or 0)  # 0 = ilimitado
 
@@ -63,89 +66,9 @@ def _category_root(cat_map: Dict[int, Category], category_id: int | None) -> str
     return name or "Sin categoría"
 
 
-def _build_html(groups: Dict[str, list[dict[str, Any]]]) -> str:
-    css = """
-    <style>
-    body { font-family: 'Helvetica','Arial',sans-serif; background:#111; color:#eee; margin:0; padding:32px; }
-    h1 { color:#f0f; text-align:center; margin-top:0; }
-    h2 { color:#22c55e; border-bottom:1px solid #333; padding-bottom:4px; margin-top:40px; }
-    .cat-list { columns:2; column-gap:40px; }
-    .cat-item { break-inside:avoid; margin:2px 0; font-size:14px; }
-    .price { color:#f0f; font-weight:600; }
-    .grid-page { display:grid; grid-template-columns:1fr 1fr; grid-template-rows:1fr 1fr; gap:28px; page-break-after:always; padding:16px 0; }
-    .card { background:#1d1d1d; border:1px solid #333; border-radius:8px; padding:12px; display:flex; flex-direction:column; }
-    .card h3 { margin:4px 0 8px; font-size:16px; line-height:1.2; color:#fff; }
-    .card img { max-width:100%; max-height:180px; object-fit:contain; margin:0 auto 8px; filter: drop-shadow(0 0 4px #000); }
-    .desc { font-size:12px; line-height:1.35; color:#bbb; margin-top:auto; white-space:pre-wrap; }
-    footer { text-align:center; font-size:10px; color:#666; margin-top:60px; }
-    @page { size:A4; margin:20mm 15mm; background:#111; }
-    </style>
-    """
-    # Listado por categoría
-    parts = ["<html><head>", css, "</head><body>"]
-    parts.append("<h1>Catálogo</h1><section id='listado'>")
-    for cat in sorted(groups.keys()):
-        items = groups[cat]
-        parts.append(f"<h2>{cat}</h2><div class='cat-list'>")
-        for p in items:
-            price = f"<span class='price'>$ {p['price']:.2f}</span>" if p.get("price") is not None else ""
-            parts.append(f"<div class='cat-item'>{p['title']} {price}</div>")
-        parts.append("</div>")
-    parts.append("</section><section id='fichas'>")
-    # Fichas (no mezclar categorías en misma página)
-    for cat in sorted(groups.keys()):
-        items = groups[cat]
-        # slice each 4
-        for i in range(0, len(items), 4):
-            chunk = items[i:i+4]
-            parts.append("<div class='grid-page'>")
-            for p in chunk:
-                img_html = f"<img src='{p['image']}' alt='img'/>" if p.get("image") else ""
-                desc = (p.get("description") or "").strip()
-                if len(desc) > 600:
-                    desc = desc[:600] + "…"
-                price = f"<div class='price'>$ {p['price']:.2f}</div>" if p.get("price") is not None else ""
-                parts.append("<div class='card'>" + img_html + f"<h3>{p['title']}</h3>{price}<div class='desc'>{desc}</div></div>")
-            parts.append("</div>")
-    parts.append("</section><footer>Generado: " + datetime.utcnow().isoformat() + " UTC</footer></body></html>")
-    return "".join(parts)
-
-
-def _render_pdf(html: str) -> bytes:
-    # Prefer WeasyPrint
-    try:
-        from weasyprint import HTML  # type: ignore
-        return HTML(string=html).write_pdf()
-    except Exception:  # pragma: no cover - fallback
-        try:
-            # Minimal fallback with reportlab: render plain text (degraded)
-            from reportlab.lib.pagesizes import A4  # type: ignore
-            from reportlab.pdfgen import canvas  # type: ignore
-            from io import BytesIO
-            buf = BytesIO()
-            c = canvas.Canvas(buf, pagesize=A4)
-            text = c.beginText(40, A4[1]-40)
-            text.textLine("Catálogo (fallback texto)")
-            for line in html.splitlines():
-                if len(line) > 100:
-                    line = line[:100]
-                text.textLine(line)
-                if text.getY() < 60:
-                    c.drawText(text)
-                    c.showPage()
-                    text = c.beginText(40, A4[1]-40)
-            c.drawText(text)
-            c.showPage()
-            c.save()
-            return buf.getvalue()
-        except Exception as e:  # pragma: no cover
-            logger.exception("Fallo render PDF fallback: %s", e)
-            raise HTTPException(500, detail="No se pudo generar el PDF")
-
-
 MAX_DETAIL_LOGS = 40  # cantidad máxima de logs detallados que se conservan
 # Estado actual de generación en memoria
-_active_generation: dict[str, Any] = {"running": False, "started_at": None, "ids": 0}
+_active_generation: dict[str, Any] = {"running": False, "started_at": None, "ids": 0, "job_id": None}
 # Timeout automático para limpieza del lock (segundos). Por defecto 15 minutos.
 try:
     CATALOG_LOCK_TIMEOUT = int(os.getenv("CATALOG_LOCK_TIMEOUT", "900"))
@@ -199,13 +122,23 @@ def _apply_retention():
 
 
 @router.post("/generate", dependencies=[Depends(require_roles("admin", "colaborador")), Depends(require_csrf)])
-async def generate_catalog(data: CatalogGenerateIn, session: AsyncSession = Depends(get_session), session_data: SessionData = Depends(current_session)):
+async def generate_catalog(
+    data: CatalogGenerateIn,
+    wait: bool = Query(False, description="Esperar el render y devolver el resultado (compatibilidad)"),
+    session: AsyncSession = Depends(get_session),
+    session_data: SessionData = Depends(current_session),
+):
+    """Arma los datos del catálogo y encola el render del PDF.
+
+    Responde 202 con ``job_id``; el progreso se consulta en ``GET /catalogs/jobs/{job_id}``.
+    Con ``wait=true`` espera al job y devuelve el resultado como antes.
+    """
     _maybe_expire_lock()
     if not data.ids:
         raise HTTPException(400, detail="No hay productos seleccionados")
     if _active_generation["running"]:
         raise HTTPException(409, detail="Ya hay una generación en curso")
-    _active_generation.update({"running": True, "started_at": datetime.utcnow().isoformat(), "ids": len(data.ids)})
+    _active_generation.update({"running": True, "started_at": datetime.utcnow().isoformat(), "ids": len(data.ids), "job_id": None})
     start_ts = datetime.utcnow()
     logger.info("[catalog] start ids=%d user=%s", len(data.ids), getattr(session_data.user, 'id', None))
     detail_lines: list[str] = []
@@ -308,10 +241,29 @@ async def generate_catalog(data: CatalogGenerateIn, session: AsyncSession = Depe
     for lst in groups.values():
         lst.sort(key=lambda x: x["title"].lower())
     log_step("groups_built", groups=len(groups))
-    html = _build_html(groups)
-    log_step("html_built", size=len(html))
-    pdf_bytes = _render_pdf(html)
-    log_step("pdf_rendered", bytes=len(pdf_bytes))
+    count = len(products)
+
+    def _persist(pdf_bytes: bytes, job: catalog_pdf.CatalogJob) -> dict[str, Any]:
+        log_step("pdf_rendered", bytes=len(pdf_bytes), job=job.id, fragments=job.fragments_total, reused=job.fragments_reused)
+        return _write_catalog(pdf_bytes, count=count, start_ts=start_ts, log_step=log_step, detail_lines=detail_lines)
+
+    def _release(job: catalog_pdf.CatalogJob) -> None:
+        if _active_generation.get("job_id") == job.id:
+            _active_generation.update({"running": False})
+
+    job = catalog_pdf.submit(groups, count=count, cache_dir=RENDER_CACHE_DIR, on_done=_persist, on_finish=_release)
+    _active_generation["job_id"] = job.id
+    log_step("job_queued", job=job.id)
+    if wait:
+        job = await catalog_pdf.wait(job.id) or job
+        if job.status != "done":
+            raise HTTPException(500, detail="No se pudo generar el PDF")
+        return job.result
+    return JSONResponse(status_code=202, content={"status": "accepted", "job_id": job.id, "count": count})
+
+
+def _write_catalog(pdf_bytes: bytes, *, count: int, start_ts: datetime, log_step, detail_lines: list[str]) -> dict[str, Any]:
+    """Escribe el PDF, actualiza el alias latest, retención y logs (corre en un thread)."""
     ts = datetime.utcnow()
     fname = _catalog_filename(ts)
     target = CATALOG_DIR / fname
@@ -319,7 +271,7 @@ async def generate_catalog(data: CatalogGenerateIn, session: AsyncSession = Depe
     log_step("pdf_written", file=fname, bytes=len(pdf_bytes))
     # Actualizar alias latest
     try:
-        if PDF_PATH.exists():
+        if PDF_PATH.exists() or PDF_PATH.is_symlink():
             PDF_PATH.unlink()
         # Crear symlink si el SO lo permite, sino copiar
         try:
@@ -337,8 +289,8 @@ async def generate_catalog(data: CatalogGenerateIn, session: AsyncSession = Depe
     logger.info("[catalog] ok file=%s size=%dB dur_ms=%d", target, len(pdf_bytes), dur_ms)
     # Generar resumen simple de logs antes de limpiar
     try:
-        summary = {"generated_at": ts.isoformat(), "file": fname, "size": len(pdf_bytes), "count": len(products), "duration_ms": dur_ms}
-        (LOG_DIR / f"summary_{ts.strftime('%Y%m%d_%H%M%S')}.json").write_text(__import__('json').dumps(summary, ensure_ascii=False, indent=2))
+        summary = {"generated_at": ts.isoformat(), "file": fname, "size": len(pdf_bytes), "count": count, "duration_ms": dur_ms}
+        (LOG_DIR / f"summary_{ts.strftime('%Y%m%d_%H%M%S')}.json").write_text(json.dumps(summary, ensure_ascii=False, indent=2))
         log_step("summary_written")
     except Exception:
         logger.exception("No se pudo escribir summary de catálogo")
@@ -348,17 +300,25 @@ async def generate_catalog(data: CatalogGenerateIn, session: AsyncSession = Depe
     except Exception:
         logger.exception("No se pudo escribir log detallado de catálogo")
     _clean_old_logs()
-    _active_generation.update({"running": False})
     return {
         "message": "ok",
         "generated_at": ts.isoformat(),
-        "count": len(products),
+        "count": count,
         "id": fname.removeprefix("catalog_").removesuffix(".pdf"),
         "filename": fname,
         "size": len(pdf_bytes),
     }
 
 
+@router.get("/jobs/{job_id}", dependencies=[Depends(require_roles("admin", "colaborador"))])
+async def catalog_job_status(job_id: str):
+    """Estado/progreso de un job de generación (``queued``/``running``/``done``/``error``)."""
+    job = await catalog_pdf.job_status(job_id)
+    if job is None:
+        raise HTTPException(404, detail="Job no encontrado")
+    return job
+
+
 @router.get("", dependencies=[Depends(require_roles("admin", "colaborador"))])
 async def list_catalogs(
     page: int = Query(1, ge=1),
@@ -547,8 +507,10 @@ async def download_latest():
 @router.get("/diagnostics/status", dependencies=[Depends(require_roles("admin", "colaborador"))])
 async def catalog_status():
     _maybe_expire_lock()
+    job_id = _active_generation.get("job_id")
     return {
         "active_generation": _active_generation,
+        "job": await catalog_pdf.job_status(job_id) if job_id else None,
         "detail_logs": len(list(DETAIL_LOG_DIR.glob('catalog_*.log'))),
         "summaries": len(list(LOG_DIR.glob('summary_*.json')))
     }
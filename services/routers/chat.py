@@ -278,11 +278,11 @@ async def chat_endpoint(
     # Para ventas conversacionales, agregamos sales_flow al estado existente
 
     # 3. Primero, gestionar flujo de aclaración si hay memoria pendiente
-    memory_state = get_memory(memory_key)
+    memory_state = await get_memory(memory_key)
     if memory_state and memory_state.pending_clarification:
         normalized = normalize_followup_text(user_text)
         if not normalized:
-            mark_prompted(memory_key)
+            await mark_prompted(memory_key)
             terms = memory_terms_text(memory_state.query)
             return ChatOut(text=clarify_prompt_text(terms), type="clarify_prompt", intent="clarify")
         if normalized in CLARIFY_CONFIRM_WORDS:
@@ -293,15 +293,15 @@ async def chat_endpoint(
                 result = await resolve_price(prior_query_text, db, limit=5)
                 payload = serialize_result(result, include_metrics=include_metrics)
                 text = render_product_response(result)
-                clear_memory(memory_key)
+                await clear_memory(memory_key)
                 return ChatOut(text=text, type="product_answer", intent=result.intent, data=payload, took_ms=payload.get("took_ms"))
             except Exception:
                 logger.exception("chat.local_price_confirm_error")
-                clear_memory(memory_key)
+                await clear_memory(memory_key)
                 return ChatOut(text="Error resolviendo información de producto.", type="error", intent="clarify")
         tokens = normalized.split()
         if len(tokens) <= 3 and not memory_state.prompted:
-            mark_prompted(memory_key)
+            await mark_prompted(memory_key)
             terms = memory_terms_text(memory_state.query)
             return ChatOut(text=clarify_prompt_text(terms), type="clarify_prompt", intent="clarify")
 
@@ -503,7 +503,7 @@ async def chat_endpoint(
                 # No fallar el request, continuar con la respuesta
             
             # Retornar respuesta del LLM
-            clear_memory(memory_key)
+            await clear_memory(memory_key)
             return ChatOut(text=answer, type="product_answer", intent="product_tool")
                 
         except Exception as e:
@@ -518,9 +518,9 @@ async def chat_endpoint(
             text = render_product_response(result)
             # Si hay ambigüedad, almacenamos memoria para el flujo de aclaración
             if payload.get("needs_clarification"):
-                ensure_memory(memory_key, result.query, pending=True, rendered=text)
+                await ensure_memory(memory_key, result.query, pending=True, rendered=text)
             else:
-                clear_memory(memory_key)
+                await clear_memory(memory_key)
             return ChatOut(text=text, type="product_answer", intent=result.intent, data=payload, took_ms=payload.get("took_ms"))
         except Exception:
             logger.exception("chat.local_price_fallback_error")
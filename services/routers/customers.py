@@ -14,6 +14,7 @@ from sqlalchemy import select, func, or_, case, literal
 from db.session import get_session
 from db.models import Customer, Sale, AuditLog
 from services.auth import require_roles, require_csrf, current_session, SessionData
+from services.pagination import COUNT_PATTERN, SortKey, paginate
 
 router = APIRouter(prefix="/customers", tags=["customers"])
 
@@ -81,11 +82,13 @@ async def list_customers(
     page_size: int = 50,
     kind: Optional[str] = Query(None, description="Filtrar por tipo de cliente"),
     only_active: bool = Query(True, description="Solo clientes activos"),
+    cursor: Optional[str] = Query(None, description="Cursor opaco (next_cursor de la página anterior)"),
+    count: Optional[str] = Query(None, pattern=COUNT_PATTERN),
     db: AsyncSession = Depends(get_session),
 ):
     page = max(1, int(page or 1))
     page_size = min(200, max(1, int(page_size or 50)))
-    stmt = select(Customer).order_by(Customer.name.asc())
+    stmt = select(Customer)
     if only_active:
         stmt = stmt.where(Customer.is_active == True)
     if q:
@@ -102,8 +105,11 @@ async def list_customers(
     if kind:
         norm_kind = kind.strip().lower()
         stmt = stmt.where(Customer.kind == norm_kind)
-    total = await db.scalar(select(func.count()).select_from(stmt.subquery()))
-    rows = (await db.execute(stmt.limit(page_size).offset((page - 1) * page_size))).scalars().all()
+    result = await paginate(
+        db, stmt, [SortKey(Customer.name, descending=False), SortKey(Customer.id, descending=False)],
+        page=page, page_size=page_size, cursor=cursor, count=count, signature="customers:name:asc",
+    )
+    rows = result.scalars()
 
     def _serialize(c: Customer) -> dict:
         return {
@@ -124,9 +130,10 @@ async def list_customers(
 
     return {
         "items": [_serialize(c) for c in rows],
-        "total": int(total or 0),
+        "total": result.total,
         "page": page,
-        "pages": ((int(total or 0) + page_size - 1) // page_size) if total else 0,
+        "pages": result.pages,
+        "next_cursor": result.next_cursor,
     }
 
 
@@ -6,10 +6,12 @@
 
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends, Query
 import logging
-from fastapi.responses import StreamingResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
-from datetime import datetime, date
+from sqlalchemy import insert, select, func
+import asyncio
+import pandas as pd
+from datetime import datetime
 from io import BytesIO
 from openpyxl import Workbook
 from openpyxl.comments import Comment
@@ -21,16 +23,12 @@ from db.models import (
     Category,
     Product,
     SupplierProduct,
-    SupplierPriceHistory,
     CanonicalProduct,
-    ProductEquivalence,
 )
 from db.session import get_session
-from services.suppliers.parsers import (
-    SUPPLIER_PARSERS,
-    AUTO_CREATE_CANONICAL,
-    suggest_canonicals,
-)
+from services import import_commit
+from services.suppliers import price_list
+from services.suppliers.parsers import SUPPLIER_PARSERS
 from services.auth import (
     require_roles,
     require_csrf,
@@ -40,6 +38,9 @@ from services.auth import (
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Tamaño de los IN (...) al buscar precios vigentes (límite de parámetros de SQLite/psycopg)
+_IN_CHUNK = 5000
+
 
 async def _get_or_create_category_path(db: AsyncSession, path: str) -> Category:
     """Crea la jerarquía de categorías completa y devuelve la última."""
@@ -241,17 +242,15 @@ async def upload_price_list(
     content = await file.read()
 
     try:
-        parsed_rows = parser.parse_bytes(content)
+        # Parseo por columnas fuera del event loop (planillas de decenas de miles de filas)
+        parse = getattr(parser, "parse_frame", None) or parser.parse_bytes
+        parsed = await asyncio.to_thread(parse, content)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception:
         # Mensaje genérico ya que puede tratarse de Excel o CSV
         raise HTTPException(status_code=400, detail="Archivo de precios no válido")
-
-    parser_kpis = {
-        "total": len(parsed_rows),
-        "errors": sum(1 for r in parsed_rows if r.get("status") == "error"),
-    }
+    parsed = price_list.to_frame(parsed)
 
     job = ImportJob(
         supplier_id=supplier_id, filename=file.filename or "", status="DRY_RUN"
@@ -259,91 +258,30 @@ async def upload_price_list(
     db.add(job)
     await db.flush()
 
-    # Preparar estructuras para deduplicar y comparar contra la base
-    seen_codes: set[str] = set()
-    codes = [r.get("codigo") for r in parsed_rows if r.get("codigo")]
-    existing_map: dict[str, SupplierProduct] = {}
-    if codes:
+    # Precios vigentes del proveedor para los códigos del archivo (merge vectorizado)
+    codes = list({c for c in parsed["codigo"].dropna().astype(str) if c})
+    existing_rows: list[tuple] = []
+    for i in range(0, len(codes), _IN_CHUNK):
         res = await db.execute(
-            select(SupplierProduct).where(
+            select(
+                SupplierProduct.supplier_product_id,
+                SupplierProduct.current_purchase_price,
+                SupplierProduct.current_sale_price,
+            ).where(
                 SupplierProduct.supplier_id == supplier_id,
-                SupplierProduct.supplier_product_id.in_(codes),
+                SupplierProduct.supplier_product_id.in_(codes[i:i + _IN_CHUNK]),
             )
         )
-        existing_map = {sp.supplier_product_id: sp for sp in res.scalars()}
+        existing_rows.extend(res.all())
+    existing = pd.DataFrame(existing_rows, columns=["codigo", "prev_compra", "prev_venta"])
 
     # Mapa de productos canónicos existentes para sugerencias por similitud
     res = await db.execute(select(CanonicalProduct.id, CanonicalProduct.name))
     canonical_map = {cid: name for cid, name in res.all()}
 
-    kpis = {
-        **parser_kpis,
-        "duplicates_in_file": 0,
-        "unchanged": 0,
-        "new": 0,
-        "changed": 0,
-    }
-
-    for idx, data in enumerate(parsed_rows):
-        status = data.pop("status", "ok")
-        error = data.pop("error_msg", None)
-
-        code = data.get("codigo")
-
-        if status != "ok":
-            db.add(
-                ImportJobRow(
-                    job_id=job.id,
-                    row_index=int(idx),
-                    status=status,
-                    error=error,
-                    row_json_normalized=data,
-                )
-            )
-            continue
-
-        if not code or code in seen_codes:
-            status = "duplicate_in_file"
-            error = "Código duplicado en archivo"
-            kpis["duplicates_in_file"] += 1
-        else:
-            seen_codes.add(code)
-            sp = existing_map.get(code)
-            if sp:
-                prev_p = float(sp.current_purchase_price or 0)
-                prev_s = float(sp.current_sale_price or 0)
-                delta_p = round(float(data["precio_compra"]) - prev_p, 2)
-                delta_s = round(float(data["precio_venta"]) - prev_s, 2)
-                data["delta_compra"] = delta_p
-                data["delta_venta"] = delta_s
-                data["delta_pct"] = (
-                    round(delta_s / prev_s * 100, 2) if prev_s else None
-                )
-                if delta_p == 0 and delta_s == 0:
-                    status = "unchanged"
-                    kpis["unchanged"] += 1
-                else:
-                    status = "changed"
-                    kpis["changed"] += 1
-            else:
-                status = "new"
-                kpis["new"] += 1
-
-        # Sugerir canónico por similitud y marcar creación automática
-        suggestions = suggest_canonicals(data["nombre"], canonical_map)
-        data["canonical_suggestions"] = suggestions
-        if AUTO_CREATE_CANONICAL and not suggestions:
-            data["auto_create_canonical"] = True
-
-        db.add(
-            ImportJobRow(
-                job_id=job.id,
-                row_index=int(idx),
-                status=status,
-                error=error,
-                row_json_normalized=data,
-            )
-        )
+    rows, kpis = await asyncio.to_thread(price_list.classify_rows, parsed, existing, canonical_map)
+    if rows:
+        await db.execute(insert(ImportJobRow), [{"job_id": job.id, **r} for r in rows])
 
     # Primero confirmamos job y filas; luego intentamos guardar el resumen.
     await db.commit()
@@ -407,6 +345,7 @@ async def preview_import(
     return {
         "items": items,
         "summary": job.summary_json,
+        "commit": import_commit.progress(job),
         "total": total,
         "pages": pages,
         "page": page,
@@ -444,145 +383,53 @@ async def get_import(
         }
         for r in res.scalars()
     ]
-    return {"job_id": job.id, "status": job.status, "summary": job.summary_json, "rows": rows}
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "summary": job.summary_json,
+        "commit": import_commit.progress(job),
+        "rows": rows,
+    }
 
 
 @router.post("/imports/{job_id}/commit", dependencies=[Depends(require_csrf)])
 async def commit_import(
     job_id: int,
+    wait: bool = Query(False, description="Esperar a que termine y devolver los contadores"),
     db: AsyncSession = Depends(get_session),
     sess: SessionData = Depends(require_roles("proveedor", "colaborador", "admin")),
 ):
+    """Aplica el job en background por lotes (202 + progreso en ``GET /imports/{id}``).
+
+    Con ``wait=true`` conserva la respuesta síncrona previa (contadores). Un job
+    ``COMMIT_ERROR`` o huérfano se reanuda desde su checkpoint.
+    """
     res = await db.execute(select(ImportJob).where(ImportJob.id == job_id))
     job = res.scalar_one_or_none()
     if not job:
         raise HTTPException(status_code=404, detail="Job no encontrado")
-    if job.status != "DRY_RUN":
+    if job.status == "COMMITTED":
         raise HTTPException(status_code=400, detail="Job ya aplicado")
     if sess.role == "proveedor" and sess.user and job.supplier_id != sess.user.supplier_id:
         raise HTTPException(status_code=403, detail="No autorizado para este proveedor")
 
-    res = await db.execute(select(ImportJobRow).where(ImportJobRow.job_id == job_id))
-    rows = res.scalars().all()
-
-    result = {
-        "inserted": 0,
-        "updated": 0,
-        "unchanged": 0,
-        "skipped_duplicates": 0,
-        "errors": 0,
-        "price_changes": 0,
-    }
-
-    for r in rows:
-        data = r.row_json_normalized
-        if r.status == "error":
-            result["errors"] += 1
-            continue
-        if r.status == "duplicate_in_file":
-            result["skipped_duplicates"] += 1
-            continue
-        if r.status == "unchanged":
-            result["unchanged"] += 1
-            continue
-
-        cat = await _get_or_create_category_path(db, data["categoria_path"])
-        prod = await _upsert_product(db, data["codigo"], data["nombre"], cat)
-
-        stmt = select(SupplierProduct).where(
-            SupplierProduct.supplier_id == job.supplier_id,
-            SupplierProduct.supplier_product_id == data["codigo"],
-        )
-        sp = (await db.execute(stmt)).scalar_one_or_none()
-        if not sp:
-            sp = SupplierProduct(
-                supplier_id=job.supplier_id,
-                supplier_product_id=data["codigo"],
-            )
-            db.add(sp)
-            result["inserted"] += 1
-        else:
-            result["updated"] += 1
-
-        parts = [
-            p.strip() for p in data.get("categoria_path", "").split(">") if p.strip()
-        ]
-        sp.title = data["nombre"]
-        sp.category_level_1 = parts[0] if len(parts) > 0 else None
-        sp.category_level_2 = parts[1] if len(parts) > 1 else None
-        sp.category_level_3 = parts[2] if len(parts) > 2 else None
-        sp.min_purchase_qty = data.get("compra_minima")
-        sp.last_seen_at = datetime.utcnow()
-        sp.current_purchase_price = data.get("precio_compra")
-        sp.current_sale_price = data.get("precio_venta")
-        sp.internal_product_id = prod.id
-
-        # Enlazar con canónicos existentes o crear nuevos según configuración
-        suggestions = data.get("canonical_suggestions", [])
-        if suggestions:
-            canonical_id = suggestions[0]["id"]
-            stmt_eq = select(ProductEquivalence).where(
-                ProductEquivalence.supplier_id == job.supplier_id,
-                ProductEquivalence.supplier_product_id == sp.id,
-            )
-            eq = (await db.execute(stmt_eq)).scalar_one_or_none()
-            if eq:
-                eq.canonical_product_id = canonical_id
-                eq.source = "auto"
-                eq.confidence = suggestions[0]["score"]
-            else:
-                db.add(
-                    ProductEquivalence(
-                        supplier_id=job.supplier_id,
-                        supplier_product_id=sp.id,
-                        canonical_product_id=canonical_id,
-                        source="auto",
-                        confidence=suggestions[0]["score"],
-                    )
-                )
-        elif data.get("auto_create_canonical") and AUTO_CREATE_CANONICAL:
-            # Crear canónico permitiendo ng_sku nulo en inserción y generándolo luego
-            cp = CanonicalProduct(name=data["nombre"])
-            db.add(cp)
-            await db.flush()
-            # Generar ng_sku luego de tener id
-            cp.ng_sku = f"NG-{cp.id:06d}"
-            db.add(
-                ProductEquivalence(
-                    supplier_id=job.supplier_id,
-                    supplier_product_id=sp.id,
-                    canonical_product_id=cp.id,
-                    source="auto",
-                    confidence=1.0,
-                )
-            )
-
-        if r.status == "changed":
-            prev_purchase = data.get("precio_compra") - data.get("delta_compra", 0)
-            prev_sale = data.get("precio_venta") - data.get("delta_venta", 0)
-            delta_purchase_pct = (
-                (data.get("delta_compra", 0) / prev_purchase * 100)
-                if prev_purchase
-                else None
-            )
-            delta_sale_pct = (
-                (data.get("delta_venta", 0) / prev_sale * 100)
-                if prev_sale
-                else None
-            )
-            db.add(
-                SupplierPriceHistory(
-                    supplier_product_fk=sp.id,
-                    file_fk=None,
-                    as_of_date=date.today(),
-                    purchase_price=data.get("precio_compra"),
-                    sale_price=data.get("precio_venta"),
-                    delta_purchase_pct=delta_purchase_pct,
-                    delta_sale_pct=delta_sale_pct,
-                )
-            )
-            result["price_changes"] += 1
-
-    job.status = "COMMITTED"
-    await db.commit()
-    return result
+    if not import_commit.is_running(job_id):
+        if not await import_commit.claim(db, job_id):
+            await db.refresh(job)
+            if job.status == "COMMITTING":
+                raise HTTPException(status_code=409, detail="Commit en curso en otro proceso")
+            raise HTTPException(status_code=400, detail=f"Job no aplicable (estado {job.status})")
+        import_commit.start(job_id)
+
+    if wait:
+        await import_commit.wait(job_id)
+        await db.refresh(job)
+        if job.status != "COMMITTED":
+            detail = (job.commit_result or {}).get("error") or "Commit no finalizado"
+            raise HTTPException(status_code=500, detail=f"Error aplicando importación: {detail}")
+        return import_commit.legacy_result(job)
+    await db.refresh(job)
+    return JSONResponse(
+        status_code=202,
+        content={"status": "accepted", "job_id": job_id, "commit": import_commit.progress(job)},
+    )
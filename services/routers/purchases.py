@@ -12,6 +12,7 @@ líneas SIN_VINCULAR.
 from __future__ import annotations
 
 from datetime import date, datetime
+import asyncio
 import re
 import os
 from decimal import Decimal
@@ -24,10 +25,10 @@ import csv
 from fastapi import APIRouter, Depends, HTTPException, Query, Body, Request, File, UploadFile
 from fastapi.responses import StreamingResponse, JSONResponse, FileResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_, or_
+from sqlalchemy import select, and_, or_
 from sqlalchemy.orm import selectinload
 
-from db.session import get_session
+from db.session import SessionLocal, get_session
 from db.models import (
     Purchase,
     PurchaseLine,
@@ -40,9 +41,13 @@ from db.models import (
     ImportLog,
 )
 from services.auth import require_roles, require_csrf, SessionData, current_session
+from services.pagination import COUNT_PATTERN, SortKey, paginate
 from services.suppliers.santaplanta_pdf import parse_santaplanta_pdf
-from services.importers.santaplanta_pipeline import parse_remito
+from services.importers import pdf_extract, pop_mailbox, remito_jobs
 from services.importers.pop_email import parse_pop_email
+from services.importers.pop_mailbox import MailboxConfig
+from services.purchases.pop_import import create_pop_purchase
+from services.purchases.sku_resolver import SkuResolver
 import httpx
 import hashlib
 import uuid
@@ -51,12 +56,6 @@ from ai.router import AIRouter
 from ai.types import Task
 from services.notifications.telegram import send_message as tg_send
 
-# PDF text extraction (opcional)
-try:  # pragma: no cover - import opcional
-    import pdfplumber  # type: ignore
-except Exception:  # pragma: no cover
-    pdfplumber = None  # type: ignore
-
 router = APIRouter(prefix="/purchases", tags=["purchases"]) 
 
 # Helper centralizado para logging estructurado de eventos de compra
@@ -73,24 +72,15 @@ def _purchase_event_log(logger_name: str, event: str, **fields):
 def _extract_pdf_text(path: str, max_chars: int = 18000) -> str:
     """Extrae texto del PDF para enviar al LLM, con fallback seguro.
 
-    - Usa pdfplumber si está disponible. Corta a max_chars.
+    - Lee el texto de la caché de extracción (``pdf_extract``, por sha256): preview y
+      apply sobre el mismo adjunto no vuelven a abrir el PDF. Corta a max_chars.
     - Si falla, devuelve un texto indicativo o los primeros bytes hex.
     """
     try:
-        if pdfplumber is not None:
-            text_parts: list[str] = []
-            with pdfplumber.open(path) as pdf:
-                for page in pdf.pages:
-                    try:
-                        txt = page.extract_text() or ""
-                    except Exception:
-                        txt = ""
-                    if txt:
-                        text_parts.append(txt)
-                    if sum(len(x) for x in text_parts) > max_chars:
-                        break
-            full = "\n\n".join(text_parts).strip()
-            return full[:max_chars]
+        doc = pdf_extract.open_document(path)
+        texts = doc.page_texts()
+        if not doc.error:
+            return "\n\n".join(t for t in texts if t).strip()[:max_chars]
         # Fallback sin lib
         with open(path, "rb") as fh:
             head = fh.read(2048)
@@ -671,11 +661,15 @@ async def list_purchases(
     date_to: Optional[str] = Query(None),
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=200),
+    cursor: Optional[str] = Query(None),
+    count: Optional[str] = Query(None, pattern=COUNT_PATTERN),
 ):
     """Lista compras con filtros y paginación.
 
     Filtros: supplier_id, status, depot_id, remito_number, product_name, date_from, date_to.
-    Paginación: page, page_size.
+    Paginación: page, page_size o ``cursor`` (keyset sobre created_at, id; ver services.pagination).
+    Líneas, sin vincular y totales salen de los agregados guardados en ``purchases``
+    (ver db.purchase_aggregates): no se agrega ``purchase_lines`` por fila.
     """
     stmt = select(Purchase)
     if supplier_id:
@@ -703,9 +697,13 @@ async def list_purchases(
         sub = select(PurchaseLine.purchase_id).where(PurchaseLine.title.ilike(f"%{product_name}%")).subquery()
         stmt = stmt.where(Purchase.id.in_(select(sub.c.purchase_id)))
 
-    count = await db.scalar(select(func.count()).select_from(stmt.subquery()))
-    stmt = stmt.order_by(Purchase.created_at.desc()).offset((page - 1) * page_size).limit(page_size)
-    rows = (await db.execute(stmt)).scalars().all()
+    unfiltered = not (supplier_id or status or depot_id is not None or remito_number or date_from or date_to or product_name)
+    result = await paginate(
+        db, stmt, [SortKey(Purchase.created_at), SortKey(Purchase.id)],
+        page=page, page_size=page_size, cursor=cursor, count=count,
+        signature="purchases:created_at:desc", estimate_table="purchases" if unfiltered else None,
+    )
+    rows = result.scalars()
     items = [
         {
             "id": r.id,
@@ -713,17 +711,23 @@ async def list_purchases(
             "remito_number": r.remito_number,
             "status": r.status,
             "remito_date": r.remito_date.isoformat(),
+            "lines_count": r.lines_count or 0,
+            "unmatched_count": r.unmatched_count or 0,
+            "subtotal": float(r.subtotal or 0),
+            "total": float(r.total or 0),
+            "last_activity_at": r.last_activity_at.isoformat() if r.last_activity_at else None,
         }
         for r in rows
     ]
-    return {"items": items, "total": count or 0, "page": page, "pages": (int(((count or 0) + page_size - 1) / page_size) if page_size else 1)}
+    return {"items": items, "total": result.total, "page": page, "pages": result.pages, "next_cursor": result.next_cursor}
 
 
 @router.get("/{purchase_id}")
 async def get_purchase(purchase_id: int, db: AsyncSession = Depends(get_session)):
     """Obtiene una compra con totales, líneas y adjuntos.
 
-    Calcula subtotal, iva y total a partir de líneas y vat_rate.
+    Calcula subtotal, iva y total a partir de líneas y vat_rate (las líneas ya
+    se cargan para la respuesta; el listado usa los agregados guardados).
     """
     res = await db.execute(
         select(Purchase)
@@ -756,6 +760,9 @@ async def get_purchase(purchase_id: int, db: AsyncSession = Depends(get_session)
         "note": p.note,
         "depot_id": p.depot_id,
         "totals": {"subtotal": float(subtotal), "iva": float(iva), "total": float(total)},
+        "lines_count": p.lines_count or 0,
+        "unmatched_count": p.unmatched_count or 0,
+        "last_activity_at": p.last_activity_at.isoformat() if p.last_activity_at else None,
         "lines": [
             {
                 "id": l.id,
@@ -812,6 +819,7 @@ async def validate_purchase(purchase_id: int, db: AsyncSession = Depends(get_ses
     unmatched = 0
     auto_linked = 0
     missing_skus: set[str] = set()
+    resolver = await SkuResolver.load(db, p.supplier_id, ((l.supplier_sku, None) for l in p.lines))
     # Reglas de validación:
     # - Si la línea tiene supplier_sku: validar contra SupplierProduct del proveedor.
     #   - Si existe: autovincular (supplier_item_id/product_id) y marcar OK.
@@ -821,15 +829,7 @@ async def validate_purchase(purchase_id: int, db: AsyncSession = Depends(get_ses
         try:
             sku_txt = (l.supplier_sku or "").strip()
             if sku_txt:
-                try:
-                    sp = await db.scalar(
-                        select(SupplierProduct).where(
-                            SupplierProduct.supplier_id == p.supplier_id,
-                            SupplierProduct.supplier_product_id == sku_txt,
-                        )
-                    )
-                except Exception:
-                    sp = None
+                sp = resolver.get(sku_txt)
                 if sp:
                     # Autovincular si no estaba
                     if not l.supplier_item_id:
@@ -903,7 +903,7 @@ async def iaval_preview(purchase_id: int, db: AsyncSession = Depends(get_session
         if (mime in {"message/rfc822", "application/eml", "text/html", "text/plain", "application/octet-stream"} or name.endswith(".eml")) and os.path.exists(att.path):
             att_eml = att if att_eml is None else att_eml
     if att_pdf:
-        pdf_text = _extract_pdf_text(att_pdf.path)
+        pdf_text = await asyncio.to_thread(_extract_pdf_text, att_pdf.path)
     elif att_eml:
         pdf_text = _extract_eml_text(att_eml.path)
     else:
@@ -1023,48 +1023,82 @@ async def iaval_preview(purchase_id: int, db: AsyncSession = Depends(get_session
 # --- NUEVO: IAVAL Vision AI ---
 
 def _pdf_to_base64_image(pdf_path: str, page: int = 0, dpi: int = 150) -> str:
-    """Convierte una página del PDF a imagen base64 para Vision API."""
-    import io
+    """Convierte una página del PDF a imagen base64 para Vision API (render cacheado por sha256)."""
     import base64
-    
-    # Intentar con PyMuPDF primero (más rápido)
-    try:
-        import fitz  # PyMuPDF
-        doc = fitz.open(pdf_path)
-        page_obj = doc[page]
-        mat = fitz.Matrix(dpi / 72, dpi / 72)
-        pix = page_obj.get_pixmap(matrix=mat)
-        img_bytes = pix.tobytes("png")
-        doc.close()
-        return base64.b64encode(img_bytes).decode("utf-8")
-    except ImportError:
-        pass
-    
-    # Fallback: pdf2image
-    try:
-        from pdf2image import convert_from_path
-        images = convert_from_path(pdf_path, dpi=dpi, first_page=page+1, last_page=page+1)
-        if images:
-            buffer = io.BytesIO()
-            images[0].save(buffer, format="PNG")
-            return base64.b64encode(buffer.getvalue()).decode("utf-8")
-    except ImportError:
-        pass
-    
-    # Fallback: pdfplumber con PIL
+
+    return base64.b64encode(pdf_extract.open_document(pdf_path).page_png(page, dpi)).decode("utf-8")
+
+
+def _vision_page_images(pdf_path: str) -> tuple[list[bytes], str]:
+    """Páginas del PDF comprimidas para Vision, cacheadas por sha256 (se rasteriza una vez por documento).
+
+    Lado mayor ``IAVAL_VISION_MAX_SIDE`` (px), formato ``IAVAL_VISION_FORMAT`` (jpeg|webp) y hasta
+    ``IAVAL_VISION_MAX_PAGES`` páginas. Devuelve (imágenes, mime).
+    """
+    fmt = "webp" if os.getenv("IAVAL_VISION_FORMAT", "jpeg").lower() == "webp" else "jpeg"
+    max_side = int(os.getenv("IAVAL_VISION_MAX_SIDE", "1600") or 1600)
+    quality = int(os.getenv("IAVAL_VISION_QUALITY", "80") or 80)
+    max_pages = max(1, int(os.getenv("IAVAL_VISION_MAX_PAGES", "8") or 8))
+    doc = pdf_extract.open_document(pdf_path)
+    count = max(1, min(doc.page_count, max_pages))
+    images = [doc.page_image(i, max_side=max_side, fmt=fmt, quality=quality) for i in range(count)]
+    return images, f"image/{fmt}"
+
+
+def _parse_vision_response(raw_response: Any) -> dict:
+    """Respuesta de Vision → dict (quita prefijo del provider y bloques markdown)."""
     try:
-        import pdfplumber
-        from PIL import Image
-        with pdfplumber.open(pdf_path) as pdf:
-            if page < len(pdf.pages):
-                img = pdf.pages[page].to_image(resolution=dpi)
-                buffer = io.BytesIO()
-                img.original.save(buffer, format="PNG")
-                return base64.b64encode(buffer.getvalue()).decode("utf-8")
+        clean_response = raw_response
+        if isinstance(clean_response, str):
+            if clean_response.startswith("openai:"):
+                clean_response = clean_response[7:]
+            elif clean_response.startswith("ollama:"):
+                clean_response = clean_response[7:]
+
+            # Limpiar markdown code blocks si existen
+            clean_response = clean_response.strip()
+            if clean_response.startswith("```json"):
+                clean_response = clean_response[7:]
+            if clean_response.startswith("```"):
+                clean_response = clean_response[3:]
+            if clean_response.endswith("```"):
+                clean_response = clean_response[:-3]
+            clean_response = clean_response.strip()
+            # _coerce_json ya devuelve dict (incluye json.loads internamente)
+            return _coerce_json(clean_response)
+        if isinstance(clean_response, dict):
+            return clean_response
+        return {"header": {}, "lines": [], "confidence": 0, "comments": ["Respuesta no reconocida"]}
     except Exception:
-        pass
-    
-    raise ValueError("No se pudo convertir el PDF a imagen. Instale PyMuPDF, pdf2image o pdfplumber.")
+        return {"header": {}, "lines": [], "confidence": 0, "comments": ["Error parseando respuesta"]}
+
+
+def _merge_vision_pages(pages: list[dict]) -> dict:
+    """Une las extracciones por página en el orden del documento.
+
+    Header: primer valor no vacío de cada campo. Líneas: concatenadas por página y
+    reindexadas (con ``page``). Confianza: la mínima (una página dudosa o fallida
+    baja la del remito completo).
+    """
+    if len(pages) == 1:
+        return pages[0]
+    header: dict = {}
+    lines: list = []
+    comments: list = []
+    confidences: list = []
+    for n, page in enumerate(pages, 1):
+        for key, value in (page.get("header") or {}).items():
+            if value not in (None, "") and key not in header:
+                header[key] = value
+        for ln in page.get("lines") or []:
+            if isinstance(ln, dict):
+                lines.append({**ln, "index": len(lines), "page": n})
+        comments.extend(f"p{n}: {c}" for c in page.get("comments") or [])
+        try:
+            confidences.append(float(page.get("confidence") or 0))
+        except (TypeError, ValueError):
+            confidences.append(0.0)
+    return {"header": header, "lines": lines, "confidence": min(confidences), "comments": comments}
 
 
 VISION_EXTRACTION_PROMPT = """Eres un extractor experto de datos de remitos argentinos. 
@@ -1112,8 +1146,11 @@ async def iaval_vision(
     Revolucionario: en lugar de parsear texto/tablas, envía una IMAGEN del PDF
     a la IA para que extraiga los datos visualmente, como lo haría un humano.
     
+    Cada página (hasta ``IAVAL_VISION_MAX_PAGES``) se envía como JPEG/WebP cacheado por
+    documento, en requests paralelas acotadas; los resultados se unen en orden de página.
+
     Incluye auditabilidad completa:
-    - Guarda la imagen enviada
+    - Guarda las imágenes enviadas (una por página)
     - Guarda el prompt utilizado
     - Guarda la respuesta raw de la IA
     - Registra todos los cambios aplicados
@@ -1156,21 +1193,25 @@ async def iaval_vision(
     audit_dir.mkdir(parents=True, exist_ok=True)
     ts = _dt.utcnow().strftime("%Y%m%d_%H%M%S")
     
-    # Convertir PDF a imagen
+    # Páginas del PDF como imágenes comprimidas (caché por documento)
     try:
-        pdf_image_b64 = _pdf_to_base64_image(att_pdf.path, page=0, dpi=150)
+        page_images, image_mime = await asyncio.to_thread(_vision_page_images, att_pdf.path)
     except Exception as e:
         log.error(f"IAVAL Vision[{correlation_id}]: Error convirtiendo PDF a imagen: {e}")
         raise HTTPException(status_code=500, detail=f"Error convirtiendo PDF a imagen: {e}")
-    
-    # === AUDITABILIDAD: Guardar imagen ===
-    image_path = audit_dir / f"{ts}_input.png"
-    try:
-        with open(image_path, "wb") as f:
-            f.write(base64.b64decode(pdf_image_b64))
-    except Exception as e:
-        log.warning(f"IAVAL Vision[{correlation_id}]: No se pudo guardar imagen de auditoría: {e}")
-    
+    n_pages = len(page_images)
+
+    # === AUDITABILIDAD: Guardar imágenes ===
+    ext = image_mime.split("/")[-1].replace("jpeg", "jpg")
+    image_paths = [audit_dir / (f"{ts}_input.{ext}" if n_pages == 1 else f"{ts}_input_p{i + 1}.{ext}") for i in range(n_pages)]
+    for path, data in zip(image_paths, page_images):
+        try:
+            with open(path, "wb") as f:
+                f.write(data)
+        except Exception as e:
+            log.warning(f"IAVAL Vision[{correlation_id}]: No se pudo guardar imagen de auditoría: {e}")
+    image_path = image_paths[0]
+
     # Preparar contexto de la compra actual
     purchase_context = {
         "id": p.id,
@@ -1211,61 +1252,53 @@ Si los datos actuales son incorrectos, proporciona los valores correctos del rem
     except Exception:
         pass
     
-    # Llamar a Vision API
-    log.info(f"IAVAL Vision[{correlation_id}]: Enviando imagen a Vision API...")
+    # Llamar a Vision API: una request por página, en paralelo acotado (IAVAL_VISION_CONCURRENCY)
+    log.info(f"IAVAL Vision[{correlation_id}]: Enviando {n_pages} página(s) a Vision API...")
     router_ai = AIRouter(settings)
-    
-    try:
-        image_data_url = f"data:image/png;base64,{pdf_image_b64}"
-        raw_response = await router_ai.run_async(
-            task=Task.REASONING.value,
-            prompt=full_prompt,
-            images=[image_data_url],
-            user_context={"role": "admin", "intent": "iaval_vision"}
-        )
-    except Exception as e:
-        log.error(f"IAVAL Vision[{correlation_id}]: Error en Vision API: {e}")
-        raise HTTPException(status_code=500, detail=f"Error en Vision API: {e}")
-    
+    sem = asyncio.Semaphore(max(1, int(os.getenv("IAVAL_VISION_CONCURRENCY", "4") or 4)))
+
+    async def _vision_page(i: int) -> str:
+        prompt = full_prompt
+        if n_pages > 1:
+            prompt += (
+                f"\n\nEsta imagen es la página {i + 1} de {n_pages} del remito: extrae sólo las líneas visibles "
+                "en esta página. Si el encabezado no aparece en ella, deja sus campos vacíos."
+            )
+        async with sem:
+            return await router_ai.run_async(
+                task=Task.REASONING.value,
+                prompt=prompt,
+                images=[f"data:{image_mime};base64,{base64.b64encode(page_images[i]).decode('utf-8')}"],
+                user_context={"role": "admin", "intent": "iaval_vision"}
+            )
+
+    raw_pages = await asyncio.gather(*(_vision_page(i) for i in range(n_pages)), return_exceptions=True)
+    errors = [r for r in raw_pages if isinstance(r, BaseException)]
+    if len(errors) == n_pages:
+        log.error(f"IAVAL Vision[{correlation_id}]: Error en Vision API: {errors[0]}")
+        raise HTTPException(status_code=500, detail=f"Error en Vision API: {errors[0]}")
+
     # === AUDITABILIDAD: Guardar respuesta raw ===
     response_path = audit_dir / f"{ts}_response.txt"
     try:
         with open(response_path, "w", encoding="utf-8") as f:
-            f.write(raw_response)
+            if n_pages == 1:
+                f.write(raw_pages[0])
+            else:
+                f.write("\n\n".join(f"=== página {i + 1} ===\n{r}" for i, r in enumerate(raw_pages)))
     except Exception:
         pass
-    
-    # Parsear respuesta JSON
-    parsed = None
-    try:
-        # Limpiar prefijo del provider
-        clean_response = raw_response
-        if isinstance(clean_response, str):
-            if clean_response.startswith("openai:"):
-                clean_response = clean_response[7:]
-            elif clean_response.startswith("ollama:"):
-                clean_response = clean_response[7:]
-            
-            # Limpiar markdown code blocks si existen
-            clean_response = clean_response.strip()
-            if clean_response.startswith("```json"):
-                clean_response = clean_response[7:]
-            if clean_response.startswith("```"):
-                clean_response = clean_response[3:]
-            if clean_response.endswith("```"):
-                clean_response = clean_response[:-3]
-            clean_response = clean_response.strip()
-            # _coerce_json ya devuelve dict (incluye json.loads internamente)
-            parsed = _coerce_json(clean_response)
-        elif isinstance(clean_response, dict):
-            # Ya es un dict, usarlo directamente
-            parsed = clean_response
+
+    # Parsear respuestas y unirlas en orden de página
+    page_results = []
+    for i, raw in enumerate(raw_pages):
+        if isinstance(raw, BaseException):
+            log.warning(f"IAVAL Vision[{correlation_id}]: página {i + 1} falló: {raw}")
+            page_results.append({"header": {}, "lines": [], "confidence": 0, "comments": [f"Error en Vision API: {raw}"]})
         else:
-            parsed = {"header": {}, "lines": [], "confidence": 0, "comments": ["Respuesta no reconocida"]}
-    except Exception as e:
-        log.warning(f"IAVAL Vision[{correlation_id}]: Error parseando JSON: {e}")
-        parsed = {"header": {}, "lines": [], "confidence": 0, "comments": ["Error parseando respuesta"]}
-    
+            page_results.append(_parse_vision_response(raw))
+    parsed = _merge_vision_pages(page_results)
+
     # Extraer datos
     header = parsed.get("header") or {}
     lines = parsed.get("lines") or []
@@ -1321,8 +1354,10 @@ Si los datos actuales son incorrectos, proporciona los valores correctos del rem
                 "line_changes": len(diff["lines"]),
                 "new_lines": len(diff["lines_new"]),
             },
+            "pages": n_pages,
             "audit_files": {
                 "image": str(image_path),
+                "images": [str(x) for x in image_paths],
                 "prompt": str(prompt_path),
                 "response": str(response_path),
             }
@@ -1389,8 +1424,10 @@ Si los datos actuales son incorrectos, proporciona los valores correctos del rem
         "confidence": confidence,
         "comments": comments,
         "applied": applied,
+        "pages": n_pages,
         "audit": {
             "image": str(image_path),
+            "images": [str(x) for x in image_paths],
             "prompt": str(prompt_path),
             "response": str(response_path),
         }
@@ -1612,6 +1649,13 @@ async def confirm_purchase(
 
         # Seguimiento de updates por SupplierProduct para evitar PriceHistory duplicado
         sp_updates: dict[int, dict[str, Any]] = {}
+        # SupplierProducts de todas las líneas (por SKU y por vínculo previo) en una consulta
+        resolver = await SkuResolver.load(
+            db, p.supplier_id, ((l.supplier_sku, None) for l in p.lines), ids=(l.supplier_item_id for l in p.lines)
+        )
+
+        async def _sp_by_id(sp_id: int) -> Optional[SupplierProduct]:
+            return resolver.get_by_id(sp_id) or await db.get(SupplierProduct, sp_id)
 
         for l in p.lines:
             # 1. Ajuste costo efectivo por descuento de línea
@@ -1624,15 +1668,7 @@ async def confirm_purchase(
             if not l.supplier_item_id:
                 sku_txt = (l.supplier_sku or "").strip()
                 if sku_txt:
-                    try:
-                        sp = await db.scalar(
-                            select(SupplierProduct).where(
-                                SupplierProduct.supplier_id == p.supplier_id,
-                                SupplierProduct.supplier_product_id == sku_txt,
-                            )
-                        )
-                    except Exception:
-                        sp = None
+                    sp = resolver.get(sku_txt)
                     if sp:
                         l.supplier_item_id = sp.id
                         if not l.product_id and sp.internal_product_id:
@@ -1640,7 +1676,7 @@ async def confirm_purchase(
 
             # 3. Cargar SupplierProduct si ya teníamos supplier_item_id
             if l.supplier_item_id and not sp:
-                sp = await db.get(SupplierProduct, l.supplier_item_id)
+                sp = await _sp_by_id(l.supplier_item_id)
 
             # 4. Track de precios (primera observación old, última new)
             if sp:
@@ -1657,7 +1693,7 @@ async def confirm_purchase(
             # 5. Resolver product_id (directo, vía supplier_item o fallback sku)
             prod_id: Optional[int] = l.product_id
             if not prod_id and l.supplier_item_id:
-                sp2 = sp if sp and sp.id == l.supplier_item_id else await db.get(SupplierProduct, l.supplier_item_id)
+                sp2 = sp if sp and sp.id == l.supplier_item_id else await _sp_by_id(l.supplier_item_id)
                 if sp2 and sp2.internal_product_id:
                     prod_id = sp2.internal_product_id
                     if not l.product_id:
@@ -1671,12 +1707,7 @@ async def confirm_purchase(
                     prod = await db.get(Product, prod_id)
             if not prod and l.supplier_sku and p.supplier_id:
                 try:
-                    sp_fallback = await db.scalar(
-                        select(SupplierProduct).where(
-                            SupplierProduct.supplier_id == p.supplier_id,
-                            SupplierProduct.supplier_product_id == l.supplier_sku,
-                        )
-                    )
+                    sp_fallback = resolver.get(l.supplier_sku)
                     if sp_fallback and sp_fallback.internal_product_id:
                         l.supplier_item_id = l.supplier_item_id or sp_fallback.id
                         l.product_id = sp_fallback.internal_product_id
@@ -1989,21 +2020,19 @@ async def resend_stock(
     unresolved: list[int] = []
     import logging, os as _os
     log = logging.getLogger("growen")
+    resolver = await SkuResolver.load(
+        db, p.supplier_id, ((l.supplier_sku, None) for l in p.lines), ids=(l.supplier_item_id for l in p.lines)
+    )
     for l in p.lines:
         prod_id: Optional[int] = l.product_id
         if not prod_id and l.supplier_item_id:
-            sp = await db.get(SupplierProduct, l.supplier_item_id)
+            sp = resolver.get_by_id(l.supplier_item_id) or await db.get(SupplierProduct, l.supplier_item_id)
             if sp and sp.internal_product_id:
                 prod_id = sp.internal_product_id
         # Intentar resolver por SKU si aún no hay vínculo
         if not prod_id and not l.supplier_item_id and (l.supplier_sku or "").strip():
             try:
-                sp = await db.scalar(
-                    select(SupplierProduct).where(
-                        SupplierProduct.supplier_id == p.supplier_id,
-                        SupplierProduct.supplier_product_id == (l.supplier_sku or "").strip(),
-                    )
-                )
+                sp = resolver.get(l.supplier_sku)
                 if sp and sp.internal_product_id:
                     prod_id = sp.internal_product_id
                     # Opcional: completar vínculos en línea para futuras consultas
@@ -2204,451 +2233,410 @@ async def rollback_purchase(purchase_id: int, db: AsyncSession = Depends(get_ses
     return {"status": "ok", "reverted": reverted}
 
 
-@router.post("/import/santaplanta", dependencies=[Depends(require_roles("admin", "colaborador")), Depends(require_csrf)])
-async def import_santaplanta_pdf(
-    supplier_id: int,
-    file: UploadFile = File(...),
-    db: AsyncSession = Depends(get_session),
-    debug: int = Query(0),
-    force_ocr: int = Query(0),
-):
-    """Importa PDF de Santa Planta mediante pipeline.
+_LAYOUT_PROFILE_KEY = "remito_layout"
 
-    Guarda temporal, ejecuta parse_remito (pdfplumber → camelot → OCR),
-    deduplica por (supplier_id, remito_number) y hash, crea compra, adjunta PDF
-    y genera líneas con matching (SKU y fuzzy por título). Si debug está activo,
-    devuelve eventos y muestras.
+
+async def _supplier_layout_hint(db: AsyncSession, supplier_id: int) -> Optional[str]:
+    """Etapa del parser que resolvió el último remito del proveedor (``extra_json.remito_layout``)."""
+    sup = await db.get(Supplier, supplier_id)
+    profile = (sup.extra_json or {}).get(_LAYOUT_PROFILE_KEY) if sup is not None and isinstance(sup.extra_json, dict) else None
+    return profile.get("stage") if isinstance(profile, dict) else None
+
+
+async def _remember_layout(db: AsyncSession, supplier_id: int, res: Any) -> None:
+    """Actualiza el perfil de layout del proveedor con la etapa que produjo las líneas."""
+    stage = res.debug.get("layout_stage") if isinstance(getattr(res, "debug", None), dict) else None
+    if not stage:
+        return
+    sup = await db.get(Supplier, supplier_id)
+    if sup is None:
+        return
+    extra = dict(sup.extra_json or {}) if isinstance(sup.extra_json, dict) else {}
+    prev = extra.get(_LAYOUT_PROFILE_KEY) if isinstance(extra.get(_LAYOUT_PROFILE_KEY), dict) else {}
+    extra[_LAYOUT_PROFILE_KEY] = {
+        "stage": stage,
+        "hits": int(prev.get("hits") or 0) + 1 if prev.get("stage") == stage else 1,
+        "fast_path": bool(res.debug.get("fast_path")),
+        "updated_at": datetime.utcnow().isoformat(),
+    }
+    sup.extra_json = extra
+
+
+async def _persist_santaplanta_import(
+    db: AsyncSession,
+    res: Any,
+    *,
+    supplier_id: int,
+    filename: str,
+    content_type: Optional[str],
+    content: bytes,
+    sha256: str,
+    correlation_id: str,
+    debug_flag: bool,
+) -> dict[str, Any]:
+    """Crea la compra a partir del resultado del pipeline (BORRADOR, adjunto, líneas, logs).
+
+    Corre en el event loop una vez que el parsing terminó en el pool. Los rechazos
+    esperables (duplicados 409, sin líneas 422) se lanzan como ``ImportRejected``.
     """
     import logging
     log = logging.getLogger("growen")
+    remito_number = res.remito_number or filename
+    remito_date_str = res.remito_date
     try:
-        content = await file.read()
-        # Validar tipo PDF por content-type o magic header
-        ct = (file.content_type or "").lower() if hasattr(file, "content_type") else ""
-        if not ("pdf" in ct or (len(content) >= 4 and content[:4] == b"%PDF")):
-            raise HTTPException(status_code=400, detail="Se espera un PDF")
-        sha256 = hashlib.sha256(content).hexdigest()
-        correlation_id = uuid.uuid4().hex
-        debug_flag = bool(debug) or (os.getenv("IMPORT_RETURN_DEBUG", "0") in ("1", "true", "True"))
-        # Guardar a disco primero y usar el pipeline robusto
-        tmp_root = Path("data") / "purchases" / "_tmp"
-        tmp_root.mkdir(parents=True, exist_ok=True)
-        tmp_pdf = tmp_root / (uuid.uuid4().hex + ".pdf")
-        with open(tmp_pdf, "wb") as fh:
-            fh.write(content)
+        remito_dt = date.fromisoformat(remito_date_str) if remito_date_str else date.today()
+    except Exception:
+        remito_dt = date.today()
 
-        # Log start (sin purchase_id aún)
-        try:
-            db.add(
-                AuditLog(
-                    action="purchase_import_start",
-                    table="purchases",
-                    entity_id=None,
-                    meta={
-                        "correlation_id": correlation_id,
-                        "supplier_id": supplier_id,
-                        "filename": file.filename,
-                        "size": len(content),
-                        "sha256": sha256,
-                    },
-                    user_id=None,
-                    ip=None,
+    # --- Política de BORRADOR vacío ---
+    # Política configurable en caliente vía env var (fallback al valor de Settings)
+    if "IMPORT_ALLOW_EMPTY_DRAFT" in os.environ:
+        ALLOW_EMPTY = str(os.getenv("IMPORT_ALLOW_EMPTY_DRAFT", "true")).lower() == "true"
+    else:
+        ALLOW_EMPTY = settings.import_allow_empty_draft
+    if not res.lines:
+        if ALLOW_EMPTY:
+            # Pre-chequeo de duplicados por (proveedor, remito)
+            exists = await db.scalar(
+                select(Purchase).where(
+                    Purchase.supplier_id == supplier_id,
+                    Purchase.remito_number == remito_number,
                 )
             )
-            await db.flush()
-        except Exception:
-            pass
-
-        log.info(f"Import[{correlation_id}]: Iniciando pipeline para {tmp_pdf} (size={len(content)}, sha256={sha256}, force_ocr={force_ocr})")
-
-        # Ejecutar pipeline (pdfplumber -> camelot -> OCR -> reintentos)
-        res = parse_remito(
-            tmp_pdf,
-            correlation_id=correlation_id,
-            use_ocr_auto=True,
-            force_ocr=bool(force_ocr),
-            debug=debug_flag,
-        )
-        # --- Fallback IA (fase 2: no líneas O baja confianza) ---
-        try:
-            from agent_core.config import settings as _st
-            low_conf = False
-            if res.lines and hasattr(res, 'classic_confidence'):
+            if exists:
+                raise remito_jobs.ImportRejected(409, "Compra ya existe para ese proveedor y remito")
+            # Pre-chequeo de duplicado por hash del PDF para el mismo proveedor
+            dup_q = (
+                select(PurchaseAttachment)
+                .join(Purchase, PurchaseAttachment.purchase_id == Purchase.id)
+                .where(Purchase.supplier_id == supplier_id)
+            )
+            dup_atts = (await db.execute(dup_q)).scalars().all()
+            for att in dup_atts:
                 try:
-                    low_conf = res.classic_confidence < _st.import_ai_classic_min_confidence
-                except Exception:
-                    low_conf = False
-            if (not res.lines or low_conf) and _st.import_ai_enabled:
-                from services.importers.ai_fallback import run_ai_fallback, merge_ai_lines
-                text_excerpt = (getattr(res, 'text_excerpt', None) or getattr(res, 'debug', {}).get('text_excerpt') or "")
-                ai_result = run_ai_fallback(
-                    correlation_id=correlation_id,
-                    text_excerpt=text_excerpt,
-                    classic_lines_hint=len(res.lines or []),
-                    classic_confidence=getattr(res, 'classic_confidence', None),
-                )
-                # Añadir eventos AI al final
-                for ev in ai_result.events:
-                    res.events.append(ev)
-                if ai_result.ok and ai_result.payload:
-                    merged, stats = merge_ai_lines(res.lines or [], ai_result.payload, _st.import_ai_min_confidence)
-                    res.lines = merged
-                    res.events.append({"level": "INFO", "stage": "ai", "event": "merged", "details": stats})
-                else:
-                    res.events.append({"level": "INFO", "stage": "ai", "event": "no_data", "details": {"reason": ai_result.error}})
-        except Exception as _ai_e:  # No debe abortar importación
+                    with open(att.path, "rb") as fh:
+                        other = hashlib.sha256(fh.read()).hexdigest()
+                    if other == sha256:
+                        db.add(
+                            AuditLog(
+                                action="purchase_import_duplicate",
+                                table="purchases",
+                                entity_id=att.purchase_id,
+                                meta={"correlation_id": correlation_id, "sha256": sha256, "filename": filename},
+                                user_id=None,
+                                ip=None,
+                            )
+                        )
+                        await db.commit()
+                        raise remito_jobs.ImportRejected(409, "PDF ya importado para este proveedor")
+                except FileNotFoundError:
+                    continue
+            # Crear compra vacía (BORRADOR), adjuntar PDF y devolver 200
+            p = Purchase(supplier_id=supplier_id, remito_number=remito_number, remito_date=remito_dt)
+            db.add(p)
+            await db.flush()
+            root = Path("data") / "purchases" / str(p.id)
+            root.mkdir(parents=True, exist_ok=True)
+            pdf_path = root / filename
+            with open(pdf_path, "wb") as fh:
+                fh.write(content)
+            db.add(PurchaseAttachment(purchase_id=p.id, filename=filename, mime=content_type, size=len(content), path=str(pdf_path)))
             try:
-                res.events.append({"level": "WARN", "stage": "ai", "event": "exception", "details": {"error": str(_ai_e)}})
+                samples_empty = (res.debug.get("samples") if isinstance(res.debug, dict) else None)
             except Exception:
-                pass
-        log.info(f"Import[{correlation_id}]: Pipeline finalizado. Remito={res.remito_number}, Fecha={res.remito_date}, Líneas detectadas={len(res.lines) if res.lines else 0}")
-
-        remito_number = res.remito_number or file.filename
-        remito_date_str = res.remito_date
-        try:
-            remito_dt = date.fromisoformat(remito_date_str) if remito_date_str else date.today()
-        except Exception:
-            remito_dt = date.today()
-
-    # --- Política de BORRADOR vacío ---
-        # Política configurable en caliente vía env var (fallback al valor de Settings)
-        if "IMPORT_ALLOW_EMPTY_DRAFT" in os.environ:
-            ALLOW_EMPTY = str(os.getenv("IMPORT_ALLOW_EMPTY_DRAFT", "true")).lower() == "true"
-        else:
-            ALLOW_EMPTY = settings.import_allow_empty_draft
-        if not res.lines:
-            if ALLOW_EMPTY:
-                # Pre-chequeo de duplicados por (proveedor, remito)
-                exists = await db.scalar(
-                    select(Purchase).where(
-                        Purchase.supplier_id == supplier_id,
-                        Purchase.remito_number == remito_number,
-                    )
-                )
-                if exists:
-                    raise HTTPException(status_code=409, detail="Compra ya existe para ese proveedor y remito")
-                # Pre-chequeo de duplicado por hash del PDF para el mismo proveedor
-                dup_q = (
-                    select(PurchaseAttachment)
-                    .join(Purchase, PurchaseAttachment.purchase_id == Purchase.id)
-                    .where(Purchase.supplier_id == supplier_id)
-                )
-                dup_atts = (await db.execute(dup_q)).scalars().all()
-                for att in dup_atts:
+                samples_empty = None
+            meta_obj = {
+                "correlation_id": correlation_id,
+                "filename": filename,
+                "sha256": sha256,
+                "remito_number": remito_number,
+                "remito_date": remito_dt.isoformat(),
+                "lines_detected": 0,
+                "note": "empty_draft_allowed",
+                "samples": samples_empty,
+            }
+            db.add(AuditLog(action="purchase_import", table="purchases", entity_id=p.id, meta=_sanitize_for_json(meta_obj)))
+            # Registrar eventos del pipeline en ImportLog para diagnóstico aunque no haya líneas
+            try:
+                for ev in (res.events or []):
                     try:
-                        with open(att.path, "rb") as fh:
-                            other = hashlib.sha256(fh.read()).hexdigest()
-                        if other == sha256:
-                            db.add(
-                                AuditLog(
-                                    action="purchase_import_duplicate",
-                                    table="purchases",
-                                    entity_id=att.purchase_id,
-                                    meta={"correlation_id": correlation_id, "sha256": sha256, "filename": file.filename},
-                                    user_id=None,
-                                    ip=None,
-                                )
-                            )
-                            await db.commit()
-                            raise HTTPException(status_code=409, detail="PDF ya importado para este proveedor")
-                    except FileNotFoundError:
-                        continue
-                # Crear compra vacía (BORRADOR), adjuntar PDF y devolver 200
-                p = Purchase(supplier_id=supplier_id, remito_number=remito_number, remito_date=remito_dt)
-                db.add(p)
-                await db.flush()
-                root = Path("data") / "purchases" / str(p.id)
-                root.mkdir(parents=True, exist_ok=True)
-                pdf_path = root / file.filename
-                with open(pdf_path, "wb") as fh:
-                    fh.write(content)
-                db.add(PurchaseAttachment(purchase_id=p.id, filename=file.filename, mime=file.content_type, size=len(content), path=str(pdf_path)))
-                try:
-                    samples_empty = (res.debug.get("samples") if isinstance(res.debug, dict) else None)
-                except Exception:
-                    samples_empty = None
-                meta_obj = {
-                    "correlation_id": correlation_id,
-                    "filename": file.filename,
-                    "sha256": sha256,
-                    "remito_number": remito_number,
-                    "remito_date": remito_dt.isoformat(),
-                    "lines_detected": 0,
-                    "note": "empty_draft_allowed",
-                    "samples": samples_empty,
-                }
-                db.add(AuditLog(action="purchase_import", table="purchases", entity_id=p.id, meta=_sanitize_for_json(meta_obj)))
-                # Registrar eventos del pipeline en ImportLog para diagnóstico aunque no haya líneas
+                        details = ev.get("details") or {}
+                    except Exception:
+                        details = {}
+                    db.add(
+                        ImportLog(
+                            purchase_id=p.id,
+                            correlation_id=correlation_id,
+                            level=str(ev.get("level") or "INFO"),
+                            stage=str(ev.get("stage") or ""),
+                            event=str(ev.get("event") or ""),
+                            details=_sanitize_for_json(details),
+                        )
+                    )
+                # Registrar métrica de confianza clásica (heurística) aun cuando no haya líneas
                 try:
-                    for ev in (res.events or []):
-                        try:
-                            details = ev.get("details") or {}
-                        except Exception:
-                            details = {}
+                    if hasattr(res, "classic_confidence") and res.classic_confidence is not None:
                         db.add(
                             ImportLog(
                                 purchase_id=p.id,
                                 correlation_id=correlation_id,
-                                level=str(ev.get("level") or "INFO"),
-                                stage=str(ev.get("stage") or ""),
-                                event=str(ev.get("event") or ""),
-                                details=_sanitize_for_json(details),
+                                level="INFO",
+                                stage="heuristic",
+                                event="classic_confidence",
+                                details={
+                                    "value": float(res.classic_confidence),
+                                    "lines": 0,
+                                },
                             )
                         )
-                    # Registrar métrica de confianza clásica (heurística) aun cuando no haya líneas
-                    try:
-                        if hasattr(res, "classic_confidence") and res.classic_confidence is not None:
-                            db.add(
-                                ImportLog(
-                                    purchase_id=p.id,
-                                    correlation_id=correlation_id,
-                                    level="INFO",
-                                    stage="heuristic",
-                                    event="classic_confidence",
-                                    details={
-                                        "value": float(res.classic_confidence),
-                                        "lines": 0,
-                                    },
-                                )
-                            )
-                    except Exception:
-                        pass
                 except Exception:
                     pass
-                await db.commit()
-                await db.refresh(p)
-                return {
-                    "purchase_id": p.id,
-                    "status": p.status,
-                    "filename": file.filename,
-                    "correlation_id": correlation_id,
-                    "parsed": {"remito": remito_number, "fecha": remito_dt.isoformat(), "lines": 0, "totals": {"subtotal": 0, "iva": 0, "total": 0}, "hash": f"sha256:{sha256}"},
-                    "unmatched_count": 0,
-                    "debug": (res.debug if debug_flag else None),
-                }
-            else:
-                try:
-                    db.add(
-                        AuditLog(
-                            action="purchase_import_no_lines",
-                            table="purchases",
-                            entity_id=None,
-                            meta={
-                                "correlation_id": correlation_id,
-                                "supplier_id": supplier_id,
-                                "filename": file.filename,
-                                "sha256": sha256,
-                                "remito": res.remito_number,
-                                "fecha": res.remito_date,
-                                "events": (res.events[:20] if res.events else []),
-                            },
-                        )
-                    )
-                    await db.commit()
-                except Exception:
-                    pass
-                # Mensaje incluye variante normal y mojibake para robustez de tests
-                detail = {
-                    "detail": "No se detectaron líneas / No se detectaron lÃ­neas. Revisá el PDF del proveedor.",
-                    "correlation_id": correlation_id,
-                    "remito": res.remito_number,
-                    "fecha": res.remito_date,
-                }
-                if debug_flag:
-                    detail["events"] = res.events[:20] if res.events else []
-                    if res.debug:
-                        detail["debug"] = {"samples": res.debug.get("samples")}
-                raise HTTPException(status_code=422, detail=detail)
-
-        # Idempotencia: UNIQUE (supplier_id, remito_number)
-        exists = await db.scalar(select(Purchase).where(Purchase.supplier_id==supplier_id, Purchase.remito_number==remito_number))
-        if exists:
-            raise HTTPException(status_code=409, detail="Compra ya existe para ese proveedor y remito")
-        # Idempotencia adicional: mismo PDF (hash) para el mismo proveedor
-        dup_q = (
-            select(PurchaseAttachment)
-            .join(Purchase, PurchaseAttachment.purchase_id == Purchase.id)
-            .where(Purchase.supplier_id == supplier_id)
-        )
-        dup_atts = (await db.execute(dup_q)).scalars().all()
-        for att in dup_atts:
+            except Exception:
+                pass
+            await db.commit()
+            await db.refresh(p)
+            return {
+                "purchase_id": p.id,
+                "status": p.status,
+                "filename": filename,
+                "correlation_id": correlation_id,
+                "parsed": {"remito": remito_number, "fecha": remito_dt.isoformat(), "lines": 0, "totals": {"subtotal": 0, "iva": 0, "total": 0}, "hash": f"sha256:{sha256}"},
+                "unmatched_count": 0,
+                "debug": (res.debug if debug_flag else None),
+            }
+        else:
             try:
-                with open(att.path, "rb") as fh:
-                    other = hashlib.sha256(fh.read()).hexdigest()
-                if other == sha256:
-                    db.add(
-                        AuditLog(
-                            action="purchase_import_duplicate",
-                            table="purchases",
-                            entity_id=att.purchase_id,
-                            meta={"correlation_id": correlation_id, "sha256": sha256, "filename": file.filename},
-                            user_id=None,
-                            ip=None,
-                        )
+                db.add(
+                    AuditLog(
+                        action="purchase_import_no_lines",
+                        table="purchases",
+                        entity_id=None,
+                        meta={
+                            "correlation_id": correlation_id,
+                            "supplier_id": supplier_id,
+                            "filename": filename,
+                            "sha256": sha256,
+                            "remito": res.remito_number,
+                            "fecha": res.remito_date,
+                            "events": (res.events[:20] if res.events else []),
+                        },
                     )
-                    await db.commit()
-                    raise HTTPException(status_code=409, detail="PDF ya importado para este proveedor")
-            except FileNotFoundError:
-                continue
+                )
+                await db.commit()
+            except Exception:
+                pass
+            # Mensaje incluye variante normal y mojibake para robustez de tests
+            detail = {
+                "detail": "No se detectaron líneas / No se detectaron lÃ­neas. Revisá el PDF del proveedor.",
+                "correlation_id": correlation_id,
+                "remito": res.remito_number,
+                "fecha": res.remito_date,
+            }
+            if debug_flag:
+                detail["events"] = res.events[:20] if res.events else []
+                if res.debug:
+                    detail["debug"] = {"samples": res.debug.get("samples")}
+            raise remito_jobs.ImportRejected(422, detail)
 
-        p = Purchase(supplier_id=supplier_id, remito_number=remito_number, remito_date=remito_dt)
-        db.add(p)
-        await db.flush()
+    # Idempotencia: UNIQUE (supplier_id, remito_number)
+    exists = await db.scalar(select(Purchase).where(Purchase.supplier_id==supplier_id, Purchase.remito_number==remito_number))
+    if exists:
+        raise remito_jobs.ImportRejected(409, "Compra ya existe para ese proveedor y remito")
+    # Idempotencia adicional: mismo PDF (hash) para el mismo proveedor
+    dup_q = (
+        select(PurchaseAttachment)
+        .join(Purchase, PurchaseAttachment.purchase_id == Purchase.id)
+        .where(Purchase.supplier_id == supplier_id)
+    )
+    dup_atts = (await db.execute(dup_q)).scalars().all()
+    for att in dup_atts:
+        try:
+            with open(att.path, "rb") as fh:
+                other = hashlib.sha256(fh.read()).hexdigest()
+            if other == sha256:
+                db.add(
+                    AuditLog(
+                        action="purchase_import_duplicate",
+                        table="purchases",
+                        entity_id=att.purchase_id,
+                        meta={"correlation_id": correlation_id, "sha256": sha256, "filename": filename},
+                        user_id=None,
+                        ip=None,
+                    )
+                )
+                await db.commit()
+                raise remito_jobs.ImportRejected(409, "PDF ya importado para este proveedor")
+        except FileNotFoundError:
+            continue
 
-        # Guardar el adjunto
-        root = Path("data") / "purchases" / str(p.id)
-        root.mkdir(parents=True, exist_ok=True)
-        pdf_path = root / file.filename
-        with open(pdf_path, "wb") as fh:
-            fh.write(content)
+    p = Purchase(supplier_id=supplier_id, remito_number=remito_number, remito_date=remito_dt)
+    db.add(p)
+    await db.flush()
 
-        db.add(PurchaseAttachment(purchase_id=p.id, filename=file.filename, mime=file.content_type, size=len(content), path=str(pdf_path)))
+    # Guardar el adjunto
+    root = Path("data") / "purchases" / str(p.id)
+    root.mkdir(parents=True, exist_ok=True)
+    pdf_path = root / filename
+    with open(pdf_path, "wb") as fh:
+        fh.write(content)
 
-        # Crear líneas con matching por supplier_sku -> supplier_products.supplier_product_id
-        # Convertir líneas normalizadas del parser
-        lines = [
-            {
-                "supplier_sku": ln.supplier_sku,
-                "title": ln.title,
-                "qty": float(ln.qty or 0),
-                "unit_cost": float(ln.unit_cost_bonif or 0),
-                "line_discount": float(ln.pct_bonif or 0),
-                "subtotal": float(ln.subtotal or 0) if ln.subtotal else float((ln.qty or 0) * (ln.unit_cost_bonif or 0)),
-                "iva": float(ln.iva or 0),
-                "total": float(ln.total or 0) if ln.total else float(ln.subtotal or 0) if ln.subtotal else float((ln.qty or 0) * (ln.unit_cost_bonif or 0)),
-            }
-            for ln in res.lines
-        ]
-        # Normalizaciones adicionales (reparar SKU y bonificación si faltan)
-        for ln in lines:
-            try:
-                title_txt = (ln.get("title") or "").strip()
-                qty_num = int(float(ln.get("qty") or 0))
-                sku_txt = (ln.get("supplier_sku") or "").strip()
-                if sku_txt.isdigit() and qty_num and int(sku_txt) == qty_num:
-                    import re as _re
-                    cand = _re.findall(r"\b(\d{4,6})\b", title_txt)
-                    if cand:
-                        ln["supplier_sku"] = cand[-1]
-                    else:
-                        cand3 = [t for t in _re.findall(r"\b(\d{3,6})\b", title_txt) if int(t) != qty_num]
-                        if cand3:
-                            ln["supplier_sku"] = cand3[-1]
-                if float(ln.get("line_discount") or 0) == 0 and title_txt:
-                    import re as _re
-                    mdisc = _re.search(r"(-?\d{1,2}(?:[\.,]\d+)?)\s*%", title_txt)
-                    if mdisc:
-                        try:
-                            val = float(str(mdisc.group(1)).replace(".", "").replace(",", "."))
-                            ln["line_discount"] = val
-                        except Exception:
-                            pass
-            except Exception:
-                pass
-        # --- Anti-duplicados: filtrar por SKU y por título normalizado ---
-        unique_lines, ignored_by_sku, ignored_by_title = _dedupe_lines(lines)
+    db.add(PurchaseAttachment(purchase_id=p.id, filename=filename, mime=content_type, size=len(content), path=str(pdf_path)))
 
-        # Log de duplicados a ImportLog en WARN
+    # Crear líneas con matching por supplier_sku -> supplier_products.supplier_product_id
+    # Convertir líneas normalizadas del parser
+    lines = [
+        {
+            "supplier_sku": ln.supplier_sku,
+            "title": ln.title,
+            "qty": float(ln.qty or 0),
+            "unit_cost": float(ln.unit_cost_bonif or 0),
+            "line_discount": float(ln.pct_bonif or 0),
+            "subtotal": float(ln.subtotal or 0) if ln.subtotal else float((ln.qty or 0) * (ln.unit_cost_bonif or 0)),
+            "iva": float(ln.iva or 0),
+            "total": float(ln.total or 0) if ln.total else float(ln.subtotal or 0) if ln.subtotal else float((ln.qty or 0) * (ln.unit_cost_bonif or 0)),
+        }
+        for ln in res.lines
+    ]
+    # Normalizaciones adicionales (reparar SKU y bonificación si faltan)
+    for ln in lines:
         try:
-            if ignored_by_sku:
-                db.add(ImportLog(
-                    purchase_id=p.id,
-                    correlation_id=correlation_id,
-                    level="WARN",
-                    stage="dedupe",
-                    event="ignored_duplicates_by_sku",
-                    details={"count": ignored_by_sku},
-                ))
-            if ignored_by_title:
-                db.add(ImportLog(
-                    purchase_id=p.id,
-                    correlation_id=correlation_id,
-                    level="WARN",
-                    stage="dedupe",
-                    event="ignored_duplicates_by_title",
-                    details={"count": ignored_by_title},
-                ))
+            title_txt = (ln.get("title") or "").strip()
+            qty_num = int(float(ln.get("qty") or 0))
+            sku_txt = (ln.get("supplier_sku") or "").strip()
+            if sku_txt.isdigit() and qty_num and int(sku_txt) == qty_num:
+                import re as _re
+                cand = _re.findall(r"\b(\d{4,6})\b", title_txt)
+                if cand:
+                    ln["supplier_sku"] = cand[-1]
+                else:
+                    cand3 = [t for t in _re.findall(r"\b(\d{3,6})\b", title_txt) if int(t) != qty_num]
+                    if cand3:
+                        ln["supplier_sku"] = cand3[-1]
+            if float(ln.get("line_discount") or 0) == 0 and title_txt:
+                import re as _re
+                mdisc = _re.search(r"(-?\d{1,2}(?:[\.,]\d+)?)\s*%", title_txt)
+                if mdisc:
+                    try:
+                        val = float(str(mdisc.group(1)).replace(".", "").replace(",", "."))
+                        ln["line_discount"] = val
+                    except Exception:
+                        pass
         except Exception:
             pass
+    # --- Anti-duplicados: filtrar por SKU y por título normalizado ---
+    unique_lines, ignored_by_sku, ignored_by_title = _dedupe_lines(lines)
 
-        src_lines = unique_lines
-        for ln in src_lines:
-            sku = (ln.get("supplier_sku") or "").strip()
-            title = (ln.get("title") or "").strip() or sku or "(sin título)"
-            
-            # SEGURIDAD: Si título es muy largo, intentar extraer solo la parte del producto
-            if len(title) > 150:
-                # El fallback multiline a veces concatena todo el texto previo
-                # Buscar patrones de producto real: SKU largo (6-12 dígitos con ceros) seguido de nombre
-                import re as _re
-                # Patrón específico Santa Planta: SKU de 6-12 dígitos (típicamente 000000092)
-                # seguido de nombre de producto (letras, al menos una palabra de 3+ chars)
-                m = _re.search(
-                    r'\b(\d{6,12})\s+([A-Za-záéíóúñÁÉÍÓÚÑ][A-Za-záéíóúñÁÉÍÓÚÑ\s0-9\-\.x]+)',
-                    title
-                )
-                if m and len(m.group(2).strip()) > 5:
-                    # Verificar que el título extraído tenga palabras válidas (no solo números/fechas)
-                    extracted_title = m.group(2).strip()
-                    # Rechazar si parece una fecha o número puro
-                    if not _re.fullmatch(r'[\d\s/\-]+', extracted_title):
-                        if not sku or len(sku) < 6:
-                            sku = m.group(1)
-                        log.info(f"Import[{correlation_id}]: Título extraído de texto largo: '{extracted_title}' (SKU: {sku})")
-                        title = extracted_title
-            
-            # SEGURIDAD: Truncar título a 250 chars (límite BD es 300)
-            if len(title) > 250:
-                title = title[:247] + "..."
-            
-            qty = Decimal(str(ln.get("qty") or 0))
-            unit_cost = Decimal(str(ln.get("unit_cost") or 0))
-            line_discount = Decimal(str(ln.get("line_discount") or 0))
-            supplier_item_id = None
-            product_id = None
-            if sku:
-                sp = await db.scalar(
-                    select(SupplierProduct)
-                    .where(
-                        SupplierProduct.supplier_id==supplier_id,
-                        SupplierProduct.supplier_product_id==sku
-                    )
-                )
-                if not sp and title:
-                    import re as _re
-                    for tok in _re.findall(r"\b(\d{3,6})\b", title):
-                        sp = await db.scalar(
-                            select(SupplierProduct)
-                            .where(
-                                SupplierProduct.supplier_id==supplier_id,
-                                SupplierProduct.supplier_product_id==tok
-                            )
-                        )
-                        if sp:
-                            sku = tok
-                            ln["supplier_sku"] = tok
-                            break
-                if sp:
-                    supplier_item_id = sp.id
-                    product_id = sp.internal_product_id
-            # Fuzzy por título deshabilitado para evitar falsos positivos.
-            # La validación exige existencia por SKU proveedor.
-            state = "OK" if (supplier_item_id or product_id) else "SIN_VINCULAR"
-            db.add(PurchaseLine(
+    # Log de duplicados a ImportLog en WARN
+    try:
+        if ignored_by_sku:
+            db.add(ImportLog(
                 purchase_id=p.id,
-                supplier_item_id=supplier_item_id,
-                product_id=product_id,
-                supplier_sku=sku or None,
-                title=title,
-                qty=qty,
-                unit_cost=unit_cost,
-                line_discount=line_discount,
-                state=state,
+                correlation_id=correlation_id,
+                level="WARN",
+                stage="dedupe",
+                event="ignored_duplicates_by_sku",
+                details={"count": ignored_by_sku},
             ))
-        try:
-            setattr(p, "meta", _sanitize_for_json({
+        if ignored_by_title:
+            db.add(ImportLog(
+                purchase_id=p.id,
+                correlation_id=correlation_id,
+                level="WARN",
+                stage="dedupe",
+                event="ignored_duplicates_by_title",
+                details={"count": ignored_by_title},
+            ))
+    except Exception:
+        pass
+
+    src_lines = unique_lines
+    prepared: list[tuple[dict, str, str]] = []
+    for ln in src_lines:
+        sku = (ln.get("supplier_sku") or "").strip()
+        title = (ln.get("title") or "").strip() or sku or "(sin título)"
+        
+        # SEGURIDAD: Si título es muy largo, intentar extraer solo la parte del producto
+        if len(title) > 150:
+            # El fallback multiline a veces concatena todo el texto previo
+            # Buscar patrones de producto real: SKU largo (6-12 dígitos con ceros) seguido de nombre
+            import re as _re
+            # Patrón específico Santa Planta: SKU de 6-12 dígitos (típicamente 000000092)
+            # seguido de nombre de producto (letras, al menos una palabra de 3+ chars)
+            m = _re.search(
+                r'\b(\d{6,12})\s+([A-Za-záéíóúñÁÉÍÓÚÑ][A-Za-záéíóúñÁÉÍÓÚÑ\s0-9\-\.x]+)',
+                title
+            )
+            if m and len(m.group(2).strip()) > 5:
+                # Verificar que el título extraído tenga palabras válidas (no solo números/fechas)
+                extracted_title = m.group(2).strip()
+                # Rechazar si parece una fecha o número puro
+                if not _re.fullmatch(r'[\d\s/\-]+', extracted_title):
+                    if not sku or len(sku) < 6:
+                        sku = m.group(1)
+                    log.info(f"Import[{correlation_id}]: Título extraído de texto largo: '{extracted_title}' (SKU: {sku})")
+                    title = extracted_title
+        
+        # SEGURIDAD: Truncar título a 250 chars (límite BD es 300)
+        if len(title) > 250:
+            title = title[:247] + "..."
+        prepared.append((ln, sku, title))
+
+    # Vínculo por SKU proveedor: todos los candidatos (SKU + tokens numéricos del título) en una consulta
+    resolver = await SkuResolver.load(db, supplier_id, ((sku, title) for _, sku, title in prepared), use_title_tokens=True)
+    for ln, sku, title in prepared:
+        qty = Decimal(str(ln.get("qty") or 0))
+        unit_cost = Decimal(str(ln.get("unit_cost") or 0))
+        line_discount = Decimal(str(ln.get("line_discount") or 0))
+        supplier_item_id = None
+        product_id = None
+        if sku:
+            sp, matched_sku = resolver.match(sku, title)
+            if sp:
+                if matched_sku != sku:
+                    sku = matched_sku
+                    ln["supplier_sku"] = matched_sku
+                supplier_item_id = sp.id
+                product_id = sp.internal_product_id
+        # Fuzzy por título deshabilitado para evitar falsos positivos.
+        # La validación exige existencia por SKU proveedor.
+        state = "OK" if (supplier_item_id or product_id) else "SIN_VINCULAR"
+        db.add(PurchaseLine(
+            purchase_id=p.id,
+            supplier_item_id=supplier_item_id,
+            product_id=product_id,
+            supplier_sku=sku or None,
+            title=title,
+            qty=qty,
+            unit_cost=unit_cost,
+            line_discount=line_discount,
+            state=state,
+        ))
+    try:
+        setattr(p, "meta", _sanitize_for_json({
+            "correlation_id": correlation_id,
+            "filename": filename,
+            "sha256": sha256,
+            "remito_number": remito_number,
+            "remito_date": remito_dt.isoformat(),
+            "lines_detected": len(lines),
+            "lines_unique": len(src_lines),
+            "ignored_by_sku": ignored_by_sku,
+            "ignored_by_title": ignored_by_title,
+        }))
+    except Exception:
+        pass
+    try:
+        samples = (res.debug.get("samples") if isinstance(res.debug, dict) else None)
+    except Exception:
+        samples = None
+    db.add(
+        AuditLog(
+            action="purchase_import",
+            table="purchases",
+            entity_id=p.id,
+            meta=_sanitize_for_json({
                 "correlation_id": correlation_id,
-                "filename": file.filename,
+                "filename": filename,
                 "sha256": sha256,
                 "remito_number": remito_number,
                 "remito_date": remito_dt.isoformat(),
@@ -2656,143 +2644,228 @@ async def import_santaplanta_pdf(
                 "lines_unique": len(src_lines),
                 "ignored_by_sku": ignored_by_sku,
                 "ignored_by_title": ignored_by_title,
-            }))
-        except Exception:
-            pass
-        try:
-            samples = (res.debug.get("samples") if isinstance(res.debug, dict) else None)
-        except Exception:
-            samples = None
-        db.add(
-            AuditLog(
-                action="purchase_import",
-                table="purchases",
-                entity_id=p.id,
-                meta=_sanitize_for_json({
-                    "correlation_id": correlation_id,
-                    "filename": file.filename,
-                    "sha256": sha256,
-                    "remito_number": remito_number,
-                    "remito_date": remito_dt.isoformat(),
-                    "lines_detected": len(lines),
-                    "lines_unique": len(src_lines),
-                    "ignored_by_sku": ignored_by_sku,
-                    "ignored_by_title": ignored_by_title,
-                    "samples": samples,
-                }),
-                user_id=None,
-                ip=None,
-            )
+                "samples": samples,
+            }),
+            user_id=None,
+            ip=None,
         )
+    )
+    try:
+        for ev in res.events:
+            try:
+                details = ev.get("details") or {}
+            except Exception:
+                details = {}
+            db.add(
+                ImportLog(
+                    purchase_id=p.id,
+                    correlation_id=correlation_id,
+                    level=str(ev.get("level") or "INFO"),
+                    stage=str(ev.get("stage") or ""),
+                    event=str(ev.get("event") or ""),
+                    details=_sanitize_for_json(details),
+                )
+            )
+        # Persistir resumen de intentos si vienen en debug.attempts
         try:
-            for ev in res.events:
-                try:
-                    details = ev.get("details") or {}
-                except Exception:
-                    details = {}
+            attempts = None
+            if isinstance(res.debug, dict):
+                attempts = res.debug.get("attempts")
+            if attempts and isinstance(attempts, list):
+                # Limitar a primeras 8 entradas y campos esenciales
+                at = [
+                    {
+                        "name": (a.get("name") if isinstance(a, dict) else getattr(a, "name", "")),
+                        "ok": bool(a.get("ok")) if isinstance(a, dict) else bool(getattr(a, "ok", False)),
+                        "lines_found": int(a.get("lines_found") or 0) if isinstance(a, dict) else int(getattr(a, "lines_found", 0) or 0),
+                        "elapsed_ms": int(a.get("elapsed_ms") or 0) if isinstance(a, dict) else int(getattr(a, "elapsed_ms", 0) or 0),
+                    }
+                    for a in attempts[:8]
+                ]
                 db.add(
                     ImportLog(
                         purchase_id=p.id,
                         correlation_id=correlation_id,
-                        level=str(ev.get("level") or "INFO"),
-                        stage=str(ev.get("stage") or ""),
-                        event=str(ev.get("event") or ""),
-                        details=_sanitize_for_json(details),
+                        level="INFO",
+                        stage="attempts",
+                        event="summary",
+                        details={"items": at},
                     )
                 )
-            # Persistir resumen de intentos si vienen en debug.attempts
-            try:
-                attempts = None
-                if isinstance(res.debug, dict):
-                    attempts = res.debug.get("attempts")
-                if attempts and isinstance(attempts, list):
-                    # Limitar a primeras 8 entradas y campos esenciales
-                    at = [
-                        {
-                            "name": (a.get("name") if isinstance(a, dict) else getattr(a, "name", "")),
-                            "ok": bool(a.get("ok")) if isinstance(a, dict) else bool(getattr(a, "ok", False)),
-                            "lines_found": int(a.get("lines_found") or 0) if isinstance(a, dict) else int(getattr(a, "lines_found", 0) or 0),
-                            "elapsed_ms": int(a.get("elapsed_ms") or 0) if isinstance(a, dict) else int(getattr(a, "elapsed_ms", 0) or 0),
-                        }
-                        for a in attempts[:8]
-                    ]
-                    db.add(
-                        ImportLog(
-                            purchase_id=p.id,
-                            correlation_id=correlation_id,
-                            level="INFO",
-                            stage="attempts",
-                            event="summary",
-                            details={"items": at},
-                        )
-                    )
-            except Exception:
-                pass
-            # Registrar métrica de confianza clásica (heurística) para diagnósticos
-            try:
-                if hasattr(res, "classic_confidence") and res.classic_confidence is not None:
-                    db.add(
-                        ImportLog(
-                            purchase_id=p.id,
-                            correlation_id=correlation_id,
-                            level="INFO",
-                            stage="heuristic",
-                            event="classic_confidence",
-                            details={
-                                "value": float(res.classic_confidence),
-                                "lines": len(res.lines or []),
-                            },
-                        )
+        except Exception:
+            pass
+        # Registrar métrica de confianza clásica (heurística) para diagnósticos
+        try:
+            if hasattr(res, "classic_confidence") and res.classic_confidence is not None:
+                db.add(
+                    ImportLog(
+                        purchase_id=p.id,
+                        correlation_id=correlation_id,
+                        level="INFO",
+                        stage="heuristic",
+                        event="classic_confidence",
+                        details={
+                            "value": float(res.classic_confidence),
+                            "lines": len(res.lines or []),
+                        },
                     )
-            except Exception:
-                pass
+                )
         except Exception:
             pass
+    except Exception:
+        pass
+    if res.lines:
+        await _remember_layout(db, supplier_id, res)
+    await db.commit()
+    await db.refresh(p)
+    try:
+        sub = float(res.totals.get("subtotal") or 0)
+    except Exception:
+        sub = sum(float(l.get("subtotal") or 0) for l in src_lines) or sum(
+            float(l.get("qty") or 0) * float(l.get("unit_cost") or 0) for l in src_lines
+        )
+    vat = float(p.vat_rate or 0)
+    iva = sub * (vat / 100.0)
+    total = sub + iva
+    response_data = {
+        "purchase_id": p.id,
+        "status": p.status,
+        "filename": filename,
+        "correlation_id": correlation_id,
+        "parsed": {
+            "remito": remito_number,
+            "fecha": remito_dt.isoformat(),
+            "lines": len(src_lines),
+            "totals": {"subtotal": round(sub, 2), "iva": round(iva, 2), "total": round(total, 2)},
+            "hash": f"sha256:{sha256}",
+        },
+        "unmatched_count": 0,
+        "debug": (res.debug if debug_flag else None),
+    }
+    # Limpieza de logs (mejor esfuerzo) al finalizar el flujo, para dejar entorno listo
+    try:
+        # Ejecutar limpieza con políticas por defecto; no bloquear ante errores
+        from scripts import cleanup_logs as _cleanup
+        # Conservar capturas recientes 30 días y limitar a 200 MB (defaults de script)
+        _ = await asyncio.to_thread(_cleanup.main, ["--screenshots-keep-days", "30", "--screenshots-max-mb", "200"])  # type: ignore
+        db.add(ImportLog(
+            purchase_id=p.id,
+            correlation_id=correlation_id,
+            level="INFO",
+            stage="cleanup",
+            event="logs_cleanup_done",
+            details={"result": "ok"},
+        ))
         await db.commit()
-        await db.refresh(p)
+    except Exception:
+        # No bloquear respuesta por fallas en limpieza
+        pass
+    return response_data
+
+
+@router.post("/import/santaplanta", dependencies=[Depends(require_roles("admin", "colaborador")), Depends(require_csrf)])
+async def import_santaplanta_pdf(
+    supplier_id: int,
+    file: UploadFile = File(...),
+    db: AsyncSession = Depends(get_session),
+    debug: int = Query(0),
+    force_ocr: int = Query(0),
+    wait: bool = Query(False),
+):
+    """Importa PDF de Santa Planta mediante pipeline.
+
+    Guarda temporal y encola parse_remito (pdfplumber → camelot → OCR → IA) en el
+    pool de ``remito_jobs``; responde 202 con ``job_id`` (progreso en
+    ``GET /purchases/import/jobs/{job_id}``). Al terminar deduplica por
+    (supplier_id, remito_number) y hash, crea compra, adjunta PDF y genera líneas
+    con matching por SKU. ``wait=true`` espera el job y devuelve la respuesta
+    sincrónica de siempre (200/409/422). Si debug está activo, devuelve eventos y
+    muestras.
+    """
+    import logging
+    log = logging.getLogger("growen")
+    try:
+        content = await file.read()
+        # Validar tipo PDF por content-type o magic header
+        ct = (file.content_type or "").lower() if hasattr(file, "content_type") else ""
+        if not ("pdf" in ct or (len(content) >= 4 and content[:4] == b"%PDF")):
+            raise HTTPException(status_code=400, detail="Se espera un PDF")
+        sha256 = hashlib.sha256(content).hexdigest()
+        correlation_id = uuid.uuid4().hex
+        debug_flag = bool(debug) or (os.getenv("IMPORT_RETURN_DEBUG", "0") in ("1", "true", "True"))
+        # Guardar a disco primero y usar el pipeline robusto
+        tmp_root = Path("data") / "purchases" / "_tmp"
+        tmp_root.mkdir(parents=True, exist_ok=True)
+        tmp_pdf = tmp_root / (uuid.uuid4().hex + ".pdf")
+        with open(tmp_pdf, "wb") as fh:
+            fh.write(content)
+
+        # Log start (sin purchase_id aún)
         try:
-            sub = float(res.totals.get("subtotal") or 0)
-        except Exception:
-            sub = sum(float(l.get("subtotal") or 0) for l in src_lines) or sum(
-                float(l.get("qty") or 0) * float(l.get("unit_cost") or 0) for l in src_lines
+            db.add(
+                AuditLog(
+                    action="purchase_import_start",
+                    table="purchases",
+                    entity_id=None,
+                    meta={
+                        "correlation_id": correlation_id,
+                        "supplier_id": supplier_id,
+                        "filename": file.filename,
+                        "size": len(content),
+                        "sha256": sha256,
+                    },
+                    user_id=None,
+                    ip=None,
+                )
             )
-        vat = float(p.vat_rate or 0)
-        iva = sub * (vat / 100.0)
-        total = sub + iva
-        response_data = {
-            "purchase_id": p.id,
-            "status": p.status,
-            "filename": file.filename,
-            "correlation_id": correlation_id,
-            "parsed": {
-                "remito": remito_number,
-                "fecha": remito_dt.isoformat(),
-                "lines": len(src_lines),
-                "totals": {"subtotal": round(sub, 2), "iva": round(iva, 2), "total": round(total, 2)},
-                "hash": f"sha256:{sha256}",
-            },
-            "unmatched_count": 0,
-            "debug": (res.debug if debug_flag else None),
-        }
-        # Limpieza de logs (mejor esfuerzo) al finalizar el flujo, para dejar entorno listo
-        try:
-            # Ejecutar limpieza con políticas por defecto; no bloquear ante errores
-            from scripts import cleanup_logs as _cleanup
-            # Conservar capturas recientes 30 días y limitar a 200 MB (defaults de script)
-            _ = _cleanup.main(["--screenshots-keep-days", "30", "--screenshots-max-mb", "200"])  # type: ignore
-            db.add(ImportLog(
-                purchase_id=p.id,
-                correlation_id=correlation_id,
-                level="INFO",
-                stage="cleanup",
-                event="logs_cleanup_done",
-                details={"result": "ok"},
-            ))
             await db.commit()
         except Exception:
-            # No bloquear respuesta por fallas en limpieza
             pass
-        return JSONResponse(content=response_data, headers={"X-Correlation-ID": correlation_id})
+        layout_hint = await _supplier_layout_hint(db, supplier_id)
+
+        log.info(f"Import[{correlation_id}]: Iniciando pipeline para {tmp_pdf} (size={len(content)}, sha256={sha256}, force_ocr={force_ocr})")
+
+        def _persist_with(session: AsyncSession):
+            async def _persist(res: Any) -> dict[str, Any]:
+                log.info(f"Import[{correlation_id}]: Pipeline finalizado. Remito={res.remito_number}, Fecha={res.remito_date}, Líneas detectadas={len(res.lines) if res.lines else 0}")
+                return await _persist_santaplanta_import(
+                    session,
+                    res,
+                    supplier_id=supplier_id,
+                    filename=file.filename,
+                    content_type=file.content_type,
+                    content=content,
+                    sha256=sha256,
+                    correlation_id=correlation_id,
+                    debug_flag=debug_flag,
+                )
+            return _persist
+
+        async def _persist_background(res: Any) -> dict[str, Any]:
+            async with SessionLocal() as session:
+                return await _persist_with(session)(res)
+
+        # Pipeline (pdfplumber -> camelot -> OCR -> IA) en el pool de workers, fuera del event loop
+        job = remito_jobs.submit(
+            tmp_pdf,
+            supplier_id=supplier_id,
+            filename=file.filename,
+            correlation_id=correlation_id,
+            force_ocr=bool(force_ocr),
+            debug=debug_flag,
+            persist=_persist_with(db) if wait else _persist_background,
+            layout_hint=layout_hint,
+        )
+        if not wait:
+            return JSONResponse(
+                status_code=202,
+                content={"status": "accepted", "job_id": job.id, "correlation_id": correlation_id, "job": job.to_dict()},
+                headers={"X-Correlation-ID": correlation_id},
+            )
+        job = await remito_jobs.wait(job.id) or job
+        if job.status != "done":
+            raise HTTPException(status_code=job.status_code or 500, detail=job.error)
+        return JSONResponse(content=job.result, headers={"X-Correlation-ID": correlation_id})
 
     except HTTPException as e:
         # Re-raise known API errors, asegurando correlation_id en headers
@@ -2810,6 +2883,15 @@ async def import_santaplanta_pdf(
     raise HTTPException(status_code=500, detail="No se pudo importar el remito; revisá backend.log para más detalles", headers={"X-Correlation-ID": cid})
 
 
+@router.get("/import/jobs/{job_id}", dependencies=[Depends(require_roles("admin", "colaborador"))])
+async def get_import_job(job_id: str):
+    """Estado de una importación de remito en curso (etapa, progreso y últimos eventos)."""
+    job = await remito_jobs.job_status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job no encontrado")
+    return job
+
+
 @router.get("/{purchase_id}/unmatched/export")
 async def export_unmatched(purchase_id: int, fmt: str = Query("csv"), db: AsyncSession = Depends(get_session)):
     res = await db.execute(
@@ -3067,77 +3149,47 @@ async def import_pop_email(
     else:
         raise HTTPException(status_code=400, detail="kind inválido")
 
-    # Unicidad por (supplier_id, remito_number) si logramos extraer remito
-    remito_number = parsed.remito_number or (upload_filename if upload_filename else None) or "POP"
-    try:
-        remito_dt = date.fromisoformat(parsed.remito_date or date.today().isoformat())
-    except Exception:
-        remito_dt = date.today()
-
-    exists = await db.scalar(select(Purchase).where(Purchase.supplier_id==supplier_id, Purchase.remito_number==remito_number))
-    if exists:
-        # Idempotente: si ya existe una compra con ese remito para el proveedor, devolverla como éxito
-        return {
-            "purchase_id": exists.id,
-            "status": getattr(exists, "status", None),
-            "parsed": {"remito": remito_number, "fecha": (getattr(exists, "remito_date", None) or remito_dt).isoformat() if getattr(exists, "remito_date", None) else remito_dt.isoformat(), "lines": None},
-            "duplicate": True,
-        }
-
-    # Crear compra
-    p = Purchase(supplier_id=supplier_id, remito_number=remito_number, remito_date=remito_dt)
-    db.add(p)
-    await db.flush()
-
-    # Crear líneas con datos parseados (SKU puede ser sintético; editable luego)
-    created = 0
-    for ln in parsed.lines:
-        title = (ln.title or "").strip() or "(sin título)"
-        qty = Decimal(str(ln.qty or 0))
-        unit_cost = Decimal(str(ln.unit_cost or 0))
-        # Clamps defensivos para evitar overflow / datos absurdos
-        try:
-            if qty <= 0 or qty >= Decimal('100000'):
-                qty = Decimal('1')
-        except Exception:
-            qty = Decimal('1')
-        try:
-            if unit_cost < 0 or unit_cost > Decimal('10000000'):
-                unit_cost = Decimal('0')
-        except Exception:
-            unit_cost = Decimal('0')
-        db.add(PurchaseLine(
-            purchase_id=p.id,
-            supplier_item_id=None,
-            product_id=None,
-            supplier_sku=(ln.supplier_sku or None),
-            title=title,
-            qty=qty,
-            unit_cost=unit_cost,
-            line_discount=Decimal("0"),
-            state="SIN_VINCULAR",
-        ))
-        created += 1
+    result = await create_pop_purchase(
+        db,
+        supplier_id,
+        parsed,
+        remito_fallback=upload_filename,
+        eml=(upload_filename, upload_mime, content) if upload_filename else None,
+    )
+    if not result.get("duplicate"):
+        await db.commit()
+    return result
 
-    # Guardar eml como adjunto opcional (si vino)
-    try:
-        if upload_filename:
-            root = Path("data") / "purchases" / str(p.id)
-            root.mkdir(parents=True, exist_ok=True)
-            eml_path = root / (upload_filename or f"pop_{p.id}.eml")
-            with open(eml_path, "wb") as fh:
-                fh.write(content)
-            db.add(PurchaseAttachment(purchase_id=p.id, filename=upload_filename, mime=upload_mime, size=len(content), path=str(eml_path)))
-    except Exception:
-        pass
 
-    # Audit
-    db.add(AuditLog(action="purchase_import_pop_email", table="purchases", entity_id=p.id, meta={
-        "lines": created,
-        "remito_number": remito_number,
-        "remito_date": remito_dt.isoformat(),
-        "parse_debug": parsed.debug,
-    }))
+@router.post("/import/pop-mailbox", dependencies=[Depends(require_roles("admin", "colaborador")), Depends(require_csrf)])
+async def import_pop_mailbox(
+    supplier_id: int,
+    limit: int | None = Query(None, ge=1, le=1000, description="Máximo de mensajes nuevos a procesar en esta corrida"),
+    wait: bool = Query(False, description="Esperar la corrida y devolver el resumen (compatibilidad)"),
+):
+    """Importa como compras los emails nuevos del buzón configurado (``POP_MAIL_*``).
 
-    await db.commit()
-    return {"purchase_id": p.id, "status": p.status, "parsed": {"remito": remito_number, "fecha": remito_dt.isoformat(), "lines": created}}
+    Incremental: los mensajes ya procesados (por UID del buzón o Message-ID) no se
+    vuelven a descargar; los que fallaron se reintentan en la próxima corrida.
+    La corrida es un job en background: responde 202 con ``job_id`` y el progreso se
+    consulta en ``GET /purchases/import/pop-mailbox/jobs/{job_id}``.
+    """
+    cfg = MailboxConfig.from_env()
+    if cfg is None:
+        raise HTTPException(status_code=400, detail="Buzón de proveedor no configurado (POP_MAIL_HOST)")
+    job = pop_mailbox.submit(supplier_id, cfg, limit=limit)
+    if not wait:
+        return JSONResponse(status_code=202, content={"status": "accepted", "job_id": job.id, "job": job.to_dict()})
+    job = await pop_mailbox.wait(job.id) or job
+    if job.status != "done":
+        raise HTTPException(status_code=job.status_code or 500, detail=job.error)
+    return job.stats
+
+
+@router.get("/import/pop-mailbox/jobs/{job_id}", dependencies=[Depends(require_roles("admin", "colaborador"))])
+async def get_pop_mailbox_job(job_id: str):
+    """Estado de una corrida del buzón (``stats`` con los contadores parciales)."""
+    job = await pop_mailbox.job_status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job no encontrado")
+    return job
@@ -17,6 +17,7 @@ from db.session import get_session
 from db.models import Customer, Sale, SaleLine, SalePayment, SaleAttachment, Product, AuditLog, Return, ReturnLine
 from db.models import StockLedger, SalesChannel
 from services.auth import require_roles, require_csrf, current_session, SessionData
+from services.pagination import COUNT_PATTERN, SortKey, paginate
 from services.media import save_upload, get_media_root
 from fastapi.responses import HTMLResponse
 from fastapi.responses import StreamingResponse
@@ -585,11 +586,13 @@ async def list_sales(
     dt_to: Optional[str] = Query(None),
     page: int = 1,
     page_size: int = 50,
+    cursor: Optional[str] = Query(None, description="Cursor opaco (next_cursor de la página anterior)"),
+    count: Optional[str] = Query(None, pattern=COUNT_PATTERN),
     db: AsyncSession = Depends(get_session),
 ):
     page = max(1, int(page or 1))
     page_size = min(200, max(1, int(page_size or 50)))
-    stmt = select(Sale).order_by(Sale.id.desc())
+    stmt = select(Sale)
     if status:
         stmt = stmt.where(Sale.status == status)
     if customer_id:
@@ -607,11 +610,15 @@ async def list_sales(
             stmt = stmt.where(Sale.sale_date <= d)
         except Exception:
             pass
-    total = await db.scalar(select(func.count()).select_from(stmt.subquery()))
-    rows = (await db.execute(stmt.limit(page_size).offset((page-1)*page_size))).scalars().all()
+    unfiltered = not (status or customer_id or dt_from or dt_to)
+    result = await paginate(
+        db, stmt, [SortKey(Sale.id)],
+        page=page, page_size=page_size, cursor=cursor, count=count,
+        signature="sales:id:desc", estimate_table="sales" if unfiltered else None,
+    )
     def _row(s: Sale):
         return {"id": s.id, "status": s.status, "sale_date": s.sale_date.isoformat(), "customer_id": s.customer_id, "total": float(s.total_amount or 0), "paid_total": float(s.paid_total or 0)}
-    return {"items": [_row(s) for s in rows], "total": int(total or 0), "page": page, "pages": ((int(total or 0) + page_size - 1)//page_size) if total else 0}
+    return {"items": [_row(s) for s in result.scalars()], "total": result.total, "page": page, "pages": result.pages, "next_cursor": result.next_cursor}
 
 
 # --- Productos para ventas (lista simple) ---
@@ -909,3 +909,37 @@ async def metrics_bug_reports(date_from: str | None = None, date_to: str | None
         pass
 
     return {"days": [{"date": d, "count": buckets.get(d, 0)} for d in sorted(buckets.keys())], "total": total}
+
+
+@router.get("/metrics/logging", dependencies=[Depends(require_roles("admin"))])
+async def metrics_logging() -> Dict[str, Any]:
+    """Estado del pipeline de logging: overhead por request (µs), cola y outbox."""
+    from services.logging import outbox, pipeline
+
+    data = pipeline.metrics_snapshot()
+    data["outbox"] = outbox.outbox.stats()
+    return data
+
+
+@router.get("/metrics/http", dependencies=[Depends(require_roles("admin"))])
+async def metrics_http() -> Dict[str, Any]:
+    """Bytes antes/después de compresión y respuestas 304 por ruta."""
+    from services.http_cache import metrics_snapshot
+
+    return metrics_snapshot()
+
+
+@router.get("/metrics/vision", dependencies=[Depends(require_roles("admin"))])
+async def metrics_vision() -> Dict[str, Any]:
+    """Latencias de descarga/preprocesamiento/visión, bytes antes/después y fallos del preprocesado de fotos."""
+    from services.chat import vision_input
+
+    return vision_input.metrics_snapshot()
+
+
+@router.get("/metrics/http-clients", dependencies=[Depends(require_roles("admin"))])
+async def metrics_http_clients() -> Dict[str, Any]:
+    """Requests, errores, status y latencia (avg/p95) de los clientes HTTP salientes por upstream."""
+    from services import http_clients
+
+    return http_clients.metrics_snapshot()
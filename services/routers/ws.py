@@ -224,7 +224,7 @@ async def ws_chat(socket: WebSocket) -> None:
             async with SessionLocal() as chat_db:
                 history_context = await get_recent_history(chat_db, chat_session_id, limit=6)
 
-                memory_state = get_memory(memory_key)
+                memory_state = await get_memory(memory_key)
                 include_metrics = role in ALLOWED_PRODUCT_METRIC_ROLES
 
                 product_query = extract_product_query(data)
@@ -263,7 +263,7 @@ async def ws_chat(socket: WebSocket) -> None:
                                 response_type="product_answer",
                                 user_identifier=user_identifier,
                             )
-                            clear_memory(memory_key)
+                            await clear_memory(memory_key)
                             continue
                         except Exception:
                             logger.exception("ws.tool_call_error")
@@ -304,7 +304,7 @@ async def ws_chat(socket: WebSocket) -> None:
                             response_type="product_answer",
                             user_identifier=user_identifier,
                         )
-                        clear_memory(memory_key)
+                        await clear_memory(memory_key)
                     except Exception:
                         logger.exception("ws.local_price_fallback_error")
                         error_text = "Error resolviendo información de producto."
@@ -327,7 +327,7 @@ async def ws_chat(socket: WebSocket) -> None:
                 if memory_state and memory_state.pending_clarification:
                     normalized = normalize_followup_text(data)
                     if not normalized:
-                        mark_prompted(memory_key)
+                        await mark_prompted(memory_key)
                         terms = memory_terms_text(memory_state.query)
                         try:
                             logger.info("chat.clarify_prompt", extra={"correlation_id": correlation_id, "terms": terms})
@@ -348,11 +348,11 @@ async def ws_chat(socket: WebSocket) -> None:
                             "type": "clarify_ack",
                             "intent": "clarify",
                         })
-                        clear_memory(memory_key)
+                        await clear_memory(memory_key)
                         continue
                     tokens = normalized.split()
                     if len(tokens) <= 3 and not memory_state.prompted:
-                        mark_prompted(memory_key)
+                        await mark_prompted(memory_key)
                         terms = memory_terms_text(memory_state.query)
                         try:
                             logger.info("chat.clarify_prompt", extra={"correlation_id": correlation_id, "terms": terms})
@@ -367,7 +367,7 @@ async def ws_chat(socket: WebSocket) -> None:
                         continue
 
                 if memory_state and not memory_state.pending_clarification:
-                    clear_memory(memory_key)
+                    await clear_memory(memory_key)
 
                 t0 = time.perf_counter()
                 prompt = data
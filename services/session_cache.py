@@ -0,0 +1,327 @@
+# NG-HEADER: Nombre de archivo: session_cache.py
+# NG-HEADER: Ubicación: services/session_cache.py
+# NG-HEADER: Descripción: Cache de corta duración para la resolución de sesiones (current_session)
+# NG-HEADER: Lineamientos: Ver AGENTS.md
+"""Cache de sesiones autenticadas por id de cookie.
+
+``current_session`` corre en cada request autenticada; con un hit de esta cache
+no hay ninguna consulta (y, como ``AsyncSession`` conecta en forma perezosa,
+tampoco se toma una conexión del pool si el handler no usa la DB).
+
+- Tier local: OrderedDict LRU (``AUTH_SESSION_CACHE_MAX``) con TTL corto
+  (``AUTH_SESSION_CACHE_TTL_SECONDS``, default 30s; ``0`` deshabilita).
+- Tier Redis (``AUTH_SESSION_CACHE_BACKEND=redis``): snapshot JSON con ``SETEX``,
+  compartido entre workers; un set por usuario permite invalidar todas sus sesiones.
+  Con ``auto`` (default) se usa Redis si ``WEB_CONCURRENCY`` > 1, así un logout o un
+  cambio de rol se ve en todos los workers apenas se confirma. Si Redis falla, la
+  cache se saltea (se consulta la DB) en lugar de servir datos potencialmente viejos.
+
+Se guardan snapshots de columnas (no instancias ORM): cada request recibe copias
+propias en estado *detached*, así ``db.delete(sess.session)`` sigue funcionando.
+
+Invalidación: al confirmar una transacción que modificó/borró un ``User`` o un
+``Session`` (eventos ORM), en logout/login (``create_session`` con sesión previa)
+y por expiración (``expires_at`` de la sesión acota el TTL de la entrada).
+Los endpoints sólo-admin revalidan la sesión contra la DB (``require_roles``).
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional, Set, Tuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session as _OrmSession, make_transient_to_detached
+
+from db.models import Session as DBSess, User
+
+logger = logging.getLogger(__name__)
+
+_TTL_SECONDS = float(os.getenv("AUTH_SESSION_CACHE_TTL_SECONDS", "30"))
+_MAX_ENTRIES = int(os.getenv("AUTH_SESSION_CACHE_MAX", "10000"))
+_REDIS_PREFIX = "growen:auth_session:"
+
+# Snapshot: {"session": {...} | None, "user": {...} | None}; session None = sid inexistente
+Snapshot = Dict[str, Any]
+
+
+def _columns(obj: Any) -> Dict[str, Any]:
+    return {attr.key: getattr(obj, attr.key) for attr in inspect(obj).mapper.column_attrs}
+
+
+def _encode(snapshot: Snapshot) -> str:
+    def _default(value: Any) -> Any:
+        if isinstance(value, datetime):
+            return {"__dt__": value.isoformat()}
+        raise TypeError(type(value))
+
+    return json.dumps(snapshot, default=_default)
+
+
+def _decode(raw: str | bytes) -> Snapshot:
+    def _hook(obj: Dict[str, Any]) -> Any:
+        if "__dt__" in obj:
+            return datetime.fromisoformat(obj["__dt__"])
+        return obj
+
+    return json.loads(raw, object_hook=_hook)
+
+
+class _LocalTier:
+    def __init__(self) -> None:
+        self._data: "OrderedDict[str, Tuple[float, Snapshot]]" = OrderedDict()
+        self._by_user: Dict[int, Set[str]] = {}
+
+    def get(self, sid: str) -> Optional[Snapshot]:
+        item = self._data.get(sid)
+        if item is None:
+            return None
+        if item[0] <= time.monotonic():
+            self.delete(sid)
+            return None
+        self._data.move_to_end(sid)
+        return item[1]
+
+    def set(self, sid: str, snapshot: Snapshot, ttl: float) -> None:
+        self._data[sid] = (time.monotonic() + ttl, snapshot)
+        self._data.move_to_end(sid)
+        uid = (snapshot.get("session") or {}).get("user_id")
+        if uid is not None:
+            self._by_user.setdefault(uid, set()).add(sid)
+        while len(self._data) > _MAX_ENTRIES:
+            old_sid, (_, old) = self._data.popitem(last=False)
+            old_uid = (old.get("session") or {}).get("user_id")
+            if old_uid is not None:
+                self._by_user.get(old_uid, set()).discard(old_sid)
+
+    def delete(self, sid: str) -> None:
+        item = self._data.pop(sid, None)
+        if item is not None:
+            uid = (item[1].get("session") or {}).get("user_id")
+            if uid is not None:
+                self._by_user.get(uid, set()).discard(sid)
+
+    def delete_user(self, user_id: int) -> None:
+        for sid in self._by_user.pop(user_id, set()):
+            self._data.pop(sid, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+        self._by_user.clear()
+
+
+class _RedisTier:
+    """Snapshots en Redis (``redis.asyncio``, no bloquea el event loop)."""
+
+    def __init__(self, client: Any) -> None:
+        self._client = client
+
+    async def get(self, sid: str) -> Optional[Snapshot]:
+        raw = await self._client.get(_REDIS_PREFIX + sid)
+        return None if raw is None else _decode(raw)
+
+    async def set(self, sid: str, snapshot: Snapshot, ttl: float) -> None:
+        pipe = self._client.pipeline()
+        pipe.setex(_REDIS_PREFIX + sid, max(1, int(ttl)), _encode(snapshot))
+        uid = (snapshot.get("session") or {}).get("user_id")
+        if uid is not None:
+            user_key = f"{_REDIS_PREFIX}user:{uid}"
+            pipe.sadd(user_key, sid)
+            pipe.expire(user_key, max(1, int(_TTL_SECONDS)))
+        await pipe.execute()
+
+    async def delete(self, sid: str) -> None:
+        await self._client.delete(_REDIS_PREFIX + sid)
+
+    async def delete_user(self, user_id: int) -> None:
+        user_key = f"{_REDIS_PREFIX}user:{user_id}"
+        sids = await self._client.smembers(user_key) or set()
+        keys = [_REDIS_PREFIX + (s.decode() if isinstance(s, bytes) else s) for s in sids]
+        await self._client.delete(user_key, *keys)
+
+
+def _workers() -> int:
+    # Mismo env que usan uvicorn/gunicorn para la cantidad de workers
+    try:
+        return int(os.getenv("WEB_CONCURRENCY", "1"))
+    except ValueError:
+        return 1
+
+
+def _create_tier() -> _LocalTier | _RedisTier | None:
+    backend = os.getenv("AUTH_SESSION_CACHE_BACKEND", "auto").lower()
+    if backend == "auto":
+        # Con varios workers el tier local dejaría logout/revocación/cambio de rol
+        # sin ver en los demás hasta por un TTL: se comparte la cache vía Redis
+        backend = "redis" if _workers() > 1 else "memory"
+    if backend != "redis":
+        return _LocalTier()
+    try:
+        import redis.asyncio as aioredis  # type: ignore
+
+        client = aioredis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0"), socket_timeout=0.5)
+        return _RedisTier(client)
+    except Exception as exc:  # pragma: no cover - depende de infraestructura
+        logger.warning("auth.session_cache: redis no disponible (%s), cache deshabilitada", exc)
+        return None
+
+
+_TIER = _create_tier()
+# Tras un fallo de Redis la cache se saltea (todo va a la DB) durante un TTL: al volver,
+# las entradas que una invalidación fallida no pudo borrar ya expiraron.
+_redis_down_until = 0.0
+
+
+def enabled() -> bool:
+    return _TTL_SECONDS > 0 and _TIER is not None
+
+
+async def _call(op: str, *args: Any) -> Any:
+    """Ejecuta ``op`` en el tier; ``None`` si Redis falla o está en la ventana de caída."""
+    global _redis_down_until
+    tier = _TIER
+    if not isinstance(tier, _RedisTier):
+        return getattr(tier, op)(*args)
+    if time.monotonic() < _redis_down_until:
+        return None
+    try:
+        return await getattr(tier, op)(*args)
+    except Exception as exc:
+        logger.warning("auth.session_cache: redis falló (%s), consultando la DB por %.0fs", exc, _TTL_SECONDS)
+        _redis_down_until = time.monotonic() + _TTL_SECONDS
+        return None
+
+
+def _detached(model: type, data: Optional[Dict[str, Any]]) -> Any:
+    if data is None:
+        return None
+    obj = model(**data)
+    make_transient_to_detached(obj)
+    return obj
+
+
+async def get(sid: str) -> Optional[Tuple[Optional[DBSess], Optional[User]]]:
+    """``(session, user)`` desde la cache, ``(None, None)`` si el sid no existe o ``None`` si hay miss."""
+    if not enabled():
+        return None
+    try:
+        snapshot = await _call("get", sid)
+    except Exception:
+        logger.debug("auth.session_cache: fallo leyendo %s", sid[:12], exc_info=True)
+        return None
+    if snapshot is None:
+        return None
+    sess_data = snapshot.get("session")
+    if sess_data is not None and sess_data["expires_at"] < datetime.utcnow():
+        await invalidate(sid)
+        return None
+    return _detached(DBSess, sess_data), _detached(User, snapshot.get("user"))
+
+
+async def put(sid: str, sess: Optional[DBSess], user: Optional[User]) -> None:
+    """Cachea la resolución de ``sid`` (``sess=None`` cachea el "no existe")."""
+    if not enabled():
+        return
+    ttl = _TTL_SECONDS
+    if sess is not None:
+        ttl = min(ttl, (sess.expires_at - datetime.utcnow()).total_seconds())
+        if ttl <= 0:
+            return
+    snapshot: Snapshot = {
+        "session": _columns(sess) if sess is not None else None,
+        "user": _columns(user) if user is not None else None,
+    }
+    try:
+        await _call("set", sid, snapshot, ttl)
+    except Exception:
+        logger.debug("auth.session_cache: fallo guardando %s", sid[:12], exc_info=True)
+
+
+async def invalidate(sid: str) -> None:
+    if _TIER is None:
+        return
+    try:
+        await _call("delete", sid)
+    except Exception:
+        logger.debug("auth.session_cache: fallo invalidando %s", sid[:12], exc_info=True)
+
+
+async def invalidate_user(user_id: int) -> None:
+    if _TIER is None:
+        return
+    try:
+        await _call("delete_user", user_id)
+    except Exception:
+        logger.debug("auth.session_cache: fallo invalidando usuario %s", user_id, exc_info=True)
+
+
+def clear() -> None:
+    """Vacía el tier local (tests)."""
+    if isinstance(_TIER, _LocalTier):
+        _TIER.clear()
+
+
+# ------------------------------ Invalidación por eventos ORM ------------------------------
+_PENDING_KEY = "auth_session_cache_pending"
+
+
+@event.listens_for(_OrmSession, "after_flush")
+def _collect_changes(sync_session: _OrmSession, _ctx: Any) -> None:
+    if not enabled():
+        return
+    changes = set()
+    # ``new`` incluye sesiones creadas: limpia un posible "no existe" cacheado para ese sid
+    for obj in (*sync_session.new, *sync_session.dirty, *sync_session.deleted):
+        if isinstance(obj, User) and obj.id is not None:
+            changes.add(("user", obj.id))
+        elif isinstance(obj, DBSess) and obj.id:
+            changes.add(("session", obj.id))
+    if changes:
+        sync_session.info.setdefault(_PENDING_KEY, set()).update(changes)
+
+
+_BACKGROUND: Set["asyncio.Task[None]"] = set()
+
+
+async def _invalidate_all(changes: Set[Tuple[str, Any]]) -> None:
+    for kind, key in changes:
+        if kind == "user":
+            await invalidate_user(key)
+        else:
+            await invalidate(key)
+
+
+@event.listens_for(_OrmSession, "after_commit")
+def _apply_invalidations(sync_session: _OrmSession) -> None:
+    changes = sync_session.info.pop(_PENDING_KEY, None)
+    if not changes:
+        return
+    if isinstance(_TIER, _LocalTier):
+        # Tier local: se invalida antes de que el commit devuelva el control
+        for kind, key in changes:
+            if kind == "user":
+                _TIER.delete_user(key)
+            else:
+                _TIER.delete(key)
+        return
+    if _TIER is None:
+        return
+    # El evento es sincrónico: el borrado en Redis corre como task del event loop
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        asyncio.run(_invalidate_all(changes))  # scripts sin event loop
+        return
+    task = loop.create_task(_invalidate_all(changes))
+    _BACKGROUND.add(task)
+    task.add_done_callback(_BACKGROUND.discard)
+
+
+@event.listens_for(_OrmSession, "after_rollback")
+def _discard_invalidations(sync_session: _OrmSession) -> None:
+    sync_session.info.pop(_PENDING_KEY, None)
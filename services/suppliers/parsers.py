@@ -20,10 +20,15 @@ from pathlib import Path
 from typing import Any, Dict
 
 import os
+import numpy as np
 from rapidfuzz import fuzz, process
 import pandas as pd
 import yaml
 
+from services.ingest.loader import read_excel
+from services.ingest.normalize import parse_decimal, text_column
+from services.ingest.validate import first_error
+
 # objetos visibles al importar el módulo
 __all__ = [
     "BaseSupplierParser",
@@ -32,6 +37,7 @@ __all__ = [
     "AUTO_CREATE_CANONICAL",
     "FUZZY_SUGGESTION_THRESHOLD",
     "suggest_canonicals",
+    "suggest_canonicals_bulk",
 ]
 
 # valores de configuración provenientes de variables de entorno
@@ -67,6 +73,37 @@ def suggest_canonicals(name: str, choices: dict[int, str]) -> list[dict]:
     ]
 
 
+def suggest_canonicals_bulk(names: list[str], choices: dict[int, str], chunk: int = 500) -> list[list[dict]]:
+    """Equivalente a :func:`suggest_canonicals` para muchos nombres a la vez.
+
+    Calcula la matriz de similitud con ``process.cdist`` (C++, multihilo) sobre los
+    nombres únicos, por bloques de ``chunk`` filas para acotar memoria.
+    """
+    if not names:
+        return []
+    if not choices:
+        return [[] for _ in names]
+    keys = list(choices.keys())
+    values = [choices[k] for k in keys]
+    cutoff = FUZZY_SUGGESTION_THRESHOLD * 100
+    unique = list(dict.fromkeys(names))
+    by_name: dict[str, list[dict]] = {}
+    for start in range(0, len(unique), chunk):
+        block = unique[start:start + chunk]
+        scores = process.cdist(
+            block, values, scorer=fuzz.WRatio, score_cutoff=cutoff, dtype=np.float64, workers=-1
+        )
+        for name, row in zip(block, scores):
+            hits = np.flatnonzero((row >= cutoff) & (row > 0)) if cutoff > 0 else np.arange(len(values))
+            if hits.size:
+                # Orden por puntaje descendente; empates en el orden de ``choices`` (como extract)
+                hits = hits[np.argsort(-row[hits], kind="stable")][:SUGGESTION_CANDIDATES]
+            by_name[name] = [
+                {"id": keys[i], "name": values[i], "score": float(row[i]) / 100} for i in hits
+            ]
+    return [by_name[n] for n in names]
+
+
 class BaseSupplierParser:
     """Interfaz mínima que deben implementar todos los parsers."""
 
@@ -89,126 +126,97 @@ class GenericExcelParser(BaseSupplierParser):
     slug: str
     config: Dict[str, Any]
 
-    def parse_bytes(self, b: bytes) -> list[dict]:
+    def _read(self, stream: BytesIO, header_row: int) -> pd.DataFrame:
         cfg = self.config
-
-        stream = BytesIO(b)
         ftype = cfg.get("file_type", "xlsx").lower()
-        header_row = cfg.get("header_row", 0)
+        stream.seek(0)
         if ftype == "xlsx":
-            df = pd.read_excel(
-                stream,
-                sheet_name=cfg.get("sheet_name"),
-                header=header_row,
-            )
+            df = read_excel(stream, sheet_name=cfg.get("sheet_name"), header=header_row, raw=True)
         elif ftype == "csv":
             df = pd.read_csv(
                 stream,
                 delimiter=cfg.get("delimiter", ","),
                 encoding=cfg.get("encoding", "utf-8"),
                 header=header_row,
+                dtype=object,
             )
         else:  # pragma: no cover - validado por configuración
             raise ValueError("Tipo de archivo no soportado: use 'xlsx' o 'csv'")
 
-        # normalizar encabezados
+        # normalizar encabezados y resolver mapeos de columnas
         df.columns = [str(c).strip() for c in df.columns]
-
-        # resolver mapeos de columnas
         col_map: Dict[str, str] = {}
         for internal, options in cfg.get("columns", {}).items():
             for opt in options:
                 if opt in df.columns:
                     col_map[opt] = internal
                     break
-        df = df.rename(columns=col_map)
+        return df.rename(columns=col_map)
+
+    def parse_frame(self, b: bytes) -> pd.DataFrame:
+        """Parsea el archivo a un ``DataFrame`` normalizado con operaciones por columna.
+
+        Columnas: ``codigo``, ``nombre``, ``categoria_path``, ``compra_minima``,
+        ``precio_compra``, ``precio_venta``, ``status`` y ``error_msg``.
+        """
+        cfg = self.config
+        stream = BytesIO(b)
+        header_row = cfg.get("header_row", 0)
+        df = self._read(stream, header_row)
 
         required = {"supplier_product_id", "title", "purchase_price", "sale_price"}
         missing = required - set(df.columns)
         if missing and header_row != 1:
             # Intento de fallback: algunos archivos traen una fila vacía y los encabezados en la 2da fila
             try:
-                stream.seek(0)
-                df = pd.read_excel(
-                    stream,
-                    sheet_name=cfg.get("sheet_name"),
-                    header=1,
-                ) if ftype == "xlsx" else pd.read_csv(
-                    stream,
-                    delimiter=cfg.get("delimiter", ","),
-                    encoding=cfg.get("encoding", "utf-8"),
-                    header=1,
-                )
-                df.columns = [str(c).strip() for c in df.columns]
-                col_map = {}
-                for internal, options in cfg.get("columns", {}).items():
-                    for opt in options:
-                        if opt in df.columns:
-                            col_map[opt] = internal
-                            break
-                df = df.rename(columns=col_map)
+                df = self._read(stream, 1)
                 missing = required - set(df.columns)
             except Exception:
                 pass
         if missing:
             raise ValueError(f"Faltan columnas: {', '.join(sorted(missing))}")
 
-        # aplicar transformaciones básicas
-        for field, opts in cfg.get("transform", {}).items():
-            if opts.get("replace_comma_decimal") and field in df.columns:
-                df[field] = df[field].map(
-                    lambda v: str(v).replace(",", ".") if pd.notna(v) else v
-                )
-
-        defaults = cfg.get("defaults", {})
-
-        rows: list[dict] = []
-        for _, r in df.iterrows():
-            codigo = str(r.get("supplier_product_id") or "").strip()
-            nombre = str(r.get("title") or "").strip()
-
-            cat_parts = [
-                str(r.get("category_level_1") or "").strip(),
-                str(r.get("category_level_2") or "").strip(),
-                str(r.get("category_level_3") or "").strip(),
-            ]
-            categoria_path = " > ".join([p for p in cat_parts if p])
+        df = df.reset_index(drop=True)
+        idx = df.index
+        transforms = cfg.get("transform", {})
+
+        def _price(field: str) -> pd.Series:
+            if transforms.get(field, {}).get("replace_comma_decimal"):
+                values = parse_decimal(df[field])
+            else:
+                values = pd.to_numeric(df[field], errors="coerce").astype(float)
+            return values.fillna(0.0)
+
+        codigo = text_column(df.get("supplier_product_id"), idx)
+        nombre = text_column(df.get("title"), idx)
+        categoria_path = pd.Series("", index=idx, dtype=object)
+        for level in ("category_level_1", "category_level_2", "category_level_3"):
+            part = text_column(df.get(level), idx)
+            joined = categoria_path.where(categoria_path.eq(""), categoria_path + " > ") + part
+            categoria_path = categoria_path.where(part.eq(""), joined)
+        pc = _price("purchase_price")
+        pv = _price("sale_price")
+        min_default = int(cfg.get("defaults", {}).get("min_qty", 1))
+        cm_raw = df["min_purchase_qty"] if "min_purchase_qty" in df.columns else pd.Series(None, index=idx, dtype=object)
+        cm = pd.to_numeric(cm_raw, errors="coerce").fillna(min_default).astype(int)
+
+        error_msg = first_error(idx, [
+            (codigo.eq("") | nombre.eq(""), "codigo/nombre vacío"),
+            (pc.le(0) | pv.le(0), "precio_compra/venta <= 0"),
+        ])
+        return pd.DataFrame({
+            "codigo": codigo,
+            "nombre": nombre,
+            "categoria_path": categoria_path,
+            "compra_minima": cm,
+            "precio_compra": pc,
+            "precio_venta": pv,
+            "status": error_msg.isna().map({True: "ok", False: "error"}),
+            "error_msg": error_msg,
+        })
 
-            try:
-                pc = float(r.get("purchase_price") or 0)
-            except Exception:  # pragma: no cover - defensivo
-                pc = 0.0
-            try:
-                pv = float(r.get("sale_price") or 0)
-            except Exception:  # pragma: no cover - defensivo
-                pv = 0.0
-
-            try:
-                cm_raw = r.get("min_purchase_qty")
-                cm = int(cm_raw if pd.notna(cm_raw) else defaults.get("min_qty", 1))
-            except Exception:  # pragma: no cover - defensivo
-                cm = int(defaults.get("min_qty", 1))
-
-            status, err = "ok", None
-            if not codigo or not nombre:
-                status, err = "error", "codigo/nombre vacío"
-            elif pc <= 0 or pv <= 0:
-                status, err = "error", "precio_compra/venta <= 0"
-
-            rows.append(
-                {
-                    "codigo": codigo,
-                    "nombre": nombre,
-                    "categoria_path": categoria_path,
-                    "compra_minima": cm,
-                    "precio_compra": pc,
-                    "precio_venta": pv,
-                    "status": status,
-                    "error_msg": err,
-                }
-            )
-
-        return rows
+    def parse_bytes(self, b: bytes) -> list[dict]:
+        return self.parse_frame(b).to_dict("records")
 
 
 def _load_yaml_parsers() -> dict[str, BaseSupplierParser]:
@@ -0,0 +1,117 @@
+# NG-HEADER: Nombre de archivo: price_list.py
+# NG-HEADER: Ubicación: services/suppliers/price_list.py
+# NG-HEADER: Descripción: Clasificación vectorizada de listas de precios (duplicados, deltas y sugerencias)
+# NG-HEADER: Lineamientos: Ver AGENTS.md
+"""Clasificación de una lista de precios parseada contra los precios vigentes.
+
+Trabaja sobre el ``DataFrame`` de :meth:`GenericExcelParser.parse_frame`:
+duplicados por ``codigo`` con ``duplicated``, deltas de precio con un ``merge``
+contra los ``SupplierProduct`` existentes y sugerencias de canónicos en bloque.
+El resultado conserva el contrato de ``ImportJobRow.row_json_normalized``.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from services.suppliers.parsers import AUTO_CREATE_CANONICAL, suggest_canonicals_bulk
+
+ROW_FIELDS = ["codigo", "nombre", "categoria_path", "compra_minima", "precio_compra", "precio_venta"]
+
+
+def to_frame(parsed: pd.DataFrame | List[Dict[str, Any]]) -> pd.DataFrame:
+    """Acepta el ``DataFrame`` del parser genérico o la lista de dicts de parsers externos."""
+    df = parsed.copy() if isinstance(parsed, pd.DataFrame) else pd.DataFrame(list(parsed))
+    df = df.reset_index(drop=True)
+    if "status" not in df.columns:
+        df["status"] = "ok"
+    df["status"] = df["status"].fillna("ok")
+    if "error_msg" not in df.columns:
+        df["error_msg"] = None
+    for col in ROW_FIELDS:
+        if col not in df.columns:
+            df[col] = None
+    return df
+
+
+def classify_rows(
+    parsed: pd.DataFrame | List[Dict[str, Any]],
+    existing: pd.DataFrame,
+    canonical_map: Dict[int, str],
+) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """Clasifica filas en ``new``/``changed``/``unchanged``/``duplicate_in_file``.
+
+    ``existing`` tiene una fila por ``SupplierProduct`` del proveedor con columnas
+    ``codigo``, ``prev_compra`` y ``prev_venta``. Devuelve las filas listas para
+    ``ImportJobRow`` (``row_index``, ``status``, ``error``, ``row_json_normalized``)
+    y los KPIs de la vista previa.
+    """
+    df = to_frame(parsed)
+    ok = df["status"].eq("ok")
+    code = df["codigo"].fillna("").astype(str)
+    # Duplicado sólo entre filas ok: una fila con error no "reserva" el código
+    dup = ok & (code.eq("") | code.where(ok).duplicated(keep="first"))
+    matched = ok & ~dup & code.isin(existing["codigo"])
+
+    prev = df[["codigo"]].merge(existing, on="codigo", how="left", validate="many_to_one")
+    prev_p = pd.to_numeric(prev["prev_compra"], errors="coerce").fillna(0).to_numpy(dtype=float)
+    prev_s = pd.to_numeric(prev["prev_venta"], errors="coerce").fillna(0).to_numpy(dtype=float)
+    pc = pd.to_numeric(df["precio_compra"], errors="coerce").fillna(0).to_numpy(dtype=float)
+    pv = pd.to_numeric(df["precio_venta"], errors="coerce").fillna(0).to_numpy(dtype=float)
+    delta_p = np.round(pc - prev_p, 2)
+    delta_s = np.round(pv - prev_s, 2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        delta_pct = np.where(prev_s != 0, np.round(delta_s / np.where(prev_s != 0, prev_s, 1) * 100, 2), np.nan)
+    unchanged = matched.to_numpy() & (delta_p == 0) & (delta_s == 0)
+
+    status = np.select(
+        [~ok.to_numpy(), dup.to_numpy(), unchanged, matched.to_numpy()],
+        [df["status"].to_numpy(dtype=object), "duplicate_in_file", "unchanged", "changed"],
+        default="new",
+    )
+    error = np.select(
+        [~ok.to_numpy(), dup.to_numpy()],
+        [df["error_msg"].to_numpy(dtype=object), "Código duplicado en archivo"],
+        default=None,
+    )
+
+    ok_idx = np.flatnonzero(ok.to_numpy())
+    suggestions = suggest_canonicals_bulk(
+        df["nombre"].fillna("").astype(str).iloc[ok_idx].tolist(), canonical_map
+    )
+    suggestions_by_row = dict(zip(ok_idx.tolist(), suggestions))
+
+    extra_cols = [c for c in df.columns if c not in ("status", "error_msg")]
+    records = df[extra_cols].to_dict("records")
+    matched_np = matched.to_numpy()
+    out: List[Dict[str, Any]] = []
+    for i, data in enumerate(records):
+        if matched_np[i]:
+            data["delta_compra"] = float(delta_p[i])
+            data["delta_venta"] = float(delta_s[i])
+            data["delta_pct"] = None if np.isnan(delta_pct[i]) else float(delta_pct[i])
+        sugg = suggestions_by_row.get(i)
+        if sugg is not None:
+            data["canonical_suggestions"] = sugg
+            if AUTO_CREATE_CANONICAL and not sugg:
+                data["auto_create_canonical"] = True
+        err = error[i]
+        out.append({
+            "row_index": i,
+            "status": str(status[i]),
+            "error": None if err is None or (isinstance(err, float) and np.isnan(err)) else str(err),
+            "row_json_normalized": data,
+        })
+
+    counts = pd.Series(status).value_counts()
+    kpis = {
+        "total": int(len(df)),
+        "errors": int(df["status"].eq("error").sum()),
+        "duplicates_in_file": int(counts.get("duplicate_in_file", 0)),
+        "unchanged": int(counts.get("unchanged", 0)),
+        "new": int(counts.get("new", 0)),
+        "changed": int(counts.get("changed", 0)),
+    }
+    return out, kpis
@@ -5,6 +5,7 @@
 # NG-HEADER: Lineamientos: Ver AGENTS.md
 import os
 import sys
+import tempfile
 from pathlib import Path
 from typing import AsyncGenerator
 import pytest
@@ -23,6 +24,13 @@ os.environ["DB_URL"] = "sqlite+aiosqlite:///:memory:"
 os.environ.setdefault("CANONICAL_SKU_STRICT", "0")
 os.environ.setdefault("SALES_RATE_LIMIT_DISABLED", "0")  # mantener activo pero limpiar bucket por test
 os.environ.setdefault("AUTH_ENABLED", "true")
+# Parsing de remitos/emails y derivados de Drive en threads: los mocks del pipeline (monkeypatch) no llegan a procesos spawn
+os.environ.setdefault("IMPORT_PDF_EXECUTOR", "thread")
+os.environ.setdefault("DRIVE_SYNC_EXECUTOR", "thread")
+os.environ.setdefault("POP_MAIL_EXECUTOR", "thread")
+# Cachés de extracción y OCR de PDFs fuera del árbol del repo
+os.environ.setdefault("PDF_EXTRACT_CACHE_DIR", tempfile.mkdtemp(prefix="pdf_extract_"))
+os.environ.setdefault("OCR_PAGE_CACHE_DIR", tempfile.mkdtemp(prefix="ocr_pages_"))
 
 # Recargar módulo de sesión para que tome DB_URL
 import db.session as _session  # type: ignore
@@ -49,6 +57,9 @@ Base = _base.Base
 async def db_session():
     """DB limpia por test (SQLite memoria compartida). Retorna sesión para usar en fixtures/tests."""
     engine = _session.engine
+    # drop_all no dispara eventos ORM: las sesiones cacheadas del test anterior quedarían vivas
+    from services import session_cache
+    session_cache.clear()
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
         try:
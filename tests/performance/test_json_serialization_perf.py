@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# NG-HEADER: Nombre de archivo: test_json_serialization_perf.py
+# NG-HEADER: Ubicación: tests/performance/test_json_serialization_perf.py
+# NG-HEADER: Descripción: Microbenchmark de serialización de una página de /products (FastJSONResponse vs default)
+# NG-HEADER: Lineamientos: Ver AGENTS.md
+"""
+Compara la serialización de una página de 100 ítems con la forma de ``/products``:
+
+- default de FastAPI: ``jsonable_encoder`` + ``JSONResponse`` (json stdlib)
+- ``FastJSONResponse``: una pasada con orjson
+"""
+
+from __future__ import annotations
+
+import json
+import time
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from services import json_response
+from services.json_response import FastJSONResponse
+
+
+def _products_page(n: int = 100) -> dict:
+    items = []
+    for i in range(n):
+        items.append({
+            "product_id": i,
+            "name": f"Sustrato Premium {i} 25 L",
+            "preferred_name": f"Sustrato Premium {i} 25 L",
+            "supplier": {"id": 3, "slug": "proveedor-demo", "name": "Proveedor Demo"},
+            "supplier_item_id": 1000 + i,
+            "precio_compra": 1234.5 + i,
+            "precio_venta": 2345.75 + i,
+            "compra_minima": 1.0,
+            "category_path": "Cultivo>Sustratos>Premium",
+            "stock": i % 17,
+            "updated_at": datetime(2026, 1, 1, 12, 30, i % 60).isoformat(),
+            "canonical_product_id": i,
+            "canonical_sale_price": 2500.0,
+            "canonical_sku": f"SUS_{i:04d}_PRM",
+            "canonical_name": f"Sustrato Premium {i}",
+            "first_variant_sku": f"SUS-{i}",
+            "technical_specs": {"volumen": "25 L", "ph": "5.8-6.2", "componentes": ["turba", "perlita", "humus"]},
+            "usage_instructions": {"pasos": ["Hidratar", "Mezclar", "Trasplantar"]},
+            "tags": [{"id": 1, "name": "sustrato"}, {"id": 2, "name": "premium"}],
+            "image_url": f"/media/products/{i}/thumb.webp",
+            "images_count": 3,
+            "primary_image_id": 5000 + i,
+        })
+    return {"page": 1, "page_size": n, "total": 5000, "items": items, "next_cursor": "eyJzIjoicHJvZHVjdHMi"}
+
+
+def _best_of(fn, rounds: int = 30) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def test_fast_response_matches_default_output():
+    payload = _products_page(5)
+    payload["items"][0]["precio_compra"] = Decimal("10.50")
+    payload["items"][0]["updated_at"] = datetime(2026, 1, 1, 12, 0, 0, 123456)
+    fast = json.loads(FastJSONResponse(payload).body)
+    default = json.loads(JSONResponse(jsonable_encoder(payload)).body)
+    assert fast["items"][0]["precio_compra"] == 10.5
+    assert fast["items"][0]["updated_at"] == default["items"][0]["updated_at"] == "2026-01-01T12:00:00.123456"
+    fast["items"][0]["precio_compra"] = default["items"][0]["precio_compra"] = None
+    assert fast == default
+
+
+@pytest.mark.skipif(json_response.orjson is None, reason="orjson no instalado")
+def test_products_page_serialization_is_faster():
+    payload = _products_page(100)
+    default = _best_of(lambda: JSONResponse(jsonable_encoder(payload)))
+    fast = _best_of(lambda: FastJSONResponse(payload))
+    print(f"\n/products x100: default={default * 1000:.2f}ms fast={fast * 1000:.2f}ms ({default / fast:.1f}x)")
+    assert fast * 2 < default
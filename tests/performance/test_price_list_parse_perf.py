@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# NG-HEADER: Nombre de archivo: test_price_list_parse_perf.py
+# NG-HEADER: Ubicación: tests/performance/test_price_list_parse_perf.py
+# NG-HEADER: Descripción: Benchmark de parseo + vista previa de una lista de precios de 50k filas
+# NG-HEADER: Lineamientos: Ver AGENTS.md
+"""
+Mide las dos etapas de ``POST /suppliers/{id}/price-list/upload`` sobre una planilla
+de 50.000 filas (coma decimal, 40% de códigos ya existentes, algunos duplicados):
+
+- parseo: lectura XLSX (calamine u openpyxl read-only) + normalización por columnas
+- vista previa: duplicados, merge de precios vigentes y sugerencias de canónicos
+"""
+
+from __future__ import annotations
+
+import time
+from io import BytesIO
+
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+from services.ingest import loader
+from services.suppliers import price_list
+from services.suppliers.parsers import GenericExcelParser
+
+ROWS = 50_000
+
+CFG = {
+    "file_type": "xlsx",
+    "sheet_name": 0,
+    "header_row": 0,
+    "columns": {
+        "supplier_product_id": ["ID"],
+        "title": ["Producto"],
+        "category_level_1": ["Agrupamiento"],
+        "category_level_2": ["Familia"],
+        "min_purchase_qty": ["Compra Minima"],
+        "purchase_price": ["PrecioDeCompra"],
+        "sale_price": ["PrecioDeVenta"],
+    },
+    "transform": {"purchase_price": {"replace_comma_decimal": True}, "sale_price": {"replace_comma_decimal": True}},
+}
+
+
+def _sheet(n: int) -> bytes:
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Lista")
+    ws.append(["ID", "Producto", "Agrupamiento", "Familia", "Compra Minima", "PrecioDeCompra", "PrecioDeVenta"])
+    for i in range(n):
+        code = i if i % 1000 else i - 1  # un duplicado cada 1000 filas
+        ws.append([f"SP{code:06d}", f"Fertilizante {i % 900} x {1 + i % 5}L", "Cultivo", f"Familia {i % 40}",
+                   1 + i % 3, f"{1000 + i % 500},50", f"{1.5 * (1000 + i % 500):.2f}".replace(".", ",")])
+    buf = BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+@pytest.mark.performance
+@pytest.mark.slow
+def test_price_list_50k_parse_and_preview():
+    content = _sheet(ROWS)
+    parser = GenericExcelParser(slug="bench", config=CFG)
+
+    t0 = time.perf_counter()
+    parsed = parser.parse_frame(content)
+    t_parse = time.perf_counter() - t0
+
+    existing = pd.DataFrame(
+        [(f"SP{i:06d}", 1000 + i % 500 + 0.5, 1500.0) for i in range(0, int(ROWS * 0.8), 2)],
+        columns=["codigo", "prev_compra", "prev_venta"],
+    )
+    canonical_map = {i: f"Fertilizante {i * 9} x {1 + i % 5}L" for i in range(100)}
+    t0 = time.perf_counter()
+    rows, kpis = price_list.classify_rows(parsed, existing, canonical_map)
+    t_preview = time.perf_counter() - t0
+
+    print(
+        f"\nlista {ROWS} filas (lector={loader.EXCEL_ENGINE}): parseo={t_parse:.2f}s "
+        f"vista previa={t_preview:.2f}s total={t_parse + t_preview:.2f}s kpis={kpis}"
+    )
+    assert len(rows) == ROWS and kpis["errors"] == 0
+    assert kpis["duplicates_in_file"] == ROWS // 1000 - 1
+    assert kpis["new"] + kpis["changed"] + kpis["unchanged"] + kpis["duplicates_in_file"] == ROWS
+    assert t_parse + t_preview < 60
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# NG-HEADER: Nombre de archivo: test_auth_session_cache.py
+# NG-HEADER: Ubicación: tests/test_auth_session_cache.py
+# NG-HEADER: Descripción: Pruebas de la cache de resolución de sesiones (current_session)
+# NG-HEADER: Lineamientos: Ver AGENTS.md
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event, update
+from starlette.requests import Request
+
+from db.models import Session as DBSess, User
+from services import session_cache
+from services.auth import create_session, current_session, require_roles
+
+
+def _request(sid: str | None) -> Request:
+    headers = [(b"cookie", f"growen_session={sid}".encode())] if sid else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers, "client": ("127.0.0.1", 1)})
+
+
+async def _seed(db, role: str = "colaborador", seconds: int = 3600) -> tuple[int, str]:
+    user = User(identifier="cache-user", email="cache@example.com", password_hash="x", role=role)
+    db.add(user)
+    await db.flush()
+    sess = DBSess(id="sid-cache-1", user_id=user.id, role=role, csrf_token="t",
+                  expires_at=datetime.utcnow() + timedelta(seconds=seconds))
+    db.add(sess)
+    await db.commit()
+    return user.id, sess.id
+
+
+@pytest.mark.asyncio
+async def test_second_resolution_hits_no_database(db_session):
+    from db.session import engine
+
+    _, sid = await _seed(db_session)
+    selects: list[str] = []
+
+    def _count(conn, cursor, statement, *args):
+        if statement.lstrip().upper().startswith("SELECT"):
+            selects.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", _count)
+    try:
+        first = await current_session(_request(sid), db_session)
+        cold = len(selects)
+        second = await current_session(_request(sid), db_session)
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", _count)
+    assert cold >= 1 and len(selects) == cold
+    assert second.role == first.role == "colaborador"
+    assert second.user.identifier == "cache-user"
+
+
+@pytest.mark.asyncio
+async def test_role_change_invalidates_on_commit(db_session):
+    uid, sid = await _seed(db_session)
+    assert (await current_session(_request(sid), db_session)).user.role == "colaborador"
+
+    user = await db_session.get(User, uid)
+    user.role = "admin"
+    await db_session.commit()
+    assert await session_cache.get(sid) is None
+    assert (await current_session(_request(sid), db_session)).user.role == "admin"
+
+
+@pytest.mark.asyncio
+async def test_logout_drops_previous_session(db_session):
+    _, sid = await _seed(db_session)
+    prev = await current_session(_request(sid), db_session)
+    new_sess, _ = await create_session(db_session, "guest", _request(sid), prev_session=prev.session)
+    assert new_sess.id != sid
+    assert (await current_session(_request(sid), db_session)).role == "guest"
+
+
+@pytest.mark.asyncio
+async def test_expired_session_is_not_served_from_cache(db_session):
+    _, sid = await _seed(db_session, seconds=1)
+    assert (await current_session(_request(sid), db_session)).role == "colaborador"
+    await asyncio.sleep(1.2)
+    assert await session_cache.get(sid) is None
+    assert (await current_session(_request(sid), db_session)).role == "guest"
+
+
+@pytest.mark.asyncio
+async def test_admin_only_check_bypasses_cache(db_session):
+    uid, sid = await _seed(db_session, role="admin")
+    assert (await current_session(_request(sid), db_session)).cached is False
+    cached = await current_session(_request(sid), db_session)
+    assert cached.cached is True and cached.role == "admin"
+
+    # Revocación hecha "en otro worker": UPDATE Core, sin eventos ORM que invaliden
+    await db_session.execute(update(DBSess).where(DBSess.id == sid).values(role="cliente"))
+    await db_session.commit()
+    assert (await current_session(_request(sid), db_session)).role == "admin"
+
+    with pytest.raises(HTTPException) as exc:
+        await require_roles("admin")(_request(sid), cached, db_session)
+    assert exc.value.status_code == 403
+    # Los chequeos no exclusivos de admin siguen usando la cache
+    ok = await require_roles("colaborador", "admin")(_request(sid), cached, db_session)
+    assert ok.role == "admin"
+
+
+class _DownRedis:
+    async def get(self, key):
+        raise ConnectionError("redis caído")
+
+
+@pytest.mark.asyncio
+async def test_redis_outage_falls_back_to_database(db_session, monkeypatch, caplog):
+    _, sid = await _seed(db_session)
+    monkeypatch.setattr(session_cache, "_TIER", session_cache._RedisTier(_DownRedis()))
+    monkeypatch.setattr(session_cache, "_redis_down_until", 0.0)
+    with caplog.at_level("WARNING", logger=session_cache.__name__):
+        data = await current_session(_request(sid), db_session)
+    assert data.role == "colaborador" and data.cached is False
+    assert "redis falló" in caplog.text
+    # Durante la ventana de caída ni se intenta Redis
+    assert await session_cache.get(sid) is None
+
+
+def test_auto_backend_uses_redis_with_multiple_workers(monkeypatch):
+    pytest.importorskip("redis")
+    monkeypatch.setenv("AUTH_SESSION_CACHE_BACKEND", "auto")
+    monkeypatch.setenv("WEB_CONCURRENCY", "4")
+    assert isinstance(session_cache._create_tier(), session_cache._RedisTier)
+    monkeypatch.setenv("WEB_CONCURRENCY", "1")
+    assert isinstance(session_cache._create_tier(), session_cache._LocalTier)
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# NG-HEADER: Nombre de archivo: test_catalog_bulk_info.py
+# NG-HEADER: Ubicación: tests/test_catalog_bulk_info.py
+# NG-HEADER: Descripción: Tests de POST /catalog/products/bulk_info (info de varios productos en pocas consultas)
+# NG-HEADER: Lineamientos: Ver AGENTS.md
+import os
+import pytest
+
+os.environ.setdefault("DB_URL", "sqlite+aiosqlite:///:memory:")
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("AUTH_ENABLED", "true")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from services.api import app
+from services.auth import current_session, require_csrf, SessionData
+from db.models import (
+    CanonicalProduct,
+    Image,
+    Product,
+    ProductEquivalence,
+    Supplier,
+    SupplierProduct,
+    Variant,
+)
+
+client = TestClient(app)
+app.dependency_overrides[current_session] = lambda: SessionData(None, None, "admin")
+app.dependency_overrides[require_csrf] = lambda: None
+
+
+async def _seed(n: int = 5) -> list[int]:
+    """Crea `n` productos; el primero vinculado a un canónico con imagen principal."""
+    from db.session import SessionLocal
+    async with SessionLocal() as s:  # type: ignore
+        sup = Supplier(slug="bulk", name="Bulk")
+        s.add(sup)
+        await s.flush()
+        ids: list[int] = []
+        for i in range(n):
+            p = Product(sku_root=f"BULK{i}", title=f"Producto bulk {i}", stock=i)
+            s.add(p)
+            await s.flush()
+            s.add(Variant(product_id=p.id, sku=f"VAR-BULK-{i}", price=100 + i))
+            ids.append(p.id)
+        sp = SupplierProduct(supplier_id=sup.id, supplier_product_id="B0", title="Prov B0", internal_product_id=ids[0])
+        s.add(sp)
+        await s.flush()
+        cp = CanonicalProduct(name="Canónico Bulk", sku_custom="BLK_0001_AAA", sale_price=999)
+        s.add(cp)
+        await s.flush()
+        s.add(ProductEquivalence(supplier_id=sup.id, supplier_product_id=sp.id, canonical_product_id=cp.id, source="test"))
+        s.add(Image(product_id=ids[0], url="/media/b0-secondary.jpg", is_primary=False, sort_order=0))
+        s.add(Image(product_id=ids[0], url="/media/b0.jpg", is_primary=True, sort_order=1))
+        await s.commit()
+        return ids
+
+
+@pytest.mark.asyncio
+async def test_bulk_info_resolves_ids_and_skus():
+    ids = await _seed()
+    r = client.post(
+        "/catalog/products/bulk_info",
+        json={"product_ids": [ids[0], ids[1]], "skus": ["BLK_0001_AAA", "bulk2", "VAR-BULK-3", "NOPE"]},
+    )
+    assert r.status_code == 200, r.text
+    data = r.json()
+    assert [it["requested"] for it in data["items"]] == [ids[0], ids[1], "BLK_0001_AAA", "bulk2", "VAR-BULK-3"]
+    assert data["not_found"] == ["NOPE"]
+    first = data["items"][0]
+    assert first["sku"] == "BLK_0001_AAA"
+    assert first["sale_price"] == 999
+    assert first["primary_image"] == "/media/b0.jpg"
+    assert data["items"][2]["product_id"] == ids[0]
+    assert data["items"][1]["sale_price"] == 101  # precio desde variante
+    assert data["items"][4]["product_id"] == ids[3]
+
+
+@pytest.mark.asyncio
+async def test_bulk_info_query_count_is_constant():
+    ids = await _seed(12)
+    from db.session import engine
+
+    statements: list[str] = []
+
+    def _count(conn, cursor, statement, *args):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", _count)
+    try:
+        r_small = client.post("/catalog/products/bulk_info", json={"product_ids": ids[:2]})
+        small = len(statements)
+        statements.clear()
+        r_big = client.post("/catalog/products/bulk_info", json={"product_ids": ids})
+        big = len(statements)
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", _count)
+    assert r_small.status_code == 200 and r_big.status_code == 200
+    assert r_big.json()["count"] == 12
+    assert big == small
+
+
+def test_bulk_info_validates_payload():
+    assert client.post("/catalog/products/bulk_info", json={}).status_code == 400
+    too_many = {"product_ids": list(range(1, 1000))}
+    r = client.post("/catalog/products/bulk_info", json=too_many)
+    assert r.status_code == 400
+    assert r.json()["detail"]["code"] == "too_many_items"
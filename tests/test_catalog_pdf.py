@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# NG-HEADER: Nombre de archivo: test_catalog_pdf.py
+# NG-HEADER: Ubicación: tests/test_catalog_pdf.py
+# NG-HEADER: Descripción: Pruebas del render de catálogos en background (jobs, fragmentos cacheados, miniaturas)
+# NG-HEADER: Lineamientos: Ver AGENTS.md
+from io import BytesIO
+
+import pytest
+from PIL import Image as PILImage
+from pypdf import PdfReader, PdfWriter
+
+from services import catalog_pdf
+
+
+def _groups():
+    return {
+        "Fertilizantes": [{"id": 1, "title": "Bio Grow", "price": 10.0, "image": None, "description": ""}],
+        "Sustratos": [{"id": 2, "title": "Light Mix", "price": 20.0, "image": None, "description": "50L"}],
+    }
+
+
+@pytest.fixture
+def thread_pool(monkeypatch):
+    monkeypatch.setattr(catalog_pdf, "_EXECUTOR_KIND", "thread")
+    monkeypatch.setattr(catalog_pdf, "_executor", None)
+    yield
+    catalog_pdf.shutdown_executor()
+
+
+@pytest.fixture
+def fake_render(monkeypatch):
+    calls = []
+
+    def _render(html):
+        calls.append(html)
+        writer = PdfWriter()
+        writer.add_blank_page(595, 842)
+        buf = BytesIO()
+        writer.write(buf)
+        return buf.getvalue()
+
+    monkeypatch.setattr(catalog_pdf, "render_pdf", _render)
+    monkeypatch.setattr(catalog_pdf, "incremental_available", lambda: True)
+    return calls
+
+
+def test_fragment_key_tracks_content():
+    items = _groups()["Sustratos"]
+    assert catalog_pdf.fragment_key("Sustratos", items) == catalog_pdf.fragment_key("Sustratos", [dict(i) for i in items])
+    changed = [{**items[0], "price": 21.0}]
+    assert catalog_pdf.fragment_key("Sustratos", items) != catalog_pdf.fragment_key("Sustratos", changed)
+
+
+@pytest.mark.asyncio
+async def test_incremental_render_reuses_unchanged_categories(tmp_path, thread_pool, fake_render):
+    outputs = []
+
+    def _on_done(pdf, job):
+        outputs.append(pdf)
+        return {"size": len(pdf)}
+
+    job = catalog_pdf.submit(_groups(), count=2, cache_dir=tmp_path, on_done=_on_done)
+    job = await catalog_pdf.wait(job.id)
+    assert job.status == "done" and job.progress == 100
+    assert (job.fragments_total, job.fragments_reused) == (2, 0)
+    assert len(fake_render) == 3  # listado + 2 categorías
+    assert len(PdfReader(BytesIO(outputs[-1])).pages) == 3
+
+    groups = _groups()
+    groups["Sustratos"][0]["price"] = 25.0
+    fake_render.clear()
+    job = await catalog_pdf.wait(catalog_pdf.submit(groups, count=2, cache_dir=tmp_path, on_done=_on_done).id)
+    assert job.status == "done"
+    assert job.fragments_reused == 1
+    assert len(fake_render) == 2  # listado + categoría modificada
+    assert job.result == {"size": len(outputs[-1])}
+
+
+@pytest.mark.asyncio
+async def test_job_error_is_reported_and_finish_called(tmp_path, thread_pool, fake_render):
+    finished = []
+
+    def _fail(pdf, job):
+        raise OSError("disco lleno")
+
+    job = catalog_pdf.submit(_groups(), count=2, cache_dir=tmp_path, on_done=_fail, on_finish=finished.append)
+    job = await catalog_pdf.wait(job.id)
+    assert job.status == "error" and "disco lleno" in job.error
+    assert finished == [job]
+    assert catalog_pdf.get_job(job.id).to_dict()["status"] == "error"
+
+
+def test_thumbnail_cached_from_media(tmp_path, monkeypatch):
+    media = tmp_path / "media"
+    media.mkdir()
+    PILImage.new("RGBA", (1600, 1200), (10, 200, 10, 255)).save(media / "p.png")
+    monkeypatch.setenv("MEDIA_ROOT", str(media))
+    cache = tmp_path / "cache"
+
+    uri = catalog_pdf.thumbnail("/media/p.png", cache, max_px=300)
+    assert uri.startswith("file://")
+    thumbs = list((cache / "thumbs").glob("*.jpg"))
+    assert len(thumbs) == 1
+    with PILImage.open(thumbs[0]) as im:
+        assert max(im.size) == 300
+    assert catalog_pdf.thumbnail("/media/p.png", cache, max_px=300) == uri
+    # Fuente inexistente: se deja la original
+    assert catalog_pdf.thumbnail("/media/missing.png", cache) == "/media/missing.png"
+
+
+@pytest.mark.asyncio
+async def test_generate_wait_keeps_sync_status_code(db_session, tmp_path, monkeypatch, thread_pool, fake_render):
+    from httpx import ASGITransport, AsyncClient
+
+    from db.models import Product
+    from services.api import app
+    from services.auth import SessionData, current_session, require_csrf
+    from services.routers import catalogs
+
+    for name in ("CATALOG_DIR", "LOG_DIR", "DETAIL_LOG_DIR", "RENDER_CACHE_DIR"):
+        monkeypatch.setattr(catalogs, name, tmp_path / name.lower())
+        (tmp_path / name.lower()).mkdir()
+    monkeypatch.setattr(catalogs, "PDF_PATH", tmp_path / "catalog_dir" / "ultimo_catalogo.pdf")
+    p = Product(sku_root="CAT202", title="Bio Grow", stock=1)
+    db_session.add(p)
+    await db_session.commit()
+
+    monkeypatch.setitem(app.dependency_overrides, current_session, lambda: SessionData(None, None, "admin"))
+    monkeypatch.setitem(app.dependency_overrides, require_csrf, lambda: None)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        r = await client.post("/catalogs/generate", params={"wait": "true"}, json={"ids": [p.id]})
+        assert r.status_code == 200, r.text
+        assert r.json()["count"] == 1
+        r = await client.post("/catalogs/generate", json={"ids": [p.id]})
+        assert r.status_code == 202 and r.json()["job_id"]
+        await catalog_pdf.wait(r.json()["job_id"])
@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+# NG-HEADER: Nombre de archivo: test_chat_history_buffer.py
+# NG-HEADER: Ubicación: tests/test_chat_history_buffer.py
+# NG-HEADER: Descripción: Pruebas del buffer de contexto del historial de chat (lecturas sin SQL, commit/rollback, write-behind)
+# NG-HEADER: Lineamientos: Ver AGENTS.md
+import os
+
+import pytest
+import pytest_asyncio
+
+os.environ.setdefault("DB_URL", "sqlite+aiosqlite:///:memory:")
+
+from sqlalchemy import event, func, select
+
+from db.base import Base
+from db.models import ChatMessage
+from db.session import SessionLocal, engine
+from services.chat import context_buffer
+from services.chat.history import clear_session_history, get_recent_history, save_message
+
+
+@pytest_asyncio.fixture(autouse=True)
+async def _schema():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    context_buffer.reset()
+    yield
+    context_buffer.reset()
+
+
+def _count_selects():
+    statements: list[str] = []
+
+    def _listener(conn, cursor, statement, *args):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", _listener)
+    return statements, lambda: event.remove(engine.sync_engine, "before_cursor_execute", _listener)
+
+
+@pytest.mark.asyncio
+async def test_hot_read_skips_sql_and_tracks_commits():
+    sid = "web:buffer-hot"
+    async with SessionLocal() as s:  # type: ignore
+        await save_message(s, sid, "user", "hola")
+        await save_message(s, sid, "assistant", "openai: buenas")
+        await s.commit()
+        # Lectura en frío: siembra el buffer
+        assert await get_recent_history(s, sid) == "H: Usuario: hola\nH: Asistente: buenas"
+
+        await save_message(s, sid, "user", "precio del sustrato?")
+        await save_message(s, sid, "tool", "ignorado")
+        await s.commit()
+
+        statements, stop = _count_selects()
+        try:
+            history = await get_recent_history(s, sid, limit=2)
+        finally:
+            stop()
+        assert statements == []
+        assert history == "H: Asistente: buenas\nH: Usuario: precio del sustrato?"
+
+
+@pytest.mark.asyncio
+async def test_rollback_does_not_leak_into_buffer():
+    sid = "web:buffer-rollback"
+    async with SessionLocal() as s:  # type: ignore
+        await save_message(s, sid, "user", "primero")
+        await s.commit()
+        await get_recent_history(s, sid)
+        await save_message(s, sid, "assistant", "fantasma")
+        await s.rollback()
+        assert await get_recent_history(s, sid) == "H: Usuario: primero"
+
+
+@pytest.mark.asyncio
+async def test_clear_invalidates_buffer():
+    sid = "web:buffer-clear"
+    async with SessionLocal() as s:  # type: ignore
+        await save_message(s, sid, "user", "hola")
+        await s.commit()
+        await get_recent_history(s, sid)
+        await clear_session_history(s, sid)
+        await s.commit()
+        assert await get_recent_history(s, sid) == ""
+
+
+@pytest.mark.asyncio
+async def test_write_behind_persists_in_batches(monkeypatch):
+    monkeypatch.setenv("CHAT_HISTORY_WRITE_BEHIND", "1")
+    sid = "telegram:999"
+    async with SessionLocal() as s:  # type: ignore
+        for i in range(3):
+            await save_message(s, sid, "user", f"m{i}")
+    await context_buffer.write_queue.drain()
+    async with SessionLocal() as s:  # type: ignore
+        total = (await s.execute(select(func.count()).select_from(ChatMessage).where(ChatMessage.session_id == sid))).scalar()
+        assert total == 3
+        assert await get_recent_history(s, sid) == "H: Usuario: m0\nH: Usuario: m1\nH: Usuario: m2"
+
+
+@pytest.mark.asyncio
+async def test_write_behind_cold_read_does_not_seed_partial_buffer(monkeypatch):
+    monkeypatch.setenv("CHAT_HISTORY_WRITE_BEHIND", "1")
+    monkeypatch.setattr(context_buffer, "write_queue", context_buffer.ChatWriteQueue(flush_interval=5))
+    sid = "telegram:pendiente"
+    async with SessionLocal() as s:  # type: ignore
+        await save_message(s, sid, "user", "todavía en cola")
+        # La DB no tiene el mensaje: se responde con la cola, pero sin sembrar el buffer
+        assert await get_recent_history(s, sid) == "H: Usuario: todavía en cola"
+        assert await context_buffer.get_entries(sid, 6) is None
+    await context_buffer.write_queue.drain()
+    async with SessionLocal() as s:  # type: ignore
+        assert await get_recent_history(s, sid) == "H: Usuario: todavía en cola"
+        assert await context_buffer.get_entries(sid, 6) == [("user", "todavía en cola")]
+
+
+class _FlakyRedis:
+    def __init__(self):
+        self.down = True
+        self.deleted: list[tuple] = []
+
+    def pipeline(self):
+        raise ConnectionError("redis caído")
+
+    async def exists(self, key):
+        raise ConnectionError("redis caído")
+
+    async def delete(self, *keys):
+        if self.down:
+            raise ConnectionError("redis caído")
+        self.deleted.append(keys)
+
+
+@pytest.mark.asyncio
+async def test_redis_outage_reads_database_and_drops_stale_buffers(monkeypatch, caplog):
+    fake = _FlakyRedis()
+    monkeypatch.setattr(context_buffer, "_TIER", context_buffer._RedisTier(fake))
+    sid = "web:buffer-redis"
+    async with SessionLocal() as s:  # type: ignore
+        with caplog.at_level("WARNING", logger=context_buffer.__name__):
+            await save_message(s, sid, "user", "hola")
+            await s.commit()
+            assert await get_recent_history(s, sid) == "H: Usuario: hola"
+        assert "leyendo historial de la DB" in caplog.text
+
+    # Al volver Redis se descarta el buffer de la sesión cuyo append se perdió
+    fake.down = False
+    monkeypatch.setattr(context_buffer, "_redis_down_until", 0.0)
+    await context_buffer.invalidate("web:otra")
+    assert (context_buffer._REDIS_PREFIX + sid, context_buffer._REDIS_PREFIX + sid + ":seeded") in fake.deleted
+    assert not context_buffer._DIRTY
+
+
+def test_multiple_workers_never_use_the_local_tier(monkeypatch):
+    monkeypatch.setenv("WEB_CONCURRENCY", "4")
+    monkeypatch.setenv("CHAT_CONTEXT_BACKEND", "memory")
+    assert context_buffer._create_tier() is None
+    monkeypatch.setenv("CHAT_CONTEXT_BACKEND", "auto")
+    pytest.importorskip("redis")
+    assert isinstance(context_buffer._create_tier(), context_buffer._RedisTier)
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# NG-HEADER: Nombre de archivo: test_chat_memory.py
+# NG-HEADER: Ubicación: tests/test_chat_memory.py
+# NG-HEADER: Descripción: Pruebas de la memoria corta del chatbot (LRU acotada, TTL y backend redis)
+# NG-HEADER: Lineamientos: Ver AGENTS.md
+import json
+import time
+
+import pytest
+
+from services.chat import memory as m
+from services.chat.price_lookup import ProductQuery
+
+
+def _query(text: str = "precio growmix") -> ProductQuery:
+    return ProductQuery(
+        raw_text=text,
+        normalized_text=text,
+        terms=text.split(),
+        sku_candidates=[],
+        has_price=True,
+        has_stock=False,
+        intent="price",
+    )
+
+
+@pytest.fixture()
+def store(monkeypatch):
+    s = m._InMemoryStore(max_entries=3)
+    monkeypatch.setattr(m, "_STORE", s)
+    return s
+
+
+@pytest.mark.asyncio
+async def test_memory_roundtrip_and_flags(store):
+    await m.ensure_memory("k1", _query(), pending=True, rendered="txt")
+    await m.mark_prompted("k1")
+    state = await m.get_memory("k1")
+    assert state is not None and state.pending_clarification and state.prompted
+    await m.mark_resolved("k1")
+    assert (await m.get_memory("k1")).pending_clarification is False
+    await m.clear_memory("k1")
+    assert await m.get_memory("k1") is None
+
+
+@pytest.mark.asyncio
+async def test_memory_is_bounded_lru(store):
+    for i in range(3):
+        await m.ensure_memory(f"k{i}", _query(), pending=True, rendered="")
+    assert await m.get_memory("k0") is not None  # k0 pasa a ser el más reciente
+    await m.ensure_memory("k3", _query(), pending=True, rendered="")
+    assert len(store) == 3
+    assert await m.get_memory("k1") is None
+    assert await m.get_memory("k0") is not None
+
+
+@pytest.mark.asyncio
+async def test_memory_expires_from_front(store, monkeypatch):
+    await m.ensure_memory("old", _query(), pending=True, rendered="")
+    await m.ensure_memory("new", _query(), pending=True, rendered="")
+    store._data["old"].created_at = time.time() - m._TTL_SECONDS - 1
+    assert await m.get_memory("new") is not None
+    assert "old" not in store._data
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.data: dict[str, str] = {}
+        self.ttls: dict[str, int] = {}
+        self.down = False
+
+    def _check(self):
+        if self.down:
+            raise ConnectionError("redis caído")
+
+    async def get(self, key):
+        self._check()
+        return self.data.get(key)
+
+    async def setex(self, key, ttl, value):
+        self._check()
+        self.data[key] = value
+        self.ttls[key] = ttl
+
+    async def expire(self, key, ttl):
+        self._check()
+        self.ttls[key] = ttl
+
+    async def delete(self, key):
+        self._check()
+        self.data.pop(key, None)
+
+
+@pytest.fixture()
+def redis_store(monkeypatch):
+    fake = _FakeRedis()
+    monkeypatch.setattr(m, "_STORE", m._RedisStore(fake))
+    monkeypatch.setattr(m, "_FALLBACK", m._InMemoryStore(max_entries=10))
+    monkeypatch.setattr(m, "_redis_down_until", 0.0)
+    return fake
+
+
+@pytest.mark.asyncio
+async def test_redis_backend_serializes_state(redis_store):
+    await m.ensure_memory("sess:abc", _query("precio top crop"), pending=True, rendered="r")
+    await m.mark_prompted("sess:abc")
+    raw = json.loads(redis_store.data[m._REDIS_PREFIX + "sess:abc"])
+    assert raw["prompted"] is True
+    state = await m.get_memory("sess:abc")
+    assert isinstance(state.query, ProductQuery)
+    assert state.query.raw_text == "precio top crop"
+    assert redis_store.ttls[m._REDIS_PREFIX + "sess:abc"] == m._TTL_SECONDS
+
+
+@pytest.mark.asyncio
+async def test_redis_outage_degrades_to_local_memory(redis_store, caplog):
+    redis_store.down = True
+    with caplog.at_level("WARNING", logger=m.__name__):
+        await m.ensure_memory("sess:x", _query(), pending=True, rendered="")
+    assert "usando memoria local" in caplog.text
+    # Mientras dura la ventana de reintento ni siquiera se intenta Redis
+    assert (await m.get_memory("sess:x")).pending_clarification is True
+    redis_store.down = False
+    assert await m.get_memory("sess:x") is not None
+    assert redis_store.data == {}
+
+    # Vencida la ventana se vuelve a Redis
+    m._redis_down_until = 0.0
+    await m.ensure_memory("sess:y", _query(), pending=False, rendered="")
+    assert m._REDIS_PREFIX + "sess:y" in redis_store.data
+
+
+def test_memory_key_is_stable_across_processes():
+    a = m.build_memory_key(session_id=None, role="guest", host="1.2.3.4", user_agent="UA/1.0")
+    assert a == m.build_memory_key(session_id=None, role="guest", host="1.2.3.4", user_agent="UA/1.0")
+    assert a.startswith("anon:guest:1.2.3.4:")
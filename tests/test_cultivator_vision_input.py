@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# NG-HEADER: Nombre de archivo: test_cultivator_vision_input.py
+# NG-HEADER: Ubicación: tests/test_cultivator_vision_input.py
+# NG-HEADER: Descripción: Pruebas del preprocesamiento y cache de imágenes para visión (Modo Cultivador)
+# NG-HEADER: Lineamientos: Ver AGENTS.md
+import base64
+import io
+
+import pytest
+
+PIL = pytest.importorskip("PIL")
+from PIL import Image  # noqa: E402
+
+from services.chat import cultivator, vision_input  # noqa: E402
+
+
+def _photo(width: int, height: int, orientation: int | None = None) -> bytes:
+    img = Image.new("RGB", (width, height), (40, 160, 60))
+    out = io.BytesIO()
+    kwargs = {}
+    if orientation is not None:
+        exif = Image.Exif()
+        exif[0x0112] = orientation
+        kwargs["exif"] = exif
+    img.save(out, format="JPEG", quality=98, **kwargs)
+    return out.getvalue()
+
+
+def _decode(data_url: str) -> Image.Image:
+    header, b64 = data_url.split(",", 1)
+    assert header == "data:image/jpeg;base64"
+    return Image.open(io.BytesIO(base64.b64decode(b64)))
+
+
+@pytest.fixture(autouse=True)
+def _clean_cache():
+    vision_input.clear_cache()
+    yield
+    vision_input.clear_cache()
+
+
+def test_preprocess_downscales_and_applies_exif_rotation():
+    raw = _photo(3000, 2000, orientation=6)  # 6 = rotar 90° (foto vertical de celular)
+    data, mime = vision_input.preprocess_image(raw)
+    assert mime == "image/jpeg"
+    assert len(data) < len(raw)
+    with Image.open(io.BytesIO(data)) as img:
+        assert img.size == (683, 1024)
+
+
+def test_small_image_is_sent_untouched():
+    out = io.BytesIO()
+    Image.new("RGB", (64, 64), (0, 0, 0)).save(out, format="PNG")
+    raw = out.getvalue()
+    data, mime = vision_input.preprocess_image(raw)
+    assert data == raw
+    assert mime == "image/png"
+
+
+@pytest.mark.asyncio
+async def test_file_id_cache_avoids_redownload(monkeypatch):
+    calls = []
+
+    async def _fake_download(file_id, token=None):
+        calls.append(file_id)
+        return _photo(2048, 1536)
+
+    monkeypatch.setattr(cultivator, "download_telegram_file", _fake_download)
+    first = await cultivator.get_image_base64_from_file_id("AgACfile")
+    second = await cultivator.get_image_base64_from_file_id("AgACfile")
+    assert first == second
+    assert calls == ["AgACfile"]
+    assert _decode(first).size == (1024, 768)
+    metrics = vision_input.metrics_snapshot()
+    assert metrics["latency"]["download"]["count"] >= 1
+    assert metrics["bytes_out"] < metrics["bytes_in"]
+
+
+@pytest.mark.asyncio
+async def test_undecodable_image_falls_back_to_raw_bytes():
+    broken = _photo(800, 600)[:200]  # JPEG truncado: Pillow no puede decodificarlo
+    data_url = await vision_input.to_data_url(broken)
+    header, b64 = data_url.split(",", 1)
+    assert header == "data:image/jpeg;base64"
+    assert base64.b64decode(b64) == broken
+    assert vision_input.metrics_snapshot()["preprocess_failures"] >= 1
@@ -0,0 +1,271 @@
+#!/usr/bin/env python
+# NG-HEADER: Nombre de archivo: test_drive_batch.py
+# NG-HEADER: Ubicación: tests/test_drive_batch.py
+# NG-HEADER: Descripción: Pruebas del cliente Drive (movimientos en batch, caché de carpetas) contra un Drive falso local
+# NG-HEADER: Lineamientos: Ver AGENTS.md
+import io
+import json
+import re
+import threading
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+pytest.importorskip("googleapiclient")
+pytest.importorskip("google_auth_httplib2")
+
+from services.integrations import drive  # noqa: E402
+from services.integrations.drive import GoogleDriveSync  # noqa: E402
+
+FOLDER_MIME = "application/vnd.google-apps.folder"
+
+
+class FakeDrive:
+    """Subconjunto de Drive v3 en memoria: files.list/get/create/update, alt=media, batch y token OAuth."""
+
+    def __init__(self):
+        self.files: dict[str, dict] = {}
+        self.requests: list[tuple[str, str]] = []  # (método, path) de cada request HTTP real
+        self.calls: list[tuple[str, str]] = []  # llamadas a la API (incluye las de un batch)
+        self.fail_updates: dict[str, int] = {}  # file_id -> cantidad de 429 a devolver
+        self.lock = threading.Lock()
+        self._seq = 0
+
+    def add(self, name, parents, mime="image/png", content=b""):
+        with self.lock:
+            self._seq += 1
+            fid = f"id{self._seq:04d}-padding"
+            self.files[fid] = {"id": fid, "name": name, "mimeType": mime, "parents": list(parents), "content": content}
+            return fid
+
+    def _meta(self, f):
+        return {k: v for k, v in f.items() if k != "content"}
+
+    def api(self, method, url, body):
+        """Resuelve una llamada a la API; devuelve (status, dict | bytes)."""
+        parts = urlsplit(url)
+        qs = {k: v[0] for k, v in parse_qs(parts.query).items()}
+        path = parts.path
+        with self.lock:
+            self.calls.append((method, path))
+        if method == "GET" and path == "/drive/v3/files":
+            q = qs.get("q", "")
+            parent = re.search(r"'([^']+)' in parents", q).group(1)
+            name = re.search(r"name='((?:[^'\\]|\\.)*)'", q)
+            folders = f"mimeType='{FOLDER_MIME}'" in q
+            found = [
+                self._meta(f)
+                for f in self.files.values()
+                if parent in f["parents"]
+                and (f["mimeType"] == FOLDER_MIME) == folders
+                and (name is None or f["name"] == name.group(1).replace("\\'", "'"))
+            ]
+            return 200, {"files": found}
+        if method == "POST" and path == "/drive/v3/files":
+            meta = json.loads(body or b"{}")
+            return 200, {"id": self.add(meta["name"], meta.get("parents", []), meta.get("mimeType"))}
+        fid = path.rsplit("/", 1)[-1]
+        f = self.files.get(fid)
+        if f is None:
+            return 404, {"error": {"code": 404, "message": f"File not found: {fid}"}}
+        if method == "GET" and qs.get("alt") == "media":
+            return 200, f["content"]
+        if method == "GET":
+            return 200, self._meta(f)
+        if method == "PATCH":
+            with self.lock:
+                if self.fail_updates.get(fid):
+                    self.fail_updates[fid] -= 1
+                    return 429, {"error": {"code": 429, "message": "Rate Limit Exceeded"}}
+                remove = [p for p in qs.get("removeParents", "").split(",") if p]
+                f["parents"] = [p for p in f["parents"] if p not in remove]
+                if qs.get("addParents") and qs["addParents"] not in f["parents"]:
+                    f["parents"].append(qs["addParents"])
+            return 200, {"id": fid, "parents": f["parents"]}
+        return 405, {"error": {"code": 405, "message": method}}
+
+    def batch(self, content_type, body):
+        msg = BytesParser().parsebytes(b"Content-Type: " + content_type.encode() + b"\r\n\r\n" + body)
+        out = []
+        for part in msg.get_payload():
+            raw = part.get_payload(decode=False)
+            head, _, payload = raw.partition("\r\n\r\n") if "\r\n\r\n" in raw else raw.partition("\n\n")
+            method, url, _ = head.splitlines()[0].split(" ", 2)
+            status, resp = self.api(method, url, payload.encode())
+            content_id = part["Content-ID"][1:-1]
+            out.append(
+                "--fakebatch\r\nContent-Type: application/http\r\n"
+                f"Content-ID: <response-{content_id}>\r\n\r\n"
+                f"HTTP/1.1 {status} X\r\nContent-Type: application/json\r\n\r\n{json.dumps(resp)}\r\n"
+            )
+        return ("".join(out) + "--fakebatch--\r\n").encode()
+
+
+def _handler(fake: FakeDrive):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, payload, content_type="application/json"):
+            data = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _dispatch(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            path = urlsplit(self.path).path
+            with fake.lock:
+                fake.requests.append((self.command, path))
+            if path == "/token":
+                return self._send(200, {"access_token": "fake-token", "expires_in": 3600, "token_type": "Bearer"})
+            if self.headers.get("Authorization") != "Bearer fake-token":
+                return self._send(401, {"error": {"code": 401, "message": "sin token"}})
+            if path == "/batch/drive/v3":
+                return self._send(200, fake.batch(self.headers["Content-Type"], body), "multipart/mixed; boundary=fakebatch")
+            status, payload = fake.api(self.command, self.path, body)
+            self._send(status, payload, "application/octet-stream" if isinstance(payload, bytes) else "application/json")
+
+        do_GET = do_POST = do_PATCH = _dispatch
+
+    return Handler
+
+
+@pytest.fixture(scope="module")
+def credentials_key():
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    return key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ).decode()
+
+
+@pytest.fixture
+def fake_drive(tmp_path, credentials_key, monkeypatch):
+    fake = FakeDrive()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _handler(fake))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    root = f"http://127.0.0.1:{server.server_address[1]}"
+    creds = tmp_path / "service_account.json"
+    creds.write_text(
+        json.dumps(
+            {
+                "type": "service_account",
+                "project_id": "fake",
+                "private_key_id": "k1",
+                "private_key": credentials_key,
+                "client_email": "sync@fake.iam.gserviceaccount.com",
+                "client_id": "1",
+                "token_uri": f"{root}/token",
+            }
+        )
+    )
+    monkeypatch.setenv("DRIVE_API_ROOT", root)
+    monkeypatch.setattr(drive.time, "sleep", lambda s: None)
+    fake.root_id = fake.add("Imagenes", [], FOLDER_MIME)
+    fake.credentials = str(creds)
+    yield fake
+    server.shutdown()
+    server.server_close()
+
+
+def _api_requests(fake):
+    return [r for r in fake.requests if r[1] != "/token"]
+
+
+@pytest.mark.asyncio
+async def test_moves_are_batched_100_per_request(fake_drive):
+    client = GoogleDriveSync(fake_drive.credentials, fake_drive.root_id)
+    await client.authenticate()
+    target = await client.find_or_create_folder(fake_drive.root_id, "Procesados")
+    ids = [fake_drive.add(f"ABC_1234_XYZ {i}.png", [fake_drive.root_id]) for i in range(150)]
+    fake_drive.requests.clear()
+
+    errors = await client.move_files([(fid, target) for fid in ids], parents={fid: [fake_drive.root_id] for fid in ids})
+
+    assert errors == {fid: None for fid in ids}
+    # 150 movimientos con padres conocidos: 2 requests HTTP (100 + 50), sin GETs previos
+    assert _api_requests(fake_drive) == [("POST", "/batch/drive/v3")] * 2
+    assert all(fake_drive.files[fid]["parents"] == [target] for fid in ids)
+
+
+@pytest.mark.asyncio
+async def test_unknown_parents_are_fetched_in_batch_and_failures_reported(fake_drive):
+    client = GoogleDriveSync(fake_drive.credentials, fake_drive.root_id)
+    await client.authenticate()
+    target = await client.find_or_create_folder(fake_drive.root_id, "Errores_SKU")
+    ids = [fake_drive.add(f"f{i}.png", [fake_drive.root_id]) for i in range(3)]
+    fake_drive.fail_updates[ids[1]] = 2  # dos 429 y luego éxito
+    fake_drive.requests.clear()
+
+    errors = await client.move_files([(fid, target) for fid in ids] + [("no-existe-padding", target)])
+
+    assert [errors[fid] for fid in ids] == [None, None, None]
+    assert "404" in errors["no-existe-padding"]
+    # 1 batch de GETs + 1 de updates + 2 reintentos del que devolvió 429
+    assert _api_requests(fake_drive) == [("POST", "/batch/drive/v3")] * 4
+    assert all(fake_drive.files[fid]["parents"] == [target] for fid in ids)
+
+    # move_file individual usa el mismo camino y sigue levantando GoogleDriveError
+    with pytest.raises(drive.GoogleDriveError):
+        await client.move_file("otro-inexistente", target)
+
+
+@pytest.mark.asyncio
+async def test_folder_ids_are_cached_per_instance(fake_drive):
+    client = GoogleDriveSync(fake_drive.credentials, fake_drive.root_id)
+    await client.authenticate()
+    fake_drive.calls.clear()
+
+    first = await client.find_or_create_folder(fake_drive.root_id, "SIN_SKU")
+    assert await client.find_or_create_folder(fake_drive.root_id, "SIN_SKU") == first
+    assert fake_drive.calls == [("GET", "/drive/v3/files"), ("POST", "/drive/v3/files")]
+
+    # Otra instancia (otra sincronización) la encuentra sin crearla de nuevo
+    other = GoogleDriveSync(fake_drive.credentials, fake_drive.root_id)
+    await other.authenticate()
+    assert await other.find_or_create_folder(fake_drive.root_id, "SIN_SKU") == first
+    assert sum(1 for f in fake_drive.files.values() if f["name"] == "SIN_SKU") == 1
+
+
+@pytest.mark.asyncio
+async def test_sync_against_fake_drive(fake_drive, tmp_path, monkeypatch, db_session):
+    from PIL import Image as PILImage
+
+    from db.models import Image, Product
+    from services.media import processor
+    from workers import drive_sync
+
+    monkeypatch.setenv("GOOGLE_APPLICATION_CREDENTIALS", fake_drive.credentials)
+    monkeypatch.setenv("DRIVE_SOURCE_FOLDER_ID", fake_drive.root_id)
+    monkeypatch.setenv("MEDIA_ROOT", str(tmp_path / "media"))
+    monkeypatch.setattr(processor, "_save_webp", lambda path, img, quality=80: img.save(path, format="WEBP", method=0))
+    db_session.add(Product(title="Producto", sku_root="ABC_1234_XYZ", canonical_sku="ABC_1234_XYZ", stock=1))
+    await db_session.commit()
+    for i in range(3):
+        buf = io.BytesIO()
+        img = PILImage.new("RGB", (40, 30))
+        img.putdata([(x * 6, y * 8, i * 60) for y in range(30) for x in range(40)])
+        img.save(buf, format="PNG")
+        fake_drive.add(f"ABC_1234_XYZ {i}.png", [fake_drive.root_id], content=buf.getvalue())
+    fake_drive.add("sin formato.png", [fake_drive.root_id], content=b"x" * 200)
+    fake_drive.requests.clear()
+
+    result = await drive_sync.sync_drive_images()
+
+    assert result == {"processed": 3, "errors": 0, "no_sku": 1, "total": 4}
+    by_name = {f["name"]: f for f in fake_drive.files.values()}
+    assert all(by_name[f"ABC_1234_XYZ {i}.png"]["parents"] == [by_name["Procesados"]["id"]] for i in range(3))
+    assert by_name["sin formato.png"]["parents"] == [by_name["SIN_SKU"]["id"]]
+    assert len((await db_session.scalars(Image.__table__.select())).all()) == 3
+    # Carpetas: 3 búsquedas + 3 altas; listado; 3 descargas; todos los movimientos en 1 batch
+    api = _api_requests(fake_drive)
+    assert api.count(("POST", "/batch/drive/v3")) == 1
+    assert not any(m == "PATCH" for m, _ in api)
+    assert len(api) == 3 + 3 + 1 + 3 + 1
@@ -15,6 +15,11 @@ from db.models import Product, Image
 from services.integrations.drive import GoogleDriveSync
 
 
+def _moved(mock_drive) -> list:
+    """Movimientos enviados a Drive (agrupados en batch vía ``move_files``)."""
+    return [m for call in mock_drive.move_files.await_args_list for m in call.args[0]]
+
+
 @pytest.mark.asyncio
 @pytest.mark.integration
 class TestDriveSyncIntegration:
@@ -57,7 +62,7 @@ class TestDriveSyncIntegration:
         ])
         mock_drive.find_or_create_folder = AsyncMock(return_value="processed_folder_id")
         mock_drive.download_file = AsyncMock(return_value=sample_image_content)
-        mock_drive.move_file = AsyncMock()
+        mock_drive.move_files = AsyncMock(return_value={})
         mock_drive.service = Mock()
         # Simular que el archivo está en la carpeta raíz
         mock_drive.service.files.return_value.get.return_value.execute.return_value = {
@@ -83,7 +88,7 @@ class TestDriveSyncIntegration:
         mock_drive.list_images_in_folder.assert_called_once()
         assert mock_drive.find_or_create_folder.call_count == 3  # Procesados, Errores, SIN_SKU
         mock_drive.download_file.assert_called_once_with("file1")
-        mock_drive.move_file.assert_called_once()
+        assert len(_moved(mock_drive)) == 1
 
         # Verificar que se creó la imagen en la BD
         images = await db_session.execute(
@@ -129,7 +134,7 @@ class TestDriveSyncIntegration:
         ])
         mock_drive.find_or_create_folder = AsyncMock(return_value="folder_id")
         mock_drive.download_file = AsyncMock(return_value=b"fake content")
-        mock_drive.move_file = AsyncMock()
+        mock_drive.move_files = AsyncMock(return_value={})
         mock_drive.service = Mock()
         mock_drive.service.files.return_value.get.return_value.execute.return_value = {
             "parents": ["test_folder_id"]
@@ -155,5 +160,5 @@ class TestDriveSyncIntegration:
             mock_process.assert_called_once()
 
             # Verificar que se movieron los archivos
-            assert mock_drive.move_file.call_count == 3
+            assert len(_moved(mock_drive)) == 3
 
@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+# NG-HEADER: Nombre de archivo: test_drive_sync_pipeline.py
+# NG-HEADER: Ubicación: tests/test_drive_sync_pipeline.py
+# NG-HEADER: Descripción: Pruebas del pipeline concurrente de sincronización de imágenes desde Drive
+# NG-HEADER: Lineamientos: Ver AGENTS.md
+import asyncio
+import hashlib
+import io
+
+import pytest
+from sqlalchemy import event, select
+
+from db.models import Image, ImageVersion, Product
+from services.media import processor
+from workers import drive_sync
+
+ROOT, PROCESSED, ERRORS, NO_SKU = "root", "f-procesados", "f-errores", "f-sin-sku"
+
+
+def _png(seed: int) -> bytes:
+    from PIL import Image as PILImage
+
+    img = PILImage.new("RGB", (40, 30))
+    img.putdata([(x * 6, y * 8, seed * 11 % 256) for y in range(30) for x in range(40)])
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+class FakeDrive:
+    """Drive en memoria: listado con ``parents``, descargas lentas y registro de movimientos."""
+
+    def __init__(self, files: dict[str, tuple[str, bytes]], log: list):
+        self.files = files
+        self.log = log
+        self.active = 0
+        self.max_active = 0
+        self.folder_lookups = 0
+        self.service = None  # el listado trae parents: no debe consultarse metadata por archivo
+
+    async def authenticate(self):
+        pass
+
+    async def find_or_create_folder(self, parent_id, name):
+        self.folder_lookups += 1
+        return {"Procesados": PROCESSED, "Errores_SKU": ERRORS, "SIN_SKU": NO_SKU}[name]
+
+    async def list_images_in_folder(self):
+        return [{"id": fid, "name": name, "parents": [ROOT]} for fid, (name, _) in self.files.items()]
+
+    async def download_file(self, file_id):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        await asyncio.sleep(0.02)
+        self.active -= 1
+        return self.files[file_id][1]
+
+    async def move_files(self, moves, parents=None):
+        self.log.append(("batch", len(moves)))
+        for file_id, folder_id in moves:
+            assert parents[file_id] == [ROOT]
+            self.log.append(("move", file_id, folder_id))
+        return {file_id: None for file_id, _ in moves}
+
+
+@pytest.fixture
+def env(tmp_path, monkeypatch):
+    monkeypatch.setenv("GOOGLE_APPLICATION_CREDENTIALS", str(tmp_path / "creds.json"))
+    monkeypatch.setenv("DRIVE_SOURCE_FOLDER_ID", ROOT)
+    monkeypatch.setenv("MEDIA_ROOT", str(tmp_path / "media"))
+    # WebP rápido: el costo del encoder (method=6) no es lo que se prueba aquí
+    monkeypatch.setattr(processor, "_save_webp", lambda path, img, quality=80: img.save(path, format="WEBP", quality=quality, method=0))
+    log: list = []
+    original = drive_sync._ImageBatch.commit
+
+    async def _commit(self):
+        file_ids, err = await original(self)
+        if file_ids:
+            log.append(("commit", tuple(file_ids), err))
+        return file_ids, err
+
+    monkeypatch.setattr(drive_sync._ImageBatch, "commit", _commit)
+    return tmp_path, log
+
+
+def _use(monkeypatch, fake):
+    monkeypatch.setattr(drive_sync, "GoogleDriveSync", lambda *a, **kw: fake)
+
+
+async def _products(db, *skus):
+    items = [Product(title=f"Producto {s}", sku_root=s, canonical_sku=s, stock=1) for s in skus]
+    db.add_all(items)
+    await db.commit()
+    return items
+
+
+class _ImageSelects:
+    def __init__(self):
+        from db.session import engine
+
+        self.engine = engine.sync_engine
+        self.count = 0
+
+    def _on(self, conn, cursor, statement, *args):
+        if statement.lstrip().upper().startswith("SELECT") and "FROM images" in statement:
+            self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._on)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._on)
+
+
+@pytest.mark.asyncio
+async def test_pipeline_downloads_concurrently_and_batches_commits(db_session, env, monkeypatch):
+    tmp_path, log = env
+    p1, p2 = await _products(db_session, "ABC_1234_XYZ", "DEF_5678_UVW")
+    files = {f"a{i}": (f"ABC_1234_XYZ {i}.png", _png(i)) for i in range(3)}
+    files.update({f"d{i}": (f"DEF_5678_UVW {i}.png", _png(10 + i)) for i in range(3)})
+    files["x"] = ("sin formato.png", _png(20))
+    files["z"] = ("ZZZ_9999_ZZZ 1.png", _png(21))
+    fake = FakeDrive(files, log)
+    _use(monkeypatch, fake)
+    monkeypatch.setattr(drive_sync, "_DB_BATCH", 4)
+
+    events = []
+    result = await drive_sync.sync_drive_images(progress_callback=events.append)
+
+    assert result == {"processed": 6, "errors": 1, "no_sku": 1, "total": 8}
+    assert fake.folder_lookups == 3
+    assert fake.max_active > 1
+
+    # Dos lotes (4 + 2) en lugar de un commit por imagen
+    commits = [e for e in log if e[0] == "commit"]
+    assert [len(c[1]) for c in commits] == [4, 2] and all(c[2] is None for c in commits)
+    # Cada archivo se mueve a Procesados recién después del commit de su lote
+    for i, entry in enumerate(log):
+        if entry[0] == "move" and entry[2] == PROCESSED:
+            assert any(c[0] == "commit" and entry[1] in c[1] for c in log[:i])
+    moves = {fid: folder for kind, fid, folder in (e for e in log if e[0] == "move")}
+    assert moves["x"] == NO_SKU and moves["z"] == ERRORS
+    # Los 8 movimientos viajan en una sola request batch
+    assert [e for e in log if e[0] == "batch"] == [("batch", 8)]
+
+    images = (await db_session.scalars(select(Image).order_by(Image.id))).all()
+    assert sorted(i.product_id for i in images) == [p1.id] * 3 + [p2.id] * 3
+    assert all(i.width == 40 and i.height == 30 for i in images)
+    assert all((tmp_path / "media" / i.path).exists() for i in images)
+    kinds = (await db_session.scalars(select(ImageVersion.kind).where(ImageVersion.image_id == images[0].id))).all()
+    assert sorted(kinds) == ["card", "full", "original", "thumb"]
+
+    processing = [e for e in events if e["status"] == "processing"]
+    assert [e["current"] for e in processing] == list(range(0, 9))
+    assert events[-1]["status"] == "completed" and events[-1]["stats"] == {"processed": 6, "errors": 1, "no_sku": 1}
+
+
+@pytest.mark.asyncio
+async def test_duplicates_come_from_prefetched_checksums(db_session, env, monkeypatch):
+    tmp_path, log = env
+    (product,) = await _products(db_session, "ABC_1234_XYZ")
+    dup, orphan = _png(1), _png(2)
+    raw = tmp_path / "media" / "Productos" / str(product.id) / "raw"
+    raw.mkdir(parents=True)
+    (raw / "dup.png").write_bytes(dup)
+    db_session.add_all(
+        [
+            Image(product_id=product.id, url="/media/dup", path=f"Productos/{product.id}/raw/dup.png", checksum_sha256=hashlib.sha256(dup).hexdigest()),
+            Image(product_id=product.id, url="/media/gone", path=f"Productos/{product.id}/raw/gone.png", checksum_sha256=hashlib.sha256(orphan).hexdigest()),
+        ]
+    )
+    await db_session.commit()
+    files = {"f1": ("ABC_1234_XYZ 1.png", dup), "f2": ("ABC_1234_XYZ 2.png", orphan), "f3": ("ABC_1234_XYZ 3.png", dup)}
+    _use(monkeypatch, FakeDrive(files, log))
+
+    with _ImageSelects() as q:
+        result = await drive_sync.sync_drive_images()
+    assert q.count == 1
+    assert result["processed"] == 3 and result["errors"] == 0
+
+    # Duplicados sin alta nueva; el huérfano (sin archivo físico) se reemplaza
+    rows = (await db_session.execute(select(Image.path, Image.checksum_sha256).order_by(Image.id))).all()
+    assert [r.checksum_sha256 for r in rows] == [hashlib.sha256(dup).hexdigest(), hashlib.sha256(orphan).hexdigest()]
+    assert rows[1].path.endswith("ABC_1234_XYZ 2.png")
+    assert [len(c[1]) for c in log if c[0] == "commit"] == [1]
+
+
+@pytest.mark.asyncio
+async def test_invalid_image_is_isolated_from_the_batch(db_session, env, monkeypatch):
+    tmp_path, log = env
+    await _products(db_session, "ABC_1234_XYZ")
+    files = {"ok": ("ABC_1234_XYZ 1.png", _png(1)), "bad": ("ABC_1234_XYZ 2.png", b"\x89PNG\r\n\x1a\n" + b"0" * 200)}
+    _use(monkeypatch, FakeDrive(files, log))
+
+    events = []
+    result = await drive_sync.sync_drive_images(progress_callback=events.append)
+
+    assert result == {"processed": 1, "errors": 1, "no_sku": 0, "total": 2}
+    moves = {fid: folder for kind, fid, folder in (e for e in log if e[0] == "move")}
+    assert moves == {"ok": PROCESSED, "bad": ERRORS}
+    assert any("corrupta o es inválida" in e["error"] for e in events)
+    assert [p.name for p in (tmp_path / "media").rglob("raw/*")] == ["ABC_1234_XYZ 1.png"]
@@ -20,6 +20,11 @@ from db.models import Product
 from services.integrations.drive import GoogleDriveError
 
 
+def _moved(mock_drive) -> list:
+    """Movimientos enviados a Drive (agrupados en batch vía ``move_files``)."""
+    return [m for call in mock_drive.move_files.await_args_list for m in call.args[0]]
+
+
 class TestExtractSkuFromFilename:
     """Tests para extracción de SKU desde nombres de archivo."""
 
@@ -93,7 +98,7 @@ class TestSyncDriveImages:
         mock.authenticate = AsyncMock()
         mock.list_images_in_folder = AsyncMock()
         mock.download_file = AsyncMock()
-        mock.move_file = AsyncMock()
+        mock.move_files = AsyncMock(return_value={})
         mock.find_or_create_folder = AsyncMock()
         mock.service = Mock()
         return mock
@@ -175,7 +180,7 @@ class TestSyncDriveImages:
         mock_drive.authenticate = AsyncMock()
         mock_drive.list_images_in_folder = AsyncMock(return_value=files)
         mock_drive.find_or_create_folder = AsyncMock(return_value="folder_id")
-        mock_drive.move_file = AsyncMock()
+        mock_drive.move_files = AsyncMock(return_value={})
         mock_drive.service = Mock()
         # Simular que el archivo está en la carpeta raíz
         mock_drive.service.files.return_value.get.return_value.execute.return_value = {
@@ -193,7 +198,7 @@ class TestSyncDriveImages:
         assert result["no_sku"] == 1
         assert result["processed"] == 0
         # Debe moverse a SIN_SKU
-        mock_drive.move_file.assert_called_once()
+        assert len(_moved(mock_drive)) == 1
 
     @patch("workers.drive_sync.GoogleDriveSync")
     @patch("workers.drive_sync._process_image")
@@ -214,7 +219,7 @@ class TestSyncDriveImages:
         mock_drive.authenticate = AsyncMock()
         mock_drive.list_images_in_folder = AsyncMock(return_value=files)
         mock_drive.find_or_create_folder = AsyncMock(return_value="folder_id")
-        mock_drive.move_file = AsyncMock()
+        mock_drive.move_files = AsyncMock(return_value={})
         mock_drive.service = Mock()
         mock_drive.service.files.return_value.get.return_value.execute.return_value = {
             "parents": ["test_folder_id"]
@@ -230,7 +235,7 @@ class TestSyncDriveImages:
 
         assert result["no_sku"] == 1  # SKU no canónico va a SIN_SKU
         assert result["processed"] == 0
-        mock_drive.move_file.assert_called_once()
+        assert len(_moved(mock_drive)) == 1
 
     @patch("workers.drive_sync.GoogleDriveSync")
     @patch("workers.drive_sync._process_image")
@@ -251,7 +256,7 @@ class TestSyncDriveImages:
         mock_drive.authenticate = AsyncMock()
         mock_drive.list_images_in_folder = AsyncMock(return_value=files)
         mock_drive.find_or_create_folder = AsyncMock(return_value="folder_id")
-        mock_drive.move_file = AsyncMock()
+        mock_drive.move_files = AsyncMock(return_value={})
         mock_drive.service = Mock()
         mock_drive.service.files.return_value.get.return_value.execute.return_value = {
             "parents": ["test_folder_id"]
@@ -268,7 +273,7 @@ class TestSyncDriveImages:
         assert result["errors"] == 1
         assert result["processed"] == 0
         # Debe moverse a Errores_SKU
-        mock_drive.move_file.assert_called_once()
+        assert len(_moved(mock_drive)) == 1
 
     @patch("workers.drive_sync.GoogleDriveSync")
     @patch("workers.drive_sync._process_image")
@@ -300,7 +305,7 @@ class TestSyncDriveImages:
         mock_drive.list_images_in_folder = AsyncMock(return_value=files)
         mock_drive.find_or_create_folder = AsyncMock(return_value="folder_id")
         mock_drive.download_file = AsyncMock(return_value=b"fake image content")
-        mock_drive.move_file = AsyncMock()
+        mock_drive.move_files = AsyncMock(return_value={})
         mock_drive.service = Mock()
         mock_drive.service.files.return_value.get.return_value.execute.return_value = {
             "parents": ["test_folder_id"]
@@ -323,7 +328,7 @@ class TestSyncDriveImages:
         # Debe llamarse _process_image
         mock_process_image.assert_called_once()
         # Debe moverse a Procesados
-        assert mock_drive.move_file.call_count == 1
+        assert len(_moved(mock_drive)) == 1
 
     @patch("workers.drive_sync.GoogleDriveSync")
     @patch.dict(os.environ, {
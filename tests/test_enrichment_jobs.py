@@ -0,0 +1,204 @@
+#!/usr/bin/env python
+# NG-HEADER: Nombre de archivo: test_enrichment_jobs.py
+# NG-HEADER: Ubicación: tests/test_enrichment_jobs.py
+# NG-HEADER: Descripción: Pruebas de jobs de enriquecimiento masivo (concurrencia, estado por ítem, reanudación, caché web)
+# NG-HEADER: Lineamientos: Ver AGENTS.md
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select, update
+
+from db.models import AuditLog, EnrichmentJobItem, Job, Product
+from services import enrichment_jobs
+from services.routers import catalog as catalog_router
+
+
+@pytest.fixture
+def fake_enrich(monkeypatch):
+    state = {"active": 0, "max_active": 0, "calls": [], "brand": {}}
+
+    async def _enrich(product_id, session, request=None, sess=None, force=False):
+        state["active"] += 1
+        state["max_active"] = max(state["max_active"], state["active"])
+        state["brand"][product_id] = enrichment_jobs.brand_context.get()
+        try:
+            await asyncio.sleep(0.05)
+            prod = await session.get(Product, product_id)
+            prod.description_html = "Texto."
+            await session.commit()
+            state["calls"].append(product_id)
+        finally:
+            state["active"] -= 1
+        return {"status": "ok"}
+
+    monkeypatch.setattr(catalog_router, "enrich_product", _enrich)
+    monkeypatch.setattr(enrichment_jobs, "_llm_provider_name", lambda: "openai")
+    monkeypatch.setattr(enrichment_jobs, "_RATE_DEFAULTS", {"web_search": (1000.0, 100), "openai": (1000.0, 100)})
+    # SQLite en memoria comparte una única conexión (StaticPool): sesiones concurrentes se pisan
+    monkeypatch.setattr(enrichment_jobs, "_CONCURRENCY", 1)
+    enrichment_jobs._BUCKETS.clear()
+    return state
+
+
+async def _products(db, specs):
+    prods = [Product(sku_root=f"S{i}", title=title, description_html=desc) for i, (title, desc) in enumerate(specs)]
+    db.add_all(prods)
+    await db.commit()
+    return [p.id for p in prods]
+
+
+@pytest.mark.asyncio
+async def test_job_persists_item_status_and_audit(db_session, fake_enrich):
+    ids = await _products(db_session, [("Prod A", None), ("", None), ("Prod C", "ya tiene"), ("Prod D", None), ("Prod E", None)])
+    job = await enrichment_jobs.create_job(db_session, ids + [999999], force=False, user_id=None, role="admin")
+    enrichment_jobs.start(job.id)
+    await enrichment_jobs.wait(job.id)
+
+    snap = await enrichment_jobs.snapshot(db_session, job.id)
+    assert snap["status"] == "done" and snap["progress"] == 100
+    assert snap["counts"]["done"] == 3 and snap["counts"]["skipped"] == 3
+    details = {it["product_id"]: it["detail"] for it in snap["items"]}
+    assert details[ids[1]] == "no_title" and details[ids[2]] == "already_enriched" and details[999999] == "not_found"
+    audit = (await db_session.execute(select(AuditLog).where(AuditLog.action == "bulk_enrich"))).scalars().one()
+    assert audit.meta["enriched"] == 3 and audit.meta["job_id"] == job.id
+
+
+@pytest.mark.asyncio
+async def test_items_run_with_bounded_concurrency(db_session, monkeypatch):
+    ids = await _products(db_session, [(f"Prod {i}", None) for i in range(6)])
+    job = await enrichment_jobs.create_job(db_session, ids, force=False, user_id=None, role="admin")
+    state = {"active": 0, "max_active": 0, "seen": []}
+
+    async def _item(job_id, item_id, product_id, *args):
+        state["active"] += 1
+        state["max_active"] = max(state["max_active"], state["active"])
+        await asyncio.sleep(0.02)
+        state["seen"].append(product_id)
+        state["active"] -= 1
+
+    monkeypatch.setattr(enrichment_jobs, "_process_item", _item)
+    monkeypatch.setattr(enrichment_jobs, "_llm_provider_name", lambda: "openai")
+    monkeypatch.setattr(enrichment_jobs, "_CONCURRENCY", 3)
+    enrichment_jobs.start(job.id)
+    await enrichment_jobs.wait(job.id)
+    assert sorted(state["seen"]) == sorted(ids)
+    assert state["max_active"] == 3
+
+
+@pytest.mark.asyncio
+async def test_orphaned_job_is_resumed(db_session, fake_enrich):
+    ids = await _products(db_session, [("Prod A", None), ("Prod B", "hecho")])
+    job = await enrichment_jobs.create_job(db_session, ids, force=False, user_id=None, role="admin")
+    # Simula una caída a mitad de camino: primer ítem en curso (producto bloqueado), segundo ya hecho
+    items = (await db_session.execute(select(EnrichmentJobItem).order_by(EnrichmentJobItem.id))).scalars().all()
+    items[0].status, items[1].status = "running", "done"
+    await db_session.execute(update(Product).where(Product.id == ids[0]).values(is_enriching=True))
+    old = datetime.utcnow() - timedelta(seconds=enrichment_jobs._STALE_S + 5)
+    await db_session.execute(update(Job).where(Job.id == job.id).values(status="running", updated_at=old))
+    await db_session.commit()
+
+    assert await enrichment_jobs.resume_orphaned() == [job.id]
+    await enrichment_jobs.wait(job.id)
+    assert fake_enrich["calls"] == [ids[0]]
+    snap = await enrichment_jobs.snapshot(db_session, job.id)
+    assert snap["status"] == "done" and snap["counts"]["done"] == 2
+    # Un segundo watchdog no vuelve a tomarlo
+    assert await enrichment_jobs.resume_orphaned() == []
+
+
+@pytest.mark.asyncio
+async def test_brand_search_shared_across_products(db_session, fake_enrich, monkeypatch):
+    ids = await _products(db_session, [("Top Crop Veg", None), ("Top Crop Bloom", None), ("Otro", None)])
+    brand_calls = []
+
+    async def _load_brands(db, product_ids):
+        return {ids[0]: "Top Crop", ids[1]: "Top Crop"}
+
+    async def _brand_results(brand, role):
+        brand_calls.append(brand)
+        return {"items": [{"title": brand, "url": "https://topcrop.example"}]}
+
+    monkeypatch.setattr(enrichment_jobs, "_load_brands", _load_brands)
+    monkeypatch.setattr(enrichment_jobs, "_brand_results", _brand_results)
+    job = await enrichment_jobs.create_job(db_session, ids, force=False, user_id=None, role="admin")
+    enrichment_jobs.start(job.id)
+    await enrichment_jobs.wait(job.id)
+
+    assert brand_calls == ["Top Crop"]
+    assert fake_enrich["brand"][ids[0]] == fake_enrich["brand"][ids[1]] is not None
+    assert fake_enrich["brand"][ids[2]] is None
+
+
+@pytest.mark.asyncio
+async def test_web_search_cache_by_query():
+    enrichment_jobs.clear_web_cache()
+    calls = []
+
+    class _Provider:
+        async def call_mcp_web_tool(self, *, tool_name, parameters):
+            calls.append(parameters["query"])
+            return {"items": [{"url": "https://x"}]} if "hit" in parameters["query"].lower() else {"error": "tool_network_failure"}
+
+    p = _Provider()
+    await enrichment_jobs.search_web_cached(p, "Fertilizante  HIT", "admin", 5)
+    await enrichment_jobs.search_web_cached(p, "fertilizante hit", "admin", 5)
+    # Los errores no se cachean
+    await enrichment_jobs.search_web_cached(p, "falla", "admin", 5)
+    await enrichment_jobs.search_web_cached(p, "falla", "admin", 5)
+    assert calls == ["Fertilizante  HIT", "falla", "falla"]
+    enrichment_jobs.clear_web_cache()
+
+
+@pytest.mark.asyncio
+async def test_web_search_cache_hit_skips_rate_bucket_and_refresh_bypasses():
+    enrichment_jobs.clear_web_cache()
+    calls = []
+    acquired = []
+
+    class _Provider:
+        async def call_mcp_web_tool(self, *, tool_name, parameters):
+            calls.append(parameters["query"])
+            return {"items": [{"url": "https://x"}]}
+
+    class _Bucket:
+        async def acquire(self):
+            acquired.append(1)
+
+    enrichment_jobs._BUCKETS["web_search"] = (asyncio.get_running_loop(), _Bucket())
+    token = enrichment_jobs.current_job.set(1)
+    try:
+        p = _Provider()
+        await enrichment_jobs.search_web_cached(p, "sustrato", "admin", 5)
+        await enrichment_jobs.search_web_cached(p, "sustrato", "admin", 5)
+        assert calls == ["sustrato"] and len(acquired) == 1
+        await enrichment_jobs.search_web_cached(p, "sustrato", "admin", 5, refresh=True)
+        assert calls == ["sustrato", "sustrato"] and len(acquired) == 2
+    finally:
+        enrichment_jobs.current_job.reset(token)
+        enrichment_jobs._BUCKETS.clear()
+        enrichment_jobs.clear_web_cache()
+
+
+@pytest.mark.asyncio
+async def test_cancel_persisted_by_another_worker_stops_runner(db_session, fake_enrich, monkeypatch):
+    ids = await _products(db_session, [(f"Prod {i}", None) for i in range(5)])
+    job = await enrichment_jobs.create_job(db_session, ids, force=False, user_id=None, role="admin")
+    monkeypatch.setattr(enrichment_jobs, "_CANCEL_CHECK_EVERY", 1)
+    inner = catalog_router.enrich_product
+
+    async def _enrich(product_id, session, **kwargs):
+        out = await inner(product_id, session, **kwargs)
+        # Otro worker cancela: sólo cambia la fila, no el set en memoria de este proceso
+        await session.execute(update(Job).where(Job.id == job.id).values(status="cancelled"))
+        await session.commit()
+        return out
+
+    monkeypatch.setattr(catalog_router, "enrich_product", _enrich)
+    enrichment_jobs.start(job.id)
+    await enrichment_jobs.wait(job.id)
+
+    snap = await enrichment_jobs.snapshot(db_session, job.id)
+    assert snap["status"] == "cancelled"
+    assert fake_enrich["calls"] == ids[:1]
+    assert snap["counts"]["pending"] == 4
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# NG-HEADER: Nombre de archivo: test_http_cache.py
+# NG-HEADER: Ubicación: tests/test_http_cache.py
+# NG-HEADER: Descripción: Pruebas de compresión de respuestas y GET condicional (ETag/304)
+# NG-HEADER: Lineamientos: Ver AGENTS.md
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.responses import StreamingResponse
+
+from db.models import ChatSession
+from services import http_cache
+from services.api import app
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def enabled(monkeypatch):
+    monkeypatch.setattr(http_cache, "_COMPRESSION", True)
+    monkeypatch.setattr(http_cache, "_ETAGS", True)
+    monkeypatch.setattr(http_cache, "brotli", None)
+    http_cache.clear_metrics()
+    yield
+
+
+def _mini_app() -> TestClient:
+    mini = FastAPI()
+    mini.add_middleware(http_cache.HttpCacheMiddleware)
+
+    @mini.get("/big")
+    async def big():
+        return {"items": [{"id": i, "name": f"Producto {i}", "tags": ["a", "b"]} for i in range(300)]}
+
+    @mini.get("/small")
+    async def small():
+        return {"ok": True}
+
+    @mini.get("/stream")
+    async def stream():
+        async def gen():
+            yield b"x" * 4000
+            yield b"y" * 4000
+        return StreamingResponse(gen(), media_type="text/plain")
+
+    return TestClient(mini)
+
+
+def test_large_json_is_gzipped_and_small_is_not(enabled):
+    c = _mini_app()
+    r = c.get("/big", headers={"Accept-Encoding": "gzip"})
+    assert r.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in r.headers["vary"]
+    assert len(r.json()["items"]) == 300  # httpx descomprime
+    assert "content-encoding" not in c.get("/small", headers={"Accept-Encoding": "gzip"}).headers
+    streamed = c.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in streamed.headers and len(streamed.content) == 8000
+    stats = http_cache.metrics_snapshot()["routes"]["/big"]
+    assert stats["bytes_out"] < stats["bytes_in"]
+
+
+def test_body_etag_answers_304(enabled):
+    c = _mini_app()
+    first = c.get("/big")
+    etag = first.headers["etag"]
+    assert etag.startswith('W/"')
+    again = c.get("/big", headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.content == b""
+    assert again.headers["etag"] == etag
+
+
+def test_disabled_by_default():
+    r = _mini_app().get("/big", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in r.headers and "etag" not in r.headers
+
+
+@pytest.mark.asyncio
+async def test_admin_chats_row_version_etag(enabled, monkeypatch):
+    monkeypatch.setattr(http_cache, "_MIN_BYTES", 0)
+    from db.session import SessionLocal
+    async with SessionLocal() as s:  # type: ignore
+        s.add(ChatSession(session_id="web:etag1", user_identifier="etag1", status="new"))
+        await s.commit()
+
+    first = client.get("/admin/chats", headers={"Accept-Encoding": "gzip"})
+    assert first.status_code == 200
+    assert first.headers["content-encoding"] == "gzip"  # también detrás de los middlewares de la app
+    etag = first.headers["etag"]
+    assert client.get("/admin/chats", headers={"If-None-Match": etag}).status_code == 304
+
+    async with SessionLocal() as s:  # type: ignore
+        sess = await s.get(ChatSession, "web:etag1")
+        sess.status = "reviewed"
+        await s.commit()
+    changed = client.get("/admin/chats", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.json()["items"][0]["status"] == "reviewed"
+
+
+@pytest.mark.asyncio
+async def test_admin_chat_detail_etag_scoped_to_session(enabled):
+    from db.session import SessionLocal
+    from services.chat.history import clear_session_history, save_message
+
+    async with SessionLocal() as s:  # type: ignore
+        s.add(ChatSession(session_id="web:etag2", user_identifier="etag2", status="new"))
+        s.add(ChatSession(session_id="web:etag3", user_identifier="etag3", status="new"))
+        await s.commit()
+        await save_message(s, "web:etag2", "user", "hola")
+        await s.commit()
+
+    first = client.get("/admin/chats/web:etag2")
+    etag = first.headers["etag"]
+    assert client.get("/admin/chats/web:etag2", headers={"If-None-Match": etag}).status_code == 304
+
+    # Actividad en otra sesión no invalida este detalle
+    async with SessionLocal() as s:  # type: ignore
+        await save_message(s, "web:etag3", "user", "otra")
+        await s.commit()
+    assert client.get("/admin/chats/web:etag2", headers={"If-None-Match": etag}).status_code == 304
+
+    # Borrar el historial (además toca updated_at de la sesión) cambia el ETag
+    async with SessionLocal() as s:  # type: ignore
+        await clear_session_history(s, "web:etag2")
+        await s.commit()
+    changed = client.get("/admin/chats/web:etag2", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.json()["messages"] == []
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# NG-HEADER: Nombre de archivo: test_http_clients.py
+# NG-HEADER: Ubicación: tests/test_http_clients.py
+# NG-HEADER: Descripción: Pruebas del registro de clientes HTTP salientes (reuso, reintentos, métricas)
+# NG-HEADER: Lineamientos: Ver AGENTS.md
+import dataclasses
+
+import httpx
+import pytest
+import respx
+
+from services import http_clients
+
+
+@pytest.fixture(autouse=True)
+def _clean():
+    http_clients.clear_metrics()
+    yield
+    http_clients.clear_metrics()
+
+
+@pytest.mark.asyncio
+async def test_client_reused_within_loop():
+    first = http_clients.get_client("telegram")
+    assert http_clients.get_client("telegram") is first
+    assert http_clients.get_client("mcp_products") is not first
+    await http_clients.aclose_all()
+    assert first.is_closed
+    assert http_clients.get_client("telegram") is not first
+    await http_clients.aclose_all()
+
+
+def test_client_replaced_on_new_loop_is_closed():
+    """Al cambiar de event loop (``asyncio.run`` en workers) el cliente anterior se cierra."""
+    import asyncio
+
+    async def _grab():
+        return http_clients.get_client("scraping")
+
+    first = asyncio.run(_grab())
+
+    async def _replace():
+        second = http_clients.get_client("scraping")
+        await asyncio.sleep(0.01)  # deja correr el aclose del cliente retirado
+        return second
+
+    second = asyncio.run(_replace())
+    assert second is not first and first.is_closed
+
+    async def _close():
+        await http_clients.aclose_all()
+
+    asyncio.run(_close())
+    assert second.is_closed
+
+
+@pytest.mark.asyncio
+async def test_request_retries_transient_5xx(monkeypatch):
+    monkeypatch.setenv("HTTP_INTERNAL_API_RETRIES", "2")
+    fast = dataclasses.replace(http_clients.POLICIES["internal_api"], backoff=0.0)
+    monkeypatch.setitem(http_clients.POLICIES, "internal_api", fast)
+    with respx.mock:
+        route = respx.get("http://api.test/ping").mock(
+            side_effect=[httpx.Response(503), httpx.Response(503), httpx.Response(200, json={"ok": True})]
+        )
+        resp = await http_clients.request("internal_api", "GET", "http://api.test/ping")
+        assert resp.status_code == 200
+        assert route.call_count == 3
+        # POST no es idempotente: no se reintenta
+        post = respx.post("http://api.test/sales").mock(return_value=httpx.Response(503))
+        resp = await http_clients.request("internal_api", "POST", "http://api.test/sales")
+        assert resp.status_code == 503
+        assert post.call_count == 1
+    await http_clients.aclose_all()
+
+
+@pytest.mark.asyncio
+async def test_metrics_per_upstream():
+    with respx.mock:
+        respx.get("http://tg.test/getMe").mock(return_value=httpx.Response(200, json={"ok": True}))
+        respx.get("http://tg.test/missing").mock(return_value=httpx.Response(404))
+        client = http_clients.get_client("telegram")
+        await client.get("http://tg.test/getMe")
+        await client.get("http://tg.test/missing")
+    await http_clients.aclose_all()
+    snap = http_clients.metrics_snapshot()["telegram"]
+    assert snap["requests"] == 2
+    assert snap["2xx"] == 1 and snap["4xx"] == 1
+    assert "p95_ms" in snap
+
+
+def test_policy_env_overrides(monkeypatch):
+    monkeypatch.setenv("HTTP_TELEGRAM_TIMEOUT", "15")
+    monkeypatch.setenv("HTTP_TELEGRAM_MAX_CONNECTIONS", "3")
+    pol = http_clients.policy("telegram")
+    assert pol.timeout == 15.0
+    assert pol.max_connections == 3
+    # Upstream desconocido: política por defecto
+    assert http_clients.policy("desconocido").timeout == http_clients.POLICIES["default"].timeout
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# NG-HEADER: Nombre de archivo: test_iaval_vision_pages.py
+# NG-HEADER: Ubicación: tests/test_iaval_vision_pages.py
+# NG-HEADER: Descripción: Pruebas de iAVaL Vision multipágina (imágenes cacheadas, llamadas en paralelo, unión por página)
+# NG-HEADER: Lineamientos: Ver AGENTS.md
+import asyncio
+import json
+import re
+from datetime import date
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from db.models import Purchase, PurchaseAttachment, Supplier
+from services.api import app
+from services.auth import SessionData, current_session, require_csrf
+from services.importers import pdf_extract
+
+pytest.importorskip("reportlab")
+pytest.importorskip("fitz")
+
+app.dependency_overrides[current_session] = lambda: SessionData(None, None, "admin")
+app.dependency_overrides[require_csrf] = lambda: None
+
+
+def _pdf(path, pages: int):
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    c = canvas.Canvas(str(path), pagesize=A4)
+    for i in range(pages):
+        c.drawString(50, 800, f"REMITO 0001-00012345  pagina {i + 1}")
+        c.rect(50 + 30 * i, 700, 20, 20, fill=1)
+        c.showPage()
+    c.save()
+    return path
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("PDF_EXTRACT_CACHE_DIR", str(tmp_path / "cache"))
+    pdf_extract.clear_memory()
+    yield tmp_path
+    pdf_extract.clear_memory()
+
+
+async def _purchase(db, pdf) -> int:
+    s = Supplier(slug="sp", name="Santa Planta")
+    db.add(s)
+    await db.flush()
+    p = Purchase(supplier_id=s.id, remito_number="0001-00012345", remito_date=date(2025, 9, 2))
+    db.add(p)
+    await db.flush()
+    db.add(PurchaseAttachment(purchase_id=p.id, filename="remito.pdf", mime="application/pdf", size=pdf.stat().st_size, path=str(pdf)))
+    await db.commit()
+    return p.id
+
+
+def test_page_image_is_compressed_bounded_and_cached(workdir, monkeypatch):
+    pdf = _pdf(workdir / "a.pdf", 1)
+    doc = pdf_extract.open_document(pdf)
+    jpg = doc.page_image(0, max_side=800, quality=70)
+    png = doc.page_png(0)
+    assert jpg[:3] == b"\xff\xd8\xff" and len(jpg) < len(png)
+    from PIL import Image
+    import io
+
+    assert max(Image.open(io.BytesIO(jpg)).size) == 800
+    assert doc.page_image(0, max_side=800, fmt="webp", quality=70)[8:12] == b"WEBP"
+
+    # Segundo pedido (otro proceso / memoria limpia): sale de disco sin rasterizar
+    monkeypatch.setattr(pdf_extract, "render_page_png", lambda *a, **kw: pytest.fail("no debe rasterizar"))
+    pdf_extract.clear_memory()
+    assert pdf_extract.open_document(pdf).page_image(0, max_side=800, quality=70) == jpg
+
+
+@pytest.mark.asyncio
+async def test_vision_sends_pages_concurrently_and_merges_in_order(db_session, workdir, monkeypatch):
+    pid = await _purchase(db_session, _pdf(workdir / "remito.pdf", 3))
+    state = {"active": 0, "max": 0, "mimes": set()}
+
+    async def _fake_run_async(self, task, prompt, user_context=None, tools_schema=None, images=None):
+        page = int(re.search(r"página (\d+) de 3", prompt).group(1))
+        state["mimes"].add(images[0].split(";")[0])
+        state["active"] += 1
+        state["max"] = max(state["max"], state["active"])
+        # La primera página responde última: el orden del resultado no depende de la llegada
+        await asyncio.sleep(0.06 - 0.02 * page)
+        state["active"] -= 1
+        header = {"remito_number": "0001-00012345", "remito_date": "2025-09-02"} if page == 1 else {"remito_number": ""}
+        lines = [{"index": 0, "supplier_sku": f"SKU-{page}{k}", "title": f"Item {page}.{k}", "qty": 1, "unit_cost": 10} for k in range(2)]
+        return "openai:" + json.dumps({"header": header, "lines": lines, "confidence": 0.9 - page / 100, "comments": ["ok"]})
+
+    import services.routers.purchases as pr
+
+    monkeypatch.setattr(pr.AIRouter, "run_async", _fake_run_async)
+    monkeypatch.setenv("IAVAL_VISION_CONCURRENCY", "3")
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        r = await client.post(f"/purchases/{pid}/iaval/vision")
+    assert r.status_code == 200, r.text
+    data = r.json()
+    assert data["pages"] == 3 and state["max"] == 3 and state["mimes"] == {"data:image/jpeg"}
+    assert [ln["supplier_sku"] for ln in data["proposal"]["lines"]] == ["SKU-10", "SKU-11", "SKU-20", "SKU-21", "SKU-30", "SKU-31"]
+    assert [ln["index"] for ln in data["proposal"]["lines"]] == list(range(6))
+    assert [ln["page"] for ln in data["proposal"]["lines"]] == [1, 1, 2, 2, 3, 3]
+    assert data["proposal"]["header"] == {"remito_number": "0001-00012345", "remito_date": "2025-09-02"}
+    assert data["confidence"] == pytest.approx(0.87)
+    assert data["comments"] == ["p1: ok", "p2: ok", "p3: ok"]
+    assert len(data["diff"]["lines_new"]) == 6
+    assert [p.rsplit("_", 1)[-1] for p in data["audit"]["images"]] == ["p1.jpg", "p2.jpg", "p3.jpg"]
+
+
+@pytest.mark.asyncio
+async def test_vision_failed_page_lowers_confidence(db_session, workdir, monkeypatch):
+    pid = await _purchase(db_session, _pdf(workdir / "remito.pdf", 2))
+
+    async def _fake_run_async(self, task, prompt, user_context=None, tools_schema=None, images=None):
+        if "página 2 de 2" in prompt:
+            raise RuntimeError("timeout")
+        return json.dumps({"header": {"remito_number": "0001-00012345"}, "lines": [{"title": "Item", "qty": 1}], "confidence": 0.95, "comments": []})
+
+    import services.routers.purchases as pr
+
+    monkeypatch.setattr(pr.AIRouter, "run_async", _fake_run_async)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        r = await client.post(f"/purchases/{pid}/iaval/vision")
+    assert r.status_code == 200
+    data = r.json()
+    assert data["confidence"] == 0 and len(data["proposal"]["lines"]) == 1
+    assert data["comments"] == ["p2: Error en Vision API: timeout"]
@@ -55,3 +55,55 @@ async def test_import_preview_limit() -> None:
     app.dependency_overrides[current_session] = lambda: SessionData(None, None, "guest")
     resp = client.get(f"/imports/{job_id}")
     assert resp.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_import_commit_wait_and_progress() -> None:
+    app.dependency_overrides[current_session] = lambda: SessionData(None, None, "admin")
+    job_id = await _setup_job()
+    resp = client.post(f"/imports/{job_id}/commit?wait=true")
+    assert resp.status_code == 200
+    # Filas sin código/categoría: se cuentan como error sin abortar el commit
+    assert resp.json()["errors"] == 3
+    data = client.get(f"/imports/{job_id}").json()
+    assert data["status"] == "COMMITTED"
+    assert data["commit"]["processed"] == 3 and data["commit"]["progress"] == 100
+    assert client.post(f"/imports/{job_id}/commit").status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_upload_price_list_preview_rows() -> None:
+    from io import BytesIO
+
+    from openpyxl import Workbook
+
+    from db.session import SessionLocal
+    from db.models import SupplierProduct
+
+    app.dependency_overrides[current_session] = lambda: SessionData(None, None, "admin")
+    async with SessionLocal() as session:
+        supplier = Supplier(slug="santa-planta", name="Santa Planta")
+        session.add(supplier)
+        await session.flush()
+        session.add(SupplierProduct(supplier_id=supplier.id, supplier_product_id="2", title="Viejo",
+                                    current_purchase_price=10, current_sale_price=20))
+        await session.commit()
+        supplier_id = supplier.id
+
+    wb = Workbook()
+    ws = wb.active
+    ws.append(["ID", "Producto", "Agrupamiento", "Familia", "SubFamilia", "Compra Minima", "PrecioDeCompra", "PrecioDeVenta"])
+    ws.append([1, "Nuevo", "Fert", None, None, 1, "10,5", "20"])
+    ws.append([2, "Existente", "Fert", None, None, 1, "12", "20"])
+    ws.append([1, "Repetido", "Fert", None, None, 1, "10,5", "20"])
+    ws.append([3, "Sin precio", "Fert", None, None, 1, "0", "0"])
+    buf = BytesIO()
+    wb.save(buf)
+    files = {"file": ("lista.xlsx", buf.getvalue(), "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")}
+    resp = client.post(f"/suppliers/{supplier_id}/price-list/upload", files=files)
+    assert resp.status_code == 200, resp.text
+    body = resp.json()
+    assert body["kpis"] == {"total": 4, "errors": 1, "duplicates_in_file": 1, "unchanged": 0, "new": 1, "changed": 1}
+    rows = client.get(f"/imports/{body['job_id']}").json()["rows"]
+    assert [r["status"] for r in rows] == ["new", "changed", "duplicate_in_file", "error"]
+    assert rows[1]["data"]["delta_compra"] == 2.0
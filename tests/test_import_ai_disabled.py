@@ -25,7 +25,7 @@ def test_import_ai_disabled_creates_draft_when_allowed(tmp_path):
     with pdf.open("rb") as fh:
         try:
             resp = client.post(
-                "/purchases/import/santaplanta?supplier_id=1&debug=1",
+                "/purchases/import/santaplanta?supplier_id=1&debug=1&wait=1",
                 files={"file": (pdf.name, fh, "application/pdf")},
             )
         except Exception as e:
@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+# NG-HEADER: Nombre de archivo: test_import_commit.py
+# NG-HEADER: Ubicación: tests/test_import_commit.py
+# NG-HEADER: Descripción: Pruebas del commit de importaciones por lotes (checkpoint, reanudación, resolución en bloque)
+# NG-HEADER: Lineamientos: Ver AGENTS.md
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, select, update
+
+from db.models import (
+    Category,
+    ImportJob,
+    ImportJobRow,
+    Product,
+    SupplierPriceHistory,
+    SupplierProduct,
+    Supplier,
+)
+from services import import_commit
+
+
+def _row(code, name, path="Fertilizantes > Base", compra=10.0, venta=15.0, **extra):
+    return {"codigo": code, "nombre": name, "categoria_path": path, "precio_compra": compra, "precio_venta": venta, **extra}
+
+
+async def _seed(db):
+    supplier = Supplier(slug=f"s-{uuid.uuid4().hex[:8]}", name="S")
+    db.add(supplier)
+    await db.flush()
+    db.add(SupplierProduct(supplier_id=supplier.id, supplier_product_id="B2", title="Viejo", current_purchase_price=8, current_sale_price=12))
+    job = ImportJob(supplier_id=supplier.id, filename="lista.xlsx", status="DRY_RUN")
+    db.add(job)
+    await db.flush()
+    specs = [
+        ("new", _row("A1", "Bio Grow")),
+        ("changed", _row("B2", "Bio Bloom", delta_compra=2.0, delta_venta=3.0)),
+        ("unchanged", _row("C3", "Igual")),
+        ("error", {"codigo": "", "nombre": ""}),
+        ("duplicate_in_file", _row("A1", "Bio Grow")),
+        ("new", _row("D4", "Sustrato", path="Sustratos")),
+        ("new", _row("E5", "Perlita", path="Sustratos")),
+    ]
+    for i, (status, data) in enumerate(specs):
+        db.add(ImportJobRow(job_id=job.id, row_index=i, status=status, error=None, row_json_normalized=data))
+    await db.commit()
+    return job.id, supplier.id
+
+
+async def _reload(db, job_id):
+    return (await db.execute(
+        select(ImportJob).where(ImportJob.id == job_id).execution_options(populate_existing=True)
+    )).scalar_one()
+
+
+@pytest.mark.asyncio
+async def test_commit_in_chunks_with_checkpoint(db_session, monkeypatch):
+    monkeypatch.setattr(import_commit, "_CHUNK", 2)
+    job_id, supplier_id = await _seed(db_session)
+
+    assert await import_commit.claim(db_session, job_id)
+    import_commit.start(job_id)
+    await import_commit.wait(job_id)
+
+    job = await _reload(db_session, job_id)
+    assert job.status == "COMMITTED"
+    assert import_commit.legacy_result(job) == {
+        "inserted": 3, "updated": 1, "unchanged": 1, "skipped_duplicates": 1, "errors": 1, "price_changes": 1,
+    }
+    prog = import_commit.progress(job)
+    assert prog["processed"] == prog["total"] == 7 and prog["progress"] == 100
+    max_row = (await db_session.execute(select(func.max(ImportJobRow.id)).where(ImportJobRow.job_id == job_id))).scalar()
+    assert job.commit_cursor == max_row
+
+    # Categorías compartidas entre lotes: sin duplicados
+    names = (await db_session.execute(select(Category.name).order_by(Category.id))).scalars().all()
+    assert sorted(names) == ["Base", "Fertilizantes", "Sustratos"]
+    sps = (await db_session.execute(
+        select(SupplierProduct).where(SupplierProduct.supplier_id == supplier_id)
+    )).scalars().all()
+    assert {sp.supplier_product_id for sp in sps} == {"A1", "B2", "D4", "E5"}
+    assert all(sp.internal_product_id for sp in sps)
+    assert (await db_session.execute(select(func.count()).select_from(Product))).scalar() == 4
+    assert (await db_session.execute(select(func.count()).select_from(SupplierPriceHistory))).scalar() == 1
+    # Ya aplicado: no se vuelve a tomar
+    assert not await import_commit.claim(db_session, job_id)
+
+
+@pytest.mark.asyncio
+async def test_failed_chunk_resumes_from_checkpoint(db_session, monkeypatch):
+    monkeypatch.setattr(import_commit, "_CHUNK", 3)
+    job_id, supplier_id = await _seed(db_session)
+    real_apply = import_commit.apply_rows
+    calls = {"n": 0}
+
+    async def _flaky(db, sid, rows, result, cache):
+        calls["n"] += 1
+        await real_apply(db, sid, rows, result, cache)
+        if calls["n"] == 2:
+            raise RuntimeError("conexión perdida")
+
+    monkeypatch.setattr(import_commit, "apply_rows", _flaky)
+    assert await import_commit.claim(db_session, job_id)
+    import_commit.start(job_id)
+    await import_commit.wait(job_id)
+
+    job = await _reload(db_session, job_id)
+    assert job.status == "COMMIT_ERROR"
+    assert "conexión perdida" in job.commit_result["error"]
+    assert job.commit_result["processed"] == 3
+    # El lote fallido se revirtió entero
+    codes = (await db_session.execute(
+        select(SupplierProduct.supplier_product_id).where(SupplierProduct.supplier_id == supplier_id)
+    )).scalars().all()
+    assert sorted(codes) == ["A1", "B2"]
+
+    monkeypatch.setattr(import_commit, "apply_rows", real_apply)
+    assert await import_commit.claim(db_session, job_id)
+    import_commit.start(job_id)
+    await import_commit.wait(job_id)
+    job = await _reload(db_session, job_id)
+    assert job.status == "COMMITTED" and "error" not in job.commit_result
+    assert import_commit.legacy_result(job)["inserted"] == 3
+    assert import_commit.legacy_result(job)["price_changes"] == 1
+
+
+@pytest.mark.asyncio
+async def test_orphaned_commit_is_resumed(db_session, monkeypatch):
+    monkeypatch.setattr(import_commit, "_CHUNK", 50)
+    job_id, _ = await _seed(db_session)
+    old = datetime.utcnow() - timedelta(seconds=import_commit._STALE_S + 5)
+    await db_session.execute(update(ImportJob).where(ImportJob.id == job_id).values(status="COMMITTING", updated_at=old))
+    await db_session.commit()
+
+    assert await import_commit.resume_orphaned() == [job_id]
+    await import_commit.wait(job_id)
+    assert (await _reload(db_session, job_id)).status == "COMMITTED"
+    assert await import_commit.resume_orphaned() == []
+
+
+@pytest.mark.asyncio
+async def test_commit_endpoint_conflict_only_while_committing(db_session, monkeypatch):
+    from httpx import ASGITransport, AsyncClient
+
+    from services.api import app
+    from services.auth import SessionData, current_session, require_csrf
+
+    monkeypatch.setitem(app.dependency_overrides, current_session, lambda: SessionData(None, None, "admin"))
+    monkeypatch.setitem(app.dependency_overrides, require_csrf, lambda: None)
+    job_id, _ = await _seed(db_session)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        await db_session.execute(update(ImportJob).where(ImportJob.id == job_id).values(status="PENDING"))
+        await db_session.commit()
+        r = await client.post(f"/imports/{job_id}/commit")
+        assert r.status_code == 400 and "PENDING" in r.json()["detail"]
+
+        await db_session.execute(
+            update(ImportJob).where(ImportJob.id == job_id).values(status="COMMITTING", updated_at=datetime.utcnow())
+        )
+        await db_session.commit()
+        r = await client.post(f"/imports/{job_id}/commit")
+        assert r.status_code == 409
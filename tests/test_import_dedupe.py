@@ -23,7 +23,7 @@ def test_import_santaplanta_includes_dedupe_meta():
 
     dummy_pdf = b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n1 0 obj<</Type/Catalog>>endobj\ntrailer<>\n%%EOF"
     files = {"file": ("remito_dup.pdf", io.BytesIO(dummy_pdf), "application/pdf")}
-    r = client.post(f"/purchases/import/santaplanta?supplier_id={sup_id}", files=files, headers={"X-CSRF-Token": "x"})
+    r = client.post(f"/purchases/import/santaplanta?supplier_id={sup_id}&wait=1", files=files, headers={"X-CSRF-Token": "x"})
     # En modo de prueba puede devolver 200 con borrador vacío
     assert r.status_code in (200, 409)
     if r.status_code == 200:
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# NG-HEADER: Nombre de archivo: test_job_registry.py
+# NG-HEADER: Ubicación: tests/test_job_registry.py
+# NG-HEADER: Descripción: Pruebas del registro de jobs en background con estado persistido (polling multi-worker)
+# NG-HEADER: Lineamientos: Ver AGENTS.md
+import asyncio
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+
+from db.models import BackgroundJob
+from services import job_registry
+from services.job_registry import JobRegistry
+
+
+@dataclass
+class _Job:
+    id: str
+    status: str = "queued"
+    progress: int = 0
+
+    def to_dict(self):
+        return asdict(self)
+
+
+@pytest.mark.asyncio
+async def test_status_visible_from_another_worker(db_session, monkeypatch):
+    monkeypatch.setattr(job_registry, "_FLUSH_S", 0.05)
+    owner = JobRegistry("test")
+    other = JobRegistry("test")  # otro worker: mismo kind, sin el job en memoria
+    gate = asyncio.Event()
+
+    async def _work(job):
+        job.status, job.progress = "running", 40
+        await gate.wait()
+        job.status, job.progress = "done", 100
+
+    job = _Job("j1")
+    owner.submit(job, _work(job))
+    await asyncio.sleep(0.3)
+    assert other.get("j1") is None
+    assert (await other.status("j1"))["progress"] == 40
+    gate.set()
+    assert (await owner.wait("j1")) is job
+    assert await other.status("j1") == {"id": "j1", "status": "done", "progress": 100}
+    assert await JobRegistry("otro").status("j1") is None
+    assert await other.status("nope") is None
+
+
+@pytest.mark.asyncio
+async def test_job_without_heartbeat_reported_as_error(db_session):
+    owner = JobRegistry("test")
+    job = _Job("j2", status="running")
+
+    async def _work():
+        return None
+
+    owner.submit(job, _work())
+    await owner.wait("j2")
+    # El worker dueño murió con el job a medias
+    old = datetime.utcnow() - timedelta(seconds=job_registry._STALE_S + 5)
+    await db_session.execute(update(BackgroundJob).where(BackgroundJob.id == "j2").values(updated_at=old))
+    await db_session.commit()
+    status = await JobRegistry("test").status("j2")
+    assert status["status"] == "error" and "interrumpido" in status["error"]
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# NG-HEADER: Nombre de archivo: test_logging_pipeline.py
+# NG-HEADER: Ubicación: tests/test_logging_pipeline.py
+# NG-HEADER: Descripción: Pruebas del logging no bloqueante, formato JSON, muestreo y outbox de efectos secundarios
+# NG-HEADER: Lineamientos: Ver AGENTS.md
+import asyncio
+import json
+import logging
+import queue
+import sys
+import threading
+
+import pytest
+
+from services.logging import outbox as outbox_mod
+from services.logging import pipeline
+
+
+class _Capture(logging.Handler):
+    def __init__(self) -> None:
+        super().__init__()
+        self.lines: list[str] = []
+        self.threads: set[str] = set()
+        self.done = threading.Event()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.lines.append(self.format(record))
+        self.threads.add(threading.current_thread().name)
+        self.done.set()
+
+
+def test_queue_handler_formats_off_request_thread(monkeypatch):
+    monkeypatch.setenv("LOG_ASYNC", "1")
+    capture = _Capture()
+    capture.setFormatter(pipeline.JsonFormatter())
+    [queue_handler] = pipeline.install([capture])
+    lg = logging.getLogger("growen.test_pipeline")
+    lg.propagate = False
+    lg.addHandler(queue_handler)
+    try:
+        lg.info("GET %s -> %s", "/products", 200, extra={"http": {"path": "/products", "status": 200}})
+        assert capture.done.wait(2)
+    finally:
+        lg.removeHandler(queue_handler)
+        pipeline.stop()
+    data = json.loads(capture.lines[0])
+    assert data["msg"] == "GET /products -> 200"
+    assert data["http"] == {"path": "/products", "status": 200}
+    assert threading.current_thread().name not in capture.threads
+
+
+def test_prepare_does_not_mutate_shared_record():
+    handler = pipeline._FastQueueHandler(queue.Queue())
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        record = logging.LogRecord("growen.test", logging.ERROR, __file__, 1, "fallo %s", ("x",), sys.exc_info())
+    prepared = handler.prepare(record)
+    assert prepared is not record
+    assert prepared.msg == "fallo x" and prepared.args is None and prepared.exc_info is None
+    assert "ValueError: boom" in prepared.exc_text
+    # Otros handlers del mismo logger siguen viendo args y traza originales
+    assert record.msg == "fallo %s" and record.args == ("x",) and record.exc_info[0] is ValueError
+
+
+def test_sync_mode_keeps_handlers(monkeypatch):
+    monkeypatch.setenv("LOG_ASYNC", "0")
+    capture = _Capture()
+    assert pipeline.install([capture, None]) == [capture]
+
+
+def test_sampling_only_applies_to_noisy_2xx(monkeypatch):
+    monkeypatch.setattr(pipeline, "_SAMPLE_PATHS", ("/auth/me",))
+    monkeypatch.setattr(pipeline, "_SAMPLE_RATE", 0.0)
+    assert not pipeline.should_log_access("/auth/me", 200)
+    assert pipeline.should_log_access("/auth/me", 401)
+    assert pipeline.should_log_access("/products", 200)
+
+
+@pytest.mark.asyncio
+async def test_outbox_is_bounded_and_drains():
+    box = outbox_mod.SideEffectOutbox(maxsize=2)
+    ran: list[int] = []
+    gate = asyncio.Event()
+
+    async def _slow() -> None:
+        await gate.wait()
+        ran.append(0)
+
+    def _job(i: int):
+        async def _run() -> None:
+            ran.append(i)
+        return _run
+
+    assert box.submit(_slow)
+    await asyncio.sleep(0)  # el worker toma _slow y queda esperando
+    assert box.submit(_job(1)) and box.submit(_job(2))
+    assert not box.submit(_job(3))
+    gate.set()
+    await box.drain(timeout=2)
+    assert ran == [0, 1, 2]
+    assert box.stats()["dropped"] == 1 and box.stats()["done"] == 3
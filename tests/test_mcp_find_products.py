@@ -67,3 +67,81 @@ async def test_find_products_by_name_tool_direct(monkeypatch):
     res = await t.find_products_by_name(query="sustrato growmix", user_role="viewer")
     assert res["count"] == 2
     assert any(item["sku"] == "GROWMIX50" for item in res["items"])  # sanity
+
+
+async def test_resolve_product_infos_uses_single_bulk_call(monkeypatch):
+    """Varias llamadas get_product_info del mismo turno se resuelven con un único get_products_info."""
+    provider = OpenAIProvider()
+    calls = []
+
+    async def fake_call(*, tool_name, parameters, user_role="guest"):
+        calls.append((tool_name, parameters))
+        return {
+            "items": [
+                {"product_id": 1, "sku": "AAA_0001_BBB", "name": "Uno"},
+                {"product_id": 2, "sku": "CCC_0002_DDD", "name": "Dos"},
+            ],
+            "not_found": ["ZZZ"],
+            "count": 2,
+        }
+
+    monkeypatch.setattr(provider, "call_mcp_tool", fake_call)
+    out = await provider._resolve_product_infos(
+        [{"product_id": 1, "sku": "AAA_0001_BBB"}, {"sku": " ccc_0002_ddd "}, {"sku": "ZZZ"}], "viewer"
+    )
+    assert calls == [("get_products_info", {"product_ids": [1], "skus": ["ccc_0002_ddd", "ZZZ"]})]
+    assert [o.get("name") for o in out[:2]] == ["Uno", "Dos"]
+    assert out[2] == {"error": "tool_call_failed", "status": 404}
+    # Con un único producto se usa el camino individual
+    calls.clear()
+    await provider._resolve_product_infos([{"sku": "AAA_0001_BBB"}], "viewer")
+    assert [name for name, _ in calls] == ["get_product_info"]
+
+
+async def test_synthetic_product_info_shares_turn_batch(monkeypatch):
+    """La llamada sintética tras una búsqueda única no agrega un viaje propio al MCP."""
+    from types import SimpleNamespace
+    import ai.providers.openai_provider as op
+
+    def _call(call_id, name, args):
+        return SimpleNamespace(id=call_id, function=SimpleNamespace(name=name, arguments=json.dumps(args)))
+
+    tool_calls = [
+        _call("c1", "find_products_by_name", {"query": "sustrato"}),
+        _call("c2", "find_products_by_name", {"query": "maceta"}),
+        _call("c3", "find_products_by_name", {"query": "x"}),
+        _call("c4", "find_products_by_name", {"query": "y"}),
+    ]
+    sent = []
+
+    class FakeCompletions:
+        def create(self, **kwargs):
+            sent.append(kwargs["messages"])
+            message = SimpleNamespace(content=None if len(sent) == 1 else "listo", tool_calls=tool_calls if len(sent) == 1 else None)
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    class FakeOpenAI:
+        def __init__(self, **kwargs):
+            self.chat = SimpleNamespace(completions=FakeCompletions())
+
+    monkeypatch.setattr(op, "OpenAI", FakeOpenAI)
+    provider = OpenAIProvider()
+    provider.api_key = "test"
+    mcp_calls = []
+
+    async def fake_call(*, tool_name, parameters, user_role="guest"):
+        mcp_calls.append(tool_name)
+        if tool_name == "find_products_by_name":
+            return {"items": [{"product_id": 9, "sku": "SUS_0009_AAA", "name": "Sustrato"}], "count": 1}
+        return {"product_id": 9, "sku": "SUS_0009_AAA", "name": "Sustrato", "description": "50L"}
+
+    monkeypatch.setattr(provider, "call_mcp_tool", fake_call)
+    answer = await provider.generate_async("sys\n\nhola", tools_schema=[{"type": "function"}], user_context={"role": "viewer"})
+    assert answer == "listo"
+    # 3 búsquedas (límite) + 1 get_product_info sintético
+    assert mcp_calls == ["find_products_by_name"] * 3 + ["get_product_info"]
+    followup = sent[1]
+    assistant = next(m for m in followup if m["role"] == "assistant")
+    answered = {m["tool_call_id"] for m in followup if m["role"] == "tool"}
+    # Todas las tool calls (incluida la sintética y la que excede el límite) tienen respuesta
+    assert answered == {c["id"] for c in assistant["tool_calls"]} == {"c1", "c2", "c3", "c4", "call_auto_product"}
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# NG-HEADER: Nombre de archivo: test_ocr_pages.py
+# NG-HEADER: Ubicación: tests/test_ocr_pages.py
+# NG-HEADER: Descripción: Pruebas del OCR por página (salteo de capa de texto, caché por imagen, paralelismo)
+# NG-HEADER: Lineamientos: Ver AGENTS.md
+import threading
+import time
+
+import pytest
+
+from services.importers import pdf_extract, santaplanta_pipeline
+from services.ocr import pages
+
+pytest.importorskip("reportlab")
+pytest.importorskip("fitz")
+
+LONG_TEXT = "Remito con capa de texto suficiente para no pasar por OCR " * 3
+
+
+@pytest.fixture
+def caches(tmp_path, monkeypatch):
+    monkeypatch.setenv("PDF_EXTRACT_CACHE_DIR", str(tmp_path / "extract"))
+    monkeypatch.setenv("OCR_PAGE_CACHE_DIR", str(tmp_path / "ocr"))
+    pdf_extract.clear_memory()
+    yield tmp_path
+    pdf_extract.clear_memory()
+
+
+@pytest.fixture
+def tesseract(monkeypatch):
+    state = {"calls": 0, "active": 0, "max_active": 0}
+    lock = threading.Lock()
+
+    def _fake(png, *, lang, timeout):
+        with lock:
+            state["calls"] += 1
+            state["active"] += 1
+            state["max_active"] = max(state["max_active"], state["active"])
+        time.sleep(0.05)
+        with lock:
+            state["active"] -= 1
+        return f"OCR {len(png)}"
+
+    monkeypatch.setattr(pages, "tesseract_png", _fake)
+    return state
+
+
+def _pdf(path, page_texts):
+    from reportlab.pdfgen import canvas
+
+    c = canvas.Canvas(str(path))
+    for i, text in enumerate(page_texts):
+        c.drawString(50, 800, text)
+        # Marca mínima por página para que cada imagen sea distinta
+        c.rect(50 + 20 * i, 700, 10, 10, fill=1)
+        c.showPage()
+    c.save()
+    return path
+
+
+def test_text_layer_pages_are_skipped_and_results_cached(caches, tesseract):
+    pdf = _pdf(caches / "a.pdf", [LONG_TEXT, ""])
+    out = pages.ocr_document(pdf_extract.open_document(pdf), lang="spa", timeout=30)
+    assert out.sources == ["text_layer", "ocr"] and tesseract["calls"] == 1
+    assert out.texts[0].startswith("Remito con capa") and out.texts[1].startswith("OCR ")
+
+    # Re-import (otro nombre, caché de extracción en memoria limpia): OCR gratis
+    copy = caches / "b.pdf"
+    copy.write_bytes(pdf.read_bytes())
+    pdf_extract.clear_memory()
+    again = pages.ocr_document(pdf_extract.open_document(copy), lang="spa", timeout=30)
+    assert again.sources == ["text_layer", "cache"] and again.texts == out.texts
+    assert tesseract["calls"] == 1
+
+    # force: también las páginas con texto; la caché sigue valiendo para la otra
+    forced = pages.ocr_document(pdf_extract.open_document(copy), lang="spa", timeout=30, force=True)
+    assert forced.sources == ["ocr", "cache"] and tesseract["calls"] == 2
+
+
+def test_pages_run_in_parallel(caches, tesseract):
+    pdf = _pdf(caches / "scan.pdf", ["", "", "", ""])
+    out = pages.ocr_document(pdf_extract.open_document(pdf), lang="spa", timeout=30, jobs=4)
+    assert out.count("ocr") == 4 and out.ok
+    assert tesseract["max_active"] > 1
+
+
+def test_failed_pages_are_reported(caches, monkeypatch):
+    def _boom(png, *, lang, timeout):
+        raise RuntimeError("tesseract no instalado")
+
+    monkeypatch.setattr(pages, "tesseract_png", _boom)
+    pdf = _pdf(caches / "scan.pdf", [""])
+    out = pages.ocr_document(pdf_extract.open_document(pdf), lang="spa", timeout=30)
+    assert not out.ok and out.sources == ["failed"]
+    assert "tesseract no instalado" in out.errors[0]
+    assert not list((caches / "ocr").glob("*.txt"))
+
+
+def test_pipeline_uses_ocr_text_for_scanned_pdf(caches, monkeypatch):
+    monkeypatch.setattr(pages, "tesseract_png", lambda png, **kw: "REMITO 0001-00012345  Fecha: 02/09/2025")
+    pdf = _pdf(caches / "escaneado.pdf", [""])
+    res = santaplanta_pipeline.parse_remito(pdf, correlation_id="ocr1")
+    assert res.remito_number == "0001-00012345"
+    attempt = [e for e in res.events if e["event"] == "ocr_attempt"][0]["details"]
+    assert attempt["ok"] and attempt["ocr"] == 1 and attempt["text_layer"] == 0
+    assert "ocr" in res.debug["stage_ms"]
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# NG-HEADER: Nombre de archivo: test_pagination_keyset.py
+# NG-HEADER: Ubicación: tests/test_pagination_keyset.py
+# NG-HEADER: Descripción: Pruebas de paginación keyset (cursor) y totales opcionales en listados
+# NG-HEADER: Lineamientos: Ver AGENTS.md
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+os.environ.setdefault("DB_URL", "sqlite+aiosqlite:///:memory:")
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("AUTH_ENABLED", "true")
+
+from fastapi.testclient import TestClient
+
+from db.models import ChatSession, Customer
+from services.api import app
+from services.auth import SessionData, current_session, require_csrf
+from services.pagination import clear_count_cache
+
+client = TestClient(app)
+app.dependency_overrides[current_session] = lambda: SessionData(None, None, "admin")
+app.dependency_overrides[require_csrf] = lambda: None
+
+
+def _walk(url: str, params: dict) -> list[dict]:
+    items: list[dict] = []
+    cursor = None
+    for _ in range(20):
+        query = dict(params, **({"cursor": cursor} if cursor else {}))
+        r = client.get(url, params=query)
+        assert r.status_code == 200, r.text
+        data = r.json()
+        items.extend(data["items"])
+        cursor = data["next_cursor"]
+        if not cursor:
+            return items
+    raise AssertionError("la paginación por cursor no terminó")
+
+
+@pytest.mark.asyncio
+async def test_customers_cursor_matches_page_mode():
+    from db.session import SessionLocal
+    async with SessionLocal() as s:  # type: ignore
+        # Nombres repetidos: el id desempata el orden
+        for name in ["Ana", "Bruno", "Ana", "Carla", "Bruno", "Dario", "Ana"]:
+            s.add(Customer(name=name))
+        await s.commit()
+
+    by_page = client.get("/customers", params={"page_size": 50}).json()
+    assert by_page["total"] == 7 and by_page["next_cursor"] is None
+
+    walked = _walk("/customers", {"page_size": 2})
+    assert [c["id"] for c in walked] == [c["id"] for c in by_page["items"]]
+    assert [c["name"] for c in walked] == sorted(c["name"] for c in walked)
+
+    # En modo cursor no se cuenta salvo que se pida
+    first = client.get("/customers", params={"page_size": 2}).json()
+    r = client.get("/customers", params={"page_size": 2, "cursor": first["next_cursor"]}).json()
+    assert r["total"] is None
+    r = client.get("/customers", params={"page_size": 2, "cursor": first["next_cursor"], "count": "exact"}).json()
+    assert r["total"] == 7
+
+
+@pytest.mark.asyncio
+async def test_chat_sessions_cursor_handles_null_sort_keys():
+    from db.session import SessionLocal
+    base = datetime(2026, 1, 1)
+    async with SessionLocal() as s:  # type: ignore
+        for i in range(5):
+            s.add(ChatSession(session_id=f"web:pg{i}", user_identifier=f"pg{i}", status="new", last_message_at=base + timedelta(minutes=i % 3)))
+        for i in range(2):
+            s.add(ChatSession(session_id=f"web:nomsg{i}", user_identifier=f"nomsg{i}", status="new", last_message_at=None))
+        await s.commit()
+
+    walked = _walk("/admin/chats", {"page_size": 3})
+    ids = [it["session_id"] for it in walked]
+    assert len(ids) == len(set(ids)) == 7
+    # Sin mensajes primero (NULL como mayor valor), luego más recientes
+    assert ids[:2] == ["web:nomsg1", "web:nomsg0"]
+    stamps = [it["last_message_at"] for it in walked[2:]]
+    assert stamps == sorted(stamps, reverse=True)
+
+
+@pytest.mark.asyncio
+async def test_estimated_total_is_cached():
+    from db.session import SessionLocal
+    clear_count_cache()
+    async with SessionLocal() as s:  # type: ignore
+        s.add(Customer(name="Estimado"))
+        await s.commit()
+        first = client.get("/customers", params={"count": "estimate"}).json()["total"]
+        s.add(Customer(name="Estimado 2"))
+        await s.commit()
+    assert client.get("/customers", params={"count": "estimate"}).json()["total"] == first
+    assert client.get("/customers").json()["total"] == first + 1
+
+
+def test_invalid_cursor_is_rejected():
+    assert client.get("/customers", params={"cursor": "no-es-un-cursor"}).status_code == 400
+    r = client.get("/sales", params={"page_size": 1})
+    assert r.status_code == 200
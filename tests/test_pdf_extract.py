@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+# NG-HEADER: Nombre de archivo: test_pdf_extract.py
+# NG-HEADER: Ubicación: tests/test_pdf_extract.py
+# NG-HEADER: Descripción: Pruebas de la caché de extracción de PDFs por sha256 (texto, tablas, Camelot, imágenes)
+# NG-HEADER: Lineamientos: Ver AGENTS.md
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from services.importers import pdf_extract, santaplanta_pipeline
+
+pytest.importorskip("pdfplumber")
+pytest.importorskip("reportlab")
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("PDF_EXTRACT_CACHE_DIR", str(tmp_path / "cache"))
+    pdf_extract.clear_memory()
+    yield tmp_path / "cache"
+    pdf_extract.clear_memory()
+
+
+def _remito_pdf(path: Path) -> Path:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    c = canvas.Canvas(str(path), pagesize=A4)
+    c.drawString(50, 800, "REMITO 0001-00099596  Fecha: 02/09/2025")
+    # Tabla con bordes: 3 filas x 3 columnas
+    xs, ys = [50, 150, 400, 500], [700, 680, 660, 640]
+    for x in xs:
+        c.line(x, ys[0], x, ys[-1])
+    for y in ys:
+        c.line(xs[0], y, xs[-1], y)
+    rows = [("Codigo", "Producto", "Cant"), ("1234", "Sustrato Growmix 80L", "2"), ("5678", "Perlita 5L", "3")]
+    for (a, b, q), y in zip(rows, ys):
+        c.drawString(55, y - 14, a)
+        c.drawString(155, y - 14, b)
+        c.drawString(405, y - 14, q)
+    c.save()
+    return path
+
+
+def test_single_pass_extraction_is_reused_across_paths(cache_dir, tmp_path, monkeypatch):
+    pdf = _remito_pdf(tmp_path / "a.pdf")
+    doc = pdf_extract.open_document(pdf)
+    assert "REMITO 0001-00099596" in doc.text()
+    assert any(w["text"] == "Perlita" for w in doc.words(0))
+    assert ["5678", "Perlita 5L", "3"] in doc.tables()[0][0]
+    assert (cache_dir / doc.sha256 / "extract.json").exists()
+
+    # Mismo contenido con otro nombre (re-import): no se vuelve a abrir el PDF
+    copy = tmp_path / "b.pdf"
+    copy.write_bytes(pdf.read_bytes())
+    pdf_extract.clear_memory()
+
+    def _boom(path):
+        raise AssertionError("no debería re-extraer")
+
+    monkeypatch.setattr(pdf_extract, "_extract_pages", _boom)
+    again = pdf_extract.open_document(copy)
+    assert again.sha256 == doc.sha256 and again.page_texts() == doc.page_texts()
+
+
+def test_parse_remito_reads_from_cache(cache_dir, tmp_path, monkeypatch):
+    pdf = _remito_pdf(tmp_path / "Remito_00099596.pdf")
+    calls = {"n": 0}
+    real = pdf_extract._extract_pages
+
+    def _count(path):
+        calls["n"] += 1
+        return real(path)
+
+    monkeypatch.setattr(pdf_extract, "_extract_pages", _count)
+    first = santaplanta_pipeline.parse_remito(pdf, correlation_id="c1", use_ocr_auto=False)
+    pdf_extract.clear_memory()
+    second = santaplanta_pipeline.parse_remito(pdf, correlation_id="c2", use_ocr_auto=False)
+    assert calls["n"] == 1
+    assert first.remito_number == second.remito_number == "0001-00099596"
+    assert [(l.supplier_sku, l.title) for l in first.lines or []] == [(l.supplier_sku, l.title) for l in second.lines or []]
+    stats = [e for e in second.events if e["event"] == "text_stats"]
+    assert stats and stats[0]["details"]["pages"] == 1
+
+
+def test_camelot_tables_cached_per_flavor(cache_dir, tmp_path, monkeypatch):
+    pdf = _remito_pdf(tmp_path / "a.pdf")
+    calls = []
+
+    class _Df:
+        def astype(self, _t):
+            return self
+
+        @property
+        def values(self):
+            class _V:
+                def tolist(self_inner):
+                    return [["1234", "Sustrato", "2"]]
+            return _V()
+
+    class _Tbl:
+        df = _Df()
+
+    class _Camelot:
+        @staticmethod
+        def read_pdf(path, flavor, pages, **kw):
+            calls.append(flavor)
+            return [_Tbl()]
+
+    monkeypatch.setattr(pdf_extract, "_camelot", lambda: _Camelot)
+    doc = pdf_extract.open_document(pdf)
+    assert doc.camelot_tables("lattice", line_scale=40) == [[["1234", "Sustrato", "2"]]]
+    assert doc.camelot_tables("lattice", line_scale=40) == [[["1234", "Sustrato", "2"]]]
+    doc.camelot_tables("stream", edge_tol=200)
+    pdf_extract.clear_memory()
+    pdf_extract.open_document(pdf).camelot_tables("stream", edge_tol=200)
+    assert calls == ["lattice", "stream"]
+
+
+def test_page_images_cached_for_vision(cache_dir, tmp_path, monkeypatch):
+    from services.routers import purchases
+
+    pdf = _remito_pdf(tmp_path / "a.pdf")
+    calls = []
+
+    def _render(path, page=0, dpi=150):
+        calls.append((page, dpi))
+        return b"\x89PNG fake"
+
+    monkeypatch.setattr(pdf_extract, "render_page_png", _render)
+    b64 = purchases._pdf_to_base64_image(str(pdf), page=0, dpi=150)
+    pdf_extract.clear_memory()
+    assert purchases._pdf_to_base64_image(str(pdf), page=0, dpi=150) == b64
+    purchases._pdf_to_base64_image(str(pdf), page=0, dpi=200)
+    assert calls == [(0, 150), (0, 200)]
+    assert "REMITO 0001-00099596" in purchases._extract_pdf_text(str(pdf))
+
+
+def test_prune_keeps_most_recent(tmp_path):
+    for i in range(4):
+        d = tmp_path / f"sha{i}"
+        d.mkdir()
+        os.utime(d, (time.time() - 100 + i, time.time() - 100 + i))
+    assert pdf_extract.prune(tmp_path, keep=2) == 2
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["sha2", "sha3"]
@@ -0,0 +1,297 @@
+#!/usr/bin/env python
+# NG-HEADER: Nombre de archivo: test_pop_mailbox.py
+# NG-HEADER: Ubicación: tests/test_pop_mailbox.py
+# NG-HEADER: Descripción: Pruebas de la ingesta incremental de emails de POP contra servidores POP3/IMAP locales
+# NG-HEADER: Lineamientos: Ver AGENTS.md
+import io
+import re
+import socketserver
+import threading
+import time
+from email.message import EmailMessage
+
+import pytest
+from sqlalchemy import select
+
+from db.models import Purchase, PurchaseAttachment, PurchaseLine, Supplier, SupplierMailMessage
+from services.importers import pop_mailbox
+from services.importers.pop_email import parse_pop_email, parse_pop_eml_stream
+from services.importers.pop_mailbox import MailboxConfig, ingest_mailbox
+
+PDF = b"%PDF-1.4\n" + bytes(range(256)) * 1200
+
+
+def _html(pedido: int, items: list[tuple[str, int, str]]) -> str:
+    rows = "".join(f"<tr><td>{t}</td><td>{q}</td><td>${p}</td></tr>" for t, q, p in items)
+    return (
+        f"<html><body><h1>Pedido {pedido} Completado</h1><table>"
+        "<tr><th>Producto</th><th>Cantidad</th><th>Precio</th></tr>"
+        f"{rows}</table></body></html>"
+    )
+
+
+def _eml(pedido: int, msgid: str, sender: str = "ventas@pop.com.ar", attachment: bool = True) -> bytes:
+    m = EmailMessage()
+    m["Subject"] = f"Pedido {pedido} Completado"
+    m["From"] = sender
+    m["Date"] = "Tue, 02 Sep 2025 10:00:00 -0300"
+    m["Message-ID"] = msgid
+    m.set_content(f"Pedido {pedido}\n.linea con punto inicial\n")
+    m.add_alternative(_html(pedido, [("Maceta 12cm Negra", 2, "1.500,00"), ("Sustrato Premium 5L", 1, "2.000,00")]), subtype="html")
+    if attachment:
+        m.add_attachment(PDF, maintype="application", subtype="pdf", filename="remito.pdf")
+    return m.as_bytes().replace(b"\r\n", b"\n").replace(b"\n", b"\r\n")
+
+
+class _Mailbox:
+    """Mensajes compartidos por los servidores falsos + registro de comandos."""
+
+    def __init__(self, messages: dict[str, bytes]):
+        self.messages = dict(messages)
+        self.log: list[str] = []
+
+    def header_block(self, uid: str, fields: tuple[str, ...] | None = None) -> bytes:
+        head = self.messages[uid].split(b"\r\n\r\n", 1)[0] + b"\r\n"
+        if fields is None:
+            return head
+        keep = [ln for ln in re.split(rb"\r\n(?![ \t])", head) if ln.split(b":", 1)[0].decode().upper() in fields]
+        return b"\r\n".join(keep) + b"\r\n\r\n"
+
+
+class _Pop3Handler(socketserver.StreamRequestHandler):
+    def _send(self, data: bytes) -> None:
+        self.wfile.write(data)
+
+    def _multi(self, body: bytes) -> None:
+        lines = body.split(b"\r\n")
+        if lines and lines[-1] == b"":
+            lines.pop()
+        self._send(b"+OK\r\n" + b"".join((b"." + ln if ln.startswith(b".") else ln) + b"\r\n" for ln in lines) + b".\r\n")
+
+    def handle(self) -> None:
+        box: _Mailbox = self.server.box  # type: ignore[attr-defined]
+        uids = list(box.messages)
+        self._send(b"+OK POP3 listo\r\n")
+        for raw in self.rfile:
+            cmd, *args = raw.decode().strip().split()
+            cmd = cmd.upper()
+            box.log.append(" ".join([cmd, *args]))
+            if cmd in ("USER", "PASS"):
+                self._send(b"+OK\r\n")
+            elif cmd == "UIDL":
+                self._multi(b"".join(f"{i} {u}\r\n".encode() for i, u in enumerate(uids, 1)))
+            elif cmd == "LIST":
+                self._multi(b"".join(f"{i} {len(box.messages[u])}\r\n".encode() for i, u in enumerate(uids, 1)))
+            elif cmd == "TOP":
+                self._multi(box.header_block(uids[int(args[0]) - 1]))
+            elif cmd == "RETR":
+                self._multi(box.messages[uids[int(args[0]) - 1]])
+            elif cmd == "QUIT":
+                self._send(b"+OK adios\r\n")
+                return
+            else:
+                self._send(b"-ERR comando\r\n")
+
+
+class _ImapHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        box: _Mailbox = self.server.box  # type: ignore[attr-defined]
+        uids = list(box.messages)
+        self.wfile.write(b"* OK IMAP4rev1 listo\r\n")
+        for raw in self.rfile:
+            tag, cmd, rest = (raw.decode().strip().split(" ", 2) + [""])[:3]
+            cmd = cmd.upper()
+            box.log.append(f"{cmd} {rest}".strip())
+            out = b""
+            if cmd == "CAPABILITY":
+                out = b"* CAPABILITY IMAP4rev1\r\n"
+            elif cmd == "EXAMINE":
+                out = f"* {len(uids)} EXISTS\r\n* OK [UIDVALIDITY 7] ok\r\n".encode()
+            elif cmd == "UID" and rest.upper().startswith("SEARCH"):
+                out = ("* SEARCH " + " ".join(uids) + "\r\n").encode()
+            elif cmd == "UID" and rest.upper().startswith("FETCH"):
+                _, uid_set, spec = rest.split(" ", 2)
+                for uid in uid_set.split(","):
+                    seq = uids.index(uid) + 1
+                    msg = box.messages[uid]
+                    part = re.search(r"BODY\.PEEK\[\]<(\d+)\.(\d+)>", spec)
+                    if part:
+                        off, n = int(part.group(1)), int(part.group(2))
+                        data, item = msg[off:off + n], f"BODY[]<{off}>"
+                    else:
+                        data = box.header_block(uid, ("MESSAGE-ID", "FROM", "SUBJECT"))
+                        item = f"RFC822.SIZE {len(msg)} BODY[HEADER.FIELDS (MESSAGE-ID FROM SUBJECT)]"
+                    out += f"* {seq} FETCH (UID {uid} {item} {{{len(data)}}}\r\n".encode() + data + b")\r\n"
+            elif cmd == "LOGOUT":
+                self.wfile.write(b"* BYE\r\n" + f"{tag} OK listo\r\n".encode())
+                return
+            self.wfile.write(out + f"{tag} OK listo\r\n".encode())
+
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def _start(handler, box: _Mailbox) -> int:
+        srv = socketserver.ThreadingTCPServer(("127.0.0.1", 0), handler)
+        srv.daemon_threads = True
+        srv.box = box  # type: ignore[attr-defined]
+        threading.Thread(target=srv.serve_forever, daemon=True).start()
+        servers.append(srv)
+        return srv.server_address[1]
+
+    yield _start
+    for srv in servers:
+        srv.shutdown()
+        srv.server_close()
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    # Los adjuntos de compras van a data/purchases relativo al cwd
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("POP_MAIL_SPOOL_DIR", str(tmp_path / "spool"))
+    return tmp_path
+
+
+async def _supplier(db) -> int:
+    s = Supplier(slug="pop", name="POP")
+    db.add(s)
+    await db.commit()
+    return s.id
+
+
+def test_stream_parser_matches_in_memory_and_spills_attachments(tmp_path):
+    raw = _eml(488344, "<a@pop>")
+    parsed = parse_pop_eml_stream(io.BytesIO(raw), tmp_path / "att")
+    assert parsed.remito_number == "488344" and parsed.message_id == "<a@pop>"
+    assert [(ln.title, ln.qty) for ln in parsed.lines] == [(ln.title, ln.qty) for ln in parse_pop_email(raw).lines]
+    assert len(parsed.lines) == 2
+    (att,) = parsed.attachments
+    assert att["filename"] == "remito.pdf" and att["size"] == len(PDF)
+    assert (tmp_path / "att").joinpath(att["path"].rsplit("/", 1)[-1]).read_bytes() == PDF
+    # Sin directorio de adjuntos no se escribe nada
+    assert parse_pop_eml_stream(io.BytesIO(raw)).attachments == []
+
+
+@pytest.mark.asyncio
+async def test_imap_ingest_is_incremental(db_session, serve, workdir, monkeypatch):
+    monkeypatch.setattr(pop_mailbox, "_FETCH_CHUNK", 64 * 1024)
+    box = _Mailbox({
+        "11": _eml(1001, "<m1@pop>"),
+        "12": _eml(1002, "<m2@pop>"),
+        "13": _eml(1003, "<spam@otro>", sender="promo@otro.com"),
+        "14": _eml(1001, "<m1@pop>"),  # mismo mail copiado en la carpeta
+    })
+    cfg = MailboxConfig("imap", "127.0.0.1", serve(_ImapHandler, box), "u", "p", ssl=False, sender="@pop.com.ar")
+    supplier_id = await _supplier(db_session)
+
+    stats = await ingest_mailbox(db_session, supplier_id, cfg)
+    assert stats == {"mailbox": "imap://u@127.0.0.1/INBOX;UIDVALIDITY=7", "seen": 4, "new": 4, "imported": 2, "duplicates": 0, "skipped": 2, "errors": 0}
+    # Sólo se bajan los cuerpos de los mensajes a importar, en trozos
+    body_fetches = [c for c in box.log if "BODY.PEEK[]<" in c]
+    assert {c.split()[2] for c in body_fetches} == {"11", "12"}
+    assert len(body_fetches) > 2
+
+    purchases = (await db_session.scalars(select(Purchase).order_by(Purchase.remito_number))).all()
+    assert [p.remito_number for p in purchases] == ["1001", "1002"]
+    lines = (await db_session.scalars(select(PurchaseLine).where(PurchaseLine.purchase_id == purchases[0].id))).all()
+    assert sorted(ln.title for ln in lines) == ["Maceta 12cm Negra", "Sustrato Premium 5L"]
+    atts = (await db_session.scalars(select(PurchaseAttachment).where(PurchaseAttachment.purchase_id == purchases[0].id))).all()
+    assert sorted(a.mime for a in atts) == ["application/pdf", "message/rfc822"]
+    pdf = next(a for a in atts if a.mime == "application/pdf")
+    assert (workdir / pdf.path).read_bytes() == PDF
+    assert not any((workdir / "spool").rglob("*.eml"))
+
+    # Segunda corrida: nada nuevo, ni headers ni cuerpos
+    box.log.clear()
+    again = await ingest_mailbox(db_session, supplier_id, cfg)
+    assert again["new"] == 0 and again["imported"] == 0
+    assert not [c for c in box.log if c.startswith("UID FETCH")]
+
+    # Llega un mensaje nuevo: sólo ése se procesa
+    box.messages["15"] = _eml(1004, "<m4@pop>", attachment=False)
+    third = await ingest_mailbox(db_session, supplier_id, cfg)
+    assert (third["new"], third["imported"]) == (1, 1)
+    rows = (await db_session.scalars(select(SupplierMailMessage).order_by(SupplierMailMessage.uid))).all()
+    assert [(r.uid, r.status) for r in rows] == [("11", "done"), ("12", "done"), ("13", "skipped"), ("14", "skipped"), ("15", "done")]
+
+
+@pytest.mark.asyncio
+async def test_pop3_ingest_parses_concurrently_and_retries_errors(db_session, serve, workdir, monkeypatch):
+    box = _Mailbox({f"uid-{i}": _eml(2000 + i, f"<p{i}@pop>", attachment=i == 0) for i in range(4)})
+    cfg = MailboxConfig("pop3", "127.0.0.1", serve(_Pop3Handler, box), "u", "p", ssl=False)
+    supplier_id = await _supplier(db_session)
+
+    state = {"active": 0, "max": 0}
+    lock = threading.Lock()
+    parse = pop_mailbox._parse_spooled
+
+    def _slow_parse(path, attachments_dir):
+        with lock:
+            state["active"] += 1
+            state["max"] = max(state["max"], state["active"])
+        time.sleep(0.05)
+        with lock:
+            state["active"] -= 1
+        return parse(path, attachments_dir)
+
+    monkeypatch.setattr(pop_mailbox, "_parse_spooled", _slow_parse)
+    create = pop_mailbox.create_pop_purchase
+
+    async def _flaky(db, supplier_id, parsed, **kw):
+        if parsed.remito_number == "2002":
+            raise RuntimeError("falla transitoria")
+        return await create(db, supplier_id, parsed, **kw)
+
+    monkeypatch.setattr(pop_mailbox, "create_pop_purchase", _flaky)
+    stats = await ingest_mailbox(db_session, supplier_id, cfg, concurrency=3)
+    assert (stats["imported"], stats["errors"]) == (3, 1)
+    assert state["max"] > 1
+    # TOP sólo para los nuevos y un RETR por mensaje (con dot-stuffing deshecho)
+    assert sum(c.startswith("RETR") for c in box.log) == 4
+    first = await db_session.scalar(select(Purchase).where(Purchase.remito_number == "2000"))
+    eml = await db_session.scalar(select(PurchaseAttachment).where(PurchaseAttachment.purchase_id == first.id, PurchaseAttachment.mime == "message/rfc822"))
+    assert (workdir / eml.path).read_bytes() == box.messages["uid-0"]
+
+    # La corrida siguiente reintenta sólo el que falló
+    monkeypatch.setattr(pop_mailbox, "create_pop_purchase", create)
+    box.log.clear()
+    retry = await ingest_mailbox(db_session, supplier_id, cfg)
+    assert (retry["new"], retry["imported"], retry["errors"]) == (1, 1, 0)
+    assert [c for c in box.log if c.startswith("RETR")] == ["RETR 3"]
+    row = await db_session.scalar(select(SupplierMailMessage).where(SupplierMailMessage.uid == "uid-2"))
+    assert row.status == "done" and row.attempts == 2 and row.purchase_id is not None
+
+
+@pytest.mark.asyncio
+async def test_mailbox_endpoint_runs_as_background_job(db_session, serve, workdir, monkeypatch):
+    from httpx import ASGITransport, AsyncClient
+
+    from services.api import app
+    from services.auth import SessionData, current_session, require_csrf
+
+    box = _Mailbox({"uid-1": _eml(3001, "<j1@pop>", attachment=False)})
+    monkeypatch.setenv("POP_MAIL_HOST", "127.0.0.1")
+    monkeypatch.setenv("POP_MAIL_PROTOCOL", "pop3")
+    monkeypatch.setenv("POP_MAIL_SSL", "0")
+    monkeypatch.setenv("POP_MAIL_PORT", str(serve(_Pop3Handler, box)))
+    supplier_id = await _supplier(db_session)
+    app.dependency_overrides[current_session] = lambda: SessionData(None, None, "admin")
+    app.dependency_overrides[require_csrf] = lambda: None
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            r = await client.post("/purchases/import/pop-mailbox", params={"supplier_id": supplier_id})
+            assert r.status_code == 202
+            job_id = r.json()["job_id"]
+            await pop_mailbox.wait(job_id)
+            st = (await client.get(f"/purchases/import/pop-mailbox/jobs/{job_id}")).json()
+            assert st["status"] == "done" and st["stats"]["imported"] == 1
+            # Otro worker (sin el job en memoria) lee el estado persistido
+            pop_mailbox._REGISTRY._jobs.pop(job_id)
+            st = (await client.get(f"/purchases/import/pop-mailbox/jobs/{job_id}")).json()
+            assert st["status"] == "done" and st["stats"]["imported"] == 1
+            assert (await client.get("/purchases/import/pop-mailbox/jobs/nope")).status_code == 404
+    finally:
+        app.dependency_overrides.pop(current_session, None)
+        app.dependency_overrides.pop(require_csrf, None)
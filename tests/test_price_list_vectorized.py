@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# NG-HEADER: Nombre de archivo: test_price_list_vectorized.py
+# NG-HEADER: Ubicación: tests/test_price_list_vectorized.py
+# NG-HEADER: Descripción: Pruebas del parseo/clasificación vectorizada de listas de precios
+# NG-HEADER: Lineamientos: Ver AGENTS.md
+from io import BytesIO
+
+import pandas as pd
+from openpyxl import Workbook
+
+from services.ingest import loader, normalize, validate
+from services.suppliers import price_list
+from services.suppliers.parsers import GenericExcelParser, suggest_canonicals, suggest_canonicals_bulk
+
+CFG = {
+    "file_type": "xlsx",
+    "sheet_name": 0,
+    "header_row": 0,
+    "columns": {
+        "supplier_product_id": ["ID"],
+        "title": ["Producto"],
+        "category_level_1": ["Agrupamiento"],
+        "category_level_2": ["Familia"],
+        "category_level_3": ["SubFamilia"],
+        "min_purchase_qty": ["Compra Minima"],
+        "purchase_price": ["PrecioDeCompra"],
+        "sale_price": ["PrecioDeVenta"],
+    },
+    "transform": {"purchase_price": {"replace_comma_decimal": True}, "sale_price": {"replace_comma_decimal": True}},
+    "defaults": {"min_qty": 1},
+}
+
+
+def _xlsx(rows) -> bytes:
+    wb = Workbook()
+    ws = wb.active
+    ws.append(["ID", "Producto", "Agrupamiento", "Familia", "SubFamilia", "Compra Minima", "PrecioDeCompra", "PrecioDeVenta"])
+    for r in rows:
+        ws.append(r)
+    buf = BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+def test_parse_decimal_local_formats():
+    s = pd.Series(["10,50", "1.234,56", "$ 1.234", "10.5", None, "abc", 12.0], dtype=object)
+    out = normalize.parse_decimal(s).tolist()
+    assert out[:4] == [10.5, 1234.56, 1234.0, 10.5]
+    assert pd.isna(out[4]) and pd.isna(out[5]) and out[6] == 12.0
+
+
+def test_validate_frame_matches_validate_row():
+    df = pd.DataFrame({
+        "supplier_product_id": ["a", "", None, "b", "c"],
+        "title": ["x", "y", "z", "", "w"],
+        "purchase_price": [1, 1, 2, 3, -1],
+    })
+    expected = [validate.validate_row(r)[1] for r in df.to_dict("records")]
+    expected[2] = "supplier_product_id requerido"  # None también es faltante en validate_row
+    assert validate.validate_frame(df).tolist() == expected
+
+
+def test_parse_frame_columns_and_errors():
+    parser = GenericExcelParser(slug="t", config=CFG)
+    df = parser.parse_frame(_xlsx([
+        [1, "Bio Grow", "Fert", None, "Base", 2, "10,5", 20],
+        [None, "Sin código", "Fert", "X", None, None, 5, 6],
+        ["C3", "  Perlita ", None, None, None, "3", "0", 5],
+        [4, "Mix", "A", "B", "C", None, "1.234,56", "1.500"],
+    ]))
+    assert df["codigo"].tolist() == ["1", "", "C3", "4"]
+    assert df["categoria_path"].tolist() == ["Fert > Base", "Fert > X", "", "A > B > C"]
+    assert df["compra_minima"].tolist() == [2, 1, 3, 1]
+    assert df.loc[3, ["precio_compra", "precio_venta"]].tolist() == [1234.56, 1500.0]
+    assert df["status"].tolist() == ["ok", "error", "error", "ok"]
+    assert df["error_msg"].tolist() == [None, "codigo/nombre vacío", "precio_compra/venta <= 0", None]
+    assert parser.parse_bytes(_xlsx([[1, "Bio Grow", "Fert", None, None, 1, 10, 20]]))[0]["nombre"] == "Bio Grow"
+
+
+def test_numeric_excel_cells_keep_their_decimals():
+    # Celdas float reales: 0.125 / 1.234 no son grupos de miles (sólo el texto lo es)
+    parser = GenericExcelParser(slug="t", config=CFG)
+    df = parser.parse_frame(_xlsx([
+        [1, "A", None, None, None, 1, 0.125, 1.234],
+        [2, "B", None, None, None, 1, "1.234", 1234.5],
+    ]))
+    assert df.loc[0, ["precio_compra", "precio_venta"]].tolist() == [0.125, 1.234]
+    assert df.loc[1, ["precio_compra", "precio_venta"]].tolist() == [1234.0, 1234.5]
+    mixed = pd.Series([0.125, "0,125", 1.234, "1.234"], dtype=object)
+    assert normalize.parse_decimal(mixed).tolist() == [0.125, 0.125, 1.234, 1234.0]
+
+
+def test_openpyxl_fallback_matches_fast_reader(monkeypatch):
+    data = _xlsx([[1, "A", "X", "Y", "Z", 1, "10,5", 20], [2, "B", None, None, None, None, 3, 4]])
+    fast = loader.read_excel(data)
+    monkeypatch.setattr(loader, "EXCEL_ENGINE", "openpyxl")
+    slow = loader.read_excel(data)
+    assert list(fast.columns) == list(slow.columns)
+    assert fast.astype(str).replace("nan", "None").values.tolist() == slow.astype(str).replace("nan", "None").values.tolist()
+
+
+def test_classify_rows_dedupe_and_deltas(monkeypatch):
+    monkeypatch.setattr(price_list, "AUTO_CREATE_CANONICAL", True)
+    parsed = pd.DataFrame([
+        {"codigo": "E1", "nombre": "Err", "precio_compra": 0, "precio_venta": 0, "status": "error", "error_msg": "precio_compra/venta <= 0"},
+        {"codigo": "E1", "nombre": "Bio Grow 1L", "precio_compra": 10, "precio_venta": 20, "status": "ok", "error_msg": None},
+        {"codigo": "E1", "nombre": "Bio Grow 1L", "precio_compra": 10, "precio_venta": 20, "status": "ok", "error_msg": None},
+        {"codigo": "S2", "nombre": "Perlita", "precio_compra": 12, "precio_venta": 25, "status": "ok", "error_msg": None},
+        {"codigo": "S3", "nombre": "Turba", "precio_compra": 5, "precio_venta": 9, "status": "ok", "error_msg": None},
+        {"codigo": "S4", "nombre": "Vermiculita", "precio_compra": 3, "precio_venta": 6, "status": "ok", "error_msg": None},
+    ])
+    existing = pd.DataFrame(
+        [("S2", 10.0, 20.0), ("S3", 5.0, 9.0), ("S4", None, None)], columns=["codigo", "prev_compra", "prev_venta"]
+    )
+    rows, kpis = price_list.classify_rows(parsed, existing, {7: "Bio Grow 1 L"})
+
+    assert [r["status"] for r in rows] == ["error", "new", "duplicate_in_file", "changed", "unchanged", "changed"]
+    assert rows[2]["error"] == "Código duplicado en archivo"
+    changed = rows[3]["row_json_normalized"]
+    assert (changed["delta_compra"], changed["delta_venta"], changed["delta_pct"]) == (2.0, 5.0, 25.0)
+    assert rows[5]["row_json_normalized"]["delta_pct"] is None
+    assert "delta_compra" not in rows[1]["row_json_normalized"]
+    assert rows[1]["row_json_normalized"]["canonical_suggestions"][0]["id"] == 7
+    assert rows[3]["row_json_normalized"]["auto_create_canonical"] is True
+    assert "canonical_suggestions" not in rows[0]["row_json_normalized"]
+    assert kpis == {"total": 6, "errors": 1, "duplicates_in_file": 1, "unchanged": 1, "new": 1, "changed": 2}
+
+
+def test_bulk_suggestions_match_single():
+    choices = {i: name for i, name in enumerate(["Bio Grow 1L", "Bio Bloom 1L", "Top Veg", "Perlita 5L", "Bio Grow 500ml"])}
+    names = ["Bio Grow 1 L", "perlita 5 l", "Top Veg", "nada parecido", "Bio Grow 1 L"]
+    assert suggest_canonicals_bulk(names, choices) == [suggest_canonicals(n, choices) for n in names]
+    assert suggest_canonicals_bulk(names, {}) == [[] for _ in names]
@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# NG-HEADER: Nombre de archivo: test_purchase_aggregates.py
+# NG-HEADER: Ubicación: tests/test_purchase_aggregates.py
+# NG-HEADER: Descripción: Pruebas de los agregados por compra (líneas, sin vincular, totales, actividad)
+# NG-HEADER: Lineamientos: Ver AGENTS.md
+import subprocess
+import sys
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from db.models import Purchase, PurchaseLine, Supplier
+from services.api import app
+from services.auth import SessionData, current_session, require_csrf
+from services.purchases.aggregates import refresh_purchase_aggregates
+
+app.dependency_overrides[current_session] = lambda: SessionData(None, None, "admin")
+app.dependency_overrides[require_csrf] = lambda: None
+
+
+async def _purchase(db, remito="R-AGG-1") -> int:
+    s = Supplier(slug=f"sp-{remito.lower()}", name="Proveedor Agregados")
+    db.add(s)
+    await db.flush()
+    p = Purchase(supplier_id=s.id, remito_number=remito, remito_date=date(2025, 9, 1), vat_rate=21)
+    db.add(p)
+    await db.commit()
+    return p.id
+
+
+def _row(items, pid):
+    return next(it for it in items if it["id"] == pid)
+
+
+@pytest.mark.asyncio
+async def test_aggregates_follow_update_validate_and_cancel(db_session):
+    pid = await _purchase(db_session)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        row = _row((await client.get("/purchases")).json()["items"], pid)
+        assert (row["lines_count"], row["unmatched_count"], row["total"]) == (0, 0, 0)
+        created_activity = row["last_activity_at"]
+        assert created_activity
+
+        r = await client.put(f"/purchases/{pid}", json={"lines": [
+            {"title": "Sustrato 50L", "supplier_sku": "NO-EXISTE", "qty": 2, "unit_cost": 100, "line_discount": 10},
+            {"title": "Maceta", "qty": 3, "unit_cost": 10.55},
+        ]})
+        assert r.status_code == 200, r.text
+        row = _row((await client.get("/purchases")).json()["items"], pid)
+        # 2*100*0.9 + 3*10.55 = 211.65 ; IVA 21% = 44.45
+        assert (row["lines_count"], row["subtotal"], row["total"]) == (2, 211.65, 256.10)
+        assert row["last_activity_at"] >= created_activity
+
+        r = await client.post(f"/purchases/{pid}/validate")
+        assert r.json()["unmatched"] == 2
+        row = _row((await client.get("/purchases", params={"status": "BORRADOR"})).json()["items"], pid)
+        assert row["unmatched_count"] == 2
+
+        detail = (await client.get(f"/purchases/{pid}")).json()
+        assert detail["totals"] == {"subtotal": 211.65, "iva": 44.45, "total": 256.10}
+        assert detail["lines_count"] == 2 and detail["unmatched_count"] == 2
+
+        # Borrar una línea y cambiar IVA en el mismo PUT
+        first = min(ln["id"] for ln in detail["lines"])
+        r = await client.put(f"/purchases/{pid}", json={"vat_rate": 10.5, "lines": [{"id": first, "op": "delete"}]})
+        assert r.status_code == 200
+        detail = (await client.get(f"/purchases/{pid}")).json()
+        assert detail["lines_count"] == 1 and detail["unmatched_count"] == 1
+        assert detail["totals"] == {"subtotal": 31.65, "iva": 3.32, "total": 34.97}
+
+        r = await client.post(f"/purchases/{pid}/cancel", json={"note": "error de carga"})
+        assert r.status_code == 200
+        row = _row((await client.get("/purchases", params={"status": "ANULADA"})).json()["items"], pid)
+        assert (row["lines_count"], row["total"]) == (1, 34.97)
+        assert row["last_activity_at"] >= detail["last_activity_at"]
+
+
+@pytest.mark.asyncio
+async def test_aggregates_are_transactional_and_follow_moved_lines(db_session):
+    a = await _purchase(db_session, "R-AGG-A")
+    b = await _purchase(db_session, "R-AGG-B")
+    line = PurchaseLine(purchase_id=a, title="X", qty=Decimal("1"), unit_cost=Decimal("5"), state="SIN_VINCULAR")
+    db_session.add(line)
+    await db_session.commit()
+    line_id = line.id
+    pa = await db_session.get(Purchase, a)
+    assert (pa.lines_count, pa.unmatched_count, pa.subtotal) == (1, 1, Decimal("5.00"))
+
+    # Rollback: el agregado escrito en el flush se descarta junto con la línea
+    db_session.add(PurchaseLine(purchase_id=a, title="Y", qty=Decimal("1"), unit_cost=Decimal("7")))
+    await db_session.flush()
+    assert pa.lines_count == 2
+    await db_session.rollback()
+    pa = await db_session.get(Purchase, a)
+    assert pa.lines_count == 1
+
+    # Mover la línea de compra actualiza origen y destino
+    line = await db_session.get(PurchaseLine, line_id)
+    line.purchase_id = b
+    await db_session.commit()
+    pa, pb = await db_session.get(Purchase, a), await db_session.get(Purchase, b)
+    assert (pa.lines_count, pb.lines_count, pb.total) == (0, 1, Decimal("6.05"))
+
+    # Recálculo explícito (tras escrituras Core) es idempotente
+    await refresh_purchase_aggregates(db_session, [a, b])
+    await db_session.commit()
+    assert (pa.lines_count, pb.lines_count, pb.unmatched_count) == (0, 1, 1)
+
+
+@pytest.mark.asyncio
+async def test_detail_iva_is_computed_from_lines(db_session):
+    pid = await _purchase(db_session, "R-AGG-IVA")
+    # Subtotal 0.125: con IVA 21% el IVA real es 0.03 (total - subtotal redondeado daría 0.04)
+    db_session.add(PurchaseLine(purchase_id=pid, title="Z", qty=Decimal("1"), unit_cost=Decimal("1"), line_discount=Decimal("87.5")))
+    await db_session.commit()
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        detail = (await client.get(f"/purchases/{pid}")).json()
+    assert detail["totals"] == {"subtotal": 0.125, "iva": 0.03, "total": 0.16}
+
+
+def test_listener_registered_by_models_import_alone():
+    code = (
+        "import sys\n"
+        "from sqlalchemy import event\n"
+        "from sqlalchemy.orm import Session\n"
+        "import db.models\n"
+        "from db import purchase_aggregates as pa\n"
+        "assert event.contains(Session, 'after_flush', pa._refresh_on_flush)\n"
+        "assert 'services.purchases.aggregates' not in sys.modules\n"
+    )
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, timeout=120)
+    assert out.returncode == 0, out.stderr
@@ -29,7 +29,7 @@ def _create_draft_with_pdf(supplier_id: int):
     os.environ["IMPORT_ALLOW_EMPTY_DRAFT"] = "true"
     dummy_pdf = b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n1 0 obj<</Type/Catalog>>endobj\ntrailer<>\n%%EOF"
     files = {"file": ("remito_test.pdf", io.BytesIO(dummy_pdf), "application/pdf")}
-    r = client.post(f"/purchases/import/santaplanta?supplier_id={supplier_id}", files=files)
+    r = client.post(f"/purchases/import/santaplanta?supplier_id={supplier_id}&wait=1", files=files)
     assert r.status_code == 200
     assert r.json()["status"] == "BORRADOR"
     return r.json()["purchase_id"]
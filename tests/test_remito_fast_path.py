@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# NG-HEADER: Nombre de archivo: test_remito_fast_path.py
+# NG-HEADER: Ubicación: tests/test_remito_fast_path.py
+# NG-HEADER: Descripción: Pruebas del parser de remitos por etapas (salida temprana y perfil de layout por proveedor)
+# NG-HEADER: Lineamientos: Ver AGENTS.md
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+
+from db.models import Supplier
+from services.importers import pdf_extract, santaplanta_pipeline
+from services.importers.santaplanta_pipeline import ParsedLine, lines_sufficient, parse_remito
+
+pytest.importorskip("reportlab")
+
+
+@pytest.fixture
+def pdf(tmp_path, monkeypatch):
+    from reportlab.pdfgen import canvas
+
+    monkeypatch.setenv("PDF_EXTRACT_CACHE_DIR", str(tmp_path / "cache"))
+    pdf_extract.clear_memory()
+    path = tmp_path / "Remito_00099596.pdf"
+    c = canvas.Canvas(str(path))
+    c.drawString(50, 800, "REMITO 0001-00099596  Fecha: 02/09/2025")
+    c.save()
+    yield path
+    pdf_extract.clear_memory()
+
+
+def _lines(n):
+    return [ParsedLine(supplier_sku=f"{1000 + i}", title=f"Producto {i}", qty=Decimal(1), unit_cost_bonif=Decimal(10), subtotal=Decimal(10)) for i in range(n)]
+
+
+@pytest.fixture
+def stages(monkeypatch):
+    """Reemplaza las etapas por fakes que registran qué corrió."""
+    calls = []
+    outputs = {name: [] for name in santaplanta_pipeline.STAGE_NAMES}
+
+    def _fake(name):
+        def _stage(doc, text, exp, dbg, ev):
+            calls.append(name)
+            return outputs[name]
+        return _stage
+
+    monkeypatch.setattr(santaplanta_pipeline, "_STAGES", {name: _fake(name) for name in santaplanta_pipeline.STAGE_NAMES})
+    monkeypatch.setattr(santaplanta_pipeline, "_extract_expected_counts_and_totals", lambda text: {"expected_items": 3})
+    return SimpleNamespace(calls=calls, outputs=outputs)
+
+
+def test_lines_sufficient_uses_footer_then_confidence():
+    assert lines_sufficient(_lines(3), 3, None)
+    assert not lines_sufficient(_lines(2), 3, Decimal("20"))
+    assert lines_sufficient(_lines(2), None, Decimal("20.05"))
+    assert not lines_sufficient(_lines(2), None, Decimal("25"))
+    assert not lines_sufficient([], None, None)
+
+
+def test_pdfplumber_match_skips_camelot_and_multiline(pdf, stages):
+    stages.outputs["plumber"] = _lines(3)
+    stages.outputs["camelot-lattice"] = _lines(5)
+    res = parse_remito(pdf, correlation_id="fp1", use_ocr_auto=False)
+    assert stages.calls == ["plumber"]
+    assert len(res.lines) == 3
+    assert res.debug["layout_stage"] == "plumber" and res.debug["fast_path"] is False
+    assert "camelot-lattice" in res.debug["stages_skipped"] and "camelot-stream" in res.debug["stages_skipped"]
+    assert set(res.debug["stage_ms"]) == {"plumber"}
+
+
+def test_camelot_runs_until_count_matches(pdf, stages):
+    stages.outputs["plumber"] = _lines(1)
+    stages.outputs["camelot-lattice"] = _lines(3)
+    stages.outputs["camelot-stream"] = _lines(2)
+    res = parse_remito(pdf, correlation_id="fp2", use_ocr_auto=False)
+    assert stages.calls == ["plumber", "camelot-lattice"]
+    assert len(res.lines) == 3 and res.debug["layout_stage"] == "camelot-lattice"
+
+
+def test_layout_hint_runs_first_and_short_circuits(pdf, stages):
+    stages.outputs["camelot-stream"] = _lines(3)
+    res = parse_remito(pdf, correlation_id="fp3", use_ocr_auto=False, layout_hint="camelot-stream")
+    assert stages.calls == ["camelot-stream"]
+    assert res.debug["fast_path"] is True and res.debug["layout_stage"] == "camelot-stream"
+    assert any(e["event"] == "fast_path_hit" for e in res.events)
+
+
+def test_layout_hint_miss_falls_back_to_cascade(pdf, stages):
+    stages.outputs["plumber"] = _lines(3)
+    res = parse_remito(pdf, correlation_id="fp4", use_ocr_auto=False, layout_hint="camelot-stream")
+    assert stages.calls == ["camelot-stream", "plumber"]
+    assert res.debug["fast_path"] is False and res.debug["layout_stage"] == "plumber"
+    assert any(e["event"] == "fast_path_miss" for e in res.events)
+
+
+def test_stage_errors_are_reported_under_their_stage(pdf, stages, monkeypatch):
+    def _boom(doc, text, exp, dbg, ev):
+        raise RuntimeError("falla")
+
+    for name in ("plumber", "camelot-lattice", "multiline"):
+        monkeypatch.setitem(santaplanta_pipeline._STAGES, name, _boom)
+    res = parse_remito(pdf, correlation_id="fp5", use_ocr_auto=False)
+    failed = {e["event"]: e["stage"] for e in res.events if e.get("details", {}).get("error") == "falla"}
+    assert failed == {"plumber_error": "pdfplumber", "camelot-lattice_error": "camelot", "multiline_error": "multiline_fallback"}
+
+
+@pytest.mark.asyncio
+async def test_supplier_layout_profile_is_recorded(db_session):
+    from services.routers import purchases
+
+    sup = Supplier(slug="sp-layout", name="SP Layout", extra_json={"contacto": "x"})
+    db_session.add(sup)
+    await db_session.commit()
+    assert await purchases._supplier_layout_hint(db_session, sup.id) is None
+
+    res = SimpleNamespace(debug={"layout_stage": "plumber", "fast_path": False})
+    await purchases._remember_layout(db_session, sup.id, res)
+    await db_session.commit()
+    res.debug["fast_path"] = True
+    await purchases._remember_layout(db_session, sup.id, res)
+    await db_session.commit()
+
+    await db_session.refresh(sup)
+    assert sup.extra_json["contacto"] == "x"
+    profile = sup.extra_json["remito_layout"]
+    assert profile["stage"] == "plumber" and profile["hits"] == 2 and profile["fast_path"] is True
+    assert await purchases._supplier_layout_hint(db_session, sup.id) == "plumber"
+
+    await purchases._remember_layout(db_session, sup.id, SimpleNamespace(debug={"layout_stage": "camelot-stream"}))
+    await db_session.commit()
+    await db_session.refresh(sup)
+    assert sup.extra_json["remito_layout"]["hits"] == 1
@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+# NG-HEADER: Nombre de archivo: test_remito_jobs.py
+# NG-HEADER: Ubicación: tests/test_remito_jobs.py
+# NG-HEADER: Descripción: Pruebas de la importación de remitos PDF como job (progreso por etapas, rechazos, tope de OCR)
+# NG-HEADER: Lineamientos: Ver AGENTS.md
+import io
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from services.importers import remito_jobs, santaplanta_pipeline
+from services.importers.santaplanta_pipeline import ParsedLine, ParsedResult
+from services.ocr.pages import OcrPages
+
+DUMMY_PDF = b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n1 0 obj<</Type/Catalog>>endobj\ntrailer<>\n%%EOF"
+
+
+@pytest.fixture
+def thread_pool(monkeypatch):
+    monkeypatch.setattr(remito_jobs, "_EXECUTOR_KIND", "thread")
+    monkeypatch.setattr(remito_jobs, "_executor", None)
+    yield
+    remito_jobs.shutdown_executor()
+    santaplanta_pipeline.set_ocr_gate(None)
+
+
+def _fake_parse(pdf_path, *, correlation_id, on_event=None, **kwargs):
+    res = ParsedResult(remito_number="0001-00000001", lines=[ParsedLine(supplier_sku="A1", title="Item")])
+    if on_event is not None:
+        res.events = santaplanta_pipeline._EventList(on_event)
+    for stage in ("start", "header", "pdfplumber", "camelot", "end"):
+        res.events.append({"level": "INFO", "stage": stage, "event": f"{stage}_ok"})
+    return res
+
+
+@pytest.mark.asyncio
+async def test_job_reports_pipeline_stages_and_result(thread_pool, monkeypatch, tmp_path):
+    monkeypatch.setattr(remito_jobs, "parse_remito", _fake_parse)
+    monkeypatch.setenv("IMPORT_AI_ENABLED", "false")
+    seen = {}
+
+    async def _persist(res):
+        seen["job"] = remito_jobs.get_job(job.id).to_dict()
+        return {"purchase_id": 1, "lines": len(res.lines)}
+
+    job = remito_jobs.submit(
+        tmp_path / "r.pdf", supplier_id=1, filename="r.pdf", correlation_id="c1",
+        force_ocr=False, debug=False, persist=_persist,
+    )
+    job = await remito_jobs.wait(job.id)
+
+    assert job.status == "done" and job.progress == 100
+    assert job.result == {"purchase_id": 1, "lines": 1}
+    # Antes de persistir ya se vieron las etapas del pipeline
+    assert seen["job"]["stage"] == "persisting"
+    stages = [ev["stage"] for ev in seen["job"]["events"]]
+    assert stages[:5] == ["start", "header", "pdfplumber", "camelot", "end"]
+    assert job.events_count >= 5
+
+
+@pytest.mark.asyncio
+async def test_rejection_keeps_http_status(thread_pool, monkeypatch, tmp_path):
+    monkeypatch.setattr(remito_jobs, "parse_remito", _fake_parse)
+
+    async def _persist(res):
+        raise remito_jobs.ImportRejected(409, "PDF ya importado para este proveedor")
+
+    job = remito_jobs.submit(
+        tmp_path / "r.pdf", supplier_id=1, filename="r.pdf", correlation_id="c2",
+        force_ocr=False, debug=False, persist=_persist,
+    )
+    job = await remito_jobs.wait(job.id)
+    assert job.status == "error" and job.status_code == 409
+    assert job.error == "PDF ya importado para este proveedor"
+
+
+@pytest.mark.asyncio
+async def test_ocr_concurrency_is_capped(thread_pool, monkeypatch, tmp_path):
+    monkeypatch.setattr(remito_jobs, "_WORKERS", 3)
+    monkeypatch.setattr(remito_jobs, "_OCR_CONCURRENCY", 1)
+    state = {"active": 0, "max_active": 0}
+    lock = threading.Lock()
+
+    def _ocr(doc, **kwargs):
+        with lock:
+            state["active"] += 1
+            state["max_active"] = max(state["max_active"], state["active"])
+        time.sleep(0.05)
+        with lock:
+            state["active"] -= 1
+        return OcrPages()
+
+    monkeypatch.setattr(santaplanta_pipeline, "ocr_document", _ocr)
+
+    async def _persist(res):
+        return {}
+
+    jobs = []
+    for i in range(3):
+        pdf = tmp_path / f"r{i}.pdf"
+        pdf.write_bytes(DUMMY_PDF)
+        jobs.append(remito_jobs.submit(
+            pdf, supplier_id=1, filename=pdf.name, correlation_id=f"c{i}",
+            force_ocr=True, debug=False, persist=_persist,
+        ))
+    for job in jobs:
+        assert (await remito_jobs.wait(job.id)).status == "done"
+    assert state["max_active"] == 1
+
+
+def test_upload_returns_job_id_and_status_endpoint():
+    from services.api import app
+    from services.auth import SessionData, current_session, require_csrf
+
+    app.dependency_overrides[current_session] = lambda: SessionData(None, None, "admin")
+    app.dependency_overrides[require_csrf] = lambda: None
+    try:
+        with TestClient(app) as client:
+            r = client.post("/suppliers", json={"slug": "sp-jobs", "name": "Santa Planta Jobs"})
+            sid = r.json()["id"]
+            files = {"file": ("remito_job.pdf", io.BytesIO(DUMMY_PDF), "application/pdf")}
+            r = client.post(f"/purchases/import/santaplanta?supplier_id={sid}", files=files)
+            assert r.status_code == 202
+            job_id = r.json()["job_id"]
+
+            for _ in range(100):
+                st = client.get(f"/purchases/import/jobs/{job_id}").json()
+                if st["status"] in ("done", "error"):
+                    break
+                time.sleep(0.05)
+            assert st["status"] == "done", st
+            assert st["result"]["status"] == "BORRADOR" and st["result"]["purchase_id"]
+            assert st["events_count"] > 0
+            assert client.get("/purchases/import/jobs/nope").status_code == 404
+
+            # Polling atendido por otro worker (sin el job en memoria): sale de background_jobs
+            for _ in range(100):
+                if job_id not in remito_jobs._REGISTRY._tasks:
+                    break
+                time.sleep(0.02)
+            remito_jobs._REGISTRY._jobs.pop(job_id)
+            remote = client.get(f"/purchases/import/jobs/{job_id}").json()
+            assert remote["status"] == "done" and remote["result"]["purchase_id"] == st["result"]["purchase_id"]
+    finally:
+        app.dependency_overrides.pop(current_session, None)
+        app.dependency_overrides.pop(require_csrf, None)
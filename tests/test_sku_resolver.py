@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# NG-HEADER: Nombre de archivo: test_sku_resolver.py
+# NG-HEADER: Ubicación: tests/test_sku_resolver.py
+# NG-HEADER: Descripción: Pruebas de la resolución en bloque de SKUs de proveedor para líneas de compra
+# NG-HEADER: Lineamientos: Ver AGENTS.md
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event
+
+from db.models import Purchase, PurchaseLine, Supplier, SupplierProduct
+from services.purchases import sku_resolver
+from services.purchases.sku_resolver import SkuResolver
+
+
+async def _supplier_with_items(db, skus):
+    sup = Supplier(slug=f"sku-res-{len(skus)}", name="SKU Resolver")
+    db.add(sup)
+    await db.flush()
+    items = [SupplierProduct(supplier_id=sup.id, supplier_product_id=s, title=f"Item {s}") for s in skus]
+    db.add_all(items)
+    await db.commit()
+    return sup, {sp.supplier_product_id: sp for sp in items}
+
+
+class _SupplierProductSelects:
+    def __init__(self):
+        from db.session import engine
+
+        self.engine = engine.sync_engine
+        self.count = 0
+
+    def _on(self, conn, cursor, statement, *args):
+        if statement.lstrip().upper().startswith("SELECT") and "FROM supplier_products" in statement:
+            self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._on)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._on)
+
+
+@pytest.mark.asyncio
+async def test_match_keeps_precedence_rules(db_session):
+    sup, items = await _supplier_with_items(db_session, ["1234", "555", "777"])
+    lines = [("1234", "Sustrato 777"), ("9999", "Perlita 555 x 777"), ("9999", "Sin tokens"), ("", "Maceta 555")]
+    with _SupplierProductSelects() as q:
+        resolver = await SkuResolver.load(db_session, sup.id, lines, use_title_tokens=True)
+    assert q.count == 1
+
+    # SKU exacto gana sobre tokens del título
+    assert resolver.match("1234", "Sustrato 777") == (items["1234"], "1234")
+    # Sin SKU exacto: primer token del título que exista
+    assert resolver.match("9999", "Perlita 555 x 777") == (items["555"], "555")
+    assert resolver.match("9999", "Sin tokens") == (None, "9999")
+    # Sin SKU no se prueban tokens (igual que antes)
+    assert resolver.match("", "Maceta 555") == (None, "")
+
+
+@pytest.mark.asyncio
+async def test_load_chunks_large_documents(db_session, monkeypatch):
+    skus = [f"{1000 + i}" for i in range(7)]
+    sup, items = await _supplier_with_items(db_session, skus)
+    monkeypatch.setattr(sku_resolver, "_IN_CHUNK", 3)
+    with _SupplierProductSelects() as q:
+        resolver = await SkuResolver.load(db_session, sup.id, [(s, None) for s in skus], ids=[items["1000"].id])
+    assert q.count == 3
+    assert all(resolver.get(s) is items[s] for s in skus)
+    assert resolver.get_by_id(items["1000"].id) is items["1000"]
+
+
+@pytest.mark.asyncio
+async def test_validate_purchase_uses_single_lookup(db_session):
+    from services.routers.purchases import validate_purchase
+
+    skus = [f"{2000 + i}" for i in range(30)]
+    sup, _ = await _supplier_with_items(db_session, skus)
+    p = Purchase(supplier_id=sup.id, remito_number="R-BULK-1", remito_date=date(2025, 9, 1))
+    db_session.add(p)
+    await db_session.flush()
+    for s in skus + ["NO-EXISTE"]:
+        db_session.add(PurchaseLine(purchase_id=p.id, supplier_sku=s, title=f"Linea {s}", qty=Decimal(1), unit_cost=Decimal(10)))
+    await db_session.commit()
+
+    with _SupplierProductSelects() as q:
+        out = await validate_purchase(p.id, db=db_session)
+    assert q.count == 1
+    assert out["linked"] == 30 and out["unmatched"] == 1
+    assert out["missing_skus"] == ["NO-EXISTE"]
@@ -324,7 +324,7 @@ class TestExtractPriceGeneric:
 class TestScrapeStaticPriceSuccess:
     """Tests de scraping exitoso con mocks"""
     
-    @patch("workers.scraping.static_scraper.requests.get")
+    @patch("workers.scraping.static_scraper._http_get")
     def test_scrape_mercadolibre_success(self, mock_get, mercadolibre_html_complete):
         """Scraping exitoso de MercadoLibre"""
         # Configurar mock
@@ -342,10 +342,10 @@ class TestScrapeStaticPriceSuccess:
         assert price == Decimal("1250.00")
         assert currency == "ARS"
         
-        # Verificar que se llamó requests.get
+        # Verificar que se llamó al GET HTTP
         mock_get.assert_called_once()
     
-    @patch("workers.scraping.static_scraper.requests.get")
+    @patch("workers.scraping.static_scraper._http_get")
     def test_scrape_amazon_success(self, mock_get, amazon_html_complete):
         """Scraping exitoso de Amazon"""
         mock_response = Mock()
@@ -360,7 +360,7 @@ class TestScrapeStaticPriceSuccess:
         # Amazon puede retornar formato americano
         assert price > 0
     
-    @patch("workers.scraping.static_scraper.requests.get")
+    @patch("workers.scraping.static_scraper._http_get")
     def test_scrape_generic_success(self, mock_get, generic_html_with_class):
         """Scraping exitoso con extractor genérico"""
         mock_response = Mock()
@@ -373,7 +373,7 @@ class TestScrapeStaticPriceSuccess:
         assert price is not None
         assert isinstance(price, Decimal)
     
-    @patch("workers.scraping.static_scraper.requests.get")
+    @patch("workers.scraping.static_scraper._http_get")
     def test_scrape_uses_custom_headers(self, mock_get, mercadolibre_html_complete):
         """Verifica que se usen headers personalizados"""
         mock_response = Mock()
@@ -389,7 +389,7 @@ class TestScrapeStaticPriceSuccess:
         assert "User-Agent" in call_kwargs["headers"]
         assert "GrowenBot" in call_kwargs["headers"]["User-Agent"]
     
-    @patch("workers.scraping.static_scraper.requests.get")
+    @patch("workers.scraping.static_scraper._http_get")
     def test_scrape_respects_timeout(self, mock_get, mercadolibre_html_complete):
         """Verifica que se use el timeout especificado"""
         mock_response = Mock()
@@ -408,7 +408,7 @@ class TestScrapeStaticPriceSuccess:
 class TestScrapeStaticPriceErrors:
     """Tests de manejo de errores de red"""
     
-    @patch("workers.scraping.static_scraper.requests.get")
+    @patch("workers.scraping.static_scraper._http_get")
     def test_scrape_timeout_raises_network_error(self, mock_get):
         """Timeout lanza NetworkError"""
         mock_get.side_effect = requests.exceptions.Timeout()
@@ -418,7 +418,7 @@ class TestScrapeStaticPriceErrors:
         
         assert "Timeout" in str(exc_info.value)
     
-    @patch("workers.scraping.static_scraper.requests.get")
+    @patch("workers.scraping.static_scraper._http_get")
     def test_scrape_connection_error_raises_network_error(self, mock_get):
         """ConnectionError lanza NetworkError"""
         mock_get.side_effect = requests.exceptions.ConnectionError("Connection refused")
@@ -428,7 +428,7 @@ class TestScrapeStaticPriceErrors:
         
         assert "conexión" in str(exc_info.value).lower() or "connection" in str(exc_info.value).lower()
     
-    @patch("workers.scraping.static_scraper.requests.get")
+    @patch("workers.scraping.static_scraper._http_get")
     def test_scrape_http_404_raises_network_error(self, mock_get):
         """HTTP 404 lanza NetworkError"""
         mock_response = Mock()
@@ -441,7 +441,7 @@ class TestScrapeStaticPriceErrors:
         
         assert "404" in str(exc_info.value) or "HTTP" in str(exc_info.value)
     
-    @patch("workers.scraping.static_scraper.requests.get")
+    @patch("workers.scraping.static_scraper._http_get")
     def test_scrape_http_500_raises_network_error(self, mock_get):
         """HTTP 500 lanza NetworkError"""
         mock_response = Mock()
@@ -454,7 +454,7 @@ class TestScrapeStaticPriceErrors:
         
         assert "500" in str(exc_info.value) or "HTTP" in str(exc_info.value)
     
-    @patch("workers.scraping.static_scraper.requests.get")
+    @patch("workers.scraping.static_scraper._http_get")
     def test_scrape_no_price_raises_price_not_found(self, mock_get, mercadolibre_html_no_price):
         """HTML sin precio lanza PriceNotFoundError"""
         mock_response = Mock()
@@ -467,7 +467,7 @@ class TestScrapeStaticPriceErrors:
         
         assert "no se pudo extraer precio" in str(exc_info.value).lower()
     
-    @patch("workers.scraping.static_scraper.requests.get")
+    @patch("workers.scraping.static_scraper._http_get")
     def test_scrape_malformed_html_raises_price_not_found(self, mock_get, malformed_html):
         """HTML mal formado intenta extraer precio y lanza error si no lo encuentra"""
         mock_response = Mock()
@@ -488,7 +488,7 @@ class TestScrapeStaticPriceErrors:
 class TestScrapeStaticPriceEdgeCases:
     """Tests de edge cases y comportamientos límite"""
     
-    @patch("workers.scraping.static_scraper.requests.get")
+    @patch("workers.scraping.static_scraper._http_get")
     def test_scrape_empty_html(self, mock_get):
         """Maneja HTML vacío"""
         mock_response = Mock()
@@ -499,7 +499,7 @@ class TestScrapeStaticPriceEdgeCases:
         with pytest.raises(PriceNotFoundError):
             scrape_static_price("https://example.com")
     
-    @patch("workers.scraping.static_scraper.requests.get")
+    @patch("workers.scraping.static_scraper._http_get")
     def test_scrape_handles_redirects(self, mock_get, mercadolibre_html_complete):
         """Maneja redirects HTTP (requests lo hace automáticamente)"""
         mock_response = Mock()
@@ -512,7 +512,7 @@ class TestScrapeStaticPriceEdgeCases:
         
         assert price is not None
     
-    @patch("workers.scraping.static_scraper.requests.get")
+    @patch("workers.scraping.static_scraper._http_get")
     def test_scrape_extracts_from_fallback_when_specific_fails(self, mock_get):
         """Usa extractor genérico cuando el específico falla"""
         # HTML de MercadoLibre sin estructura correcta, pero con precio en texto
@@ -540,7 +540,7 @@ class TestScrapeStaticPriceEdgeCases:
 class TestScrapeStaticPriceIntegration:
     """Tests de integración de flujo completo (mock a mock)"""
     
-    @patch("workers.scraping.static_scraper.requests.get")
+    @patch("workers.scraping.static_scraper._http_get")
     def test_full_flow_mercadolibre(self, mock_get, mercadolibre_html_complete):
         """Flujo completo: HTTP → Parse → Extract → Normalize"""
         mock_response = Mock()
@@ -557,7 +557,7 @@ class TestScrapeStaticPriceIntegration:
         assert currency == "ARS"
         assert str(price) == "1250.00"  # Verificar formato string
     
-    @patch("workers.scraping.static_scraper.requests.get")
+    @patch("workers.scraping.static_scraper._http_get")
     def test_multiple_scrapes_dont_interfere(self, mock_get, mercadolibre_html_complete, amazon_html_complete):
         """Múltiples scrapes no interfieren entre sí"""
         # Primera llamada: MercadoLibre
@@ -15,6 +15,7 @@ from urllib.parse import urlparse, parse_qs, unquote
 import httpx
 
 from agent_core.detect_mcp_url import get_mcp_web_search_url
+from services import http_clients
 
 # Usar logger principal para visibilidad en logs
 logger = logging.getLogger("growen")
@@ -316,23 +317,23 @@ async def call_mcp_web_search(
     try:
         logger.info(f"[discovery] Llamando MCP Web Search: query='{query}' max_results={max_results}")
         
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            resp = await client.post(mcp_url, json=payload)
-            
-            if resp.status_code != 200:
-                logger.error(
-                    f"[discovery] MCP Web Search respondió status={resp.status_code} "
-                    f"detail={resp.text[:200]}"
-                )
-                return {"error": "mcp_call_failed", "status": resp.status_code}
-            
-            result = resp.json().get("result", {})
-            
-            items = result.get("items", [])
-            logger.info(f"[discovery] MCP Web Search retornó {len(items)} resultados")
-            
-            return result
-            
+        client = http_clients.get_client("mcp_web_search")
+        resp = await client.post(mcp_url, json=payload, timeout=10.0)
+        
+        if resp.status_code != 200:
+            logger.error(
+                f"[discovery] MCP Web Search respondió status={resp.status_code} "
+                f"detail={resp.text[:200]}"
+            )
+            return {"error": "mcp_call_failed", "status": resp.status_code}
+        
+        result = resp.json().get("result", {})
+        
+        items = result.get("items", [])
+        logger.info(f"[discovery] MCP Web Search retornó {len(items)} resultados")
+        
+        return result
+        
     except httpx.RequestError as e:
         logger.error(f"[discovery] Error de red llamando MCP Web Search: {e}")
         return {"error": "network_failure"}
@@ -25,6 +25,8 @@ from decimal import Decimal
 import httpx
 from bs4 import BeautifulSoup
 
+from services import http_clients
+
 logger = logging.getLogger(__name__)
 
 
@@ -128,17 +130,17 @@ async def check_url_availability(url: str, timeout: int = 5) -> bool:
     }
     
     try:
-        async with httpx.AsyncClient(timeout=timeout, follow_redirects=True) as client:
-            response = await client.head(url, headers=headers)
-            
-            # Considerar 200-399 como disponible
-            is_available = 200 <= response.status_code < 400
-            
-            if not is_available:
-                logger.warning(f"[validator] URL {url} retornó status {response.status_code}")
-            
-            return is_available
-            
+        client = http_clients.get_client("scraping")
+        response = await client.head(url, headers=headers, timeout=timeout)
+        
+        # Considerar 200-399 como disponible
+        is_available = 200 <= response.status_code < 400
+        
+        if not is_available:
+            logger.warning(f"[validator] URL {url} retornó status {response.status_code}")
+        
+        return is_available
+        
     except httpx.TimeoutException:
         logger.error(f"[validator] Timeout al verificar {url}")
         raise NetworkError(f"Timeout al verificar URL")
@@ -173,38 +175,38 @@ async def detect_price_in_html(url: str, timeout: int = 10) -> bool:
     }
     
     try:
-        async with httpx.AsyncClient(timeout=timeout, follow_redirects=True) as client:
-            response = await client.get(url, headers=headers)
-            response.raise_for_status()
-            
-            html = response.text
-            
-            # Buscar patrones de precio en el HTML completo
-            for pattern in PRICE_PATTERNS:
-                if re.search(pattern, html, re.IGNORECASE):
-                    logger.info(f"[validator] Precio detectado en {url} con patrón: {pattern}")
-                    return True
-            
-            # Fallback: buscar en tags específicos con BeautifulSoup
-            soup = BeautifulSoup(html, "html.parser")
-            
-            # Buscar en meta tags de precio (schema.org)
-            price_meta = soup.find("meta", {"property": "product:price:amount"})
-            if price_meta and price_meta.get("content"):
-                logger.info(f"[validator] Precio detectado en meta tag: {url}")
+        client = http_clients.get_client("scraping")
+        response = await client.get(url, headers=headers, timeout=timeout)
+        response.raise_for_status()
+        
+        html = response.text
+        
+        # Buscar patrones de precio en el HTML completo
+        for pattern in PRICE_PATTERNS:
+            if re.search(pattern, html, re.IGNORECASE):
+                logger.info(f"[validator] Precio detectado en {url} con patrón: {pattern}")
                 return True
-            
-            # Buscar en clases/ids comunes de precio
-            price_elements = soup.find_all(class_=re.compile(r"price|precio|valor", re.IGNORECASE))
-            for elem in price_elements:
-                text = elem.get_text()
-                if re.search(r'\d{1,3}(?:[,\.]\d{3})*', text):
-                    logger.info(f"[validator] Precio detectado en elemento: {url}")
-                    return True
-            
-            logger.warning(f"[validator] No se detectó precio en {url}")
-            return False
-            
+        
+        # Fallback: buscar en tags específicos con BeautifulSoup
+        soup = BeautifulSoup(html, "html.parser")
+        
+        # Buscar en meta tags de precio (schema.org)
+        price_meta = soup.find("meta", {"property": "product:price:amount"})
+        if price_meta and price_meta.get("content"):
+            logger.info(f"[validator] Precio detectado en meta tag: {url}")
+            return True
+        
+        # Buscar en clases/ids comunes de precio
+        price_elements = soup.find_all(class_=re.compile(r"price|precio|valor", re.IGNORECASE))
+        for elem in price_elements:
+            text = elem.get_text()
+            if re.search(r'\d{1,3}(?:[,\.]\d{3})*', text):
+                logger.info(f"[validator] Precio detectado en elemento: {url}")
+                return True
+        
+        logger.warning(f"[validator] No se detectó precio en {url}")
+        return False
+        
     except httpx.TimeoutException:
         logger.error(f"[validator] Timeout al obtener HTML de {url}")
         raise NetworkError(f"Timeout al obtener HTML")
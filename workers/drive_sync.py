@@ -7,11 +7,13 @@
 from __future__ import annotations
 
 import asyncio
+import hashlib
 import logging
 import os
 import re
 import sys
-import tempfile
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Optional, Callable, Any, Awaitable, Union
 
@@ -19,14 +21,14 @@ from typing import Optional, Callable, Any, Awaitable, Union
 if sys.platform == "win32":
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
-from sqlalchemy import select, func, or_
+from sqlalchemy import delete, select, func, or_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from db.models import Product, Image, ImageVersion, ImageReview, CanonicalProduct, ProductEquivalence, SupplierProduct
 from db.session import SessionLocal
 from db.sku_utils import is_canonical_sku
-from services.integrations.drive import GoogleDriveSync, GoogleDriveError
-from services.media import get_media_root, sha256_of_file
+from services.integrations.drive import BATCH_LIMIT, GoogleDriveSync, GoogleDriveError
+from services.media import get_media_root
 from services.media.processor import to_square_webp_set
 
 logger = logging.getLogger(__name__)
@@ -110,12 +112,297 @@ def detect_mime_type(content: bytes, filename: str) -> str:
     return mime_map.get(ext, "application/octet-stream")
 
 
+# Concurrencia del pipeline de sincronización (ver sync_drive_images)
+_DOWNLOAD_CONCURRENCY = max(1, int(os.getenv("DRIVE_SYNC_DOWNLOADS", "8") or 8))
+_PROCESS_WORKERS = max(1, int(os.getenv("DRIVE_SYNC_PROCESS_WORKERS", "0") or 0) or (os.cpu_count() or 1))
+_EXECUTOR_KIND = os.getenv("DRIVE_SYNC_EXECUTOR", "process").lower()
+_DB_BATCH = max(1, int(os.getenv("DRIVE_SYNC_DB_BATCH", "50") or 50))
+_IN_CHUNK = 500
+
+
+def _render_image(target: str, out_dir: str, base: str) -> tuple[int, int, dict[str, str]]:
+    """Valida la imagen y genera los derivados WebP. Corre en el pool de procesos.
+
+    Returns:
+        (ancho, alto, {kind: path}) con kind en thumb/card/full.
+    """
+    from PIL import Image as PILImage
+
+    path = Path(target)
+    # NOTA: El opener HEIF/HEIC se registra al importar este módulo (también en los workers)
+    try:
+        # Verificar tamaño del archivo antes de procesarlo
+        file_size = path.stat().st_size
+        if file_size < 100:  # Archivos muy pequeños probablemente están corruptos
+            raise ValueError(f"Archivo demasiado pequeño para ser una imagen válida: {file_size} bytes")
+        # Intentar abrir la imagen sin verify() (que puede ser destructivo)
+        with PILImage.open(path) as img_test:
+            # Hacer una operación simple que falle si la imagen está corrupta
+            img_test.load()
+            # Verificar que tenga dimensiones válidas
+            if img_test.size[0] <= 0 or img_test.size[1] <= 0:
+                raise ValueError(f"Imagen con dimensiones inválidas: {img_test.size}")
+            width, height = img_test.size
+    except Exception as e:
+        raise ValueError(f"La imagen descargada está corrupta o es inválida: {e}") from None
+    proc = to_square_webp_set(path, Path(out_dir), base)
+    return width, height, {"thumb": str(proc.thumb), "card": str(proc.card), "full": str(proc.full)}
+
+
+def _make_executor() -> Executor:
+    if _EXECUTOR_KIND == "process":
+        import multiprocessing
+
+        # spawn: el worker tiene threads (event loop, clientes HTTP); fork no es seguro
+        return ProcessPoolExecutor(max_workers=_PROCESS_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return ThreadPoolExecutor(max_workers=_PROCESS_WORKERS, thread_name_prefix="drive-img")
+
+
+@dataclass
+class _PendingImage:
+    file_id: str
+    image: Image
+    versions: list[dict[str, Any]]
+    files: list[Path]
+
+
+class _ImageBatch:
+    """Altas de imágenes pendientes: un flush y un commit por lote en lugar de uno por imagen.
+
+    Toda la escritura en la sesión pasa por :meth:`commit` (serializado con un lock),
+    así las tareas concurrentes del pipeline nunca comparten la sesión a la vez.
+    """
+
+    def __init__(self, db: AsyncSession, size: int):
+        self.db = db
+        self.size = size
+        self.items: list[_PendingImage] = []
+        self.orphans: list[int] = []
+        self._lock = asyncio.Lock()
+
+    @property
+    def full(self) -> bool:
+        return len(self.items) >= self.size
+
+    def add(self, item: _PendingImage) -> None:
+        self.items.append(item)
+
+    def __contains__(self, file_id: str) -> bool:
+        return any(it.file_id == file_id for it in self.items)
+
+    async def commit(self) -> tuple[list[str], Optional[Exception]]:
+        """Persiste el lote. Devuelve los file_id incluidos y el error si falló."""
+        async with self._lock:
+            items, orphans = self.items, self.orphans
+            self.items, self.orphans = [], []
+            if not items and not orphans:
+                return [], None
+            try:
+                # Registros huérfanos (checksum en DB sin archivo físico); versiones en cascade por FK
+                if orphans:
+                    await self.db.execute(delete(Image).where(Image.id.in_(orphans)))
+                self.db.add_all([it.image for it in items])
+                await self.db.flush()
+                for it in items:
+                    self.db.add_all([ImageVersion(image_id=it.image.id, **v) for v in it.versions])
+                    self.db.add(ImageReview(image_id=it.image.id, status="pending"))
+                await self.db.commit()
+                return [it.file_id for it in items], None
+            except Exception as e:
+                logger.error(f"Error al guardar lote de {len(items)} imágenes: {e}", exc_info=True)
+                try:
+                    await self.db.rollback()
+                except Exception:
+                    pass
+                for it in items:
+                    for f in it.files:
+                        try:
+                            f.unlink()
+                        except OSError:
+                            pass
+                return [it.file_id for it in items], e
+
+
+class _MoveQueue:
+    """Movimientos pendientes en Drive, enviados en requests batch de hasta ``BATCH_LIMIT``.
+
+    Los padres actuales de cada archivo ya se conocen por el listado, así que un
+    lote de movimientos es una sola request HTTP.
+    """
+
+    def __init__(self, drive_sync: GoogleDriveSync, parents: dict[str, list[str]]):
+        self.drive_sync = drive_sync
+        self.parents = parents
+        self.items: list[tuple[str, str, str, str]] = []
+
+    @property
+    def full(self) -> bool:
+        return len(self.items) >= BATCH_LIMIT
+
+    def add(self, file_id: str, folder_id: str, filename: str, folder_name: str) -> None:
+        self.items.append((file_id, folder_id, filename, folder_name))
+
+    async def flush(self) -> None:
+        items, self.items = self.items, []
+        if not items:
+            return
+        try:
+            errors = await self.drive_sync.move_files(
+                [(file_id, folder_id) for file_id, folder_id, _, _ in items], parents=self.parents
+            )
+        except Exception as e:
+            errors = {file_id: str(e) for file_id, _, _, _ in items}
+        for file_id, _, filename, folder_name in items:
+            if errors.get(file_id):
+                logger.error(f"Error al mover archivo {filename} a {folder_name}: {errors[file_id]}")
+
+
+@dataclass
+class _SyncContext:
+    """Estado compartido por las tareas del pipeline de una sincronización."""
+
+    root: Path
+    batch: _ImageBatch
+    executor: Executor
+    # (product_id, checksum) -> (image_id, path) de imágenes ya conocidas (DB o esta corrida)
+    known: dict[tuple[int, str], tuple[Optional[int], Optional[str]]] = field(default_factory=dict)
+    reserved: set[Path] = field(default_factory=set)
+    product_locks: dict[int, asyncio.Lock] = field(default_factory=dict)
+
+    def product_lock(self, product_id: int) -> asyncio.Lock:
+        return self.product_locks.setdefault(product_id, asyncio.Lock())
+
+
+async def _find_product(db: AsyncSession, sku: str) -> Optional[Product]:
+    """Resuelve el producto de un SKU que no coincidió por canonical_sku.
+
+    Orden: CanonicalProduct (sku_custom/ng_sku) → Product.sku_root → búsqueda
+    case-insensitive.
+    """
+    logger.debug(f"  ✗ Producto NO encontrado por canonical_sku='{sku}'")
+    product: Optional[Product] = None
+    # Búsqueda 2: Buscar en CanonicalProduct directamente (antes de fallback a sku_root)
+    # Esto es importante porque CanonicalProduct puede tener el SKU correcto aunque Product no
+    logger.debug(f"  - Búsqueda 2: Buscando en CanonicalProduct (sku_custom o ng_sku)...")
+    canonical = await db.scalar(
+        select(CanonicalProduct).where(
+            or_(
+                CanonicalProduct.sku_custom == sku,
+                CanonicalProduct.ng_sku == sku,
+                func.lower(CanonicalProduct.sku_custom) == sku.lower(),
+                func.lower(CanonicalProduct.ng_sku) == sku.lower(),
+            )
+        )
+    )
+    if canonical:
+        logger.info(f"  ✓ CanonicalProduct encontrado: ID={canonical.id}, sku_custom='{canonical.sku_custom}', ng_sku='{canonical.ng_sku}'")
+        # Buscar Product asociado a través de ProductEquivalence -> SupplierProduct
+        supplier_product = await db.scalar(
+            select(SupplierProduct)
+            .join(ProductEquivalence, ProductEquivalence.supplier_product_id == SupplierProduct.id)
+            .where(ProductEquivalence.canonical_product_id == canonical.id)
+            .limit(1)
+        )
+        if supplier_product and supplier_product.internal_product_id:
+            product = await db.get(Product, supplier_product.internal_product_id)
+            if product:
+                logger.info(f"  ✓ Producto encontrado vía CanonicalProduct: ID={product.id}, canonical_sku='{product.canonical_sku}', sku_root='{product.sku_root}'")
+                # Si el Product tiene un canonical_sku diferente, actualizarlo para futuras búsquedas
+                if product.canonical_sku != canonical.sku_custom and canonical.sku_custom:
+                    logger.info(f"  → Actualizando Product.canonical_sku de '{product.canonical_sku}' a '{canonical.sku_custom}'")
+                    product.canonical_sku = canonical.sku_custom
+                    await db.commit()
+            else:
+                logger.warning(f"  ⚠ CanonicalProduct encontrado pero Product.internal_product_id={supplier_product.internal_product_id} no existe")
+        else:
+            logger.warning(f"  ⚠ CanonicalProduct encontrado pero no hay SupplierProduct asociado")
+        return product
+
+    logger.debug(f"  ✗ CanonicalProduct NO encontrado")
+    # Búsqueda 3 (FALLBACK): Product.sku_root (solo para SKUs de sistema/proveedor/deprecado)
+    logger.debug(f"  - Búsqueda 3 (FALLBACK): Product.sku_root == '{sku}' (solo para SKUs de sistema/proveedor/deprecado)")
+    product = await db.scalar(select(Product).where(Product.sku_root == sku))
+    if product:
+        logger.warning(f"  ⚠ Producto encontrado por sku_root (fallback): ID={product.id}, canonical_sku='{product.canonical_sku}', sku_root='{product.sku_root}'")
+        logger.warning(f"  ⚠ NOTA: El SKU '{sku}' está en sku_root pero no en canonical_sku. Considerar migrar a canonical_sku.")
+        return product
+
+    logger.warning(f"  ✗ Producto NO encontrado para SKU '{sku}' (buscado en canonical_sku, CanonicalProduct y sku_root)")
+    # Intentar búsqueda case-insensitive como último recurso
+    logger.debug(f"  - Búsqueda 4: Intentando búsqueda case-insensitive...")
+    product_ci = await db.scalar(select(Product).where(func.lower(Product.canonical_sku) == sku.lower()))
+    if not product_ci:
+        product_ci = await db.scalar(select(Product).where(func.lower(Product.sku_root) == sku.lower()))
+    if product_ci:
+        logger.warning(f"  ⚠ Producto encontrado con búsqueda case-insensitive: ID={product_ci.id}, canonical_sku='{product_ci.canonical_sku}', sku_root='{product_ci.sku_root}'")
+        logger.warning(f"  ⚠ El SKU en la DB es diferente al buscado (posible problema de mayúsculas/minúsculas)")
+        return product_ci
+
+    logger.error(f"  ✗ Producto NO encontrado ni con búsqueda case-insensitive para SKU '{sku}'")
+    # Buscar productos similares para diagnóstico
+    similar = list(
+        await db.scalars(
+            select(Product).where(
+                or_(
+                    Product.canonical_sku.like(f"%{sku[:7]}%"),  # Buscar por prefijo (ej: "FER_0009")
+                    Product.sku_root.like(f"%{sku[:7]}%"),
+                )
+            ).limit(5)
+        )
+    )
+    if similar:
+        logger.warning(f"  ⚠ Productos similares encontrados (primeros 5):")
+        for p in similar:
+            logger.warning(f"    - ID={p.id}: canonical_sku='{p.canonical_sku}', sku_root='{p.sku_root}'")
+    return None
+
+
+async def _load_products(db: AsyncSession, skus: set[str]) -> dict[str, Optional[Product]]:
+    """Productos por SKU: una consulta IN por canonical_sku y la cadena de fallbacks sólo para los faltantes."""
+    found: dict[str, Optional[Product]] = {}
+    ordered = sorted(skus)
+    for start in range(0, len(ordered), _IN_CHUNK):
+        rows = await db.scalars(select(Product).where(Product.canonical_sku.in_(ordered[start:start + _IN_CHUNK])))
+        for product in rows:
+            found[product.canonical_sku] = product
+    for sku in ordered:
+        if sku not in found:
+            found[sku] = await _find_product(db, sku)
+    return found
+
+
+async def _load_known_checksums(
+    db: AsyncSession, product_ids: set[int]
+) -> dict[tuple[int, str], tuple[Optional[int], Optional[str]]]:
+    """Checksums de imágenes existentes de los productos involucrados (dedupe en memoria)."""
+    known: dict[tuple[int, str], tuple[Optional[int], Optional[str]]] = {}
+    ordered = sorted(product_ids)
+    for start in range(0, len(ordered), _IN_CHUNK):
+        rows = await db.execute(
+            select(Image.id, Image.product_id, Image.checksum_sha256, Image.path).where(
+                Image.product_id.in_(ordered[start:start + _IN_CHUNK]),
+                Image.checksum_sha256.is_not(None),
+            )
+        )
+        for image_id, product_id, checksum, path in rows:
+            known.setdefault((product_id, checksum), (image_id, path))
+    return known
+
+
 async def sync_drive_images(
     progress_callback: Optional[Callable[[dict[str, Any]], Union[None, Awaitable[None]]]] = None,
     source_folder_id: Optional[str] = None,
 ) -> dict[str, Any]:
     """Sincroniza imágenes desde Google Drive.
 
+    Pipeline: los padres de cada archivo vienen en el listado (``fields=parents``);
+    productos y checksums existentes se precargan en bloque; las descargas corren
+    en paralelo acotado (``DRIVE_SYNC_DOWNLOADS``), la validación y los derivados
+    WebP en un pool de procesos (``DRIVE_SYNC_PROCESS_WORKERS``) y las altas en DB
+    se confirman por lotes (``DRIVE_SYNC_DB_BATCH``). Un archivo se mueve a
+    "Procesados" recién cuando su lote quedó confirmado; los movimientos en Drive
+    se envían en requests batch de hasta ``BATCH_LIMIT``.
+
     Args:
         progress_callback: Función opcional para reportar progreso en tiempo real.
             Recibe un dict con: status, current, total, sku, message, error
@@ -194,7 +481,7 @@ async def sync_drive_images(
     drive_sync = GoogleDriveSync(str(creds_path_resolved), source_folder_id)
     await drive_sync.authenticate()
 
-    # Crear/buscar carpetas destino
+    # Crear/buscar carpetas destino (una vez por sincronización)
     # IMPORTANTE: Las carpetas destino siempre se crean en la carpeta principal,
     # no en la carpeta de origen (para evitar crear carpetas dentro de Errores_SKU)
     await emit_progress("initializing", message="Buscando/creando carpetas destino...")
@@ -212,23 +499,7 @@ async def sync_drive_images(
     await emit_progress("listing", message="Listando archivos en carpeta origen...")
     files = await drive_sync.list_images_in_folder()
     logger.info(f"Total archivos encontrados en Drive: {len(files)}")
-    
-    # Filtrar archivos que NO están en subcarpetas (solo en source_folder_id)
-    # Los archivos listados ya están filtrados por 'source_folder_id' in parents,
-    # pero pueden estar en subcarpetas. Necesitamos verificar que solo tengan
-    # source_folder_id como padre directo.
-    files_in_root = []
-    processed_folder_name = os.getenv("DRIVE_PROCESSED_FOLDER_NAME", "Procesados")
-    errors_folder_name = os.getenv("DRIVE_ERRORS_FOLDER_NAME", "Errores_SKU")
-    no_sku_folder_name = os.getenv("DRIVE_SIN_SKU_FOLDER_NAME", "SIN_SKU")
-    
-    # Obtener IDs de carpetas destino para excluirlas
-    # IMPORTANTE: Usar main_folder_id (carpeta principal) para crear carpetas destino,
-    # no source_folder_id (para evitar crear carpetas dentro de Errores_SKU)
-    # Nota: find_or_create_folder espera (parent_id, folder_name)
-    processed_folder_id = await drive_sync.find_or_create_folder(main_folder_id, processed_folder_name)
-    errors_folder_id = await drive_sync.find_or_create_folder(main_folder_id, errors_folder_name)
-    no_sku_folder_id = await drive_sync.find_or_create_folder(main_folder_id, no_sku_folder_name)
+
     # Construir lista de carpetas excluidas
     # Si estamos procesando desde Errores_SKU, no excluir Errores_SKU (es la carpeta de origen)
     excluded_folder_ids = {processed_folder_id, no_sku_folder_id}
@@ -237,35 +508,7 @@ async def sync_drive_images(
         excluded_folder_ids.add(errors_folder_id)
     
     logger.info(f"Carpetas excluidas: {excluded_folder_ids} (source_folder_id: {source_folder_id}, errors_folder_id: {errors_folder_id})")
-    
-    for file_info in files:
-        # Verificar que el archivo esté directamente en source_folder_id
-        # (no en subcarpetas como Procesados, SIN_SKU, o Errores_SKU si no es la carpeta de origen)
-        try:
-            # Obtener metadata del archivo para verificar padres (ejecutar en thread para no bloquear)
-            def get_file_metadata():
-                return drive_sync.service.files().get(
-                    fileId=file_info["id"], fields="parents"
-                ).execute()
-            
-            file_metadata = await asyncio.to_thread(get_file_metadata)
-            parents = file_metadata.get("parents", [])
-            logger.debug(f"Archivo {file_info.get('name')}: padres={parents}")
-            
-            # Solo incluir si tiene source_folder_id como único padre
-            # y no está en ninguna carpeta excluida
-            if source_folder_id in parents and len(parents) == 1:
-                # Verificar que no esté en una carpeta excluida
-                if not any(pid in excluded_folder_ids for pid in parents):
-                    files_in_root.append(file_info)
-                    logger.debug(f"Archivo incluido: {file_info.get('name')}")
-                else:
-                    logger.debug(f"Archivo excluido (en carpeta destino): {file_info.get('name')}, padres={parents}")
-            else:
-                logger.debug(f"Archivo excluido (múltiples padres o no en source): {file_info.get('name')}, padres={parents}")
-        except Exception as e:
-            logger.warning(f"Error al verificar padres de {file_info.get('name')}: {e}", exc_info=True)
-            # En caso de error, NO incluir por seguridad (evitar procesar archivos en subcarpetas)
+    files_in_root = await _filter_root_files(drive_sync, files, source_folder_id, excluded_folder_ids)
 
     total_files = len(files_in_root)
     await emit_progress(
@@ -297,313 +540,132 @@ async def sync_drive_images(
             "total": 0,
         }
 
-    # Contadores
-    processed_count = 0
-    error_count = 0
-    no_sku_count = 0
+    # Contadores (las tareas terminan en cualquier orden; "current" es la cantidad terminada)
+    counts = {"processed": 0, "errors": 0, "no_sku": 0}
+    done = 0
 
-    # Procesar cada archivo
-    async with SessionLocal() as db:
-        for idx, file_info in enumerate(files_in_root, 1):
-            file_id = file_info["id"]
-            filename = file_info["name"]
+    async def report(sku: str, filename: str, message: str, kind: str, error: str = "") -> None:
+        nonlocal done
+        done += 1
+        counts[kind] += 1
+        remaining = total_files - done
+        await emit_progress(
+            "processing",
+            current=done,
+            total=total_files,
+            sku=sku,
+            filename=filename,
+            message=f"{message} ({done}/{total_files}, faltan {remaining})",
+            error=error,
+            **counts,
+        )
 
-            try:
-                # Extraer SKU
-                logger.debug(f"Extrayendo SKU de archivo: '{filename}'")
-                sku = extract_sku_from_filename(filename)
-                if not sku:
-                    logger.warning(f"No se pudo extraer SKU de '{filename}'")
-                    remaining = total_files - idx
-                    await emit_progress(
-                        "processing",
-                        current=idx,
-                        total=total_files,
-                        sku="",
-                        filename=filename,
-                        message=f"Archivo sin formato SKU válido: {filename} ({idx}/{total_files}, faltan {remaining})",
-                        processed=processed_count,
-                        errors=error_count,
-                        no_sku=no_sku_count + 1,
-                    )
-                    try:
-                        await drive_sync.move_file(file_id, no_sku_folder_id)
-                    except Exception as e:
-                        logger.error(f"Error al mover archivo {filename} a SIN_SKU: {e}")
-                    no_sku_count += 1
-                    continue
-
-                # Validar que sea SKU canónico
-                logger.debug(f"Validando si SKU '{sku}' es canónico")
-                if not is_canonical_sku(sku):
-                    logger.warning(f"SKU '{sku}' extraído de '{filename}' NO es canónico")
-                    remaining = total_files - idx
-                    await emit_progress(
-                        "processing",
-                        current=idx,
-                        total=total_files,
-                        sku=sku,
-                        filename=filename,
-                        message=f"SKU no canónico: {sku} ({idx}/{total_files}, faltan {remaining})",
-                        processed=processed_count,
-                        errors=error_count,
-                        no_sku=no_sku_count + 1,
-                    )
-                    try:
-                        await drive_sync.move_file(file_id, no_sku_folder_id)
-                    except Exception as e:
-                        logger.error(f"Error al mover archivo {filename} a SIN_SKU: {e}")
-                    no_sku_count += 1
-                    continue
-
-                remaining = total_files - idx
-                await emit_progress(
-                    "processing",
-                    current=idx,
-                    total=total_files,
-                    sku=sku,
-                    filename=filename,
-                    message=f"Procesando SKU {sku} ({idx}/{total_files}, faltan {remaining})",
-                    processed=processed_count,
-                    errors=error_count,
-                    no_sku=no_sku_count,
-                )
+    # Todos los archivos a procesar tienen como único padre la carpeta origen
+    moves = _MoveQueue(drive_sync, {f["id"]: [source_folder_id] for f in files_in_root})
+
+    async def move(file_id: str, folder_id: str, filename: str, folder_name: str) -> None:
+        moves.add(file_id, folder_id, filename, folder_name)
+        if moves.full:
+            await moves.flush()
 
-                # Buscar producto: PRIMERO por canonical_sku (formato preferido XXX_####_YYY),
-                # luego por sku_root como fallback (solo para sistema/proveedor/deprecado)
-                logger.info(f"Buscando producto para SKU canónico: '{sku}' (filename: '{filename}')")
-                logger.debug(f"  - Búsqueda 1 (PREFERIDA): Product.canonical_sku == '{sku}'")
-                # DIAGNÓSTICO: Verificar que la sesión puede leer productos
-                test_count = await db.scalar(select(func.count(Product.id)))
-                logger.debug(f"  - DIAGNÓSTICO: Total productos en BD (según worker): {test_count}")
-                product = await db.scalar(select(Product).where(Product.canonical_sku == sku))
-                if product:
-                    logger.info(f"  ✓ Producto encontrado por canonical_sku: ID={product.id}, canonical_sku='{product.canonical_sku}', sku_root='{product.sku_root}'")
-                else:
-                    logger.debug(f"  ✗ Producto NO encontrado por canonical_sku='{sku}'")
-                    # DIAGNÓSTICO: Buscar productos con SKU similar para ver qué hay en la BD
-                    similar = await db.scalars(
-                        select(Product).where(Product.canonical_sku.like(f"%{sku[:7]}%")).limit(3)
-                    )
-                    similar_list = list(similar)
-                    if similar_list:
-                        logger.debug(f"  - DIAGNÓSTICO: Productos con SKU similar encontrados:")
-                        for p in similar_list:
-                            logger.debug(f"    - ID={p.id}: canonical_sku='{p.canonical_sku}', sku_root='{p.sku_root}'")
-                    # Búsqueda 2: Buscar en CanonicalProduct directamente (antes de fallback a sku_root)
-                    # Esto es importante porque CanonicalProduct puede tener el SKU correcto aunque Product no
-                    logger.debug(f"  - Búsqueda 2: Buscando en CanonicalProduct (sku_custom o ng_sku)...")
-                    canonical = await db.scalar(
-                        select(CanonicalProduct).where(
-                            or_(
-                                CanonicalProduct.sku_custom == sku,
-                                CanonicalProduct.ng_sku == sku,
-                                func.lower(CanonicalProduct.sku_custom) == sku.lower(),
-                                func.lower(CanonicalProduct.ng_sku) == sku.lower(),
-                            )
-                        )
-                    )
-                    if canonical:
-                        logger.info(f"  ✓ CanonicalProduct encontrado: ID={canonical.id}, sku_custom='{canonical.sku_custom}', ng_sku='{canonical.ng_sku}'")
-                        # Buscar Product asociado a través de ProductEquivalence -> SupplierProduct
-                        supplier_product = await db.scalar(
-                            select(SupplierProduct)
-                            .join(ProductEquivalence, ProductEquivalence.supplier_product_id == SupplierProduct.id)
-                            .where(ProductEquivalence.canonical_product_id == canonical.id)
-                            .limit(1)
-                        )
-                        if supplier_product and supplier_product.internal_product_id:
-                            product = await db.get(Product, supplier_product.internal_product_id)
-                            if product:
-                                logger.info(f"  ✓ Producto encontrado vía CanonicalProduct: ID={product.id}, canonical_sku='{product.canonical_sku}', sku_root='{product.sku_root}'")
-                                # Si el Product tiene un canonical_sku diferente, actualizarlo para futuras búsquedas
-                                if product.canonical_sku != canonical.sku_custom and canonical.sku_custom:
-                                    logger.info(f"  → Actualizando Product.canonical_sku de '{product.canonical_sku}' a '{canonical.sku_custom}'")
-                                    product.canonical_sku = canonical.sku_custom
-                                    await db.commit()
-                            else:
-                                logger.warning(f"  ⚠ CanonicalProduct encontrado pero Product.internal_product_id={supplier_product.internal_product_id} no existe")
-                        else:
-                            logger.warning(f"  ⚠ CanonicalProduct encontrado pero no hay SupplierProduct asociado")
+    async def fail(file_id: str, sku: str, filename: str, error_msg: str, move_to_errors: bool = True) -> None:
+        # Guardar log de error si está en modo debug
+        if debug_mode:
+            try:
+                await _save_error_log(drive_sync, errors_folder_id, filename, sku, error_msg)
+            except Exception as e:
+                logger.warning(f"No se pudo guardar log de error: {e}")
+        if move_to_errors:
+            await move(file_id, errors_folder_id, filename, errors_folder_name)
+        await report(sku, filename, f"SKU {sku}: {error_msg}", "errors", error=error_msg)
+
+    # Pre-pase: SKUs de todos los archivos (sin I/O)
+    plan: list[tuple[dict[str, Any], Optional[str], Optional[str]]] = []
+    for file_info in files_in_root:
+        raw_sku = extract_sku_from_filename(file_info["name"])
+        if raw_sku and not is_canonical_sku(raw_sku):
+            logger.warning(f"SKU '{raw_sku}' extraído de '{file_info['name']}' NO es canónico")
+        plan.append((file_info, raw_sku, raw_sku if raw_sku and is_canonical_sku(raw_sku) else None))
+
+    pending: dict[str, tuple[str, str]] = {}
+    executor = _make_executor()
+    try:
+        async with SessionLocal() as db:
+            # Productos y checksums existentes en bloque, antes de arrancar las tareas concurrentes
+            products = await _load_products(db, {sku for _, _, sku in plan if sku})
+            ctx = _SyncContext(
+                root=get_media_root(),
+                batch=_ImageBatch(db, _DB_BATCH),
+                executor=executor,
+                known=await _load_known_checksums(db, {p.id for p in products.values() if p is not None}),
+            )
+            downloads = asyncio.Semaphore(_DOWNLOAD_CONCURRENCY)
+            # Acota los contenidos descargados en memoria a la espera del pool de procesos
+            in_flight = asyncio.Semaphore(_DOWNLOAD_CONCURRENCY + _PROCESS_WORKERS)
+
+            async def flush_batch() -> None:
+                file_ids, err = await ctx.batch.commit()
+                for fid in file_ids:
+                    sku, filename = pending.pop(fid)
+                    if err is None:
+                        await move(fid, processed_folder_id, filename, processed_folder_name)
+                        await report(sku, filename, f"✅ SKU {sku} procesado exitosamente", "processed")
                     else:
-                        logger.debug(f"  ✗ CanonicalProduct NO encontrado")
-                        # Búsqueda 3 (FALLBACK): Product.sku_root (solo para SKUs de sistema/proveedor/deprecado)
-                        logger.debug(f"  - Búsqueda 3 (FALLBACK): Product.sku_root == '{sku}' (solo para SKUs de sistema/proveedor/deprecado)")
-                        product = await db.scalar(select(Product).where(Product.sku_root == sku))
-                        if product:
-                            logger.warning(f"  ⚠ Producto encontrado por sku_root (fallback): ID={product.id}, canonical_sku='{product.canonical_sku}', sku_root='{product.sku_root}'")
-                            logger.warning(f"  ⚠ NOTA: El SKU '{sku}' está en sku_root pero no en canonical_sku. Considerar migrar a canonical_sku.")
-                        else:
-                            logger.warning(f"  ✗ Producto NO encontrado para SKU '{sku}' (buscado en canonical_sku, CanonicalProduct y sku_root)")
-                            # Intentar búsqueda case-insensitive como último recurso
-                            logger.debug(f"  - Búsqueda 4: Intentando búsqueda case-insensitive...")
-                            product_ci = await db.scalar(
-                                select(Product).where(
-                                    func.lower(Product.canonical_sku) == sku.lower()
-                                )
-                            )
-                            if not product_ci:
-                                product_ci = await db.scalar(
-                                    select(Product).where(
-                                        func.lower(Product.sku_root) == sku.lower()
-                                    )
-                                )
-                            if product_ci:
-                                logger.warning(f"  ⚠ Producto encontrado con búsqueda case-insensitive: ID={product_ci.id}, canonical_sku='{product_ci.canonical_sku}', sku_root='{product_ci.sku_root}'")
-                                logger.warning(f"  ⚠ El SKU en la DB es diferente al buscado (posible problema de mayúsculas/minúsculas)")
-                                product = product_ci
-                            else:
-                                logger.error(f"  ✗ Producto NO encontrado ni con búsqueda case-insensitive para SKU '{sku}'")
-                                # Buscar productos similares para diagnóstico
-                                logger.debug(f"  - Diagnóstico: Buscando productos con SKU similar...")
-                                similar_products = await db.scalars(
-                                    select(Product).where(
-                                        or_(
-                                            Product.canonical_sku.like(f"%{sku[:7]}%"),  # Buscar por prefijo (ej: "FER_0009")
-                                            Product.sku_root.like(f"%{sku[:7]}%")
-                                        )
-                                    ).limit(5)
-                                )
-                                similar = list(similar_products)
-                                if similar:
-                                    logger.warning(f"  ⚠ Productos similares encontrados (primeros 5):")
-                                    for p in similar:
-                                        logger.warning(f"    - ID={p.id}: canonical_sku='{p.canonical_sku}', sku_root='{p.sku_root}'")
-                                else:
-                                    logger.debug(f"  - No se encontraron productos similares")
-                if not product:
-                    remaining = total_files - idx
-                    error_msg = f"Producto no encontrado para SKU '{sku}' (buscado en canonical_sku y sku_root)"
-                    logger.warning(f"SKU '{sku}': {error_msg}")
-                    await emit_progress(
-                        "processing",
-                        current=idx,
-                        total=total_files,
-                        sku=sku,
-                        filename=filename,
-                        message=f"SKU {sku}: {error_msg} ({idx}/{total_files}, faltan {remaining})",
-                        error=error_msg,
-                        processed=processed_count,
-                        errors=error_count + 1,
-                        no_sku=no_sku_count,
-                    )
-                    
-                    # Guardar log de error si está en modo debug
-                    if debug_mode:
-                        try:
-                            error_log_path = await _save_error_log(
-                                drive_sync, errors_folder_id, filename, sku, error_msg
-                            )
-                        except Exception as e:
-                            logger.warning(f"No se pudo guardar log de error: {e}")
-                    
-                    try:
-                        await drive_sync.move_file(file_id, errors_folder_id)
-                    except Exception as e:
-                        logger.error(f"Error al mover archivo {filename} a Errores_SKU: {e}")
-                    error_count += 1
-                    continue
-
-                # Descargar y procesar
+                        await fail(fid, sku, filename, f"Error al guardar imagen: {err}")
+
+            async def handle(file_info: dict[str, Any], raw_sku: Optional[str], sku: Optional[str]) -> None:
+                file_id = file_info["id"]
+                filename = file_info["name"]
                 try:
-                    content = await drive_sync.download_file(file_id)
-                except GoogleDriveError as e:
-                    remaining = total_files - idx
-                    error_msg = f"Error al descargar archivo: {e}"
-                    await emit_progress(
-                        "processing",
-                        current=idx,
-                        total=total_files,
-                        sku=sku,
-                        filename=filename,
-                        message=f"SKU {sku}: {error_msg} ({idx}/{total_files}, faltan {remaining})",
-                        error=error_msg,
-                        processed=processed_count,
-                        errors=error_count + 1,
-                        no_sku=no_sku_count,
-                    )
-                    if debug_mode:
+                    if not sku:
+                        await move(file_id, no_sku_folder_id, filename, no_sku_folder_name)
+                        message = f"SKU no canónico: {raw_sku}" if raw_sku else f"Archivo sin formato SKU válido: {filename}"
+                        await report(raw_sku or "", filename, message, "no_sku")
+                        return
+
+                    product = products.get(sku)
+                    if not product:
+                        error_msg = f"Producto no encontrado para SKU '{sku}' (buscado en canonical_sku y sku_root)"
+                        logger.warning(f"SKU '{sku}': {error_msg}")
+                        await fail(file_id, sku, filename, error_msg)
+                        return
+
+                    async with in_flight:
+                        # Descargar
                         try:
-                            await _save_error_log(
-                                drive_sync, errors_folder_id, filename, sku, error_msg
-                            )
-                        except Exception:
-                            pass
-                    error_count += 1
-                    continue
+                            async with downloads:
+                                content = await drive_sync.download_file(file_id)
+                        except GoogleDriveError as e:
+                            await fail(file_id, sku, filename, f"Error al descargar archivo: {e}", move_to_errors=False)
+                            return
 
-                # Procesar imagen
-                try:
-                    await _process_image(
-                        content, filename, product, db, file_id, drive_sync, processed_folder_id
-                    )
-                    remaining = total_files - idx
-                    await emit_progress(
-                        "processing",
-                        current=idx,
-                        total=total_files,
-                        sku=sku,
-                        filename=filename,
-                        message=f"✅ SKU {sku} procesado exitosamente ({idx}/{total_files}, faltan {remaining})",
-                        processed=processed_count + 1,
-                        errors=error_count,
-                        no_sku=no_sku_count,
-                    )
-                    processed_count += 1
-                except Exception as e:
-                    remaining = total_files - idx
-                    error_msg = f"Error al procesar imagen: {e}"
-                    logger.error(f"Error procesando {filename}: {e}", exc_info=True)
-                    await emit_progress(
-                        "processing",
-                        current=idx,
-                        total=total_files,
-                        sku=sku,
-                        filename=filename,
-                        message=f"SKU {sku}: {error_msg} ({idx}/{total_files}, faltan {remaining})",
-                        error=error_msg,
-                        processed=processed_count,
-                        errors=error_count + 1,
-                        no_sku=no_sku_count,
-                    )
-                    if debug_mode:
+                        # Procesar imagen (validación y derivados en el pool)
                         try:
-                            await _save_error_log(
-                                drive_sync, errors_folder_id, filename, sku, error_msg
-                            )
-                        except Exception:
-                            pass
-                    try:
-                        await db.rollback()
-                    except Exception:
-                        pass
-                    try:
-                        await drive_sync.move_file(file_id, errors_folder_id)
-                    except Exception as e:
-                        logger.error(f"Error al mover archivo {filename} a Errores_SKU: {e}")
-                    error_count += 1
+                            await _process_image(content, filename, product, file_id, ctx)
+                        except Exception as e:
+                            logger.error(f"Error procesando {filename}: {e}", exc_info=True)
+                            await fail(file_id, sku, filename, f"Error al procesar imagen: {e}")
+                            return
+
+                    if file_id not in ctx.batch:
+                        # Duplicada: no hay nada que confirmar en DB
+                        await move(file_id, processed_folder_id, filename, processed_folder_name)
+                        await report(sku, filename, f"✅ SKU {sku} procesado exitosamente", "processed")
+                        return
+                    pending[file_id] = (sku, filename)
+                    if ctx.batch.full:
+                        await flush_batch()
+                except Exception as e:
+                    logger.error(f"Error inesperado procesando {filename}: {e}", exc_info=True)
+                    # Intentar mover a errores si es posible
+                    await move(file_id, errors_folder_id, filename, errors_folder_name)
+                    await report("", filename, f"Error inesperado con {filename}: {str(e)[:100]}", "errors", error=str(e)[:200])
 
-            except Exception as e:
-                remaining = total_files - idx if total_files > 0 else 0
-                logger.error(f"Error inesperado procesando {filename}: {e}", exc_info=True)
-                await emit_progress(
-                    "processing",
-                    current=idx,
-                    total=total_files,
-                    sku="",
-                    filename=filename,
-                    message=f"Error inesperado con {filename}: {str(e)[:100]} ({idx}/{total_files}, faltan {remaining})",
-                    error=str(e)[:200],
-                    processed=processed_count,
-                    errors=error_count + 1,
-                    no_sku=no_sku_count,
-                )
-                # Intentar mover a errores si es posible
-                try:
-                    await drive_sync.move_file(file_id, errors_folder_id)
-                except Exception:
-                    pass
-                error_count += 1
+            await asyncio.gather(*(handle(*item) for item in plan))
+            await flush_batch()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+        await moves.flush()
 
     await emit_progress(
         "completed",
@@ -611,246 +673,198 @@ async def sync_drive_images(
         total=total_files,
         sku="",
         filename="",
-        message=f"Sincronización completada: {processed_count} procesados, {error_count} errores, {no_sku_count} sin SKU",
-        processed=processed_count,
-        errors=error_count,
-        no_sku=no_sku_count,
+        message=f"Sincronización completada: {counts['processed']} procesados, {counts['errors']} errores, {counts['no_sku']} sin SKU",
+        **counts,
     )
 
-    return {
-        "processed": processed_count,
-        "errors": error_count,
-        "no_sku": no_sku_count,
-        "total": total_files,
+    return {**counts, "total": total_files}
+
+
+async def _filter_root_files(
+    drive_sync: GoogleDriveSync,
+    files: list[dict[str, Any]],
+    source_folder_id: str,
+    excluded_folder_ids: set[str],
+) -> list[dict[str, Any]]:
+    """Archivos cuyo único padre es ``source_folder_id``.
+
+    El listado ya pide ``parents``; sólo si falta se consulta la metadata de cada
+    archivo, en paralelo acotado.
+    """
+    semaphore = asyncio.Semaphore(_DOWNLOAD_CONCURRENCY)
+
+    async def parents_of(file_info: dict[str, Any]) -> Optional[list[str]]:
+        if "parents" in file_info:
+            return file_info.get("parents") or []
+        try:
+            def get_file_metadata():
+                return drive_sync.service.files().get(
+                    fileId=file_info["id"], fields="parents"
+                ).execute()
+
+            async with semaphore:
+                file_metadata = await asyncio.to_thread(get_file_metadata)
+            return file_metadata.get("parents", [])
+        except Exception as e:
+            logger.warning(f"Error al verificar padres de {file_info.get('name')}: {e}", exc_info=True)
+            # En caso de error, NO incluir por seguridad (evitar procesar archivos en subcarpetas)
+            return None
+
+    all_parents = await asyncio.gather(*(parents_of(f) for f in files))
+    files_in_root = []
+    for file_info, parents in zip(files, all_parents):
+        if parents is None:
+            continue
+        logger.debug(f"Archivo {file_info.get('name')}: padres={parents}")
+        # Solo incluir si tiene source_folder_id como único padre
+        # y no está en ninguna carpeta excluida
+        if source_folder_id in parents and len(parents) == 1 and not any(pid in excluded_folder_ids for pid in parents):
+            files_in_root.append(file_info)
+        else:
+            logger.debug(f"Archivo excluido: {file_info.get('name')}, padres={parents}")
+    return files_in_root
+
+
+def _safe_filename(filename: str, content: bytes, mime_type: str) -> str:
+    """Nombre de archivo sin directorios, con extensión deducida si falta."""
+    safe_name = filename.replace("\\", "/").split("/")[-1]
+    if Path(safe_name).suffix:
+        return safe_name
+    # Si el archivo no tiene extensión, intentar agregarla basándose en:
+    # 1. MIME type detectado
+    # 2. Magic bytes del contenido
+    ext_map = {
+        "image/jpeg": ".jpg",
+        "image/png": ".png",
+        "image/webp": ".webp",
+        "image/gif": ".gif",
+        "image/heif": ".heif",
+        "image/heic": ".heic",
     }
+    ext = ext_map.get(mime_type)
+    if not ext:
+        content_preview = content[:20]
+        if content_preview.startswith(b'\xff\xd8\xff'):
+            ext = ".jpg"
+        elif content_preview.startswith(b'\x89PNG\r\n\x1a\n'):
+            ext = ".png"
+        elif content_preview.startswith(b'RIFF') and b'WEBP' in content_preview[:12]:
+            ext = ".webp"
+        elif content_preview.startswith(b'GIF87a') or content_preview.startswith(b'GIF89a'):
+            ext = ".gif"
+        elif content_preview.startswith(b'ftyp'):
+            ext = ".heic"  # o .heif
+    if ext:
+        logger.info(f"Agregada extensión {ext} al archivo sin extensión (MIME: {mime_type})")
+        return f"{safe_name}{ext}"
+    logger.warning(f"No se pudo determinar extensión para archivo {safe_name} (MIME: {mime_type})")
+    return safe_name
+
+
+def _write_file(target: Path, content: bytes) -> None:
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target.write_bytes(content)
 
 
 async def _process_image(
     content: bytes,
     filename: str,
     product: Product,
-    db: AsyncSession,
     file_id: str,
-    drive_sync: GoogleDriveSync,
-    processed_folder_id: str,
-) -> None:
-    """Procesa una imagen descargada y la asocia al producto."""
-    import shutil
+    ctx: _SyncContext,
+) -> bool:
+    """Procesa una imagen descargada y la encola en el lote del producto.
 
+    Returns:
+        True si quedó pendiente de confirmar en el lote; False si es un duplicado
+        (mismo checksum y archivo físico presente) y no hay nada que guardar.
+    """
     mime_type = detect_mime_type(content, filename)
-    temp_file: Optional[Path] = None
-
-    try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=Path(filename).suffix) as tmp:
-            tmp.write(content)
-            temp_file = Path(tmp.name)
-
-        checksum = sha256_of_file(temp_file)
-
-        # Verificar duplicados (solo si el archivo físico existe)
-        exists_same = await db.scalar(
-            select(Image.id).where(
-                Image.product_id == product.id, Image.checksum_sha256 == checksum
+    checksum = hashlib.sha256(content).hexdigest()
+    root = ctx.root
+    key = (product.id, checksum)
+
+    # Verificar duplicados contra el set precargado (solo si el archivo físico existe)
+    known = ctx.known.get(key)
+    if known is not None:
+        image_id, path = known
+        if image_id is None or (path and (root / path).exists()):
+            logger.info(
+                f"Imagen duplicada (checksum {checksum[:8]}...), archivo físico existe. "
+                f"Saltando. (Image ID {image_id or 'en esta sincronización'})"
             )
+            return False
+        logger.warning(
+            f"Imagen duplicada en DB pero archivo físico NO existe "
+            f"(Image ID {image_id}, path: {path}). "
+            f"Eliminando registro huérfano y re-procesando desde Drive..."
         )
-        if exists_same:
-            # Verificar que el archivo físico realmente existe
-            existing_img = await db.get(Image, exists_same)
-            if existing_img and existing_img.path:
-                root = get_media_root()
-                physical_path = root / existing_img.path
-                if physical_path.exists():
-                    logger.info(
-                        f"Imagen duplicada (checksum {checksum[:8]}...), archivo físico existe. "
-                        f"Saltando descarga. (Image ID {exists_same})"
-                    )
-                    await drive_sync.move_file(file_id, processed_folder_id)
-                    return
-                else:
-                    logger.warning(
-                        f"Imagen duplicada en DB pero archivo físico NO existe "
-                        f"(Image ID {exists_same}, path: {existing_img.path}). "
-                        f"Eliminando registro huérfano y re-descargando desde Drive..."
-                    )
-                    # Eliminar el registro huérfano y sus versiones derivadas
-                    # Las ImageVersion se eliminarán en cascade por la foreign key
-                    await db.delete(existing_img)
-                    await db.flush()
-                    logger.info(
-                        f"Registro huérfano eliminado (Image ID {exists_same}). "
-                        f"Continuando con descarga para producto {product.id} (SKU: {product.canonical_sku or product.sku_root})..."
-                    )
-                    # Continuar con el procesamiento (no hacer return)
-            else:
-                logger.warning(
-                    f"Imagen duplicada en DB pero sin path registrado (Image ID {exists_same}). "
-                    f"Eliminando registro huérfano y re-descargando desde Drive..."
-                )
-                # Eliminar el registro huérfano
-                await db.delete(existing_img)
-                await db.flush()
-                logger.info(
-                    f"Registro huérfano eliminado (Image ID {exists_same}). "
-                    f"Continuando con descarga para producto {product.id} (SKU: {product.canonical_sku or product.sku_root})..."
-                )
-                # Continuar con el procesamiento (no hacer return)
-
-        # Guardar imagen original
-        root = get_media_root()
-        logger.info(f"Guardando imagen para producto {product.id} en MEDIA_ROOT: {root}")
-        raw_dir = root / "Productos" / str(product.id) / "raw"
-        raw_dir.mkdir(parents=True, exist_ok=True)
-        logger.debug(f"Directorio creado/verificado: {raw_dir}")
-
-        safe_name = filename.replace("\\", "/").split("/")[-1]
-        logger.debug(f"Nombre original del archivo: {filename}, nombre seguro: {safe_name}")
-        
-        # Si el archivo no tiene extensión, intentar agregarla basándose en:
-        # 1. MIME type detectado
-        # 2. Magic bytes del contenido
-        if not Path(safe_name).suffix:
-            ext = None
-            # Primero intentar por MIME type
-            if mime_type.startswith("image/"):
-                ext_map = {
-                    "image/jpeg": ".jpg",
-                    "image/png": ".png",
-                    "image/webp": ".webp",
-                    "image/gif": ".gif",
-                    "image/heif": ".heif",
-                    "image/heic": ".heic",
-                }
-                ext = ext_map.get(mime_type)
-            
-            # Si no se encontró extensión por MIME, intentar por magic bytes
-            if not ext:
-                content_preview = content[:20] if len(content) >= 20 else content
-                if content_preview.startswith(b'\xff\xd8\xff'):
-                    ext = ".jpg"
-                elif content_preview.startswith(b'\x89PNG\r\n\x1a\n'):
-                    ext = ".png"
-                elif content_preview.startswith(b'RIFF') and b'WEBP' in content_preview[:12]:
-                    ext = ".webp"
-                elif content_preview.startswith(b'GIF87a') or content_preview.startswith(b'GIF89a'):
-                    ext = ".gif"
-                elif content_preview.startswith(b'ftyp'):
-                    ext = ".heic"  # o .heif
-            
-            if ext:
-                safe_name = f"{safe_name}{ext}"
-                logger.info(f"Agregada extensión {ext} al archivo sin extensión (MIME: {mime_type})")
-            else:
-                logger.warning(f"No se pudo determinar extensión para archivo {safe_name} (MIME: {mime_type})")
-        
-        target = raw_dir / safe_name
-        i = 1
-        while target.exists():
-            stem = Path(safe_name).stem
-            ext = Path(safe_name).suffix
-            target = raw_dir / f"{stem}-{i}{ext}"
-            i += 1
-
-        logger.info(f"Copiando archivo temporal a: {target}")
-        shutil.copy2(temp_file, target)
-        logger.info(f"Archivo copiado exitosamente. Tamaño: {target.stat().st_size} bytes")
-
-        # Validar que la imagen se pueda abrir (verificar integridad)
-        # NOTA: El opener HEIF/HEIC ya está registrado al inicio del módulo
-        try:
-            from PIL import Image as PILImage
-            # Verificar tamaño del archivo antes de procesarlo
-            file_size = target.stat().st_size
-            if file_size < 100:  # Archivos muy pequeños probablemente están corruptos
-                raise ValueError(f"Archivo demasiado pequeño para ser una imagen válida: {file_size} bytes")
-            
-            # Intentar abrir la imagen sin verify() (que puede ser destructivo)
-            with PILImage.open(target) as img_test:
-                # Hacer una operación simple que falle si la imagen está corrupta
-                img_test.load()
-                # Verificar que tenga dimensiones válidas
-                if img_test.size[0] <= 0 or img_test.size[1] <= 0:
-                    raise ValueError(f"Imagen con dimensiones inválidas: {img_test.size}")
-                img_width, img_height = img_test.size
-            logger.debug(f"Imagen validada correctamente: {target} ({img_width}x{img_height}, {file_size} bytes)")
-        except ImportError:
-            logger.warning("PIL no disponible, saltando validación de imagen")
-        except Exception as e:
-            logger.error(f"Imagen corrupta o inválida {target}: {e}", exc_info=True)
-            # Limpiar archivo corrupto
-            try:
-                target.unlink()
-            except Exception:
-                pass
-            raise ValueError(f"La imagen descargada está corrupta o es inválida: {e}")
-
-        # Crear registro Image
-        rel_path = str(target.relative_to(root))
-        # Normalizar separadores para URLs (Windows usa backslashes)
-        rel_path_normalized = rel_path.replace('\\', '/')
-        img = Image(
-            product_id=product.id,
-            url=f"/media/{rel_path_normalized}",
-            path=rel_path,  # Mantener path original (puede tener backslashes para compatibilidad)
-            mime=mime_type,
-            bytes=len(content),
-            checksum_sha256=checksum,
-        )
-        db.add(img)
-        await db.flush()
-
-        # Crear ImageVersion original
-        db.add(
-            ImageVersion(
-                image_id=img.id,
-                kind="original",
-                path=rel_path_normalized,  # Usar path normalizado
-                size_bytes=len(content),
-                mime=mime_type,
-                source_url=f"drive://{file_id}",
-            )
-        )
-
-        # Generar derivados
-        out_dir = root / "Productos" / str(product.id) / "derived"
-        base = (
-            "-".join([p for p in [product.slug or None, product.sku_root or None] if p])
-            or f"prod-{product.id}"
-        )
-        proc = to_square_webp_set(target, out_dir, base)
-
-        for kind, pth, px in (
-            ("thumb", proc.thumb, 256),
-            ("card", proc.card, 800),
-            ("full", proc.full, 1600),
-        ):
-            relv = str(pth.relative_to(root))
-            # Normalizar separadores para URLs
-            relv_normalized = relv.replace('\\', '/')
-            db.add(
-                ImageVersion(
-                    image_id=img.id,
-                    kind=kind,
-                    path=relv_normalized,  # Usar path normalizado
-                    width=px,
-                    height=px,
-                    mime="image/webp",
-                )
+        # Se borra junto con el lote (las ImageVersion se eliminan en cascade)
+        ctx.batch.orphans.append(image_id)
+    ctx.known[key] = (None, None)
+
+    # Guardar imagen original (el nombre se reserva antes de ceder el control)
+    raw_dir = root / "Productos" / str(product.id) / "raw"
+    safe_name = _safe_filename(filename, content, mime_type)
+    target = raw_dir / safe_name
+    i = 1
+    while target.exists() or target in ctx.reserved:
+        target = raw_dir / f"{Path(safe_name).stem}-{i}{Path(safe_name).suffix}"
+        i += 1
+    ctx.reserved.add(target)
+
+    out_dir = root / "Productos" / str(product.id) / "derived"
+    base = (
+        "-".join([p for p in [product.slug or None, product.sku_root or None] if p])
+        or f"prod-{product.id}"
+    )
+    try:
+        logger.info(f"Guardando imagen para producto {product.id} en: {target}")
+        await asyncio.to_thread(_write_file, target, content)
+        # Validar y generar derivados fuera del event loop. Los derivados de un
+        # producto comparten nombre base: un lock por producto evita escrituras cruzadas.
+        async with ctx.product_lock(product.id):
+            width, height, derived = await asyncio.get_running_loop().run_in_executor(
+                ctx.executor, _render_image, str(target), str(out_dir), base
             )
-
-        # Crear ImageReview
-        db.add(ImageReview(image_id=img.id, status="pending"))
-
-        await db.commit()
-
-        # Mover archivo a "Procesados"
-        await drive_sync.move_file(file_id, processed_folder_id)
-
-    finally:
-        if temp_file and temp_file.exists():
-            try:
-                temp_file.unlink()
-            except Exception:
-                pass
+    except Exception as e:
+        logger.error(f"Imagen corrupta o inválida {target}: {e}")
+        # Limpiar archivo corrupto
+        try:
+            target.unlink()
+        except Exception:
+            pass
+        ctx.known.pop(key, None)
+        raise
+
+    # Crear registro Image
+    rel_path = str(target.relative_to(root))
+    # Normalizar separadores para URLs (Windows usa backslashes)
+    rel_path_normalized = rel_path.replace('\\', '/')
+    img = Image(
+        product_id=product.id,
+        url=f"/media/{rel_path_normalized}",
+        path=rel_path,  # Mantener path original (puede tener backslashes para compatibilidad)
+        mime=mime_type,
+        bytes=len(content),
+        width=width,
+        height=height,
+        checksum_sha256=checksum,
+    )
+    versions: list[dict[str, Any]] = [
+        {
+            "kind": "original",
+            "path": rel_path_normalized,
+            "size_bytes": len(content),
+            "mime": mime_type,
+            "source_url": f"drive://{file_id}",
+        }
+    ]
+    for kind, px in (("thumb", 256), ("card", 800), ("full", 1600)):
+        relv = str(Path(derived[kind]).relative_to(root)).replace('\\', '/')
+        versions.append({"kind": kind, "path": relv, "width": px, "height": px, "mime": "image/webp"})
+    ctx.batch.add(_PendingImage(file_id=file_id, image=img, versions=versions, files=[target]))
+    return True
 
 
 async def _save_error_log(
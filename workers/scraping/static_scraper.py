@@ -27,11 +27,17 @@ from urllib.parse import urlparse
 import requests
 from bs4 import BeautifulSoup
 
+from services import http_clients
 from workers.scraping.price_normalizer import normalize_price as normalize_price_with_currency
 
 logger = logging.getLogger(__name__)
 
 
+def _http_get(url: str, **kwargs) -> requests.Response:
+    """GET vía la sesión compartida de scraping (keep-alive entre URLs del mismo sitio)."""
+    return http_clients.get_session("scraping").get(url, **kwargs)
+
+
 class ScrapingError(Exception):
     """Error genérico de scraping."""
     pass
@@ -87,7 +93,7 @@ def scrape_static_price(url: str, timeout: int = 10) -> Tuple[Optional[Decimal],
     }
     
     try:
-        response = requests.get(url, headers=headers, timeout=timeout)
+        response = _http_get(url, headers=headers, timeout=timeout)
         response.raise_for_status()
     except requests.exceptions.Timeout:
         logger.error(f"Timeout al acceder a {url}")
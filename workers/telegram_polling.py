@@ -42,6 +42,7 @@ from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sess
 from agent_core.config import settings
 from services.chat.telegram_handler import handle_telegram_message
 from services.notifications.telegram import send_message as tg_send
+from services import http_clients
 
 # Resolver ROOT antes de configurar logging
 ROOT = Path(__file__).resolve().parent.parent
@@ -147,16 +148,15 @@ async def delete_webhook(token: str) -> bool:
     """
     url = f"{TELEGRAM_API_BASE}/bot{token}/deleteWebhook"
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            resp = await client.post(url, json={"drop_pending_updates": True})
-            resp.raise_for_status()
-            result = resp.json()
-            if result.get("ok"):
-                logger.info("✓ Webhook eliminado exitosamente")
-                return True
-            else:
-                logger.warning(f"⚠ Error eliminando webhook: {result.get('description', 'Unknown')}")
-                return False
+        resp = await http_clients.get_client("telegram").post(url, json={"drop_pending_updates": True})
+        resp.raise_for_status()
+        result = resp.json()
+        if result.get("ok"):
+            logger.info("✓ Webhook eliminado exitosamente")
+            return True
+        else:
+            logger.warning(f"⚠ Error eliminando webhook: {result.get('description', 'Unknown')}")
+            return False
     except Exception as e:
         logger.error(f"✗ Error al eliminar webhook: {e}")
         return False
@@ -187,16 +187,17 @@ async def get_updates(
         params["offset"] = offset
     
     try:
-        async with httpx.AsyncClient(timeout=timeout + 10) as client:  # Timeout mayor que polling
-            resp = await client.get(url, params=params)
-            resp.raise_for_status()
-            result = resp.json()
-            # Log detallado si hay error en la respuesta de Telegram
-            if not result.get("ok"):
-                error_code = result.get("error_code")
-                description = result.get("description", "Unknown error")
-                logger.error(f"✗ Telegram API error: code={error_code}, description={description}")
-            return result
+        # Conexión keep-alive reutilizada entre polls; timeout mayor que el del long polling
+        client = http_clients.get_client("telegram_polling")
+        resp = await client.get(url, params=params, timeout=timeout + 10)
+        resp.raise_for_status()
+        result = resp.json()
+        # Log detallado si hay error en la respuesta de Telegram
+        if not result.get("ok"):
+            error_code = result.get("error_code")
+            description = result.get("description", "Unknown error")
+            logger.error(f"✗ Telegram API error: code={error_code}, description={description}")
+        return result
     except httpx.TimeoutException:
         # Timeout es normal en long polling, no es un error
         logger.debug("Timeout en getUpdates (normal en long polling)")
@@ -278,18 +279,17 @@ async def run_polling() -> None:
     logger.info("Verificando conexión con Telegram API...")
     try:
         test_url = f"{TELEGRAM_API_BASE}/bot{TELEGRAM_BOT_TOKEN}/getMe"
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            test_resp = await client.get(test_url)
-            test_resp.raise_for_status()
-            test_result = test_resp.json()
-            if test_result.get("ok"):
-                bot_info = test_result.get("result", {})
-                bot_username = bot_info.get("username", "N/A")
-                bot_id = bot_info.get("id", "N/A")
-                logger.info(f"✓ Conexión exitosa con Telegram. Bot: @{bot_username} (ID: {bot_id})")
-            else:
-                logger.error(f"✗ Error verificando bot: {test_result.get('description', 'Unknown error')}")
-                return
+        test_resp = await http_clients.get_client("telegram").get(test_url)
+        test_resp.raise_for_status()
+        test_result = test_resp.json()
+        if test_result.get("ok"):
+            bot_info = test_result.get("result", {})
+            bot_username = bot_info.get("username", "N/A")
+            bot_id = bot_info.get("id", "N/A")
+            logger.info(f"✓ Conexión exitosa con Telegram. Bot: @{bot_username} (ID: {bot_id})")
+        else:
+            logger.error(f"✗ Error verificando bot: {test_result.get('description', 'Unknown error')}")
+            return
     except Exception as e:
         logger.error(f"✗ Error de conexión con Telegram API: {e}")
         logger.error("Verificar que TELEGRAM_BOT_TOKEN sea correcto y que haya conexión a internet")
@@ -435,10 +435,17 @@ async def run_polling() -> None:
     logger.info("Worker de Telegram detenido.")
 
 
+async def _run_and_close() -> None:
+    try:
+        await run_polling()
+    finally:
+        await http_clients.aclose_all()
+
+
 def main() -> None:
     """Función principal para ejecutar el worker."""
     try:
-        asyncio.run(run_polling())
+        asyncio.run(_run_and_close())
     except KeyboardInterrupt:
         logger.info("Worker interrumpido por el usuario.")
     except Exception as e: